@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""T2 bucket: per-closer ticket counts + version column for compare-and-swap draws
+
+Revision ID: t2_counts_01
+Revises: add_fk_constr01
+Create Date: 2026-04-01
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = 't2_counts_01'
+down_revision = 'add_fk_constr01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('t2_bucket_state', sa.Column('ticket_counts', sa.JSON(), nullable=True))
+    op.add_column(
+        't2_bucket_state',
+        sa.Column('version', sa.Integer(), nullable=False, server_default='0')
+    )
+    # ticket_counts bleibt NULL und wird beim ersten Draw aus der Legacy-Liste abgeleitet
+
+
+def downgrade():
+    op.drop_column('t2_bucket_state', 'version')
+    op.drop_column('t2_bucket_state', 'ticket_counts')
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""T2 analytics: composite (user, timestamp) indexes + indexed search expressions
+
+Revision ID: t2_analytics_idx01
+Revises: t2_counts_01
+Create Date: 2026-04-05
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = 't2_analytics_idx01'
+down_revision = 't2_counts_01'
+branch_labels = None
+depends_on = None
+
+
+def _trigram_available(bind) -> bool:
+    """pg_trgm anlegen, falls erlaubt (Savepoint, damit ein Fehlschlag die Migration nicht abbricht)"""
+    try:
+        with bind.begin_nested():
+            bind.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        return True
+    except Exception:
+        return False
+
+
+def upgrade():
+    # IF NOT EXISTS: create_all() legt die Modell-Indizes bei frischen Datenbanken bereits an
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_draw_history_user_drawn_at "
+        "ON t2_draw_history (username, drawn_at)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_t2_booking_user_created "
+        'ON t2_bookings ("user", created_at)'
+    )
+
+    # Suche: lower(...) LIKE '%q%' -> Trigram-GIN, sonst B-Tree auf dem Ausdruck
+    if _trigram_available(op.get_bind()):
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS idx_draw_history_customer_search "
+            "ON t2_draw_history USING gin (lower(customer_name) gin_trgm_ops)"
+        )
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS idx_draw_history_closer_search "
+            "ON t2_draw_history USING gin (lower(closer_drawn) gin_trgm_ops)"
+        )
+    else:
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS idx_draw_history_customer_search "
+            "ON t2_draw_history (username, lower(customer_name))"
+        )
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS idx_draw_history_closer_search "
+            "ON t2_draw_history (username, lower(closer_drawn))"
+        )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS idx_draw_history_closer_search")
+    op.execute("DROP INDEX IF EXISTS idx_draw_history_customer_search")
+    op.execute("DROP INDEX IF EXISTS idx_t2_booking_user_created")
+    op.execute("DROP INDEX IF EXISTS idx_draw_history_user_drawn_at")
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Lootbox: append-only lootbox_history table, legacy history lists moved over
+
+Revision ID: lootbox_hist01
+Revises: t2_analytics_idx01
+Create Date: 2026-04-10
+"""
+
+from alembic import op
+
+revision = 'lootbox_hist01'
+down_revision = 't2_analytics_idx01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # IF NOT EXISTS: create_all() legt die Tabelle bei frischen Datenbanken bereits an
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS lootbox_history ("
+        "id SERIAL PRIMARY KEY, "
+        "username VARCHAR(100) NOT NULL, "
+        "crate_id VARCHAR(20) NOT NULL, "
+        "crate_type VARCHAR(20) NOT NULL, "
+        "reward JSON NOT NULL, "
+        "opened_at TIMESTAMP NOT NULL, "
+        "created_at TIMESTAMP NOT NULL DEFAULT now(), "
+        "updated_at TIMESTAMP NOT NULL DEFAULT now())"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_lootbox_history_user_id "
+        "ON lootbox_history (username, id)"
+    )
+
+    # Bisherige (gekuerzte) History-Listen in Oeffnungsreihenfolge uebernehmen
+    op.execute(
+        "INSERT INTO lootbox_history (username, crate_id, crate_type, reward, opened_at) "
+        "SELECT d.username, e.value->>'crate_id', e.value->>'crate_type', e.value->'reward', "
+        "(e.value->>'opened_at')::timestamptz AT TIME ZONE 'Europe/Berlin' "
+        "FROM lootbox_data d, json_array_elements(d.history) WITH ORDINALITY AS e(value, pos) "
+        "WHERE d.history IS NOT NULL AND json_typeof(d.history) = 'array' "
+        "ORDER BY d.username, e.pos"
+    )
+    op.execute("UPDATE lootbox_data SET history = NULL WHERE history IS NOT NULL")
+
+
+def downgrade():
+    op.execute(
+        "UPDATE lootbox_data d SET history = h.entries FROM ("
+        "SELECT username, json_agg(json_build_object("
+        "'crate_id', crate_id, 'crate_type', crate_type, 'reward', reward, "
+        "'opened_at', to_char(opened_at, 'YYYY-MM-DD\"T\"HH24:MI:SS')) ORDER BY id) AS entries "
+        "FROM lootbox_history GROUP BY username) h "
+        "WHERE d.username = h.username"
+    )
+    op.execute("DROP INDEX IF EXISTS idx_lootbox_history_user_id")
+    op.execute("DROP TABLE IF EXISTS lootbox_history")
@@ -43,6 +43,8 @@ def create_app(config_object: Optional[str] = None) -> Flask:
     # Strip trailing /N to get base URL for DB separation
     _redis_base = _redis_url.rsplit("/", 1)[0] if _redis_url.count("/") > 2 else _redis_url
 
+    from app.config.base import HubSpotConfig
+
     app.config["CELERY"] = {
         "broker_url": f"{_redis_base}/1",
         "result_backend": f"{_redis_base}/2",
@@ -59,8 +61,19 @@ def create_app(config_object: Optional[str] = None) -> Flask:
         "task_always_eager": os.getenv("CELERY_TASK_ALWAYS_EAGER", "false").lower()
             in ["true", "1", "yes"],
         "task_eager_propagates": True,
+        "beat_schedule": {
+            "hubspot-snapshot-refresh": {
+                "task": "app.services.hubspot_tasks.refresh_hubspot_snapshot_task",
+                "schedule": float(HubSpotConfig.HUBSPOT_SNAPSHOT_INTERVAL),
+            },
+        },
     }
 
+    # Request-Metriken (Latenz-Histogramme, SQL/API/JSON-Zähler) - vor allen
+    # anderen Hooks, damit die gemessene Zeit den ganzen Request umfasst
+    from app.utils.request_metrics import request_metrics
+    request_metrics.init_app(app)
+
     # Extensions initialisieren (bestehende)
     from app.core.extensions import init_extensions
     init_extensions(app)
@@ -147,7 +160,12 @@ def setup_logging(app: Flask) -> None:
             '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
         ))
         app_handler.setLevel(logging.INFO)
-        app.logger.addHandler(app_handler)
+
+        # Rotation und Schreiben im Listener-Thread, nicht im Request
+        from app.utils.logging import queued_handlers
+        for handler in queued_handlers('hub', app_handler):
+            if handler not in app.logger.handlers:
+                app.logger.addHandler(handler)
         app.logger.setLevel(logging.INFO)
 
 
@@ -339,6 +357,11 @@ def register_blueprints(app: Flask) -> None:
         if csrf:
             csrf.exempt(hubspot_webhook_bp)
         app.logger.info("HubSpot webhook blueprint registered")
+        # Drain-Thread sofort starten: Batches von vor einem Neustart liegen sonst
+        # bis zum nächsten Webhook in der Inbox
+        if not app.testing and os.getenv('TESTING', '').lower() not in ('true', '1'):
+            from app.services.hubspot_webhook_inbox import webhook_inbox
+            webhook_inbox.start()
     except ImportError as e:
         app.logger.warning(f"HubSpot webhook blueprint error: {e}")
 
@@ -494,6 +517,11 @@ def register_request_hooks(app: Flask) -> None:
             session['last_activity'] = datetime.now().isoformat()
             session.modified = True  # Force session TTL refresh on every request
 
+            # Presence-Heartbeat (ZADD bzw. In-Process-Dict, kein Datei-Rewrite)
+            if request.endpoint and not request.endpoint.startswith('static'):
+                from app.services.activity_tracking import activity_tracking
+                activity_tracking.update_online_status(session['user'], getattr(session, 'sid', ''))
+
         # Request-Logging für wichtige Endpoints
         if request.endpoint and not request.endpoint.startswith('static'):
             app.logger.debug(f'Request: {request.method} {request.path} from {request.remote_addr}')
@@ -208,6 +208,8 @@ class SecurityConfig:
     LOCKOUT_DURATION_TIER1: int = 15      # Minuten
     LOCKOUT_DURATION_TIER2: int = 60      # Minuten
     LOCKOUT_DURATION_TIER3: int = 1440    # Minuten (24h)
+    # Fehlversuche verfallen so lange nach dem letzten Versuch (Minuten)
+    LOCKOUT_ATTEMPT_WINDOW: int = int(os.getenv("LOCKOUT_ATTEMPT_WINDOW", "1440"))
 
     # Online-User Erkennung
     ONLINE_USER_TIMEOUT_MINUTES: int = 15
@@ -327,6 +329,13 @@ class HubSpotConfig:
     # Cache-TTL für HubSpot-Daten (Sekunden)
     HUBSPOT_CACHE_TTL: int = int(os.getenv("HUBSPOT_CACHE_TTL", "1800"))  # 30 Minuten
 
+    # Analytics-Snapshot: Refresh-Intervall des Celery-Beat-Tasks (Sekunden).
+    # Ist der Snapshot älter als 2x Intervall (Beat läuft nicht), baut der
+    # erste Request ihn single-flight neu auf.
+    HUBSPOT_SNAPSHOT_INTERVAL: int = int(os.getenv("HUBSPOT_SNAPSHOT_INTERVAL", "900"))  # 15 Minuten
+    # Max. Wartezeit für Requests, während ein anderer Worker den ersten Snapshot baut
+    HUBSPOT_SNAPSHOT_WAIT: int = int(os.getenv("HUBSPOT_SNAPSHOT_WAIT", "30"))
+
 
 # ========== GOOGLE CALENDAR API KONFIGURATION ==========
 class GoogleCalendarConfig:
@@ -369,6 +378,15 @@ class FinanzConfig:
     FINANZ_LLM_BASE_URL: str = os.getenv("FINANZ_LLM_BASE_URL", "http://localhost:8000/v1")
     FINANZ_LLM_TIMEOUT: int = int(os.getenv("FINANZ_LLM_TIMEOUT", "30"))
     FINANZ_LLM_TIMEOUT_EXTRACTION: int = int(os.getenv("FINANZ_LLM_TIMEOUT_EXTRACTION", "60"))
+    # Gleichzeitige Requests pro Prozess (Batch-API + HTTP-Pool)
+    FINANZ_LLM_MAX_CONCURRENCY: int = int(os.getenv("FINANZ_LLM_MAX_CONCURRENCY", "4"))
+    # Antwort-Cache (Modell + Prompt-Hash + Sampling-Parameter), LRU bis zur Größe
+    FINANZ_LLM_CACHE_ENABLED: bool = get_env_bool("FINANZ_LLM_CACHE_ENABLED", True)
+    FINANZ_LLM_CACHE_MAX_MB: int = int(os.getenv("FINANZ_LLM_CACHE_MAX_MB", "64"))
+    # Budget pro Prozess und Minute (0 = unbegrenzt); darüber warten Aufrufer bis MAX_WAIT
+    FINANZ_LLM_BUDGET_REQUESTS_PER_MIN: int = int(os.getenv("FINANZ_LLM_BUDGET_REQUESTS_PER_MIN", "0"))
+    FINANZ_LLM_BUDGET_TOKENS_PER_MIN: int = int(os.getenv("FINANZ_LLM_BUDGET_TOKENS_PER_MIN", "0"))
+    FINANZ_LLM_BUDGET_MAX_WAIT: int = int(os.getenv("FINANZ_LLM_BUDGET_MAX_WAIT", "120"))
 
     # Upload limits
     FINANZ_MAX_FILE_SIZE_MB: int = int(os.getenv("FINANZ_MAX_FILE_SIZE_MB", "50"))
@@ -376,6 +394,12 @@ class FinanzConfig:
     FINANZ_ALLOWED_EXTENSIONS: list = get_env_list(
         "FINANZ_ALLOWED_EXTENSIONS", ["pdf", "jpg", "jpeg", "png", "tiff", "heic"]
     )
+    # Uploads werden in Blöcken dieser Größe gestreamt (Hash + Magic-Bytes im selben Durchlauf)
+    FINANZ_UPLOAD_BUFFER_KB: int = int(os.getenv("FINANZ_UPLOAD_BUFFER_KB", "256"))
+    # Fortsetzbare Uploads: max. Größe eines Chunks, Aufbewahrung unvollständiger Uploads
+    FINANZ_UPLOAD_CHUNK_MAX_MB: int = int(os.getenv("FINANZ_UPLOAD_CHUNK_MAX_MB", "8"))
+    FINANZ_UPLOAD_PARTIAL_TTL: int = int(os.getenv("FINANZ_UPLOAD_PARTIAL_TTL", "86400"))  # 24h
+    FINANZ_UPLOAD_MAX_PARTIALS_PER_TOKEN: int = int(os.getenv("FINANZ_UPLOAD_MAX_PARTIALS_PER_TOKEN", "5"))
 
     # Token TTLs (seconds)
     FINANZ_TOKEN_TTL_T1: int = int(os.getenv("FINANZ_TOKEN_TTL_T1", "7200"))           # 2h
@@ -388,6 +412,24 @@ class FinanzConfig:
     )
     FINANZ_CHUNK_SIZE: int = int(os.getenv("FINANZ_CHUNK_SIZE", "4000"))
     FINANZ_CHUNK_OVERLAP: int = int(os.getenv("FINANZ_CHUNK_OVERLAP", "200"))
+    # Micro-batching: chunks across documents bis Größe oder Wartezeit erreicht
+    FINANZ_EMBED_BATCH_SIZE: int = int(os.getenv("FINANZ_EMBED_BATCH_SIZE", "64"))
+    FINANZ_EMBED_BATCH_WAIT_MS: int = int(os.getenv("FINANZ_EMBED_BATCH_WAIT_MS", "50"))
+    # Modell beim Start jedes Celery-Worker-Prozesses laden (worker_process_init)
+    FINANZ_EMBED_PRELOAD: bool = get_env_bool("FINANZ_EMBED_PRELOAD", True)
+    FINANZ_EMBED_CACHE_ENABLED: bool = get_env_bool("FINANZ_EMBED_CACHE_ENABLED", True)
+
+    # Page-level PDF extraction / OCR
+    FINANZ_EXTRACT_WORKERS: int = int(os.getenv("FINANZ_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+    # process | thread (thread reicht, wenn tesseract als Subprozess die Arbeit macht)
+    FINANZ_EXTRACT_POOL: str = os.getenv("FINANZ_EXTRACT_POOL", "process").lower()
+    # Seiten mit weniger Zeichen (auf A4 normiert) werden per OCR gelesen
+    FINANZ_OCR_MIN_CHARS_PER_PAGE: int = int(os.getenv("FINANZ_OCR_MIN_CHARS_PER_PAGE", "100"))
+    FINANZ_OCR_DPI: int = int(os.getenv("FINANZ_OCR_DPI", "300"))
+    # Speicherdeckel: gleichzeitig gerasterte Seiten und max. Pixel pro Seite
+    FINANZ_OCR_MAX_RASTER_PAGES: int = int(os.getenv("FINANZ_OCR_MAX_RASTER_PAGES", "2"))
+    FINANZ_OCR_MAX_PIXELS: int = int(os.getenv("FINANZ_OCR_MAX_PIXELS", str(40_000_000)))
+    FINANZ_OCR_LANG: str = os.getenv("FINANZ_OCR_LANG", "deu")
 
     # Cache
     FINANZ_CACHE_TTL: int = int(os.getenv("FINANZ_CACHE_TTL", "1800"))  # 30 min
@@ -410,6 +452,21 @@ class FinanzConfig:
         """Return the ChromaDB persistence directory path."""
         return os.path.join(Config.PERSIST_BASE, 'chroma_db')
 
+    @classmethod
+    def get_page_cache_dir(cls) -> str:
+        """Return the per-page extracted text cache directory (keyed by file_hash)."""
+        return os.path.join(Config.PERSIST_BASE, 'finanz_page_cache')
+
+    @classmethod
+    def get_embedding_cache_path(cls) -> str:
+        """Return the embedding cache database path (keyed by chunk content hash)."""
+        return os.path.join(Config.PERSIST_BASE, 'embedding_cache.sqlite3')
+
+    @classmethod
+    def get_llm_cache_path(cls) -> str:
+        """Return the LLM response cache database path (keyed by model + prompt hash + params)."""
+        return os.path.join(Config.PERSIST_BASE, 'llm_cache.sqlite3')
+
 
 # ========== LOGGING KONFIGURATION ==========
 class LoggingConfig:
@@ -436,6 +493,8 @@ class StorageConfig:
     # Backup-Einstellungen
     MAX_BACKUPS: int = int(os.getenv("MAX_BACKUPS", "10"))
     BACKUP_RETENTION_DAYS: int = int(os.getenv("BACKUP_RETENTION_DAYS", "30"))
+    # Höchstens ein Snapshot pro Datei und Intervall (Sekunden)
+    BACKUP_MIN_INTERVAL: float = float(os.getenv("BACKUP_MIN_INTERVAL", "60"))
 
     # JSON-Optimierung
     ENABLE_JSON_OPTIMIZATION: bool = os.getenv("ENABLE_JSON_OPTIMIZATION", "True").lower() in ["true", "1", "yes"]
@@ -21,6 +21,18 @@ class LoggingConfig:
     # Log-Datei (optional)
     LOG_FILE = os.getenv('LOG_FILE', None)
 
+    # Asynchrone Log-Pipeline (QueueHandler/QueueListener pro Worker)
+    LOG_QUEUE_ENABLED = os.getenv('LOG_QUEUE_ENABLED', 'true').lower() == 'true'
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+    # drop_new | drop_old | block
+    LOG_QUEUE_OVERFLOW = os.getenv('LOG_QUEUE_OVERFLOW', 'drop_new').lower()
+    # Max. Wartezeit bei 'block' (und für ERROR+ bei den drop-Policies), danach verwerfen
+    LOG_QUEUE_BLOCK_TIMEOUT = float(os.getenv('LOG_QUEUE_BLOCK_TIMEOUT', '0.05'))
+
+    # Sampling für gesprächige Logger: "calendar_api=0.1,app.services.tracking_system=0.05"
+    # (gilt für DEBUG/INFO, Logger-Name als Präfix; WARNING+ wird nie gesampelt)
+    LOG_SAMPLING = os.getenv('LOG_SAMPLING', '')
+
     # Performance-Threshold für langsame Queries (ms)
     SLOW_QUERY_THRESHOLD = int(os.getenv('SLOW_QUERY_THRESHOLD', '1000'))
 
@@ -33,5 +33,14 @@ def celery_init_app(app: Flask) -> Celery:
     celery_app.config_from_object(app.config["CELERY"])
     celery_app.set_default()
     app.extensions["celery"] = celery_app
+
+    # Warm the embedding model once per worker process instead of on the
+    # first embed task (no-op unless FINANZ_ENABLED)
+    from celery.signals import worker_process_init
+    from app.services.finanz_embedding_service import preload_embedding_model
+    worker_process_init.connect(
+        preload_embedding_model, weak=False, dispatch_uid="finanz_embedding_preload"
+    )
+
     logger.info("Celery initialized successfully")
     return celery_app
@@ -8,6 +8,8 @@ from flask import Flask
 from typing import Optional
 import logging
 
+from app.core.startup_tasks import startup_runner, MODE_ONCE, MODE_CLI
+
 # Logger setup
 logger = logging.getLogger(__name__)
 
@@ -27,65 +29,82 @@ def init_extensions(app: Flask) -> None:
     """Initialize all Flask extensions and external services"""
     global cache_manager, data_persistence, error_handler, level_system, tracking_system, hubspot_service, limiter, csrf, sess
 
+    startup_runner.clear()
+
     # Import and initialize cache manager
-    from app.core.cache_manager import cache_manager as cm
-    cache_manager = cm
+    with startup_runner.timed("cache_manager"):
+        from app.core.cache_manager import cache_manager as cm
+        cache_manager = cm
 
     # Import and initialize data persistence
-    from app.services.data_persistence import data_persistence as dp
-    data_persistence = dp
-
-    # Initialize data persistence from static if missing
-    try:
-        data_persistence.bootstrap_from_static_if_missing()
-        data_persistence.auto_cleanup_backups()
-        data_persistence.validate_data_integrity()
-        data_persistence.validate_scores_integrity()
-    except Exception as e:
-        logger.warning(f"Persistenz-Init Hinweis", extra={'error': str(e)})
+    with startup_runner.timed("data_persistence"):
+        from app.services.data_persistence import data_persistence as dp
+        data_persistence = dp
+
+    # Wartung beim Boot: einmal pro Deploy statt in jedem Worker (siehe startup_tasks)
+    # Static-Bootstrap muss vor dem ersten Request fertig sein
+    startup_runner.register("bootstrap_from_static", data_persistence.bootstrap_from_static_if_missing, MODE_ONCE)
+    # Cleanup und Integritätsprüfungen laufen über startup-maintenance.timer
+    # (nach dem Boot und nachts), nicht in den Workern
+    startup_runner.register("auto_cleanup_backups", data_persistence.auto_cleanup_backups, MODE_CLI)
+    startup_runner.register("validate_data_integrity", data_persistence.validate_data_integrity, MODE_CLI)
+    startup_runner.register("validate_scores_integrity", data_persistence.validate_scores_integrity, MODE_CLI)
+
+    # Abgebrochene Finanz-Uploads (Kundendokumente) nach FINANZ_UPLOAD_PARTIAL_TTL entfernen
+    def _sweep_finanz_partial_uploads():
+        from app.services.finanz_upload_service import FinanzUploadService
+        FinanzUploadService().sweep_all_partials()
+
+    startup_runner.register("sweep_finanz_partial_uploads", _sweep_finanz_partial_uploads, MODE_CLI)
 
     # Pre-hash USERLIST passwords to eliminate plaintext fallback
-    try:
+    def _migrate_userlist_passwords():
         from app.services.security_service import security_service
         security_service.migrate_userlist_passwords()
-    except Exception as e:
-        logger.warning(f"USERLIST password migration skipped: {e}")
+
+    startup_runner.register("migrate_userlist_passwords", _migrate_userlist_passwords, MODE_ONCE)
 
     # Import and initialize error handler
-    from app.utils.error_handler import error_handler as eh
-    error_handler = eh
-    error_handler.init_app(app)
+    with startup_runner.timed("error_handler"):
+        from app.utils.error_handler import error_handler as eh
+        error_handler = eh
+        error_handler.init_app(app)
 
     # Import and initialize level system
-    from app.services.level_system import level_system as ls
-    level_system = ls
+    with startup_runner.timed("level_system"):
+        from app.services.level_system import level_system as ls
+        level_system = ls
 
     # Import and initialize tracking system
-    try:
-        from app.services.tracking_system import BookingTracker
-        tracking_system = BookingTracker()
-        _verify_tracking_write_access(tracking_system)
-
-        # Tracking-Luecken erkennen
+    with startup_runner.timed("tracking_system"):
         try:
-            gaps = tracking_system.detect_tracking_gaps(lookback_days=14)
-            if gaps:
-                logger.warning(f"Tracking gaps on startup: {len(gaps)} missing workdays")
-        except Exception as gap_err:
-            logger.debug(f"Gap detection skipped: {gap_err}")
+            from app.services.tracking_system import BookingTracker
+            tracking_system = BookingTracker()
+            _verify_tracking_write_access(tracking_system)
 
-    except Exception as e:
-        logger.warning(f"Could not initialize tracking system", extra={'error': str(e)})
-        tracking_system = None
+            # Tracking-Luecken erkennen
+            tracker = tracking_system
+
+            def _detect_tracking_gaps():
+                gaps = tracker.detect_tracking_gaps(lookback_days=14)
+                if gaps:
+                    logger.warning(f"Tracking gaps on startup: {len(gaps)} missing workdays")
+
+            startup_runner.register("detect_tracking_gaps", _detect_tracking_gaps, MODE_CLI)
+
+        except Exception as e:
+            logger.warning(f"Could not initialize tracking system", extra={'error': str(e)})
+            tracking_system = None
 
     # Initialize HubSpot CRM Integration (graceful degradation)
-    try:
-        from app.services.hubspot_service import hubspot_service as hs
-        hubspot_service = hs
-        hubspot_service.init_app(app)
-    except Exception as e:
-        logger.info(f"HubSpot integration not initialized: {e}")
-        hubspot_service = None
+    with startup_runner.timed("hubspot"):
+        try:
+            from app.services.hubspot_service import hubspot_service as hs
+            hubspot_service = hs
+            hubspot_service.init_app(app)
+        except Exception as e:
+            logger.info(f"HubSpot integration not initialized: {e}")
+            hubspot_service = None
 
     # Initialize CSRF Protection (Security Critical — app MUST NOT run without it)
     try:
@@ -136,18 +155,27 @@ def init_extensions(app: Flask) -> None:
             limiter = None
 
     # Initialize Flask-Session with Redis backend (if available)
-    init_session_storage(app)
+    with startup_runner.timed("session_storage"):
+        init_session_storage(app)
 
     # Initialize Celery task queue (graceful degradation if Redis unavailable)
-    try:
-        from app.core.celery_init import celery_init_app
-        celery_app = celery_init_app(app)
+    with startup_runner.timed("celery"):
+        try:
+            from app.core.celery_init import celery_init_app
+            celery_app = celery_init_app(app)
 
-        # Auto-discover task modules
-        celery_app.autodiscover_tasks(['app.services'], related_name='finanz_tasks')
-    except Exception as e:
-        logger.info(f"Celery not initialized: {e}")
+            # Auto-discover task modules
+            celery_app.autodiscover_tasks(['app.services'], related_name='finanz_tasks')
+            celery_app.autodiscover_tasks(['app.services'], related_name='hubspot_tasks')
+        except Exception as e:
+            logger.info(f"Celery not initialized: {e}")
+
+    # once-Tasks jetzt, deferred-Tasks nach dem Boot im Hintergrund
+    # (in Tests synchron, damit kein Thread die Testdaten überlebt)
+    with startup_runner.timed("startup_tasks"):
+        startup_runner.run_boot(defer_inline=app.testing or os.getenv('TESTING', '').lower() in ('true', '1'))
 
+    startup_runner.log_report()
     logger.info("All extensions initialized successfully")
 
 
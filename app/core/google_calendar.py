@@ -15,6 +15,7 @@ from googleapiclient.errors import HttpError
 from app.utils.credentials import load_google_credentials
 from app.config.base import config, slot_config
 from app.utils.logging import calendar_logger
+from app.utils.request_metrics import InstrumentedClient
 
 
 class GoogleCalendarService:
@@ -40,7 +41,13 @@ class GoogleCalendarService:
         """Initialize Google Calendar API service"""
         try:
             creds = load_google_credentials(config.SCOPES)
-            self.service = build("calendar", "v3", credentials=creds)
+            # Nur .execute() löst einen HTTP-Call aus -> pro Request gezählt
+            self.service = InstrumentedClient(
+                build("calendar", "v3", credentials=creds),
+                "calendar_calls",
+                count_if=lambda name: name == "execute",
+                wrap_results=True,
+            )
             calendar_logger.info("Google Calendar service initialized successfully")
         except Exception as e:
             calendar_logger.error(f"Failed to initialize Google Calendar service: {e}")
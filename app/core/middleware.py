@@ -28,7 +28,9 @@ def init_middleware(app: Flask) -> None:
             'health.readiness_check',
             'health.liveness_check',
             'health.metrics',
-            'health.ping'
+            'health.ping',
+            # HubSpot-Webhook authentifiziert per Signatur (X-HubSpot-Signature-v3)
+            'hubspot_webhook.handle_webhook'
         ]
 
         # Allow access to public endpoints
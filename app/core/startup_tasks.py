@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+Startup-Task-Runner für init_extensions
+
+Wartungsarbeiten beim Boot (Backup-Cleanup, Integritätsprüfungen,
+Passwort-Migration, Tracking-Lücken) liefen bisher in jedem Gunicorn-Worker
+synchron vor dem ersten Request. Jeder Task hat jetzt einen Modus:
+
+- ``once``:     einmal pro Deploy, synchron beim Boot. Ein Worker gewinnt den
+                Cross-Process-Lock, die anderen warten darauf und überspringen
+                den Task danach (Marker-Datei mit Deploy-ID).
+- ``deferred``: einmal pro Deploy in einem Hintergrund-Thread, nachdem der
+                Worker Requests annimmt. Läuft der Task bereits in einem anderen
+                Worker, wird er übersprungen.
+- ``cli``:      nicht beim Boot; ``scripts/run_startup_tasks.py`` bzw. der
+                systemd-Timer ``startup-maintenance.timer`` führt ihn aus.
+
+Modi lassen sich per ``STARTUP_TASK_MODES="name=mode,..."`` überschreiben.
+Jeder Lauf erfasst Dauer und Ergebnis; ``report()`` liefert zusammen mit den
+Boot-Abschnitten (``timed``) den Boot-Timing-Report.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.utils.file_lock import file_lock, FileLockException
+
+logger = logging.getLogger(__name__)
+
+MODE_ONCE = "once"
+MODE_DEFERRED = "deferred"
+MODE_CLI = "cli"
+MODES = (MODE_ONCE, MODE_DEFERRED, MODE_CLI)
+
+STARTUP_TASKS_ENABLED = os.getenv("STARTUP_TASKS", "on").lower() not in ("off", "false", "0")
+STARTUP_DEFER_DELAY = float(os.getenv("STARTUP_DEFER_DELAY", "5"))
+# Wie lange ein Worker beim Boot auf einen once-Task eines anderen Workers wartet
+STARTUP_LOCK_TIMEOUT = float(os.getenv("STARTUP_LOCK_TIMEOUT", "120"))
+
+
+def _deploy_id() -> str:
+    """
+    ID des aktuellen Deploys
+
+    Ohne DEPLOY_ID/GIT_COMMIT gilt jeder Neustart des Gunicorn-Masters als
+    neuer Deploy (alle Worker haben denselben Parent-Prozess).
+    """
+    return os.getenv("DEPLOY_ID") or os.getenv("GIT_COMMIT") or f"boot-{os.getppid()}"
+
+
+def _mode_overrides() -> Dict[str, str]:
+    overrides = {}
+    for item in os.getenv("STARTUP_TASK_MODES", "").split(","):
+        name, _, mode = item.partition("=")
+        name, mode = name.strip(), mode.strip().lower()
+        if name and mode in MODES:
+            overrides[name] = mode
+        elif name:
+            logger.warning(f"Ignoring invalid STARTUP_TASK_MODES entry: {item!r}")
+    return overrides
+
+
+class StartupTaskRunner:
+    """Registriert Boot-Tasks und führt sie je nach Modus aus"""
+
+    def __init__(self, state_dir: Optional[Path] = None, deploy_id: Optional[str] = None,
+                 defer_delay: float = STARTUP_DEFER_DELAY,
+                 lock_timeout: float = STARTUP_LOCK_TIMEOUT):
+        self._state_dir = Path(state_dir) if state_dir else None
+        self.deploy_id = deploy_id or _deploy_id()
+        self.defer_delay = defer_delay
+        self.lock_timeout = lock_timeout
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._sections: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._deferred_thread: Optional[threading.Thread] = None
+
+    @property
+    def state_dir(self) -> Path:
+        if self._state_dir is None:
+            from app.services.data_persistence import data_persistence
+            self._state_dir = Path(data_persistence.data_dir) / ".startup"
+        self._state_dir.mkdir(parents=True, exist_ok=True)
+        return self._state_dir
+
+    # ========== Registrierung ==========
+
+    def register(self, name: str, func: Callable[[], Any], mode: str = MODE_ONCE) -> None:
+        """Registriert einen Task (``STARTUP_TASK_MODES`` hat Vorrang vor ``mode``)"""
+        mode = _mode_overrides().get(name, mode)
+        if mode not in MODES:
+            raise ValueError(f"Unknown startup task mode: {mode}")
+        self._tasks[name] = {"func": func, "mode": mode}
+        with self._lock:
+            self._results.setdefault(name, {"name": name, "mode": mode, "status": "pending"})
+
+    def task_names(self, mode: Optional[str] = None) -> List[str]:
+        """Registrierte Tasks, optional gefiltert nach Modus"""
+        return [name for name, task in self._tasks.items() if mode is None or task["mode"] == mode]
+
+    def clear(self) -> None:
+        """Vergisst registrierte Tasks und Ergebnisse (neue App-Instanz)"""
+        with self._lock:
+            self._tasks.clear()
+            self._results.clear()
+            self._sections.clear()
+
+    # ========== Boot ==========
+
+    @contextmanager
+    def timed(self, section: str):
+        """Misst einen Abschnitt von init_extensions für den Boot-Report"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._sections.append({
+                    "section": section,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+                })
+
+    def run_boot(self, defer_inline: bool = False) -> None:
+        """
+        Führt ``once``-Tasks synchron aus und startet ``deferred``-Tasks
+
+        Args:
+            defer_inline: deferred-Tasks sofort im aufrufenden Thread ausführen
+                          (Tests, Single-Process-Betrieb)
+        """
+        if not STARTUP_TASKS_ENABLED:
+            logger.info("Startup tasks disabled (STARTUP_TASKS=off)")
+            return
+
+        for name in self.task_names(MODE_ONCE):
+            self.run_task(name, wait=True)
+
+        deferred = self.task_names(MODE_DEFERRED)
+        if not deferred:
+            return
+        if defer_inline:
+            for name in deferred:
+                self.run_task(name, wait=False)
+            return
+
+        def _run_deferred():
+            time.sleep(self.defer_delay)
+            for name in deferred:
+                self.run_task(name, wait=False)
+            self.log_report()
+
+        self._deferred_thread = threading.Thread(
+            target=_run_deferred, name="startup-deferred-tasks", daemon=True
+        )
+        self._deferred_thread.start()
+
+    def run_cli(self, names: Optional[Iterable[str]] = None, force: bool = False) -> List[Dict[str, Any]]:
+        """
+        Führt Tasks aus dem CLI/systemd-Timer aus
+
+        Args:
+            names: Tasknamen, Standard: alle ``cli``-Tasks
+            force: auch ausführen, wenn der Task in diesem Deploy schon lief
+        """
+        names = list(names) if names else self.task_names(MODE_CLI)
+        unknown = [n for n in names if n not in self._tasks]
+        if unknown:
+            raise KeyError(f"Unknown startup task(s): {', '.join(unknown)}")
+        return [self.run_task(name, wait=True, force=force, once=False) for name in names]
+
+    # ========== Ausführung ==========
+
+    def run_task(self, name: str, wait: bool = True, force: bool = False,
+                 once: bool = True) -> Dict[str, Any]:
+        """
+        Führt einen Task unter dem Cross-Process-Lock aus
+
+        Args:
+            wait: auf einen Lauf in einem anderen Worker warten (sonst überspringen)
+            force: Deploy-Marker ignorieren
+            once: nach Erfolg einen Marker für diesen Deploy schreiben
+        """
+        task = self._tasks[name]
+        lock_path = str(self.state_dir / name)
+        marker = self.state_dir / f"{name}.done"
+
+        try:
+            with file_lock(lock_path, timeout=self.lock_timeout if wait else 0):
+                done = self._read_marker(marker)
+                if not force and once and done and done.get("deploy_id") == self.deploy_id:
+                    return self._record(name, task["mode"], "skipped",
+                                        reason=f"done by pid {done.get('pid')}")
+                result = self._execute(name, task)
+                if once and result["status"] == "ok":
+                    self._write_marker(marker, result)
+                return result
+        except FileLockException:
+            reason = "running in another worker" if not wait else "lock timeout"
+            if wait:
+                logger.warning(f"Startup task {name}: {reason}, continuing without it")
+            return self._record(name, task["mode"], "skipped", reason=reason)
+
+    def _execute(self, name: str, task: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            task["func"]()
+        except Exception as e:
+            duration = round((time.perf_counter() - start) * 1000, 1)
+            logger.warning(f"Startup task {name} failed after {duration} ms: {e}")
+            return self._record(name, task["mode"], "failed", duration_ms=duration, error=str(e))
+
+        duration = round((time.perf_counter() - start) * 1000, 1)
+        logger.info(f"Startup task {name} finished in {duration} ms")
+        return self._record(name, task["mode"], "ok", duration_ms=duration)
+
+    def _record(self, name: str, mode: str, status: str, **fields) -> Dict[str, Any]:
+        result = {
+            "name": name,
+            "mode": mode,
+            "status": status,
+            "pid": os.getpid(),
+            "finished_at": datetime.now().isoformat(),
+            **fields,
+        }
+        with self._lock:
+            self._results[name] = result
+        return dict(result)
+
+    def _read_marker(self, marker: Path) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(marker.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _write_marker(self, marker: Path, result: Dict[str, Any]) -> None:
+        tmp = marker.with_suffix(".tmp")
+        tmp.write_text(json.dumps({**result, "deploy_id": self.deploy_id}), encoding="utf-8")
+        os.replace(tmp, marker)
+
+    # ========== Report ==========
+
+    def report(self) -> Dict[str, Any]:
+        """Boot-Abschnitte und Task-Ergebnisse dieses Workers"""
+        with self._lock:
+            sections = [dict(s) for s in self._sections]
+            tasks = [dict(r) for r in self._results.values()]
+        return {
+            "deploy_id": self.deploy_id,
+            "pid": os.getpid(),
+            "boot_total_ms": round(sum(s["duration_ms"] for s in sections), 1),
+            "sections": sections,
+            "tasks": tasks,
+        }
+
+    def log_report(self) -> None:
+        report = self.report()
+        slowest = sorted(report["sections"], key=lambda s: s["duration_ms"], reverse=True)[:5]
+        sections = ", ".join(f"{s['section']}={s['duration_ms']}ms" for s in slowest)
+        tasks = ", ".join(
+            f"{t['name']}={t['status']}" + (f"({t['duration_ms']}ms)" if "duration_ms" in t else "")
+            for t in report["tasks"]
+        )
+        logger.info(f"Boot report pid={report['pid']}: {report['boot_total_ms']} ms [{sections}] tasks: {tasks}")
+
+
+# Globale Instanz
+startup_runner = StartupTaskRunner()
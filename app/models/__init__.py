@@ -5,7 +5,7 @@ SQLAlchemy Data Models für PostgreSQL Migration
 Architektur:
 - base.py: Base Model, Database Engine, Session Management
 - user.py: User, UserStats, UserPrediction, BehaviorPattern, PersonalInsight
-- gamification.py: Score, UserBadge, DailyQuest, QuestProgress, PersonalGoal, Champion, MasteryData, UserLevel, LevelHistory, RankHistory, LootboxData
+- gamification.py: Score, UserBadge, DailyQuest, QuestProgress, PersonalGoal, Champion, MasteryData, UserLevel, LevelHistory, RankHistory, LootboxData, LootboxHistory
 - cosmetics.py: UserCosmetic, CustomizationAchievement
 - weekly.py: WeeklyPointsParticipant, WeeklyPoints, WeeklyActivity, PrestigeData, MinigameData, PersistentData
 - booking.py: Booking, BookingOutcome
@@ -66,7 +66,8 @@ from app.models.gamification import (
     UserLevel,
     LevelHistory,
     RankHistory,
-    LootboxData
+    LootboxData,
+    LootboxHistory
 )
 
 # Cosmetics Models
@@ -153,6 +154,7 @@ __all__ = [
     'LevelHistory',
     'RankHistory',
     'LootboxData',
+    'LootboxHistory',
     # Cosmetics
     'UserCosmetic',
     'CustomizationAchievement',
@@ -362,3 +362,24 @@ class LootboxData(Base):
 
     def __repr__(self) -> str:
         return f"<LootboxData(username='{self.username}', pity={self.pity_counter})>"
+
+
+class LootboxHistory(Base):
+    """
+    Geoeffnete Kisten (append-only, ein Eintrag pro Oeffnung)
+    Ersetzt: lootbox_data.history (auf 50 Eintraege gekuerzte Liste)
+    """
+    __tablename__ = 'lootbox_history'
+
+    username: Mapped[str] = mapped_column(String(100), nullable=False)
+    crate_id: Mapped[str] = mapped_column(String(20), nullable=False)
+    crate_type: Mapped[str] = mapped_column(String(20), nullable=False)
+    reward: Mapped[dict] = mapped_column(JSON, nullable=False)
+    opened_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # Berlin-Lokalzeit
+
+    __table_args__ = (
+        Index('idx_lootbox_history_user_id', 'username', 'id'),
+    )
+
+    def __repr__(self) -> str:
+        return f"<LootboxHistory(username='{self.username}', crate='{self.crate_id}')>"
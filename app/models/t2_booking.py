@@ -68,6 +68,7 @@ class T2Booking(Base):
     # Indexes für Performance
     __table_args__ = (
         Index('idx_t2_booking_user_date', 'user', 'date'),
+        Index('idx_t2_booking_user_created', 'user', 'created_at'),
         Index('idx_t2_booking_berater_date', 'berater', 'date'),
         Index('idx_t2_booking_status', 'status'),
         Index('idx_t2_booking_event_id', 'event_id'),
@@ -7,7 +7,7 @@ Critical for multi-worker environments (4 Gunicorn workers).
 """
 
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from sqlalchemy import String, Float, Integer, JSON, DateTime, UniqueConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from app.models.base import Base
@@ -52,7 +52,8 @@ class T2BucketState(Base):
     - Draw statistics
     - Last reset timestamp
 
-    Uses SELECT FOR UPDATE for atomic read-modify-write operations.
+    Admin writes use SELECT FOR UPDATE; draws use a single
+    UPDATE ... WHERE version = :seen RETURNING (compare-and-swap).
     """
     __tablename__ = "t2_bucket_state"
 
@@ -61,9 +62,13 @@ class T2BucketState(Base):
 
     # Current state
     probabilities: Mapped[Dict[str, float]] = mapped_column(JSON, nullable=False)
-    bucket: Mapped[list] = mapped_column(JSON, nullable=False)  # List of closer names
+    bucket: Mapped[list] = mapped_column(JSON, nullable=False)  # Legacy: List of closer names
+    ticket_counts: Mapped[Optional[Dict[str, int]]] = mapped_column(JSON, nullable=True)  # Remaining tickets per closer
     total_draws: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
 
+    # Optimistic concurrency: draw_closer() updates with WHERE version = :seen
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
     # Statistics
     stats: Mapped[Dict[str, int]] = mapped_column(JSON, nullable=False)  # Draw counts per closer
 
@@ -83,6 +88,7 @@ class T2BucketState(Base):
         return {
             "probabilities": self.probabilities,
             "bucket": self.bucket,
+            "ticket_counts": self.ticket_counts,
             "total_draws": self.total_draws,
             "stats": self.stats,
             "max_draws_before_reset": self.max_draws_before_reset,
@@ -90,7 +96,8 @@ class T2BucketState(Base):
         }
 
     def __repr__(self) -> str:
-        return f"<T2BucketState(draws={self.total_draws}/{self.max_draws_before_reset}, bucket_size={len(self.bucket)})>"
+        tickets = sum((self.ticket_counts or {}).values()) if self.ticket_counts is not None else len(self.bucket)
+        return f"<T2BucketState(draws={self.total_draws}/{self.max_draws_before_reset}, tickets={tickets})>"
 
 
 class T2DrawHistory(Base):
@@ -115,6 +122,10 @@ class T2DrawHistory(Base):
         Index('idx_draw_history_user', 'username'),
         Index('idx_draw_history_closer', 'closer_drawn'),
         Index('idx_draw_history_timestamp', 'drawn_at'),
+        # Per-User Analytics (Zeitfenster, Timeline, letzte Draws)
+        Index('idx_draw_history_user_drawn_at', 'username', 'drawn_at'),
+        # Trigram-Indizes für die Suche (lower(customer_name), lower(closer_drawn))
+        # legt nur die Migration an, da sie die pg_trgm-Extension voraussetzen
     )
 
     def to_dict(self) -> Dict[str, Any]:
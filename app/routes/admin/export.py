@@ -5,15 +5,14 @@ Exports all persistent data as ZIP for migration purposes
 """
 
 import os
-import io
 import logging
-import zipfile
 from datetime import datetime
-from flask import send_file, jsonify, session
+from flask import Response, jsonify, session
 from app.routes.admin import admin_bp
 from app.utils.decorators import require_admin
 from app.services.data_persistence import data_persistence
 from app.services.audit_service import audit_service
+from app.utils.streaming_export import iter_zip
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +25,7 @@ def export_all_data():
     Only accessible by admin users
 
     Returns:
-        ZIP file with all JSON files from data/persistent/
+        Streamed ZIP file with all JSON files from data/persistent/
     """
     try:
         # Audit-log data export
@@ -43,34 +42,25 @@ def export_all_data():
                 "path": persist_dir
             }), 404
 
-        # Create in-memory ZIP file
-        memory_file = io.BytesIO()
-
-        with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Add all JSON files from persistent directory
-            file_count = 0
-            for root, dirs, files in os.walk(persist_dir):
-                for file in files:
-                    if file.endswith('.json'):
-                        file_path = os.path.join(root, file)
-                        # Archive name is relative to persist_dir
-                        arcname = os.path.relpath(file_path, persist_dir)
-                        zipf.write(file_path, arcname)
-                        file_count += 1
-
-        # Seek to beginning of file
-        memory_file.seek(0)
+        # Collect files up front so the archive is built lazily while streaming
+        entries = []
+        for root, dirs, files in os.walk(persist_dir):
+            for file in files:
+                if file.endswith('.json'):
+                    file_path = os.path.join(root, file)
+                    # Archive name is relative to persist_dir
+                    arcname = os.path.relpath(file_path, persist_dir)
+                    entries.append((file_path, arcname))
 
         # Generate filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"business-hub-data-export_{timestamp}.zip"
 
-        # Send file
-        return send_file(
-            memory_file,
+        # Stream ZIP (no in-memory archive)
+        return Response(
+            iter_zip(entries),
             mimetype='application/zip',
-            as_attachment=True,
-            download_name=filename
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
         )
 
     except Exception as e:
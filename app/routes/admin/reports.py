@@ -5,12 +5,11 @@ Analytics, exports, and reporting functionality
 """
 
 import logging
-from flask import render_template, request, redirect, url_for, flash, jsonify, make_response
+from flask import render_template, request, redirect, url_for, flash, jsonify, Response
 from datetime import datetime, timedelta
 import pytz
 import json
 import io
-import csv
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +17,7 @@ from app.config.base import slot_config
 from app.core.extensions import tracking_system
 from app.utils.decorators import require_admin
 from app.routes.admin import admin_bp
+from app.utils.streaming_export import iter_csv
 from app.services.weekly_points import get_week_key, list_recent_weeks, compute_week_stats
 
 TZ = pytz.timezone(slot_config.TIMEZONE)
@@ -45,38 +45,29 @@ def weekly_tracking_report():
 @admin_bp.route("/export/csv")
 @require_admin
 def export_csv():
-    """Export booking data as CSV"""
+    """Export booking data as CSV (streamed straight from the booking store)"""
     try:
         if not tracking_system:
             flash("Tracking-System nicht verfügbar", "warning")
             return redirect(url_for("admin.admin_dashboard"))
 
-        # Get all bookings
-        all_bookings = tracking_system.load_all_bookings()
-
-        # Create CSV
-        output = io.StringIO()
-        writer = csv.writer(output)
-
-        # Write header
-        writer.writerow(['Date', 'Time', 'Customer', 'User', 'Color', 'Description'])
-
-        # Write data
-        for booking in all_bookings:
-            writer.writerow([
+        rows = (
+            [
                 booking.get('date', ''),
-                booking.get('time_slot', ''),
-                booking.get('customer_name', ''),
+                booking.get('time') or booking.get('time_slot', ''),
+                booking.get('customer') or booking.get('customer_name', ''),
                 booking.get('user', ''),
                 booking.get('color_id', ''),
                 booking.get('description', '')
-            ])
-
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = 'attachment; filename=bookings_export.csv'
+            ]
+            for booking in tracking_system.iter_all_bookings()
+        )
 
-        return response
+        return Response(
+            iter_csv(rows, header=['Date', 'Time', 'Customer', 'User', 'Color', 'Description']),
+            mimetype='text/csv',
+            headers={'Content-Disposition': 'attachment; filename=bookings_export.csv'}
+        )
 
     except Exception as e:
         logger.error(f"CSV export failed: {e}", exc_info=True)
@@ -4,8 +4,6 @@ Admin Tracking Export Routes
 Excel und CSV Exports für Tracking-Analytics
 """
 
-import csv
-import io
 from datetime import datetime
 
 import pytz
@@ -15,6 +13,7 @@ from app.config.base import slot_config
 from app.core.extensions import tracking_system
 from app.utils.decorators import require_admin
 from app.routes.admin import admin_bp
+from app.utils.streaming_export import iter_csv, iter_workbook
 
 TZ = pytz.timezone(slot_config.TIMEZONE)
 
@@ -41,34 +40,32 @@ def export_tracking_csv():
         # Hole Daten
         stats = tracking_system.get_stats_for_period(start_date, end_date)
 
-        # Erstelle CSV
-        output = io.StringIO()
-        writer = csv.writer(output, delimiter=';')
-
         if export_type == "summary":
-            # Zusammenfassung
-            writer.writerow(["Tracking Analytics Export - Zusammenfassung"])
-            writer.writerow([f"Zeitraum: {start_date} bis {end_date}"])
-            writer.writerow([])
-            writer.writerow(["Metrik", "Wert"])
-            writer.writerow(["Getrackte Tage", stats.get("days_tracked", 0)])
-            writer.writerow(["Gesamte Termine", stats.get("total_slots", 0)])
-            writer.writerow(["Erschienen", stats.get("completed", 0)])
-            writer.writerow(["Nicht erschienen", stats.get("no_shows", 0)])
-            writer.writerow(["Abgesagt", stats.get("cancelled", 0)])
-            writer.writerow(["Verschoben", stats.get("rescheduled", 0)])
-            writer.writerow(["Überhang", stats.get("overhang", 0)])
-            writer.writerow(["Auftauchquote", f"{stats.get('appearance_rate', 0)}%"])
-            writer.writerow(["No-Show-Rate", f"{stats.get('no_show_rate', 0)}%"])
+            rows = [
+                # Zusammenfassung
+                ["Tracking Analytics Export - Zusammenfassung"],
+                [f"Zeitraum: {start_date} bis {end_date}"],
+                [],
+                ["Metrik", "Wert"],
+                ["Getrackte Tage", stats.get("days_tracked", 0)],
+                ["Gesamte Termine", stats.get("total_slots", 0)],
+                ["Erschienen", stats.get("completed", 0)],
+                ["Nicht erschienen", stats.get("no_shows", 0)],
+                ["Abgesagt", stats.get("cancelled", 0)],
+                ["Verschoben", stats.get("rescheduled", 0)],
+                ["Überhang", stats.get("overhang", 0)],
+                ["Auftauchquote", f"{stats.get('appearance_rate', 0)}%"],
+                ["No-Show-Rate", f"{stats.get('no_show_rate', 0)}%"],
+            ]
+            header = None
         else:
             # Tagesstatistiken
-            writer.writerow([
+            header = [
                 "Datum", "Wochentag", "Termine gesamt", "Erschienen",
                 "Nicht erschienen", "Abgesagt", "Verschoben", "Überhang", "Auftauchquote"
-            ])
-
-            for day in stats.get("daily_data", []):
-                writer.writerow([
+            ]
+            rows = (
+                [
                     day.get("date", ""),
                     day.get("weekday", ""),
                     day.get("total_slots", 0),
@@ -78,14 +75,15 @@ def export_tracking_csv():
                     day.get("rescheduled", 0),
                     day.get("overhang", 0),
                     f"{day.get('appearance_rate', 0)}%"
-                ])
+                ]
+                for day in stats.get("daily_data", [])
+            )
 
-        # Response erstellen
-        output.seek(0)
+        # Response streamen
         filename = f"tracking_export_{start_date}_{end_date}.csv"
 
         return Response(
-            output.getvalue(),
+            iter_csv(rows, header=header, delimiter=';'),
             mimetype="text/csv",
             headers={
                 "Content-Disposition": f"attachment; filename={filename}",
@@ -110,7 +108,7 @@ def export_tracking_excel():
     try:
         # Prüfe ob openpyxl verfügbar ist
         try:
-            from openpyxl import Workbook
+            from openpyxl.cell import WriteOnlyCell
             from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
             from openpyxl.utils import get_column_letter
         except ImportError:
@@ -133,9 +131,6 @@ def export_tracking_excel():
         from app.services.consultant_ranking import consultant_ranking_service
         ranking_data = consultant_ranking_service.get_ranking_summary(start_date, end_date)
 
-        # Erstelle Workbook
-        wb = Workbook()
-
         # Styles definieren
         header_font = Font(bold=True, color="FFFFFF")
         header_fill = PatternFill(start_color="294C5D", end_color="294C5D", fill_type="solid")
@@ -149,182 +144,134 @@ def export_tracking_excel():
             bottom=Side(style='thin')
         )
 
-        # ========== Sheet 1: Übersicht ==========
-        ws1 = wb.active
-        ws1.title = "Übersicht"
-
-        ws1["A1"] = "Tracking Analytics Export"
-        ws1["A1"].font = Font(bold=True, size=16)
-        ws1["A2"] = f"Zeitraum: {start_date} bis {end_date}"
-        ws1["A3"] = f"Exportiert: {datetime.now(TZ).strftime('%d.%m.%Y %H:%M')}"
-
-        # Übersichts-Tabelle
-        overview_start = 5
-        overview_data = [
-            ["Metrik", "Wert"],
-            ["Getrackte Tage", stats.get("days_tracked", 0)],
-            ["Gesamte Termine", stats.get("total_slots", 0)],
-            ["Erschienen", stats.get("completed", 0)],
-            ["Nicht erschienen", stats.get("no_shows", 0)],
-            ["Abgesagt", stats.get("cancelled", 0)],
-            ["Verschoben", stats.get("rescheduled", 0)],
-            ["Überhang", stats.get("overhang", 0)],
-            ["Auftauchquote", f"{stats.get('appearance_rate', 0)}%"],
-            ["No-Show-Rate", f"{stats.get('no_show_rate', 0)}%"]
-        ]
-
-        for row_idx, row_data in enumerate(overview_data, overview_start):
-            for col_idx, value in enumerate(row_data, 1):
-                cell = ws1.cell(row=row_idx, column=col_idx, value=value)
-                cell.border = thin_border
-                if row_idx == overview_start:
-                    cell.font = header_font
-                    cell.fill = header_fill
-
-        ws1.column_dimensions["A"].width = 25
-        ws1.column_dimensions["B"].width = 15
-
-        # ========== Sheet 2: Tagesstatistik ==========
-        ws2 = wb.create_sheet("Tagesstatistik")
-
-        headers = ["Datum", "Wochentag", "Termine", "Erschienen", "No-Shows",
-                   "Abgesagt", "Verschoben", "Überhang", "Auftauchquote"]
-
-        for col, header in enumerate(headers, 1):
-            cell = ws2.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.border = thin_border
-
-        for row_idx, day in enumerate(stats.get("daily_data", []), 2):
-            appearance_rate = day.get("appearance_rate", 0)
-
-            data = [
-                day.get("date", ""),
-                day.get("weekday", ""),
-                day.get("total_slots", 0),
-                day.get("completed", 0),
-                day.get("no_shows", 0),
-                day.get("cancelled", 0),
-                day.get("rescheduled", 0),
-                day.get("overhang", 0),
-                f"{appearance_rate}%"
+        def rate_fill(rate):
+            if rate >= 80:
+                return good_fill
+            if rate >= 60:
+                return warning_fill
+            return bad_fill
+
+        def cell(ws, value, font=None, fill=None, border=thin_border):
+            c = WriteOnlyCell(ws, value=value)
+            if font is not None:
+                c.font = font
+            if fill is not None:
+                c.fill = fill
+            if border is not None:
+                c.border = border
+            return c
+
+        def header_row(ws, headers):
+            return [cell(ws, h, font=header_font, fill=header_fill) for h in headers]
+
+        def build(wb):
+            # Write-only: Spaltenbreiten vor der ersten Zeile setzen,
+            # Zeilen werden per append() direkt auf die Platte geschrieben
+
+            # ========== Sheet 1: Übersicht ==========
+            ws1 = wb.create_sheet("Übersicht")
+            ws1.column_dimensions["A"].width = 25
+            ws1.column_dimensions["B"].width = 15
+
+            ws1.append([cell(ws1, "Tracking Analytics Export", font=Font(bold=True, size=16), border=None)])
+            ws1.append([f"Zeitraum: {start_date} bis {end_date}"])
+            ws1.append([f"Exportiert: {datetime.now(TZ).strftime('%d.%m.%Y %H:%M')}"])
+            ws1.append([])
+
+            # Übersichts-Tabelle
+            ws1.append(header_row(ws1, ["Metrik", "Wert"]))
+            overview_data = [
+                ["Getrackte Tage", stats.get("days_tracked", 0)],
+                ["Gesamte Termine", stats.get("total_slots", 0)],
+                ["Erschienen", stats.get("completed", 0)],
+                ["Nicht erschienen", stats.get("no_shows", 0)],
+                ["Abgesagt", stats.get("cancelled", 0)],
+                ["Verschoben", stats.get("rescheduled", 0)],
+                ["Überhang", stats.get("overhang", 0)],
+                ["Auftauchquote", f"{stats.get('appearance_rate', 0)}%"],
+                ["No-Show-Rate", f"{stats.get('no_show_rate', 0)}%"]
             ]
+            for row_data in overview_data:
+                ws1.append([cell(ws1, value) for value in row_data])
 
-            for col_idx, value in enumerate(data, 1):
-                cell = ws2.cell(row=row_idx, column=col_idx, value=value)
-                cell.border = thin_border
-
-                # Färbe Auftauchquote
-                if col_idx == 9:
-                    if appearance_rate >= 80:
-                        cell.fill = good_fill
-                    elif appearance_rate >= 60:
-                        cell.fill = warning_fill
-                    else:
-                        cell.fill = bad_fill
-
-        # Spaltenbreiten
-        for col in range(1, 10):
-            ws2.column_dimensions[get_column_letter(col)].width = 15
-
-        # ========== Sheet 3: Telefonisten Show-Rates ==========
-        ws3 = wb.create_sheet("Telefonisten Show-Rates")
-
-        headers = ["Telefonist", "Termine", "Erschienen", "No-Shows",
-                   "Abgesagt", "Verschoben", "Überhang", "Auftauchquote"]
-
-        for col, header in enumerate(headers, 1):
-            cell = ws3.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.border = thin_border
-
-        row_idx = 2
-        for consultant, perf in sorted(consultant_perf.items(),
-                                       key=lambda x: x[1].get("appearance_rate", 0),
-                                       reverse=True):
-            appearance_rate = perf.get("appearance_rate", 0)
-
-            data = [
-                consultant,
-                perf.get("total_slots", 0),
-                perf.get("completed", 0),
-                perf.get("no_shows", 0),
-                perf.get("cancelled", 0),
-                perf.get("rescheduled", 0),
-                perf.get("overhang", 0),
-                f"{appearance_rate}%"
-            ]
+            # ========== Sheet 2: Tagesstatistik ==========
+            ws2 = wb.create_sheet("Tagesstatistik")
+            for col in range(1, 10):
+                ws2.column_dimensions[get_column_letter(col)].width = 15
 
-            for col_idx, value in enumerate(data, 1):
-                cell = ws3.cell(row=row_idx, column=col_idx, value=value)
-                cell.border = thin_border
-
-                if col_idx == 8:
-                    if appearance_rate >= 80:
-                        cell.fill = good_fill
-                    elif appearance_rate >= 60:
-                        cell.fill = warning_fill
-                    else:
-                        cell.fill = bad_fill
-
-            row_idx += 1
-
-        for col in range(1, 9):
-            ws3.column_dimensions[get_column_letter(col)].width = 15
-
-        # ========== Sheet 4: Combined Ranking ==========
-        ws4 = wb.create_sheet("Combined Ranking")
-
-        headers = ["Rang", "Berater", "Combined Score", "Kategorie",
-                   "Show-Rate", "Tel. Achievement", "Aktivitäten"]
-
-        for col, header in enumerate(headers, 1):
-            cell = ws4.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.border = thin_border
-
-        row_idx = 2
-        for r in ranking_data.get("rankings", []):
-            category = r.get("category", "")
-            data = [
-                r.get("rank", ""),
-                r.get("name", ""),
-                r.get("combined_score", 0),
-                category.upper(),
-                f"{r.get('show_rate', 0)}%",
-                f"{r.get('telefonie_achievement', 0)}%",
-                r.get("total_activities", 0)
-            ]
-
-            for col_idx, value in enumerate(data, 1):
-                cell = ws4.cell(row=row_idx, column=col_idx, value=value)
-                cell.border = thin_border
+            ws2.append(header_row(ws2, [
+                "Datum", "Wochentag", "Termine", "Erschienen", "No-Shows",
+                "Abgesagt", "Verschoben", "Überhang", "Auftauchquote"
+            ]))
 
-                if col_idx == 4:
-                    if category == "high":
-                        cell.fill = good_fill
-                    elif category == "medium":
-                        cell.fill = warning_fill
-                    else:
-                        cell.fill = bad_fill
-
-            row_idx += 1
+            for day in stats.get("daily_data", []):
+                appearance_rate = day.get("appearance_rate", 0)
+                ws2.append([
+                    cell(ws2, day.get("date", "")),
+                    cell(ws2, day.get("weekday", "")),
+                    cell(ws2, day.get("total_slots", 0)),
+                    cell(ws2, day.get("completed", 0)),
+                    cell(ws2, day.get("no_shows", 0)),
+                    cell(ws2, day.get("cancelled", 0)),
+                    cell(ws2, day.get("rescheduled", 0)),
+                    cell(ws2, day.get("overhang", 0)),
+                    # Färbe Auftauchquote
+                    cell(ws2, f"{appearance_rate}%", fill=rate_fill(appearance_rate)),
+                ])
 
-        for col in range(1, 8):
-            ws4.column_dimensions[get_column_letter(col)].width = 18
+            # ========== Sheet 3: Telefonisten Show-Rates ==========
+            ws3 = wb.create_sheet("Telefonisten Show-Rates")
+            for col in range(1, 9):
+                ws3.column_dimensions[get_column_letter(col)].width = 15
+
+            ws3.append(header_row(ws3, [
+                "Telefonist", "Termine", "Erschienen", "No-Shows",
+                "Abgesagt", "Verschoben", "Überhang", "Auftauchquote"
+            ]))
+
+            for consultant, perf in sorted(consultant_perf.items(),
+                                           key=lambda x: x[1].get("appearance_rate", 0),
+                                           reverse=True):
+                appearance_rate = perf.get("appearance_rate", 0)
+                ws3.append([
+                    cell(ws3, consultant),
+                    cell(ws3, perf.get("total_slots", 0)),
+                    cell(ws3, perf.get("completed", 0)),
+                    cell(ws3, perf.get("no_shows", 0)),
+                    cell(ws3, perf.get("cancelled", 0)),
+                    cell(ws3, perf.get("rescheduled", 0)),
+                    cell(ws3, perf.get("overhang", 0)),
+                    cell(ws3, f"{appearance_rate}%", fill=rate_fill(appearance_rate)),
+                ])
 
-        # Speichere in BytesIO
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
+            # ========== Sheet 4: Combined Ranking ==========
+            ws4 = wb.create_sheet("Combined Ranking")
+            for col in range(1, 8):
+                ws4.column_dimensions[get_column_letter(col)].width = 18
+
+            ws4.append(header_row(ws4, [
+                "Rang", "Berater", "Combined Score", "Kategorie",
+                "Show-Rate", "Tel. Achievement", "Aktivitäten"
+            ]))
+
+            category_fills = {"high": good_fill, "medium": warning_fill}
+            for r in ranking_data.get("rankings", []):
+                category = r.get("category", "")
+                ws4.append([
+                    cell(ws4, r.get("rank", "")),
+                    cell(ws4, r.get("name", "")),
+                    cell(ws4, r.get("combined_score", 0)),
+                    cell(ws4, category.upper(), fill=category_fills.get(category, bad_fill)),
+                    cell(ws4, f"{r.get('show_rate', 0)}%"),
+                    cell(ws4, f"{r.get('telefonie_achievement', 0)}%"),
+                    cell(ws4, r.get("total_activities", 0)),
+                ])
 
         filename = f"tracking_analytics_{start_date}_{end_date}.xlsx"
 
+        # Write-only Workbook über Temp-Datei streamen
         return Response(
-            output.getvalue(),
+            iter_workbook(build),
             mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             headers={
                 "Content-Disposition": f"attachment; filename={filename}"
@@ -185,9 +185,9 @@ def get_user_bookings_from_jsonl(username, days_back=30):
     Returns:
         List of booking dicts with customer, date, time, etc.
     """
-    import json
     import os
     from datetime import date, timedelta
+    from app.services.tracking_system.booking_store import get_booking_store
 
     bookings_file = "data/tracking/bookings.jsonl"
     if not os.path.exists(bookings_file):
@@ -197,26 +197,9 @@ def get_user_bookings_from_jsonl(username, days_back=30):
     user_bookings = []
 
     try:
-        with open(bookings_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    booking = json.loads(line.strip())
-
-                    # Check if this booking belongs to the user
-                    if booking.get('user') != username:
-                        continue
-
-                    # Check if booking is within date range
-                    booking_date_str = booking.get('date')
-                    if booking_date_str:
-                        booking_date = date.fromisoformat(booking_date_str)
-                        if booking_date < cutoff_date:
-                            continue
-
-                    user_bookings.append(booking)
-
-                except (json.JSONDecodeError, ValueError) as e:
-                    continue
+        # Sidecar-Index: nur Zeilen dieses Users ab cutoff werden dekodiert
+        store = get_booking_store(bookings_file)
+        user_bookings.extend(store.iter_bookings(user=username, start_date=cutoff_date))
     except Exception as e:
         import logging
         logger = logging.getLogger(__name__)
@@ -849,15 +849,14 @@ def start_analysis(session_id):
                     'queued': 0,
                 })
 
-            # Launch pipelines
-            from app.services.finanz_tasks import process_document_pipeline
+            # Launch one batch pipeline (classification prompts go out together)
+            from app.services.finanz_tasks import process_documents_pipeline
             queued = 0
-            for doc in docs:
-                try:
-                    process_document_pipeline(doc.id, session_id)
-                    queued += 1
-                except Exception as e:
-                    logger.error("Failed to queue pipeline for doc %s: %s", doc.id, e)
+            try:
+                process_documents_pipeline([doc.id for doc in docs], session_id)
+                queued = len(docs)
+            except Exception as e:
+                logger.error("Failed to queue pipeline for session %s: %s", session_id, e)
 
             return jsonify({
                 'success': True,
@@ -10,6 +10,13 @@ Routes:
 - GET  /upload/<token_value>        -- Upload page (standalone mobile)
 - POST /upload/<token_value>/submit -- AJAX file upload handler
 - GET  /upload/<token_value>/status -- AJAX token status check
+
+Resumable chunked uploads (large files, unstable mobile connections):
+- POST /upload/<token_value>/resumable                      -- start, JSON {filename, size}
+- GET  /upload/<token_value>/resumable/<upload_id>          -- progress (resume offset)
+- PUT  /upload/<token_value>/resumable/<upload_id>?offset=N -- raw chunk body,
+       optional X-Chunk-SHA256 header
+- POST /upload/<token_value>/resumable/<upload_id>/complete -- store document
 """
 
 import logging
@@ -17,7 +24,7 @@ import logging
 from flask import Blueprint, g, jsonify, render_template, request
 
 from app.config.base import FinanzConfig as finanz_config
-from app.services.finanz_upload_service import FinanzUploadService
+from app.services.finanz_upload_service import FinanzUploadService, UploadRejected
 from app.services.finanz_sse_service import sse_manager
 
 logger = logging.getLogger(__name__)
@@ -87,6 +94,10 @@ def upload_submit(token_value):
             'message': error_message or 'Token ungueltig',
         }), 403
 
+    oversized = _reject_oversized_request()
+    if oversized is not None:
+        return oversized
+
     # Get file from request
     if 'file' not in request.files:
         return jsonify({
@@ -101,50 +112,68 @@ def upload_submit(token_value):
             'message': 'Keine Datei ausgewaehlt',
         }), 400
 
-    # Validate file via magic bytes
-    is_file_valid, detected_mime, file_error = upload_service.validate_file(file)
-    if not is_file_valid:
-        logger.warning(
-            "File rejected for token %s: %s (mime: %s)",
-            token_value[:8], file_error, detected_mime,
-        )
-        return jsonify({
-            'error': True,
-            'message': file_error,
-        }), 400
-
-    # Store file
+    # Stream to disk: type, size and hash are checked while the file is copied
     try:
         document = upload_service.store_file(
             file_storage=file,
             session_id=token.session_id,
             token_id=token.id,
             original_filename=file.filename,
-            mime_type=detected_mime,
         )
-    except ValueError as e:
+    except Exception as e:
+        return _store_error_response(token, file.filename, e)
+
+    return _document_response(token, document)
+
+
+def _reject_oversized_request():
+    """Reject bodies above the file limit before they are parsed."""
+    max_bytes = finanz_config.FINANZ_MAX_FILE_SIZE_MB * 1024 * 1024
+    # Multipart-Overhead (Boundary, Header) großzügig einrechnen
+    if request.content_length and request.content_length > max_bytes + 64 * 1024:
+        return jsonify({
+            'error': True,
+            'message': f'Datei zu gross (max. {finanz_config.FINANZ_MAX_FILE_SIZE_MB} MB)',
+        }), 413
+    return None
+
+
+def _store_error_response(token, filename, error):
+    """Map store/finish errors to the JSON error responses of the upload page."""
+    if isinstance(error, UploadRejected):
+        logger.warning(
+            "File rejected for session %s: %s (%s)",
+            token.session_id, filename, error.message,
+        )
+        return jsonify({
+            'error': True,
+            'message': error.message,
+        }), error.status_code
+    if isinstance(error, ValueError):
         # Duplicate file detected
         logger.info(
             "Duplicate file rejected for session %s: %s",
-            token.session_id, str(e),
+            token.session_id, str(error),
         )
         return jsonify({
             'error': True,
-            'message': str(e),
+            'message': str(error),
         }), 409
-    except Exception as e:
-        logger.error(
-            "Failed to store file for session %s: %s",
-            token.session_id, e, exc_info=True,
-        )
-        return jsonify({
-            'error': True,
-            'message': 'Fehler beim Speichern der Datei. Bitte versuchen Sie es erneut.',
-        }), 500
+    logger.error(
+        "Failed to store file for session %s: %s",
+        token.session_id, error, exc_info=True,
+    )
+    return jsonify({
+        'error': True,
+        'message': 'Fehler beim Speichern der Datei. Bitte versuchen Sie es erneut.',
+    }), 500
 
+
+def _document_response(token, document):
+    """Publish the SSE upload event and return the document JSON."""
     logger.info(
         "Document uploaded: %s for session %s (doc_id=%s)",
-        file.filename, token.session_id, document.id,
+        document.original_filename, token.session_id, document.id,
     )
 
     # Publish SSE event for real-time notification
@@ -206,3 +235,110 @@ def upload_status(token_value):
         'expires_at': expires_at,
         'message': error_message if not is_valid else '',
     })
+
+
+# ========== Resumable chunked uploads ==========
+
+def _resumable_token(token_value):
+    """Validate the token; returns (token, None) or (None, error_response)."""
+    is_valid, token, error_message = upload_service.validate_token(token_value)
+    if not is_valid:
+        logger.warning(
+            "Resumable upload rejected -- invalid token: %s (%s)",
+            token_value[:8], error_message,
+        )
+        return None, (jsonify({
+            'error': True,
+            'message': error_message or 'Token ungueltig',
+        }), 403)
+    return token, None
+
+
+def _rejected(error):
+    return jsonify({'error': True, 'message': error.message}), error.status_code
+
+
+@upload_bp.route('/upload/<token_value>/resumable', methods=['POST'])
+def resumable_start(token_value):
+    """Start a resumable upload; returns upload_id and the maximum chunk size."""
+    token, error_response = _resumable_token(token_value)
+    if error_response:
+        return error_response
+
+    data = request.get_json(silent=True) or {}
+    filename = (data.get('filename') or '').strip()
+    try:
+        total_size = int(data.get('size') or 0)
+    except (TypeError, ValueError):
+        total_size = 0
+    if not filename:
+        return jsonify({'error': True, 'message': 'Keine Datei ausgewaehlt'}), 400
+
+    try:
+        upload = upload_service.start_resumable_upload(
+            session_id=token.session_id,
+            token_id=token.id,
+            original_filename=filename,
+            total_size=total_size,
+        )
+    except UploadRejected as e:
+        return _rejected(e)
+    return jsonify({'success': True, **upload})
+
+
+@upload_bp.route('/upload/<token_value>/resumable/<upload_id>', methods=['GET'])
+def resumable_status(token_value, upload_id):
+    """Progress of a resumable upload (offset to resume from)."""
+    token, error_response = _resumable_token(token_value)
+    if error_response:
+        return error_response
+    try:
+        return jsonify({'success': True, **upload_service.get_resumable_upload(token.session_id, upload_id)})
+    except UploadRejected as e:
+        return _rejected(e)
+
+
+@upload_bp.route('/upload/<token_value>/resumable/<upload_id>', methods=['PUT'])
+def resumable_chunk(token_value, upload_id):
+    """Append one raw chunk at ?offset=N, streamed from the request body."""
+    token, error_response = _resumable_token(token_value)
+    if error_response:
+        return error_response
+
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify({'error': True, 'message': 'Offset fehlt'}), 400
+
+    try:
+        progress = upload_service.append_chunk(
+            session_id=token.session_id,
+            upload_id=upload_id,
+            offset=offset,
+            stream=request.stream,
+            chunk_sha256=request.headers.get('X-Chunk-SHA256'),
+        )
+    except UploadRejected as e:
+        if e.status_code == 409:
+            # Client setzt beim gemeldeten Stand fort
+            try:
+                current = upload_service.get_resumable_upload(token.session_id, upload_id)
+                return jsonify({'error': True, 'message': e.message, **current}), 409
+            except UploadRejected:
+                pass
+        return _rejected(e)
+    return jsonify({'success': True, **progress})
+
+
+@upload_bp.route('/upload/<token_value>/resumable/<upload_id>/complete', methods=['POST'])
+def resumable_complete(token_value, upload_id):
+    """Finish a resumable upload and store the document."""
+    token, error_response = _resumable_token(token_value)
+    if error_response:
+        return error_response
+
+    try:
+        document = upload_service.finish_resumable_upload(token.session_id, upload_id)
+    except Exception as e:
+        return _store_error_response(token, upload_id, e)
+
+    return _document_response(token, document)
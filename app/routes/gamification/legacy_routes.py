@@ -59,6 +59,13 @@ def require_login(f):
         return f(*args, **kwargs)
     return decorated_function
 
+
+def _requested_avatar_px():
+    """Angefragte Avatar-Anzeigegroesse (?px=), Standard: Listen-Avatar (md)"""
+    from app.services.avatar_service import AVATAR_SIZES
+    px = request.args.get('px', type=int)
+    return px if px and px > 0 else AVATAR_SIZES['md']['px']
+
 # ===== DASHBOARD ROUTES =====
 
 @gamification_bp.route('/daily-quests')
@@ -465,7 +472,7 @@ def api_user_avatar(username):
 
         # Include resolved avatar URL from avatar_service
         if avatar_service:
-            avatar_url = avatar_service.get_avatar_url(username)
+            avatar_url = avatar_service.get_avatar_url(username, px=_requested_avatar_px())
             if avatar_url:
                 avatar_data['avatar_url'] = avatar_url
 
@@ -925,18 +932,8 @@ def api_purchase_crate():
         if crate_type not in CRATE_TYPES:
             return jsonify({"success": False, "message": "Unbekannter Kisten-Typ"}), 400
 
-        price = CRATE_TYPES[crate_type]["price"]
-        user_coins = daily_quest_system.get_user_coins(user)
-        if user_coins < price:
-            return jsonify({"success": False, "message": f"Nicht genug Coins! Benötigt: {price}, Verfügbar: {user_coins}"})
-
-        result = lootbox_service.purchase_crate(user, crate_type)
-        if result["success"]:
-            coins_data = daily_quest_system.load_user_coins()
-            coins_data[user] = coins_data.get(user, 0) - price
-            daily_quest_system.save_user_coins(coins_data)
-            result["remaining_coins"] = coins_data.get(user, 0)
-
+        # Guthaben-Prüfung und Abbuchung in derselben Transaktion wie der Kauf
+        result = lootbox_service.purchase_crate(user, crate_type, charge=True)
         return jsonify(result)
     except Exception as e:
         logger.error(f"Error in api_purchase_crate: {e}")
@@ -1128,7 +1125,7 @@ def api_avatar_url(username):
         if not avatar_service:
             return jsonify({"avatar_url": None, "username": username})
 
-        avatar_url = avatar_service.get_avatar_url(username)
+        avatar_url = avatar_service.get_avatar_url(username, px=_requested_avatar_px())
         return jsonify({
             "avatar_url": avatar_url,
             "username": username
@@ -1162,8 +1159,8 @@ def run_daily_maintenance():
         except Exception as e:
             logger.warning(f"Per-user quest generation skipped: {e}")
 
-        # Prüfe MVP-Badges
-        achievement_system.auto_check_mvp_badges()
+        # MVP-Badges für abgeschlossene Perioden
+        achievement_system.check_mvp_period_boundaries()
 
         # Record daily rank snapshots
         try:
@@ -3,12 +3,15 @@
 Health Check and Monitoring Endpoints
 """
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from datetime import datetime, timezone
 import os
 import psutil
 
 from app.services.data_persistence import data_persistence
+from app.core.startup_tasks import startup_runner
+from app.utils.request_metrics import request_metrics
+from app.utils.logging import logging_stats
 from app.core.google_calendar import GoogleCalendarService
 from app.services.holiday_service import holiday_service
 
@@ -283,6 +286,9 @@ def metrics():
                 'total_bookings': total_bookings,
                 'uptime_seconds': get_uptime_seconds()
             },
+            'write_behind': data_persistence.mirror.stats(),
+            'startup': startup_runner.report(),
+            'logging': logging_stats(),
             'timestamp': datetime.now(timezone.utc).isoformat() + 'Z'
         }
 
@@ -294,6 +300,16 @@ def metrics():
         }), 500
 
 
+@health_bp.route("/health/metrics/prometheus")
+def prometheus_metrics():
+    """
+    Request-Metriken im Prometheus Text-Format
+    Latenz-Histogramme und SQL/API/JSON-Zähler pro Endpoint, summiert über alle Worker
+    """
+    return Response(request_metrics.render_prometheus(),
+                    content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @health_bp.route("/health/detailed")
 def health_detailed():
     """
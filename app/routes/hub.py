@@ -4,8 +4,9 @@ Central Business Tool Hub - Main Dashboard Blueprint
 Landing Page mit Tool-Navigation und Overview
 """
 
-from flask import Blueprint, render_template, session, redirect, url_for, request, jsonify
+from flask import Blueprint, render_template, session, redirect, url_for, request, jsonify, make_response
 from datetime import datetime, timedelta
+import hashlib
 import json
 import logging
 from app.services.notification_service import notification_service
@@ -47,7 +48,16 @@ def api_dashboard_stats():
         return jsonify({'error': 'Unauthorized'}), 401
 
     stats = get_live_stats(user)
-    return jsonify(stats)
+    # Zeitstempel ändert sich bei jedem Aufruf und zählt nicht als Änderung
+    stats_version = json.dumps(
+        {k: v for k, v in stats.items() if k != 'timestamp'}, sort_keys=True, default=str
+    )
+
+    def build():
+        stats['unread_notifications'] = notification_service.get_unread_count(user)
+        return stats
+
+    return conditional_notification_response(user, 'dashboard-stats', build, extra=stats_version)
 
 
 @hub_bp.route('/api/notifications')
@@ -89,17 +99,19 @@ def api_popup_notifications():
     if not user:
         return jsonify({'error': 'Unauthorized'}), 401
 
-    # Get only popup notifications (unread + show_popup=True)
-    notifications = notification_service.get_user_notifications(
-        user,
-        show_popup_only=True,
-        unread_only=True
-    )
+    def build():
+        # Get only popup notifications (unread + show_popup=True)
+        notifications = notification_service.get_user_notifications(
+            user,
+            show_popup_only=True,
+            unread_only=True
+        )
+        return {
+            'success': True,
+            'notifications': notifications
+        }
 
-    return jsonify({
-        'success': True,
-        'notifications': notifications
-    })
+    return conditional_notification_response(user, 'popup', build)
 
 
 @hub_bp.route('/api/notifications/dismiss', methods=['POST'])
@@ -166,6 +178,28 @@ def tool_redirect(tool_id):
     return redirect(url)
 
 
+def conditional_notification_response(username, scope, build, extra=''):
+    """
+    JSON-Antwort mit ETag aus dem Notification-Versionsstempel
+
+    Stimmt If-None-Match, gibt es 304 ohne ``build()`` aufzurufen – ein
+    unveränderter Poll kostet damit keinen DB- oder Dateizugriff.
+    ``extra`` fließt in den ETag ein, wenn die Antwort außer Notifications
+    noch weitere Daten enthält (z.B. Live-Stats).
+    """
+    version = notification_service.get_notification_version(username)
+    etag = hashlib.sha1(f"{scope}:{username}:{version}:{extra}".encode('utf-8')).hexdigest()[:20]
+
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    # Browser muss revalidieren, darf aber den gecachten Body wiederverwenden
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 def get_display_name(username):
     """
     Extrahiert Display-Namen aus Login-Username
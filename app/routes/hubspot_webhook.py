@@ -3,42 +3,22 @@
 HubSpot Webhook Endpoint
 
 Empfängt Deal-Stage-Änderungen von HubSpot für bidirektionalen Sync.
-Validiert die Signatur des Requests und verarbeitet Events.
-Erstellt Queue-Items für Admin-Review (gleicher Ansatz wie G.2).
+Validiert die Signatur, legt den Roh-Batch in der Webhook-Inbox ab und
+antwortet sofort. Dedup, Zusammenfassen pro Deal und die Queue-Items für
+Admin-Review (gleicher Ansatz wie G.2) übernimmt der Drain der Inbox
+(app/services/hubspot_webhook_inbox.py).
 """
 
 import hashlib
 import hmac
 import logging
 import time
-from collections import OrderedDict
 from flask import Blueprint, request, jsonify
 
 logger = logging.getLogger(__name__)
 
 hubspot_webhook_bp = Blueprint('hubspot_webhook', __name__)
 
-# Idempotency: track processed event hashes to prevent replay (max 1000 entries)
-_processed_events = OrderedDict()
-_MAX_PROCESSED = 1000
-
-
-def _event_key(event: dict) -> str:
-    """Generate a unique key for deduplication."""
-    return f"{event.get('objectId')}:{event.get('propertyName')}:{event.get('propertyValue')}:{event.get('occurredAt', '')}"
-
-
-def _is_duplicate(event: dict) -> bool:
-    """Check if this event was already processed."""
-    key = _event_key(event)
-    if key in _processed_events:
-        return True
-    _processed_events[key] = time.time()
-    # Evict oldest entries if over limit
-    while len(_processed_events) > _MAX_PROCESSED:
-        _processed_events.popitem(last=False)
-    return False
-
 
 def validate_hubspot_signature(req) -> bool:
     """Validiere die HubSpot Webhook-Signatur (v3).
@@ -89,91 +69,11 @@ def validate_hubspot_signature(req) -> bool:
     return hmac.compare_digest(signature, expected)
 
 
-def handle_stage_change(deal_id: str, new_stage: str, previous_stage: str) -> bool:
-    """Verarbeite eine HubSpot Deal-Stage-Änderung.
-
-    Holt Deal-Details via API, mappt die Stage auf einen lokalen Outcome-Typ,
-    und erstellt ein Queue-Item für Admin-Review.
-
-    Args:
-        deal_id: HubSpot Deal ID
-        new_stage: Neue Stage-ID
-        previous_stage: Vorherige Stage-ID
-
-    Returns:
-        True wenn erfolgreich verarbeitet
-    """
-    from app.config.base import hubspot_config
-    from app.services.hubspot_service import hubspot_service
-    from app.services.hubspot_queue_service import hubspot_queue_service
-    from app.services.audit_service import audit_service
-
-    # Deal-Details von HubSpot holen
-    deal_info = hubspot_service.get_deal(deal_id)
-    if not deal_info:
-        logger.warning(f"Could not fetch deal {deal_id} from HubSpot, skipping")
-        return False
-
-    # Stage → lokaler Outcome-Typ mappen
-    reverse_mapping = hubspot_config.REVERSE_STAGE_MAPPING
-    suggested_outcome = reverse_mapping.get(new_stage, 'unknown')
-
-    # Outcome-Daten aus Deal extrahieren
-    customer_name = deal_info.get('dealname', '')
-    datum_t1 = deal_info.get('datum_t1', '')
-    uhrzeit_t1 = deal_info.get('uhrzeit_t1', '')
-
-    outcome_data = {
-        'customer': customer_name,
-        'date': datum_t1 or '',
-        'time': uhrzeit_t1 or '',
-        'outcome': suggested_outcome,
-        'consultant': deal_info.get('telefonist', ''),
-    }
-
-    # Queue-Item erstellen (Admin-Review, wie G.2)
-    note = f"HubSpot Stage-Change: {previous_stage} → {new_stage}"
-
-    try:
-        queue_item = hubspot_queue_service.add_to_queue(
-            outcome_data=outcome_data,
-            deal_info=deal_info,
-            suggested_action=suggested_outcome,
-            stage=new_stage,
-            note=note,
-        )
-
-        logger.info(
-            f"HubSpot webhook queued: deal {deal_id} → "
-            f"{suggested_outcome} (queue item {queue_item.get('id')})"
-        )
-
-        # Audit-Log
-        audit_service.log(
-            'hubspot_webhook_processed',
-            'webhook',
-            {
-                'deal_id': deal_id,
-                'new_stage': new_stage,
-                'previous_stage': previous_stage,
-                'suggested_outcome': suggested_outcome,
-                'queue_item_id': queue_item.get('id'),
-                'customer': customer_name,
-            }
-        )
-
-        return True
-
-    except Exception as e:
-        logger.error(f"Failed to queue HubSpot stage change for deal {deal_id}: {e}")
-        return False
-
-
 @hubspot_webhook_bp.route('/api/hubspot/webhook', methods=['POST'])
 def handle_webhook():
     """Empfängt HubSpot Deal-Stage-Änderungen.
 
-    Event-Typen die verarbeitet werden:
+    Event-Typen die verarbeitet werden (asynchron, siehe webhook_inbox):
     - deal.propertyChange (dealstage) → Queue-Item für Admin-Review
     """
     # Signatur validieren
@@ -185,34 +85,16 @@ def handle_webhook():
     if not payload:
         return jsonify({'error': 'Empty payload'}), 400
 
-    # HubSpot sendet Events als Array
+    # HubSpot sendet Events als Array (bis zu 100 pro Request)
     events = payload if isinstance(payload, list) else [payload]
 
-    processed = 0
-    for event in events:
-        try:
-            subscription_type = event.get('subscriptionType', '')
-
-            if subscription_type == 'deal.propertyChange':
-                property_name = event.get('propertyName', '')
-
-                if property_name == 'dealstage':
-                    if _is_duplicate(event):
-                        logger.info(f"Skipping duplicate HubSpot event: {_event_key(event)}")
-                        continue
-                    deal_id = str(event.get('objectId', ''))
-                    new_stage = event.get('propertyValue', '')
-                    previous_stage = event.get('previousPropertyValue', '')
-
-                    logger.info(
-                        f"HubSpot deal stage change: {deal_id} "
-                        f"{previous_stage} → {new_stage}"
-                    )
-
-                    if handle_stage_change(deal_id, new_stage, previous_stage):
-                        processed += 1
-
-        except Exception as e:
-            logger.error(f"Error processing HubSpot webhook event: {e}")
-
-    return jsonify({'status': 'ok', 'processed': processed}), 200
+    from app.services.hubspot_webhook_inbox import webhook_inbox
+    try:
+        batch_id = webhook_inbox.store(request.get_data())
+    except OSError as e:
+        # 5xx -> HubSpot stellt den Batch erneut zu
+        logger.error(f"Could not persist HubSpot webhook batch: {e}")
+        return jsonify({'error': 'Temporarily unavailable'}), 503
+
+    logger.info(f"HubSpot webhook batch {batch_id} accepted ({len(events)} events)")
+    return jsonify({'status': 'accepted', 'events': len(events)}), 200
@@ -123,11 +123,15 @@ def scoreboard():
             logger.error(f"Cosmetics data error for {username}: {e}", exc_info=True)
             user_cosmetics[username] = {"title": None, "theme": "default", "avatar": "🧑‍💼", "effects": []}
 
-    # Resolve avatar URLs for all ranked users
+    # Resolve avatar URLs for all ranked users (list rows 40-48px, podium up to 96px)
     avatar_urls = {}
+    podium_avatar_urls = {}
     try:
-        from app.services.avatar_service import avatar_service
-        avatar_urls = avatar_service.get_all_avatar_urls([u for u, _ in ranking])
+        from app.services.avatar_service import avatar_service, AVATAR_SIZES
+        avatar_urls = avatar_service.get_all_avatar_urls(
+            [u for u, _ in ranking], px=AVATAR_SIZES['md']['px'])
+        podium_avatar_urls = avatar_service.get_all_avatar_urls(
+            [u for u, _ in ranking[:3]], px=AVATAR_SIZES['xl']['px'])
     except Exception as e:
         logger.debug(f"Avatar URL resolution skipped: {e}")
 
@@ -218,6 +222,7 @@ def scoreboard():
                          user_levels=user_levels,
                          user_cosmetics=user_cosmetics,
                          avatar_urls=avatar_urls,
+                         podium_avatar_urls=podium_avatar_urls,
                          rank_changes=rank_changes,
                          user_streaks=user_streaks,
                          top_three=top_three,
@@ -126,8 +126,8 @@ def get_user_cosmetics(username):
 
         # Resolve avatar URL via avatar_service
         try:
-            from app.services.avatar_service import avatar_service
-            result['avatar_url'] = avatar_service.get_avatar_url(username)
+            from app.services.avatar_service import avatar_service, AVATAR_SIZES
+            result['avatar_url'] = avatar_service.get_avatar_url(username, px=AVATAR_SIZES['2xl']['px'])
         except Exception as e:
             logger.debug(f"Avatar URL resolution skipped for {username}: {e}")
             result['avatar_url'] = None
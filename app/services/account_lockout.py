@@ -2,14 +2,34 @@
 """
 Account Lockout Service
 Verhindert Brute-Force-Angriffe durch temporäre Konto-Sperrung
+
+Fehlversuche liegen in einem atomaren Zähler-Store statt in einer JSON-Datei,
+die pro Login komplett gelesen und neu geschrieben wird:
+- Redis: ein Hash ``lockout:user:<name>`` pro Account (HINCRBY + EXPIRE),
+  die Tier-Schwellen wertet ein Lua-Skript in einem Roundtrip aus
+- Aktive Sperren zusätzlich im ZSET ``lockout:locked`` (Score = Sperrende),
+  damit die Admin-Liste ohne Scan auskommt
+- Ohne Redis: geshardete In-Process-Zähler, periodisch nach PG/JSON persistiert.
+  Sperren und Entsperrungen werden sofort persistiert, und jeder Worker
+  gleicht seine Zähler spätestens nach LOCKOUT_SYNC_INTERVAL Sekunden mit dem
+  persistierten Stand ab, damit sie in allen Workern gelten.
+
+Wie bisher setzt eine abgelaufene Sperre den Eintrag zurück (beim nächsten
+Login-Check bzw. Fehlversuch). Nicht gesperrte Fehlversuche verfallen
+LOCKOUT_ATTEMPT_WINDOW Minuten nach dem letzten Versuch.
 """
 
 import os
+import time
+import atexit
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Optional, Tuple
+import threading
+import zlib
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
 from app.config.base import SecurityConfig
 from app.core.extensions import data_persistence
+from app.utils.redis_client import get_redis_client
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +44,393 @@ except ImportError:
     POSTGRES_AVAILABLE = False
     USE_POSTGRES = False
 
+LOCKOUT_KEY_PREFIX = "lockout:user:"
+LOCKOUT_LOCKED_KEY = "lockout:locked"
+LOCKOUT_SHARDS = int(os.getenv("LOCKOUT_SHARDS", "16"))
+LOCKOUT_PERSIST_INTERVAL = float(os.getenv("LOCKOUT_PERSIST_INTERVAL", "30"))
+LOCKOUT_SYNC_INTERVAL = float(os.getenv("LOCKOUT_SYNC_INTERVAL", "2"))
+
+# KEYS[1] = lockout:user:<name>, KEYS[2] = lockout:locked
+# ARGV[1] = now (Unix-Sekunden), ARGV[2] = Fenster (Sekunden),
+# ARGV[3] = '1' wenn eine aktive Sperre nur gemeldet (nicht gezählt) und eine
+#           abgelaufene Sperre zurückgesetzt wird,
+# ARGV[4] = username, ARGV[5..] = Paare (Schwelle, Minuten), höchstes Tier zuerst
+_FAILURE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local locked_until = tonumber(redis.call('HGET', KEYS[1], 'locked_until') or '0')
+if ARGV[3] == '1' and locked_until > now then
+    return {'locked', tostring(locked_until), redis.call('HGET', KEYS[1], 'failed') or '0'}
+end
+if ARGV[3] == '1' and locked_until > 0 then
+    redis.call('DEL', KEYS[1])
+    redis.call('ZREM', KEYS[2], ARGV[4])
+    locked_until = 0
+end
+local failed = redis.call('HINCRBY', KEYS[1], 'failed', 1)
+if failed == 1 then
+    redis.call('HSET', KEYS[1], 'first', ARGV[1])
+end
+redis.call('HSET', KEYS[1], 'last', ARGV[1])
+local status = 'failed'
+for i = 5, #ARGV, 2 do
+    if failed >= tonumber(ARGV[i]) then
+        locked_until = now + tonumber(ARGV[i + 1]) * 60
+        redis.call('HSET', KEYS[1], 'locked_until', tostring(locked_until))
+        redis.call('ZADD', KEYS[2], locked_until, ARGV[4])
+        status = 'now_locked'
+        break
+    end
+end
+local ttl = tonumber(ARGV[2])
+if locked_until - now > ttl then
+    ttl = math.ceil(locked_until - now)
+end
+redis.call('EXPIRE', KEYS[1], ttl)
+return {status, tostring(locked_until), tostring(failed)}
+"""
+
+
+def _to_iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts).isoformat() if ts else None
+
+
+def _from_iso(value: Optional[str]) -> float:
+    return datetime.fromisoformat(value).timestamp() if value else 0.0
+
+
+class LockoutCounters:
+    """
+    Atomare Fehlversuchs-Zähler pro Account (Redis-Hash, In-Process-Fallback)
+
+    Einträge: {'failed', 'first', 'last', 'locked_until'} mit Unix-Timestamps,
+    locked_until = 0 wenn nicht gesperrt.
+    """
+
+    def __init__(self, tiers: List[Tuple[int, int]], window_seconds: int,
+                 load: Callable[[], Dict], save: Callable[[Dict], None],
+                 shards: int = LOCKOUT_SHARDS,
+                 persist_interval: float = LOCKOUT_PERSIST_INTERVAL,
+                 sync_interval: float = LOCKOUT_SYNC_INTERVAL):
+        # (Schwelle, Minuten), höchstes Tier zuerst
+        self.tiers = sorted(tiers, reverse=True)
+        self.window_seconds = window_seconds
+        self.persist_interval = persist_interval
+        self.sync_interval = sync_interval
+        self._load = load
+        self._save = save
+        self._shards = [(threading.Lock(), {}) for _ in range(max(1, shards))]
+        # username -> locked_until (Admin-Liste ohne Shard-Scan)
+        self._locked: Dict[str, float] = {}
+        self._meta_lock = threading.Lock()
+        # Serialisiert Flush und Abgleich (beide lesen den persistierten Stand)
+        self._io_lock = threading.RLock()
+        self._dirty = set()
+        self._synced_at: Optional[float] = None
+        self._last_flush = time.monotonic()
+
+    def tier_minutes(self, failed: int) -> int:
+        """Sperrdauer für ``failed`` Fehlversuche (0 = keine Sperre)"""
+        for threshold, minutes in self.tiers:
+            if failed >= threshold:
+                return minutes
+        return 0
+
+    # ========== Öffentliche API ==========
+
+    def record_failure(self, username: str, check_locked: bool,
+                       now: Optional[float] = None) -> Tuple[str, float, int]:
+        """
+        Zählt einen Fehlversuch und wendet die Tiers an
+
+        Returns:
+            (status, locked_until, failed) mit status 'locked' (bereits gesperrt,
+            nicht gezählt wenn ``check_locked``), 'now_locked' oder 'failed'
+        """
+        now = now if now is not None else time.time()
+        client = get_redis_client()
+        if client is not None:
+            try:
+                args = [now, self.window_seconds, '1' if check_locked else '0', username]
+                for threshold, minutes in self.tiers:
+                    args.extend([threshold, minutes])
+                status, locked_until, failed = client.eval(
+                    _FAILURE_SCRIPT, 2, f"{LOCKOUT_KEY_PREFIX}{username}", LOCKOUT_LOCKED_KEY, *args)
+                return status, float(locked_until), int(failed)
+            except Exception as e:
+                logger.warning(f"Redis lockout update failed, using local counters: {e}")
+
+        lock, entries = self._shard(username)
+        with lock:
+            entry = self._live(entries, username, now)
+            if check_locked and entry and entry['locked_until'] > now:
+                return 'locked', entry['locked_until'], entry['failed']
+            if check_locked and entry and entry['locked_until']:
+                # Sperre abgelaufen - Eintrag zurücksetzen
+                entry = None
+            if entry is None:
+                entry = entries[username] = {'failed': 0, 'first': now, 'last': now, 'locked_until': 0.0}
+            entry['failed'] += 1
+            entry['last'] = now
+            status = 'failed'
+            minutes = self.tier_minutes(entry['failed'])
+            if minutes:
+                entry['locked_until'] = now + minutes * 60
+                status = 'now_locked'
+            result = (status, entry['locked_until'], entry['failed'])
+            # Noch unter dem Shard-Lock, damit ein Abgleich die Änderung nicht überschreibt
+            self._dirty.add(username)
+
+        # Neue Sperren sofort persistieren, damit andere Worker sie sehen
+        self._mark(username, entry['locked_until'] if minutes else None, persist=bool(minutes))
+        return result
+
+    def get(self, username: str, now: Optional[float] = None) -> Optional[Dict]:
+        """Eintrag des Accounts oder None (abgelaufen / unbekannt)"""
+        now = now if now is not None else time.time()
+        client = get_redis_client()
+        if client is not None:
+            try:
+                raw = client.hgetall(f"{LOCKOUT_KEY_PREFIX}{username}")
+                if not raw:
+                    return None
+                return {
+                    'failed': int(raw.get('failed', 0)),
+                    'first': float(raw.get('first', 0)),
+                    'last': float(raw.get('last', 0)),
+                    'locked_until': float(raw.get('locked_until', 0)),
+                }
+            except Exception as e:
+                logger.warning(f"Redis lockout read failed, using local counters: {e}")
+
+        lock, entries = self._shard(username)
+        with lock:
+            entry = self._live(entries, username, now)
+            return dict(entry) if entry else None
+
+    def clear(self, username: str, sync: bool = False) -> bool:
+        """
+        Entfernt Zähler und Sperre; True wenn ein Eintrag existierte
+
+        Args:
+            sync: vorher mit dem persistierten Stand abgleichen (Sperre kann
+                  aus einem anderen Worker stammen, z.B. Admin-Entsperrung)
+        """
+        client = get_redis_client()
+        if client is not None:
+            try:
+                pipe = client.pipeline()
+                pipe.delete(f"{LOCKOUT_KEY_PREFIX}{username}")
+                pipe.zrem(LOCKOUT_LOCKED_KEY, username)
+                deleted, _ = pipe.execute()
+                return bool(deleted)
+            except Exception as e:
+                logger.warning(f"Redis lockout clear failed, using local counters: {e}")
+
+        if sync:
+            self._sync(force=True)
+        lock, entries = self._shard(username)
+        with lock:
+            existed = self._live(entries, username, time.time()) is not None
+            entries.pop(username, None)
+            if existed:
+                self._dirty.add(username)
+        if existed:
+            self._mark(username, None, removed=True, persist=True)
+        return existed
+
+    def locked(self, now: Optional[float] = None) -> List[Tuple[str, float, int]]:
+        """Aktive Sperren als (username, locked_until, failed), früheste zuerst"""
+        now = now if now is not None else time.time()
+        client = get_redis_client()
+        if client is not None:
+            try:
+                client.zremrangebyscore(LOCKOUT_LOCKED_KEY, '-inf', now)
+                members = client.zrangebyscore(LOCKOUT_LOCKED_KEY, f"({now}", '+inf', withscores=True)
+                pipe = client.pipeline()
+                for username, _ in members:
+                    pipe.hget(f"{LOCKOUT_KEY_PREFIX}{username}", 'failed')
+                counts = pipe.execute() if members else []
+                return [
+                    (username, float(until), int(failed or 0))
+                    for (username, until), failed in zip(members, counts)
+                ]
+            except Exception as e:
+                logger.warning(f"Redis lockout list failed, using local counters: {e}")
+
+        self._sync()
+        with self._meta_lock:
+            for username in [u for u, until in self._locked.items() if until <= now]:
+                del self._locked[username]
+            active = sorted(self._locked.items(), key=lambda item: item[1])
+        result = []
+        for username, until in active:
+            entry = self.get(username, now)
+            if entry and entry['locked_until'] > now:
+                result.append((username, entry['locked_until'], entry['failed']))
+        return result
+
+    # ========== Persistenz (nur In-Process-Fallback) ==========
+
+    def flush(self) -> int:
+        """
+        Schreibt geänderte lokale Einträge nach PG/JSON (merged mit dem
+        persistierten Stand, damit andere Worker nicht überschrieben werden)
+
+        Returns:
+            Anzahl geschriebener Accounts
+        """
+        with self._io_lock:
+            with self._meta_lock:
+                dirty = self._dirty
+                self._dirty = set()
+                self._last_flush = time.monotonic()
+            if not dirty:
+                return 0
+
+            now = time.time()
+            try:
+                data = self._load() or {}
+                for username in dirty:
+                    lock, entries = self._shard_of(username)
+                    with lock:
+                        entry = self._live(entries, username, now)
+                        entry = dict(entry) if entry else None
+                    current = data.get(username)
+                    if entry and current:
+                        # Aktive Sperre eines anderen Workers nicht überschreiben
+                        remote = self._parse(current)
+                        if remote['locked_until'] > max(entry['locked_until'], now):
+                            entry['locked_until'] = remote['locked_until']
+                            entry['failed'] = max(entry['failed'], remote['failed'])
+                    if entry:
+                        data[username] = {
+                            'failed_attempts': entry['failed'],
+                            'first_attempt': _to_iso(entry['first']),
+                            'last_attempt': _to_iso(entry['last']),
+                            'locked_until': _to_iso(entry['locked_until']),
+                        }
+                    else:
+                        data.pop(username, None)
+                # Verfallene Einträge anderer Worker gleich mit aufräumen
+                for username in [u for u, d in data.items() if self._expired(self._parse(d), now)]:
+                    del data[username]
+                self._save(data)
+                return len(dirty)
+            except Exception as e:
+                logger.error(f"Lockout persist failed: {e}")
+                with self._meta_lock:
+                    self._dirty |= dirty
+                return 0
+
+    # ========== Intern ==========
+
+    def _shard(self, username: str):
+        self._sync()
+        return self._shard_of(username)
+
+    def _shard_of(self, username: str):
+        return self._shards[zlib.crc32(username.encode('utf-8')) % len(self._shards)]
+
+    def _parse(self, data: Dict) -> Dict:
+        return {
+            'failed': int(data.get('failed_attempts', 0)),
+            'first': _from_iso(data.get('first_attempt')),
+            'last': _from_iso(data.get('last_attempt')),
+            'locked_until': _from_iso(data.get('locked_until')),
+        }
+
+    def _expired(self, entry: Dict, now: float) -> bool:
+        return max(entry['last'] + self.window_seconds, entry['locked_until']) <= now
+
+    def _live(self, entries: Dict, username: str, now: float) -> Optional[Dict]:
+        entry = entries.get(username)
+        if entry is not None and self._expired(entry, now):
+            del entries[username]
+            return None
+        return entry
+
+    def _sync(self, force: bool = False) -> None:
+        """
+        Gleicht die lokalen Zähler mit dem persistierten Stand (PG/JSON) ab
+
+        Beim ersten Zugriff (Warmstart), danach höchstens alle ``sync_interval``
+        Sekunden bzw. sofort mit ``force``. Nicht geflushte lokale Änderungen
+        bleiben erhalten, alles andere übernimmt den persistierten Stand, so dass
+        Sperren und Entsperrungen anderer Worker auch hier gelten.
+        """
+        if not force and self._is_synced():
+            return
+        with self._io_lock:
+            if not force and self._is_synced():
+                return
+            started = time.monotonic()
+            try:
+                persisted = self._load() or {}
+            except Exception as e:
+                logger.warning(f"Could not load persisted lockouts: {e}")
+                persisted = None
+            if persisted is not None:
+                self._merge(persisted, time.time())
+            self._synced_at = started
+
+    def _is_synced(self) -> bool:
+        return self._synced_at is not None and time.monotonic() - self._synced_at < self.sync_interval
+
+    def _merge(self, persisted: Dict, now: float) -> None:
+        remote = {}
+        for username, data in persisted.items():
+            try:
+                entry = self._parse(data)
+            except (TypeError, ValueError):
+                continue
+            if not self._expired(entry, now):
+                remote[username] = entry
+
+        # Lokale, noch nicht geflushte Änderungen (_dirty) bleiben erhalten;
+        # _dirty wird unter dem jeweiligen Shard-Lock gesetzt
+        locked = {}
+        for lock, entries in self._shards:
+            with lock:
+                for username in [u for u in entries if u not in remote and u not in self._dirty]:
+                    # In einem anderen Worker entsperrt / zurückgesetzt
+                    del entries[username]
+                    locked[username] = None
+        for username, entry in remote.items():
+            lock, entries = self._shard_of(username)
+            with lock:
+                local = entries.get(username)
+                if local is not None and username in self._dirty:
+                    # Aktive Sperre / offene Fehlversuche des anderen Workers
+                    # übernehmen, eine abgelaufene Sperre nicht wiederbeleben
+                    if entry['locked_until'] > now:
+                        local['locked_until'] = max(local['locked_until'], entry['locked_until'])
+                        local['failed'] = max(local['failed'], entry['failed'])
+                    elif not entry['locked_until']:
+                        local['failed'] = max(local['failed'], entry['failed'])
+                    entry = local
+                else:
+                    entries[username] = entry
+                locked[username] = entry['locked_until'] if entry['locked_until'] > now else None
+
+        with self._meta_lock:
+            for username, until in locked.items():
+                if until:
+                    self._locked[username] = until
+                else:
+                    self._locked.pop(username, None)
+
+    def _mark(self, username: str, locked_until: Optional[float], removed: bool = False,
+              persist: bool = False) -> None:
+        with self._meta_lock:
+            self._dirty.add(username)
+            if locked_until:
+                self._locked[username] = locked_until
+            elif removed:
+                self._locked.pop(username, None)
+            due = persist or time.monotonic() - self._last_flush >= self.persist_interval
+        if due:
+            self.flush()
+
 
 class AccountLockoutService:
     """
@@ -33,6 +440,10 @@ class AccountLockoutService:
     - Nach 5 fehlgeschlagenen Versuchen: 15 Minuten Sperre
     - Nach 10 fehlgeschlagenen Versuchen: 1 Stunde Sperre
     - Nach 15 fehlgeschlagenen Versuchen: 24 Stunden Sperre
+
+    Während einer Sperre werden Versuche nicht gezählt; eine abgelaufene Sperre
+    setzt den Eintrag zurück. Nicht gesperrte Fehlversuche verfallen mit dem
+    Versuchsfenster, nach erfolgreichem Login oder per Admin-Entsperrung.
     """
 
     def __init__(self):
@@ -43,6 +454,16 @@ class AccountLockoutService:
         self.lockout_duration_tier1 = SecurityConfig.LOCKOUT_DURATION_TIER1
         self.lockout_duration_tier2 = SecurityConfig.LOCKOUT_DURATION_TIER2
         self.lockout_duration_tier3 = SecurityConfig.LOCKOUT_DURATION_TIER3
+        self.counters = LockoutCounters(
+            tiers=[
+                (self.max_attempts_tier1, self.lockout_duration_tier1),
+                (self.max_attempts_tier2, self.lockout_duration_tier2),
+                (self.max_attempts_tier3, self.lockout_duration_tier3),
+            ],
+            window_seconds=SecurityConfig.LOCKOUT_ATTEMPT_WINDOW * 60,
+            load=lambda: self._load_lockout_data(),
+            save=lambda data: self._save_lockout_data(data),
+        )
 
     def _load_lockout_data(self) -> Dict:
         """Lade Lockout-Daten — PG-first mit JSON-Fallback"""
@@ -122,25 +543,19 @@ class AccountLockoutService:
         """
         Prüfe ob Account gesperrt ist
 
+        Eine abgelaufene Sperre setzt den Eintrag zurück; nicht gesperrte
+        Fehlversuche bleiben stehen.
+
         Returns:
             (is_locked, minutes_remaining)
         """
-        lockout_data = self._load_lockout_data()
-
-        if username not in lockout_data:
-            return False, None
-
-        user_data = lockout_data[username]
-        locked_until = datetime.fromisoformat(user_data.get('locked_until', '')) if user_data.get('locked_until') else None
-
-        if locked_until and datetime.now() < locked_until:
-            # Noch gesperrt
-            remaining = (locked_until - datetime.now()).total_seconds() / 60
-            return True, int(remaining)
-
-        # Sperre abgelaufen - Zähler zurücksetzen
-        del lockout_data[username]
-        self._save_lockout_data(lockout_data)
+        entry = self.counters.get(username)
+        now = time.time()
+        if entry and entry['locked_until'] > now:
+            return True, int((entry['locked_until'] - now) / 60)
+        if entry and entry['locked_until']:
+            # Sperre abgelaufen - Zähler zurücksetzen
+            self.counters.clear(username)
         return False, None
 
     def record_failed_attempt(self, username: str) -> Tuple[bool, Optional[int]]:
@@ -150,161 +565,81 @@ class AccountLockoutService:
         Returns:
             (is_now_locked, lockout_minutes)
         """
-        lockout_data = self._load_lockout_data()
-
-        if username not in lockout_data:
-            lockout_data[username] = {
-                'failed_attempts': 0,
-                'first_attempt': datetime.now().isoformat(),
-                'last_attempt': None,
-                'locked_until': None
-            }
-
-        user_data = lockout_data[username]
-        user_data['failed_attempts'] += 1
-        user_data['last_attempt'] = datetime.now().isoformat()
-
-        failed_attempts = user_data['failed_attempts']
-        lockout_duration = 0
-
-        # Bestimme Lockout-Tier
-        if failed_attempts >= self.max_attempts_tier3:
-            lockout_duration = self.lockout_duration_tier3
-            logger.warning(f"Account {username} locked for {lockout_duration} minutes (Tier 3: {failed_attempts} attempts)")
-        elif failed_attempts >= self.max_attempts_tier2:
-            lockout_duration = self.lockout_duration_tier2
-            logger.warning(f"Account {username} locked for {lockout_duration} minutes (Tier 2: {failed_attempts} attempts)")
-        elif failed_attempts >= self.max_attempts_tier1:
-            lockout_duration = self.lockout_duration_tier1
-            logger.warning(f"Account {username} locked for {lockout_duration} minutes (Tier 1: {failed_attempts} attempts)")
-
-        if lockout_duration > 0:
-            locked_until = datetime.now() + timedelta(minutes=lockout_duration)
-            user_data['locked_until'] = locked_until.isoformat()
-            self._save_lockout_data(lockout_data)
-            return True, lockout_duration
-
-        # Noch nicht gesperrt
-        self._save_lockout_data(lockout_data)
+        status, _, failed = self.counters.record_failure(username, check_locked=False)
+        if status == 'now_locked':
+            return True, self._log_lock(username, failed)
         return False, None
 
     def check_and_record_failure(self, username: str) -> Tuple[str, Optional[int]]:
-        """Atomarer Check + Increment in einem Load/Save-Zyklus.
+        """Atomarer Check + Increment in einer Operation des Zähler-Stores.
 
         Returns:
             ('locked', minutes_remaining) - bereits gesperrt
             ('now_locked', lockout_minutes) - gerade gesperrt worden
             ('failed', None) - Versuch gezaehlt, noch nicht gesperrt
         """
-        lockout_data = self._load_lockout_data()
-
-        # 1. Check ob bereits gesperrt
-        if username in lockout_data:
-            user_data = lockout_data[username]
-            locked_until = datetime.fromisoformat(user_data.get('locked_until', '')) if user_data.get('locked_until') else None
-
-            if locked_until and datetime.now() < locked_until:
-                remaining = (locked_until - datetime.now()).total_seconds() / 60
-                return 'locked', int(remaining)
-
-            # Sperre abgelaufen — Eintrag zuruecksetzen
-            if locked_until:
-                del lockout_data[username]
-
-        # 2. Increment + ggf. sperren
-        if username not in lockout_data:
-            lockout_data[username] = {
-                'failed_attempts': 0,
-                'first_attempt': datetime.now().isoformat(),
-                'last_attempt': None,
-                'locked_until': None
-            }
-
-        user_data = lockout_data[username]
-        user_data['failed_attempts'] += 1
-        user_data['last_attempt'] = datetime.now().isoformat()
-
-        failed_attempts = user_data['failed_attempts']
-        lockout_duration = 0
-
-        if failed_attempts >= self.max_attempts_tier3:
-            lockout_duration = self.lockout_duration_tier3
-            logger.warning(f"Account {username} locked for {lockout_duration} minutes (Tier 3: {failed_attempts} attempts)")
-        elif failed_attempts >= self.max_attempts_tier2:
-            lockout_duration = self.lockout_duration_tier2
-            logger.warning(f"Account {username} locked for {lockout_duration} minutes (Tier 2: {failed_attempts} attempts)")
-        elif failed_attempts >= self.max_attempts_tier1:
-            lockout_duration = self.lockout_duration_tier1
-            logger.warning(f"Account {username} locked for {lockout_duration} minutes (Tier 1: {failed_attempts} attempts)")
-
-        if lockout_duration > 0:
-            locked_until = datetime.now() + timedelta(minutes=lockout_duration)
-            user_data['locked_until'] = locked_until.isoformat()
-            self._save_lockout_data(lockout_data)
-            return 'now_locked', lockout_duration
-
-        self._save_lockout_data(lockout_data)
+        status, locked_until, failed = self.counters.record_failure(username, check_locked=True)
+        if status == 'locked':
+            return 'locked', int((locked_until - time.time()) / 60)
+        if status == 'now_locked':
+            return 'now_locked', self._log_lock(username, failed)
         return 'failed', None
 
+    def _log_lock(self, username: str, failed: int) -> int:
+        lockout_duration = self.counters.tier_minutes(failed)
+        tier = 3 if failed >= self.max_attempts_tier3 else 2 if failed >= self.max_attempts_tier2 else 1
+        logger.warning(
+            f"Account {username} locked for {lockout_duration} minutes (Tier {tier}: {failed} attempts)")
+        return lockout_duration
+
     def record_successful_login(self, username: str):
         """Lösche fehlgeschlagene Versuche nach erfolgreichem Login"""
-        lockout_data = self._load_lockout_data()
-
-        if username in lockout_data:
-            del lockout_data[username]
-            self._save_lockout_data(lockout_data)
+        if self.counters.clear(username):
             logger.info(f"Failed login attempts cleared for {username}")
 
     def admin_unlock(self, username: str) -> bool:
         """Admin-Funktion: Account manuell entsperren"""
-        lockout_data = self._load_lockout_data()
-
-        if username in lockout_data:
-            del lockout_data[username]
-            self._save_lockout_data(lockout_data)
+        if self.counters.clear(username, sync=True):
             logger.info(f"Account {username} manually unlocked by admin")
             return True
-
         return False
 
     def get_lockout_info(self, username: str) -> Optional[Dict]:
         """Hole Lockout-Informationen für Admin-Dashboard"""
-        lockout_data = self._load_lockout_data()
-
-        if username not in lockout_data:
+        entry = self.counters.get(username)
+        if entry is None:
             return None
 
-        user_data = lockout_data[username]
-        locked_until = datetime.fromisoformat(user_data.get('locked_until', '')) if user_data.get('locked_until') else None
-
+        now = time.time()
+        is_locked = entry['locked_until'] > now
         return {
             'username': username,
-            'failed_attempts': user_data.get('failed_attempts', 0),
-            'first_attempt': user_data.get('first_attempt'),
-            'last_attempt': user_data.get('last_attempt'),
-            'locked_until': user_data.get('locked_until'),
-            'is_locked': locked_until and datetime.now() < locked_until if locked_until else False,
-            'minutes_remaining': int((locked_until - datetime.now()).total_seconds() / 60) if locked_until and datetime.now() < locked_until else 0
+            'failed_attempts': entry['failed'],
+            'first_attempt': _to_iso(entry['first']),
+            'last_attempt': _to_iso(entry['last']),
+            'locked_until': _to_iso(entry['locked_until']),
+            'is_locked': is_locked,
+            'minutes_remaining': int((entry['locked_until'] - now) / 60) if is_locked else 0
         }
 
     def get_all_locked_accounts(self) -> list:
-        """Hole alle aktuell gesperrten Accounts"""
-        lockout_data = self._load_lockout_data()
-        locked_accounts = []
-
-        for username, user_data in lockout_data.items():
-            locked_until = datetime.fromisoformat(user_data.get('locked_until', '')) if user_data.get('locked_until') else None
-
-            if locked_until and datetime.now() < locked_until:
-                locked_accounts.append({
-                    'username': username,
-                    'failed_attempts': user_data.get('failed_attempts', 0),
-                    'locked_until': user_data.get('locked_until'),
-                    'minutes_remaining': int((locked_until - datetime.now()).total_seconds() / 60)
-                })
+        """Hole alle aktuell gesperrten Accounts (über den Sperr-Index, ohne Scan)"""
+        now = time.time()
+        return [
+            {
+                'username': username,
+                'failed_attempts': failed,
+                'locked_until': _to_iso(locked_until),
+                'minutes_remaining': int((locked_until - now) / 60)
+            }
+            for username, locked_until, failed in self.counters.locked(now)
+        ]
 
-        return locked_accounts
+    def flush(self):
+        """Persistiert ausstehende lokale Zähler (Shutdown, Tests)"""
+        return self.counters.flush()
 
 
 # Global instance
 account_lockout = AccountLockoutService()
+atexit.register(account_lockout.flush)
@@ -0,0 +1,447 @@
+# -*- coding: utf-8 -*-
+"""
+Inkrementelle, eventgesteuerte Achievement-Auswertung
+
+Statt pro Buchung Scores, Daily Stats und Badges komplett zu laden, alle Regeln
+zu prüfen und die Streaks über die ganze Historie neu zu berechnen:
+
+- Jede Badge-Regel deklariert, von welchen Event-Typen und welchem Aggregat-Wert
+  sie abhängt (RULES)
+- Pro User werden laufende Aggregate (Tages-/Wochen-/Monats-/Gesamtpunkte,
+  Buchungszähler, Streak-Längen, letzter aktiver Tag) fortgeschrieben
+- Pro Event werden nur die betroffenen, noch nicht verdienten Regeln geprüft;
+  Badges werden nur geladen, wenn tatsächlich ein Badge fällig ist
+- MVP-Badges werden einmal pro abgeschlossener Periode (Woche/Monat/Jahr)
+  vergeben statt bei jeder Buchung
+
+Die Aggregate liegen pro User in einer eigenen Datei (users/<user>.json) unter
+einem eigenen Lock; ein Event schreibt nur die Datei seines Users. Der
+Perioden-Stand für die MVP-Vergabe liegt separat in periods.json und wird nur
+beim Periodenwechsel geschrieben.
+
+record() wird NACH dem Schreiben der Quelldaten (scores / daily_user_stats)
+aufgerufen. Kennt die Engine einen User noch nicht, werden seine Aggregate
+einmalig aus den Quelldaten aufgebaut (das aktuelle Event ist darin enthalten).
+"""
+
+import os
+import logging
+from urllib.parse import quote
+from datetime import datetime, timedelta, date
+from typing import Dict, List, Optional, Tuple
+
+import pytz
+
+from app.services.achievement_system import ACHIEVEMENT_DEFINITIONS, EVENT_ACTIVITY, EVENT_SCORE
+from app.utils.file_lock import file_lock
+from app.utils.json_utils import atomic_read_json, atomic_write_json
+
+logger = logging.getLogger(__name__)
+TZ = pytz.timezone("Europe/Berlin")
+
+# Streak-Fenster der bisherigen Berechnung (calculate_*_streak)
+STREAK_WINDOW_DAYS = 60
+
+
+class Rule:
+    """Badge-Regel: ``stat >= threshold``, ausgewertet bei den Events in ``events``"""
+
+    def __init__(self, badge_id: str, stat: str, events: Tuple[str, ...], threshold: int):
+        self.badge_id = badge_id
+        self.stat = stat
+        self.events = events
+        self.threshold = threshold
+        self.definition = ACHIEVEMENT_DEFINITIONS[badge_id]
+
+    def met(self, values: Dict[str, int]) -> bool:
+        return values.get(self.stat, 0) >= self.threshold
+
+
+# Kategorie -> (Aggregat-Wert, auslösende Events)
+CATEGORY_STATS = {
+    "daily": ("day_points", (EVENT_ACTIVITY,)),
+    "weekly": ("week_points", (EVENT_ACTIVITY,)),
+    "monthly": ("month_points", (EVENT_SCORE,)),
+    "total": ("total_points", (EVENT_SCORE,)),
+    "streak": ("best_streak", (EVENT_ACTIVITY,)),
+    "milestone": ("total_bookings", (EVENT_ACTIVITY,)),
+}
+
+# Spezial-Badges mit eigener Bedingung (weekend_warrior wird bisher nicht vergeben)
+SPECIAL_STATS = {
+    "first_booking": ("first_booking", (EVENT_ACTIVITY,)),
+    "night_owl": ("evening_bookings", (EVENT_ACTIVITY,)),
+    "early_bird": ("morning_bookings", (EVENT_ACTIVITY,)),
+}
+
+
+def _build_rules() -> List[Rule]:
+    rules = []
+    for badge_id, definition in ACHIEVEMENT_DEFINITIONS.items():
+        category = definition["category"]
+        if category in CATEGORY_STATS and "threshold" in definition:
+            stat, events = CATEGORY_STATS[category]
+            rules.append(Rule(badge_id, stat, events, definition["threshold"]))
+        elif badge_id in SPECIAL_STATS:
+            stat, events = SPECIAL_STATS[badge_id]
+            rules.append(Rule(badge_id, stat, events, definition.get("threshold", 1)))
+    return rules
+
+
+RULES = _build_rules()
+
+
+def _week_key(day: date) -> str:
+    iso = day.isocalendar()
+    return f"{iso[0]}-W{iso[1]:02d}"
+
+
+def _previous_weekday(day: date) -> date:
+    day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+def _latest_weekday(day: date) -> date:
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+def _weekday_cap(today: date) -> int:
+    """Maximaler Arbeits-Streak im Fenster von STREAK_WINDOW_DAYS Kalendertagen"""
+    return sum(1 for i in range(STREAK_WINDOW_DAYS) if (today - timedelta(days=i)).weekday() < 5)
+
+
+def _trailing_run(active: set, step, limit: int = STREAK_WINDOW_DAYS) -> Tuple[Optional[str], int]:
+    """Letzter aktiver Tag und Länge der Serie, die an ihm endet"""
+    if not active:
+        return None, 0
+    last = max(active)
+    run, day = 0, last
+    while day in active and run < limit:
+        run += 1
+        day = step(day)
+    return last.isoformat(), run
+
+
+def _extend_run(agg: Dict, name: str, day: date, previous: date) -> None:
+    last = agg.get(f"{name}_last")
+    if last == day.isoformat():
+        return
+    agg[f"{name}_run"] = agg.get(f"{name}_run", 0) + 1 if last == previous.isoformat() else 1
+    agg[f"{name}_last"] = day.isoformat()
+
+
+class AchievementEngine:
+    """Hält die User-Aggregate und wertet Events gegen die betroffenen Regeln aus"""
+
+    def __init__(self, system=None, state_dir: Optional[str] = None):
+        self._system = system
+        if state_dir is None:
+            persist_base = os.getenv("PERSIST_BASE", "data")
+            state_dir = os.path.join(persist_base, "persistent", "achievement_aggregates")
+        self.state_dir = state_dir
+        self.periods_file = os.path.join(state_dir, "periods.json")
+
+    @property
+    def system(self):
+        if self._system is None:
+            from app.services.achievement_system import achievement_system
+            self._system = achievement_system
+        return self._system
+
+    def _user_file(self, user: str) -> str:
+        return os.path.join(self.state_dir, "users", f"{quote(user, safe='')}.json")
+
+    def _load_user(self, user: str) -> Optional[Dict]:
+        agg = atomic_read_json(self._user_file(user), default=None)
+        return agg if isinstance(agg, dict) else None
+
+    def _save_user(self, user: str, agg: Dict) -> None:
+        path = self._user_file(user)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write_json(path, agg, indent=None)
+
+    def _load_periods(self) -> Optional[Dict]:
+        periods = atomic_read_json(self.periods_file, default=None)
+        return periods if isinstance(periods, dict) else None
+
+    def _save_periods(self, periods: Dict) -> None:
+        os.makedirs(self.state_dir, exist_ok=True)
+        atomic_write_json(self.periods_file, periods, indent=None)
+
+    # ========== Aggregate ==========
+
+    @staticmethod
+    def _roll(agg: Dict, now: datetime) -> None:
+        """Setzt Tages-/Wochen-/Monatsfenster zurück, wenn die Periode gewechselt hat"""
+        today = now.date()
+        if agg.get("day") != today.isoformat():
+            agg["day"] = today.isoformat()
+            agg["day_points"] = 0
+            agg["day_bookings"] = 0
+        if agg.get("week") != _week_key(today):
+            agg["week"] = _week_key(today)
+            agg["week_points"] = 0
+        if agg.get("month") != now.strftime("%Y-%m"):
+            agg["month"] = now.strftime("%Y-%m")
+            agg["month_points"] = 0
+
+    def build_aggregate(self, user_scores: Dict, user_stats: Dict, earned, now: datetime) -> Dict:
+        """Aggregate eines Users aus den Quelldaten (einmalig bzw. nach Reparaturen)"""
+        today = now.date()
+        week_start = today - timedelta(days=today.weekday())
+        month = now.strftime("%Y-%m")
+
+        days = {}
+        for date_str, stats in user_stats.items():
+            try:
+                day = datetime.strptime(date_str, "%Y-%m-%d").date()
+            except (ValueError, TypeError):
+                continue
+            if day <= today and isinstance(stats, dict):
+                days[day] = stats
+
+        points_days = {d for d, s in days.items() if s.get("points", 0) > 0}
+        booking_days = {d for d, s in days.items() if s.get("bookings", 0) > 0}
+        work_days = {d for d in points_days if d.weekday() < 5}
+        today_stats = days.get(today, {})
+
+        agg = {
+            "day": today.isoformat(),
+            "day_points": today_stats.get("points", 0),
+            "day_bookings": today_stats.get("bookings", 0),
+            "week": _week_key(today),
+            "week_points": sum(s.get("points", 0) for d, s in days.items() if week_start <= d),
+            "month": month,
+            "month_points": user_scores.get(month, 0),
+            "total_points": sum(user_scores.values()),
+            "total_bookings": sum(s.get("bookings", 0) for s in user_stats.values() if isinstance(s, dict)),
+            "evening_bookings": sum(s.get("evening_bookings", 0) for s in user_stats.values() if isinstance(s, dict)),
+            "morning_bookings": sum(s.get("morning_bookings", 0) for s in user_stats.values() if isinstance(s, dict)),
+            "first_booking": int(any(s.get("first_booking", False) for s in user_stats.values() if isinstance(s, dict))),
+            "earned": sorted(earned),
+        }
+        agg["points_last"], agg["points_run"] = _trailing_run(points_days, lambda d: d - timedelta(days=1))
+        agg["booking_last"], agg["booking_run"] = _trailing_run(booking_days, lambda d: d - timedelta(days=1))
+        agg["work_last"], agg["work_run"] = _trailing_run(work_days, _previous_weekday)
+        return agg
+
+    def _apply(self, agg: Dict, event_type: str, data: Dict, now: datetime) -> None:
+        today = now.date()
+        if event_type == EVENT_SCORE:
+            points = data.get("points", 0)
+            agg["total_points"] = agg.get("total_points", 0) + points
+            if data.get("month", agg["month"]) == agg["month"]:
+                agg["month_points"] += points
+            return
+
+        if event_type != EVENT_ACTIVITY:
+            raise ValueError(f"Unknown achievement event: {event_type}")
+
+        points = data.get("points", 0)
+        bookings = data.get("bookings", 0)
+        agg["day_points"] += points
+        agg["week_points"] += points
+        agg["day_bookings"] += bookings
+        agg["total_bookings"] = agg.get("total_bookings", 0) + bookings
+        agg["evening_bookings"] = agg.get("evening_bookings", 0) + data.get("evening_bookings", 0)
+        agg["morning_bookings"] = agg.get("morning_bookings", 0) + data.get("morning_bookings", 0)
+        if data.get("first_booking"):
+            agg["first_booking"] = 1
+
+        if agg["day_points"] > 0:
+            _extend_run(agg, "points", today, today - timedelta(days=1))
+            if today.weekday() < 5:
+                _extend_run(agg, "work", today, _previous_weekday(today))
+        if agg["day_bookings"] > 0:
+            _extend_run(agg, "booking", today, today - timedelta(days=1))
+
+    @staticmethod
+    def values(agg: Dict, now: datetime) -> Dict[str, int]:
+        """Regel-Werte zum Zeitpunkt ``now`` (Streaks wie calculate_advanced_streak)"""
+        today = now.date()
+        today_str = today.isoformat()
+
+        def current(name: str, reference: date, cap: int) -> int:
+            if agg.get(f"{name}_last") != reference.isoformat():
+                return 0
+            return min(agg.get(f"{name}_run", 0), cap)
+
+        is_today = agg.get("day") == today_str
+        streaks = (
+            current("work", _latest_weekday(today), _weekday_cap(today)),
+            current("booking", today, STREAK_WINDOW_DAYS),
+            current("points", today, STREAK_WINDOW_DAYS),
+        )
+        return {
+            "day_points": agg.get("day_points", 0) if is_today else 0,
+            "week_points": agg.get("week_points", 0) if agg.get("week") == _week_key(today) else 0,
+            "month_points": agg.get("month_points", 0) if agg.get("month") == now.strftime("%Y-%m") else 0,
+            "total_points": agg.get("total_points", 0),
+            "best_streak": max(streaks),
+            "total_bookings": agg.get("total_bookings", 0),
+            "evening_bookings": agg.get("evening_bookings", 0),
+            "morning_bookings": agg.get("morning_bookings", 0),
+            "first_booking": agg.get("first_booking", 0),
+        }
+
+    # ========== Events ==========
+
+    def record(self, user: str, event_type: str, now: Optional[datetime] = None, **data) -> List[Dict]:
+        """
+        Verarbeitet ein Event und vergibt fällige Badges
+
+        Args:
+            user: Username
+            event_type: EVENT_SCORE (points, month) oder EVENT_ACTIVITY
+                (points, bookings, evening_bookings, morning_bookings, first_booking)
+            now: Zeitpunkt des Events (Default: jetzt)
+
+        Returns:
+            Liste neu vergebener Badges
+        """
+        now = now or datetime.now(TZ)
+
+        user_file = self._user_file(user)
+        os.makedirs(os.path.dirname(user_file), exist_ok=True)
+        with file_lock(user_file):
+            agg = self._load_user(user)
+
+            if agg is None:
+                # Erstes Event: Aggregate aus den Quelldaten, alle Regeln prüfen
+                agg = self._seed(user, now)
+                rules = RULES
+            else:
+                self._roll(agg, now)
+                self._apply(agg, event_type, data, now)
+                rules = [r for r in RULES if event_type in r.events]
+
+            new_badges = self._evaluate(user, agg, rules, now)
+            self._save_user(user, agg)
+
+        self._check_periods(now)
+        return new_badges
+
+    def _seed(self, user: str, now: datetime) -> Dict:
+        from app.core.extensions import data_persistence
+        scores = data_persistence.load_scores()
+        daily_stats = data_persistence.load_daily_user_stats()
+        badges_data = self.system.load_badges()
+        earned = [b["id"] for b in badges_data.get(user, {}).get("badges", [])]
+        return self.build_aggregate(scores.get(user, {}), daily_stats.get(user, {}), earned, now)
+
+    def _evaluate(self, user: str, agg: Dict, rules: List[Rule], now: datetime) -> List[Dict]:
+        earned = set(agg.get("earned", []))
+        values = self.values(agg, now)
+        due = [r for r in rules if r.badge_id not in earned and r.met(values)]
+        if not due:
+            return []
+
+        system = self.system
+        badges_data = system.load_badges()
+        new_badges = []
+        with system.batched_notifications():
+            for rule in due:
+                badge = system.award_badge(user, rule.badge_id, rule.definition, badges_data)
+                earned.add(rule.badge_id)
+                if badge:
+                    new_badges.append(badge)
+                    if rule.definition["category"] == "milestone":
+                        system._grant_milestone_cosmetics(user, rule.definition)
+        if new_badges:
+            system.save_badges(badges_data)
+        agg["earned"] = sorted(earned)
+        return new_badges
+
+    def rebuild(self, user: str, scores: Dict, daily_stats: Dict, badges_data: Dict,
+                now: Optional[datetime] = None) -> Dict:
+        """Baut die Aggregate eines Users neu auf (nach Voll-Prüfung oder Datenkorrektur)"""
+        now = now or datetime.now(TZ)
+        earned = [b["id"] for b in badges_data.get(user, {}).get("badges", [])]
+        agg = self.build_aggregate(scores.get(user, {}), daily_stats.get(user, {}), earned, now)
+        user_file = self._user_file(user)
+        os.makedirs(os.path.dirname(user_file), exist_ok=True)
+        with file_lock(user_file):
+            self._save_user(user, agg)
+        return agg
+
+    # ========== MVP (Periodengrenzen) ==========
+
+    def check_period_boundaries(self, now: Optional[datetime] = None) -> List[Tuple[str, Dict]]:
+        """
+        Vergibt MVP-Badges für abgeschlossene Perioden (täglicher Job / erstes Event danach)
+
+        Returns:
+            Liste von (user, badge) der neu vergebenen MVP-Badges
+        """
+        return self._check_periods(now or datetime.now(TZ))
+
+    def _check_periods(self, now: datetime) -> List[Tuple[str, Dict]]:
+        current = {"week": _week_key(now.date()), "month": now.strftime("%Y-%m"), "year": str(now.year)}
+        # Schneller Pfad ohne Lock: innerhalb einer Periode wird nichts geschrieben
+        if self._load_periods() == current:
+            return []
+
+        os.makedirs(self.state_dir, exist_ok=True)
+        with file_lock(self.periods_file):
+            seen = self._load_periods()
+            if seen == current:
+                return []
+            self._save_periods(current)
+        if not seen:
+            return []
+        closed = {k: seen[k] for k in current if seen.get(k) and seen[k] != current[k]}
+        if not closed:
+            return []
+        try:
+            return self._award_mvps(closed)
+        except Exception as e:
+            logger.error(f"MVP-Badge Fehler: {e}")
+            return []
+
+    def _award_mvps(self, closed: Dict[str, str]) -> List[Tuple[str, Dict]]:
+        from app.core.extensions import data_persistence
+        scores = data_persistence.load_scores()
+        totals = {}
+
+        if "week" in closed:
+            week_start = datetime.strptime(f"{closed['week']}-1", "%G-W%V-%u").date()
+            week_days = {(week_start + timedelta(days=i)).isoformat() for i in range(7)}
+            week_scores = {}
+            for user, user_stats in data_persistence.load_daily_user_stats().items():
+                week_scores[user] = sum(
+                    stats.get("points", 0) for day, stats in user_stats.items()
+                    if day in week_days and isinstance(stats, dict)
+                )
+            totals[("mvp_week", closed["week"])] = week_scores
+        if "month" in closed:
+            totals[("mvp_month", closed["month"])] = {
+                user: user_scores.get(closed["month"], 0) for user, user_scores in scores.items()
+            }
+        if "year" in closed:
+            prefix = f"{closed['year']}-"
+            totals[("mvp_year", closed["year"])] = {
+                user: sum(p for m, p in user_scores.items() if m.startswith(prefix))
+                for user, user_scores in scores.items()
+            }
+
+        mvp_data = self.system.load_mvp_badges()
+        awarded = []
+        for (badge_type, period), period_scores in totals.items():
+            if not period_scores:
+                continue
+            best_user, best_points = max(period_scores.items(), key=lambda x: x[1])
+            if best_points > 0:
+                badge = self.system.award_mvp_badge(best_user, badge_type, period, mvp_data)
+                if badge:
+                    awarded.append((best_user, badge))
+        if awarded:
+            self.system.save_mvp_badges(mvp_data)
+        return awarded
+
+
+# Globale Instanz
+achievement_engine = AchievementEngine()
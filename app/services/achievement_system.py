@@ -8,6 +8,8 @@ import os
 import json
 import pytz
 import logging
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from collections import defaultdict
 
@@ -27,6 +29,10 @@ except ImportError:
     POSTGRES_AVAILABLE = False
     USE_POSTGRES = False
 
+# Event-Typen der inkrementellen Auswertung (achievement_engine)
+EVENT_SCORE = "score"
+EVENT_ACTIVITY = "activity"
+
 # Raritäts-Farben für konsistente Darstellung
 RARITY_COLORS = {
     "common": "#10b981",
@@ -308,7 +314,32 @@ class AchievementSystem:
         if not os.path.exists(self.mvp_file):
             with open(self.mvp_file, "w", encoding="utf-8") as f:
                 json.dump({}, f)
-    
+
+        # Pro Thread gesammelte Badge-Notifications (batched_notifications)
+        self._local = threading.local()
+
+    @contextmanager
+    def batched_notifications(self):
+        """Sammelt Badge-Notifications und sendet sie am Ende gebündelt (notify_users)"""
+        if getattr(self._local, "pending", None) is not None:
+            yield  # bereits in einem äußeren Batch
+            return
+        self._local.pending = []
+        try:
+            yield
+        finally:
+            pending, self._local.pending = self._local.pending, None
+            self._send_badge_notifications(pending)
+
+    def _send_badge_notifications(self, items):
+        if not items:
+            return
+        try:
+            from app.services.notification_service import notification_service
+            notification_service.notify_users(items)
+        except Exception as notif_err:
+            logger.debug(f"Badge notification skipped: {notif_err}")
+
     def load_badges(self):
         """Lade alle User-Badges über data_persistence"""
         try:
@@ -480,53 +511,74 @@ class AchievementSystem:
 
             from app.core.extensions import data_persistence
 
-            # Lade aktuelle Daten (Punkte sind bereits gespeichert)
-            scores = data_persistence.load_scores()
+            # Daily Stats sind Quelldaten (Scores werden bereits vom aufrufenden System gespeichert)
             daily_stats = data_persistence.load_daily_user_stats()
-            badges_data = self.load_badges()
-            
-            # Setup für Daily Stats (ohne Punkte zu ändern)
-            month = datetime.now(TZ).strftime("%Y-%m")
             today = datetime.now(TZ).strftime("%Y-%m-%d")
-            
-            # Stelle sicher dass User in scores existiert (ohne Punkte zu ändern)
-            if user not in scores:
-                scores[user] = {}
-            if month not in scores[user]:
-                scores[user][month] = 0
-            # ENTFERNT: scores[user][month] += points  # ← Das war das Problem!
-            
+
             # Update Daily Stats (only track activity, not add points again)
             if user not in daily_stats:
                 daily_stats[user] = {}
             if today not in daily_stats[user]:
                 daily_stats[user][today] = {"points": 0, "bookings": 0, "first_booking": False}
-            
+
             # Track points for this booking (for daily stats, but don't double-add)
             daily_stats[user][today]["points"] += points
             daily_stats[user][today]["bookings"] += 1
-            
+
             # Markiere erste Buchung
             if not daily_stats[user][today].get("first_booking", False):
                 daily_stats[user][today]["first_booking"] = True
-            
-            # Speichere nur Daily Stats Updates (Scores werden bereits vom aufrufenden System gespeichert)
+
             data_persistence.save_daily_user_stats(daily_stats)
-            
-            # Prüfe auf neue Badges
-            new_badges = self.check_achievements(user, scores, daily_stats, badges_data)
-            
-            # Automatische MVP-Prüfung
-            self.auto_check_mvp_badges()
-            
-            return new_badges
-            
+
+            # Nur die von Tagesaktivität abhängigen Regeln prüfen (MVP an Periodengrenzen)
+            return self.record_event(
+                user, EVENT_ACTIVITY, points=points, bookings=1, first_booking=True
+            )
+
         except Exception as e:
             logger.error(f"Achievement System Fehler: {e}")
             return []
-    
+
+    def record_event(self, user, event_type, **data):
+        """
+        Inkrementelle Auswertung eines Events (siehe achievement_engine)
+
+        Aufruf NACH dem Speichern der Quelldaten (scores / daily_user_stats).
+
+        Returns:
+            Liste neu vergebener Badges
+        """
+        try:
+            return self._engine().record(user, event_type, **data)
+        except Exception as e:
+            logger.error(f"Achievement event {event_type} failed for {user}: {e}")
+            return []
+
+    def _engine(self):
+        """Engine, die Badges über diese Instanz lädt/speichert"""
+        from app.services.achievement_engine import AchievementEngine, achievement_engine
+        if achievement_engine.system is self:
+            return achievement_engine
+        engine = getattr(self, '_own_engine', None)
+        if engine is None:
+            engine = self._own_engine = AchievementEngine(system=self)
+        return engine
+
+    def check_mvp_period_boundaries(self):
+        """MVP-Badges für abgeschlossene Wochen/Monate/Jahre vergeben (täglicher Job)"""
+        try:
+            return self._engine().check_period_boundaries()
+        except Exception as e:
+            logger.error(f"MVP-Badge Fehler: {e}")
+            return []
+
     def check_achievements(self, user, scores, daily_stats, badges_data):
         """Prüfe alle Achievement-Bedingungen für einen User"""
+        with self.batched_notifications():
+            return self._check_achievements(user, scores, daily_stats, badges_data)
+
+    def _check_achievements(self, user, scores, daily_stats, badges_data):
         new_badges = []
         
         # 1. Tägliche Punkte Badges
@@ -697,28 +749,20 @@ class AchievementSystem:
             except Exception as e:
                 logger.debug(f"PG badge award skipped: {e}")
 
-        # Send notification for new badge
-        try:
-            from app.services.notification_service import notification_service
-            import uuid as _uuid
-            all_notifs = notification_service._load_all_notifications()
-            if user not in all_notifs:
-                all_notifs[user] = []
-            all_notifs[user].append({
-                'id': str(_uuid.uuid4())[:8],
-                'type': 'success',
-                'title': 'Neues Badge erhalten!',
-                'message': f"{definition['emoji']} {definition['name']} freigeschaltet!",
-                'timestamp': datetime.now(TZ).isoformat(),
-                'read': False,
-                'dismissed': False,
-                'show_popup': True,
-                'roles': [],
-                'actions': [{'text': 'Ansehen', 'url': '/slots/profile'}],
-            })
-            notification_service._save_all_notifications(all_notifs)
-        except Exception as notif_err:
-            logger.debug(f"Badge notification skipped: {notif_err}")
+        # Send notification for new badge (gebündelt innerhalb batched_notifications)
+        notification = {
+            'username': user,
+            'type': 'success',
+            'title': 'Neues Badge erhalten!',
+            'message': f"{definition['emoji']} {definition['name']} freigeschaltet!",
+            'show_popup': True,
+            'actions': [{'text': 'Ansehen', 'url': '/slots/profile'}],
+        }
+        pending = getattr(self._local, "pending", None)
+        if pending is not None:
+            pending.append(notification)
+        else:
+            self._send_badge_notifications([notification])
 
         return badge
     
@@ -803,7 +847,7 @@ class AchievementSystem:
         return streak
     
     def auto_check_mvp_badges(self):
-        """Automatische MVP-Badge-Vergabe - sollte täglich laufen"""
+        """MVP-Badges für die laufenden Perioden (manuelle Prüfung; regulär: check_mvp_period_boundaries)"""
         try:
             from app.core.extensions import data_persistence
             scores = data_persistence.load_scores()
@@ -1217,8 +1261,11 @@ class AchievementSystem:
             # Check achievements for this user
             new_badges = self.check_achievements(user, scores, daily_stats, badges_data)
 
-            # Also run MVP check
-            self.auto_check_mvp_badges()
+            # Aggregate der inkrementellen Engine an den vollständigen Stand angleichen
+            try:
+                self._engine().rebuild(user, scores, daily_stats, badges_data)
+            except Exception as e:
+                logger.warning(f"Achievement aggregate rebuild failed for {user}: {e}")
 
             return new_badges
 
@@ -1230,6 +1277,10 @@ class AchievementSystem:
         """Reparaturroutine: Vergibt persistente Badges rückwirkend anhand gespeicherter Scores/Daily Stats.
         Gibt eine Zusammenfassung zurück: {users_processed, badges_awarded}.
         """
+        with self.batched_notifications():
+            return self._backfill_persistent_badges()
+
+    def _backfill_persistent_badges(self):
         try:
             from app.core.extensions import data_persistence
 
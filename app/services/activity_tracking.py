@@ -2,15 +2,25 @@
 """
 Activity Tracking Service
 Tracks user login activity and online status for admin monitoring
+
+Online-Status läuft über den PresenceService (Redis Sorted Set bzw.
+In-Process-Fallback). Logins werden append-only in ``login_history.jsonl``
+geschrieben; die Legacy-Datei ``login_history.json`` dient als kompaktierter
+Stand und wird nur beim Kompaktieren neu geschrieben.
 """
 
 import os
+import json
+import time
 from datetime import datetime, timedelta
 import pytz
+from pathlib import Path
 from typing import Dict, List, Optional
 import logging
 
 from app.services.data_persistence import data_persistence
+from app.services.presence_service import presence_service
+from app.utils.file_lock import file_lock
 
 # PostgreSQL dual-write support
 USE_POSTGRES = os.getenv('USE_POSTGRES', 'true').lower() == 'true'
@@ -26,6 +36,11 @@ except ImportError:
 logger = logging.getLogger(__name__)
 TZ = pytz.timezone('Europe/Berlin')
 
+# Logins pro User, die beim Kompaktieren erhalten bleiben
+LOGIN_HISTORY_PER_USER = 100
+# Ab dieser Größe wird das JSONL-Log in login_history.json kompaktiert
+LOGIN_HISTORY_COMPACT_BYTES = int(os.getenv('LOGIN_HISTORY_COMPACT_BYTES', str(2 * 1024 * 1024)))
+
 
 class ActivityTrackingService:
     """Service für Login-Tracking und Online-Status-Verwaltung"""
@@ -33,6 +48,14 @@ class ActivityTrackingService:
     def __init__(self):
         self.login_history_file = 'login_history'
         self.online_sessions_file = 'online_sessions'
+        self.presence = presence_service
+        # (Cache-Key, geparste History) – siehe get_login_history_map()
+        self._history_cache = None
+
+    @property
+    def login_log_path(self) -> Path:
+        """Append-only Login-Log (eine JSON-Zeile pro Login)"""
+        return Path(data_persistence.data_dir) / f'{self.login_history_file}.jsonl'
 
     def track_login(self, username: str, ip_address: str, user_agent: str, success: bool = True) -> None:
         """
@@ -44,48 +67,33 @@ class ActivityTrackingService:
             user_agent: Browser User-Agent String
             success: Ob der Login erfolgreich war
         """
-        try:
-            # Lade aktuelle Login-History
-            login_history = data_persistence.load_data(self.login_history_file, default={})
-
-            # Initialisiere User-History wenn nicht vorhanden
-            if username not in login_history:
-                login_history[username] = []
-
-            # Erstelle Login-Entry
-            login_entry = {
-                'timestamp': datetime.now(TZ).isoformat(),
-                'ip_address': ip_address,
-                'user_agent': user_agent,
-                'success': success,
-                'browser': self._extract_browser(user_agent),
-                'device': self._extract_device(user_agent)
-            }
-
-            # Füge zur History hinzu (neueste zuerst)
-            login_history[username].insert(0, login_entry)
-
-            # Behalte nur die letzten 100 Logins pro User
-            login_history[username] = login_history[username][:100]
-
-            # Speichere
-            data_persistence.save_data(self.login_history_file, login_history)
+        # Erstelle Login-Entry
+        login_entry = {
+            'username': username,
+            'timestamp': datetime.now(TZ).isoformat(),
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'success': success,
+            'browser': self._extract_browser(user_agent),
+            'device': self._extract_device(user_agent)
+        }
 
+        try:
+            self._append_login(login_entry)
             logger.info(f"Login tracked for {username} from {ip_address}")
-
-            # Sync last_login to PostgreSQL
-            if USE_POSTGRES and POSTGRES_AVAILABLE and success:
-                try:
-                    with db_session_scope() as session:
-                        pg_user = session.query(UserModel).filter_by(username=username).first()
-                        if pg_user:
-                            pg_user.last_login = datetime.now(TZ).replace(tzinfo=None)
-                except Exception as e:
-                    logger.debug(f"PG login sync failed: {e}")
-
         except Exception as e:
             logger.error(f"Error tracking login for {username}: {e}")
 
+        # Sync last_login to PostgreSQL
+        if USE_POSTGRES and POSTGRES_AVAILABLE and success:
+            try:
+                with db_session_scope() as session:
+                    pg_user = session.query(UserModel).filter_by(username=username).first()
+                    if pg_user:
+                        pg_user.last_login = datetime.now(TZ).replace(tzinfo=None)
+            except Exception as e:
+                logger.debug(f"PG login sync failed: {e}")
+
     def update_online_status(self, username: str, session_id: str, action: str = 'active') -> None:
         """
         Aktualisiert den Online-Status eines Users
@@ -96,33 +104,11 @@ class ActivityTrackingService:
             action: 'active' oder 'logout'
         """
         try:
-            online_sessions = data_persistence.load_data(self.online_sessions_file, default={})
-
             if action == 'active':
-                # Update/Create Session
-                online_sessions[username] = {
-                    'session_id': session_id,
-                    'last_activity': datetime.now(TZ).isoformat(),
-                    'status': 'online'
-                }
+                # ZADD bzw. Dict-Update; last_activity geht gebündelt nach PG
+                self.presence.heartbeat(username)
             elif action == 'logout':
-                # Entferne Session
-                if username in online_sessions:
-                    del online_sessions[username]
-
-            # Speichere
-            data_persistence.save_data(self.online_sessions_file, online_sessions)
-
-            # Sync last_activity to PostgreSQL
-            if USE_POSTGRES and POSTGRES_AVAILABLE and action == 'active':
-                try:
-                    with db_session_scope() as session:
-                        pg_user = session.query(UserModel).filter_by(username=username).first()
-                        if pg_user:
-                            pg_user.last_activity = datetime.now(TZ).replace(tzinfo=None)
-                except Exception as e:
-                    logger.debug(f"PG activity sync failed: {e}")
-
+                self.presence.remove(username)
         except Exception as e:
             logger.error(f"Error updating online status for {username}: {e}")
 
@@ -136,8 +122,17 @@ class ActivityTrackingService:
         Returns:
             Liste von Dicts mit User-Info und letzter Aktivität
         """
-        if USE_POSTGRES and POSTGRES_AVAILABLE:
+        try:
+            last_seen = dict(self.presence.online(timeout_minutes * 60))
+        except Exception as e:
+            logger.error(f"Error getting online users: {e}")
+            last_seen = {}
+
+        # Ohne Redis sieht jeder Worker nur seine eigenen Heartbeats;
+        # die anderen kommen über die gebündelten PG-Updates dazu
+        if not self.presence.is_shared and USE_POSTGRES and POSTGRES_AVAILABLE:
             try:
+                self.presence.flush()
                 cutoff = datetime.now(TZ).replace(tzinfo=None) - timedelta(minutes=timeout_minutes)
                 with db_session_scope() as session:
                     users = session.query(UserModel).filter(
@@ -146,52 +141,23 @@ class ActivityTrackingService:
                         UserModel.is_active == True
                     ).order_by(UserModel.last_activity.desc()).all()
 
-                    now = datetime.now(TZ).replace(tzinfo=None)
-                    return [{
-                        'username': u.username,
-                        'last_activity': u.last_activity.isoformat() if u.last_activity else '',
-                        'minutes_ago': int((now - u.last_activity).total_seconds() / 60) if u.last_activity else 0,
-                        'status': 'online'
-                    } for u in users]
+                    for u in users:
+                        ts = TZ.localize(u.last_activity).timestamp()
+                        last_seen[u.username] = max(last_seen.get(u.username, 0), ts)
             except Exception as e:
                 logger.warning(f"PG online users query failed: {e}")
 
-        # JSON fallback
-        try:
-            online_sessions = data_persistence.load_data(self.online_sessions_file, default={})
-            current_time = datetime.now(TZ)
-            online_users = []
-
-            # Cleanup alte Sessions und erstelle Online-Liste
-            for username, session_data in list(online_sessions.items()):
-                last_activity = datetime.fromisoformat(session_data['last_activity'])
-
-                # Prüfe ob Session noch gültig ist
-                time_diff = current_time - last_activity
+        now = time.time()
+        online_users = [{
+            'username': username,
+            'last_activity': datetime.fromtimestamp(ts, TZ).isoformat(),
+            'minutes_ago': max(0, int((now - ts) / 60)),
+            'status': 'online'
+        } for username, ts in last_seen.items()]
 
-                if time_diff.total_seconds() / 60 <= timeout_minutes:
-                    # User ist online
-                    online_users.append({
-                        'username': username,
-                        'last_activity': session_data['last_activity'],
-                        'minutes_ago': int(time_diff.total_seconds() / 60),
-                        'status': 'online'
-                    })
-                else:
-                    # Session ist abgelaufen, entfernen
-                    del online_sessions[username]
-
-            # Speichere bereinigte Sessions
-            data_persistence.save_data(self.online_sessions_file, online_sessions)
-
-            # Sortiere nach letzter Aktivität (neueste zuerst)
-            online_users.sort(key=lambda x: x['last_activity'], reverse=True)
-
-            return online_users
-
-        except Exception as e:
-            logger.error(f"Error getting online users: {e}")
-            return []
+        # Sortiere nach letzter Aktivität (neueste zuerst)
+        online_users.sort(key=lambda x: x['last_activity'], reverse=True)
+        return online_users
 
     def get_user_login_history(self, username: str, limit: int = 20) -> List[Dict]:
         """
@@ -205,11 +171,10 @@ class ActivityTrackingService:
             Liste von Login-Entries
         """
         try:
-            login_history = data_persistence.load_data(self.login_history_file, default={})
-            user_history = login_history.get(username, [])
+            user_history = [dict(entry) for entry in self.get_login_history_map().get(username, [])[:limit]]
 
             # Füge formatierte Timestamps hinzu
-            for entry in user_history[:limit]:
+            for entry in user_history:
                 try:
                     dt = datetime.fromisoformat(entry['timestamp'])
                     entry['formatted_time'] = dt.strftime('%d.%m.%Y %H:%M:%S')
@@ -218,7 +183,7 @@ class ActivityTrackingService:
                     entry['formatted_time'] = entry['timestamp']
                     entry['time_ago'] = 'Unbekannt'
 
-            return user_history[:limit]
+            return user_history
 
         except Exception as e:
             logger.error(f"Error getting login history for {username}: {e}")
@@ -235,7 +200,7 @@ class ActivityTrackingService:
             Liste von Login-Entries mit Usernames
         """
         try:
-            login_history = data_persistence.load_data(self.login_history_file, default={})
+            login_history = self.get_login_history_map()
             all_logins = []
 
             # Sammle alle Logins
@@ -276,7 +241,7 @@ class ActivityTrackingService:
             Dict mit Statistiken
         """
         try:
-            login_history = data_persistence.load_data(self.login_history_file, default={})
+            login_history = self.get_login_history_map()
             cutoff_date = datetime.now(TZ) - timedelta(days=days)
 
             stats = {
@@ -347,6 +312,91 @@ class ActivityTrackingService:
                 'peak_hour_logins': 0
             }
 
+    # Login-Log
+
+    def get_login_history_map(self) -> Dict[str, List[Dict]]:
+        """
+        Login-History aller User: {username: [entries, neueste zuerst]}
+
+        Kompaktierter Stand aus login_history.json plus append-only Log.
+        Das Ergebnis wird gecacht, bis sich Größe oder mtime einer der beiden
+        Dateien ändern; die Entry-Dicts sind geteilt und nicht zu verändern.
+        """
+        key = (self._file_signature(self.login_log_path),
+               self._file_signature(Path(data_persistence.data_dir) / f'{self.login_history_file}.json'))
+        cached = self._history_cache
+        if cached is None or cached[0] != key:
+            cached = (key, self._build_login_history_map())
+            self._history_cache = cached
+
+        return {username: list(entries) for username, entries in cached[1].items()}
+
+    def _build_login_history_map(self) -> Dict[str, List[Dict]]:
+        history = {
+            username: list(entries)
+            for username, entries in data_persistence.load_data(self.login_history_file, default={}).items()
+        }
+
+        recent: Dict[str, List[Dict]] = {}
+        for entry in self._read_login_log():
+            username = entry.pop('username', None)
+            if username:
+                recent.setdefault(username, []).append(entry)
+
+        for username, entries in recent.items():
+            entries.reverse()
+            history[username] = (entries + history.get(username, []))[:LOGIN_HISTORY_PER_USER]
+
+        return history
+
+    @staticmethod
+    def _file_signature(path: Path) -> Optional[tuple]:
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def _append_login(self, entry: Dict) -> None:
+        """Hängt einen Login an das Log an; kompaktiert ab LOGIN_HISTORY_COMPACT_BYTES"""
+        path = self.login_log_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+
+        with file_lock(str(path)):
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                size = f.tell()
+
+            if size >= LOGIN_HISTORY_COMPACT_BYTES:
+                self._compact_login_log(path)
+
+    def _compact_login_log(self, path: Path) -> None:
+        """Überführt das Log in login_history.json (Lock auf dem Log wird gehalten)"""
+        history = self.get_login_history_map()
+        if data_persistence.save_data(self.login_history_file, history):
+            with open(path, 'w', encoding='utf-8'):
+                pass
+            logger.info(f"Login history compacted ({len(history)} users)")
+
+    def _read_login_log(self) -> List[Dict]:
+        path = self.login_log_path
+        if not path.exists():
+            return []
+
+        entries = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # Abgeschnittene Zeile (Crash während append)
+                    continue
+        return entries
+
     # Helper Methods
 
     def _extract_browser(self, user_agent: str) -> str:
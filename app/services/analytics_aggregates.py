@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Analytics Aggregates
+Gemeinsame KPI-Aggregation pro Zeitfenster für den Analytics-Service
+
+Statt pro Dashboard-Kennzahl eigene count()-Queries abzusetzen, werden alle
+Window-KPIs in zwei gruppierten Queries (bookings, booking_outcomes) mit
+bedingten Aggregaten (COUNT ... FILTER (WHERE ...)) berechnet.
+
+Das Ergebnis wird pro Fenster im CacheManager abgelegt (Redis oder File-Cache,
+damit alle Gunicorn-Worker denselben Snapshot sehen). Schreibt der Outcome-Check
+oder das Booking-Tracking neue Daten, wird die Generation hochgezählt und
+damit jeder gecachte Snapshot ungültig.
+"""
+
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+from sqlalchemy import func, and_
+
+logger = logging.getLogger(__name__)
+
+CACHE_TYPE = "analytics"
+GENERATION_KEY = "kpi_generation"
+
+
+def _get_cache():
+    """CacheManager-Instanz (lazy, None falls nicht verfügbar)"""
+    try:
+        from app.core.cache_manager import cache_manager
+        return cache_manager
+    except Exception as e:
+        logger.debug(f"Cache manager unavailable: {e}")
+        return None
+
+
+class KPIAggregator:
+    """Berechnet und cached alle KPIs eines Analytics-Zeitfensters"""
+
+    def compute(self, session, days: int, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Berechnet den KPI-Snapshot für die letzten `days` Tage
+
+        Zwei Queries, unabhängig von der Anzahl Berater:
+        1. bookings gruppiert nach username (aktuelles + vorheriges Fenster)
+        2. booking_outcomes gruppiert nach consultant (aktuelles Fenster)
+
+        Args:
+            session: SQLAlchemy-Session
+            days: Fenstergröße in Tagen
+            now: Referenzzeitpunkt (Default: datetime.now())
+
+        Returns:
+            JSON-serialisierbarer Snapshot
+        """
+        from app.models.booking import Booking, BookingOutcome
+
+        now = now or datetime.now()
+        start = now - timedelta(days=days)
+        prev_start = start - timedelta(days=days)
+
+        in_window = Booking.date >= start
+        in_prev_window = and_(Booking.date >= prev_start, Booking.date < start)
+
+        booking_rows = session.query(
+            Booking.username,
+            func.count(Booking.id).filter(in_window),
+            func.count(Booking.id).filter(in_prev_window),
+        ).filter(
+            Booking.date >= prev_start
+        ).group_by(Booking.username).all()
+
+        bookings_by_user = {}
+        total_bookings = 0
+        prev_bookings = 0
+        for username, current, previous in booking_rows:
+            total_bookings += current or 0
+            prev_bookings += previous or 0
+            if current:
+                bookings_by_user[username] = current
+
+        outcome_rows = session.query(
+            BookingOutcome.consultant,
+            func.count(BookingOutcome.id),
+            func.count(BookingOutcome.id).filter(BookingOutcome.outcome == 'completed'),
+            func.count(BookingOutcome.id).filter(BookingOutcome.outcome == 'no_show'),
+        ).filter(
+            BookingOutcome.date >= start
+        ).group_by(BookingOutcome.consultant).all()
+
+        outcomes_by_consultant = {}
+        total_outcomes = 0
+        completed = 0
+        no_shows = 0
+        for consultant, total, done, missed in outcome_rows:
+            total_outcomes += total
+            completed += done
+            no_shows += missed
+            if consultant is not None:
+                outcomes_by_consultant[consultant] = {
+                    'total': total,
+                    'completed': done,
+                    'no_show': missed,
+                }
+
+        return {
+            'days': days,
+            'start': start.isoformat(),
+            'computed_at': now.isoformat(),
+            'bookings': {
+                'total': total_bookings,
+                'previous': prev_bookings,
+                'unique_users': len(bookings_by_user),
+                'by_user': bookings_by_user,
+            },
+            'outcomes': {
+                'total': total_outcomes,
+                'completed': completed,
+                'no_show': no_shows,
+                'by_consultant': outcomes_by_consultant,
+            },
+        }
+
+    def get_window_kpis(self, days: int) -> Optional[Dict[str, Any]]:
+        """
+        KPI-Snapshot für ein Zeitfenster (gecached)
+
+        Returns:
+            Snapshot-Dict oder None wenn PostgreSQL nicht verfügbar ist
+        """
+        from app.models import is_postgres_enabled
+        if not is_postgres_enabled():
+            return None
+
+        cache = _get_cache()
+        cache_key = self._cache_key(cache, days)
+        if cache:
+            cached = cache.get(CACHE_TYPE, cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            from app.utils.db_utils import db_session_scope_no_commit
+            with db_session_scope_no_commit() as session:
+                snapshot = self.compute(session, days)
+        except Exception as e:
+            logger.warning(f"KPI aggregation failed: {e}")
+            return None
+
+        if cache:
+            cache.set(CACHE_TYPE, cache_key, snapshot)
+        return snapshot
+
+    def invalidate(self) -> None:
+        """Macht alle gecachten Snapshots ungültig (nach Outcome-/Booking-Writes)"""
+        cache = _get_cache()
+        if not cache:
+            return
+        try:
+            cache.set(CACHE_TYPE, GENERATION_KEY, time.time_ns())
+        except Exception as e:
+            logger.debug(f"KPI cache invalidation failed: {e}")
+
+    def _cache_key(self, cache, days: int) -> str:
+        """Cache-Key aus Fenster, Tagesdatum und aktueller Generation"""
+        generation = cache.get(CACHE_TYPE, GENERATION_KEY) if cache else None
+        return f"kpi_window_{days}_{datetime.now().strftime('%Y-%m-%d')}_{generation or 0}"
+
+
+# Global instance
+kpi_aggregator = KPIAggregator()
+
+
+def invalidate_analytics_kpis() -> None:
+    """Invalidiere gecachte Analytics-KPI-Snapshots nach Booking-/Outcome-Writes (fail-safe)"""
+    try:
+        kpi_aggregator.invalidate()
+    except Exception as e:
+        logger.debug(f"KPI cache invalidation skipped: {e}")
@@ -10,6 +10,7 @@ from typing import Dict, List, Any, Optional
 from collections import defaultdict
 from sqlalchemy import func, extract
 from app.core.extensions import data_persistence
+from app.services.analytics_aggregates import kpi_aggregator
 from app.utils.helpers import get_userlist
 
 logger = logging.getLogger(__name__)
@@ -28,17 +29,6 @@ def _get_db_session():
         return None
 
 
-# Helper function to get Booking models
-def _get_booking_models():
-    """Get Booking models (returns None if not available)"""
-    try:
-        from app.models.booking import Booking, BookingOutcome
-        return Booking, BookingOutcome
-    except Exception as e:
-        logger.debug(f"Could not import Booking models: {e}")
-        return None, None
-
-
 def _start_date(days: int) -> datetime:
     """Calculate start date from days parameter."""
     return datetime.now() - timedelta(days=days)
@@ -72,56 +62,30 @@ class AnalyticsService:
         """Executive-Level KPIs with real PostgreSQL calculations"""
         scores = data_persistence.load_scores()
         months = _months_in_range(days)
-        start = _start_date(days)
-
-        # Load real booking data from PostgreSQL
-        try:
-            from app.models.booking import Booking, BookingOutcome
-            db_session = _get_db_session()
-
-            if db_session:
-                total_bookings = db_session.query(Booking).filter(
-                    Booking.date >= start
-                ).count()
-
-                # Conversion-Rate (appeared / total)
-                appeared = db_session.query(BookingOutcome).filter(
-                    BookingOutcome.date >= start,
-                    BookingOutcome.outcome.in_(['completed'])
-                ).count()
-
-                conversion_rate = (appeared / total_bookings * 100) if total_bookings > 0 else 0
 
-                # No-Show-Rate
-                no_shows = db_session.query(BookingOutcome).filter(
-                    BookingOutcome.date >= start,
-                    BookingOutcome.outcome == 'no_show'
-                ).count()
+        # Real booking data from the shared PostgreSQL KPI snapshot
+        snapshot = self._get_window_kpis(days)
+        if snapshot:
+            total_bookings = snapshot['bookings']['total']
 
-                no_show_rate = (no_shows / total_bookings * 100) if total_bookings > 0 else 0
+            # Conversion-Rate (appeared / total)
+            appeared = snapshot['outcomes']['completed']
+            conversion_rate = (appeared / total_bookings * 100) if total_bookings > 0 else 0
 
-                # Avg Deal Value - HubSpot only, None if unavailable
-                avg_deal_value = self._get_hubspot_avg_deal_value()
-
-            else:
-                # No PostgreSQL: only show what we can calculate
-                total_bookings = sum(
-                    sum(m_data.get(m, 0) for m in months) // 3
-                    for user, m_data in scores.items()
-                )
-                conversion_rate = None
-                no_show_rate = None
-                avg_deal_value = self._get_hubspot_avg_deal_value()
-
-        except Exception as e:
-            logger.error(f"Error calculating executive KPIs: {e}")
+            # No-Show-Rate
+            no_shows = snapshot['outcomes']['no_show']
+            no_show_rate = (no_shows / total_bookings * 100) if total_bookings > 0 else 0
+        else:
+            # No PostgreSQL: only show what we can calculate
             total_bookings = sum(
                 sum(m_data.get(m, 0) for m in months) // 3
                 for user, m_data in scores.items()
             )
             conversion_rate = None
             no_show_rate = None
-            avg_deal_value = self._get_hubspot_avg_deal_value()
+
+        # Avg Deal Value - HubSpot only, None if unavailable
+        avg_deal_value = self._get_hubspot_avg_deal_value()
 
         # Calculate revenue forecast only if all data available
         if conversion_rate is not None and avg_deal_value is not None:
@@ -215,7 +179,6 @@ class AnalyticsService:
         """Lead-to-Close-Funnel with real data only"""
         scores = data_persistence.load_scores()
         months = _months_in_range(days)
-        start = _start_date(days)
 
         total_leads = self._get_hubspot_total_deals()
         total_bookings = sum(
@@ -226,20 +189,11 @@ class AnalyticsService:
         # Get real show/close counts from PostgreSQL
         total_showed = None
         total_closed = None
-        try:
-            from app.models.booking import BookingOutcome
-            db_session = _get_db_session()
-            if db_session:
-                total_showed = db_session.query(BookingOutcome).filter(
-                    BookingOutcome.date >= start,
-                    BookingOutcome.outcome.in_(['completed', 'no_show'])
-                ).count()
-                total_closed = db_session.query(BookingOutcome).filter(
-                    BookingOutcome.date >= start,
-                    BookingOutcome.outcome == 'completed'
-                ).count()
-        except Exception as e:
-            logger.warning(f"Could not get funnel outcomes: {e}")
+        snapshot = self._get_window_kpis(days)
+        if snapshot:
+            outcomes = snapshot['outcomes']
+            total_showed = outcomes['completed'] + outcomes['no_show']
+            total_closed = outcomes['completed']
 
         # Build funnel stages with available data
         stages = [
@@ -321,12 +275,10 @@ class AnalyticsService:
 
     def get_berater_stats(self, days: int = DEFAULT_DAYS) -> Dict[str, List]:
         """Berater-Statistiken für Charts mit echten PostgreSQL-Daten"""
-        db = _get_db_session()
-        Booking, BookingOutcome = _get_booking_models()
-        start = _start_date(days)
+        snapshot = self._get_window_kpis(days)
 
         # Fallback to scores if PostgreSQL not available
-        if not db or not Booking:
+        if not snapshot:
             logger.warning("PostgreSQL not available, using scores fallback for berater stats")
             scores = data_persistence.load_scores()
             months = _months_in_range(days)
@@ -341,32 +293,16 @@ class AnalyticsService:
                 })
             return {'berater': berater_data}
 
-        # Real PostgreSQL queries
-        bookings_by_user = db.query(
-            Booking.username,
-            func.count(Booking.id).label('booking_count')
-        ).filter(
-            Booking.date >= start
-        ).group_by(Booking.username).all()
+        outcomes_by_consultant = snapshot['outcomes']['by_consultant']
 
         berater_data = []
-        for username, booking_count in bookings_by_user:
-            # Calculate conversion rate from outcomes per consultant
-            if BookingOutcome:
-                completed_count = db.query(func.count(BookingOutcome.id)).filter(
-                    BookingOutcome.date >= start,
-                    BookingOutcome.outcome == 'completed',
-                    BookingOutcome.consultant == username
-                ).scalar() or 0
-
-                total_outcomes = db.query(func.count(BookingOutcome.id)).filter(
-                    BookingOutcome.date >= start,
-                    BookingOutcome.consultant == username
-                ).scalar() or 1
-
-                conversion_rate = round((completed_count / total_outcomes) * 100, 1) if total_outcomes > 0 else 0
-            else:
-                conversion_rate = 75.0
+        for username, booking_count in snapshot['bookings']['by_user'].items():
+            # Conversion rate from outcomes per consultant
+            consultant_outcomes = outcomes_by_consultant.get(username, {})
+            completed_count = consultant_outcomes.get('completed', 0)
+            total_outcomes = consultant_outcomes.get('total', 0) or 1
+
+            conversion_rate = round((completed_count / total_outcomes) * 100, 1) if total_outcomes > 0 else 0
 
             berater_data.append({
                 'name': username,
@@ -399,26 +335,13 @@ class AnalyticsService:
             logger.info("Campaign analytics: HubSpot service not available")
 
         # Cross-reference with internal booking outcomes for show rates
-        try:
-            from app.models.booking import BookingOutcome
-            db_session = _get_db_session()
-
-            if db_session and campaigns:
-                start = _start_date(days)
-                total_outcomes = db_session.query(BookingOutcome).filter(
-                    BookingOutcome.date >= start,
-                ).count() or 1
-
-                completed = db_session.query(BookingOutcome).filter(
-                    BookingOutcome.date >= start,
-                    BookingOutcome.outcome == 'completed',
-                ).count()
-
+        overall_show_rate = None
+        if campaigns:
+            snapshot = self._get_window_kpis(days)
+            if snapshot:
+                total_outcomes = snapshot['outcomes']['total'] or 1
+                completed = snapshot['outcomes']['completed']
                 overall_show_rate = round((completed / total_outcomes) * 100, 1) if total_outcomes > 0 else 0
-            else:
-                overall_show_rate = None
-        except Exception:
-            overall_show_rate = None
 
         # Summary
         total_deals = sum(c.get('deals', 0) for c in campaigns)
@@ -436,6 +359,16 @@ class AnalyticsService:
             }
         }
 
+    # === KPI Aggregation ===
+
+    def _get_window_kpis(self, days: int) -> Optional[Dict[str, Any]]:
+        """Shared per-window KPI snapshot (one grouped query per table, cached)"""
+        try:
+            return kpi_aggregator.get_window_kpis(days)
+        except Exception as e:
+            logger.warning(f"Could not load KPI snapshot: {e}")
+            return None
+
     # === HubSpot Integration Helpers ===
 
     def _get_hubspot_service(self):
@@ -520,12 +453,11 @@ class AnalyticsService:
 
     def _get_overview_stats(self, days: int = DEFAULT_DAYS) -> Dict[str, Any]:
         """Übersichts-Statistiken with real PostgreSQL data"""
-        db = _get_db_session()
-        Booking, _ = _get_booking_models()
+        snapshot = self._get_window_kpis(days)
         start = _start_date(days)
 
         # Fallback to scores if PostgreSQL not available
-        if not db or not Booking:
+        if not snapshot:
             logger.warning("PostgreSQL not available, using scores fallback")
             scores = data_persistence.load_scores()
             months = _months_in_range(days)
@@ -551,24 +483,10 @@ class AnalyticsService:
                 'growth_rate': round(growth_rate, 1)
             }
 
-        # Real PostgreSQL queries
-        prev_start = start - timedelta(days=days)
-
-        # Current period bookings
-        total_bookings = db.query(func.count(Booking.id)).filter(
-            Booking.date >= start
-        ).scalar() or 0
-
-        # Previous period bookings
-        prev_bookings = db.query(func.count(Booking.id)).filter(
-            Booking.date >= prev_start,
-            Booking.date < start
-        ).scalar() or 0
-
-        # Unique users who booked in period
-        total_users = db.query(func.count(func.distinct(Booking.username))).filter(
-            Booking.date >= start
-        ).scalar() or 1  # Avoid division by zero
+        total_bookings = snapshot['bookings']['total']
+        prev_bookings = snapshot['bookings']['previous']
+        # Unique users who booked in period (avoid division by zero)
+        total_users = snapshot['bookings']['unique_users'] or 1
 
         # Calculate real growth rate
         if prev_bookings > 0:
@@ -595,35 +513,23 @@ class AnalyticsService:
     def _get_system_alerts(self, days: int = DEFAULT_DAYS) -> List[Dict]:
         """System-Warnungen with real no-show calculation"""
         alerts = []
-        start = _start_date(days)
 
         # Check No-Show-Rate (REAL CALCULATION from PostgreSQL)
-        try:
-            from app.models.booking import Booking, BookingOutcome
-            db_session = _get_db_session()
-
-            if db_session:
-                total_bookings = db_session.query(Booking).filter(
-                    Booking.date >= start
-                ).count()
-
-                no_shows = db_session.query(BookingOutcome).filter(
-                    BookingOutcome.date >= start,
-                    BookingOutcome.outcome == 'no_show'
-                ).count()
-
-                if total_bookings > 0:
-                    no_show_rate = (no_shows / total_bookings) * 100
-
-                    # Alert if no-show rate > 15%
-                    if no_show_rate > 15:
-                        alerts.append({
-                            'type': 'warning',
-                            'message': f'Hohe No-Show-Rate: {no_show_rate:.1f}% ({no_shows}/{total_bookings})',
-                            'severity': 'high' if no_show_rate > 20 else 'medium'
-                        })
-        except Exception as e:
-            logger.warning(f"Could not calculate no-show rate: {e}")
+        snapshot = self._get_window_kpis(days)
+        if snapshot:
+            total_bookings = snapshot['bookings']['total']
+            no_shows = snapshot['outcomes']['no_show']
+
+            if total_bookings > 0:
+                no_show_rate = (no_shows / total_bookings) * 100
+
+                # Alert if no-show rate > 15%
+                if no_show_rate > 15:
+                    alerts.append({
+                        'type': 'warning',
+                        'message': f'Hohe No-Show-Rate: {no_show_rate:.1f}% ({no_shows}/{total_bookings})',
+                        'severity': 'high' if no_show_rate > 20 else 'medium'
+                    })
 
         # Check Performance
         scores = data_persistence.load_scores()
@@ -3,11 +3,20 @@
 Avatar Service - Zentrale Avatar-Aufloesung und Upload-Verarbeitung
 
 Prioritaet: Upload > Shop-PNG > Emoji > Initialen
+
+Aufloesung laeuft ueber ein In-Memory-Manifest (username -> URL/Emoji/Varianten),
+das Avatar-Metadaten und aktive Kosmetik einmal laedt statt pro User. Jede
+Aenderung (Upload, Shop-Avatar, Loeschen, Avatar-Equip) erhoeht den Versions-
+stempel in user_avatars.version; andere Worker bauen ihr Manifest dann neu.
+Uploads werden beim Hochladen in alle Standardgroessen vorskaliert.
 """
 
 import os
 import json
+import time
+import uuid
 import logging
+import threading
 from markupsafe import Markup
 
 logger = logging.getLogger(__name__)
@@ -35,6 +44,12 @@ AVATAR_SIZES = {
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
 MAX_FILE_SIZE = 2 * 1024 * 1024  # 2MB
 AVATAR_OUTPUT_SIZE = (256, 256)
+# Vorskalierte Upload-Varianten (2x der AVATAR_SIZES fuer HiDPI, Basisbild = 256)
+AVATAR_VARIANT_SIZES = (48, 64, 96, 128, 192)
+# Manifest spaetestens nach dieser Zeit neu aufbauen (Aenderungen ausserhalb des Service)
+AVATAR_MANIFEST_TTL = float(os.getenv('AVATAR_MANIFEST_TTL', '300'))
+# Default-Avatar aus cosmetics_shop.get_user_cosmetics
+DEFAULT_ACTIVE_AVATAR = "🧑‍💼"
 
 
 class AvatarService:
@@ -54,6 +69,13 @@ class AvatarService:
             with open(self.avatars_file, "w", encoding="utf-8") as f:
                 json.dump({}, f)
 
+        # Versionsstempel des Manifests (mtime/Inode der Datei, prozessuebergreifend)
+        self.manifest_version_file = os.path.splitext(self.avatars_file)[0] + ".version"
+        self._manifest_lock = threading.Lock()
+        self._manifest = None
+        self._manifest_version = None
+        self._manifest_built_at = 0.0
+
     def _load_avatars(self):
         """Load avatar data — PG-first mit JSON-Fallback"""
         if USE_POSTGRES and POSTGRES_AVAILABLE:
@@ -87,68 +109,151 @@ class AvatarService:
         with open(self.avatars_file, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
 
-    def _get_active_cosmetics(self, username):
-        """Get active cosmetics for a user from cosmetics shop"""
+    # ========== Manifest ==========
+
+    def _read_manifest_version(self):
+        try:
+            st = os.stat(self.manifest_version_file)
+            # Neue Datei per os.replace -> neue Inode, auch bei grober mtime-Aufloesung
+            return (st.st_mtime_ns, st.st_ino)
+        except OSError:
+            return None
+
+    def invalidate_manifest(self):
+        """Manifest in allen Prozessen verwerfen (nach jeder Avatar-Aenderung)"""
+        with self._manifest_lock:
+            self._manifest = None
+        tmp_path = f"{self.manifest_version_file}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(uuid.uuid4().hex)
+            os.replace(tmp_path, self.manifest_version_file)
+        except OSError as e:
+            logger.warning(f"Avatar manifest version bump failed: {e}")
+
+    def _load_all_active_cosmetics(self):
+        """Aktive Kosmetik aller User (ein Load) + Shop-Katalog"""
         try:
             from app.services.cosmetics_shop import cosmetics_shop, AVATAR_SHOP
-            cosmetics_data = cosmetics_shop.get_user_cosmetics(username)
-            active = cosmetics_data.get('active', {})
-            return active, AVATAR_SHOP
+            return cosmetics_shop.load_active_cosmetics(), AVATAR_SHOP
         except Exception as e:
-            logger.debug(f"Could not load cosmetics for {username}: {e}")
+            logger.debug(f"Could not load active cosmetics: {e}")
             return {}, {}
 
-    def get_avatar_url(self, username):
+    def _upload_variants(self, upload_files, avatar_url):
+        """Vorhandene Groessen-Varianten eines Uploads: {px: url}"""
+        base = os.path.basename(avatar_url)
+        stem, ext = os.path.splitext(base)
+        url_dir = avatar_url[:-len(base)]
+        variants = {}
+        for px in AVATAR_VARIANT_SIZES:
+            name = f"{stem}-{px}{ext}"
+            if name in upload_files:
+                variants[px] = f"{url_dir}{name}"
+        return variants
+
+    def _resolve(self, user_data, active_avatar_id, avatar_shop, upload_files):
+        """Manifest-Eintrag: Upload > Shop-PNG > gespeicherter Shop-Pfad; plus Emoji"""
+        url = None
+        variants = {}
+
+        if user_data.get('type') == 'upload':
+            upload_path = user_data.get('path', '')
+            if upload_path and os.path.basename(upload_path) in upload_files:
+                url = upload_path
+                variants = self._upload_variants(upload_files, upload_path)
+
+        if url is None and active_avatar_id and active_avatar_id in avatar_shop:
+            url = avatar_shop[active_avatar_id].get('image', '') or None
+
+        if url is None and user_data.get('type') == 'shop' and user_data.get('path'):
+            url = user_data['path']
+
+        emoji = None
+        if active_avatar_id:
+            if active_avatar_id in avatar_shop:
+                emoji = avatar_shop[active_avatar_id].get('emoji', '')
+            elif len(active_avatar_id) <= 4:
+                emoji = active_avatar_id
+
+        return {"url": url, "emoji": emoji, "variants": variants}
+
+    def _build_manifest(self):
+        avatars = self._load_avatars()
+        active, avatar_shop = self._load_all_active_cosmetics()
+        try:
+            upload_files = set(os.listdir(self.upload_dir))
+        except OSError:
+            upload_files = set()
+
+        manifest = {}
+        for username in set(avatars) | set(active):
+            active_avatar_id = active.get(username, {"avatar": DEFAULT_ACTIVE_AVATAR}).get('avatar')
+            manifest[username] = self._resolve(
+                avatars.get(username, {}), active_avatar_id, avatar_shop, upload_files
+            )
+        # User ohne Eintrag: Default-Kosmetik, kein Bild
+        manifest[None] = self._resolve({}, DEFAULT_ACTIVE_AVATAR, avatar_shop, upload_files)
+        return manifest
+
+    def get_manifest(self):
+        """
+        Aktuelles Manifest {username: {url, emoji, variants}}
+
+        Wird neu aufgebaut, wenn sich der Versionsstempel geaendert hat oder
+        AVATAR_MANIFEST_TTL abgelaufen ist.
+        """
+        version = self._read_manifest_version()
+        with self._manifest_lock:
+            fresh = (
+                self._manifest is not None
+                and self._manifest_version == version
+                and time.monotonic() - self._manifest_built_at < AVATAR_MANIFEST_TTL
+            )
+            if fresh:
+                return self._manifest
+
+        manifest = self._build_manifest()
+        with self._manifest_lock:
+            self._manifest = manifest
+            self._manifest_version = version
+            self._manifest_built_at = time.monotonic()
+        return manifest
+
+    def _entry(self, username, manifest=None):
+        manifest = manifest if manifest is not None else self.get_manifest()
+        return manifest.get(username) or manifest[None]
+
+    @staticmethod
+    def _pick_variant(entry, px):
+        """Kleinste vorskalierte Variante >= 2x Anzeigegroesse, sonst Basisbild"""
+        if px and entry["variants"]:
+            for size in sorted(entry["variants"]):
+                if size >= px * 2:
+                    return entry["variants"][size]
+        return entry["url"]
+
+    # ========== Aufloesung ==========
+
+    def get_avatar_url(self, username, px=None):
         """
         Zentrale Avatar-URL-Aufloesung.
         Prioritaet: Upload > Shop-PNG > None (fuer Emoji/Initialen-Fallback)
 
+        Args:
+            username: Username
+            px: Optionale Anzeigegroesse in Pixeln (waehlt vorskalierte Upload-Variante)
+
         Returns:
             str or None: URL zum Avatar-Bild oder None wenn Emoji/Initialen
         """
         if not username:
             return None
-
-        # 1. Check for uploaded avatar
-        avatars = self._load_avatars()
-        user_data = avatars.get(username, {})
-
-        if user_data.get('type') == 'upload':
-            upload_path = user_data.get('path', '')
-            if upload_path and os.path.exists(upload_path.lstrip('/')):
-                return upload_path
-
-        # 2. Check for shop avatar (PNG image)
-        active, avatar_shop = self._get_active_cosmetics(username)
-        active_avatar_id = active.get('avatar')
-
-        if active_avatar_id and active_avatar_id in avatar_shop:
-            shop_item = avatar_shop[active_avatar_id]
-            image_path = shop_item.get('image', '')
-            if image_path:
-                return image_path
-
-        # 3. Check if avatar data has a stored shop path
-        if user_data.get('type') == 'shop' and user_data.get('path'):
-            return user_data['path']
-
-        # 4. No image avatar - return None (caller handles emoji/initials)
-        return None
+        return self._pick_variant(self._entry(username), px)
 
     def get_avatar_emoji(self, username):
         """Get the emoji avatar for a user (from cosmetics shop active avatar)"""
-        active, avatar_shop = self._get_active_cosmetics(username)
-        active_avatar_id = active.get('avatar')
-
-        if active_avatar_id:
-            # If it's a shop item, return the emoji
-            if active_avatar_id in avatar_shop:
-                return avatar_shop[active_avatar_id].get('emoji', '')
-            # If it's a raw emoji string (legacy)
-            if len(active_avatar_id) <= 4:
-                return active_avatar_id
-
-        return None
+        return self._entry(username)["emoji"]
 
     def get_avatar_html(self, username, size='md', extra_classes=''):
         """
@@ -172,8 +277,10 @@ class AvatarService:
             f"flex items-center justify-center overflow-hidden {extra_classes}"
         ).strip()
 
+        entry = self._entry(username)
+
         # Try image URL first
-        avatar_url = self.get_avatar_url(username)
+        avatar_url = self._pick_variant(entry, size_config['px']) if username else None
         if avatar_url:
             return Markup(
                 f'<div class="{base_classes}">'
@@ -183,7 +290,7 @@ class AvatarService:
             )
 
         # Try emoji
-        emoji = self.get_avatar_emoji(username)
+        emoji = entry["emoji"]
         if emoji:
             return Markup(
                 f'<div class="{base_classes} {font_size}" '
@@ -200,7 +307,8 @@ class AvatarService:
     def save_uploaded_avatar(self, username, file):
         """
         Upload verarbeiten: PNG/JPG/WebP, max 2MB, Resize auf 256x256.
-        Speicherung als static/uploads/avatars/{username}.webp
+        Speicherung als static/uploads/avatars/{username}.webp, dazu
+        vorskalierte Varianten {username}-{px}.webp (AVATAR_VARIANT_SIZES)
 
         Args:
             username: Username
@@ -261,6 +369,11 @@ class AvatarService:
             output_path = os.path.join(self.upload_dir, output_filename)
             img.save(output_path, 'WEBP', quality=85)
 
+            # Vorskalierte Varianten fuer kleine Slots (Scoreboard, Header, Listen)
+            for px in AVATAR_VARIANT_SIZES:
+                variant = img.resize((px, px), Image.LANCZOS)
+                variant.save(os.path.join(self.upload_dir, f"{username}-{px}.webp"), 'WEBP', quality=85)
+
             # URL path for serving
             avatar_url = f"/static/uploads/avatars/{output_filename}"
 
@@ -276,6 +389,7 @@ class AvatarService:
 
             # Dual-write to PostgreSQL if available
             self._pg_sync_avatar(username, "upload", avatar_url)
+            self.invalidate_manifest()
 
             logger.info(f"Avatar uploaded for {username}: {avatar_url}")
 
@@ -324,6 +438,7 @@ class AvatarService:
 
             # Dual-write to PostgreSQL
             self._pg_sync_avatar(username, "shop", image_path)
+            self.invalidate_manifest()
 
             logger.info(f"Shop avatar set for {username}: {avatar_id}")
 
@@ -348,12 +463,14 @@ class AvatarService:
             avatars = self._load_avatars()
             user_data = avatars.get(username, {})
 
-            # Delete uploaded file if exists
+            # Delete uploaded file (and its size variants) if exists
             if user_data.get('type') == 'upload' and user_data.get('path'):
                 file_path = user_data['path'].lstrip('/')
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    logger.info(f"Deleted avatar file for {username}: {file_path}")
+                stem, ext = os.path.splitext(file_path)
+                for path in [file_path] + [f"{stem}-{px}{ext}" for px in AVATAR_VARIANT_SIZES]:
+                    if os.path.exists(path):
+                        os.remove(path)
+                        logger.info(f"Deleted avatar file for {username}: {path}")
 
             # Remove from JSON
             if username in avatars:
@@ -362,6 +479,7 @@ class AvatarService:
 
             # Dual-write to PostgreSQL
             self._pg_sync_avatar(username, None, None)
+            self.invalidate_manifest()
 
             logger.info(f"Avatar deleted for {username}")
 
@@ -376,20 +494,22 @@ class AvatarService:
         avatars = self._load_avatars()
         return avatars.get(username, {})
 
-    def get_all_avatar_urls(self, usernames):
+    def get_all_avatar_urls(self, usernames, px=None):
         """
-        Batch-Aufloesung fuer Scoreboard etc.
+        Batch-Aufloesung fuer Scoreboard etc. (ein Manifest-Lookup fuer alle)
 
         Args:
             usernames: Liste von Usernames
+            px: Optionale Anzeigegroesse in Pixeln
 
         Returns:
             dict: {username: avatar_url_or_None}
         """
-        result = {}
-        for username in usernames:
-            result[username] = self.get_avatar_url(username)
-        return result
+        manifest = self.get_manifest()
+        return {
+            username: self._pick_variant(self._entry(username, manifest), px) if username else None
+            for username in usernames
+        }
 
     def _now_iso(self):
         """Current timestamp as ISO string"""
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Backup-Snapshots für DataPersistence
+
+Content-adressierte, gebündelte Snapshots statt eines Voll-Backups pro Save:
+
+- Inhalt wird per SHA-256 gehasht; identisch zum letzten Snapshot → kein Backup
+- Bursts werden zusammengefasst: höchstens ein Snapshot pro Datei und
+  Intervall; der Stand am Ende eines Bursts wird per Timer nachgezogen
+- Retention über ein kleines Manifest (``backups/manifest.json``) statt
+  Glob + stat über das gesamte Backup-Verzeichnis
+
+Das Dateilayout bleibt ``<datei>.json.<timestamp>.backup``, damit bestehende
+Backups und externe Tools weiter funktionieren. Ein fehlendes Manifest wird
+einmalig aus den vorhandenen Backup-Dateien aufgebaut.
+"""
+
+import os
+import json
+import time
+import atexit
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.utils.file_lock import file_lock
+from app.utils.json_utils import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+# Eigener Lock-Pfad: atomic_write_json lockt das Manifest selbst
+MANIFEST_LOCK_NAME = ".manifest"
+
+
+class BackupSnapshotScheduler:
+    """Hash-basierte, zeitlich gebündelte Backup-Snapshots mit Manifest-Index"""
+
+    def __init__(self, max_backups: int = 10, min_interval: float = 60.0):
+        self.max_backups = max_backups
+        self.min_interval = min_interval
+        self._lock = threading.RLock()
+        # backup_dir -> (manifest mtime_ns, manifest)
+        self._manifests: Dict[str, tuple] = {}
+        # (backup_dir, filename) -> monotonic timestamp des letzten Snapshots
+        self._last_snapshot: Dict[tuple, float] = {}
+        # (backup_dir, filename) -> Timer für den nachgezogenen Snapshot
+        self._pending: Dict[tuple, threading.Timer] = {}
+        atexit.register(self.flush_pending)
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    def request(self, backup_dir: Path, source_dir: Path, filename: str,
+                data: Any = None) -> Optional[str]:
+        """
+        Snapshot anfordern (nach jedem Save)
+
+        Innerhalb des Intervalls wird nur ein Timer für den Stand am Ende
+        des Bursts gesetzt.
+
+        Returns:
+            Name des geschriebenen Backups oder None (übersprungen/gebündelt)
+        """
+        key = (str(backup_dir), filename)
+        with self._lock:
+            now = time.monotonic()
+            last = self._last_snapshot.get(key)
+            if last is not None and now - last < self.min_interval:
+                if key not in self._pending:
+                    timer = threading.Timer(
+                        self.min_interval - (now - last),
+                        self._flush_one, args=(key, backup_dir, source_dir, filename)
+                    )
+                    timer.daemon = True
+                    self._pending[key] = timer
+                    timer.start()
+                return None
+            self._last_snapshot[key] = now
+
+        return self.snapshot(backup_dir, source_dir, filename, data)
+
+    def _flush_one(self, key, backup_dir, source_dir, filename) -> None:
+        with self._lock:
+            timer = self._pending.pop(key, None)
+            if timer is None:
+                return
+            self._last_snapshot[key] = time.monotonic()
+        if not Path(backup_dir).is_dir():
+            return  # Verzeichnis inzwischen entfernt (z.B. Tests/Umzug)
+        try:
+            self.snapshot(backup_dir, source_dir, filename)
+        except Exception as e:
+            logger.warning(f"Deferred backup for {filename} failed: {e}")
+
+    def flush_pending(self) -> None:
+        """Schreibt alle ausstehenden gebündelten Snapshots sofort (Shutdown)"""
+        with self._lock:
+            pending = list(self._pending.items())
+        for key, timer in pending:
+            timer.cancel()
+            backup_dir, source_dir, filename = timer.args[1:]
+            self._flush_one(key, backup_dir, source_dir, filename)
+
+    # ------------------------------------------------------------------
+    # Snapshot / Retention
+    # ------------------------------------------------------------------
+
+    def snapshot(self, backup_dir: Path, source_dir: Path, filename: str,
+                 data: Any = None) -> Optional[str]:
+        """
+        Schreibt sofort einen Snapshot, falls sich der Inhalt geändert hat
+
+        Returns:
+            Name des Backups oder None wenn identisch zum letzten Snapshot
+        """
+        payload = self._read_payload(Path(source_dir) / filename, data)
+        digest = hashlib.sha256(payload).hexdigest()
+        backup_dir = Path(backup_dir)
+
+        with self._lock, file_lock(str(backup_dir / MANIFEST_LOCK_NAME)):
+            manifest = self._load_manifest(backup_dir)
+            entries = manifest.setdefault(filename, [])
+
+            if entries and entries[-1].get("sha256") == digest:
+                logger.debug(f"Backup für {filename} übersprungen (unverändert)")
+                return None
+
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            name = f"{filename}.{timestamp}.backup"
+            tmp_path = backup_dir / f".{name}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, backup_dir / name)
+
+            entries.append({
+                "name": name,
+                "sha256": digest,
+                "size": len(payload),
+                "created": datetime.now().isoformat(),
+            })
+            self._prune(backup_dir, entries)
+            self._save_manifest(backup_dir, manifest)
+            return name
+
+    def enforce_retention(self, backup_dir: Path, filename: str) -> None:
+        """Retention für eine Datei über das Manifest durchsetzen"""
+        backup_dir = Path(backup_dir)
+        with self._lock, file_lock(str(backup_dir / MANIFEST_LOCK_NAME)):
+            manifest = self._load_manifest(backup_dir)
+            entries = manifest.get(filename, [])
+            if len(entries) > self.max_backups:
+                self._prune(backup_dir, entries)
+                self._save_manifest(backup_dir, manifest)
+
+    def entries(self, backup_dir: Path, filename: str) -> List[Dict[str, Any]]:
+        """Vorhandene Snapshots einer Datei (älteste zuerst)"""
+        backup_dir = Path(backup_dir)
+        with self._lock:
+            manifest = self._load_manifest(backup_dir)
+            return [
+                dict(e) for e in manifest.get(filename, [])
+                if (backup_dir / e["name"]).exists()
+            ]
+
+    def latest(self, backup_dir: Path, filename: str) -> Optional[Path]:
+        """Pfad des neuesten Snapshots oder None"""
+        entries = self.entries(backup_dir, filename)
+        return Path(backup_dir) / entries[-1]["name"] if entries else None
+
+    def _prune(self, backup_dir: Path, entries: List[Dict[str, Any]]) -> None:
+        while len(entries) > self.max_backups:
+            old = entries.pop(0)
+            try:
+                (backup_dir / old["name"]).unlink()
+                logger.debug(f"Altes Backup gelöscht: {old['name']}")
+            except FileNotFoundError:
+                pass
+
+    # ------------------------------------------------------------------
+    # Manifest
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _read_payload(source_path: Path, data: Any) -> bytes:
+        if source_path.exists():
+            return source_path.read_bytes()
+        if data is None:
+            data = {}
+        return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+    def _load_manifest(self, backup_dir: Path) -> Dict[str, List[Dict[str, Any]]]:
+        """Manifest laden (in-memory gecacht, neu gelesen bei mtime-Änderung)"""
+        manifest_path = backup_dir / MANIFEST_NAME
+        key = str(backup_dir)
+        try:
+            mtime = manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+
+        cached = self._manifests.get(key)
+        if cached is not None and cached[0] == mtime and mtime is not None:
+            return cached[1]
+
+        if mtime is None:
+            manifest = self._rebuild_manifest(backup_dir)
+        else:
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Backup-Manifest unlesbar, baue neu auf: {e}")
+                manifest = self._rebuild_manifest(backup_dir)
+
+        self._manifests[key] = (mtime, manifest)
+        return manifest
+
+    def _save_manifest(self, backup_dir: Path, manifest: Dict[str, Any]) -> None:
+        manifest_path = backup_dir / MANIFEST_NAME
+        atomic_write_json(str(manifest_path), manifest)
+        try:
+            mtime = manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        self._manifests[str(backup_dir)] = (mtime, manifest)
+
+    @staticmethod
+    def _rebuild_manifest(backup_dir: Path) -> Dict[str, List[Dict[str, Any]]]:
+        """Einmalige Migration: Manifest aus vorhandenen Backup-Dateien aufbauen"""
+        manifest: Dict[str, List[Dict[str, Any]]] = {}
+        if not backup_dir.exists():
+            return manifest
+
+        for path in sorted(backup_dir.glob("*.backup"), key=lambda p: p.stat().st_mtime):
+            # <filename>.json.<timestamp>.backup
+            name = path.name
+            marker = name.find(".json.")
+            if marker == -1:
+                continue
+            filename = name[:marker + len(".json")]
+            try:
+                digest = hashlib.sha256(path.read_bytes()).hexdigest()
+            except OSError:
+                continue
+            manifest.setdefault(filename, []).append({
+                "name": name,
+                "sha256": digest,
+                "size": path.stat().st_size,
+                "created": datetime.fromtimestamp(path.stat().st_mtime).isoformat(),
+            })
+        return manifest
@@ -1045,7 +1045,10 @@ def award_booking_points(user, points):
                 achievement_sys = achievement_module.achievement_system
 
                 if achievement_sys:
-                    new_badges = achievement_sys.process_user_achievements(user)
+                    # Inkrementell: nur die von Score-Punkten abhängigen Regeln
+                    new_badges = achievement_sys.record_event(
+                        user, achievement_module.EVENT_SCORE, points=points, month=month
+                    )
                     if isinstance(new_badges, list) and len(new_badges) > 20:
                         booking_logger.warning(f"Achievement system returned {len(new_badges)} badges, limiting to 20")
                         new_badges = new_badges[:20]
@@ -1184,11 +1187,20 @@ def execute_post_booking_chain(user, customer_name, date, hour, color_id,
             if today_key not in daily_stats[user]:
                 daily_stats[user][today_key] = {"points": 0, "bookings": 0, "first_booking": False}
             h_int = int(hour.split(":")[0]) if isinstance(hour, str) and ":" in hour else 0
+            counter = None
             if h_int >= 18:
-                daily_stats[user][today_key]["evening_bookings"] = daily_stats[user][today_key].get("evening_bookings", 0) + 1
+                counter = "evening_bookings"
             elif 9 <= h_int < 12:
-                daily_stats[user][today_key]["morning_bookings"] = daily_stats[user][today_key].get("morning_bookings", 0) + 1
+                counter = "morning_bookings"
+            if counter:
+                daily_stats[user][today_key][counter] = daily_stats[user][today_key].get(counter, 0) + 1
             data_persistence.save_daily_user_stats(daily_stats)
+
+            if counter:
+                from app.services.achievement_system import achievement_system, EVENT_ACTIVITY
+                new_badges = list(new_badges or []) + achievement_system.record_event(
+                    user, EVENT_ACTIVITY, **{counter: 1}
+                )
     except Exception as e:
         booking_logger.warning(f"Could not update special badge counters for user {user}: {e}", exc_info=True)
 
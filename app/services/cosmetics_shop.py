@@ -513,12 +513,14 @@ SPECIAL_EFFECTS = {
 
 class CosmeticsShop:
     def __init__(self):
-        # Use correct server paths
-        self.purchases_file = "persist/persistent/cosmetic_purchases.json"
-        self.active_cosmetics_file = "persist/persistent/active_cosmetics.json"
+        # Use correct server paths (COSMETICS_DIR nur für Tests, nicht an PERSIST_BASE
+        # gekoppelt: das würde den bestehenden Store in Produktion verschieben)
+        persist_dir = os.getenv("COSMETICS_DIR", "persist/persistent")
+        self.purchases_file = os.path.join(persist_dir, "cosmetic_purchases.json")
+        self.active_cosmetics_file = os.path.join(persist_dir, "active_cosmetics.json")
 
         # Ensure directories exist
-        os.makedirs("persist/persistent", exist_ok=True)
+        os.makedirs(persist_dir, exist_ok=True)
 
         # Initialize files
         for file_path in [self.purchases_file, self.active_cosmetics_file]:
@@ -956,7 +958,9 @@ class CosmeticsShop:
             # Sync avatar selection to avatar_service
             try:
                 from app.services.avatar_service import avatar_service
-                avatar_service.save_shop_avatar(user, item_id)
+                if not avatar_service.save_shop_avatar(user, item_id).get("success"):
+                    # Emoji-Avatar ohne Shop-Bild: Manifest trotzdem verwerfen
+                    avatar_service.invalidate_manifest()
             except Exception as e:
                 logger.debug(f"Avatar service sync skipped: {e}")
         elif item_type == "effect":
@@ -991,6 +995,14 @@ class CosmeticsShop:
         self.save_active_cosmetics(active)
         self._pg_sync_unequip(user, item_type, item_id)
 
+        if item_type == "avatar":
+            # Aufgeloeste Avatare (Emoji/Shop-Bild) haben sich geaendert
+            try:
+                from app.services.avatar_service import avatar_service
+                avatar_service.invalidate_manifest()
+            except Exception as e:
+                logger.debug(f"Avatar manifest invalidation skipped: {e}")
+
         return {"success": True, "message": f"{item_type.title()} entfernt"}
     
     # ------------------------------------------------------------------
@@ -171,13 +171,14 @@ WHEEL_PRIZES = {
 
 class DailyQuestSystem:
     def __init__(self):
-        self.quests_file = "data/persistent/daily_quests.json"
-        self.user_progress_file = "data/persistent/quest_progress.json"
-        self.minigame_file = "data/persistent/minigame_data.json"
-        self.coins_file = "data/persistent/user_coins.json"
+        persist_dir = os.path.join(os.getenv("PERSIST_BASE", "data"), "persistent")
+        self.quests_file = os.path.join(persist_dir, "daily_quests.json")
+        self.user_progress_file = os.path.join(persist_dir, "quest_progress.json")
+        self.minigame_file = os.path.join(persist_dir, "minigame_data.json")
+        self.coins_file = os.path.join(persist_dir, "user_coins.json")
         
         # Ensure directories exist
-        os.makedirs("data/persistent", exist_ok=True)
+        os.makedirs(persist_dir, exist_ok=True)
         
         # Initialize files
         for file_path in [self.quests_file, self.user_progress_file, self.minigame_file, self.coins_file]:
@@ -922,23 +923,14 @@ class DailyQuestSystem:
             )
             if total_quests > 0 and completed_count >= total_quests:
                 from app.services.notification_service import notification_service
-                import uuid as _uuid
-                all_notifs = notification_service._load_all_notifications()
-                if user not in all_notifs:
-                    all_notifs[user] = []
-                all_notifs[user].append({
-                    'id': str(_uuid.uuid4())[:8],
-                    'type': 'success',
-                    'title': 'Alle Tages-Quests erledigt!',
-                    'message': f'Du hast alle {total_quests} Quests fuer heute abgeschlossen!',
-                    'timestamp': datetime.now(TZ).isoformat(),
-                    'read': False,
-                    'dismissed': False,
-                    'show_popup': True,
-                    'roles': [],
-                    'actions': [],
-                })
-                notification_service._save_all_notifications(all_notifs)
+                notification_service.notify_user(
+                    user,
+                    'Alle Tages-Quests erledigt!',
+                    f'Du hast alle {total_quests} Quests fuer heute abgeschlossen!',
+                    notification_type='success',
+                    show_popup=True,
+                    actions=[],
+                )
         except Exception as notif_err:
             logger.debug(f"All-quests-complete notification skipped: {notif_err}")
 
@@ -1010,23 +1002,14 @@ class DailyQuestSystem:
                     # Send notification directly to user
                     try:
                         from app.services.notification_service import notification_service
-                        import uuid as _uuid
-                        all_notifs = notification_service._load_all_notifications()
-                        if user not in all_notifs:
-                            all_notifs[user] = []
-                        all_notifs[user].append({
-                            'id': str(_uuid.uuid4())[:8],
-                            'type': 'success',
-                            'title': 'Lootbox erhalten!',
-                            'message': f"Du hast eine {result.get('crate_name', crate_type)} als Quest-Belohnung erhalten!",
-                            'timestamp': datetime.now(TZ).isoformat(),
-                            'read': False,
-                            'dismissed': False,
-                            'show_popup': True,
-                            'roles': [],
-                            'actions': [{'text': 'Oeffnen', 'url': '/slots/gamification'}],
-                        })
-                        notification_service._save_all_notifications(all_notifs)
+                        notification_service.notify_user(
+                            user,
+                            'Lootbox erhalten!',
+                            f"Du hast eine {result.get('crate_name', crate_type)} als Quest-Belohnung erhalten!",
+                            notification_type='success',
+                            show_popup=True,
+                            actions=[{'text': 'Oeffnen', 'url': '/slots/gamification'}],
+                        )
                     except Exception as notif_err:
                         logger.debug(f"Lootbox notification skipped: {notif_err}")
             except Exception as e:
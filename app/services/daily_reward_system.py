@@ -122,23 +122,14 @@ class DailyRewardSystem:
                 logger.info(f"Streak shield protected streak for {username} (streak: {streak})")
                 try:
                     from app.services.notification_service import notification_service
-                    import uuid as _uuid
-                    all_notifs = notification_service._load_all_notifications()
-                    if username not in all_notifs:
-                        all_notifs[username] = []
-                    all_notifs[username].append({
-                        'id': str(_uuid.uuid4())[:8],
-                        'type': 'success',
-                        'title': 'Streak-Shield aktiviert!',
-                        'message': 'Dein Streak-Shield hat deine Streak geschuetzt!',
-                        'timestamp': datetime.now(TZ).isoformat(),
-                        'read': False,
-                        'dismissed': False,
-                        'show_popup': True,
-                        'roles': [],
-                        'actions': [],
-                    })
-                    notification_service._save_all_notifications(all_notifs)
+                    notification_service.notify_user(
+                        username,
+                        'Streak-Shield aktiviert!',
+                        'Dein Streak-Shield hat deine Streak geschuetzt!',
+                        notification_type='success',
+                        show_popup=True,
+                        actions=[],
+                    )
                 except Exception as notif_err:
                     logger.debug(f"Streak shield notification skipped: {notif_err}")
             else:
@@ -11,6 +11,8 @@ from pathlib import Path
 from typing import Dict, Any, Optional, List
 from app.utils.json_utils import atomic_write_json, atomic_read_json, atomic_update_json
 from app.utils.db_utils import db_session_scope, db_session_scope_no_commit
+from app.services.backup_snapshots import BackupSnapshotScheduler
+from app.utils.write_behind import static_mirror
 
 # Logger setup
 logger = logging.getLogger(__name__)
@@ -39,6 +41,7 @@ class DataPersistence:
         3. Fallback: ./data (lokale Entwicklung)
 
         Dual-Write: zusätzlich nach static/ für Legacy-Kompatibilität
+        (asynchron über den Write-Behind-Mirror, siehe app.utils.write_behind)
         """
         persist_base_env = os.getenv("PERSIST_BASE", "")
 
@@ -65,6 +68,16 @@ class DataPersistence:
         self.data_dir.mkdir(parents=True, exist_ok=True)
         self.backup_dir.mkdir(parents=True, exist_ok=True)
         self.static_dir.mkdir(parents=True, exist_ok=True)
+
+        # Hash-basierte, gebündelte Backups mit Manifest-Index
+        from app.config.base import storage_config
+        self.snapshots = BackupSnapshotScheduler(
+            max_backups=storage_config.MAX_BACKUPS,
+            min_interval=storage_config.BACKUP_MIN_INTERVAL,
+        )
+
+        # static/-Kopien werden gebündelt im Hintergrund geschrieben
+        self.mirror = static_mirror
     
     def save_scores(self, scores_data: Dict[str, Any]) -> bool:
         """Speichere Scores (Dual-Write: PostgreSQL + JSON)"""
@@ -103,7 +116,7 @@ class DataPersistence:
             self._create_backup("scores.json", scores_data)
 
             static_scores = str(self.static_dir / "scores.json")
-            atomic_write_json(static_scores, scores_data)
+            self.mirror.mirror(scores_file, static_scores)
 
             logger.info(f"Scores gespeichert: {len(scores_data)} Benutzer")
             return True
@@ -205,15 +218,14 @@ class DataPersistence:
 
         # 2. JSON write (always, as backup)
         try:
-            badges_file = self.data_dir / "user_badges.json"
-            with open(badges_file, "w", encoding="utf-8") as f:
-                json.dump(badges_data, f, indent=2, ensure_ascii=False)
+            badges_file = str(self.data_dir / "user_badges.json")
+            if not atomic_write_json(badges_file, badges_data):
+                return False
 
             self._create_backup("user_badges.json", badges_data)
 
-            static_badges = self.static_dir / "user_badges.json"
-            with open(static_badges, "w", encoding="utf-8") as f:
-                json.dump(badges_data, f, indent=2, ensure_ascii=False)
+            static_badges = str(self.static_dir / "user_badges.json")
+            self.mirror.mirror(badges_file, static_badges)
 
             logger.info(f"Badges gespeichert: {len(badges_data)} Benutzer")
             return True
@@ -258,19 +270,17 @@ class DataPersistence:
 
         # 2. JSON-Fallback
         try:
-            badges_file = self.data_dir / "user_badges.json"
-            if badges_file.exists():
-                with open(badges_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    return self._normalize_usernames_in_data(data)
-
-            static_badges = self.static_dir / "user_badges.json"
-            if static_badges.exists():
-                with open(static_badges, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    data = self._normalize_usernames_in_data(data)
-                    self.save_badges(data)
-                    return data
+            badges_file = str(self.data_dir / "user_badges.json")
+            data = atomic_read_json(badges_file)
+            if data is not None:
+                return self._normalize_usernames_in_data(data)
+
+            static_badges = str(self.static_dir / "user_badges.json")
+            data = atomic_read_json(static_badges)
+            if data is not None:
+                data = self._normalize_usernames_in_data(data)
+                self.save_badges(data)
+                return data
 
             return {}
         except Exception as e:
@@ -318,15 +328,14 @@ class DataPersistence:
 
         # 2. JSON write (always, as backup)
         try:
-            champions_file = self.data_dir / "champions.json"
-            with open(champions_file, "w", encoding="utf-8") as f:
-                json.dump(champions_data, f, indent=2, ensure_ascii=False)
+            champions_file = str(self.data_dir / "champions.json")
+            if not atomic_write_json(champions_file, champions_data):
+                return False
 
             self._create_backup("champions.json", champions_data)
 
-            static_champions = self.static_dir / "champions.json"
-            with open(static_champions, "w", encoding="utf-8") as f:
-                json.dump(champions_data, f, indent=2, ensure_ascii=False)
+            static_champions = str(self.static_dir / "champions.json")
+            self.mirror.mirror(champions_file, static_champions)
 
             logger.info(f"Champions gespeichert: {len(champions_data)} Monate")
             return True
@@ -366,17 +375,16 @@ class DataPersistence:
 
         # 2. JSON-Fallback
         try:
-            stats_file = self.data_dir / "daily_user_stats.json"
-            if stats_file.exists():
-                with open(stats_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-
-            static_stats = self.static_dir / "daily_user_stats.json"
-            if static_stats.exists():
-                with open(static_stats, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self.save_daily_user_stats(data)
-                    return data
+            stats_file = str(self.data_dir / "daily_user_stats.json")
+            data = atomic_read_json(stats_file)
+            if data is not None:
+                return data
+
+            static_stats = str(self.static_dir / "daily_user_stats.json")
+            data = atomic_read_json(static_stats)
+            if data is not None:
+                self.save_daily_user_stats(data)
+                return data
 
             return {}
         except Exception as e:
@@ -433,15 +441,14 @@ class DataPersistence:
 
         # 2. JSON write (always, as backup)
         try:
-            stats_file = self.data_dir / "daily_user_stats.json"
-            with open(stats_file, "w", encoding="utf-8") as f:
-                json.dump(stats_data, f, indent=2, ensure_ascii=False)
+            stats_file = str(self.data_dir / "daily_user_stats.json")
+            if not atomic_write_json(stats_file, stats_data):
+                return False
 
             self._create_backup("daily_user_stats.json", stats_data)
 
-            static_stats = self.static_dir / "daily_user_stats.json"
-            with open(static_stats, "w", encoding="utf-8") as f:
-                json.dump(stats_data, f, indent=2, ensure_ascii=False)
+            static_stats = str(self.static_dir / "daily_user_stats.json")
+            self.mirror.mirror(stats_file, static_stats)
 
             logger.info(f"Daily User Stats gespeichert: {len(stats_data)} Tage")
             return True
@@ -474,17 +481,16 @@ class DataPersistence:
 
         # 2. JSON-Fallback
         try:
-            champions_file = self.data_dir / "champions.json"
-            if champions_file.exists():
-                with open(champions_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-
-            static_champions = self.static_dir / "champions.json"
-            if static_champions.exists():
-                with open(static_champions, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self.save_champions(data)
-                    return data
+            champions_file = str(self.data_dir / "champions.json")
+            data = atomic_read_json(champions_file)
+            if data is not None:
+                return data
+
+            static_champions = str(self.static_dir / "champions.json")
+            data = atomic_read_json(static_champions)
+            if data is not None:
+                self.save_champions(data)
+                return data
 
             return {}
         except Exception as e:
@@ -507,31 +513,26 @@ class DataPersistence:
             logger.error(f"Error normalizing usernames: {e}")
             return data
 
-    def _create_backup(self, filename, data):
-        """Erstelle Backup mit Timestamp"""
+    def _create_backup(self, filename, data, force=False):
+        """
+        Fordere Backup-Snapshot an (Hash-Dedup + Bündelung pro Intervall)
+
+        Args:
+            filename: Dateiname im Persist-Verzeichnis
+            data: Gespeicherte Daten (nur genutzt, falls die Datei fehlt)
+            force: Intervall ignorieren und sofort snapshotten
+        """
         try:
             # filename inkl. .json erwarten
             if not filename.endswith(".json"):
                 filename = f"{filename}.json"
 
-            # Falls keine Daten übergeben wurden, lade aus der aktuellen Datei
-            if data is None:
-                source_path = self.data_dir / filename
-                if source_path.exists():
-                    with open(source_path, "r", encoding="utf-8") as sf:
-                        data = json.load(sf)
-                else:
-                    data = {}
-
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = self.backup_dir / f"{filename}.{timestamp}.backup"
-            with open(backup_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-
-            # Behalte nur die letzten 10 Backups
-            self._cleanup_old_backups(filename)
+            if force:
+                return self.snapshots.snapshot(self.backup_dir, self.data_dir, filename, data)
+            return self.snapshots.request(self.backup_dir, self.data_dir, filename, data)
         except Exception as e:
             logger.warning(f"Backup-Fehler für {filename}: {e}")
+            return None
     
     def auto_cleanup_backups(self):
         """Automatische Bereinigung alter Backups"""
@@ -543,24 +544,11 @@ class DataPersistence:
             logger.error(f"Backup-Cleanup Fehler: {e}")
     
     def _cleanup_old_backups(self, filename):
-        """Bereinige alte Backups für eine bestimmte Datei"""
+        """Bereinige alte Backups für eine bestimmte Datei (über Manifest, ohne Glob)"""
         try:
-            # Einheitliches Format: <filename>.json.YYYYmmdd_HHMMSS.backup
             if not filename.endswith(".json"):
                 filename = f"{filename}.json"
-
-            backup_files = list(self.backup_dir.glob(f"{filename}.*.backup"))
-
-            # Behalte nur die letzten 10 Backups
-            if len(backup_files) > 10:
-                # Sortiere nach Erstellungsdatum (älteste zuerst)
-                backup_files.sort(key=lambda x: x.stat().st_mtime)
-                
-                # Lösche die ältesten Backups
-                files_to_delete = backup_files[:-10]
-                for backup_file in files_to_delete:
-                    backup_file.unlink()
-                    logger.debug(f"Altes Backup gelöscht: {backup_file.name}")
+            self.snapshots.enforce_retention(self.backup_dir, filename)
         except Exception as e:
             logger.error(f"Fehler beim Bereinigen von {filename} Backups: {e}")
     
@@ -569,18 +557,12 @@ class DataPersistence:
         try:
             stats = {}
             for filename in ["scores.json", "champions.json", "user_badges.json", "daily_user_stats.json"]:
-                backup_files = list(self.backup_dir.glob(f"{filename}.*.backup"))
+                entries = self.snapshots.entries(self.backup_dir, filename)
                 stats[filename] = {
-                    "count": len(backup_files),
-                    "latest": None,
-                    "oldest": None
+                    "count": len(entries),
+                    "latest": entries[-1]["name"] if entries else None,
+                    "oldest": entries[0]["name"] if entries else None
                 }
-                
-                if backup_files:
-                    # Sortiere nach Erstellungsdatum
-                    backup_files.sort(key=lambda x: x.stat().st_mtime)
-                    stats[filename]["oldest"] = backup_files[0].name
-                    stats[filename]["latest"] = backup_files[-1].name
             
             return stats
         except Exception as e:
@@ -593,13 +575,10 @@ class DataPersistence:
             if not filename.endswith(".json"):
                 filename = f"{filename}.json"
 
-            backup_files = list(self.backup_dir.glob(f"{filename}.*.backup"))
-            if not backup_files:
+            latest_backup = self.snapshots.latest(self.backup_dir, filename)
+            if latest_backup is None:
                 return False, "Keine Backups verfügbar"
             
-            # Neuestes Backup finden
-            latest_backup = max(backup_files, key=lambda x: x.stat().st_mtime)
-            
             # Backup laden
             with open(latest_backup, "r", encoding="utf-8") as f:
                 data = json.load(f)
@@ -738,7 +717,7 @@ class DataPersistence:
                 try:
                     source_file = self.data_dir / filename
                     if source_file.exists():
-                        self._create_backup(filename, None)  # None = lade automatisch
+                        self._create_backup(filename, None, force=True)  # None = lade automatisch
                         backed_up.append(filename)
                 except Exception as e:
                     logger.error(f"Backup-Fehler für {filename}: {e}")
@@ -854,9 +833,9 @@ class DataPersistence:
             # Backup erstellen
             self._create_backup(filename, data)
 
-            # Auch in static/ für Kompatibilität
+            # Auch in static/ für Kompatibilität (write-behind)
             static_file = str(self.static_dir / filename)
-            atomic_write_json(static_file, data)
+            self.mirror.mirror(data_file, static_file)
 
             return True
 
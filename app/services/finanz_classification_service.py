@@ -43,62 +43,88 @@ class FinanzClassificationService:
         Raises:
             ValueError: If document not found or not in correct status
         """
+        return self.classify_documents([document_id])[document_id]
+
+    def classify_documents(self, document_ids: list[int]) -> dict[int, dict]:
+        """
+        Classify several documents; in live mode all prompts go out as one batch.
+
+        Args:
+            document_ids: IDs of FinanzDocuments (all must be in EXTRACTED status)
+
+        Returns:
+            Dict document_id -> classification result (see classify_document)
+
+        Raises:
+            ValueError: If a document is not found or not in correct status
+        """
+        label = ", ".join(str(i) for i in document_ids)
         db = get_db_session()
         try:
-            doc = db.query(FinanzDocument).filter(
-                FinanzDocument.id == document_id
-            ).first()
-            if doc is None:
-                raise ValueError(f"Document {document_id} not found")
-
-            if doc.status != DocumentStatus.EXTRACTED:
-                raise ValueError(
-                    f"Document {document_id} not in EXTRACTED status (current: {doc.status})"
-                )
+            found = {
+                doc.id: doc for doc in db.query(FinanzDocument).filter(
+                    FinanzDocument.id.in_(document_ids)
+                ).all()
+            }
+            docs = []
+            for document_id in document_ids:
+                doc = found.get(document_id)
+                if doc is None:
+                    raise ValueError(f"Document {document_id} not found")
+
+                if doc.status != DocumentStatus.EXTRACTED:
+                    raise ValueError(
+                        f"Document {document_id} not in EXTRACTED status (current: {doc.status})"
+                    )
+                docs.append(doc)
 
             # Update status
-            doc.status = DocumentStatus.CLASSIFYING
+            for doc in docs:
+                doc.status = DocumentStatus.CLASSIFYING
             db.commit()
 
-            text = doc.extracted_text or ""
+            texts = [doc.extracted_text or "" for doc in docs]
 
             use_llm = finanz_config.FINANZ_LLM_ENABLED
 
             try:
                 if use_llm:
-                    result = self._classify_llm(text)
+                    results = self._classify_llm_batch(texts, [doc.file_hash for doc in docs])
                 else:
-                    result = self._classify_keywords(text)
+                    results = [self._classify_keywords(text) for text in texts]
             except Exception as e:
-                doc.status = DocumentStatus.ERROR
+                for doc in docs:
+                    doc.status = DocumentStatus.ERROR
                 db.commit()
-                raise RuntimeError(f"Classification failed for doc {document_id}: {e}") from e
-
-            # Update document
-            type_key = result["type_key"]
-            if type_key and type_key != "sonstige":
-                try:
-                    doc.document_type = DocumentType(type_key)
-                except ValueError:
+                raise RuntimeError(f"Classification failed for doc {label}: {e}") from e
+
+            # Update documents
+            for doc, result in zip(docs, results):
+                type_key = result["type_key"]
+                if type_key and type_key != "sonstige":
+                    try:
+                        doc.document_type = DocumentType(type_key)
+                    except ValueError:
+                        doc.document_type = DocumentType.SONSTIGE
+                else:
                     doc.document_type = DocumentType.SONSTIGE
-            else:
-                doc.document_type = DocumentType.SONSTIGE
 
-            doc.classification_confidence = result["confidence"]
-            doc.status = DocumentStatus.CLASSIFIED
+                doc.classification_confidence = result["confidence"]
+                doc.status = DocumentStatus.CLASSIFIED
+
+                logger.info(
+                    "Document %s classified as '%s' (confidence: %.2f)",
+                    doc.id, result["type_key"], result["confidence"],
+                )
             db.commit()
 
-            logger.info(
-                "Document %s classified as '%s' (confidence: %.2f)",
-                document_id, result["type_key"], result["confidence"],
-            )
-            return result
+            return {doc.id: result for doc, result in zip(docs, results)}
 
         except (ValueError, RuntimeError):
             raise
         except Exception as e:
             db.rollback()
-            logger.error("Classification error for doc %s: %s", document_id, e, exc_info=True)
+            logger.error("Classification error for doc %s: %s", label, e, exc_info=True)
             raise
         finally:
             db.close()
@@ -146,14 +172,34 @@ class FinanzClassificationService:
         }
 
     def _classify_llm(self, text: str) -> dict:
+        """Classify a single text via LLM (see _classify_llm_batch)."""
+        return self._classify_llm_batch([text])[0]
+
+    def _classify_llm_batch(self, texts: list[str], cache_owners: Optional[list] = None) -> list[dict]:
         """
         Classify using LLM via vLLM API endpoint.
 
-        Sends document text with list of contract types to the LLM
-        and expects a structured JSON response.
+        Sends each document text with list of contract types to the LLM
+        and expects a structured JSON response. All prompts are submitted
+        as one batch; unchanged documents are answered from the LLM cache
+        (tagged with the documents' file hashes in ``cache_owners``).
         """
         from app.services.llm_client import llm_client
 
+        owners = cache_owners or [None] * len(texts)
+        responses = llm_client.chat_completions([
+            {
+                "prompt": self._build_prompt(text),
+                "max_tokens": 100,
+                "temperature": 0.1,
+                "timeout": finanz_config.FINANZ_LLM_TIMEOUT,
+                "cache_owner": owner,
+            }
+            for text, owner in zip(texts, owners)
+        ])
+        return [self._parse_llm_result(result, text) for result, text in zip(responses, texts)]
+
+    def _build_prompt(self, text: str) -> str:
         type_list = "\n".join(
             f"- {key}: {ct['label']}"
             for key, ct in CONTRACT_TYPES.items()
@@ -163,7 +209,7 @@ class FinanzClassificationService:
         max_chars = 8000
         truncated = text[:max_chars] if len(text) > max_chars else text
 
-        prompt = f"""Klassifiziere das folgende Dokument. Gib den passenden Vertragstyp als JSON zurueck.
+        return f"""Klassifiziere das folgende Dokument. Gib den passenden Vertragstyp als JSON zurueck.
 
 Verfuegbare Vertragstypen:
 {type_list}
@@ -173,13 +219,7 @@ Dokument-Text:
 
 Antworte NUR mit JSON im Format: {{"type": "<type_key>", "confidence": 0.0-1.0}}"""
 
-        result = llm_client.chat_completion(
-            prompt=prompt,
-            max_tokens=100,
-            temperature=0.1,
-            timeout=finanz_config.FINANZ_LLM_TIMEOUT,
-        )
-
+    def _parse_llm_result(self, result: Optional[dict], text: str) -> dict:
         if result is None:
             logger.warning("LLM classification returned no result, falling back to keywords")
             return self._classify_keywords(text)
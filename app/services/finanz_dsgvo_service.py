@@ -9,7 +9,8 @@ Handles GDPR-compliant data deletion for financial advisory sessions:
 - Preserves extracted data and embeddings for analytics
 
 File-Deletion Logic:
-1. Delete stored files from disk
+1. Delete stored files from disk, unfinished uploads and the derived caches
+   (page texts, LLM answers, embedding vectors in the SQLite caches)
 2. Set original_filename to "[GELOESCHT]"
 3. Set stored_filename to None
 4. KEEP extracted_text (for analytics)
@@ -26,6 +27,8 @@ from typing import Optional
 
 from app.config.base import FinanzConfig as finanz_config
 from app.models import get_db_session
+from app.services.finanz_extraction_service import page_text_cache
+from app.services.llm_client import session_cache_owner
 from app.models.finanzberatung import (
     FinanzSession, FinanzDocument, SessionStatus,
 )
@@ -36,6 +39,16 @@ logger = logging.getLogger(__name__)
 DELETION_RETENTION_DAYS = 30
 
 
+def _purge_model_caches(owner: Optional[str]) -> None:
+    """Drop cached LLM answers and embeddings derived from a document or session."""
+    from app.services.llm_client import llm_client
+    from app.services.finanz_embedding_service import embedding_cache
+    if llm_client.cache is not None:
+        llm_client.cache.purge(owner)
+    if embedding_cache is not None:
+        embedding_cache.purge(owner)
+
+
 class FinanzDSGVOService:
     """Manages GDPR-compliant data deletion for Finanzberatung sessions."""
 
@@ -215,10 +228,22 @@ class FinanzDSGVOService:
                     except OSError as e:
                         logger.error("Failed to delete file %s: %s", file_path, e)
 
+                # Cached page texts are a copy of the file content, drop them too,
+                # as well as the extracted fields in the LLM and embedding caches
+                page_text_cache.purge(doc.file_hash)
+                _purge_model_caches(doc.file_hash)
+
                 # Anonymize filenames, keep extracted_text
                 doc.original_filename = "[GELOESCHT]"
                 doc.stored_filename = None
 
+            # Scorecard prompts and search queries are cached per session
+            _purge_model_caches(session_cache_owner(session_id))
+
+            # Unfinished resumable uploads and upload temp files hold document content too
+            from app.services.finanz_upload_service import FinanzUploadService
+            partials_deleted = FinanzUploadService().purge_session_partials(session_id)
+
             # Update session
             session.files_deleted_at = datetime.now(timezone.utc)
             session.transition_to(SessionStatus.ARCHIVED)
@@ -226,8 +251,8 @@ class FinanzDSGVOService:
             db.commit()
 
             logger.info(
-                "Session %s: %d files deleted, status -> ARCHIVED",
-                session_id, files_deleted,
+                "Session %s: %d files deleted, %d partial uploads removed, status -> ARCHIVED",
+                session_id, files_deleted, partials_deleted,
             )
 
             # Audit log
@@ -8,15 +8,31 @@ Embeds document text into vector space for similarity search:
 - Storage in ChromaDB collection per session
 - Similarity search for finding related documents/contracts
 
+The model is loaded once per process (``embedding_model``) and preloaded in
+Celery worker processes. Chunks from concurrent embed tasks are grouped by
+``embedding_batcher`` up to a size/latency budget before ``encode`` runs, and
+``embedding_cache`` stores vectors by chunk content hash so re-uploads and
+re-runs skip recomputation; entries are tagged with the document's file hash
+so DSGVO deletion can purge them.
+
 Gracefully degrades if ML dependencies are not installed.
 """
 
+import os
+import time
+import array
+import hashlib
 import logging
+import sqlite3
+import threading
+from concurrent.futures import Future
+from functools import lru_cache
 from typing import Optional
 
 from app.config.base import Config, FinanzConfig as finanz_config
 from app.models import get_db_session
 from app.models.finanzberatung import FinanzDocument, DocumentStatus
+from app.services.llm_client import session_cache_owner
 
 logger = logging.getLogger(__name__)
 
@@ -39,25 +55,395 @@ try:
 except ImportError:
     HAS_CHROMADB = False
 
+# FINANZ_EMBEDDING_MODEL=hashing -> deterministic CPU-only encoder (tests, CI, dev)
+HASHING_MODEL_NAME = "hashing"
+
+
+@lru_cache(maxsize=4)
+def _get_tiktoken_encoding(name: str = "cl100k_base"):
+    """tiktoken encodings are expensive to build; keep one per process."""
+    return tiktoken.get_encoding(name)
+
+
+def _to_lists(vectors) -> list[list[float]]:
+    """Normalize numpy arrays / nested sequences to plain lists."""
+    if hasattr(vectors, "tolist"):
+        return vectors.tolist()
+    return [list(v) for v in vectors]
+
+
+class HashingEncoder:
+    """
+    Deterministic stand-in for SentenceTransformer.
+
+    Same text -> same unit vector, no downloads, no torch. Used when
+    FINANZ_EMBEDDING_MODEL=hashing and by the test suite.
+    """
+
+    def __init__(self, dim: int = 32):
+        self.dim = dim
+        self.calls: list[int] = []
+
+    def encode(self, texts, show_progress_bar: bool = False, **kwargs) -> list[list[float]]:
+        self.calls.append(len(texts))
+        vectors = []
+        for text in texts:
+            digest = b""
+            counter = 0
+            while len(digest) < self.dim:
+                digest += hashlib.sha256(f"{counter}:{text}".encode("utf-8")).digest()
+                counter += 1
+            raw = [(b - 127.5) / 127.5 for b in digest[:self.dim]]
+            norm = sum(x * x for x in raw) ** 0.5 or 1.0
+            vectors.append([x / norm for x in raw])
+        return vectors
+
+
+class EmbeddingModelHolder:
+    """Process-wide encoder: loaded once, shared by all service instances."""
+
+    def __init__(self, model_name: Optional[str] = None):
+        self._model_name = model_name
+        self._encoder = None
+        self._lock = threading.Lock()
+
+    @property
+    def model_name(self) -> str:
+        return self._model_name or finanz_config.FINANZ_EMBEDDING_MODEL
+
+    @property
+    def is_available(self) -> bool:
+        return (
+            self._encoder is not None
+            or self.model_name == HASHING_MODEL_NAME
+            or HAS_SENTENCE_TRANSFORMERS
+        )
+
+    def get(self):
+        """Return the encoder, loading it on first use."""
+        if self._encoder is None:
+            with self._lock:
+                if self._encoder is None:
+                    self._encoder = self._load()
+        return self._encoder
+
+    def _load(self):
+        if self.model_name == HASHING_MODEL_NAME:
+            return HashingEncoder()
+        if not HAS_SENTENCE_TRANSFORMERS:
+            return None
+        start = time.perf_counter()
+        model = SentenceTransformer(self.model_name)
+        logger.info(
+            "Embedding model %s loaded in %.1fs (pid %s)",
+            self.model_name, time.perf_counter() - start, os.getpid(),
+        )
+        return model
+
+    def set_encoder(self, encoder, model_name: Optional[str] = None) -> None:
+        """Swap in an encoder (tests: HashingEncoder). ``None`` resets to lazy loading."""
+        with self._lock:
+            self._encoder = encoder
+            self._model_name = model_name
+
+    def preload(self) -> bool:
+        """Load the model now (Celery worker_process_init). Never raises."""
+        try:
+            return self.get() is not None
+        except Exception as e:
+            logger.warning("Embedding model preload failed: %s", e)
+            return False
+
+
+class EmbeddingCache:
+    """
+    Vectors keyed by sha256(model + chunk text) in a small SQLite file.
+
+    SQLite is shared safely between Celery worker processes; vectors are
+    stored as float32 blobs. Owners (document file hash, session) are kept
+    per key so ``purge(owner)`` can drop them on DSGVO deletion.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._local = threading.local()
+
+    @property
+    def path(self) -> str:
+        return self._path or finanz_config.get_embedding_cache_path()
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\n{text}".encode("utf-8")).hexdigest()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS owners ("
+                "owner TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (owner, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_owners_key ON owners (key)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        found: dict[str, list[float]] = {}
+        unique = list(dict.fromkeys(keys))
+        try:
+            conn = self._conn()
+            for i in range(0, len(unique), 500):
+                batch = unique[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array.array("f", blob).tolist()
+        except sqlite3.Error as e:
+            logger.warning("Embedding cache read failed: %s", e)
+        return found
+
+    def put_many(self, items: dict[str, list[float]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        try:
+            conn = self._conn()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                    [(key, array.array("f", vector).tobytes(), now) for key, vector in items.items()],
+                )
+        except sqlite3.Error as e:
+            logger.warning("Embedding cache write failed: %s", e)
+
+    def tag(self, keys: list[str], owner: str) -> None:
+        if not keys or not owner:
+            return
+        try:
+            conn = self._conn()
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO owners (owner, key) VALUES (?, ?)",
+                    [(owner, key) for key in dict.fromkeys(keys)],
+                )
+        except sqlite3.Error as e:
+            logger.warning("Embedding cache tag failed: %s", e)
+
+    def purge(self, owner: Optional[str]) -> int:
+        """Delete all vectors tagged with ``owner``; returns the number of deleted vectors."""
+        if not owner:
+            return 0
+        try:
+            conn = self._conn()
+            with conn:
+                keys = [(key,) for (key,) in conn.execute("SELECT key FROM owners WHERE owner = ?", (owner,))]
+                conn.executemany("DELETE FROM embeddings WHERE key = ?", keys)
+                conn.executemany("DELETE FROM owners WHERE key = ?", keys)
+            return len(keys)
+        except sqlite3.Error as e:
+            logger.warning("Embedding cache purge failed: %s", e)
+            return 0
+
+    def clear(self) -> None:
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute("DELETE FROM embeddings")
+                conn.execute("DELETE FROM owners")
+        except sqlite3.Error as e:
+            logger.warning("Embedding cache clear failed: %s", e)
+
+
+class EmbeddingBatcher:
+    """
+    Groups embedding requests from concurrent callers into few ``encode`` calls.
+
+    A background thread collects pending chunks until ``max_batch`` chunks are
+    queued or ``max_wait`` seconds passed since the first one arrived, then
+    encodes them together. Run the embedding worker with a thread pool
+    (``--pool threads``) so concurrent documents actually meet here; with
+    prefork each document still gets full-size batches and the cache.
+    """
+
+    def __init__(self, holder: EmbeddingModelHolder, cache: Optional[EmbeddingCache] = None,
+                 max_batch: Optional[int] = None, max_wait: Optional[float] = None):
+        self.holder = holder
+        self.cache = cache
+        self.max_batch = max_batch or finanz_config.FINANZ_EMBED_BATCH_SIZE
+        self.max_wait = (
+            max_wait if max_wait is not None
+            else finanz_config.FINANZ_EMBED_BATCH_WAIT_MS / 1000.0
+        )
+        self._cond = threading.Condition()
+        self._pending: list[tuple[list[str], Future]] = []
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"requested": 0, "cache_hits": 0, "encoded": 0, "encode_calls": 0}
+
+    # ---------------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------------
+
+    def embed(self, texts: list[str], batch: bool = True,
+              cache_owner: Optional[str] = None) -> list[list[float]]:
+        """
+        Embed ``texts``; cached chunks are not re-encoded.
+
+        Args:
+            batch: wait for other callers' chunks (False for interactive queries)
+            cache_owner: document file hash or session owner the texts belong to
+                (cached vectors are purged with it)
+        """
+        if not texts:
+            return []
+        model_name = self.holder.model_name
+        keys = [EmbeddingCache.key(model_name, t) for t in texts]
+        known = self.cache.get_many(keys) if self.cache else {}
+
+        missing: dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in known:
+                missing.setdefault(key, text)
+
+        self._count("requested", len(texts))
+        self._count("cache_hits", len(texts) - sum(1 for k in keys if k not in known))
+
+        if missing:
+            missing_texts = list(missing.values())
+            if batch:
+                vectors = self._submit(missing_texts).result()
+            else:
+                vectors = self._encode(missing_texts)
+            fresh = dict(zip(missing.keys(), vectors))
+            if self.cache:
+                self.cache.put_many(fresh)
+            known.update(fresh)
+
+        if self.cache and cache_owner:
+            self.cache.tag(keys, cache_owner)
+
+        return [known[key] for key in keys]
+
+    # ---------------------------------------------------------------
+    # Batching
+    # ---------------------------------------------------------------
+
+    def _count(self, name: str, amount: int) -> None:
+        with self._cond:
+            self.stats[name] += amount
+
+    def _encode(self, texts: list[str]) -> list[list[float]]:
+        encoder = self.holder.get()
+        if encoder is None:
+            raise RuntimeError("No embedding model available")
+        vectors: list[list[float]] = []
+        for i in range(0, len(texts), self.max_batch):
+            part = texts[i:i + self.max_batch]
+            vectors.extend(_to_lists(encoder.encode(part, show_progress_bar=False)))
+            self._count("encode_calls", 1)
+        self._count("encoded", len(texts))
+        return vectors
+
+    def _submit(self, texts: list[str]) -> Future:
+        future: Future = Future()
+        with self._cond:
+            self._pending.append((texts, future))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def _take_batch(self) -> list[tuple[list[str], Future]]:
+        """Wait for a full batch or the latency budget; returns [] when idle."""
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(timeout=30)
+                if not self._pending:
+                    return []
+            deadline = time.monotonic() + self.max_wait
+            while sum(len(t) for t, _ in self._pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(timeout=remaining)
+            batch, size = [], 0
+            while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_batch):
+                texts, future = self._pending.pop(0)
+                batch.append((texts, future))
+                size += len(texts)
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                with self._cond:
+                    if not self._pending:
+                        self._thread = None
+                        return
+                continue
+            texts = [t for chunk_texts, _ in batch for t in chunk_texts]
+            try:
+                vectors = self._encode(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            offset = 0
+            for chunk_texts, future in batch:
+                future.set_result(vectors[offset:offset + len(chunk_texts)])
+                offset += len(chunk_texts)
+
+    def _after_fork(self) -> None:
+        self._cond = threading.Condition()
+        self._pending = []
+        self._thread = None
+
+
+def preload_embedding_model(**kwargs) -> None:
+    """Celery ``worker_process_init`` handler: warm the model before the first task."""
+    if not (finanz_config.FINANZ_ENABLED and finanz_config.FINANZ_EMBED_PRELOAD):
+        return
+    if embedding_model.is_available and embedding_model.preload():
+        logger.info("Embedding model preloaded in worker pid %s", os.getpid())
+
+
+# Process-wide instances
+embedding_model = EmbeddingModelHolder()
+embedding_cache = EmbeddingCache() if finanz_config.FINANZ_EMBED_CACHE_ENABLED else None
+embedding_batcher = EmbeddingBatcher(embedding_model, embedding_cache)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=embedding_batcher._after_fork)
+
 
 class FinanzEmbeddingService:
     """Embeds financial document text for semantic search."""
 
-    def __init__(self):
-        self._model = None
+    def __init__(self, batcher: Optional[EmbeddingBatcher] = None):
+        self._batcher = batcher or embedding_batcher
         self._chroma_client = None
 
     @property
     def is_available(self) -> bool:
         """Check if all ML dependencies are available."""
-        return HAS_TIKTOKEN and HAS_SENTENCE_TRANSFORMERS and HAS_CHROMADB
+        return HAS_TIKTOKEN and self._batcher.holder.is_available and HAS_CHROMADB
 
     def _get_model(self):
-        """Lazy-load the sentence transformer model."""
-        if self._model is None and HAS_SENTENCE_TRANSFORMERS:
-            model_name = finanz_config.FINANZ_EMBEDDING_MODEL
-            self._model = SentenceTransformer(model_name)
-        return self._model
+        """Process-wide model (loaded once, shared across service instances)."""
+        return self._batcher.holder.get()
 
     def _get_chroma_client(self):
         """Lazy-load ChromaDB client."""
@@ -97,7 +483,7 @@ class FinanzEmbeddingService:
                 start = end - overlap
             return chunks
 
-        enc = tiktoken.get_encoding("cl100k_base")
+        enc = _get_tiktoken_encoding("cl100k_base")
         tokens = enc.encode(text)
 
         chunks = []
@@ -152,9 +538,8 @@ class FinanzEmbeddingService:
             if not chunks:
                 return {"chunk_count": 0, "collection_name": None, "skipped": True}
 
-            # Embed chunks
-            model = self._get_model()
-            embeddings = model.encode(chunks, show_progress_bar=False).tolist()
+            # Embed chunks (batched with other documents, cached by content hash)
+            embeddings = self._batcher.embed(chunks, cache_owner=doc.file_hash)
 
             # Store in ChromaDB
             collection = self._get_collection(doc.session_id)
@@ -221,12 +606,13 @@ class FinanzEmbeddingService:
             return []
 
         try:
-            model = self._get_model()
             collection = self._get_collection(session_id)
             if collection is None:
                 return []
 
-            query_embedding = model.encode([query], show_progress_bar=False).tolist()
+            query_embedding = self._batcher.embed(
+                [query], batch=False, cache_owner=session_cache_owner(session_id)
+            )
 
             results = collection.query(
                 query_embeddings=query_embedding,
@@ -3,18 +3,26 @@
 Finanzberatung Document Extraction Service
 
 Extracts text from uploaded documents:
-- PDFs: pdfplumber for text-based extraction
+- PDFs: page-parallel pdfplumber extraction; OCR only for sparse (scanned) pages
 - Images (JPG/PNG/TIFF/HEIC): pytesseract OCR with preprocessing
 - Produces full text + page-level mapping
+- Per-page results cached by file_hash, so reprocessing skips OCR
+- Optional progress callback per finished page (SSE in finanz_tasks)
 
 Gracefully degrades if ML dependencies are not installed.
 """
 
+import json
 import logging
+import multiprocessing
 import os
-from typing import Optional
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Callable, Optional
 
 from app.config.base import FinanzConfig as finanz_config
+from app.services import finanz_page_extraction as page_extraction
 from app.models import get_db_session
 from app.models.finanzberatung import FinanzDocument, DocumentStatus
 
@@ -37,15 +45,98 @@ except ImportError:
     logger.info("pytesseract not available — OCR extraction disabled")
 
 
+ProgressCallback = Callable[[dict], None]
+
+
+class PageTextCache:
+    """
+    Extracted page texts keyed by document file_hash.
+
+    One small JSON file per page (``{file_hash}/{index}.json``) so pages can be
+    stored as soon as they finish, without rewriting the whole document.
+    """
+
+    def __init__(self, base_dir: Optional[str] = None):
+        self._base_dir = base_dir
+
+    @property
+    def base_dir(self) -> str:
+        return self._base_dir or finanz_config.get_page_cache_dir()
+
+    def _dir(self, file_hash: str) -> str:
+        return os.path.join(self.base_dir, file_hash)
+
+    def load(self, file_hash: Optional[str]) -> dict[int, dict]:
+        if not file_hash:
+            return {}
+        directory = self._dir(file_hash)
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return {}
+        pages = {}
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, name), encoding="utf-8") as f:
+                    entry = json.load(f)
+                pages[int(entry["index"])] = entry
+            except (OSError, ValueError, KeyError) as e:
+                logger.debug("Ignoring broken page cache entry %s: %s", name, e)
+        return pages
+
+    def store(self, file_hash: Optional[str], entry: dict) -> None:
+        if not file_hash:
+            return
+        directory = self._dir(file_hash)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{entry['index']:05d}.json")
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("Page cache write failed for %s: %s", file_hash[:12], e)
+
+    def purge(self, file_hash: Optional[str]) -> None:
+        if file_hash:
+            shutil.rmtree(self._dir(file_hash), ignore_errors=True)
+
+
+page_text_cache = PageTextCache()
+
+# Thread mode: one raster semaphore per process, shared by all documents
+_thread_raster_slots: Optional[threading.BoundedSemaphore] = None
+_thread_raster_lock = threading.Lock()
+
+
+def _init_thread_workers() -> None:
+    global _thread_raster_slots
+    with _thread_raster_lock:
+        if _thread_raster_slots is None:
+            _thread_raster_slots = threading.BoundedSemaphore(
+                max(1, finanz_config.FINANZ_OCR_MAX_RASTER_PAGES)
+            )
+            page_extraction.init_worker(_thread_raster_slots)
+
+
 class FinanzExtractionService:
     """Extracts text content from uploaded financial documents."""
 
-    def extract_document(self, document_id: int) -> dict:
+    def __init__(self, cache: Optional[PageTextCache] = None):
+        self.cache = cache or page_text_cache
+
+    def extract_document(self, document_id: int,
+                         progress: Optional[ProgressCallback] = None) -> dict:
         """
         Extract text from a document and update its status.
 
         Args:
             document_id: ID of the FinanzDocument to process
+            progress: Called after every finished page with
+                      {'page', 'pages_done', 'page_count', 'ocr', 'cached'}
 
         Returns:
             Dict with 'text', 'page_count', 'pages' (list of page texts)
@@ -76,7 +167,7 @@ class FinanzExtractionService:
             # Extract based on MIME type
             try:
                 if doc.mime_type == 'application/pdf':
-                    result = self._extract_pdf(file_path)
+                    result = self._extract_pdf(file_path, doc.file_hash, progress)
                 elif doc.mime_type.startswith('image/'):
                     result = self._extract_image(file_path)
                 else:
@@ -115,17 +206,59 @@ class FinanzExtractionService:
         """Resolve the full filesystem path for a document."""
         return finanz_config.get_file_path(doc.session_id, doc.stored_filename)
 
-    def _extract_pdf(self, file_path: str) -> dict:
-        """Extract text from a PDF file using pdfplumber."""
+    def _extract_pdf(self, file_path: str, file_hash: Optional[str] = None,
+                     progress: Optional[ProgressCallback] = None) -> dict:
+        """
+        Extract text from a PDF, page-parallel.
+
+        Cached pages are reused; the rest run in a bounded pool. Pages whose
+        text layer is dense enough skip OCR. Results are reassembled in page
+        order regardless of completion order.
+        """
         if not HAS_PDFPLUMBER:
             logger.warning("pdfplumber not installed — returning empty extraction")
             return {"text": "", "page_count": 0, "pages": []}
 
-        pages = []
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text() or ""
-                pages.append(text)
+        total = page_extraction.page_count(file_path) or 0
+        entries: list[Optional[dict]] = [None] * total
+        done = 0
+
+        def _report(entry: dict, cached: bool):
+            nonlocal done
+            done += 1
+            if progress is not None:
+                try:
+                    progress({
+                        "page": entry["index"] + 1,
+                        "pages_done": done,
+                        "page_count": total,
+                        "ocr": entry.get("ocr", False),
+                        "cached": cached,
+                    })
+                except Exception as e:
+                    logger.debug("Progress callback failed (non-critical): %s", e)
+
+        for index, entry in sorted(self.cache.load(file_hash).items()):
+            if index < total:
+                entries[index] = entry
+                _report(entry, cached=True)
+
+        todo = [i for i in range(total) if entries[i] is None]
+        options = (
+            finanz_config.FINANZ_OCR_MIN_CHARS_PER_PAGE,
+            finanz_config.FINANZ_OCR_DPI,
+            finanz_config.FINANZ_OCR_MAX_PIXELS,
+            finanz_config.FINANZ_OCR_LANG,
+        )
+        for entry in self._run_pages(file_path, todo, options):
+            entries[entry["index"]] = entry
+            self.cache.store(file_hash, entry)
+            _report(entry, cached=False)
+
+        pages = [entry["text"] for entry in entries]
+        ocr_pages = sum(1 for entry in entries if entry.get("ocr"))
+        if ocr_pages:
+            logger.info("PDF %s: OCR on %d of %d pages", os.path.basename(file_path), ocr_pages, total)
 
         full_text = "\n\n".join(pages)
         return {
@@ -134,6 +267,53 @@ class FinanzExtractionService:
             "pages": pages,
         }
 
+    def _run_pages(self, file_path: str, indices: list[int], options: tuple):
+        """Yield page results as they finish (bounded pool, inline for 1 worker/page)."""
+        if not indices:
+            return
+        workers = max(1, min(finanz_config.FINANZ_EXTRACT_WORKERS, len(indices)))
+
+        if workers == 1:
+            _init_thread_workers()
+            try:
+                for index in indices:
+                    yield page_extraction.extract_page(file_path, index, *options)
+            finally:
+                page_extraction.close_pdf()
+            return
+
+        executor = self._make_executor(workers)
+        try:
+            futures = [
+                executor.submit(page_extraction.extract_page, file_path, index, *options)
+                for index in indices
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # On error: drop queued pages instead of finishing the whole document
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _make_executor(self, workers: int):
+        """
+        Process pool by default; threads inside daemonic processes (Celery
+        prefork children may not fork children) or when configured.
+        """
+        raster_pages = max(1, finanz_config.FINANZ_OCR_MAX_RASTER_PAGES)
+        use_processes = (
+            finanz_config.FINANZ_EXTRACT_POOL == "process"
+            and not multiprocessing.current_process().daemon
+        )
+        if use_processes:
+            ctx = multiprocessing.get_context("spawn")
+            return ProcessPoolExecutor(
+                max_workers=workers, mp_context=ctx,
+                initializer=page_extraction.init_worker,
+                initargs=(ctx.BoundedSemaphore(raster_pages),),
+            )
+        _init_thread_workers()
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="finanz-extract")
+
     def _extract_image(self, file_path: str) -> dict:
         """Extract text from an image file using pytesseract OCR."""
         if not HAS_TESSERACT:
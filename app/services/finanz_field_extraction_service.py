@@ -25,7 +25,7 @@ from app.config.base import FinanzConfig as finanz_config
 from app.config.finanz_checklist import (
     CONTRACT_TYPES, get_fields_for_type, FIELD_TYPE_CURRENCY,
     FIELD_TYPE_DATE, FIELD_TYPE_NUMBER, FIELD_TYPE_PERCENT,
-    FIELD_TYPE_TEXT,
+    FIELD_TYPE_TEXT, PRIORITY_MUSS, PRIORITY_SOLL, PRIORITY_KANN,
 )
 from app.models import get_db_session
 from app.models.finanzberatung import (
@@ -95,7 +95,7 @@ class FinanzFieldExtractionService:
 
             try:
                 if use_llm:
-                    results = self._extract_llm(type_key, text, pages)
+                    results = self._extract_llm(type_key, text, pages, cache_owner=doc.file_hash)
                 else:
                     results = self._extract_patterns(type_key, text, pages)
             except Exception as e:
@@ -393,9 +393,16 @@ class FinanzFieldExtractionService:
     # -----------------------------------------------------------------------
 
     def _extract_llm(
-        self, type_key: str, text: str, pages: list[str]
+        self, type_key: str, text: str, pages: list[str], cache_owner: Optional[str] = None
     ) -> list[dict]:
-        """Extract fields using LLM with structured JSON output."""
+        """
+        Extract fields using LLM with structured JSON output.
+
+        One prompt per document. Only if that answer is missing or unusable
+        the fields are retried per priority group (MUSS / SOLL / KANN) as one
+        batch; groups that still fail fall back to patterns. Cached answers
+        are tagged with ``cache_owner`` (the document's file hash).
+        """
         from app.services.llm_client import llm_client
 
         fields = get_fields_for_type(type_key)
@@ -403,16 +410,73 @@ class FinanzFieldExtractionService:
             return []
 
         ct = CONTRACT_TYPES.get(type_key, {})
-        field_desc = "\n".join(
-            f"- {f['name']}: {f['label']} (Typ: {f['type']}, Prioritaet: {f['priority']})"
-            for f in fields
-        )
+        type_label = ct.get('label', type_key)
 
         # Truncate text
         max_chars = 12000
         truncated = text[:max_chars] if len(text) > max_chars else text
 
-        prompt = f"""Extrahiere die folgenden Felder aus dem Dokument (Vertragsart: {ct.get('label', type_key)}).
+        result = llm_client.chat_completion(
+            prompt=self._build_prompt(type_label, fields, truncated),
+            max_tokens=2000,
+            temperature=0.1,
+            timeout=finanz_config.FINANZ_LLM_TIMEOUT_EXTRACTION,
+            cache_owner=cache_owner,
+        )
+        if result is not None:
+            return self._validate_llm_fields(result.get("fields", []), fields, pages)
+
+        groups = self._field_groups(fields)
+        if len(groups) < 2:
+            logger.warning("LLM field extraction returned no result, falling back to patterns")
+            return self._extract_patterns(type_key, text, pages)
+
+        logger.warning("LLM field extraction returned no result, retrying per field group")
+        responses = llm_client.chat_completions([
+            {
+                "prompt": self._build_prompt(type_label, group, truncated),
+                "max_tokens": 2000,
+                "temperature": 0.1,
+                "timeout": finanz_config.FINANZ_LLM_TIMEOUT_EXTRACTION,
+                "cache_owner": cache_owner,
+            }
+            for group in groups
+        ])
+
+        validated = []
+        patterns = None
+        for group, group_result in zip(groups, responses):
+            if group_result is None:
+                logger.warning("LLM field group returned no result, falling back to patterns")
+                if patterns is None:
+                    patterns = self._extract_patterns(type_key, text, pages)
+                names = {f["name"] for f in group}
+                validated.extend(item for item in patterns if item["name"] in names)
+                continue
+            validated.extend(self._validate_llm_fields(group_result.get("fields", []), group, pages))
+
+        return validated
+
+    @staticmethod
+    def _field_groups(fields: list[dict]) -> list[list[dict]]:
+        """Split field definitions by priority (checklist order within a group)."""
+        order = [PRIORITY_MUSS, PRIORITY_SOLL, PRIORITY_KANN]
+        groups: dict[str, list[dict]] = {}
+        for field_def in fields:
+            groups.setdefault(field_def.get("priority"), []).append(field_def)
+        return [
+            groups[priority]
+            for priority in sorted(groups, key=lambda p: order.index(p) if p in order else len(order))
+        ]
+
+    @staticmethod
+    def _build_prompt(type_label: str, fields: list[dict], truncated: str) -> str:
+        field_desc = "\n".join(
+            f"- {f['name']}: {f['label']} (Typ: {f['type']}, Prioritaet: {f['priority']})"
+            for f in fields
+        )
+
+        return f"""Extrahiere die folgenden Felder aus dem Dokument (Vertragsart: {type_label}).
 
 Gesuchte Felder:
 {field_desc}
@@ -434,20 +498,10 @@ Regeln:
 - Waehrungsbetraege als Dezimalzahl (z.B. "234.56")
 - Daten als DD.MM.YYYY"""
 
-        result = llm_client.chat_completion(
-            prompt=prompt,
-            max_tokens=2000,
-            temperature=0.1,
-            timeout=finanz_config.FINANZ_LLM_TIMEOUT_EXTRACTION,
-        )
-
-        if result is None:
-            logger.warning("LLM field extraction returned no result, falling back to patterns")
-            return self._extract_patterns(type_key, text, pages)
-
-        extracted = result.get("fields", [])
-
-        # Validate and enrich with page numbers
+    def _validate_llm_fields(
+        self, extracted: list[dict], fields: list[dict], pages: list[str]
+    ) -> list[dict]:
+        """Keep only requested fields, enrich with type and page numbers."""
         valid_names = {f["name"] for f in fields}
         validated = []
         for item in extracted:
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Finanzberatung Page-Level PDF Extraction
+
+Runs inside the extraction worker pool (process or thread). One call handles
+one PDF page:
+- Text layer via pdfplumber
+- OCR via pytesseract only if the text layer is too sparse (scanned pages)
+- Rasterization bounded by a shared semaphore and a per-page pixel cap
+
+Deliberately free of Flask/DB imports so spawned worker processes start fast.
+"""
+
+import os
+import threading
+from typing import Optional
+
+# Optional ML imports
+try:
+    import pdfplumber
+    HAS_PDFPLUMBER = True
+except ImportError:
+    HAS_PDFPLUMBER = False
+
+try:
+    import pytesseract
+    from PIL import ImageEnhance, ImageFilter
+    HAS_TESSERACT = True
+except ImportError:
+    HAS_TESSERACT = False
+
+# A4 in PDF points (1/72 inch) — text density is normalized to this size
+A4_AREA = 595.0 * 842.0
+
+# Set per worker by init_worker(); limits concurrently rasterized pages
+_raster_slots = None
+# Open PDF per worker thread (pages of one document hit the same worker repeatedly)
+_local = threading.local()
+
+
+def init_worker(raster_slots) -> None:
+    """Pool initializer: shared raster semaphore, single-threaded tesseract."""
+    global _raster_slots
+    _raster_slots = raster_slots
+    # Parallelism comes from the pool; OpenMP threads per tesseract would oversubscribe
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def text_density(text: str, width: float, height: float) -> float:
+    """Alphanumeric characters per page, normalized to A4."""
+    chars = sum(1 for c in text if c.isalnum())
+    area = (width or 0) * (height or 0)
+    if area <= 0:
+        return float(chars)
+    return chars * A4_AREA / area
+
+
+def raster_resolution(width: float, height: float, dpi: int, max_pixels: int) -> int:
+    """Largest resolution <= dpi whose raster stays within max_pixels."""
+    pixels = (width / 72.0 * dpi) * (height / 72.0 * dpi)
+    if pixels <= max_pixels or pixels <= 0:
+        return dpi
+    return max(72, int(dpi * (max_pixels / pixels) ** 0.5))
+
+
+def _open_pdf(file_path: str):
+    cached = getattr(_local, "pdf", None)
+    if cached is not None and cached[0] == file_path:
+        return cached[1]
+    if cached is not None:
+        cached[1].close()
+    pdf = pdfplumber.open(file_path)
+    _local.pdf = (file_path, pdf)
+    return pdf
+
+
+def close_pdf() -> None:
+    """Close the worker's cached PDF handle (end of document)."""
+    cached = getattr(_local, "pdf", None)
+    if cached is not None:
+        cached[1].close()
+        _local.pdf = None
+
+
+def _ocr_page(page, dpi: int, max_pixels: int, lang: str) -> str:
+    resolution = raster_resolution(page.width, page.height, dpi, max_pixels)
+    if _raster_slots is not None:
+        _raster_slots.acquire()
+    try:
+        img = page.to_image(resolution=resolution).original
+        # Same preprocessing as single-image uploads
+        img = img.convert('L')
+        img = ImageEnhance.Contrast(img).enhance(2.0)
+        img = img.filter(ImageFilter.SHARPEN)
+        text = pytesseract.image_to_string(img, lang=lang)
+        del img
+        return text
+    finally:
+        if _raster_slots is not None:
+            _raster_slots.release()
+
+
+def extract_page(file_path: str, index: int, min_density: float, dpi: int,
+                 max_pixels: int, lang: str = "deu") -> dict:
+    """
+    Extract one page; OCR only when the text layer is below ``min_density``.
+
+    Returns:
+        Dict with 'index', 'text', 'ocr' (bool), 'density'
+    """
+    pdf = _open_pdf(file_path)
+    page = pdf.pages[index]
+    try:
+        text = page.extract_text() or ""
+        density = text_density(text, page.width, page.height)
+        ocr = False
+        if density < min_density and HAS_TESSERACT:
+            ocr_text = _ocr_page(page, dpi, max_pixels, lang)
+            # Keep whichever yields more content (mixed text/scan pages)
+            if text_density(ocr_text, page.width, page.height) > density:
+                text = ocr_text
+            ocr = True
+        return {"index": index, "text": text, "ocr": ocr, "density": round(density, 1)}
+    finally:
+        # pdfplumber caches parsed objects per page; drop them
+        page.close()
+
+
+def page_count(file_path: str) -> Optional[int]:
+    if not HAS_PDFPLUMBER:
+        return None
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
@@ -26,6 +26,7 @@ from app.models.finanzberatung import (
     FinanzSession, FinanzDocument, FinanzExtractedData, FinanzScorecard,
     ScorecardCategory, TrafficLight, DocumentStatus,
 )
+from app.services.llm_client import session_cache_owner
 
 logger = logging.getLogger(__name__)
 
@@ -62,7 +63,7 @@ class FinanzScorecardService:
             # Generate per-category scorecards
             results = []
             for cat in ScorecardCategory:
-                result = self._evaluate_category(cat, contracts)
+                result = self._evaluate_category(cat, contracts, cache_owner=session_cache_owner(session_id))
                 results.append(result)
 
             # Overall score
@@ -135,7 +136,9 @@ class FinanzScorecardService:
 
         return contracts
 
-    def _evaluate_category(self, category: ScorecardCategory, contracts: dict) -> dict:
+    def _evaluate_category(
+        self, category: ScorecardCategory, contracts: dict, cache_owner: Optional[str] = None
+    ) -> dict:
         """Evaluate a single scorecard category (rule-based, with optional LLM enhancement)."""
         # Always compute rule-based result as baseline + fallback
         rule_result = self._eval_rule_based(category, contracts)
@@ -144,7 +147,7 @@ class FinanzScorecardService:
             return rule_result
 
         try:
-            return self._assess_llm(category, contracts, rule_result)
+            return self._assess_llm(category, contracts, rule_result, cache_owner=cache_owner)
         except Exception as e:
             logger.warning("LLM scoring failed for %s, using rules: %s", category.value, e)
             return rule_result
@@ -413,6 +416,7 @@ class FinanzScorecardService:
         category: ScorecardCategory,
         contracts: dict,
         rule_result: dict,
+        cache_owner: Optional[str] = None,
     ) -> dict:
         """
         Generate a qualitative LLM assessment for one scorecard category.
@@ -450,6 +454,7 @@ Regeln:
             max_tokens=500,
             temperature=0.2,
             timeout=finanz_config.FINANZ_LLM_TIMEOUT,
+            cache_owner=cache_owner,
         )
 
         if result is None:
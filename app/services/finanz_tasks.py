@@ -6,9 +6,12 @@ All tasks use @shared_task to avoid circular imports with the app factory.
 Tasks are automatically discovered when celery_worker.py creates the Flask app.
 
 Pipeline: extract → classify → [embed, extract_fields] (parallel) → update_completeness
+
+Batch pipeline (several documents of a session): all extractions in parallel,
+then one classification batch, then per document the embed/extract_fields step.
 """
 import logging
-from celery import shared_task, chain, group
+from celery import shared_task, chain, chord, group
 
 logger = logging.getLogger(__name__)
 
@@ -25,23 +28,31 @@ def health_check_task():
 # ---------------------------------------------------------------------------
 
 @shared_task(bind=True, max_retries=2, default_retry_delay=30)
-def extract_document_task(self, document_id: int):
+def extract_document_task(self, document_id: int, tolerate_failure: bool = False):
     """
     Extract text from an uploaded document (PDF or image).
 
     Status: UPLOADED → EXTRACTING → EXTRACTED (or ERROR)
+
+    With tolerate_failure (chord header of the batch pipeline) the last failed
+    attempt returns an error result instead of raising, so one broken
+    document does not stop the batch.
     """
     from app.services.finanz_extraction_service import FinanzExtractionService
 
     logger.info("Starting extraction for document %s", document_id)
     try:
         service = FinanzExtractionService()
-        result = service.extract_document(document_id)
+        result = service.extract_document(
+            document_id, progress=_page_progress_publisher(document_id)
+        )
         _publish_status(document_id, 'extracted', result.get('page_count', 0))
         return {"document_id": document_id, "status": "extracted", **result}
     except Exception as exc:
         logger.error("Extraction task failed for doc %s: %s", document_id, exc, exc_info=True)
         _publish_status(document_id, 'error', str(exc))
+        if tolerate_failure and self.request.retries >= self.max_retries:
+            return {"document_id": document_id, "status": "error", "error": str(exc)}
         raise self.retry(exc=exc)
 
 
@@ -70,6 +81,56 @@ def classify_document_task(self, prev_result, document_id: int = None):
         raise self.retry(exc=exc)
 
 
+@shared_task(bind=True, max_retries=2, default_retry_delay=30)
+def classify_documents_task(self, prev_results, document_ids: list = None):
+    """
+    Classify all successfully extracted documents of a batch in one LLM batch.
+
+    Status per document: EXTRACTED → CLASSIFYING → CLASSIFIED (or ERROR)
+    """
+    from app.services.finanz_classification_service import FinanzClassificationService
+
+    extracted = {
+        r.get("document_id") for r in (prev_results or [])
+        if isinstance(r, dict) and r.get("status") == "extracted"
+    }
+    doc_ids = [i for i in (document_ids or []) if i in extracted]
+    if not doc_ids:
+        return []
+
+    logger.info("Starting batch classification for documents %s", doc_ids)
+    try:
+        service = FinanzClassificationService()
+        results = service.classify_documents(doc_ids)
+    except Exception as exc:
+        logger.error("Batch classification failed for docs %s: %s", doc_ids, exc, exc_info=True)
+        for doc_id in doc_ids:
+            _publish_status(doc_id, 'error', str(exc))
+        raise self.retry(exc=exc)
+
+    classified = []
+    for doc_id in doc_ids:
+        result = results[doc_id]
+        _publish_status(doc_id, 'classified', result.get('type_label', ''))
+        classified.append({"document_id": doc_id, "status": "classified", **result})
+    return classified
+
+
+@shared_task
+def analyze_classified_documents_task(classified, session_id: int):
+    """Fan out embedding and field extraction for each classified document of a batch."""
+    for result in classified or []:
+        doc_id = result["document_id"]
+        chain(
+            group(
+                embed_document_task.si(result, document_id=doc_id),
+                extract_fields_task.si(result, document_id=doc_id),
+            ),
+            update_session_completeness.s(session_id=session_id),
+        ).apply_async()
+    return {"session_id": session_id, "queued": len(classified or [])}
+
+
 @shared_task(bind=True, max_retries=2, default_retry_delay=30)
 def extract_fields_task(self, prev_result, document_id: int = None):
     """
@@ -163,6 +224,32 @@ def process_document_pipeline(document_id: int, session_id: int):
     return result
 
 
+def process_documents_pipeline(document_ids: list[int], session_id: int):
+    """
+    Launch the processing pipeline for several documents of one session.
+
+    Pipeline: [extract, ...] → classify (one LLM batch) → per document [embed, extract_fields]
+    → update_completeness. A single document uses process_document_pipeline.
+    """
+    if len(document_ids) == 1:
+        return process_document_pipeline(document_ids[0], session_id)
+
+    pipeline = chord(
+        group(extract_document_task.s(doc_id, tolerate_failure=True) for doc_id in document_ids),
+        chain(
+            classify_documents_task.s(document_ids=list(document_ids)),
+            analyze_classified_documents_task.s(session_id=session_id),
+        ),
+    )
+
+    result = pipeline.apply_async()
+    logger.info(
+        "Batch pipeline started for %d documents (session %s), task_id=%s",
+        len(document_ids), session_id, result.id,
+    )
+    return result
+
+
 @shared_task
 def generate_scorecard_task(session_id: int):
     """Generate scorecards for a session after all documents are analyzed."""
@@ -209,6 +296,34 @@ def _publish_status(document_id: int, status: str, detail=None):
         logger.debug("SSE publish failed (non-critical): %s", e)
 
 
+def _page_progress_publisher(document_id: int):
+    """Progress callback for extraction: one 'document_progress' SSE event per page."""
+    session_id = None
+
+    def publish(event: dict):
+        nonlocal session_id
+        if session_id is None:
+            from app.models import get_db_session
+            from app.models.finanzberatung import FinanzDocument
+
+            db = get_db_session()
+            try:
+                row = db.query(FinanzDocument.session_id).filter(
+                    FinanzDocument.id == document_id
+                ).first()
+            finally:
+                db.close()
+            if row is None:
+                return
+            session_id = row[0]
+        _publish_session_event(session_id, 'document_progress', {
+            'document_id': document_id,
+            **event,
+        })
+
+    return publish
+
+
 def _publish_session_event(session_id: int, event_type: str, data: dict):
     """Publish an event to the session's SSE channel."""
     try:
@@ -6,7 +6,10 @@ Provides business logic for the customer document upload flow:
 - Crypto-secure token generation with configurable TTL
 - QR code generation (base64 PNG) from upload URL
 - File validation via magic bytes (python-magic), not extensions
-- File storage with UUID filenames and SHA-256 hashing
+- Streaming storage: fixed-size blocks into a temp file in the session
+  directory, SHA-256 and magic bytes computed in the same pass, size limit
+  enforced while reading, atomic rename to a UUID filename
+- Resumable chunked uploads with per-chunk SHA-256 checksums
 - Deduplication within a session by file hash
 - Token lifecycle (activate, deactivate, followup eligibility)
 
@@ -18,10 +21,14 @@ import hashlib
 import io
 import logging
 import os
+import re
 import secrets
+import shutil
+import tempfile
+import time
 import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
 import magic
 import qrcode
@@ -35,6 +42,8 @@ from app.models.finanzberatung import (
     DocumentStatus,
     TokenType,
 )
+from app.utils.file_lock import file_lock
+from app.utils.json_utils import atomic_read_json, atomic_write_json
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +60,13 @@ _MIME_TO_EXT = {
 # Allowed MIME types for upload
 _ALLOWED_MIMES = set(_MIME_TO_EXT.keys())
 
+# Bytes used for magic byte detection
+_SNIFF_BYTES = 2048
+
+# Unfinished resumable uploads live in {upload_dir}/.partial/{upload_id}.part/.json
+_PARTIAL_DIR = '.partial'
+_UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
 # Token type to TTL config mapping
 _TTL_MAP = {
     TokenType.T1: lambda: finanz_config.FINANZ_TOKEN_TTL_T1,
@@ -59,6 +75,69 @@ _TTL_MAP = {
 }
 
 
+class UploadRejected(Exception):
+    """Upload rejected (type, size, checksum, offset); message is German for end-user display."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def _max_file_bytes() -> int:
+    return finanz_config.FINANZ_MAX_FILE_SIZE_MB * 1024 * 1024
+
+
+def _too_large() -> UploadRejected:
+    return UploadRejected(
+        f'Datei zu gross (max. {finanz_config.FINANZ_MAX_FILE_SIZE_MB} MB)', 413
+    )
+
+
+def _sniff_mime(header: bytes) -> str:
+    """Detect the MIME type from the first bytes and reject disallowed types."""
+    detected_mime = magic.from_buffer(header, mime=True)
+    if detected_mime not in _ALLOWED_MIMES:
+        raise UploadRejected(
+            f'Dateityp nicht erlaubt: {detected_mime}. '
+            f'Erlaubt: PDF, JPG, PNG, TIFF, HEIF/HEIC'
+        )
+    return detected_mime
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+class _ContentProbe:
+    """SHA-256 and magic byte detection, fed block by block while the file streams."""
+
+    def __init__(self):
+        self.sha256 = hashlib.sha256()
+        self.header = b''
+        self.mime_type = None
+        self.size = 0
+
+    def update(self, block: bytes) -> None:
+        self.size += len(block)
+        self.sha256.update(block)
+        if self.mime_type is None:
+            self.header += block[:_SNIFF_BYTES - len(self.header)]
+            if len(self.header) >= _SNIFF_BYTES:
+                self.mime_type = _sniff_mime(self.header)
+
+    def finish(self) -> Tuple[str, str]:
+        """Return (sha256_hex, mime_type); files shorter than the sniff window are checked here."""
+        if not self.size:
+            raise UploadRejected('Leere Datei')
+        if self.mime_type is None:
+            self.mime_type = _sniff_mime(self.header)
+        return self.sha256.hexdigest(), self.mime_type
+
+
 class FinanzUploadService:
     """Service for managing document upload tokens, validation, and storage."""
 
@@ -257,38 +336,93 @@ class FinanzUploadService:
         session_id: int,
         token_id: int,
         original_filename: str,
-        mime_type: str,
+        mime_type: Optional[str] = None,
     ) -> FinanzDocument:
         """
-        Store an uploaded file with UUID filename and SHA-256 hash.
+        Stream an uploaded file to disk with UUID filename and SHA-256 hash.
 
-        Creates the storage directory if needed. Checks for duplicate
-        files within the same session by comparing SHA-256 hashes.
-        Increments the token's upload_count.
+        The file is read in FINANZ_UPLOAD_BUFFER_KB blocks into a temp file
+        inside the session directory. Hash, magic byte detection and the
+        size limit are applied in the same pass, so the upload is never
+        held in memory and oversized or disallowed files are rejected as
+        soon as the offending bytes arrive. The temp file is renamed into
+        place only after the duplicate check. Increments the token's
+        upload_count.
 
         Args:
             file_storage: Werkzeug FileStorage object
             session_id: The session this document belongs to
             token_id: The token used for this upload
             original_filename: The original filename from the client
-            mime_type: Detected MIME type from validate_file()
+            mime_type: Ignored; the type is detected from the streamed content
 
         Returns:
             The created FinanzDocument record
 
         Raises:
+            UploadRejected: If the file is empty, too large or of a disallowed type
             ValueError: If a duplicate file is detected in the session
         """
-        db = get_db_session()
+        upload_dir = finanz_config.get_upload_dir(session_id)
+        tmp_path, file_hash, file_size, detected_mime = self._stream_to_temp(
+            file_storage.stream, upload_dir
+        )
         try:
-            # Read file content
-            file_content = file_storage.read()
-            file_storage.seek(0)
-            file_size = len(file_content)
+            return self._commit_document(
+                tmp_path, session_id, token_id, original_filename,
+                detected_mime, file_hash, file_size,
+            )
+        except BaseException:
+            _remove_quietly(tmp_path)
+            raise
 
-            # Compute SHA-256 hash
-            file_hash = hashlib.sha256(file_content).hexdigest()
+    def _stream_to_temp(self, stream, upload_dir: str) -> Tuple[str, str, int, str]:
+        """
+        Copy a stream block by block into a temp file in upload_dir.
+
+        Returns:
+            Tuple of (temp_path, sha256_hex, size, mime_type)
+        """
+        buffer_size = finanz_config.FINANZ_UPLOAD_BUFFER_KB * 1024
+        max_bytes = _max_file_bytes()
+        os.makedirs(upload_dir, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=upload_dir, prefix='.upload-', suffix='.tmp')
+        probe = _ContentProbe()
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    block = stream.read(buffer_size)
+                    if not block:
+                        break
+                    if probe.size + len(block) > max_bytes:
+                        raise _too_large()
+                    probe.update(block)
+                    out.write(block)
+            file_hash, mime_type = probe.finish()
+        except BaseException:
+            _remove_quietly(tmp_path)
+            raise
+        return tmp_path, file_hash, probe.size, mime_type
 
+    def _commit_document(
+        self,
+        source_path: str,
+        session_id: int,
+        token_id: int,
+        original_filename: str,
+        mime_type: str,
+        file_hash: str,
+        file_size: int,
+    ) -> FinanzDocument:
+        """
+        Duplicate check, atomic rename of source_path to its UUID filename
+        and the FinanzDocument record. source_path must be in the session
+        directory; on failure it is left in place for the caller.
+        """
+        db = get_db_session()
+        file_path = None
+        try:
             # Check for duplicate in same session
             existing = db.query(FinanzDocument).filter(
                 FinanzDocument.session_id == session_id,
@@ -304,15 +438,9 @@ class FinanzUploadService:
             ext = _MIME_TO_EXT.get(mime_type, 'bin')
             stored_filename = f"{uuid.uuid4()}.{ext}"
 
-            # Build storage path: {PERSIST_BASE}/{FINANZ_UPLOAD_DIR}/{session_id}/
-            upload_dir = finanz_config.get_upload_dir(session_id)
-            os.makedirs(upload_dir, exist_ok=True)
-
-            file_path = os.path.join(upload_dir, stored_filename)
-
-            # Write file to disk
-            with open(file_path, 'wb') as f:
-                f.write(file_content)
+            # {PERSIST_BASE}/{FINANZ_UPLOAD_DIR}/{session_id}/ (same filesystem as source_path)
+            file_path = os.path.join(finanz_config.get_upload_dir(session_id), stored_filename)
+            os.replace(source_path, file_path)
 
             # Create document record
             document = FinanzDocument(
@@ -348,6 +476,8 @@ class FinanzUploadService:
             raise
         except Exception as e:
             db.rollback()
+            if file_path is not None and os.path.exists(file_path):
+                os.replace(file_path, source_path)
             logger.error(
                 "Failed to store file for session %s: %s",
                 session_id, e, exc_info=True,
@@ -356,6 +486,310 @@ class FinanzUploadService:
         finally:
             db.close()
 
+    # ------------------------------------------------------------------
+    # Resumable chunked uploads
+    # ------------------------------------------------------------------
+
+    def _partial_paths(self, session_id: int, upload_id: str) -> Tuple[str, str]:
+        """Return (part_path, manifest_path) for a resumable upload."""
+        if not _UPLOAD_ID_RE.match(upload_id or ''):
+            raise UploadRejected('Upload nicht gefunden', 404)
+        base = os.path.join(finanz_config.get_upload_dir(session_id), _PARTIAL_DIR, upload_id)
+        return f"{base}.part", f"{base}.json"
+
+    def _load_manifest(self, manifest_path: str) -> dict:
+        manifest = atomic_read_json(manifest_path)
+        if manifest is None:
+            raise UploadRejected('Upload nicht gefunden', 404)
+        return manifest
+
+    def _discard_partial(self, part_path: str, manifest_path: str) -> None:
+        # inkl. der .lock-Dateien von file_lock, sonst bleiben sie pro Upload liegen
+        for path in (part_path, manifest_path):
+            _remove_quietly(path)
+            _remove_quietly(f"{path}.lock")
+
+    def _sweep_partials(self, session_id: int) -> int:
+        """
+        Remove unfinished uploads of a session idle for longer than FINANZ_UPLOAD_PARTIAL_TTL,
+        plus orphaned store_file() temp files of the same age.
+
+        Returns:
+            Number of removed uploads/temp files
+        """
+        upload_dir = finanz_config.get_upload_dir(session_id)
+        partial_dir = os.path.join(upload_dir, _PARTIAL_DIR)
+        cutoff = time.time() - finanz_config.FINANZ_UPLOAD_PARTIAL_TTL
+        removed = 0
+        try:
+            names = os.listdir(partial_dir)
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            manifest_path = os.path.join(partial_dir, name)
+            try:
+                if os.path.getmtime(manifest_path) < cutoff:
+                    self._discard_partial(manifest_path[:-len('.json')] + '.part', manifest_path)
+                    removed += 1
+                    logger.info("Stale partial upload removed: session=%s, id=%s", session_id, name[:-5])
+            except OSError:
+                pass
+
+        for tmp_path in self._temp_files(upload_dir):
+            try:
+                if os.path.getmtime(tmp_path) < cutoff:
+                    _remove_quietly(tmp_path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    @staticmethod
+    def _temp_files(upload_dir: str) -> List[str]:
+        """store_file() temp files in a session directory (left behind by crashed workers)."""
+        try:
+            names = os.listdir(upload_dir)
+        except OSError:
+            return []
+        return [
+            os.path.join(upload_dir, name) for name in names
+            if name.startswith('.upload-') and name.endswith('.tmp')
+        ]
+
+    def sweep_all_partials(self) -> int:
+        """
+        TTL sweep across all sessions (startup-maintenance timer).
+
+        Unfinished uploads of finished or abandoned sessions are otherwise
+        only swept when the same session starts another resumable upload.
+
+        Returns:
+            Number of removed uploads/temp files
+        """
+        base_dir = os.path.join(Config.PERSIST_BASE, finanz_config.FINANZ_UPLOAD_DIR)
+        try:
+            names = os.listdir(base_dir)
+        except FileNotFoundError:
+            return 0
+        removed = 0
+        for name in names:
+            if name.isdigit():
+                removed += self._sweep_partials(int(name))
+        if removed:
+            logger.info("Partial upload sweep: %d stale files removed", removed)
+        return removed
+
+    def purge_session_partials(self, session_id: int) -> int:
+        """
+        Remove all unfinished uploads and temp files of a session (DSGVO deletion).
+
+        Returns:
+            Number of removed uploads/temp files
+        """
+        upload_dir = finanz_config.get_upload_dir(session_id)
+        partial_dir = os.path.join(upload_dir, _PARTIAL_DIR)
+        removed = 0
+        try:
+            removed += sum(1 for name in os.listdir(partial_dir) if name.endswith('.json'))
+        except OSError:
+            pass
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        _remove_quietly(f"{partial_dir}.lock")
+        for tmp_path in self._temp_files(upload_dir):
+            _remove_quietly(tmp_path)
+            removed += 1
+        return removed
+
+    def _open_partials(self, session_id: int, token_id: int) -> int:
+        """Number of unfinished uploads of a token in a session."""
+        partial_dir = os.path.join(finanz_config.get_upload_dir(session_id), _PARTIAL_DIR)
+        try:
+            names = os.listdir(partial_dir)
+        except FileNotFoundError:
+            return 0
+        count = 0
+        for name in names:
+            if name.endswith('.json'):
+                manifest = atomic_read_json(os.path.join(partial_dir, name)) or {}
+                if manifest.get('token_id') == token_id:
+                    count += 1
+        return count
+
+    def start_resumable_upload(
+        self,
+        session_id: int,
+        token_id: int,
+        original_filename: str,
+        total_size: int,
+    ) -> dict:
+        """
+        Begin a resumable upload for a file of total_size bytes.
+
+        Returns:
+            Dict with upload_id, received (0), total_size and the maximum chunk_size
+
+        Raises:
+            UploadRejected: If the announced size is empty or above the limit,
+                or the token already has FINANZ_UPLOAD_MAX_PARTIALS_PER_TOKEN open uploads (429)
+        """
+        if total_size <= 0:
+            raise UploadRejected('Leere Datei')
+        if total_size > _max_file_bytes():
+            raise _too_large()
+
+        self._sweep_partials(session_id)
+
+        upload_id = uuid.uuid4().hex
+        part_path, manifest_path = self._partial_paths(session_id, upload_id)
+        partial_dir = os.path.dirname(part_path)
+        os.makedirs(partial_dir, exist_ok=True)
+        # Zählen und Anlegen unter einem Lock, sonst umgehen parallele Starts das Limit
+        with file_lock(partial_dir):
+            if self._open_partials(session_id, token_id) >= finanz_config.FINANZ_UPLOAD_MAX_PARTIALS_PER_TOKEN:
+                raise UploadRejected('Zu viele offene Uploads, bitte laufende Uploads abschliessen', 429)
+            open(part_path, 'wb').close()
+            if not atomic_write_json(manifest_path, {
+                'token_id': token_id,
+                'original_filename': original_filename,
+                'total_size': total_size,
+                'started_at': datetime.now(timezone.utc).isoformat(),
+            }):
+                _remove_quietly(part_path)
+                raise IOError(f"Could not write upload manifest {manifest_path}")
+
+        logger.info(
+            "Resumable upload started: session=%s, id=%s, size=%d",
+            session_id, upload_id, total_size,
+        )
+        return {
+            'upload_id': upload_id,
+            'received': 0,
+            'total_size': total_size,
+            'chunk_size': finanz_config.FINANZ_UPLOAD_CHUNK_MAX_MB * 1024 * 1024,
+        }
+
+    def get_resumable_upload(self, session_id: int, upload_id: str) -> dict:
+        """Return the upload's progress; clients resume from ``received``."""
+        part_path, manifest_path = self._partial_paths(session_id, upload_id)
+        manifest = self._load_manifest(manifest_path)
+        return {
+            'upload_id': upload_id,
+            'received': os.path.getsize(part_path),
+            'total_size': manifest['total_size'],
+        }
+
+    def append_chunk(
+        self,
+        session_id: int,
+        upload_id: str,
+        offset: int,
+        stream,
+        chunk_sha256: Optional[str] = None,
+    ) -> dict:
+        """
+        Append one chunk, streamed from ``stream``, at ``offset``.
+
+        The chunk is written as it arrives and rolled back (truncated) if it
+        exceeds the chunk or file size, fails its SHA-256 checksum or, for
+        the first chunk, has a disallowed type.
+
+        Raises:
+            UploadRejected: 404 unknown upload, 409 offset mismatch (resume from
+                ``received``), 413 too large, 400 checksum/type/empty chunk
+        """
+        part_path, manifest_path = self._partial_paths(session_id, upload_id)
+        manifest = self._load_manifest(manifest_path)
+        buffer_size = finanz_config.FINANZ_UPLOAD_BUFFER_KB * 1024
+
+        with file_lock(part_path):
+            received = os.path.getsize(part_path)
+            if offset != received:
+                raise UploadRejected(
+                    f'Falscher Offset {offset}, bereits empfangen: {received} Bytes', 409
+                )
+            limit = min(
+                finanz_config.FINANZ_UPLOAD_CHUNK_MAX_MB * 1024 * 1024,
+                manifest['total_size'] - received,
+            )
+
+            chunk_hash = hashlib.sha256()
+            probe = _ContentProbe() if received == 0 else None
+            written = 0
+            try:
+                with open(part_path, 'ab') as out:
+                    while True:
+                        block = stream.read(buffer_size)
+                        if not block:
+                            break
+                        written += len(block)
+                        if written > limit:
+                            raise UploadRejected('Chunk zu gross', 413)
+                        chunk_hash.update(block)
+                        if probe is not None:
+                            probe.update(block)
+                        out.write(block)
+                if not written:
+                    raise UploadRejected('Leerer Chunk')
+                if probe is not None:
+                    probe.finish()
+                if chunk_sha256 and chunk_hash.hexdigest() != chunk_sha256.lower():
+                    raise UploadRejected('Pruefsumme des Chunks stimmt nicht')
+            except BaseException:
+                with open(part_path, 'r+b') as f:
+                    f.truncate(received)
+                raise
+
+        # Aktivität verlängert die Aufbewahrung
+        os.utime(manifest_path)
+        return {
+            'upload_id': upload_id,
+            'received': received + written,
+            'total_size': manifest['total_size'],
+        }
+
+    def finish_resumable_upload(self, session_id: int, upload_id: str) -> FinanzDocument:
+        """
+        Complete a resumable upload and store it like store_file().
+
+        The file hash is computed in one streaming pass over the assembled
+        part file (hash state cannot be carried across requests/workers).
+
+        Raises:
+            UploadRejected: If the upload is unknown, incomplete or of a disallowed type
+            ValueError: If a duplicate file is detected in the session
+        """
+        part_path, manifest_path = self._partial_paths(session_id, upload_id)
+        manifest = self._load_manifest(manifest_path)
+        buffer_size = finanz_config.FINANZ_UPLOAD_BUFFER_KB * 1024
+
+        with file_lock(part_path):
+            received = os.path.getsize(part_path)
+            if received != manifest['total_size']:
+                raise UploadRejected(
+                    f'Upload unvollstaendig: {received} von {manifest["total_size"]} Bytes', 409
+                )
+
+            probe = _ContentProbe()
+            try:
+                with open(part_path, 'rb') as f:
+                    for block in iter(lambda: f.read(buffer_size), b''):
+                        probe.update(block)
+                file_hash, mime_type = probe.finish()
+
+                document = self._commit_document(
+                    part_path, session_id, manifest['token_id'], manifest['original_filename'],
+                    mime_type, file_hash, received,
+                )
+            except (UploadRejected, ValueError):
+                # Endgültig abgelehnt: Teil-Upload verwerfen
+                self._discard_partial(part_path, manifest_path)
+                raise
+
+        self._discard_partial(part_path, manifest_path)
+        return document
+
     def get_active_token(
         self, session_id: int
     ) -> Optional[FinanzUploadToken]:
@@ -63,50 +63,82 @@ class HubSpotQueueService:
         Returns:
             Das erstellte Queue-Item
         """
+        return self.add_many_to_queue([{
+            'outcome_data': outcome_data,
+            'deal_info': deal_info,
+            'suggested_action': suggested_action,
+            'stage': stage,
+            'note': note,
+        }])[0]
+
+    def add_many_to_queue(self, entries: List[Dict[str, Any]], strict: bool = False) -> List[Dict[str, Any]]:
+        """Fuege mehrere Items mit einem Load/Save ein (z.B. Webhook-Batch).
+
+        Args:
+            entries: Dicts mit den Argumenten von add_to_queue
+                (outcome_data, deal_info, suggested_action, stage, note)
+            strict: IOError statt stillem Verlust, wenn das Speichern scheitert
+
+        Returns:
+            Pro Eintrag das erstellte oder bereits pending Queue-Item
+        """
         queue = self._load_queue()
 
-        # Dedup: gleicher Outcome bereits vorhanden?
-        oid = self._outcome_id(outcome_data)
+        # Dedup: gleicher Outcome bereits pending?
+        pending = {}
         for item in queue:
-            existing_oid = self._outcome_id({
-                'customer': item.get('customer', ''),
-                'date': item.get('date', ''),
-                'time': item.get('time', ''),
-            })
-            if existing_oid == oid and item.get('status') == 'pending':
+            if item.get('status') == 'pending':
+                pending.setdefault(self._outcome_id({
+                    'customer': item.get('customer', ''),
+                    'date': item.get('date', ''),
+                    'time': item.get('time', ''),
+                }), item)
+
+        result = []
+        added = 0
+        for entry in entries:
+            outcome_data = entry['outcome_data']
+            deal_info = entry.get('deal_info')
+            oid = self._outcome_id(outcome_data)
+            if oid in pending:
                 logger.debug(f"Queue dedup: {oid} already pending")
-                return item
-
-        item = {
-            'id': self._generate_id(),
-            'status': 'pending',
-            'created_at': datetime.now(timezone.utc).isoformat(),
-            'updated_at': None,
-            'updated_by': None,
-            # Outcome
-            'customer': outcome_data.get('customer', ''),
-            'date': outcome_data.get('date', ''),
-            'time': outcome_data.get('time', ''),
-            'outcome': outcome_data.get('outcome', ''),
-            'consultant': outcome_data.get('consultant', ''),
-            # Deal
-            'deal_id': deal_info.get('id') if deal_info else None,
-            'deal_name': deal_info.get('dealname') if deal_info else None,
-            'deal_stage': deal_info.get('dealstage') if deal_info else None,
-            # Vorgeschlagene Aktion
-            'suggested_action': suggested_action,
-            'suggested_stage': stage,
-            'suggested_note': note,
-            # Override + Sync
-            'override_stage': None,
-            'override_note': None,
-            'sync_result': None,
-        }
+                result.append(pending[oid])
+                continue
 
-        queue.append(item)
-        self._save_queue(queue)
-        logger.info(f"Queue item added: {item['id']} ({item['customer']} - {item['outcome']})")
-        return item
+            item = {
+                'id': self._generate_id(),
+                'status': 'pending',
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'updated_at': None,
+                'updated_by': None,
+                # Outcome
+                'customer': outcome_data.get('customer', ''),
+                'date': outcome_data.get('date', ''),
+                'time': outcome_data.get('time', ''),
+                'outcome': outcome_data.get('outcome', ''),
+                'consultant': outcome_data.get('consultant', ''),
+                # Deal
+                'deal_id': deal_info.get('id') if deal_info else None,
+                'deal_name': deal_info.get('dealname') if deal_info else None,
+                'deal_stage': deal_info.get('dealstage') if deal_info else None,
+                # Vorgeschlagene Aktion
+                'suggested_action': entry['suggested_action'],
+                'suggested_stage': entry['stage'],
+                'suggested_note': entry['note'],
+                # Override + Sync
+                'override_stage': None,
+                'override_note': None,
+                'sync_result': None,
+            }
+            queue.append(item)
+            pending[oid] = item
+            result.append(item)
+            added += 1
+            logger.info(f"Queue item added: {item['id']} ({item['customer']} - {item['outcome']})")
+
+        if added and not self._save_queue(queue) and strict:
+            raise IOError(f"Could not save {QUEUE_FILENAME}")
+        return result
 
     def get_queue(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
         """Hole alle Queue-Items, optional gefiltert nach Status."""
@@ -13,12 +13,19 @@ Phasen:
 """
 
 import logging
+import threading
 import time
-from datetime import datetime, timezone
+from collections import Counter
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, List, Any
 
+from app.services.hubspot_snapshot import hubspot_snapshot_store
+
 logger = logging.getLogger(__name__)
 
+# CRM Search API liefert über after-Paginierung maximal so viele Treffer
+HUBSPOT_SEARCH_RESULT_CAP = 10000
+
 # Properties to fetch from HubSpot deals
 DEAL_PROPERTIES = [
     'dealname', 'dealstage', 'pipeline', 'amount',
@@ -26,6 +33,34 @@ DEAL_PROPERTIES = [
     'closedate', 'createdate',
 ]
 
+# Deal properties exported into the analytics snapshot
+# (hs_v2_date_entered_<stage> properties are appended per pipeline stage)
+SNAPSHOT_DEAL_PROPERTIES = DEAL_PROPERTIES + [
+    'hubspot_owner_id', 'hs_analytics_source',
+    'hs_analytics_source_data_1', 'hs_analytics_source_data_2',
+]
+
+# Contact properties exported into the analytics snapshot
+SNAPSHOT_CONTACT_PROPERTIES = [
+    'hs_analytics_source', 'familienstand', 'lebenssituation',
+    'num_associated_deals', 'recent_deal_amount',
+]
+
+# Known HubSpot analytics sources
+LEAD_SOURCES = [
+    'PAID_SEARCH', 'PAID_SOCIAL', 'ORGANIC_SEARCH',
+    'REFERRALS', 'DIRECT_TRAFFIC', 'OTHER_CAMPAIGNS',
+    'SOCIAL_MEDIA', 'EMAIL_MARKETING', 'OFFLINE',
+]
+
+# Customer segments: name -> (contact property, value)
+CUSTOMER_SEGMENTS = {
+    'Familie': ('familienstand', 'verheiratet'),
+    'Selbstaendige': ('lebenssituation', 'selbstaendig'),
+    'Angestellte': ('lebenssituation', 'angestellt'),
+    'Rentner': ('lebenssituation', 'rentner'),
+}
+
 
 class HubSpotService:
     """Service für HubSpot CRM Integration.
@@ -41,6 +76,8 @@ class HubSpotService:
         self._initialized = False
         self._cache: Dict[str, Any] = {}
         self._cache_ts: Dict[str, float] = {}
+        # Aus dem Snapshot abgeleitete Werte: key -> (snapshot_version, value)
+        self._derived: Dict[str, Any] = {}
 
     def init_app(self, app=None):
         """Initialisiere den HubSpot Client wenn Token vorhanden."""
@@ -50,7 +87,10 @@ class HubSpotService:
 
         try:
             from hubspot import HubSpot
-            self.client = HubSpot(access_token=self.config.HUBSPOT_ACCESS_TOKEN)
+            from app.utils.request_metrics import InstrumentedClient
+            self.client = InstrumentedClient(
+                HubSpot(access_token=self.config.HUBSPOT_ACCESS_TOKEN), "hubspot_calls"
+            )
             self._initialized = True
             logger.info("HubSpot client initialized successfully")
         except ImportError:
@@ -646,245 +686,332 @@ class HubSpotService:
         return all_results
 
     # ================================================================
-    # ANALYTICS DATA
+    # ANALYTICS SNAPSHOT
     # ================================================================
 
-    def get_pipeline_stats(self) -> Optional[Dict[str, Any]]:
-        """Hole Pipeline-Statistiken aus HubSpot.
+    def refresh_snapshot(self) -> bool:
+        """Baue den Analytics-Snapshot per Voll-Export neu auf (Celery Beat).
+
+        Single-Flight: Läuft bereits ein Export in einem anderen Worker,
+        wird nichts getan.
 
         Returns:
-            Dict mit {stage_label: count} oder None
+            True wenn ein neuer Snapshot gespeichert wurde
         """
         if not self.is_available:
-            return None
+            return False
 
-        cached = self._cache_get('pipeline_stats')
-        if cached is not None:
-            return cached
+        token = hubspot_snapshot_store.acquire_refresh_lock()
+        if not token:
+            logger.info("HubSpot snapshot refresh already running elsewhere, skipping")
+            hubspot_snapshot_store.release_refresh_enqueue()
+            return False
 
         try:
-            # Get pipeline stages
-            pipeline_response = self.client.crm.pipelines.pipeline_stages_api.get_all(
-                object_type="deals",
-                pipeline_id=self.config.HUBSPOT_PIPELINE_ID,
+            snapshot = self._export_snapshot()
+            hubspot_snapshot_store.set(snapshot)
+            logger.info(
+                f"HubSpot snapshot refreshed: {len(snapshot['deals'])} deals, "
+                f"{len(snapshot['contacts'])} contacts"
             )
+            return True
+        except Exception as e:
+            logger.error(f"HubSpot snapshot refresh failed: {e}")
+            return False
+        finally:
+            hubspot_snapshot_store.release_refresh_lock(token)
+            hubspot_snapshot_store.release_refresh_enqueue()
 
-            stats = {}
-            for stage in (pipeline_response.results or []):
-                stage_id = stage.id
-                label = stage.label
-
-                # Count deals in this stage
-                count_filters = [
-                    {"propertyName": "dealstage", "operator": "EQ", "value": stage_id},
-                    {"propertyName": "pipeline", "operator": "EQ", "value": self.config.HUBSPOT_PIPELINE_ID},
-                ]
-                from hubspot.crm.deals import PublicObjectSearchRequest
-                req = PublicObjectSearchRequest(
-                    filter_groups=[{"filters": count_filters}],
-                    limit=1,
-                    properties=["dealstage"],
-                )
-                resp = self.client.crm.deals.search_api.do_search(
-                    public_object_search_request=req
-                )
-                stats[label] = resp.total
+    def _schedule_refresh(self) -> None:
+        """Reiht einen Snapshot-Refresh ein, ohne den Request zu blockieren.
 
-            self._cache_set('pipeline_stats', stats)
-            logger.info(f"HubSpot pipeline stats loaded: {len(stats)} stages")
-            return stats
+        Single-Flight über den Einreih-Marker im Store: pro veraltetem
+        Snapshot wird genau ein Task eingereiht. Ist Celery nicht erreichbar,
+        läuft der Export in einem Hintergrund-Thread dieses Workers.
+        """
+        if not hubspot_snapshot_store.claim_refresh_enqueue():
+            return
 
+        try:
+            from app.services.hubspot_tasks import refresh_hubspot_snapshot_task
+            refresh_hubspot_snapshot_task.delay()
+            logger.info("HubSpot snapshot stale, refresh task enqueued")
         except Exception as e:
-            logger.error(f"HubSpot pipeline stats failed: {e}")
-            return None
+            logger.warning(f"HubSpot snapshot refresh could not be enqueued ({e}), refreshing in background thread")
+            try:
+                threading.Thread(target=self.refresh_snapshot, name='hubspot-snapshot-refresh',
+                                 daemon=True).start()
+            except Exception as thread_error:
+                logger.error(f"HubSpot snapshot background refresh failed to start: {thread_error}")
+                hubspot_snapshot_store.release_refresh_enqueue()
+
+    def _export_snapshot(self) -> Dict[str, Any]:
+        """Voll-Export aller Daten, die die Analytics-Methoden benötigen."""
+        pipeline_response = self.client.crm.pipelines.pipeline_stages_api.get_all(
+            object_type="deals",
+            pipeline_id=self.config.HUBSPOT_PIPELINE_ID,
+        )
+        stages = []
+        for stage in (pipeline_response.results or []):
+            stages.append({
+                'id': stage.id,
+                'label': stage.label,
+                'display_order': stage.display_order,
+                'metadata': dict(stage.metadata or {}),
+            })
+
+        owners = {}
+        after = None
+        while True:
+            owner_kwargs = {'limit': 100}
+            if after:
+                owner_kwargs['after'] = after
+            owners_resp = self.client.crm.owners.owners_api.get_page(**owner_kwargs)
+            for owner in (owners_resp.results or []):
+                name = f"{owner.first_name or ''} {owner.last_name or ''}".strip()
+                if name and owner.id:
+                    owners[str(owner.id)] = name
+            paging = owners_resp.paging
+            if paging and paging.next and paging.next.after:
+                after = paging.next.after
+            else:
+                break
 
-    def get_total_deals_count(self, stage: str = None) -> Optional[int]:
-        """Hole Anzahl der Deals (optional gefiltert nach Stage).
+        from hubspot.crm.deals import PublicObjectSearchRequest as DealSearch
+        from hubspot.crm.contacts import PublicObjectSearchRequest as ContactSearch
 
-        Args:
-            stage: Optional - Stage-Key oder Stage-ID
+        deal_props = SNAPSHOT_DEAL_PROPERTIES + [f"hs_v2_date_entered_{s['id']}" for s in stages]
+        deal_results = self._search_all(
+            self.client.crm.deals.search_api, DealSearch,
+            filter_groups=[{"filters": [{"propertyName": "pipeline", "operator": "EQ",
+                                         "value": self.config.HUBSPOT_PIPELINE_ID}]}],
+            properties=deal_props,
+        )
+        deals = [{'id': d.id, **(d.properties or {})} for d in deal_results]
+
+        contact_results = self._search_all(
+            self.client.crm.contacts.search_api, ContactSearch,
+            filter_groups=[
+                {"filters": [{"propertyName": prop, "operator": "HAS_PROPERTY"}]}
+                for prop in ('hs_analytics_source', 'familienstand', 'lebenssituation')
+            ],
+            properties=SNAPSHOT_CONTACT_PROPERTIES,
+        )
+        contacts = [{'id': c.id, **(c.properties or {})} for c in contact_results]
 
-        Returns:
-            Anzahl Deals oder None
+        return {
+            'built_at': time.time(),
+            'pipeline_id': self.config.HUBSPOT_PIPELINE_ID,
+            'stages': stages,
+            'owners': owners,
+            'deals': deals,
+            'contacts': contacts,
+        }
+
+    def _search_all(self, search_api, request_cls, filter_groups: List[Dict],
+                    properties: List[str], limit: int = 100) -> List:
+        """Vollständige Suche per Keyset-Paginierung über hs_object_id.
+
+        Die Search-API liefert über ``after`` höchstens 10.000 Treffer und
+        schneidet danach stillschweigend ab. Deshalb wird nach hs_object_id
+        sortiert und jede Seite mit ``hs_object_id > letzte ID`` neu gestartet,
+        sodass jede einzelne Abfrage weit unter dem Limit bleibt.
+        """
+        all_results = []
+        last_id = None
+        while True:
+            groups = filter_groups
+            if last_id is not None:
+                cursor = {"propertyName": "hs_object_id", "operator": "GT", "value": last_id}
+                groups = [{"filters": list(g.get("filters", [])) + [cursor]} for g in filter_groups]
+
+            response = search_api.do_search(public_object_search_request=request_cls(
+                filter_groups=groups,
+                properties=properties,
+                sorts=[{"propertyName": "hs_object_id", "direction": "ASCENDING"}],
+                limit=limit,
+            ))
+            results = response.results or []
+            all_results.extend(results)
+
+            total = getattr(response, 'total', None)
+            if last_id is None and isinstance(total, int) and total >= HUBSPOT_SEARCH_RESULT_CAP:
+                logger.info(f"HubSpot search matches {total} objects, paging by hs_object_id past the search cap")
+
+            if len(results) < limit:
+                break
+            next_id = str(results[-1].id)
+            if next_id == last_id:
+                logger.warning(f"HubSpot keyset search stalled at hs_object_id {next_id}, result may be incomplete")
+                break
+            last_id = next_id
+        return all_results
+
+    def _get_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Aktuellen Snapshot holen, bei Bedarf single-flight neu bauen.
+
+        - Frischer Snapshot: direkt zurück
+        - Veralteter Snapshot: wird sofort ausgeliefert, der Refresh läuft
+          eingereiht im Hintergrund (kein Export auf dem Request-Thread)
+        - Kein Snapshot (Kaltstart): ein Worker baut, die anderen warten darauf
         """
         if not self.is_available:
             return None
 
-        cache_key = f'deals_count_{stage or "all"}'
-        cached = self._cache_get(cache_key)
-        if cached is not None:
-            return cached
+        snapshot = hubspot_snapshot_store.get()
+        if snapshot is not None:
+            age = hubspot_snapshot_store.age(snapshot)
+            max_age = self.config.HUBSPOT_SNAPSHOT_INTERVAL * 2
+            if age is None or age >= max_age:
+                self._schedule_refresh()
+            return snapshot
 
-        try:
-            from hubspot.crm.deals import PublicObjectSearchRequest
+        token = hubspot_snapshot_store.acquire_refresh_lock()
+        if token:
+            try:
+                fresh = self._export_snapshot()
+                hubspot_snapshot_store.set(fresh)
+                return fresh
+            except Exception as e:
+                logger.error(f"HubSpot snapshot build failed: {e}")
+                return None
+            finally:
+                hubspot_snapshot_store.release_refresh_lock(token)
 
-            filters = [
-                {"propertyName": "pipeline", "operator": "EQ",
-                 "value": self.config.HUBSPOT_PIPELINE_ID},
-            ]
-            if stage:
-                stage_id = self.config.STAGE_MAPPING.get(stage, stage)
-                filters.append(
-                    {"propertyName": "dealstage", "operator": "EQ", "value": stage_id}
-                )
+        return hubspot_snapshot_store.wait_for_snapshot(self.config.HUBSPOT_SNAPSHOT_WAIT)
 
-            req = PublicObjectSearchRequest(
-                filter_groups=[{"filters": filters}],
-                limit=1,
-                properties=["dealstage"],
-            )
-            resp = self.client.crm.deals.search_api.do_search(
-                public_object_search_request=req
-            )
-            count = resp.total
-            self._cache_set(cache_key, count)
-            logger.info(f"HubSpot deals count (stage={stage}): {count}")
-            return count
+    def _from_snapshot(self, key: str, compute) -> Optional[Any]:
+        """Leite einen Analytics-Wert aus dem Snapshot ab (memoized pro Snapshot-Version)."""
+        try:
+            snapshot = self._get_snapshot()
+            if snapshot is None:
+                return None
 
+            version = snapshot.get('built_at')
+            memo = self._derived.get(key)
+            if memo is not None and memo[0] == version:
+                return memo[1]
+
+            value = compute(snapshot)
+            self._derived[key] = (version, value)
+            return value
         except Exception as e:
-            logger.error(f"HubSpot deals count failed: {e}")
+            logger.error(f"HubSpot {key} failed: {e}")
             return None
 
-    def get_avg_deal_value(self) -> Optional[float]:
-        """Hole durchschnittlichen Deal-Wert.
+    @staticmethod
+    def _parse_hubspot_timestamp(value: Optional[str]) -> Optional[datetime]:
+        """HubSpot liefert Datumswerte als Epoch-ms oder ISO-8601."""
+        if not value:
+            return None
+        try:
+            if value.isdigit():
+                return datetime.fromtimestamp(int(value) / 1000, tz=timezone.utc)
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except (ValueError, AttributeError):
+            return None
+
+    @staticmethod
+    def _has_deals(contact: Dict[str, Any]) -> bool:
+        try:
+            return int(contact.get('num_associated_deals') or 0) > 0
+        except (ValueError, TypeError):
+            return False
+
+    # ================================================================
+    # ANALYTICS DATA (abgeleitet aus dem Snapshot)
+    # ================================================================
+
+    def get_pipeline_stats(self) -> Optional[Dict[str, Any]]:
+        """Hole Pipeline-Statistiken aus HubSpot.
 
         Returns:
-            Durchschnittlicher Deal-Wert in EUR oder None
+            Dict mit {stage_label: count} oder None
         """
-        if not self.is_available:
-            return None
+        def compute(snapshot):
+            counts = Counter(d.get('dealstage') for d in snapshot['deals'])
+            return {stage['label']: counts.get(stage['id'], 0) for stage in snapshot['stages']}
 
-        cached = self._cache_get('avg_deal_value')
-        if cached is not None:
-            return cached
+        return self._from_snapshot('pipeline_stats', compute)
 
-        try:
-            filters = [
-                {"propertyName": "pipeline", "operator": "EQ",
-                 "value": self.config.HUBSPOT_PIPELINE_ID},
-                {"propertyName": "amount", "operator": "GT", "value": "0"},
-            ]
-            results = self._search_deals(filters=filters, properties=['amount'])
+    def get_total_deals_count(self, stage: str = None) -> Optional[int]:
+        """Hole Anzahl der Deals (optional gefiltert nach Stage).
 
-            if not results:
-                logger.debug("No deals with amount found")
-                return None
+        Args:
+            stage: Optional - Stage-Key oder Stage-ID
 
+        Returns:
+            Anzahl Deals oder None
+        """
+        def compute(snapshot):
+            if not stage:
+                return len(snapshot['deals'])
+            stage_id = self.config.STAGE_MAPPING.get(stage, stage)
+            return sum(1 for d in snapshot['deals'] if d.get('dealstage') == stage_id)
+
+        return self._from_snapshot(f'deals_count_{stage or "all"}', compute)
+
+    def get_avg_deal_value(self) -> Optional[float]:
+        """Hole durchschnittlichen Deal-Wert.
+
+        Returns:
+            Durchschnittlicher Deal-Wert in EUR oder None
+        """
+        def compute(snapshot):
             total = 0.0
             count = 0
-            for deal in results:
-                amount_str = (deal.properties or {}).get('amount')
-                if amount_str:
-                    try:
-                        amount = float(amount_str)
-                        if amount > 0:
-                            total += amount
-                            count += 1
-                    except (ValueError, TypeError):
-                        continue
+            for deal in snapshot['deals']:
+                try:
+                    amount = float(deal.get('amount') or 0)
+                except (ValueError, TypeError):
+                    continue
+                if amount > 0:
+                    total += amount
+                    count += 1
 
             if count == 0:
+                logger.debug("No deals with amount found")
                 return None
+            return round(total / count, 2)
 
-            avg = round(total / count, 2)
-            self._cache_set('avg_deal_value', avg)
-            logger.info(f"HubSpot avg deal value: {avg} EUR ({count} deals)")
-            return avg
-
-        except Exception as e:
-            logger.error(f"HubSpot avg deal value failed: {e}")
-            return None
+        return self._from_snapshot('avg_deal_value', compute)
 
     def get_lead_source_attribution(self) -> Optional[List[Dict[str, Any]]]:
         """Hole Lead-Source Attribution aus HubSpot.
 
-        Groups contacts by hs_analytics_source, counts associated deals.
+        Groups contacts by hs_analytics_source; conversion is the share of
+        contacts with at least one associated deal.
 
         Returns:
             Liste von Dicts mit channel, leads, conversion_rate oder None
         """
-        if not self.is_available:
-            return None
-
-        cached = self._cache_get('lead_source_attribution')
-        if cached is not None:
-            return cached
-
-        try:
-            from hubspot.crm.contacts import PublicObjectSearchRequest as ContactSearch
-
-            # Known HubSpot analytics sources
-            sources = [
-                'PAID_SEARCH', 'PAID_SOCIAL', 'ORGANIC_SEARCH',
-                'REFERRALS', 'DIRECT_TRAFFIC', 'OTHER_CAMPAIGNS',
-                'SOCIAL_MEDIA', 'EMAIL_MARKETING', 'OFFLINE',
-            ]
+        def compute(snapshot):
+            leads = Counter()
+            converted = Counter()
+            for contact in snapshot['contacts']:
+                source = contact.get('hs_analytics_source')
+                if source not in LEAD_SOURCES:
+                    continue
+                leads[source] += 1
+                if self._has_deals(contact):
+                    converted[source] += 1
 
             attribution = []
-            for source in sources:
-                req = ContactSearch(
-                    filter_groups=[{"filters": [{
-                        "propertyName": "hs_analytics_source",
-                        "operator": "EQ",
-                        "value": source,
-                    }]}],
-                    limit=1,
-                    properties=["hs_analytics_source"],
-                )
-                resp = self.client.crm.contacts.search_api.do_search(
-                    public_object_search_request=req
-                )
-                lead_count = resp.total
+            for source in LEAD_SOURCES:
+                lead_count = leads.get(source, 0)
                 if lead_count == 0:
                     continue
-
-                # Estimate conversion: sample up to 10 contacts, check for deals
-                sample_req = ContactSearch(
-                    filter_groups=[{"filters": [{
-                        "propertyName": "hs_analytics_source",
-                        "operator": "EQ",
-                        "value": source,
-                    }]}],
-                    limit=10,
-                    properties=["hs_analytics_source"],
-                )
-                sample_resp = self.client.crm.contacts.search_api.do_search(
-                    public_object_search_request=sample_req
-                )
-
-                contacts_with_deals = 0
-                sample_size = len(sample_resp.results or [])
-                for contact in (sample_resp.results or []):
-                    try:
-                        assocs = self.client.crm.associations.v4.basic_api.get_page(
-                            object_type="contacts",
-                            object_id=contact.id,
-                            to_object_type="deals",
-                        )
-                        if assocs.results:
-                            contacts_with_deals += 1
-                    except Exception:
-                        continue
-
-                conversion = round((contacts_with_deals / sample_size * 100), 1) if sample_size > 0 else 0
-
-                # Readable channel name
-                channel_name = source.replace('_', ' ').title()
                 attribution.append({
-                    'channel': channel_name,
+                    'channel': source.replace('_', ' ').title(),
                     'leads': lead_count,
-                    'conversion_rate': conversion,
+                    'conversion_rate': round(converted[source] / lead_count * 100, 1),
                     'cost_per_lead': 0,
                 })
 
             attribution.sort(key=lambda x: x['leads'], reverse=True)
-            self._cache_set('lead_source_attribution', attribution)
-            logger.info(f"HubSpot lead attribution loaded: {len(attribution)} channels")
-            return attribution if attribution else None
+            return attribution or None
 
-        except Exception as e:
-            logger.error(f"HubSpot lead source attribution failed: {e}")
-            return None
+        return self._from_snapshot('lead_source_attribution', compute)
 
     def get_conversion_rates(self) -> Optional[Dict[str, float]]:
         """Hole Conversion-Rates aus der Pipeline.
@@ -895,68 +1022,30 @@ class HubSpotService:
         Returns:
             Dict mit stage transition rates oder None
         """
-        if not self.is_available:
-            return None
-
-        cached = self._cache_get('conversion_rates')
-        if cached is not None:
-            return cached
-
-        try:
-            # Get all pipeline stages in order
-            pipeline_response = self.client.crm.pipelines.pipeline_stages_api.get_all(
-                object_type="deals",
-                pipeline_id=self.config.HUBSPOT_PIPELINE_ID,
-            )
-            stages = sorted(pipeline_response.results or [], key=lambda s: s.display_order)
-
+        def compute(snapshot):
+            stages = sorted(snapshot['stages'], key=lambda s: s['display_order'])
             if len(stages) < 2:
                 return None
 
-            # For each stage, count deals that entered it
-            history_props = [f"hs_v2_date_entered_{s.id}" for s in stages]
-
-            # Search deals in this pipeline with history properties
-            from hubspot.crm.deals import PublicObjectSearchRequest
-            req = PublicObjectSearchRequest(
-                filter_groups=[{"filters": [{
-                    "propertyName": "pipeline", "operator": "EQ",
-                    "value": self.config.HUBSPOT_PIPELINE_ID,
-                }]}],
-                limit=100,
-                properties=history_props,
-            )
-            resp = self.client.crm.deals.search_api.do_search(
-                public_object_search_request=req
-            )
-
             # Count deals per stage entry
             stage_counts = {}
             for stage in stages:
-                prop = f"hs_v2_date_entered_{stage.id}"
-                count = 0
-                for deal in (resp.results or []):
-                    val = (deal.properties or {}).get(prop)
-                    if val and val.strip():
-                        count += 1
-                stage_counts[stage.label] = count
+                prop = f"hs_v2_date_entered_{stage['id']}"
+                stage_counts[stage['label']] = sum(
+                    1 for d in snapshot['deals'] if (d.get(prop) or '').strip()
+                )
 
             # Compute transition rates
             rates = {}
-            stage_labels = [s.label for s in stages]
+            stage_labels = [s['label'] for s in stages]
             for i in range(1, len(stage_labels)):
                 prev_count = stage_counts.get(stage_labels[i - 1], 0)
                 curr_count = stage_counts.get(stage_labels[i], 0)
                 key = f"{stage_labels[i-1]}_to_{stage_labels[i]}".lower().replace(' ', '_')
                 rates[key] = round((curr_count / prev_count * 100), 1) if prev_count > 0 else 0
-
-            self._cache_set('conversion_rates', rates)
-            logger.info(f"HubSpot conversion rates loaded: {rates}")
             return rates
 
-        except Exception as e:
-            logger.error(f"HubSpot conversion rates failed: {e}")
-            return None
+        return self._from_snapshot('conversion_rates', compute)
 
     def get_pipeline_stages(self) -> Optional[List[Dict[str, Any]]]:
         """Hole Pipeline-Stages mit IDs und Labels.
@@ -971,6 +1060,16 @@ class HubSpotService:
         if cached is not None:
             return cached
 
+        # Shared snapshot already holds the stages (no API call needed)
+        snapshot = hubspot_snapshot_store.get()
+        if snapshot is not None and snapshot.get('stages'):
+            stages = [
+                {'id': s['id'], 'label': s['label'], 'display_order': s['display_order']}
+                for s in sorted(snapshot['stages'], key=lambda s: s['display_order'])
+            ]
+            self._cache_set('pipeline_stages', stages)
+            return stages
+
         try:
             pipeline_response = self.client.crm.pipelines.pipeline_stages_api.get_all(
                 object_type="deals",
@@ -1017,49 +1116,22 @@ class HubSpotService:
         Returns:
             Liste von Kampagnen-Dicts oder None
         """
-        if not self.is_available:
-            return None
-
-        cache_key = f'campaign_stats_{days}'
-        cached = self._cache_get(cache_key)
-        if cached is not None:
-            return cached
-
-        try:
-            from hubspot.crm.deals import PublicObjectSearchRequest
-
-            # Calculate date filter
-            cutoff = datetime.now(timezone.utc) - __import__('datetime').timedelta(days=days)
-            cutoff_ms = str(int(cutoff.timestamp() * 1000))
-
-            # Fetch deals created in the time range with campaign-related properties
-            campaign_props = DEAL_PROPERTIES + [
-                'hs_analytics_source', 'hs_analytics_source_data_1',
-                'hs_analytics_source_data_2',
-            ]
-
-            filters = [
-                {"propertyName": "pipeline", "operator": "EQ",
-                 "value": self.config.HUBSPOT_PIPELINE_ID},
-                {"propertyName": "createdate", "operator": "GTE",
-                 "value": cutoff_ms},
-            ]
-
-            results = self._search_deals(filters=filters, properties=campaign_props)
+        def compute(snapshot):
+            cutoff = datetime.now(timezone.utc) - timedelta(days=days)
 
             # Identify Rückholung stage ID for campaign splitting
             rueckholung_stage_id = None
-            stages = self.get_pipeline_stages()
-            if stages:
-                for s in stages:
-                    if 'rückholung' in s['label'].lower() or 'rueckholung' in s['label'].lower():
-                        rueckholung_stage_id = s['id']
-                        break
+            for s in snapshot['stages']:
+                if 'rückholung' in s['label'].lower() or 'rueckholung' in s['label'].lower():
+                    rueckholung_stage_id = s['id']
+                    break
 
             # Group by campaign source
             campaigns = {}
-            for deal_obj in results:
-                props = deal_obj.properties or {}
+            for props in snapshot['deals']:
+                created = self._parse_hubspot_timestamp(props.get('createdate'))
+                if created is None or created < cutoff:
+                    continue
 
                 # Rückholung deals get their own campaign category
                 dealstage = props.get('dealstage', '')
@@ -1127,13 +1199,10 @@ class HubSpotService:
                 })
 
             result.sort(key=lambda x: x['deals'], reverse=True)
-            self._cache_set(cache_key, result)
-            logger.info(f"HubSpot campaign stats loaded: {len(result)} campaigns ({days} days)")
+            logger.info(f"HubSpot campaign stats derived: {len(result)} campaigns ({days} days)")
             return result
 
-        except Exception as e:
-            logger.error(f"HubSpot campaign stats failed: {e}")
-            return None
+        return self._from_snapshot(f'campaign_stats_{days}', compute)
 
     def get_deals_in_date_range(self, start: str, end: str) -> Optional[List[Dict[str, Any]]]:
         """Hole alle Deals in einem Datumsbereich (für my-calendar Enrichment).
@@ -1254,203 +1323,84 @@ class HubSpotService:
     def get_customer_segments(self) -> Optional[List[Dict[str, Any]]]:
         """Hole Kundensegmente basierend auf HubSpot Contact Properties.
 
-        Groups contacts by lifecyclestage, counts per segment,
+        Groups contacts by segment properties, counts per segment,
         and calculates avg deal value + conversion per segment.
 
         Returns:
             Liste von Segment-Dicts oder None
         """
-        if not self.is_available:
-            return None
-
-        cached = self._cache_get('customer_segments')
-        if cached is not None:
-            return cached
-
-        try:
-            from hubspot.crm.contacts import PublicObjectSearchRequest as ContactSearch
-
-            segment_props = {
-                'Familie': {"propertyName": "familienstand", "operator": "EQ", "value": "verheiratet"},
-                'Selbstaendige': {"propertyName": "lebenssituation", "operator": "EQ", "value": "selbstaendig"},
-                'Angestellte': {"propertyName": "lebenssituation", "operator": "EQ", "value": "angestellt"},
-                'Rentner': {"propertyName": "lebenssituation", "operator": "EQ", "value": "rentner"},
-            }
-
+        def compute(snapshot):
             segments = []
-            for segment_name, filter_def in segment_props.items():
-                try:
-                    req = ContactSearch(
-                        filter_groups=[{"filters": [filter_def]}],
-                        limit=10,
-                        properties=["email", "lifecyclestage"],
-                    )
-                    resp = self.client.crm.contacts.search_api.do_search(
-                        public_object_search_request=req
-                    )
-                except Exception as e:
-                    logger.warning(f"HubSpot segment '{segment_name}' skipped: {e}")
+            for segment_name, (prop, value) in CUSTOMER_SEGMENTS.items():
+                members = [c for c in snapshot['contacts'] if c.get(prop) == value]
+                if not members:
                     continue
 
-                contact_count = resp.total
-
-                if contact_count == 0:
-                    continue
-
-                # Sample contacts for deal stats
-                contacts_with_deals = 0
+                with_deals = [c for c in members if self._has_deals(c)]
                 deal_values = []
-                for contact in (resp.results or []):
+                for contact in with_deals:
                     try:
-                        deals = self._get_associated_deals(contact.id)
-                        if deals:
-                            contacts_with_deals += 1
-                            for d in deals:
-                                if d.get('amount'):
-                                    try:
-                                        deal_values.append(float(d['amount']))
-                                    except (ValueError, TypeError):
-                                        pass
-                    except Exception:
+                        amount = float(contact.get('recent_deal_amount') or 0)
+                    except (ValueError, TypeError):
                         continue
-
-                sample_size = len(resp.results or [])
-                conversion = round((contacts_with_deals / sample_size * 100), 1) if sample_size > 0 else 0
-                avg_val = round(sum(deal_values) / len(deal_values), 2) if deal_values else 0
+                    if amount > 0:
+                        deal_values.append(amount)
 
                 segments.append({
                     'segment': segment_name,
-                    'count': contact_count,
-                    'avg_value': avg_val,
-                    'conversion': conversion,
+                    'count': len(members),
+                    'avg_value': round(sum(deal_values) / len(deal_values), 2) if deal_values else 0,
+                    'conversion': round(len(with_deals) / len(members) * 100, 1),
                 })
 
             segments.sort(key=lambda x: x['count'], reverse=True)
-            self._cache_set('customer_segments', segments)
-            logger.info(f"HubSpot customer segments loaded: {len(segments)} segments")
-            return segments if segments else None
+            return segments or None
 
-        except Exception as e:
-            logger.error(f"HubSpot customer segments failed: {e}")
-            return None
+        return self._from_snapshot('customer_segments', compute)
 
     def get_per_owner_conversion(self) -> Optional[Dict[str, float]]:
         """Per-Owner Conversion Rates (Deals won / total Deals).
 
-        Loads all owners, then counts total and closed-won deals per owner.
-
         Returns:
             Dict mapping owner full name to conversion rate percentage, or None.
         """
-        if not self.is_available:
-            return None
-
-        cached = self._cache_get('per_owner_conversion')
-        if cached is not None:
-            return cached
-
-        try:
-            # 1. Load all owners
-            owners_resp = self.client.crm.owners.owners_api.get_page(limit=100)
-            owners = {}
-            for owner in (owners_resp.results or []):
-                first = owner.first_name or ''
-                last = owner.last_name or ''
-                name = f"{first} {last}".strip()
-                if name and owner.id:
-                    owners[owner.id] = name
-
+        def compute(snapshot):
+            owners = snapshot['owners']
             if not owners:
                 logger.warning("HubSpot per-owner conversion: no owners found")
                 return None
 
-            # 2. Get pipeline stages to identify closed-won
-            pipeline_response = self.client.crm.pipelines.pipeline_stages_api.get_all(
-                object_type="deals",
-                pipeline_id=self.config.HUBSPOT_PIPELINE_ID,
-            )
-            # Closed-won is typically the last stage or has metadata indicating won
+            # Closed-won stages from pipeline metadata
             won_stage_ids = set()
-            for stage in (pipeline_response.results or []):
-                metadata = stage.metadata or {}
+            for stage in snapshot['stages']:
+                metadata = stage.get('metadata') or {}
                 if metadata.get('isClosed') == 'true' and metadata.get('probability', '0') == '1.0':
-                    won_stage_ids.add(stage.id)
+                    won_stage_ids.add(stage['id'])
 
-            # Fallback: if no metadata, use highest display_order with isClosed
+            # Fallback: closed stages with probability > 0.5
             if not won_stage_ids:
-                closed_stages = [
-                    s for s in (pipeline_response.results or [])
-                    if (s.metadata or {}).get('isClosed') == 'true'
-                ]
-                if closed_stages:
-                    # Take the one with probability closest to 1
-                    for s in closed_stages:
-                        prob = float((s.metadata or {}).get('probability', '0'))
-                        if prob > 0.5:
-                            won_stage_ids.add(s.id)
-
-            # 3. Count deals per owner
-            from hubspot.crm.deals import PublicObjectSearchRequest
-
-            owner_total = {}
-            owner_won = {}
-
-            for owner_id, owner_name in owners.items():
-                # Total deals for this owner in pipeline
-                req = PublicObjectSearchRequest(
-                    filter_groups=[{"filters": [
-                        {"propertyName": "pipeline", "operator": "EQ",
-                         "value": self.config.HUBSPOT_PIPELINE_ID},
-                        {"propertyName": "hubspot_owner_id", "operator": "EQ",
-                         "value": owner_id},
-                    ]}],
-                    limit=1,
-                    properties=["dealstage"],
-                )
-                resp = self.client.crm.deals.search_api.do_search(
-                    public_object_search_request=req
-                )
-                total = resp.total
-                if total == 0:
+                for stage in snapshot['stages']:
+                    metadata = stage.get('metadata') or {}
+                    if metadata.get('isClosed') == 'true' and float(metadata.get('probability', '0')) > 0.5:
+                        won_stage_ids.add(stage['id'])
+
+            owner_total = Counter()
+            owner_won = Counter()
+            for deal in snapshot['deals']:
+                owner_name = owners.get(str(deal.get('hubspot_owner_id') or ''))
+                if not owner_name:
                     continue
+                owner_total[owner_name] += 1
+                if deal.get('dealstage') in won_stage_ids:
+                    owner_won[owner_name] += 1
 
-                owner_total[owner_name] = total
-
-                # Won deals
-                if won_stage_ids:
-                    won_count = 0
-                    for stage_id in won_stage_ids:
-                        req_won = PublicObjectSearchRequest(
-                            filter_groups=[{"filters": [
-                                {"propertyName": "pipeline", "operator": "EQ",
-                                 "value": self.config.HUBSPOT_PIPELINE_ID},
-                                {"propertyName": "hubspot_owner_id", "operator": "EQ",
-                                 "value": owner_id},
-                                {"propertyName": "dealstage", "operator": "EQ",
-                                 "value": stage_id},
-                            ]}],
-                            limit=1,
-                            properties=["dealstage"],
-                        )
-                        resp_won = self.client.crm.deals.search_api.do_search(
-                            public_object_search_request=req_won
-                        )
-                        won_count += resp_won.total
-                    owner_won[owner_name] = won_count
-
-            # 4. Calculate conversion rates
-            rates = {}
-            for name, total in owner_total.items():
-                won = owner_won.get(name, 0)
-                rates[name] = round((won / total * 100), 1) if total > 0 else 0.0
-
-            self._cache_set('per_owner_conversion', rates)
-            logger.info(f"HubSpot per-owner conversion loaded: {len(rates)} owners")
-            return rates if rates else None
+            rates = {
+                name: round((owner_won.get(name, 0) / total * 100), 1)
+                for name, total in owner_total.items()
+            }
+            return rates or None
 
-        except Exception as e:
-            logger.error(f"HubSpot per-owner conversion failed: {e}")
-            return None
+        return self._from_snapshot('per_owner_conversion', compute)
 
 
 # Singleton-Instanz
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+HubSpot Snapshot Store
+
+Gemeinsamer Snapshot aller HubSpot-Daten, aus denen die Analytics-Methoden
+des HubSpotService lokal abgeleitet werden (Pipeline-Stages, Owner, Deals,
+Contacts). Der Snapshot wird von einem Celery-Beat-Task periodisch per
+Voll-Export aktualisiert und in Redis abgelegt, damit alle Gunicorn-Worker
+denselben Stand lesen und niemand mehr selbst durch die Search-API paginiert.
+
+Ohne Redis fällt der Store auf einen In-Process-Snapshot zurück.
+
+Redis-Keys:
+    hubspot:snapshot          JSON-Snapshot
+    hubspot:snapshot:version  Build-Zeitstempel (günstiger Versions-Check)
+    hubspot:snapshot:lock     Single-Flight-Lock für den Export
+    hubspot:snapshot:queued   Marker: Refresh-Task ist bereits eingereiht
+"""
+
+import json
+import time
+import uuid
+import threading
+import logging
+from typing import Any, Dict, Optional
+
+from app.utils.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = 'hubspot:snapshot'
+VERSION_KEY = 'hubspot:snapshot:version'
+LOCK_KEY = 'hubspot:snapshot:lock'
+QUEUED_KEY = 'hubspot:snapshot:queued'
+
+
+class HubSpotSnapshotStore:
+    """Redis-backed Snapshot mit In-Process-Cache und Single-Flight-Lock."""
+
+    def __init__(self, lock_timeout: int = 300):
+        self.lock_timeout = lock_timeout
+        self._local: Optional[Dict[str, Any]] = None
+        self._local_version: Optional[str] = None
+        self._thread_lock = threading.Lock()
+        self._queued_lock = threading.Lock()
+        self._queued_until = 0.0
+
+    # ------------------------------------------------------------------
+    # Read / Write
+    # ------------------------------------------------------------------
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        """Aktueller Snapshot oder None.
+
+        Dekodiert den JSON-Snapshot nur, wenn sich die Version in Redis
+        geändert hat; sonst wird die lokal dekodierte Kopie geliefert.
+        """
+        client = get_redis_client()
+        if client is None:
+            return self._local
+
+        try:
+            version = client.get(VERSION_KEY)
+            if version is None:
+                return None
+            if version == self._local_version and self._local is not None:
+                return self._local
+
+            raw = client.get(SNAPSHOT_KEY)
+            if raw is None:
+                return None
+            snapshot = json.loads(raw)
+            self._local = snapshot
+            self._local_version = version
+            return snapshot
+        except Exception as e:
+            logger.warning(f"HubSpot snapshot read from Redis failed: {e}")
+            return self._local
+
+    def set(self, snapshot: Dict[str, Any]) -> None:
+        """Speichert einen neu gebauten Snapshot."""
+        version = str(snapshot.get('built_at', time.time()))
+        self._local = snapshot
+        self._local_version = version
+
+        client = get_redis_client()
+        if client is None:
+            return
+
+        try:
+            pipe = client.pipeline()
+            pipe.set(SNAPSHOT_KEY, json.dumps(snapshot, default=str))
+            pipe.set(VERSION_KEY, version)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"HubSpot snapshot write to Redis failed: {e}")
+
+    def age(self, snapshot: Optional[Dict[str, Any]]) -> Optional[float]:
+        """Alter eines Snapshots in Sekunden."""
+        if not snapshot or 'built_at' not in snapshot:
+            return None
+        return time.time() - float(snapshot['built_at'])
+
+    # ------------------------------------------------------------------
+    # Single-Flight
+    # ------------------------------------------------------------------
+
+    def acquire_refresh_lock(self) -> Optional[str]:
+        """Versucht den Export-Lock zu bekommen.
+
+        Returns:
+            Token bei Erfolg, None wenn bereits ein anderer Prozess/Thread exportiert
+        """
+        if not self._thread_lock.acquire(blocking=False):
+            return None
+
+        client = get_redis_client()
+        token = uuid.uuid4().hex
+        if client is None:
+            return token
+
+        try:
+            if client.set(LOCK_KEY, token, nx=True, ex=self.lock_timeout):
+                return token
+        except Exception as e:
+            # Redis-Fehler: lokal trotzdem exportieren statt gar nicht
+            logger.warning(f"HubSpot snapshot lock unavailable: {e}")
+            return token
+
+        self._thread_lock.release()
+        return None
+
+    def release_refresh_lock(self, token: str) -> None:
+        """Gibt den Export-Lock frei (nur wenn er noch uns gehört)."""
+        client = get_redis_client()
+        try:
+            if client is not None and client.get(LOCK_KEY) == token:
+                client.delete(LOCK_KEY)
+        except Exception as e:
+            logger.debug(f"HubSpot snapshot lock release failed: {e}")
+        finally:
+            if self._thread_lock.locked():
+                self._thread_lock.release()
+
+    def claim_refresh_enqueue(self) -> bool:
+        """Single-Flight für das Einreihen eines Refreshs aus dem Request-Pfad.
+
+        Returns:
+            True wenn dieser Aufrufer den Refresh einreihen soll; False wenn
+            bereits ein Refresh eingereiht ist oder läuft (Marker läuft nach
+            lock_timeout ab, falls der Task verloren geht)
+        """
+        client = get_redis_client()
+        if client is not None:
+            try:
+                return bool(client.set(QUEUED_KEY, '1', nx=True, ex=self.lock_timeout))
+            except Exception as e:
+                logger.warning(f"HubSpot snapshot queue marker unavailable: {e}")
+
+        with self._queued_lock:
+            now = time.time()
+            if now < self._queued_until:
+                return False
+            self._queued_until = now + self.lock_timeout
+            return True
+
+    def release_refresh_enqueue(self) -> None:
+        """Entfernt den Einreih-Marker (Refresh fertig oder Einreihen fehlgeschlagen)."""
+        self._queued_until = 0.0
+        client = get_redis_client()
+        try:
+            if client is not None:
+                client.delete(QUEUED_KEY)
+        except Exception as e:
+            logger.debug(f"HubSpot snapshot queue marker release failed: {e}")
+
+    def wait_for_snapshot(self, timeout: float, poll_interval: float = 0.5) -> Optional[Dict[str, Any]]:
+        """Wartet bis ein anderer Prozess/Thread den Snapshot gebaut hat."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            snapshot = self.get()
+            if snapshot is not None:
+                return snapshot
+            time.sleep(poll_interval)
+        return self.get()
+
+    def clear(self) -> None:
+        """Verwirft den lokalen Snapshot (Tests)."""
+        self._local = None
+        self._local_version = None
+        self._queued_until = 0.0
+
+
+# Singleton-Instanz
+hubspot_snapshot_store = HubSpotSnapshotStore()
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+HubSpot Celery tasks.
+
+Scheduled via Celery Beat (see CELERY["beat_schedule"] in app/__init__.py):
+
+    celery -A celery_worker:celery_app beat --loglevel=info
+"""
+import logging
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def refresh_hubspot_snapshot_task():
+    """Refresh the shared HubSpot analytics snapshot from one full export."""
+    from app.services.hubspot_service import hubspot_service
+
+    if not hubspot_service.is_available:
+        logger.debug("HubSpot snapshot refresh skipped: integration not available")
+        return {"status": "skipped"}
+
+    refreshed = hubspot_service.refresh_snapshot()
+    return {"status": "refreshed" if refreshed else "not_refreshed"}
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+HubSpot Webhook Inbox
+
+Entkoppelt den Webhook-Request von der Verarbeitung:
+- ``store()``: Roh-Body als Datei im Inbox-Verzeichnis (fsync + rename),
+  danach antwortet der Endpoint sofort mit 200
+- ``drain()``: liest gespeicherte Batches, filtert Deal-Stage-Änderungen,
+  dedupliziert über einen geteilten Store, fasst mehrere Änderungen pro Deal
+  zur letzten zusammen und schreibt alle Queue-Items mit einem Save
+
+Dedup-Keys liegen in Redis (``SET NX EX`` pro Event, TTL) oder ohne Redis in
+einer JSON-Datei, die nur unter dem Drain-Lock gelesen/geschrieben wird. Der
+Drain-Lock ist ein File-Lock, damit immer nur ein Gunicorn-Worker draint.
+
+Ein Daemon-Thread pro Prozess draint kurz nach dem Eingang (Bursts werden
+gesammelt) und danach in festem Intervall für Reste. ``create_app`` startet
+ihn beim Boot (``start()``), damit nach Crash/Neustart liegengebliebene
+Batches auch ohne neuen Webhook verarbeitet werden.
+"""
+
+import os
+import json
+import time
+import uuid
+import atexit
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.utils.file_lock import file_lock, FileLockException
+from app.utils.json_utils import atomic_read_json, atomic_write_json
+from app.utils.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_DEDUP_PREFIX = "hubspot:webhook:seen:"
+# Dedup-Fenster: HubSpot wiederholt fehlgeschlagene Zustellungen bis zu 3 Tage
+WEBHOOK_DEDUP_TTL = int(os.getenv("HUBSPOT_WEBHOOK_DEDUP_TTL", str(7 * 24 * 3600)))
+# Max. Events pro Drain-Durchlauf (ganze Batches, ggf. etwas mehr)
+WEBHOOK_DRAIN_BATCH = int(os.getenv("HUBSPOT_WEBHOOK_DRAIN_BATCH", "500"))
+# Wartezeit nach einem Eingang, damit ein Burst in einem Durchlauf landet
+WEBHOOK_DRAIN_DELAY = float(os.getenv("HUBSPOT_WEBHOOK_DRAIN_DELAY", "2.0"))
+# Periodischer Drain für Reste (fehlgeschlagene Durchläufe, Neustart)
+WEBHOOK_DRAIN_INTERVAL = float(os.getenv("HUBSPOT_WEBHOOK_DRAIN_INTERVAL", "60"))
+
+
+def event_key(event: dict) -> str:
+    """Eindeutiger Key eines Events für die Deduplizierung"""
+    return (
+        f"{event.get('objectId')}:{event.get('propertyName')}:"
+        f"{event.get('propertyValue')}:{event.get('occurredAt', '')}"
+    )
+
+
+def is_stage_change(event: Any) -> bool:
+    return (
+        isinstance(event, dict)
+        and event.get('subscriptionType') == 'deal.propertyChange'
+        and event.get('propertyName') == 'dealstage'
+    )
+
+
+def coalesce_stage_changes(events: Iterable[dict]) -> Dict[str, dict]:
+    """
+    Mehrere Stage-Änderungen pro Deal zur letzten zusammenfassen
+
+    Returns:
+        {deal_id: {'new_stage', 'previous_stage', 'occurred_at', 'events'}},
+        previous_stage ist die Ausgangs-Stage der frühesten Änderung
+    """
+    result: Dict[str, dict] = {}
+    ordered = sorted(events, key=lambda e: int(e.get('occurredAt') or 0))
+    for event in ordered:
+        deal_id = str(event.get('objectId', ''))
+        entry = result.get(deal_id)
+        if entry is None:
+            entry = result[deal_id] = {
+                'previous_stage': event.get('previousPropertyValue', ''),
+                'events': 0,
+            }
+        entry['new_stage'] = event.get('propertyValue', '')
+        entry['occurred_at'] = event.get('occurredAt')
+        entry['events'] += 1
+    return result
+
+
+class WebhookDedupStore:
+    """Verarbeitete Event-Keys (Redis mit TTL, sonst JSON-Datei unter Drain-Lock)"""
+
+    def __init__(self, path: str, ttl: int = WEBHOOK_DEDUP_TTL):
+        self.path = path
+        self.ttl = ttl
+
+    @staticmethod
+    def _redis_key(key: str) -> str:
+        return WEBHOOK_DEDUP_PREFIX + hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def seen(self, keys: List[str]) -> Set[str]:
+        """Teilmenge von ``keys``, die bereits verarbeitet wurde"""
+        if not keys:
+            return set()
+        client = get_redis_client()
+        if client is not None:
+            try:
+                pipe = client.pipeline()
+                for key in keys:
+                    pipe.exists(self._redis_key(key))
+                return {key for key, hit in zip(keys, pipe.execute()) if hit}
+            except Exception as e:
+                logger.warning(f"Redis webhook dedup read failed, using file store: {e}")
+        known = self._load()
+        return {key for key in keys if key in known}
+
+    def mark(self, keys: List[str]) -> None:
+        if not keys:
+            return
+        client = get_redis_client()
+        if client is not None:
+            try:
+                pipe = client.pipeline()
+                for key in keys:
+                    pipe.set(self._redis_key(key), 1, ex=self.ttl, nx=True)
+                pipe.execute()
+                return
+            except Exception as e:
+                logger.warning(f"Redis webhook dedup write failed, using file store: {e}")
+        known = self._load()
+        now = time.time()
+        known.update({key: now for key in keys})
+        atomic_write_json(self.path, known, indent=None)
+
+    def _load(self) -> Dict[str, float]:
+        known = atomic_read_json(self.path, default={}) or {}
+        cutoff = time.time() - self.ttl
+        return {key: ts for key, ts in known.items() if ts >= cutoff}
+
+
+class HubSpotWebhookInbox:
+    """Dauerhafte Inbox für Webhook-Batches und gebündelte Verarbeitung"""
+
+    def __init__(self, base_dir: Optional[str] = None, dedup: Optional[WebhookDedupStore] = None,
+                 background: bool = True, drain_delay: float = WEBHOOK_DRAIN_DELAY,
+                 drain_interval: float = WEBHOOK_DRAIN_INTERVAL):
+        if base_dir is None:
+            persist_base = os.getenv("PERSIST_BASE", "data")
+            base_dir = os.path.join(persist_base, "persistent", "hubspot_webhooks")
+        self.inbox_dir = base_dir
+        self.lock_path = os.path.join(base_dir, ".drain")
+        self.dedup = dedup or WebhookDedupStore(
+            os.path.join(os.path.dirname(base_dir), "hubspot_webhook_seen.json"))
+        self.background = background
+        self.drain_delay = drain_delay
+        self.drain_interval = drain_interval
+        self._cond = threading.Condition()
+        self._wake = False
+        self._thread = None
+        self._stopped = False
+
+    # ========== Eingang (Request-Thread) ==========
+
+    def store(self, raw_body: bytes) -> str:
+        """
+        Speichert einen Roh-Batch dauerhaft (fsync + atomarer Rename)
+
+        Returns:
+            Batch-ID (Dateiname ohne Endung)
+
+        Raises:
+            OSError: wenn nicht gespeichert werden konnte (Endpoint antwortet 5xx,
+            HubSpot stellt erneut zu)
+        """
+        os.makedirs(self.inbox_dir, exist_ok=True)
+        batch_id = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        final_path = os.path.join(self.inbox_dir, f"{batch_id}.json")
+        tmp_path = final_path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(raw_body)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, final_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self.notify()
+        return batch_id
+
+    def pending_batches(self) -> List[str]:
+        try:
+            names = os.listdir(self.inbox_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(os.path.join(self.inbox_dir, n) for n in names if n.endswith(".json"))
+
+    # ========== Verarbeitung ==========
+
+    def drain(self, max_events: int = WEBHOOK_DRAIN_BATCH) -> Dict[str, int]:
+        """
+        Verarbeitet gespeicherte Batches bis ``max_events`` Events
+
+        Bei einem Fehler beim Queue-Write bleiben Batches und Dedup-Keys
+        unverändert; der nächste Durchlauf versucht es erneut.
+
+        Returns:
+            Statistik: batches, events, duplicates, deals, queued
+        """
+        stats = {"batches": 0, "events": 0, "duplicates": 0, "deals": 0, "queued": 0}
+        os.makedirs(self.inbox_dir, exist_ok=True)
+        try:
+            with file_lock(self.lock_path, timeout=0.5):
+                while True:
+                    batch_stats = self._drain_once(max_events)
+                    for key, value in batch_stats.items():
+                        stats[key] += value
+                    if not batch_stats["batches"] or not self.pending_batches():
+                        break
+        except FileLockException:
+            logger.debug("HubSpot webhook drain already running in another worker")
+        return stats
+
+    def _drain_once(self, max_events: int) -> Dict[str, int]:
+        stats = {"batches": 0, "events": 0, "duplicates": 0, "deals": 0, "queued": 0}
+        batch_files, events = [], []
+        for path in self.pending_batches():
+            try:
+                with open(path, "rb") as f:
+                    payload = json.loads(f.read() or b"null")
+            except (OSError, ValueError) as e:
+                logger.error(f"Unreadable HubSpot webhook batch {path}: {e}")
+                os.replace(path, path + ".bad")
+                continue
+            batch_files.append(path)
+            events.extend(payload if isinstance(payload, list) else [payload])
+            if len(events) >= max_events:
+                break
+
+        stats["batches"] = len(batch_files)
+        if not batch_files:
+            return stats
+
+        changes = [e for e in events if is_stage_change(e)]
+        stats["events"] = len(changes)
+
+        unique: Dict[str, dict] = {}
+        for event in changes:
+            unique.setdefault(event_key(event), event)
+        already = self.dedup.seen(list(unique))
+        fresh = [event for key, event in unique.items() if key not in already]
+        stats["duplicates"] = len(changes) - len(fresh)
+
+        deals = coalesce_stage_changes(fresh)
+        stats["deals"] = len(deals)
+
+        entries = []
+        for deal_id, change in deals.items():
+            entry = self._build_queue_entry(deal_id, change['new_stage'], change['previous_stage'])
+            if entry is not None:
+                entry['_deal_id'] = deal_id
+                entry['_change'] = change
+                entries.append(entry)
+
+        if entries:
+            from app.services.hubspot_queue_service import hubspot_queue_service
+            # Ein Load/Save für den ganzen Batch; Exception -> Batch bleibt liegen
+            items = hubspot_queue_service.add_many_to_queue(entries, strict=True)
+            stats["queued"] = len(items)
+            self._audit(entries, items)
+
+        self.dedup.mark(list(unique))
+        for path in batch_files:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+        logger.info(
+            f"HubSpot webhook drain: {stats['batches']} batches, {stats['events']} stage changes, "
+            f"{stats['duplicates']} duplicates, {stats['deals']} deals, {stats['queued']} queued"
+        )
+        return stats
+
+    def _build_queue_entry(self, deal_id: str, new_stage: str, previous_stage: str) -> Optional[dict]:
+        """Deal-Details holen und Stage auf lokalen Outcome mappen"""
+        from app.config.base import hubspot_config
+        from app.services.hubspot_service import hubspot_service
+
+        deal_info = hubspot_service.get_deal(deal_id)
+        if not deal_info:
+            logger.warning(f"Could not fetch deal {deal_id} from HubSpot, skipping")
+            return None
+
+        suggested_outcome = hubspot_config.REVERSE_STAGE_MAPPING.get(new_stage, 'unknown')
+        return {
+            'outcome_data': {
+                'customer': deal_info.get('dealname', ''),
+                'date': deal_info.get('datum_t1', '') or '',
+                'time': deal_info.get('uhrzeit_t1', '') or '',
+                'outcome': suggested_outcome,
+                'consultant': deal_info.get('telefonist', ''),
+            },
+            'deal_info': deal_info,
+            'suggested_action': suggested_outcome,
+            'stage': new_stage,
+            'note': f"HubSpot Stage-Change: {previous_stage} → {new_stage}",
+        }
+
+    def _audit(self, entries: List[dict], items: List[dict]) -> None:
+        try:
+            from app.services.audit_service import audit_service
+            for entry, item in zip(entries, items):
+                change = entry['_change']
+                audit_service.log_event(
+                    event_type='hubspot',
+                    action='webhook_processed',
+                    details={
+                        'deal_id': entry['_deal_id'],
+                        'new_stage': change['new_stage'],
+                        'previous_stage': change['previous_stage'],
+                        'coalesced_events': change['events'],
+                        'suggested_outcome': entry['suggested_action'],
+                        'queue_item_id': item.get('id'),
+                        'customer': entry['outcome_data']['customer'],
+                    },
+                )
+        except Exception as e:
+            logger.warning(f"HubSpot webhook audit failed: {e}")
+
+    # ========== Hintergrund-Thread ==========
+
+    def notify(self) -> None:
+        """Weckt den Drain-Thread (startet ihn bei Bedarf)"""
+        if not self.background:
+            return
+        with self._cond:
+            self._wake = True
+            self._ensure_started()
+            self._cond.notify()
+
+    def start(self) -> None:
+        """Startet den Drain-Thread beim Boot; der erste Durchlauf holt Reste ab"""
+        self.notify()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="hubspot-webhook-drain", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped:
+            with self._cond:
+                if not self._wake:
+                    self._cond.wait(self.drain_interval)
+                self._wake = False
+            if self._stopped:
+                break
+            # Burst sammeln
+            time.sleep(self.drain_delay)
+            try:
+                self.drain()
+            except Exception as e:
+                logger.error(f"HubSpot webhook drain failed: {e}", exc_info=True)
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+
+# Globale Instanz
+webhook_inbox = HubSpotWebhookInbox()
+atexit.register(webhook_inbox.stop)
@@ -240,23 +240,14 @@ class LevelSystem:
             # Send level-up notification
             try:
                 from app.services.notification_service import notification_service
-                import uuid as _uuid
-                all_notifs = notification_service._load_all_notifications()
-                if user not in all_notifs:
-                    all_notifs[user] = []
-                all_notifs[user].append({
-                    'id': str(_uuid.uuid4())[:8],
-                    'type': 'success',
-                    'title': 'Level Up!',
-                    'message': f"Du bist auf Level {new_level} aufgestiegen!",
-                    'timestamp': now_ts,
-                    'read': False,
-                    'dismissed': False,
-                    'show_popup': True,
-                    'roles': [],
-                    'actions': [{'text': 'Profil', 'url': '/slots/profile'}],
-                })
-                notification_service._save_all_notifications(all_notifs)
+                notification_service.notify_user(
+                    user,
+                    'Level Up!',
+                    f"Du bist auf Level {new_level} aufgestiegen!",
+                    notification_type='success',
+                    show_popup=True,
+                    actions=[{'text': 'Profil', 'url': '/slots/profile'}],
+                )
             except Exception as notif_err:
                 logger.debug(f"Level-up notification skipped: {notif_err}")
 
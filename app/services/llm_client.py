@@ -5,12 +5,31 @@ Shared HTTP client for vLLM communication.
 Provides connection pooling, automatic retries on transient errors,
 and robust JSON parsing with structured error handling.
 
+On top of single requests the client offers:
+- ``chat_completions([...])``: a batch of prompts with bounded concurrency
+- ``LLMResponseCache``: parsed responses keyed by model, prompt hash and
+  sampling parameters in a size-limited SQLite file, so re-running the
+  pipeline on an unchanged document costs no prompts. Entries are tagged
+  with their owner (document file hash or session) so DSGVO deletion can
+  purge them
+- ``LLMBudget``: per-process requests/tokens per minute; callers wait for
+  capacity (backpressure) instead of overloading the GPU server
+- ``metrics()``: request, cache, token and latency counters
+
 All Finanzberatung LLM services should use this client instead of
 making direct requests.post() calls.
 """
 
+import os
 import json
+import time
+import hashlib
 import logging
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 import requests
 from requests.adapters import HTTPAdapter
@@ -20,12 +39,265 @@ from app.config.base import FinanzConfig as finanz_config
 
 logger = logging.getLogger(__name__)
 
+# Grobe Token-Schätzung für das Budget, bis die Antwort echte usage-Werte liefert
+CHARS_PER_TOKEN = 4
+
+
+def session_cache_owner(session_id: int) -> str:
+    """Cache owner for prompts built from a whole session (scorecard, search queries)."""
+    return f"session:{session_id}"
+
+
+class LLMResponseCache:
+    """
+    Parsed LLM responses keyed by sha256(model + prompt + sampling params).
+
+    Stored in a small SQLite file (shared between worker processes). Entries
+    are evicted least-recently-used once the stored size exceeds ``max_bytes``.
+    Each entry can be tagged with owners (document file hash, see
+    ``session_cache_owner``); ``purge(owner)`` drops them on DSGVO deletion.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        self._path = path
+        self.max_bytes = (
+            max_bytes if max_bytes is not None
+            else finanz_config.FINANZ_LLM_CACHE_MAX_MB * 1024 * 1024
+        )
+        self._local = threading.local()
+
+    @property
+    def path(self) -> str:
+        return self._path or finanz_config.get_llm_cache_path()
+
+    @staticmethod
+    def key(model: str, prompt: str, params: dict) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        sampling = json.dumps(params, sort_keys=True)
+        return hashlib.sha256(f"{model}\n{prompt_hash}\n{sampling}".encode("utf-8")).hexdigest()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+                "last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS owners ("
+                "owner TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (owner, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_owners_key ON owners (key)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_many(self, keys: list[str]) -> dict[str, dict]:
+        found: dict[str, dict] = {}
+        unique = list(dict.fromkeys(keys))
+        if not unique:
+            return found
+        try:
+            conn = self._conn()
+            for i in range(0, len(unique), 500):
+                batch = unique[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, response FROM responses WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, response in rows:
+                    found[key] = json.loads(response)
+            if found:
+                with conn:
+                    conn.executemany(
+                        "UPDATE responses SET last_used = ? WHERE key = ?",
+                        [(time.time(), key) for key in found],
+                    )
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning("LLM cache read failed: %s", e)
+        return found
+
+    def put(self, key: str, response: dict, owner: Optional[str] = None) -> None:
+        payload = json.dumps(response, ensure_ascii=False)
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, payload, len(payload.encode("utf-8")), time.time()),
+                )
+                if owner:
+                    conn.execute("INSERT OR IGNORE INTO owners (owner, key) VALUES (?, ?)", (owner, key))
+            self._trim(conn)
+        except sqlite3.Error as e:
+            logger.warning("LLM cache write failed: %s", e)
+
+    def tag(self, keys: list[str], owner: str) -> None:
+        """Record ``owner`` for existing entries (cache hits of another document)."""
+        if not keys or not owner:
+            return
+        try:
+            conn = self._conn()
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO owners (owner, key) VALUES (?, ?)",
+                    [(owner, key) for key in dict.fromkeys(keys)],
+                )
+        except sqlite3.Error as e:
+            logger.warning("LLM cache tag failed: %s", e)
+
+    def purge(self, owner: Optional[str]) -> int:
+        """Delete all entries tagged with ``owner``; returns the number of deleted responses."""
+        if not owner:
+            return 0
+        try:
+            conn = self._conn()
+            with conn:
+                keys = [(key,) for (key,) in conn.execute("SELECT key FROM owners WHERE owner = ?", (owner,))]
+                conn.executemany("DELETE FROM responses WHERE key = ?", keys)
+                conn.executemany("DELETE FROM owners WHERE key = ?", keys)
+            return len(keys)
+        except sqlite3.Error as e:
+            logger.warning("LLM cache purge failed: %s", e)
+            return 0
+
+    def _trim(self, conn: sqlite3.Connection) -> None:
+        """Evict least-recently-used entries down to 90% of ``max_bytes``."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - int(self.max_bytes * 0.9)
+        evict = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            evict.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        with conn:
+            conn.executemany("DELETE FROM responses WHERE key = ?", evict)
+            conn.executemany("DELETE FROM owners WHERE key = ?", evict)
+        logger.debug("LLM cache trimmed %d entries", len(evict))
+
+    def size(self) -> int:
+        try:
+            return self._conn().execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def clear(self) -> None:
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute("DELETE FROM responses")
+                conn.execute("DELETE FROM owners")
+        except sqlite3.Error as e:
+            logger.warning("LLM cache clear failed: %s", e)
+
+
+class LLMBudget:
+    """
+    Rolling one-minute budget of requests and tokens for this process.
+
+    ``acquire`` blocks until the request fits into the window (or
+    ``max_wait`` seconds passed); ``settle`` replaces the token estimate with
+    the usage reported by the server. A limit of 0 disables that dimension.
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None,
+                 tokens_per_minute: Optional[int] = None,
+                 max_wait: Optional[float] = None,
+                 window: float = 60.0):
+        self.window = window
+        self.requests_per_minute = (
+            requests_per_minute if requests_per_minute is not None
+            else finanz_config.FINANZ_LLM_BUDGET_REQUESTS_PER_MIN
+        )
+        self.tokens_per_minute = (
+            tokens_per_minute if tokens_per_minute is not None
+            else finanz_config.FINANZ_LLM_BUDGET_TOKENS_PER_MIN
+        )
+        self.max_wait = max_wait if max_wait is not None else finanz_config.FINANZ_LLM_BUDGET_MAX_WAIT
+        self._cond = threading.Condition()
+        # [timestamp, tokens] pro Request im Fenster
+        self._window: deque = deque()
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests_per_minute > 0 or self.tokens_per_minute > 0
+
+    def acquire(self, tokens: int) -> Optional[list]:
+        """
+        Reserve one request and ``tokens`` tokens.
+
+        Returns:
+            Reservation handle for ``settle``, or None if the budget stayed
+            exhausted for ``max_wait`` seconds
+        """
+        entry = [time.monotonic(), tokens]
+        if not self.enabled:
+            return entry
+        deadline = time.monotonic() + self.max_wait
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                if self._fits(tokens):
+                    entry[0] = now
+                    self._window.append(entry)
+                    return entry
+                remaining = deadline - now
+                if remaining <= 0:
+                    return None
+                # Aufwachen, sobald der älteste Eintrag aus dem Fenster fällt
+                next_expiry = self._window[0][0] + self.window - now if self._window else remaining
+                self._cond.wait(timeout=max(0.01, min(remaining, next_expiry)))
+
+    def settle(self, entry: list, tokens: int) -> None:
+        with self._cond:
+            entry[1] = tokens
+            self._cond.notify_all()
+
+    def usage(self) -> dict:
+        with self._cond:
+            self._expire(time.monotonic())
+            return {"requests": len(self._window), "tokens": sum(e[1] for e in self._window)}
+
+    def _expire(self, now: float) -> None:
+        while self._window and self._window[0][0] <= now - self.window:
+            self._window.popleft()
+
+    def _fits(self, tokens: int) -> bool:
+        if not self._window:
+            return True  # ein einzelner Request passt immer, auch wenn er allein das Budget sprengt
+        if self.requests_per_minute and len(self._window) + 1 > self.requests_per_minute:
+            return False
+        if self.tokens_per_minute and sum(e[1] for e in self._window) + tokens > self.tokens_per_minute:
+            return False
+        return True
+
+    def _after_fork(self) -> None:
+        self._cond = threading.Condition()
+        self._window = deque()
+
 
 class LLMClient:
     """HTTP client for vLLM with connection pooling and retry logic."""
 
-    def __init__(self):
+    def __init__(self, cache: Optional[LLMResponseCache] = None,
+                 budget: Optional[LLMBudget] = None,
+                 max_concurrency: Optional[int] = None):
         self._session = None
+        self.cache = cache
+        self.budget = budget or LLMBudget()
+        self.max_concurrency = max(1, max_concurrency or finanz_config.FINANZ_LLM_MAX_CONCURRENCY)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._reset_metrics()
 
     @property
     def session(self) -> requests.Session:
@@ -37,8 +309,8 @@ class LLMClient:
                 status_forcelist=[502, 503, 504],
             )
             adapter = HTTPAdapter(
-                pool_connections=5,
-                pool_maxsize=5,
+                pool_connections=self.max_concurrency,
+                pool_maxsize=self.max_concurrency,
                 max_retries=retry,
             )
             self._session.mount("http://", adapter)
@@ -51,32 +323,168 @@ class LLMClient:
         max_tokens: int = 100,
         temperature: float = 0.1,
         timeout: int = 30,
+        cache_owner: Optional[str] = None,
     ) -> dict | None:
         """
         Send a chat completion request to vLLM.
 
+        Args:
+            cache_owner: document file hash or ``session_cache_owner(id)`` whose
+                data the prompt contains; the cached answer is purged with it
+
         Returns:
             Parsed JSON dict from the LLM response, or None on any error.
         """
+        return self.chat_completions([{
+            "prompt": prompt,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "timeout": timeout,
+            "cache_owner": cache_owner,
+        }])[0]
+
+    def chat_completions(self, batch: list[dict], max_concurrency: Optional[int] = None) -> list[dict | None]:
+        """
+        Send a batch of chat completion requests with bounded concurrency.
+
+        Args:
+            batch: dicts with ``prompt`` and optional ``max_tokens``,
+                ``temperature``, ``timeout``, ``cache_owner`` (same defaults as
+                chat_completion)
+            max_concurrency: at most this many requests of the batch in flight
+                (additionally capped process-wide by FINANZ_LLM_MAX_CONCURRENCY)
+
+        Returns:
+            One parsed JSON dict (or None on error) per request, in order.
+            Cached responses and duplicate prompts within the batch are not sent.
+        """
+        model = finanz_config.FINANZ_LLM_MODEL
+        normalized = []
+        for request in batch:
+            params = {
+                "max_tokens": request.get("max_tokens", 100),
+                "temperature": request.get("temperature", 0.1),
+            }
+            key = LLMResponseCache.key(model, request["prompt"], params)
+            normalized.append((key, request["prompt"], params, request.get("timeout", 30)))
+
+        keys = [key for key, _, _, _ in normalized]
+        results: dict[str, dict | None] = self.cache.get_many(keys) if self.cache else {}
+        self._count("cache_hits", sum(1 for key in keys if key in results))
+
+        pending = {}
+        for key, prompt, params, timeout in normalized:
+            if key not in results:
+                pending.setdefault(key, (prompt, params, timeout))
+
+        if pending:
+            workers = min(len(pending), max_concurrency or self.max_concurrency, self.max_concurrency)
+            if workers == 1:
+                fresh = [self._send(model, *args) for args in pending.values()]
+            else:
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm") as pool:
+                    fresh = list(pool.map(lambda args: self._send(model, *args), pending.values()))
+            for key, response in zip(pending, fresh):
+                results[key] = response
+                if response is not None and self.cache:
+                    self.cache.put(key, response)
+
+        if self.cache:
+            owned: dict[str, list[str]] = {}
+            for key, request in zip(keys, batch):
+                if request.get("cache_owner") and results[key] is not None:
+                    owned.setdefault(request["cache_owner"], []).append(key)
+            for owner, owner_keys in owned.items():
+                self.cache.tag(owner_keys, owner)
+
+        return [results[key] for key in keys]
+
+    def metrics(self) -> dict:
+        """Counters since process start (or ``reset_metrics``) plus latency percentiles."""
+        with self._lock:
+            snapshot = dict(self._metrics)
+            latencies = sorted(self._latencies)
+        if latencies:
+            snapshot["latency_avg_ms"] = round(sum(latencies) / len(latencies) * 1000, 1)
+            snapshot["latency_p95_ms"] = round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1)
+        else:
+            snapshot["latency_avg_ms"] = snapshot["latency_p95_ms"] = None
+        snapshot["budget"] = self.budget.usage()
+        return snapshot
+
+    def reset_metrics(self) -> None:
+        with self._lock:
+            self._reset_metrics()
+
+    # ---------------------------------------------------------------
+    # Internals
+    # ---------------------------------------------------------------
+
+    def _reset_metrics(self) -> None:
+        self._metrics = {
+            "requests": 0, "cache_hits": 0, "errors": 0,
+            "budget_waits": 0, "budget_rejected": 0,
+            "prompt_tokens": 0, "completion_tokens": 0,
+            "in_flight": 0, "max_in_flight": 0,
+        }
+        # Latenzen der letzten Requests (Sekunden)
+        self._latencies = deque(maxlen=1000)
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._metrics[name] += amount
+
+    def _send(self, model: str, prompt: str, params: dict, timeout: int) -> dict | None:
+        estimate = len(prompt) // CHARS_PER_TOKEN + params["max_tokens"]
+        started = time.monotonic()
+        reservation = self.budget.acquire(estimate)
+        if reservation is None:
+            self._count("budget_rejected")
+            logger.warning("LLM budget exhausted for %ss, request skipped", self.budget.max_wait)
+            return None
+        if time.monotonic() - started > 0.01:
+            self._count("budget_waits")
+
+        with self._slots:
+            with self._lock:
+                self._metrics["in_flight"] += 1
+                self._metrics["requests"] += 1
+                self._metrics["max_in_flight"] = max(self._metrics["max_in_flight"], self._metrics["in_flight"])
+            started = time.monotonic()
+            try:
+                return self._post(model, prompt, params, timeout, reservation)
+            finally:
+                with self._lock:
+                    self._metrics["in_flight"] -= 1
+                    self._latencies.append(time.monotonic() - started)
+
+    def _post(self, model: str, prompt: str, params: dict, timeout: int, reservation: list) -> dict | None:
         try:
             response = self.session.post(
                 f"{finanz_config.FINANZ_LLM_BASE_URL}/chat/completions",
                 json={
-                    "model": finanz_config.FINANZ_LLM_MODEL,
+                    "model": model,
                     "messages": [{"role": "user", "content": prompt}],
-                    "temperature": temperature,
-                    "max_tokens": max_tokens,
+                    "temperature": params["temperature"],
+                    "max_tokens": params["max_tokens"],
                 },
                 timeout=timeout,
             )
             response.raise_for_status()
 
             data = response.json()
+            usage = data.get("usage") or {}
+            if usage:
+                self._count("prompt_tokens", usage.get("prompt_tokens", 0))
+                self._count("completion_tokens", usage.get("completion_tokens", 0))
+                self.budget.settle(reservation, usage.get("total_tokens", reservation[1]))
+
             choices = data.get("choices", [])
             if not choices or "message" not in choices[0]:
                 logger.error(
                     "Unexpected vLLM response structure: %s", str(data)[:300]
                 )
+                self._count("errors")
                 return None
 
             content = choices[0]["message"].get("content", "").strip()
@@ -84,10 +492,22 @@ class LLMClient:
 
         except json.JSONDecodeError as e:
             logger.warning("vLLM returned invalid JSON: %s", e)
+            self._count("errors")
             return None
         except requests.RequestException as e:
             logger.error("vLLM request failed: %s", e)
+            self._count("errors")
             return None
 
+    def _after_fork(self) -> None:
+        self._session = None
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._reset_metrics()
+        self.budget._after_fork()
+
+
+llm_client = LLMClient(cache=LLMResponseCache() if finanz_config.FINANZ_LLM_CACHE_ENABLED else None)
 
-llm_client = LLMClient()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=llm_client._after_fork)
@@ -1,6 +1,12 @@
 # -*- coding: utf-8 -*-
 """
 Lootbox / Crate System - Purchase, open and collect rewards from crates
+
+Jede Operation betrifft nur einen User:
+- PostgreSQL: Kisten-Zeile per SELECT ... FOR UPDATE, Coins/Punkte/Kosmetik als
+  Einzelzeilen-Updates, alles in einer Transaktion
+- JSON-Fallback: ein Shard pro User (lootboxes/<user>.json) unter Datei-Lock
+- History: append-only (lootbox_history bzw. lootboxes/<user>.history.jsonl)
 """
 
 import os
@@ -9,9 +15,11 @@ import random
 import logging
 import uuid
 from datetime import datetime
+from urllib.parse import quote
 
 import pytz
 
+from app.utils.file_lock import file_lock
 from app.utils.json_utils import atomic_read_json, atomic_write_json
 
 logger = logging.getLogger(__name__)
@@ -19,8 +27,16 @@ logger = logging.getLogger(__name__)
 USE_POSTGRES = os.getenv('USE_POSTGRES', 'true').lower() == 'true'
 
 try:
-    from app.models.gamification import LootboxData as LootboxDataModel
-    from app.utils.db_utils import db_session_scope
+    from sqlalchemy import update
+    from sqlalchemy.exc import IntegrityError
+    from app.models.gamification import (
+        LootboxData as LootboxDataModel,
+        LootboxHistory as LootboxHistoryModel,
+        Score as ScoreModel,
+    )
+    from app.models.user import User as UserModel
+    from app.models.cosmetics import UserCosmetic as UserCosmeticModel
+    from app.utils.db_utils import db_session_scope, db_session_scope_no_commit
     POSTGRES_AVAILABLE = True
 except ImportError:
     POSTGRES_AVAILABLE = False
@@ -102,185 +118,385 @@ COSMETIC_DROPS = {
 PITY_THRESHOLD = 10  # Guaranteed rare+ after this many opens without one
 
 
+def _berlin_naive(iso_timestamp):
+    """ISO-Zeitstempel -> naive Berlin-Lokalzeit (Spaltenformat von lootbox_history)"""
+    dt = datetime.fromisoformat(iso_timestamp)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(TZ).replace(tzinfo=None)
+    return dt
+
+
+def _history_entry(row):
+    return {
+        "crate_id": row.crate_id,
+        "crate_type": row.crate_type,
+        "reward": row.reward,
+        "opened_at": TZ.localize(row.opened_at).isoformat(),
+    }
+
+
+class _PgLedger:
+    """Coins, Punkte und Kosmetik eines Users innerhalb der laufenden PG-Transaktion"""
+
+    def __init__(self, session, username):
+        self.session = session
+        self.username = username
+
+    def adjust_coins(self, delta, minimum=None):
+        """total_coins += delta als ein UPDATE; liefert (gebucht, Kontostand)"""
+        stmt = update(UserModel).where(UserModel.username == self.username)
+        if minimum is not None:
+            stmt = stmt.where(UserModel.total_coins + delta >= minimum)
+        balance = self.session.execute(
+            stmt.values(total_coins=UserModel.total_coins + delta).returning(UserModel.total_coins)
+        ).scalar()
+        if balance is not None:
+            return True, balance
+
+        current = self.session.query(UserModel.total_coins).filter_by(username=self.username).scalar()
+        if current is None:
+            logger.warning(f"User {self.username} not found in PostgreSQL, coins not booked")
+        return False, current or 0
+
+    def add_points(self, month, points):
+        """Monats-Score += points (Upsert auf idx_username_month)"""
+        stmt = update(ScoreModel).where(
+            ScoreModel.username == self.username, ScoreModel.month == month
+        ).values(points=ScoreModel.points + points)
+        if self.session.execute(stmt).rowcount:
+            return
+        try:
+            with self.session.begin_nested():
+                self.session.add(ScoreModel(
+                    username=self.username, month=month, points=points, bookings_count=0
+                ))
+        except IntegrityError:
+            # Parallel angelegt: dann eben addieren
+            self.session.execute(stmt)
+
+    def grant_cosmetic(self, reward):
+        """Kosmetik freischalten; False, wenn der User sie schon besitzt"""
+        row = self.session.query(UserCosmeticModel).filter_by(
+            username=self.username, item_id=reward["item_id"]
+        ).with_for_update().first()
+        if row is not None:
+            if row.is_owned:
+                return False
+            row.is_owned = True
+            row.unlock_date = datetime.now(TZ).replace(tzinfo=None)
+            return True
+        try:
+            with self.session.begin_nested():
+                self.session.add(UserCosmeticModel(
+                    username=self.username,
+                    item_id=reward["item_id"],
+                    item_type=reward["item_type"],
+                    item_category="visual",
+                    name=reward["item_name"],
+                    rarity=reward["rarity"],
+                    is_owned=True,
+                    is_active=False,
+                    unlock_date=datetime.now(TZ).replace(tzinfo=None),
+                    purchase_price=0,
+                ))
+        except IntegrityError:
+            return False
+        return True
+
+
+class _JsonLedger:
+    """Coins, Punkte und Kosmetik eines Users in den JSON-Stores, je Store unter dessen Datei-Lock"""
+
+    def __init__(self, username):
+        self.username = username
+
+    def adjust_coins(self, delta, minimum=None):
+        from app.services.daily_quests import daily_quest_system
+        path = daily_quest_system.coins_file
+        with file_lock(path):
+            coins = atomic_read_json(path, {})
+            balance = coins.get(self.username, 0) + delta
+            if minimum is not None and balance < minimum:
+                return False, balance - delta
+            coins[self.username] = balance
+            if not atomic_write_json(path, coins):
+                raise IOError(f"Could not write {path}")
+        return True, balance
+
+    def add_points(self, month, points):
+        from app.services.data_persistence import data_persistence
+        with file_lock(str(data_persistence.data_dir / "scores.json")):
+            scores = data_persistence.load_scores()
+            user_scores = scores.setdefault(self.username, {})
+            user_scores[month] = user_scores.get(month, 0) + points
+            if not data_persistence.save_scores(scores):
+                raise IOError("Could not write scores.json")
+
+    def grant_cosmetic(self, reward):
+        from app.services.cosmetics_shop import cosmetics_shop
+        with file_lock(cosmetics_shop.purchases_file):
+            purchases = cosmetics_shop.load_purchases()
+            if self.username not in purchases:
+                purchases[self.username] = {"titles": [], "themes": [], "avatars": [], "effects": [], "frames": [], "purchase_history": []}
+            user_purchases = purchases[self.username]
+
+            item_type = reward["item_type"]
+            list_key = item_type + "s" if item_type != "effect" else "effects"
+            owned = user_purchases.setdefault(list_key, [])
+            if reward["item_id"] in owned:
+                return False
+            owned.append(reward["item_id"])
+            user_purchases.setdefault("purchase_history", []).append({
+                "item_type": item_type,
+                "item_id": reward["item_id"],
+                "item_name": reward["item_name"],
+                "price": 0,
+                "source": "lootbox",
+                "purchased_at": datetime.now(TZ).isoformat(),
+            })
+            cosmetics_shop.save_purchases(purchases)
+        return True
+
+
 class LootboxService:
     def __init__(self):
         persist_base = os.getenv("PERSIST_BASE", "data")
+        # Legacy-Gesamtdatei: wird nur noch gelesen und pro User in den Shard übernommen
         self.lootbox_file = os.path.join(persist_base, "persistent", "lootboxes.json")
-        os.makedirs(os.path.dirname(self.lootbox_file), exist_ok=True)
-        if not os.path.exists(self.lootbox_file):
-            with open(self.lootbox_file, "w", encoding="utf-8") as f:
-                json.dump({}, f)
+        self.shard_dir = os.path.join(persist_base, "persistent", "lootboxes")
+        os.makedirs(self.shard_dir, exist_ok=True)
 
     # ------------------------------------------------------------------
     # Persistence
     # ------------------------------------------------------------------
 
-    def _load_data(self):
-        if USE_POSTGRES and POSTGRES_AVAILABLE:
-            try:
-                with db_session_scope() as session:
-                    rows = session.query(LootboxDataModel).all()
-                    data = {}
-                    for row in rows:
-                        data[row.username] = {
-                            "crates": row.crates or [],
-                            "history": row.history or [],
-                            "pity_counter": row.pity_counter
-                        }
-                    return data
-            except Exception as e:
-                logger.warning(f"PG lootbox read failed: {e}")
-        # JSON fallback
-        try:
-            data = atomic_read_json(self.lootbox_file)
-            return data if data is not None else {}
-        except Exception:
-            return {}
+    def _shard_path(self, username):
+        return os.path.join(self.shard_dir, f"{quote(username, safe='.-_@')}.json")
 
-    def _save_data(self, data):
-        # 1. PostgreSQL
-        if USE_POSTGRES and POSTGRES_AVAILABLE:
+    def _history_path(self, username):
+        return os.path.join(self.shard_dir, f"{quote(username, safe='.-_@')}.history.jsonl")
+
+    def _legacy_user(self, username):
+        """(Zustand, History) eines Users aus der alten lootboxes.json"""
+        user_data = (atomic_read_json(self.lootbox_file) or {}).get(username) or {}
+        state = {
+            "crates": user_data.get("crates", []),
+            "pity_counter": user_data.get("pity_counter", 0),
+        }
+        return state, user_data.get("history", [])
+
+    def _read_shard(self, username):
+        state = atomic_read_json(self._shard_path(username))
+        if state is not None:
+            return state
+        return self._legacy_user(username)[0]
+
+    def _read_shard_for_update(self, username):
+        """Shard lesen; beim ersten Zugriff Legacy-Daten übernehmen (Aufrufer hält den Shard-Lock)"""
+        state = atomic_read_json(self._shard_path(username))
+        if state is not None:
+            return state
+        state, history = self._legacy_user(username)
+        if history and not os.path.exists(self._history_path(username)):
+            self._append_history_json(username, history)
+        return state
+
+    def _append_history_json(self, username, entries):
+        lines = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries)
+        with open(self._history_path(username), "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def _write_json_state(self, username, state):
+        if state["history"]:
+            self._append_history_json(username, state["history"])
+        shard = {"crates": state["crates"], "pity_counter": state["pity_counter"]}
+        if not atomic_write_json(self._shard_path(username), shard):
+            raise IOError(f"Could not write lootbox shard for {username}")
+
+    def _locked_row(self, session, username):
+        """LootboxData-Zeile des Users mit Zeilensperre (legt sie bei Bedarf an)"""
+        query = session.query(LootboxDataModel).filter_by(username=username).with_for_update()
+        row = query.first()
+        if row is None:
             try:
+                with session.begin_nested():
+                    session.add(LootboxDataModel(username=username, crates=[], history=None, pity_counter=0))
+            except IntegrityError:
+                pass  # parallel angelegt
+            row = query.first()
+
+        # Alte, gekürzte History-Liste einmalig in lootbox_history überführen
+        if row.history:
+            for entry in row.history:
+                session.add(LootboxHistoryModel(
+                    username=username,
+                    crate_id=entry["crate_id"],
+                    crate_type=entry["crate_type"],
+                    reward=entry["reward"],
+                    opened_at=_berlin_naive(entry["opened_at"]),
+                ))
+            row.history = None
+        return row
+
+    def _transaction(self, username, operation):
+        """
+        ``operation(state, ledger)`` auf dem gesperrten Stand eines Users ausführen.
+
+        ``state`` enthält crates, pity_counter und die in dieser Operation neu
+        angehängten history-Einträge. Gespeichert wird nur bei ``success``.
+        Der Shard-Lock serialisiert den User prozessübergreifend; mit PostgreSQL
+        läuft alles in einer Transaktion und der Shard wird danach als Backup
+        geschrieben.
+        """
+        with file_lock(self._shard_path(username)):
+            if USE_POSTGRES and POSTGRES_AVAILABLE:
                 with db_session_scope() as session:
-                    for username, user_data in data.items():
-                        existing = session.query(LootboxDataModel).filter_by(
-                            username=username
-                        ).first()
-                        if existing:
-                            existing.crates = user_data.get("crates", [])
-                            existing.history = user_data.get("history", [])
-                            existing.pity_counter = user_data.get("pity_counter", 0)
-                        else:
-                            session.add(LootboxDataModel(
+                    row = self._locked_row(session, username)
+                    state = {"crates": list(row.crates or []), "pity_counter": row.pity_counter, "history": []}
+                    result = operation(state, _PgLedger(session, username))
+                    if result.get("success"):
+                        row.crates = state["crates"]
+                        row.pity_counter = state["pity_counter"]
+                        for entry in state["history"]:
+                            session.add(LootboxHistoryModel(
                                 username=username,
-                                crates=user_data.get("crates", []),
-                                history=user_data.get("history", []),
-                                pity_counter=user_data.get("pity_counter", 0)
+                                crate_id=entry["crate_id"],
+                                crate_type=entry["crate_type"],
+                                reward=entry["reward"],
+                                opened_at=_berlin_naive(entry["opened_at"]),
                             ))
-            except Exception as e:
-                logger.error(f"PG lootbox save failed: {e}")
-
-        # 2. JSON
-        try:
-            atomic_write_json(self.lootbox_file, data)
-        except Exception as e:
-            logger.error(f"Could not save lootbox data: {e}")
-
-    def _get_user_data(self, data, username):
-        if username not in data:
-            data[username] = {
-                "crates": [],
-                "history": [],
-                "pity_counter": 0,
-            }
-        return data[username]
+                if result.get("success"):
+                    try:
+                        self._write_json_state(username, state)
+                    except Exception as e:
+                        logger.error(f"Lootbox JSON backup failed for {username}: {e}")
+                return result
+
+            state = dict(self._read_shard_for_update(username), history=[])
+            result = operation(state, _JsonLedger(username))
+            if result.get("success"):
+                self._write_json_state(username, state)
+            return result
 
     # ------------------------------------------------------------------
     # Purchase
     # ------------------------------------------------------------------
 
-    def purchase_crate(self, username, crate_type):
-        """Purchase a crate. Caller must handle coin deduction."""
+    def purchase_crate(self, username, crate_type, charge=False):
+        """
+        Purchase a crate.
+
+        With ``charge=True`` the price is debited in the same transaction and the
+        purchase fails if the balance is too low; otherwise the crate is free
+        (e.g. quest rewards).
+        """
         if crate_type not in CRATE_TYPES:
             return {"success": False, "message": "Unbekannter Kisten-Typ"}
 
         crate_info = CRATE_TYPES[crate_type]
         crate_id = str(uuid.uuid4())[:8]
+        price = crate_info["price"]
+
+        def purchase(state, ledger):
+            result = {
+                "success": True,
+                "crate_id": crate_id,
+                "crate_type": crate_type,
+                "crate_name": crate_info["name"],
+                "price": price,
+            }
+            if charge:
+                booked, balance = ledger.adjust_coins(-price, minimum=0)
+                if not booked:
+                    return {"success": False, "message": f"Nicht genug Coins! Benötigt: {price}, Verfügbar: {balance}"}
+                result["remaining_coins"] = balance
+
+            state["crates"].append({
+                "id": crate_id,
+                "type": crate_type,
+                "purchased_at": datetime.now(TZ).isoformat(),
+                "opened": False,
+            })
+            return result
 
-        data = self._load_data()
-        user_data = self._get_user_data(data, username)
+        try:
+            result = self._transaction(username, purchase)
+        except Exception as e:
+            logger.error(f"Crate purchase failed for {username}: {e}")
+            return {"success": False, "message": "Kiste konnte nicht gespeichert werden"}
 
-        crate = {
-            "id": crate_id,
-            "type": crate_type,
-            "purchased_at": datetime.now(TZ).isoformat(),
-            "opened": False,
-        }
-        user_data["crates"].append(crate)
-        self._save_data(data)
-
-        logger.info(f"{username} purchased {crate_type} crate ({crate_id})")
-        return {
-            "success": True,
-            "crate_id": crate_id,
-            "crate_type": crate_type,
-            "crate_name": crate_info["name"],
-            "price": crate_info["price"],
-        }
+        if result["success"]:
+            logger.info(f"{username} purchased {crate_type} crate ({crate_id})")
+        return result
 
     # ------------------------------------------------------------------
     # Open
     # ------------------------------------------------------------------
 
     def open_crate(self, username, crate_id):
-        """Open a purchased crate and roll loot."""
-        data = self._load_data()
-        user_data = self._get_user_data(data, username)
-
-        # Find crate
-        crate = None
-        for c in user_data["crates"]:
-            if c["id"] == crate_id and not c.get("opened"):
-                crate = c
-                break
-
-        if not crate:
-            return {"success": False, "message": "Kiste nicht gefunden oder bereits geoeffnet"}
-
-        crate_type = crate["type"]
-        loot_table = LOOT_TABLES.get(crate_type, LOOT_TABLES["common"])
-
-        # Pity system
-        pity = user_data.get("pity_counter", 0)
-        reward = self._roll_loot(loot_table, pity)
-
-        # Update pity counter
-        is_good_drop = reward["type"] == "cosmetic" and reward.get("rarity") in ("epic", "legendary")
-        if is_good_drop:
-            user_data["pity_counter"] = 0
-        else:
-            user_data["pity_counter"] = pity + 1
-
-        # Mark crate opened
-        crate["opened"] = True
-        crate["opened_at"] = datetime.now(TZ).isoformat()
-        crate["reward"] = reward
-
-        # Record history
-        user_data["history"].append({
-            "crate_id": crate_id,
-            "crate_type": crate_type,
-            "reward": reward,
-            "opened_at": crate["opened_at"],
-        })
-
-        # Keep only last 50 history entries
-        if len(user_data["history"]) > 50:
-            user_data["history"] = user_data["history"][-50:]
-
-        self._save_data(data)
-
-        # Apply reward
-        applied = self._apply_reward(username, reward)
-
-        logger.info(f"{username} opened {crate_type} crate ({crate_id}): {reward['type']} - {reward.get('display', '')}")
+        """Open a purchased crate, roll loot and grant it in the same transaction."""
+
+        def open_(state, ledger):
+            crate = None
+            for c in state["crates"]:
+                if c["id"] == crate_id and not c.get("opened"):
+                    crate = c
+                    break
+
+            if not crate:
+                return {"success": False, "message": "Kiste nicht gefunden oder bereits geoeffnet"}
+
+            crate_type = crate["type"]
+            loot_table = LOOT_TABLES.get(crate_type, LOOT_TABLES["common"])
+
+            # Pity system
+            pity = state.get("pity_counter", 0)
+            reward = self._roll_loot(loot_table, pity)
+
+            is_good_drop = reward["type"] == "cosmetic" and reward.get("rarity") in ("epic", "legendary")
+            state["pity_counter"] = 0 if is_good_drop else pity + 1
+
+            # Geöffnete Kiste wandert aus dem Inventar in die History
+            state["crates"].remove(crate)
+            state["history"].append({
+                "crate_id": crate_id,
+                "crate_type": crate_type,
+                "reward": reward,
+                "opened_at": datetime.now(TZ).isoformat(),
+            })
+
+            return {
+                "success": True,
+                "reward": reward,
+                "applied": self._apply_reward(ledger, reward),
+                "crate_type": crate_type,
+            }
+
+        try:
+            result = self._transaction(username, open_)
+        except Exception as e:
+            logger.error(f"Failed to open crate {crate_id} for {username}: {e}")
+            return {"success": False, "message": "Kiste konnte nicht geoeffnet werden"}
+
+        if not result["success"]:
+            return result
+
+        reward = result["reward"]
+        self._apply_inventory_reward(username, reward, result["applied"])
+
+        logger.info(f"{username} opened {result['crate_type']} crate ({crate_id}): {reward['type']} - {reward.get('display', '')}")
 
         try:
             from app.services.audit_service import audit_service
             audit_service.log('lootbox_opened', username, {
-                'crate_type': crate_type,
+                'crate_type': result['crate_type'],
                 'reward_type': reward['type'],
                 'reward_display': reward.get('display', ''),
             })
         except Exception as e:
             logger.debug(f"Audit log for lootbox skipped: {e}")
 
-        return {
-            "success": True,
-            "reward": reward,
-            "applied": applied,
-            "crate_type": crate_type,
-        }
+        return result
 
     def _roll_loot(self, loot_table, pity_counter):
         """Weighted random roll from a loot table with pity system."""
@@ -341,56 +557,35 @@ class LootboxService:
 
         return {"type": "coins", "amount": 10, "display": "10 Coins"}
 
-    def _apply_reward(self, username, reward):
-        """Actually grant the reward to the user. Returns dict with what was applied."""
+    def _apply_reward(self, ledger, reward):
+        """Grant coins, XP and cosmetics via the transaction's ledger. Returns dict with what was applied."""
         reward_type = reward["type"]
         applied = {"type": reward_type}
 
-        try:
-            if reward_type == "coins":
-                from app.services.daily_quests import daily_quest_system
-                coins_data = daily_quest_system.load_user_coins()
-                coins_data[username] = coins_data.get(username, 0) + reward["amount"]
-                daily_quest_system.save_user_coins(coins_data)
+        if reward_type == "coins":
+            booked, _ = ledger.adjust_coins(reward["amount"])
+            if booked:
                 applied["amount"] = reward["amount"]
+            else:
+                applied["error"] = "Coin-Konto nicht gefunden"
+
+        elif reward_type == "xp":
+            # XP is added via scores (10 points = XP in level system)
+            ledger.add_points(datetime.now(TZ).strftime("%Y-%m"), reward["amount"] // 10)
+            applied["xp"] = reward["amount"]
+
+        elif reward_type == "cosmetic":
+            # Grant cosmetic to user without coin cost
+            ledger.grant_cosmetic(reward)
+            applied["item_id"] = reward["item_id"]
+
+        return applied
 
-            elif reward_type == "xp":
-                # XP is added via scores (10 points = XP in level system)
-                from app.services.data_persistence import data_persistence
-                scores = data_persistence.load_scores()
-                import pytz
-                month = datetime.now(TZ).strftime("%Y-%m")
-                if username not in scores:
-                    scores[username] = {}
-                scores[username][month] = scores[username].get(month, 0) + (reward["amount"] // 10)
-                data_persistence.save_scores(scores)
-                applied["xp"] = reward["amount"]
-
-            elif reward_type == "cosmetic":
-                from app.services.cosmetics_shop import cosmetics_shop
-                # Grant cosmetic to user without coin cost
-                purchases = cosmetics_shop.load_purchases()
-                if username not in purchases:
-                    purchases[username] = {"titles": [], "themes": [], "avatars": [], "effects": [], "frames": [], "purchase_history": []}
-
-                item_type = reward["item_type"]
-                list_key = item_type + "s" if item_type != "effect" else "effects"
-                if list_key not in purchases[username]:
-                    purchases[username][list_key] = []
-                if reward["item_id"] not in purchases[username].get(list_key, []):
-                    purchases[username][list_key].append(reward["item_id"])
-                    purchases[username]["purchase_history"].append({
-                        "item_type": item_type,
-                        "item_id": reward["item_id"],
-                        "item_name": reward["item_name"],
-                        "price": 0,
-                        "source": "lootbox",
-                        "purchased_at": datetime.now(TZ).isoformat(),
-                    })
-                    cosmetics_shop.save_purchases(purchases)
-                applied["item_id"] = reward["item_id"]
-
-            elif reward_type == "booster":
+    def _apply_inventory_reward(self, username, reward, applied):
+        """Booster, Shields and spins live in the gameplay inventory store and are granted after commit."""
+        reward_type = reward["type"]
+        try:
+            if reward_type == "booster":
                 from app.services.gameplay_rewards import gameplay_rewards
                 gameplay_rewards.activate_xp_booster(
                     username,
@@ -413,22 +608,48 @@ class LootboxService:
             logger.error(f"Failed to apply lootbox reward for {username}: {e}")
             applied["error"] = str(e)
 
-        return applied
-
     # ------------------------------------------------------------------
     # Queries
     # ------------------------------------------------------------------
 
     def get_unopened_crates(self, username):
-        data = self._load_data()
-        user_data = self._get_user_data(data, username)
-        return [c for c in user_data["crates"] if not c.get("opened")]
-
-    def get_loot_history(self, username, limit=20):
-        data = self._load_data()
-        user_data = self._get_user_data(data, username)
-        history = user_data.get("history", [])
-        return list(reversed(history[-limit:]))
+        if USE_POSTGRES and POSTGRES_AVAILABLE:
+            try:
+                with db_session_scope_no_commit() as session:
+                    crates = session.query(LootboxDataModel.crates).filter_by(username=username).scalar()
+                    return [c for c in (crates or []) if not c.get("opened")]
+            except Exception as e:
+                logger.warning(f"PG lootbox read failed: {e}")
+        return [c for c in self._read_shard(username)["crates"] if not c.get("opened")]
+
+    def get_loot_history(self, username, limit=20, offset=0):
+        """Opened crates, newest first; ``offset`` skips the newest entries (pagination)."""
+        if USE_POSTGRES and POSTGRES_AVAILABLE:
+            try:
+                with db_session_scope_no_commit() as session:
+                    rows = (
+                        session.query(LootboxHistoryModel)
+                        .filter(LootboxHistoryModel.username == username)
+                        .order_by(LootboxHistoryModel.id.desc())
+                        .offset(offset)
+                        .limit(limit)
+                        .all()
+                    )
+                    return [_history_entry(row) for row in rows]
+            except Exception as e:
+                logger.warning(f"PG lootbox history read failed: {e}")
+
+        try:
+            with open(self._history_path(username), "rb") as f:
+                lines = [line for line in f.read().splitlines() if line.strip()]
+        except FileNotFoundError:
+            history = self._legacy_user(username)[1]
+            return list(reversed(history))[offset:offset + limit]
+
+        # Nur die Zeilen der angefragten Seite dekodieren
+        end = max(len(lines) - offset, 0)
+        page = lines[max(end - limit, 0):end]
+        return [json.loads(line) for line in reversed(page)]
 
 
 lootbox_service = LootboxService()
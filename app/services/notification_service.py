@@ -5,16 +5,45 @@ Zentrale Verwaltung für Benachrichtigungen mit Rollenbasierung
 
 PostgreSQL Dual-Write: Neue Notifications werden in beide Systeme geschrieben.
 Reads sind PG-first mit JSON-Fallback.
+
+Einzel-Notifications (Badges, Level-Ups, Quests) laufen über notify_user /
+notify_users: ein PG-Insert plus eine Zeile im Append-Log des Users
+(notifications/<user>.jsonl) statt Laden und Neuschreiben des ganzen Stores.
+Die Append-Logs werden beim Lesen des JSON-Stores eingemischt und beim
+nächsten vollständigen Speichern in den Store übernommen.
+
+Polling (Dashboard-Stats, Popup-Abfrage) läuft über NotificationState: pro
+User ein Unread-Zähler und ein Versionsstempel im Cache, gepflegt von allen
+schreibenden Methoden. Solange sich nichts ändert, beantworten die Endpoints
+Polls per ETag/304 ohne DB- oder Dateizugriff.
 """
 
+import json
 import logging
 import os
+import threading
+import time
 import uuid
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+import pytz
+
 from app.core.extensions import data_persistence
+from app.utils.file_lock import file_lock
+from app.utils.redis_client import get_redis_client
 
 logger = logging.getLogger(__name__)
+TZ = pytz.timezone('Europe/Berlin')
+
+APPEND_LOG_DIR = 'notifications'
+
+NOTIFICATION_STATE_PREFIX = 'notifications:state:'
+# Lebensdauer des Redis-Hashes (wird bei jeder Änderung erneuert)
+NOTIFICATION_STATE_TTL = int(os.getenv('NOTIFICATION_STATE_TTL', str(24 * 3600)))
+# Ohne Redis: wie lange ein Worker seinem lokalen Stand vertraut
+NOTIFICATION_STATE_LOCAL_TTL = float(os.getenv('NOTIFICATION_STATE_LOCAL_TTL', '30'))
 
 # PostgreSQL dual-write support
 USE_POSTGRES = os.getenv('USE_POSTGRES', 'true').lower() == 'true'
@@ -28,11 +57,152 @@ except ImportError:
     USE_POSTGRES = False
 
 
+# Neue Version setzen und Unread-Zähler anpassen: mode 'add' (nur wenn gecacht),
+# 'set' (absoluter Wert) oder 'drop' (beim nächsten Lesen neu zählen)
+_CHANGE_SCRIPT = """
+redis.call('HSET', KEYS[1], 'version', ARGV[1])
+if ARGV[2] == 'set' then
+    redis.call('HSET', KEYS[1], 'unread', ARGV[3])
+elseif ARGV[2] == 'add' and redis.call('HEXISTS', KEYS[1], 'unread') == 1 then
+    if redis.call('HINCRBY', KEYS[1], 'unread', ARGV[3]) < 0 then
+        redis.call('HDEL', KEYS[1], 'unread')
+    end
+elseif ARGV[2] ~= 'add' then
+    redis.call('HDEL', KEYS[1], 'unread')
+end
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+"""
+
+# Gezählten Wert nur übernehmen, wenn sich die Version seit dem Lesen nicht geändert hat
+_SET_UNREAD_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'version') == ARGV[1] then
+    redis.call('HSET', KEYS[1], 'unread', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+class NotificationState:
+    """
+    Per-User Unread-Zähler und Versionsstempel (Redis-Hash, In-Process-Fallback)
+
+    Die Version ändert sich bei jeder Änderung an den Notifications eines Users
+    und dient als ETag-Basis. Ohne Redis hält jeder Worker einen eigenen Stand,
+    der nach NOTIFICATION_STATE_LOCAL_TTL Sekunden neu aufgebaut wird; Änderungen
+    aus anderen Prozessen sind dann mit dieser Verzögerung sichtbar.
+    """
+
+    def __init__(self, ttl: int = NOTIFICATION_STATE_TTL,
+                 local_ttl: float = NOTIFICATION_STATE_LOCAL_TTL):
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self._lock = threading.Lock()
+        # username -> (gültig bis (monotonic), version, unread oder None)
+        self._local: Dict[str, Tuple[float, str, Optional[int]]] = {}
+
+    @staticmethod
+    def _new_version() -> str:
+        # Zeitbasiert statt Zähler: nach Ablauf des Hashes keine Wiederholung alter ETags
+        return str(time.time_ns())
+
+    def _local_entry(self, username: str) -> Tuple[float, str, Optional[int]]:
+        entry = self._local.get(username)
+        if entry is None or entry[0] < time.monotonic():
+            entry = (time.monotonic() + self.local_ttl, self._new_version(), None)
+            self._local[username] = entry
+        return entry
+
+    def get(self, username: str) -> Tuple[str, Optional[int]]:
+        """
+        Aktueller Stand für ``username``
+
+        Returns:
+            (version, unread) – unread ist None wenn nicht gecacht
+        """
+        client = get_redis_client()
+        if client is not None:
+            key = f"{NOTIFICATION_STATE_PREFIX}{username}"
+            try:
+                version, unread = client.hmget(key, 'version', 'unread')
+                if version is None:
+                    # HSETNX: parallel startende Worker einigen sich auf eine Version
+                    client.hsetnx(key, 'version', self._new_version())
+                    client.expire(key, self.ttl)
+                    version, unread = client.hmget(key, 'version', 'unread')
+                return str(version), int(unread) if unread is not None else None
+            except Exception as e:
+                logger.debug(f"Redis notification state read failed, using local state: {e}")
+
+        with self._lock:
+            _, version, unread = self._local_entry(username)
+        return version, unread
+
+    def set_unread(self, username: str, version: str, count: int) -> None:
+        """Cacht einen frisch gezählten Wert, sofern ``version`` noch aktuell ist"""
+        client = get_redis_client()
+        if client is not None:
+            try:
+                client.eval(_SET_UNREAD_SCRIPT, 1, f"{NOTIFICATION_STATE_PREFIX}{username}",
+                            version, count)
+                return
+            except Exception as e:
+                logger.debug(f"Redis notification state write failed, using local state: {e}")
+
+        with self._lock:
+            expires, current, _ = self._local_entry(username)
+            if current == version:
+                self._local[username] = (expires, current, count)
+
+    def changed(self, username: str, unread_delta: Optional[int] = None,
+                unread: Optional[int] = None) -> None:
+        """
+        Neue Version für ``username``
+
+        Args:
+            unread_delta: Zähler um diesen Wert anpassen (nur wenn gecacht)
+            unread: Zähler auf diesen Wert setzen
+            Ohne beides wird der Zähler verworfen und beim nächsten Lesen neu gezählt.
+        """
+        version = self._new_version()
+        if unread is not None:
+            mode, value = 'set', unread
+        elif unread_delta is not None:
+            mode, value = 'add', unread_delta
+        else:
+            mode, value = 'drop', 0
+
+        client = get_redis_client()
+        if client is not None:
+            try:
+                client.eval(_CHANGE_SCRIPT, 1, f"{NOTIFICATION_STATE_PREFIX}{username}",
+                            version, mode, value, self.ttl)
+                return
+            except Exception as e:
+                logger.debug(f"Redis notification state update failed, using local state: {e}")
+
+        with self._lock:
+            expires, _, cached = self._local_entry(username)
+            if mode == 'set':
+                cached = value
+            elif mode == 'drop' or cached is None or cached + value < 0:
+                cached = None
+            else:
+                cached += value
+            self._local[username] = (expires, version, cached)
+
+    def clear(self) -> None:
+        """Verwirft den lokalen Stand (Tests)"""
+        with self._lock:
+            self._local.clear()
+
+
 class NotificationService:
     """Service für rollenbasierte Benachrichtigungen"""
 
-    def __init__(self):
+    def __init__(self, state: Optional[NotificationState] = None):
         self.notifications_file = 'user_notifications'
+        self.state = state or NotificationState()
 
         # Rollen-Mapping: Welche User gehören zu welcher Rolle
         self.role_mapping = {
@@ -96,7 +266,7 @@ class NotificationService:
         if data_persistence is None:
             logger.warning("data_persistence not initialized, returning empty notifications")
             return {}
-        return data_persistence.load_data(self.notifications_file, {})
+        return self._merge_append_logs(data_persistence.load_data(self.notifications_file, {}))
 
     def _save_all_notifications(self, notifications: Dict[str, List[Dict]]):
         """Speichere alle Benachrichtigungen (JSON-Fallback-Store)"""
@@ -104,6 +274,186 @@ class NotificationService:
             logger.warning("data_persistence not initialized, skipping JSON save")
             return
         data_persistence.save_data(self.notifications_file, notifications)
+        self._compact_append_logs(notifications)
+
+    # ========== Append-Logs (JSON-Fallback für Einzel-Notifications) ==========
+
+    def _append_log_dir(self) -> Optional[str]:
+        if data_persistence is None:
+            return None
+        return os.path.join(str(data_persistence.data_dir), APPEND_LOG_DIR)
+
+    def _append_log_path(self, username: str) -> Optional[str]:
+        log_dir = self._append_log_dir()
+        if log_dir is None:
+            return None
+        return os.path.join(log_dir, f"{quote(username, safe='.-_@')}.jsonl")
+
+    def _read_append_log(self, path: str) -> List[Dict]:
+        entries = []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        logger.warning(f"Skipping corrupt notification log line in {path}")
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _append_user_notifications(self, username: str, notifications: List[Dict]) -> bool:
+        """Hängt Notifications an das Append-Log des Users an (O(neue Einträge))"""
+        path = self._append_log_path(username)
+        if path is None:
+            logger.warning("data_persistence not initialized, skipping JSON append")
+            return False
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            lines = ''.join(json.dumps(n, ensure_ascii=False) + '\n' for n in notifications)
+            with file_lock(path):
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(lines)
+            return True
+        except Exception as e:
+            logger.error(f"Notification append failed for {username}: {e}")
+            return False
+
+    def _iter_append_logs(self):
+        log_dir = self._append_log_dir()
+        if log_dir is None:
+            return
+        try:
+            names = sorted(os.listdir(log_dir))
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name.endswith('.jsonl'):
+                yield unquote(name[:-len('.jsonl')]), os.path.join(log_dir, name)
+
+    def _merge_append_logs(self, store: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+        """Store + noch nicht übernommene Append-Log-Einträge (Store bleibt unverändert)"""
+        merged = dict(store)
+        for username, path in self._iter_append_logs():
+            known = {n.get('id') for n in merged.get(username, [])}
+            extra = [n for n in self._read_append_log(path) if n.get('id') not in known]
+            if extra:
+                merged[username] = list(merged.get(username, [])) + extra
+        return merged
+
+    def _compact_append_logs(self, saved: Dict[str, List[Dict]]) -> None:
+        """Entfernt Log-Einträge, die jetzt im Store stehen"""
+        for username, path in self._iter_append_logs():
+            saved_ids = {n.get('id') for n in saved.get(username, [])}
+            try:
+                with file_lock(path):
+                    entries = self._read_append_log(path)
+                    remaining = [n for n in entries if n.get('id') not in saved_ids]
+                    if len(remaining) == len(entries):
+                        continue
+                    if not remaining:
+                        os.remove(path)
+                        continue
+                    tmp = f"{path}.tmp"
+                    with open(tmp, 'w', encoding='utf-8') as f:
+                        f.writelines(json.dumps(n, ensure_ascii=False) + '\n' for n in remaining)
+                    os.replace(tmp, path)
+            except Exception as e:
+                logger.warning(f"Notification log compaction failed for {username}: {e}")
+
+    # ========== Einzel-/Bulk-Notifications ==========
+
+    def notify_user(
+        self,
+        username: str,
+        title: str,
+        message: str,
+        notification_type: str = 'info',
+        show_popup: bool = False,
+        actions: Optional[List[Dict[str, str]]] = None
+    ) -> Dict:
+        """
+        Erstelle eine Notification für genau einen User
+
+        Ein PG-Insert plus eine Append-Zeile im JSON-Fallback; der Gesamtstore
+        wird weder gelesen noch geschrieben.
+
+        Returns:
+            Die erstellte Notification (JSON-Format)
+        """
+        return self.notify_users([{
+            'username': username,
+            'title': title,
+            'message': message,
+            'type': notification_type,
+            'show_popup': show_popup,
+            'actions': actions or [],
+        }])[0]
+
+    def notify_users(self, items: List[Dict]) -> List[Dict]:
+        """
+        Erstelle mehrere Einzel-Notifications in einem Rutsch
+
+        Args:
+            items: Dicts mit 'username', 'title', 'message' und optional
+                   'type', 'show_popup', 'actions'
+
+        Returns:
+            Liste der erstellten Notifications (gleiche Reihenfolge)
+        """
+        if not items:
+            return []
+
+        created = []
+        for item in items:
+            created.append((item['username'], {
+                'id': str(uuid.uuid4())[:8],
+                'type': item.get('type', 'info'),
+                'title': item['title'],
+                'message': item['message'],
+                'timestamp': datetime.now(TZ).isoformat(),
+                'read': False,
+                'dismissed': False,
+                'show_popup': item.get('show_popup', False),
+                'roles': [],
+                'actions': item.get('actions') or [],
+            }))
+
+        # PostgreSQL: alle Rows in einer Transaktion
+        if USE_POSTGRES and POSTGRES_AVAILABLE:
+            try:
+                with db_session_scope() as session:
+                    session.add_all([
+                        NotificationModel(
+                            notification_id=f"{n['id']}-{username}",
+                            username=username,
+                            title=n['title'],
+                            message=n['message'],
+                            notification_type=n['type'],
+                            is_read=False,
+                            is_dismissed=False,
+                            show_popup=n['show_popup'],
+                            roles=[],
+                            actions=n['actions']
+                        )
+                        for username, n in created
+                    ])
+            except Exception as e:
+                logger.error(f"PG notification insert failed: {e}")
+
+        # JSON-Fallback: eine Append-Operation pro User
+        by_user: Dict[str, List[Dict]] = {}
+        for username, n in created:
+            by_user.setdefault(username, []).append(n)
+        for username, notifications in by_user.items():
+            self._append_user_notifications(username, notifications)
+            self.state.changed(username, unread_delta=len(notifications))
+            logger.info(f"Created {len(notifications)} notification(s) for {username}")
+
+        return [n for _, n in created]
 
     def _get_users_by_roles(self, roles: List[str]) -> List[str]:
         """
@@ -219,6 +569,9 @@ class NotificationService:
         # JSON write (immer)
         self._save_all_notifications(all_notifications)
 
+        for username in target_users:
+            self.state.changed(username, unread_delta=1)
+
         return created_count
 
     def get_user_notifications(
@@ -310,8 +663,10 @@ class NotificationService:
                 notification['read'] = True
                 self._save_all_notifications(all_notifications)
                 logger.info(f"Marked notification {notification_id} as read for {username}")
+                self.state.changed(username)
                 return True
 
+        self.state.changed(username)
         logger.warning(f"Notification {notification_id} not found for {username}")
         return False
 
@@ -348,14 +703,16 @@ class NotificationService:
                 notification['dismissed'] = True
                 self._save_all_notifications(all_notifications)
                 logger.info(f"Dismissed notification {notification_id} for {username}")
+                self.state.changed(username)
                 return True
 
+        self.state.changed(username)
         logger.warning(f"Notification {notification_id} not found for {username}")
         return False
 
     def get_unread_count(self, username: str) -> int:
         """
-        Anzahl ungelesener Benachrichtigungen — PG-first mit COUNT-Query
+        Anzahl ungelesener Benachrichtigungen — gecachter Zähler, sonst PG-COUNT
 
         Args:
             username: Username
@@ -363,6 +720,19 @@ class NotificationService:
         Returns:
             Anzahl ungelesener Notifications
         """
+        version, cached = self.state.get(username)
+        if cached is not None:
+            return cached
+
+        count = self._count_unread(username)
+        self.state.set_unread(username, version, count)
+        return count
+
+    def get_notification_version(self, username: str) -> str:
+        """Versionsstempel der Notifications von ``username`` (ETag-Basis, ohne DB-Zugriff)"""
+        return self.state.get(username)[0]
+
+    def _count_unread(self, username: str) -> int:
         if USE_POSTGRES and POSTGRES_AVAILABLE:
             try:
                 with db_session_scope() as session:
@@ -417,6 +787,8 @@ class NotificationService:
             self._save_all_notifications(all_notifications)
             logger.info(f"Marked {count} notifications as read for {username}")
 
+        self.state.changed(username, unread=0)
+
         # Gib PG-Count zurück wenn verfügbar, sonst JSON-Count
         return pg_count if (USE_POSTGRES and POSTGRES_AVAILABLE and pg_count > 0) else count
 
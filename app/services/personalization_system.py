@@ -178,13 +178,14 @@ GOAL_TEMPLATES = {
 
 class PersonalizationSystem:
     def __init__(self):
-        self.profiles_file = "data/persistent/user_profiles.json"
-        self.customization_file = "data/persistent/user_customizations.json"
-        self.goals_file = "data/persistent/personal_goals.json"
-        self.achievements_file = "data/persistent/customization_achievements.json"
+        persist_dir = os.path.join(os.getenv("PERSIST_BASE", "data"), "persistent")
+        self.profiles_file = os.path.join(persist_dir, "user_profiles.json")
+        self.customization_file = os.path.join(persist_dir, "user_customizations.json")
+        self.goals_file = os.path.join(persist_dir, "personal_goals.json")
+        self.achievements_file = os.path.join(persist_dir, "customization_achievements.json")
 
         # Ensure directories exist
-        os.makedirs("data/persistent", exist_ok=True)
+        os.makedirs(persist_dir, exist_ok=True)
 
         # Initialize files
         for file_path in [self.profiles_file, self.customization_file, self.goals_file, self.achievements_file]:
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Presence Service
+Online-Status über ein Redis Sorted Set (Score = letzter Heartbeat)
+
+- Heartbeat: ``ZADD presence:online {user: ts}`` – O(log n), kein Datei-Rewrite
+- Online-Abfrage: ``ZREVRANGEBYSCORE`` ab dem Timeout-Cutoff
+- Ablauf ist lazy: sehr alte Einträge werden beim Lesen entfernt
+- last_activity erreicht PostgreSQL gebündelt (ein executemany pro Intervall)
+
+Ohne Redis hält jeder Prozess ein eigenes Dict; andere Worker sind dann nur
+über die gebündelten PG-Updates sichtbar.
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import pytz
+
+from app.utils.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+TZ = pytz.timezone('Europe/Berlin')
+
+PRESENCE_KEY = "presence:online"
+PRESENCE_FLUSH_INTERVAL = float(os.getenv("PRESENCE_FLUSH_INTERVAL", "60"))
+# Einträge ohne Heartbeat länger als das werden beim Lesen entfernt
+PRESENCE_RETENTION_SECONDS = int(os.getenv("PRESENCE_RETENTION_SECONDS", str(24 * 3600)))
+
+# PostgreSQL Support
+USE_POSTGRES = os.getenv('USE_POSTGRES', 'true').lower() == 'true'
+
+try:
+    from app.models.user import User as UserModel
+    from app.utils.db_utils import db_session_scope
+    POSTGRES_AVAILABLE = True
+except ImportError:
+    POSTGRES_AVAILABLE = False
+    USE_POSTGRES = False
+
+
+class PresenceService:
+    """Heartbeats und Online-Abfragen (Redis ZSET, In-Process-Fallback)"""
+
+    def __init__(self, flush_interval: float = PRESENCE_FLUSH_INTERVAL,
+                 retention_seconds: int = PRESENCE_RETENTION_SECONDS):
+        self.flush_interval = flush_interval
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # username -> Unix-Timestamp (nur ohne Redis)
+        self._local: Dict[str, float] = {}
+        # username -> Unix-Timestamp, noch nicht nach PG geschrieben
+        self._pending: Dict[str, float] = {}
+        self._last_flush = time.monotonic()
+
+    @property
+    def is_shared(self) -> bool:
+        """True wenn der Status über Redis zwischen Workern geteilt wird"""
+        return get_redis_client() is not None
+
+    # ========== Heartbeats ==========
+
+    def heartbeat(self, username: str, timestamp: Optional[float] = None) -> None:
+        """Markiert ``username`` als aktiv"""
+        ts = timestamp if timestamp is not None else time.time()
+
+        client = get_redis_client()
+        stored = False
+        if client is not None:
+            try:
+                client.zadd(PRESENCE_KEY, {username: ts})
+                stored = True
+            except Exception as e:
+                logger.debug(f"Redis presence heartbeat failed, using local state: {e}")
+
+        with self._lock:
+            if not stored:
+                self._local[username] = ts
+            self._pending[username] = ts
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+
+        if due:
+            self.flush()
+
+    def remove(self, username: str) -> None:
+        """Entfernt ``username`` aus der Online-Liste (Logout)"""
+        client = get_redis_client()
+        if client is not None:
+            try:
+                client.zrem(PRESENCE_KEY, username)
+            except Exception as e:
+                logger.debug(f"Redis presence remove failed: {e}")
+        with self._lock:
+            self._local.pop(username, None)
+
+    # ========== Abfragen ==========
+
+    def online(self, timeout_seconds: float) -> List[Tuple[str, float]]:
+        """
+        Users mit Heartbeat innerhalb von ``timeout_seconds``
+
+        Returns:
+            Liste von (username, timestamp), neueste zuerst
+        """
+        now = time.time()
+        cutoff = now - timeout_seconds
+        expired = now - self.retention_seconds
+
+        client = get_redis_client()
+        if client is not None:
+            try:
+                client.zremrangebyscore(PRESENCE_KEY, "-inf", expired)
+                return [
+                    (member, float(score))
+                    for member, score in client.zrevrangebyscore(PRESENCE_KEY, "+inf", cutoff, withscores=True)
+                ]
+            except Exception as e:
+                logger.warning(f"Redis presence query failed, using local state: {e}")
+
+        with self._lock:
+            for username in [u for u, ts in self._local.items() if ts < expired]:
+                del self._local[username]
+            entries = [(u, ts) for u, ts in self._local.items() if ts >= cutoff]
+        entries.sort(key=lambda item: item[1], reverse=True)
+        return entries
+
+    # ========== PostgreSQL-Sync ==========
+
+    def flush(self) -> int:
+        """
+        Schreibt ausstehende last_activity-Werte gebündelt nach PostgreSQL
+
+        Returns:
+            Anzahl übertragener Users
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = self._pending
+                self._pending = {}
+                self._last_flush = time.monotonic()
+
+            if not batch or not (USE_POSTGRES and POSTGRES_AVAILABLE):
+                return 0
+
+            from sqlalchemy import bindparam
+
+            table = UserModel.__table__
+            params = [
+                {
+                    "b_username": username,
+                    "b_last_activity": datetime.fromtimestamp(ts, TZ).replace(tzinfo=None),
+                }
+                for username, ts in batch.items()
+            ]
+            try:
+                with db_session_scope() as session:
+                    session.execute(
+                        table.update()
+                        .where(table.c.username == bindparam("b_username"))
+                        .values(last_activity=bindparam("b_last_activity")),
+                        params,
+                    )
+                logger.debug(f"Presence flush: {len(params)} users synced to PostgreSQL")
+                return len(params)
+            except Exception as e:
+                logger.warning(f"Presence flush to PostgreSQL failed: {e}")
+                # Für den nächsten Versuch behalten (neuere Heartbeats gewinnen)
+                with self._lock:
+                    for username, ts in batch.items():
+                        if self._pending.get(username, 0) < ts:
+                            self._pending[username] = ts
+                return 0
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+
+# Globale Instanz
+presence_service = PresenceService()
+atexit.register(presence_service.flush)
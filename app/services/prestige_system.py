@@ -105,11 +105,12 @@ PRESTIGE_LEVELS = {
 
 class PrestigeSystem:
     def __init__(self):
-        self.prestige_file = "data/persistent/prestige_data.json"
-        self.mastery_file = "data/persistent/mastery_data.json"
+        persist_dir = os.path.join(os.getenv("PERSIST_BASE", "data"), "persistent")
+        self.prestige_file = os.path.join(persist_dir, "prestige_data.json")
+        self.mastery_file = os.path.join(persist_dir, "mastery_data.json")
 
         # Ensure directories exist
-        os.makedirs("data/persistent", exist_ok=True)
+        os.makedirs(persist_dir, exist_ok=True)
 
         # Initialize files
         for file_path in [self.prestige_file, self.mastery_file]:
@@ -23,10 +23,16 @@ def _parse_ts(ts: str) -> datetime:
         dt = TZ.localize(dt)
     return dt
 
+
+def _naive(dt: datetime) -> datetime:
+    """Berlin-Ortszeit ohne tzinfo (so liegen drawn_at/created_at in der DB)"""
+    return dt.astimezone(TZ).replace(tzinfo=None)
+
 # PostgreSQL Imports (for draw history migration)
 try:
     from app.models import T2DrawHistory, T2Booking, get_db_session, is_postgres_enabled
     from app.utils.db_utils import db_session_scope, db_session_scope_no_commit
+    from sqlalchemy import case, func, or_
     POSTGRES_IMPORTS_AVAILABLE = True
 except ImportError:
     POSTGRES_IMPORTS_AVAILABLE = False
@@ -40,6 +46,7 @@ if not os.path.exists(PERSIST_BASE):
 DATA_DIR = os.path.join(PERSIST_BASE, "persistent")
 BUCKET_FILE = os.path.join(DATA_DIR, "t2_bucket_system.json")
 T2_BOOKINGS_FILE = os.path.join(DATA_DIR, "t2_bookings.json")
+TRACKING_BOOKINGS_FILE = "data/tracking/bookings.jsonl"
 
 
 class T2AnalyticsService:
@@ -53,61 +60,85 @@ class T2AnalyticsService:
         from app.services.data_persistence import data_persistence
         self.data_persistence = data_persistence
 
-    def _load_bucket_data(self) -> Dict:
-        """Load T2 bucket system data with draw history (PostgreSQL-first, JSON fallback)"""
+        # Per-User-Index der T2-Buchungen (JSON fallback)
+        self._t2_index: Dict[str, List[Dict]] = {}
+        self._t2_index_key = None
+
+    def _load_user_draws(self, username: str) -> List[Dict]:
+        """Draw history of one user, oldest first (JSON: per-user index instead of full history)"""
         try:
-            from app.services.t2_bucket_system import load_bucket_data
-            return load_bucket_data()
+            from app.services.t2_bucket_system import load_draw_history
+            return load_draw_history(username=username)
         except Exception as e:
-            logger.warning(f"Failed to load bucket data via service, falling back to JSON: {e}")
+            logger.warning(f"Failed to load draw history via service, falling back to JSON: {e}")
             try:
                 if not os.path.exists(BUCKET_FILE):
-                    return {"draw_history": [], "probabilities": {}, "bucket": []}
+                    return []
 
                 with open(BUCKET_FILE, "r", encoding="utf-8") as f:
-                    return json.load(f)
+                    draws = json.load(f).get("draw_history", [])
+                return [d for d in draws if d.get("user") == username]
             except Exception as e2:
                 logger.error(f"Error loading bucket data from JSON: {e2}")
-                return {"draw_history": [], "probabilities": {}, "bucket": []}
+                return []
+
+    def _draws_table_empty(self, session) -> bool:
+        """Leere T2DrawHistory-Tabelle -> JSON-Historie wie bei load_draw_history()"""
+        return session.query(T2DrawHistory.id).first() is None
+
+    def _count_user_t2_bookings(self, username: str, week_start: datetime) -> Tuple[int, int]:
+        """
+        T2-Buchungen eines Users zählen (PostgreSQL-first, JSON fallback)
 
-    def _load_t2_bookings(self) -> List[Dict]:
-        """Load T2 bookings data (PostgreSQL-first, JSON fallback)"""
-        # Try PostgreSQL first
+        Returns:
+            (total, this_week) - this_week nach Buchungszeitpunkt (created_at)
+        """
         if POSTGRES_IMPORTS_AVAILABLE and is_postgres_enabled():
             try:
                 with db_session_scope_no_commit() as session:
-                    bookings = session.query(T2Booking).all()
-                    result = [booking.to_dict() for booking in bookings]
-                logger.debug(f"✅ Loaded {len(result)} T2 bookings from PostgreSQL (analytics)")
-                return result
+                    total, this_week = session.query(
+                        func.count(T2Booking.id),
+                        func.sum(case((T2Booking.created_at >= _naive(week_start), 1), else_=0))
+                    ).filter(T2Booking.user == username).one()
+                return total or 0, this_week or 0
             except Exception as e:
-                logger.warning(f"PostgreSQL T2 bookings load failed, falling back to JSON: {e}")
+                logger.warning(f"PostgreSQL T2 bookings count failed, falling back to JSON: {e}")
 
-        # Fallback to JSON
+        bookings = self._t2_bookings_by_user().get(username, [])
+        this_week = [
+            b for b in bookings
+            if _parse_ts(b.get("created_at") or "1970-01-01T00:00:00") >= week_start
+        ]
+        return len(bookings), len(this_week)
+
+    def _t2_bookings_by_user(self) -> Dict[str, List[Dict]]:
+        """Per-User-Index über t2_bookings.json (neu aufgebaut nur nach Schreibzugriffen)"""
         try:
-            if not os.path.exists(T2_BOOKINGS_FILE):
-                return []
+            st = os.stat(T2_BOOKINGS_FILE)
+        except OSError:
+            return {}
 
-            with open(T2_BOOKINGS_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return data.get("bookings", [])
-        except Exception as e:
-            logger.error(f"Error loading T2 bookings from JSON: {e}")
-            return []
+        key = (T2_BOOKINGS_FILE, st.st_mtime_ns, st.st_size)
+        if self._t2_index_key != key:
+            by_user = defaultdict(list)
+            try:
+                with open(T2_BOOKINGS_FILE, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                bookings = data.get("bookings", []) if isinstance(data, dict) else data
+                for booking in bookings:
+                    by_user[booking.get("user")].append(booking)
+            except Exception as e:
+                logger.error(f"Error loading T2 bookings from JSON: {e}")
+            self._t2_index = dict(by_user)
+            self._t2_index_key = key
 
-    def _load_tracking_bookings(self) -> List[Dict]:
-        """Load T1 Slot bookings from tracking system"""
-        try:
-            bookings_file = "data/tracking/bookings.jsonl"
-            if not os.path.exists(bookings_file):
-                return []
+        return self._t2_index
 
-            bookings = []
-            with open(bookings_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    if line.strip():
-                        bookings.append(json.loads(line))
-            return bookings
+    def _load_user_tracking_bookings(self, username: str) -> List[Dict]:
+        """T1 Slot-Buchungen eines Users aus dem Tracking-JSONL (über den Sidecar-Index)"""
+        try:
+            from app.services.tracking_system.booking_store import get_booking_store
+            return list(get_booking_store(TRACKING_BOOKINGS_FILE).iter_bookings(user=username))
         except Exception as e:
             logger.error(f"Error loading tracking bookings: {e}")
             return []
@@ -210,11 +241,7 @@ class T2AnalyticsService:
 
         # FALLBACK TO JSON (old behavior - only shows draws since last reset!)
         logger.warning(f"⚠️  Using JSON fallback for draw history (may be incomplete after bucket reset)")
-        bucket_data = self._load_bucket_data()
-        all_draws = bucket_data.get("draw_history", [])
-
-        # Filter by username
-        user_draws = [d for d in all_draws if d.get("user") == username]
+        user_draws = self._load_user_draws(username)
 
         # Apply date filters
         if start_date:
@@ -271,13 +298,95 @@ class T2AnalyticsService:
             Dict with total_draws, closer_distribution, favorite_closer,
             recent_activity, weekly_average, etc.
         """
-        bucket_data = self._load_bucket_data()
-        all_draws = bucket_data.get("draw_history", [])
-
-        # Filter user draws
-        user_draws = [d for d in all_draws if d.get("user") == username]
+        now = datetime.now(TZ)
+        week_start = now - timedelta(days=now.weekday())
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
+        aggregate = None
+        if POSTGRES_IMPORTS_AVAILABLE and is_postgres_enabled():
+            try:
+                aggregate = self._draw_stats_sql(username, week_start, month_start)
+            except Exception as e:
+                logger.warning(f"PostgreSQL draw stats failed, using JSON fallback: {e}")
+
+        if aggregate is None:
+            aggregate = self._draw_stats_json(username, week_start, month_start)
+
+        return self._build_draw_stats(aggregate, now)
+
+    def _draw_stats_sql(self, username: str, week_start: datetime, month_start: datetime) -> Optional[Dict]:
+        """Ein GROUP BY (closer, draw_type) über den (username, drawn_at)-Index"""
+        D = T2DrawHistory
+        with db_session_scope_no_commit() as session:
+            rows = session.query(
+                D.closer_drawn,
+                D.draw_type,
+                func.count(D.id),
+                func.sum(case((D.drawn_at >= _naive(week_start), 1), else_=0)),
+                func.sum(case((D.drawn_at >= _naive(month_start), 1), else_=0)),
+                func.min(D.drawn_at),
+            ).filter(
+                D.username == username
+            ).group_by(
+                D.closer_drawn, D.draw_type
+            ).order_by(
+                # Reihenfolge des ersten Auftretens (Tie-Break für favorite_closer)
+                func.min(D.drawn_at), func.min(D.id)
+            ).all()
+
+            if not rows:
+                return None if self._draws_table_empty(session) else self._empty_draw_aggregate()
+
+            last = session.query(D).filter(
+                D.username == username
+            ).order_by(D.drawn_at.desc(), D.id).first()
+
+            aggregate = self._empty_draw_aggregate()
+            for closer, draw_type, count, this_week, this_month, first in rows:
+                aggregate["total"] += count
+                aggregate["closers"][closer] += count
+                aggregate["draw_types"][draw_type] += count
+                aggregate["this_week"] += this_week or 0
+                aggregate["this_month"] += this_month or 0
+                first = _parse_ts(first.isoformat())
+                if aggregate["first"] is None or first < aggregate["first"]:
+                    aggregate["first"] = first
+            aggregate["last"] = last.to_dict()
+            return aggregate
+
+    def _draw_stats_json(self, username: str, week_start: datetime, month_start: datetime) -> Dict:
+        aggregate = self._empty_draw_aggregate()
+        user_draws = self._load_user_draws(username)
         if not user_draws:
+            return aggregate
+
+        for draw in user_draws:
+            ts = _parse_ts(draw["timestamp"])
+            aggregate["total"] += 1
+            aggregate["closers"][draw.get("closer")] += 1
+            aggregate["draw_types"][draw.get("draw_type")] += 1
+            aggregate["this_week"] += ts >= week_start
+            aggregate["this_month"] += ts >= month_start
+            if aggregate["first"] is None or ts < aggregate["first"]:
+                aggregate["first"] = ts
+        aggregate["last"] = max(user_draws, key=lambda x: x.get("timestamp", ""))
+        return aggregate
+
+    @staticmethod
+    def _empty_draw_aggregate() -> Dict:
+        return {
+            "total": 0,
+            "closers": Counter(),
+            "draw_types": Counter(),
+            "this_week": 0,
+            "this_month": 0,
+            "first": None,
+            "last": None,
+        }
+
+    @staticmethod
+    def _build_draw_stats(aggregate: Dict, now: datetime) -> Dict:
+        if not aggregate["total"]:
             return {
                 "total_draws": 0,
                 "closer_distribution": {},
@@ -289,38 +398,17 @@ class T2AnalyticsService:
                 "draw_types": {}
             }
 
-        # Calculate distributions
-        closer_counter = Counter(d.get("closer") for d in user_draws)
-        draw_type_counter = Counter(d.get("draw_type") for d in user_draws)
+        closer_counter = aggregate["closers"]
 
         # Favorite closer (most drawn)
         favorite_closer = closer_counter.most_common(1)[0][0] if closer_counter else None
 
-        # Time-based filters
-        now = datetime.now(TZ)
-        week_start = now - timedelta(days=now.weekday())
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        this_week_draws = [
-            d for d in user_draws
-            if _parse_ts(d["timestamp"]) >= week_start
-        ]
-
-        this_month_draws = [
-            d for d in user_draws
-            if _parse_ts(d["timestamp"]) >= month_start
-        ]
-
         # Calculate weekly average (if user has been active for more than 1 week)
-        if user_draws:
-            first_draw = min(_parse_ts(d["timestamp"]) for d in user_draws)
-            weeks_active = max(1, (now - first_draw).days / 7)
-            average_per_week = len(user_draws) / weeks_active
-        else:
-            average_per_week = 0.0
+        weeks_active = max(1, (now - aggregate["first"]).days / 7)
+        average_per_week = aggregate["total"] / weeks_active
 
         # Last draw
-        last_draw = max(user_draws, key=lambda x: x.get("timestamp", ""))
+        last_draw = aggregate["last"]
         try:
             last_draw_dt = datetime.fromisoformat(last_draw["timestamp"])
             last_draw_formatted = last_draw_dt.strftime("%d.%m.%Y %H:%M")
@@ -328,11 +416,11 @@ class T2AnalyticsService:
             last_draw_formatted = "N/A"
 
         return {
-            "total_draws": len(user_draws),
+            "total_draws": aggregate["total"],
             "closer_distribution": dict(closer_counter),
             "favorite_closer": favorite_closer,
-            "this_week": len(this_week_draws),
-            "this_month": len(this_month_draws),
+            "this_week": int(aggregate["this_week"]),
+            "this_month": int(aggregate["this_month"]),
             "average_per_week": round(average_per_week, 1),
             "last_draw": {
                 "closer": last_draw.get("closer"),
@@ -340,7 +428,7 @@ class T2AnalyticsService:
                 "timestamp": last_draw.get("timestamp"),
                 "formatted": last_draw_formatted
             } if last_draw else None,
-            "draw_types": dict(draw_type_counter)
+            "draw_types": dict(aggregate["draw_types"])
         }
 
     def search_draws(self, username: str, query: str) -> List[Dict]:
@@ -354,22 +442,25 @@ class T2AnalyticsService:
         Returns:
             List of matching draws
         """
-        bucket_data = self._load_bucket_data()
-        all_draws = bucket_data.get("draw_history", [])
+        query_lower = query.lower()
+        matches = None
 
-        # Filter by username
-        user_draws = [d for d in all_draws if d.get("user") == username]
+        if POSTGRES_IMPORTS_AVAILABLE and is_postgres_enabled():
+            try:
+                matches = self._search_draws_sql(username, query_lower)
+            except Exception as e:
+                logger.warning(f"PostgreSQL draw search failed, using JSON fallback: {e}")
 
-        # Search in customer_name and closer
-        query_lower = query.lower()
-        matches = [
-            d for d in user_draws
-            if (d.get("customer_name", "").lower().find(query_lower) != -1 or
-                d.get("closer", "").lower().find(query_lower) != -1)
-        ]
+        if matches is None:
+            # Search in customer_name and closer
+            matches = [
+                d for d in self._load_user_draws(username)
+                if ((d.get("customer_name") or "").lower().find(query_lower) != -1 or
+                    (d.get("closer") or "").lower().find(query_lower) != -1)
+            ]
 
-        # Sort by timestamp descending
-        matches.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+            # Sort by timestamp descending
+            matches.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
 
         # Format timestamps
         for draw in matches:
@@ -381,6 +472,22 @@ class T2AnalyticsService:
 
         return matches
 
+    def _search_draws_sql(self, username: str, query_lower: str) -> Optional[List[Dict]]:
+        """lower(...) LIKE '%q%' - passt auf die Such-Indizes der Migration t2_analytics_idx01"""
+        D = T2DrawHistory
+        with db_session_scope_no_commit() as session:
+            records = session.query(D).filter(
+                D.username == username,
+                or_(
+                    func.lower(D.customer_name).contains(query_lower, autoescape=True),
+                    func.lower(D.closer_drawn).contains(query_lower, autoescape=True),
+                )
+            ).order_by(D.drawn_at.desc(), D.id).all()
+
+            if not records and self._draws_table_empty(session):
+                return None
+            return [record.to_dict() for record in records]
+
     def get_combined_user_stats(self, username: str) -> Dict:
         """
         Get combined statistics from T1-Slots, T2-Bookings, and Draw-Activity
@@ -388,36 +495,28 @@ class T2AnalyticsService:
         Returns:
             Dict with aggregated KPIs across all systems
         """
+        # Time filters
+        now = datetime.now(TZ)
+        week_start = now - timedelta(days=now.weekday())
+
         # T1 Slot-Buchungen
-        t1_bookings = self._load_tracking_bookings()
-        user_t1_bookings = [b for b in t1_bookings if b.get("user") == username]
+        user_t1_bookings = self._load_user_tracking_bookings(username)
 
-        # T2-Buchungen
-        t2_bookings = self._load_t2_bookings()
-        user_t2_bookings = [b for b in t2_bookings if b.get("booked_by") == username]
+        # T2-Buchungen (gebucht vom User, "diese Woche" nach Buchungszeitpunkt)
+        t2_total, t2_this_week = self._count_user_t2_bookings(username, week_start)
 
         # Draw-Activity
         draw_stats = self.get_user_draw_stats(username)
 
-        # Time filters
-        now = datetime.now(TZ)
-        week_start = now - timedelta(days=now.weekday())
-
         # T1 This Week
         t1_this_week = [
             b for b in user_t1_bookings
             if TZ.localize(datetime.strptime(b.get("date", "1970-01-01"), "%Y-%m-%d")) >= week_start
         ]
 
-        # T2 This Week
-        t2_this_week = [
-            b for b in user_t2_bookings
-            if _parse_ts(b.get("booking_time", "1970-01-01T00:00:00")) >= week_start
-        ]
-
         # Calculate success rate (T1 only, based on color tracking)
         # Note: This is simplified - real implementation would check outcomes
-        total_activities = len(user_t1_bookings) + len(user_t2_bookings) + draw_stats["total_draws"]
+        total_activities = len(user_t1_bookings) + t2_total + draw_stats["total_draws"]
 
         return {
             "t1_slots": {
@@ -425,8 +524,8 @@ class T2AnalyticsService:
                 "this_week": len(t1_this_week)
             },
             "t2_bookings": {
-                "total": len(user_t2_bookings),
-                "this_week": len(t2_this_week)
+                "total": t2_total,
+                "this_week": t2_this_week
             },
             "draw_activity": {
                 "total": draw_stats["total_draws"],
@@ -435,7 +534,7 @@ class T2AnalyticsService:
             },
             "combined": {
                 "total_activities": total_activities,
-                "this_week_activities": len(t1_this_week) + len(t2_this_week) + draw_stats["this_week"]
+                "this_week_activities": len(t1_this_week) + t2_this_week + draw_stats["this_week"]
             }
         }
 
@@ -450,30 +549,31 @@ class T2AnalyticsService:
         Returns:
             Dict with timeline data for Line Chart
         """
-        bucket_data = self._load_bucket_data()
-        all_draws = bucket_data.get("draw_history", [])
-
-        # Filter user draws
-        user_draws = [d for d in all_draws if d.get("user") == username]
-
-        # Filter last N days
         now = datetime.now(TZ)
         cutoff_date = now - timedelta(days=days)
 
-        recent_draws = [
-            d for d in user_draws
-            if _parse_ts(d["timestamp"]) >= cutoff_date
-        ]
-
-        # Group by date
-        draws_by_date = defaultdict(int)
-        for draw in recent_draws:
+        draws_by_date = None
+        if POSTGRES_IMPORTS_AVAILABLE and is_postgres_enabled():
             try:
-                dt = datetime.fromisoformat(draw["timestamp"])
-                date_key = dt.strftime("%Y-%m-%d")
-                draws_by_date[date_key] += 1
-            except:
-                pass
+                draws_by_date = self._draws_per_day_sql(username, cutoff_date)
+            except Exception as e:
+                logger.warning(f"PostgreSQL draw timeline failed, using JSON fallback: {e}")
+
+        if draws_by_date is None:
+            recent_draws = [
+                d for d in self._load_user_draws(username)
+                if _parse_ts(d["timestamp"]) >= cutoff_date
+            ]
+
+            # Group by date
+            draws_by_date = defaultdict(int)
+            for draw in recent_draws:
+                try:
+                    dt = datetime.fromisoformat(draw["timestamp"])
+                    date_key = dt.strftime("%Y-%m-%d")
+                    draws_by_date[date_key] += 1
+                except:
+                    pass
 
         # Fill in missing dates with 0
         date_list = []
@@ -486,9 +586,22 @@ class T2AnalyticsService:
         return {
             "dates": date_list,
             "counts": count_list,
-            "total_draws": len(recent_draws)
+            "total_draws": sum(draws_by_date.values())
         }
 
+    def _draws_per_day_sql(self, username: str, cutoff_date: datetime) -> Optional[Dict[str, int]]:
+        D = T2DrawHistory
+        day = func.date(D.drawn_at)
+        with db_session_scope_no_commit() as session:
+            rows = session.query(day, func.count(D.id)).filter(
+                D.username == username,
+                D.drawn_at >= _naive(cutoff_date)
+            ).group_by(day).all()
+
+            if not rows and self._draws_table_empty(session):
+                return None
+            return {str(date_key): count for date_key, count in rows}
+
     def get_2h_booking_analytics(self, start_date=None, end_date=None):
         """
         Aggregiert 2h-Buchungs-Statistiken für Admin-Dashboard.
@@ -504,15 +617,65 @@ class T2AnalyticsService:
                 "overall": {...}
             }
         """
-        from datetime import date as date_type, timedelta
-        from collections import defaultdict
+        from datetime import date as date_type
 
         if not start_date:
             start_date = date_type.today() - timedelta(days=30)
         if not end_date:
             end_date = date_type.today()
 
-        # Lade alle T2-Buchungen
+        # Aktueller und letzter Monat
+        now = datetime.now()
+        this_month_start = now.date().replace(day=1)
+        last_month_start = (this_month_start - timedelta(days=1)).replace(day=1)
+        next_month_start = (this_month_start + timedelta(days=32)).replace(day=1)
+
+        grouped = None
+        if POSTGRES_IMPORTS_AVAILABLE and is_postgres_enabled():
+            try:
+                grouped = self._group_2h_bookings_sql(
+                    start_date, end_date, last_month_start, this_month_start, next_month_start
+                )
+            except Exception as e:
+                logger.warning(f"PostgreSQL 2h booking analytics failed, falling back to JSON: {e}")
+
+        if grouped is None:
+            grouped = self._group_2h_bookings_json(
+                start_date, end_date, last_month_start.strftime('%Y-%m'), this_month_start.strftime('%Y-%m')
+            )
+
+        pairs, status_counts = grouped
+        return self._build_2h_analytics(pairs, status_counts)
+
+    def _group_2h_bookings_sql(self, start_date, end_date, last_month_start, this_month_start, next_month_start):
+        """
+        GROUP BY (berater, coach) im Zeitraum + GROUP BY status über alle Buchungen
+
+        Returns:
+            ([(berater, coach, total, this_month, last_month)], {status: count})
+        """
+        B = T2Booking
+        with db_session_scope_no_commit() as session:
+            rows = session.query(
+                B.berater,
+                B.coach,
+                func.count(B.id),
+                func.sum(case(((B.date >= this_month_start) & (B.date < next_month_start), 1), else_=0)),
+                func.sum(case(((B.date >= last_month_start) & (B.date < this_month_start), 1), else_=0)),
+            ).filter(
+                B.date >= start_date,
+                B.date <= end_date,
+                B.status.notin_(['cancelled', 'rescheduled'])
+            ).group_by(B.berater, B.coach).all()
+
+            status_rows = session.query(B.status, func.count(B.id)).group_by(B.status).all()
+
+        pairs = [(berater, coach, total, this_month or 0, last_month or 0)
+                 for berater, coach, total, this_month, last_month in rows]
+        return pairs, dict(status_rows)
+
+    def _group_2h_bookings_json(self, start_date, end_date, last_month_str, this_month_str):
+        """Wie _group_2h_bookings_sql, aus t2_bookings.json"""
         all_bookings_data = self.data_persistence.load_data('t2_bookings', {'bookings': []})
 
         # Handle both list and dict formats (defensive programming)
@@ -527,20 +690,32 @@ class T2AnalyticsService:
             logger.error(f"Unexpected t2_bookings format: {type(all_bookings_data)}")
             all_bookings = []
 
-        # Filter nach Zeitraum
-        from datetime import datetime
-        filtered_bookings = []
+        pairs = {}
+        status_counts = Counter()
         for booking in all_bookings:
+            status_counts[booking.get('status', 'active')] += 1
+
             try:
                 booking_date = datetime.fromisoformat(booking['date']).date()
-                if start_date <= booking_date <= end_date:
-                    # Skip cancelled/rescheduled
-                    if booking.get('status') not in ['cancelled', 'rescheduled']:
-                        filtered_bookings.append(booking)
             except (ValueError, KeyError):
                 continue
+            # Skip cancelled/rescheduled
+            if not (start_date <= booking_date <= end_date) or booking.get('status') in ['cancelled', 'rescheduled']:
+                continue
 
-        # Initialize stats
+            key = (booking.get('berater', 'Unknown'), booking.get('coach', 'Unknown'))
+            counts = pairs.setdefault(key, [0, 0, 0])
+            counts[0] += 1
+            booking_month = booking['date'][:7]  # YYYY-MM
+            if booking_month == this_month_str:
+                counts[1] += 1
+            elif booking_month == last_month_str:
+                counts[2] += 1
+
+        return [key + tuple(counts) for key, counts in pairs.items()], dict(status_counts)
+
+    @staticmethod
+    def _build_2h_analytics(pairs, status_counts) -> Dict:
         berater_stats = defaultdict(lambda: {'total': 0, 'this_month': 0, 'last_month': 0})
         coach_stats = defaultdict(lambda: {
             'total': 0,
@@ -549,43 +724,21 @@ class T2AnalyticsService:
             'delegation_rate': 0.0
         })
 
-        total_bookings = len(filtered_bookings)
-        total_cancelled = 0
-        total_rescheduled = 0
-
-        # Aktuelle und letzte Monats-Strings
-        now = datetime.now()
-        this_month_str = now.strftime('%Y-%m')
-        last_month = now.replace(day=1) - timedelta(days=1)
-        last_month_str = last_month.strftime('%Y-%m')
-
-        # Cancelled/Rescheduled count (aus allen Buchungen, nicht nur filtered)
-        for booking in all_bookings:
-            status = booking.get('status', 'active')
-            if status == 'cancelled':
-                total_cancelled += 1
-            elif status == 'rescheduled':
-                total_rescheduled += 1
-
-        # Aggregiere Stats
-        for booking in filtered_bookings:
-            berater = booking.get('berater', 'Unknown')
-            coach = booking.get('coach', 'Unknown')
-            booking_month = booking['date'][:7]  # YYYY-MM
+        total_bookings = 0
+        for berater, coach, total, this_month, last_month in pairs:
+            total_bookings += total
 
             # Berater Stats
-            berater_stats[berater]['total'] += 1
-            if booking_month == this_month_str:
-                berater_stats[berater]['this_month'] += 1
-            elif booking_month == last_month_str:
-                berater_stats[berater]['last_month'] += 1
+            berater_stats[berater]['total'] += total
+            berater_stats[berater]['this_month'] += this_month
+            berater_stats[berater]['last_month'] += last_month
 
             # Coach Stats
-            coach_stats[coach]['total'] += 1
+            coach_stats[coach]['total'] += total
             if coach == berater:
-                coach_stats[coach]['executed_self'] += 1
+                coach_stats[coach]['executed_self'] += total
             else:
-                coach_stats[coach]['delegated'] += 1
+                coach_stats[coach]['delegated'] += total
 
         # Berechne Delegation Rates
         for coach, stats in coach_stats.items():
@@ -598,8 +751,10 @@ class T2AnalyticsService:
         else:
             avg_delegation_rate = 0.0
 
-        # Cancellation Rate
-        total_all_bookings = len(all_bookings)
+        # Cancelled/Rescheduled (aus allen Buchungen, nicht nur Zeitraum)
+        total_cancelled = status_counts.get('cancelled', 0)
+        total_rescheduled = status_counts.get('rescheduled', 0)
+        total_all_bookings = sum(status_counts.values())
         cancellation_rate = round((total_cancelled / total_all_bookings * 100), 1) if total_all_bookings > 0 else 0.0
 
         return {
@@ -5,6 +5,7 @@ Inspired by boat-drawing system with modern implementation
 
 Features:
 - Weighted probability mapping per closer
+- Bucket as remaining-ticket counts per closer, sampled in O(closers)
 - Bucket system with automatic reset (max 10 draws)
 - Timeout/cooldown between draws
 - Admin-only configuration
@@ -13,6 +14,7 @@ Features:
 
 import json
 import os
+from collections import Counter
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import random
@@ -21,6 +23,8 @@ import logging
 from contextlib import contextmanager
 
 from app.utils.timezone_utils import parse_iso_to_utc, now_utc, format_berlin_iso
+from app.utils.file_lock import file_lock
+from app.utils.json_utils import atomic_read_json, atomic_write_json
 
 logger = logging.getLogger(__name__)
 TZ = pytz.timezone("Europe/Berlin")
@@ -78,6 +82,23 @@ if not os.path.exists(PERSIST_BASE):
 
 DATA_DIR = os.path.join(PERSIST_BASE, "persistent")
 BUCKET_FILE = os.path.join(DATA_DIR, "t2_bucket_system.json")
+HISTORY_FILENAME = "t2_draw_history.jsonl"
+
+# Optimistische Draw-Versuche, danach ein Versuch mit SELECT FOR UPDATE
+DRAW_CAS_RETRIES = 5
+
+# Zufallsquelle für Draws (seedbar für Tests, siehe seed_draw_rng)
+_rng = random.Random()
+
+
+def seed_draw_rng(seed=None):
+    """Seed the draw RNG (deterministic draws in tests)"""
+    _rng.seed(seed)
+
+
+def _history_file() -> str:
+    """Append-only JSONL draw history next to the bucket file (JSON mode)"""
+    return os.path.join(os.path.dirname(BUCKET_FILE), HISTORY_FILENAME)
 
 
 def _ensure_dirs():
@@ -167,7 +188,7 @@ def load_bucket_data() -> Dict:
                             "closers": closers_dict,
                             "probabilities": bucket_state.probabilities,
                             "default_probabilities": {name: info["default_probability"] for name, info in closers_dict.items()},
-                            "bucket": bucket_state.bucket,
+                            "bucket_counts": _row_ticket_counts(bucket_state),
                             "draw_history": draw_history,
                             "user_last_draw": user_last_draw,
                             "stats": bucket_state.stats,
@@ -200,8 +221,8 @@ def load_bucket_data() -> Dict:
                 data["probabilities"] = {name: info["default_probability"] for name, info in T2_CLOSERS.items()}
             if "default_probabilities" not in data:
                 data["default_probabilities"] = {name: info["default_probability"] for name, info in T2_CLOSERS.items()}
-            if "bucket" not in data:
-                data["bucket"] = _create_initial_bucket(data.get("probabilities", {}))
+            data["bucket_counts"] = _ticket_counts(data)
+            data.pop("bucket", None)
             if "draw_history" not in data:
                 data["draw_history"] = []
             if "user_last_draw" not in data:
@@ -244,9 +265,10 @@ def save_bucket_data(data: Dict):
                         last_reset = datetime.now(TZ)
 
                     if bucket_state:
-                        # UPDATE existing singleton
+                        # UPDATE existing singleton (version bump invalidates concurrent draws)
                         bucket_state.probabilities = data.get('probabilities', {})
-                        bucket_state.bucket = data.get('bucket', [])
+                        bucket_state.ticket_counts = _ticket_counts(data)
+                        bucket_state.version = (bucket_state.version or 0) + 1
                         bucket_state.total_draws = data.get('total_draws', 0)
                         bucket_state.stats = data.get('stats', {})
                         bucket_state.max_draws_before_reset = data.get('bucket_size_config', 20)
@@ -257,7 +279,9 @@ def save_bucket_data(data: Dict):
                         bucket_state = T2BucketState(
                             singleton_id=1,
                             probabilities=data.get('probabilities', {}),
-                            bucket=data.get('bucket', []),
+                            bucket=[],
+                            ticket_counts=_ticket_counts(data),
+                            version=0,
                             total_draws=data.get('total_draws', 0),
                             stats=data.get('stats', {}),
                             max_draws_before_reset=data.get('bucket_size_config', 20),
@@ -272,11 +296,7 @@ def save_bucket_data(data: Dict):
 
     # ALWAYS WRITE TO JSON (backup)
     try:
-        # Always save current closers to data
-        data["closers"] = T2_CLOSERS.copy()
-
-        with open(BUCKET_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        _write_bucket_json(data)
 
         if postgres_success:
             logger.debug("✅ Dual-write complete: PostgreSQL + JSON")
@@ -288,6 +308,17 @@ def save_bucket_data(data: Dict):
             raise  # If both fail, raise error
 
 
+def _write_bucket_json(data: Dict) -> None:
+    """Write the JSON backup document (closers and ticket counts normalized)"""
+    # Always save current closers to data
+    data["closers"] = T2_CLOSERS.copy()
+    data["bucket_counts"] = _ticket_counts(data)
+    data.pop("bucket", None)
+
+    if not atomic_write_json(BUCKET_FILE, data):
+        raise IOError(f"Could not write {BUCKET_FILE}")
+
+
 def _initialize_bucket_data() -> Dict:
     """Initialize fresh bucket data"""
     probabilities = {name: info["default_probability"] for name, info in T2_CLOSERS.items()}
@@ -296,7 +327,7 @@ def _initialize_bucket_data() -> Dict:
         "closers": T2_CLOSERS.copy(),  # Store closers persistently
         "probabilities": probabilities,
         "default_probabilities": {name: info["default_probability"] for name, info in T2_CLOSERS.items()},  # Store defaults
-        "bucket": _create_initial_bucket(probabilities),
+        "bucket_counts": _initial_ticket_counts(probabilities),
         "draw_history": [],
         "user_last_draw": {},
         "stats": {name: 0 for name in T2_CLOSERS.keys()},
@@ -306,9 +337,9 @@ def _initialize_bucket_data() -> Dict:
     }
 
 
-def _create_initial_bucket(probabilities: Dict[str, float]) -> List[str]:
+def _initial_ticket_counts(probabilities: Dict[str, float]) -> Dict[str, int]:
     """
-    Create bucket based on probabilities
+    Create bucket ticket counts based on probabilities
     Each closer gets tickets proportional to their probability weight
 
     Example:
@@ -318,23 +349,438 @@ def _create_initial_bucket(probabilities: Dict[str, float]) -> List[str]:
     - Probability 0 → 0 tickets (Closer wird nicht gezogen)
     Total: 20 tickets in bucket
     """
-    bucket = []
+    counts = {}
 
     for closer_name, probability in probabilities.items():
         # Round to int, 0 tickets if probability is 0
         if probability > 0:
-            ticket_count = max(1, int(round(probability)))
+            counts[closer_name] = max(1, int(round(probability)))
         else:
-            ticket_count = 0
+            counts[closer_name] = 0
+
+    return counts
 
-        # Add tickets to bucket
-        for _ in range(ticket_count):
-            bucket.append(closer_name)
 
-    # Shuffle bucket for randomness
-    random.shuffle(bucket)
+def _ticket_counts(data: Dict) -> Dict[str, int]:
+    """Remaining tickets per closer (migrates the legacy ticket list)"""
+    counts = data.get("bucket_counts")
+    if isinstance(counts, dict):
+        return {name: int(count) for name, count in counts.items()}
+    if isinstance(data.get("bucket"), list):
+        return dict(Counter(data["bucket"]))
+    return _initial_ticket_counts(data.get("probabilities", {}))
 
-    return bucket
+
+def _row_ticket_counts(bucket_state) -> Dict[str, int]:
+    """Ticket counts of a T2BucketState row (legacy rows only have the list)"""
+    if bucket_state.ticket_counts is not None:
+        return {name: int(count) for name, count in bucket_state.ticket_counts.items()}
+    return dict(Counter(bucket_state.bucket or []))
+
+
+def _default_probabilities(data: Dict) -> Dict[str, float]:
+    return data.get("default_probabilities") or {
+        name: info["default_probability"] for name, info in T2_CLOSERS.items()
+    }
+
+
+def _reset_cycle(data: Dict) -> None:
+    """Restore default probabilities and refill the bucket"""
+    data["probabilities"] = dict(_default_probabilities(data))
+    data["bucket_counts"] = _initial_ticket_counts(data["probabilities"])
+    data["total_draws"] = 0
+    data["last_reset"] = datetime.now(TZ).isoformat()
+
+
+# ========== DRAW ENGINE ==========
+
+def _pick_weighted(counts: Dict[str, int], rng: random.Random) -> Optional[str]:
+    """
+    Pick a closer with probability proportional to its remaining tickets
+
+    O(closers) instead of materializing and scanning a ticket list. Iterates
+    in sorted order so a seeded RNG gives reproducible draws.
+    """
+    total = sum(count for count in counts.values() if count > 0)
+    if total <= 0:
+        return None
+
+    point = rng.randrange(total)
+    for name in sorted(counts):
+        count = counts[name]
+        if count <= 0:
+            continue
+        if point < count:
+            return name
+        point -= count
+    return None
+
+
+def _apply_draw(state: Dict, rng: random.Random) -> Optional[Dict]:
+    """
+    Draw one ticket and apply the degressive-probability rules to ``state``
+
+    ``state`` needs probabilities, default_probabilities, bucket_counts,
+    stats, total_draws and bucket_size_config; it is updated in place.
+
+    Returns:
+        Draw info or None if no closer has tickets
+    """
+    counts = state["bucket_counts"]
+    if sum(count for count in counts.values() if count > 0) == 0:
+        # Bucket is empty - reset it with DEFAULT probabilities (not current!)
+        _reset_cycle(state)
+        counts = state["bucket_counts"]
+
+    drawn_closer = _pick_weighted(counts, rng)
+    if drawn_closer is None:
+        return None
+
+    # Remove drawn ticket from bucket
+    counts[drawn_closer] -= 1
+    tickets_after = sum(counts.values())
+
+    # DEGRESSIVE PROBABILITY: Reduce the drawn closer's probability by 1
+    reduction = BUCKET_CONFIG.get("probability_reduction_per_draw", 1.0)
+    min_prob = BUCKET_CONFIG.get("min_probability", 0.0)
+
+    current_prob = state["probabilities"].get(drawn_closer, 1.0)
+    new_prob = max(min_prob, current_prob - reduction)
+    state["probabilities"][drawn_closer] = new_prob
+
+    # Update stats
+    state["total_draws"] = state.get("total_draws", 0) + 1
+    state["stats"][drawn_closer] = state["stats"].get(drawn_closer, 0) + 1
+
+    # Check if bucket needs reset
+    max_draws = state.get("bucket_size_config", BUCKET_CONFIG["max_draws_before_reset"])
+    if state["total_draws"] >= max_draws:
+        _reset_cycle(state)
+
+    return {
+        "closer": drawn_closer,
+        "old_probability": current_prob,
+        "new_probability": new_prob,
+        "bucket_size_after": tickets_after,
+        "tickets_remaining": sum(state["bucket_counts"].values()),
+        "draws_until_reset": max_draws - state["total_draws"],
+    }
+
+
+def _draw_json(username: str, draw_type: str, customer_name: Optional[str]) -> Optional[Dict]:
+    """Draw against the JSON document (fallback mode), serialized by a file lock"""
+    _ensure_dirs()
+    with file_lock(BUCKET_FILE):
+        data = load_bucket_data()
+        timeout_check = _timeout_status(username, data.get("user_last_draw", {}).get(username), draw_type)
+        if not timeout_check["can_draw"]:
+            return {"timeout": timeout_check}
+
+        data["bucket_counts"] = _ticket_counts(data)
+        data.pop("bucket", None)
+        data.setdefault("stats", {})
+
+        info = _apply_draw(data, _rng)
+        if info is None:
+            return None
+
+        timestamp = datetime.now(TZ).isoformat()
+        data.setdefault("user_last_draw", {})[username] = {
+            "timestamp": timestamp,
+            "closer": info["closer"],
+            "draw_type": draw_type,
+            "customer_name": customer_name
+        }
+
+        save_bucket_data(data)
+
+    # Append-only history instead of a growing array in the bucket document
+    _append_history_json({
+        "user": username,
+        "closer": info["closer"],
+        "draw_type": draw_type,
+        "customer_name": customer_name,
+        "timestamp": timestamp,
+        "bucket_size_after": info["bucket_size_after"],
+        "probability_after": info["new_probability"]
+    })
+    return info
+
+
+def _append_history_json(entry: Dict) -> None:
+    line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+    try:
+        with open(_history_file(), "ab") as f:
+            f.write(line)
+            f.flush()
+            offset = f.tell() - len(line)
+    except OSError as e:
+        logger.error(f"Could not append T2 draw history: {e}")
+        return
+
+    # Sidecar-Index fortschreiben (Lesepfad ergänzt fehlende Einträge selbst)
+    try:
+        _history_store().record_append(offset, len(line), entry.get("timestamp"), entry.get("user"))
+    except Exception as e:
+        logger.debug(f"Draw history index update skipped: {e}")
+
+
+def _history_store():
+    """Per-user indexed view of the JSONL draw history"""
+    from app.services.tracking_system.booking_store import get_booking_store
+    return get_booking_store(_history_file(), date_field="timestamp")
+
+
+# Legacy-Array im Bucket-Dokument, pro User gruppiert: (mtime_ns, size) -> {user: [draws]}
+_legacy_history_index: Dict = {"key": None, "by_user": {}}
+
+
+def _legacy_user_history(username: str) -> List[Dict]:
+    """Draws of one user from the legacy ``draw_history`` array (re-read only after writes)"""
+    try:
+        st = os.stat(BUCKET_FILE)
+    except OSError:
+        return []
+
+    key = (BUCKET_FILE, st.st_mtime_ns, st.st_size)
+    if _legacy_history_index["key"] != key:
+        by_user: Dict[str, List[Dict]] = {}
+        try:
+            with open(BUCKET_FILE, "r", encoding="utf-8") as f:
+                for draw in json.load(f).get("draw_history", []):
+                    by_user.setdefault(draw.get("user"), []).append(draw)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read legacy draw history: {e}")
+        _legacy_history_index.update(key=key, by_user=by_user)
+
+    return [dict(d) for d in _legacy_history_index["by_user"].get(username, [])]
+
+
+def _draw_pg(username: str, draw_type: str, customer_name: Optional[str]) -> Tuple[bool, Optional[Dict]]:
+    """
+    Draw against PostgreSQL with a compare-and-swap on the bucket state row
+
+    Reads the row without locking, samples in Python and commits the new
+    state with one ``UPDATE ... WHERE version = :seen RETURNING``. History
+    and the user's last draw are written in the same transaction. Conflicts
+    retry; the last attempt takes a row lock so a draw always completes.
+    After the commit the draw is mirrored to the JSON backup.
+    The user's timeout is read from their T2UserLastDraw row in the same
+    session, not from the whole bucket state.
+
+    Returns:
+        (handled, info): handled=False if the database is not initialized
+        or no bucket state row exists yet;
+        info = {"timeout": ...} if the user is still in timeout
+    """
+    table = T2BucketState.__table__
+
+    for attempt in range(DRAW_CAS_RETRIES + 1):
+        try:
+            session = get_db_session()
+        except RuntimeError:
+            # Database never initialized: JSON-only mode, save_bucket_data()
+            # cannot write to PG either
+            return False, None
+        try:
+            query = session.query(T2BucketState).filter_by(singleton_id=1)
+            if attempt == DRAW_CAS_RETRIES:
+                query = query.with_for_update()
+            row = query.first()
+            if row is None:
+                return False, None
+
+            user_last_draw = session.query(T2UserLastDraw).filter_by(username=username).first()
+            timeout_check = _timeout_status(
+                username, user_last_draw.to_dict() if user_last_draw else None, draw_type
+            )
+            if not timeout_check["can_draw"]:
+                session.rollback()
+                return True, {"timeout": timeout_check}
+
+            seen_version = row.version or 0
+            defaults = {
+                closer.name: closer.default_probability
+                for closer in session.query(T2CloserConfig).filter_by(is_active=True).all()
+            }
+            state = {
+                "probabilities": dict(row.probabilities or {}),
+                "default_probabilities": defaults or {
+                    name: info["default_probability"] for name, info in T2_CLOSERS.items()
+                },
+                "bucket_counts": _row_ticket_counts(row),
+                "stats": dict(row.stats or {}),
+                "total_draws": row.total_draws or 0,
+                "bucket_size_config": row.max_draws_before_reset,
+                "last_reset": row.last_reset,
+            }
+
+            info = _apply_draw(state, _rng)
+            if info is None:
+                session.rollback()
+                return True, None
+
+            last_reset = state["last_reset"]
+            if isinstance(last_reset, str):
+                last_reset = datetime.fromisoformat(last_reset)
+
+            won = session.execute(
+                table.update()
+                .where(table.c.singleton_id == 1, table.c.version == seen_version)
+                .values(
+                    probabilities=state["probabilities"],
+                    ticket_counts=state["bucket_counts"],
+                    stats=state["stats"],
+                    total_draws=state["total_draws"],
+                    last_reset=last_reset,
+                    version=seen_version + 1,
+                    updated_at=datetime.utcnow(),
+                )
+                .returning(table.c.version)
+            ).first()
+
+            if won is None:
+                # Another worker drew in between - retry with fresh state
+                session.rollback()
+                logger.debug(f"T2 draw CAS conflict (attempt {attempt + 1})")
+                continue
+
+            draw_time = datetime.now(TZ)
+
+            # 1. Create T2DrawHistory record (append-only audit trail)
+            session.add(T2DrawHistory(
+                username=username,
+                closer_drawn=info["closer"],
+                draw_type=draw_type,
+                customer_name=customer_name,
+                bucket_size_after=info["bucket_size_after"],
+                probability_after=info["new_probability"],
+                drawn_at=draw_time
+            ))
+
+            # 2. Upsert T2UserLastDraw (timeout tracking, row read above)
+            if user_last_draw:
+                user_last_draw.last_draw_at = draw_time
+                user_last_draw.last_closer_drawn = info["closer"]
+                user_last_draw.last_draw_type = draw_type
+                user_last_draw.last_customer_name = customer_name
+            else:
+                session.add(T2UserLastDraw(
+                    username=username,
+                    last_draw_at=draw_time,
+                    last_closer_drawn=info["closer"],
+                    last_draw_type=draw_type,
+                    last_customer_name=customer_name
+                ))
+
+            session.commit()
+            logger.debug(f"✅ T2 draw committed for {username} → {info['closer']} (version {seen_version + 1})")
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+        _mirror_draw_json(state, seen_version + 1, {
+            "user": username,
+            "closer": info["closer"],
+            "draw_type": draw_type,
+            "customer_name": customer_name,
+            "timestamp": draw_time.isoformat(),
+            "bucket_size_after": info["bucket_size_after"],
+            "probability_after": info["new_probability"]
+        })
+        return True, info
+
+    return True, None
+
+
+def _mirror_draw_json(state: Dict, version: int, entry: Dict) -> None:
+    """
+    Mirror a committed PG draw into the JSON backup (document + JSONL history)
+
+    Keeps the fallback copy current like the former dual-write. The stored
+    ``version`` keeps an older draw that mirrors late from overwriting the
+    counts of a newer one; the user's last draw is always recorded.
+    """
+    try:
+        _ensure_dirs()
+        with file_lock(BUCKET_FILE):
+            data = atomic_read_json(BUCKET_FILE, default=None) or _initialize_bucket_data()
+            if (data.get("version") or 0) < version:
+                last_reset = state["last_reset"]
+                data.update({
+                    "probabilities": dict(state["probabilities"]),
+                    "bucket_counts": dict(state["bucket_counts"]),
+                    "stats": dict(state["stats"]),
+                    "total_draws": state["total_draws"],
+                    "last_reset": last_reset.isoformat() if isinstance(last_reset, datetime) else last_reset,
+                    "version": version,
+                })
+            data.setdefault("user_last_draw", {})[entry["user"]] = {
+                "timestamp": entry["timestamp"],
+                "closer": entry["closer"],
+                "draw_type": entry["draw_type"],
+                "customer_name": entry["customer_name"]
+            }
+            _write_bucket_json(data)
+    except Exception as e:
+        logger.error(f"Could not mirror T2 draw to JSON backup: {e}")
+
+    _append_history_json(entry)
+
+
+def load_draw_history(limit: Optional[int] = None, username: Optional[str] = None) -> List[Dict]:
+    """
+    Draw history, oldest first (PostgreSQL-first, JSONL fallback)
+
+    Args:
+        limit: Only the most recent ``limit`` draws
+        username: Only draws of this user (JSON: served from the per-user index)
+    """
+    if USE_POSTGRES and POSTGRES_AVAILABLE:
+        try:
+            with get_db_context() as session:
+                if session:
+                    query = session.query(T2DrawHistory)
+                    if username is not None:
+                        query = query.filter(T2DrawHistory.username == username)
+                    query = query.order_by(T2DrawHistory.drawn_at.desc(), T2DrawHistory.id.desc())
+                    if limit:
+                        query = query.limit(limit)
+                    records = query.all()
+                    if records:
+                        return [record.to_dict() for record in reversed(records)]
+        except Exception as e:
+            logger.warning(f"PostgreSQL draw history read failed, falling back to JSON: {e}")
+
+    if username is not None:
+        history = _legacy_user_history(username)
+        history.extend(_history_store().iter_bookings(user=username))
+        return history[-limit:] if limit else history
+
+    # Legacy-Array aus dem Bucket-Dokument + append-only JSONL
+    history = []
+    if os.path.exists(BUCKET_FILE):
+        try:
+            with open(BUCKET_FILE, "r", encoding="utf-8") as f:
+                history.extend(json.load(f).get("draw_history", []))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read legacy draw history: {e}")
+
+    history_file = _history_file()
+    if os.path.exists(history_file):
+        with open(history_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    history.append(json.loads(line))
+                except ValueError:
+                    continue
+
+    return history[-limit:] if limit else history
 
 
 # ========== PUBLIC API ==========
@@ -372,7 +818,7 @@ def update_probability(closer_name: str, new_probability: float) -> Dict:
     data["probabilities"][closer_name] = new_probability
 
     # Rebuild bucket with new probabilities
-    data["bucket"] = _create_initial_bucket(data["probabilities"])
+    data["bucket_counts"] = _initial_ticket_counts(data["probabilities"])
     data["total_draws"] = 0  # Reset draw counter
     data["last_reset"] = datetime.now(TZ).isoformat()
 
@@ -387,20 +833,17 @@ def update_probability(closer_name: str, new_probability: float) -> Dict:
 def get_bucket_composition() -> Dict:
     """Get current bucket composition (for admin view)"""
     data = load_bucket_data()
-    bucket = data.get("bucket", [])
+    counts = _ticket_counts(data)
 
     # Get configured bucket size (use stored value if available)
     max_draws = data.get("bucket_size_config", BUCKET_CONFIG["max_draws_before_reset"])
 
-    # Count tickets per closer
-    composition = {}
-    for closer_name in T2_CLOSERS.keys():
-        count = bucket.count(closer_name)
-        composition[closer_name] = count
+    # Tickets per closer
+    composition = {closer_name: counts.get(closer_name, 0) for closer_name in T2_CLOSERS.keys()}
 
     return {
         "composition": composition,
-        "total_tickets": len(bucket),
+        "total_tickets": sum(counts.values()),
         "draws_until_reset": max_draws - data.get("total_draws", 0),
         "max_draws_before_reset": max_draws,
         "probabilities": data.get("probabilities", {}),
@@ -417,13 +860,16 @@ def check_user_timeout(username: str, draw_type: str = "T2") -> Dict:
     Returns: {can_draw: bool, timeout_remaining_seconds: int, message: str}
     """
     data = load_bucket_data()
-    user_last_draw = data.get("user_last_draw", {})
+    return _timeout_status(username, data.get("user_last_draw", {}).get(username), draw_type)
+
 
-    if username not in user_last_draw:
+def _timeout_status(username: str, last_draw: Optional[Dict], draw_type: str = "T2") -> Dict:
+    """Evaluate the draw timeout from one user_last_draw entry (None = never drawn)"""
+    if not last_draw:
         logger.debug(f"User {username} has no previous draw, allowing draw")
         return {"can_draw": True, "timeout_remaining_seconds": 0, "message": "Ready to draw"}
 
-    last_draw_iso = user_last_draw[username].get("timestamp")
+    last_draw_iso = last_draw.get("timestamp")
     if not last_draw_iso:
         logger.debug(f"User {username} has no timestamp, allowing draw")
         return {"can_draw": True, "timeout_remaining_seconds": 0, "message": "Ready to draw"}
@@ -482,135 +928,56 @@ def draw_closer(username: str, draw_type: str = "T2", customer_name: str = None)
         bucket_stats: dict
     }
     """
-    # Check timeout
-    timeout_check = check_user_timeout(username, draw_type)
-    if not timeout_check["can_draw"]:
+    # Timeout is checked inside the draw paths, against the same state read
+    info = None
+    handled = False
+
+    # PostgreSQL: lock-free compare-and-swap on the bucket state row
+    if USE_POSTGRES and POSTGRES_AVAILABLE:
+        try:
+            handled, info = _draw_pg(username, draw_type, customer_name)
+        except Exception as e:
+            # No JSON draw here: its save_bucket_data() would write the JSON
+            # counts back into PG and could undo committed draws
+            logger.error(f"PostgreSQL draw failed: {e}", exc_info=True)
+            return {
+                "success": False,
+                "error": "Ziehung derzeit nicht möglich, bitte erneut versuchen"
+            }
+
+    if not handled:
+        info = _draw_json(username, draw_type, customer_name)
+
+    if info is None:
+        return {
+            "success": False,
+            "error": "Keine Closer mit Tickets verfügbar"
+        }
+
+    timeout_check = info.get("timeout")
+    if timeout_check:
         return {
             "success": False,
             "error": timeout_check["message"],
             "timeout_remaining": timeout_check["timeout_remaining_seconds"]
         }
 
-    data = load_bucket_data()
-    bucket = data.get("bucket", [])
-
-    if not bucket:
-        # Bucket is empty - reset it with DEFAULT probabilities (not current!)
-        default_probs = data.get("default_probabilities", {name: info["default_probability"] for name, info in T2_CLOSERS.items()})
-        data["probabilities"] = default_probs.copy()
-        data["bucket"] = _create_initial_bucket(data["probabilities"])
-        data["total_draws"] = 0
-        data["last_reset"] = datetime.now(TZ).isoformat()
-        bucket = data["bucket"]
-
-    # Draw random closer from bucket
-    drawn_closer = random.choice(bucket)
-
-    # Remove drawn ticket from bucket
-    bucket.remove(drawn_closer)
-    data["bucket"] = bucket
-
-    # DEGRESSIVE PROBABILITY: Reduce the drawn closer's probability by 1
-    reduction = BUCKET_CONFIG.get("probability_reduction_per_draw", 1.0)
-    min_prob = BUCKET_CONFIG.get("min_probability", 0.0)
-
-    current_prob = data["probabilities"].get(drawn_closer, 1.0)
-    new_prob = max(min_prob, current_prob - reduction)
-    data["probabilities"][drawn_closer] = new_prob
-
-    # Update stats
-    data["total_draws"] = data.get("total_draws", 0) + 1
-    data["stats"][drawn_closer] = data["stats"].get(drawn_closer, 0) + 1
-
-    # Record user's last draw
-    data["user_last_draw"][username] = {
-        "timestamp": datetime.now(TZ).isoformat(),
-        "closer": drawn_closer,
-        "draw_type": draw_type,
-        "customer_name": customer_name
-    }
-
-    # Add to history
-    data["draw_history"].append({
-        "user": username,
-        "closer": drawn_closer,
-        "draw_type": draw_type,
-        "customer_name": customer_name,
-        "timestamp": datetime.now(TZ).isoformat(),
-        "bucket_size_after": len(bucket),
-        "probability_after": new_prob
-    })
-
-    # Check if bucket needs reset
-    max_draws = data.get("bucket_size_config", BUCKET_CONFIG["max_draws_before_reset"])
-    if data["total_draws"] >= max_draws:
-        # Reset probabilities to default values
-        data["probabilities"] = data.get("default_probabilities", {name: info["default_probability"] for name, info in T2_CLOSERS.items()}).copy()
-        data["bucket"] = _create_initial_bucket(data["probabilities"])
-        data["total_draws"] = 0
-        data["last_reset"] = datetime.now(TZ).isoformat()
-
-    # DUAL-WRITE: Write draw history and user timeout to PostgreSQL
-    if USE_POSTGRES and POSTGRES_AVAILABLE:
-        try:
-            with get_db_context() as session:
-                if session:
-                    draw_time = datetime.now(TZ)
-
-                    # 1. Create T2DrawHistory record (audit trail)
-                    draw_record = T2DrawHistory(
-                        username=username,
-                        closer_drawn=drawn_closer,
-                        draw_type=draw_type,
-                        customer_name=customer_name,
-                        bucket_size_after=len(bucket),
-                        probability_after=new_prob,
-                        drawn_at=draw_time
-                    )
-                    session.add(draw_record)
-                    logger.debug(f"✅ Created T2DrawHistory record for {username} → {drawn_closer}")
-
-                    # 2. Upsert T2UserLastDraw (timeout tracking)
-                    user_last_draw = session.query(T2UserLastDraw).filter_by(username=username).first()
-                    if user_last_draw:
-                        # UPDATE existing record
-                        user_last_draw.last_draw_at = draw_time
-                        user_last_draw.last_closer_drawn = drawn_closer
-                        user_last_draw.last_draw_type = draw_type
-                        user_last_draw.last_customer_name = customer_name
-                        logger.debug(f"✅ Updated T2UserLastDraw for {username}")
-                    else:
-                        # INSERT new record
-                        user_last_draw = T2UserLastDraw(
-                            username=username,
-                            last_draw_at=draw_time,
-                            last_closer_drawn=drawn_closer,
-                            last_draw_type=draw_type,
-                            last_customer_name=customer_name
-                        )
-                        session.add(user_last_draw)
-                        logger.debug(f"✅ Created T2UserLastDraw for {username}")
-
-                    # Commit is handled by context manager
-        except Exception as e:
-            logger.error(f"PostgreSQL draw tracking failed (continuing with JSON): {e}")
-
-    # Save bucket state (will dual-write to PostgreSQL + JSON)
-    save_bucket_data(data)
+    drawn_closer = info["closer"]
+    closer_info = T2_CLOSERS.get(drawn_closer, {})
 
     return {
         "success": True,
         "closer": drawn_closer,
-        "closer_full_name": T2_CLOSERS[drawn_closer]["full_name"],
-        "color": T2_CLOSERS[drawn_closer]["color"],
+        "closer_full_name": closer_info.get("full_name", drawn_closer),
+        "color": closer_info.get("color", "#999999"),
         "message": f"You drew {drawn_closer}!",
         "bucket_stats": {
-            "tickets_remaining": len(data["bucket"]),
-            "draws_until_reset": max_draws - data["total_draws"]
+            "tickets_remaining": info["tickets_remaining"],
+            "draws_until_reset": info["draws_until_reset"]
         },
         "probability_info": {
-            "old_probability": current_prob,
-            "new_probability": new_prob
+            "old_probability": info["old_probability"],
+            "new_probability": info["new_probability"]
         }
     }
 
@@ -620,18 +987,14 @@ def reset_bucket() -> Dict:
     data = load_bucket_data()
 
     # Reset probabilities to default values
-    data["probabilities"] = data.get("default_probabilities", {name: info["default_probability"] for name, info in T2_CLOSERS.items()}).copy()
-
-    data["bucket"] = _create_initial_bucket(data["probabilities"])
-    data["total_draws"] = 0
-    data["last_reset"] = datetime.now(TZ).isoformat()
+    _reset_cycle(data)
 
     save_bucket_data(data)
 
     return {
         "success": True,
         "message": "Bucket reset successfully (probabilities restored to defaults)",
-        "bucket_size": len(data["bucket"])
+        "bucket_size": sum(data["bucket_counts"].values())
     }
 
 
@@ -642,11 +1005,11 @@ def get_system_stats() -> Dict:
     return {
         "total_all_time_draws": sum(data.get("stats", {}).values()),
         "closer_distribution": data.get("stats", {}),
-        "current_bucket_size": len(data.get("bucket", [])),
+        "current_bucket_size": sum(_ticket_counts(data).values()),
         "draws_this_cycle": data.get("total_draws", 0),
         "last_reset": data.get("last_reset"),
         "probabilities": data.get("probabilities", {}),
-        "recent_draws": data.get("draw_history", [])[-20:]  # Last 20 draws
+        "recent_draws": load_draw_history(limit=20)  # Last 20 draws
     }
 
 
@@ -673,10 +1036,7 @@ def update_bucket_size(new_size: int) -> Dict:
     BUCKET_CONFIG["max_draws_before_reset"] = new_size
 
     # Reset bucket with new size
-    data["probabilities"] = data.get("default_probabilities", {name: info["default_probability"] for name, info in T2_CLOSERS.items()}).copy()
-    data["bucket"] = _create_initial_bucket(data["probabilities"])
-    data["total_draws"] = 0
-    data["last_reset"] = datetime.now(TZ).isoformat()
+    _reset_cycle(data)
     data["bucket_size_config"] = new_size  # Store in data for persistence
 
     save_bucket_data(data)
@@ -746,7 +1106,7 @@ def add_closer(name: str, color: str, full_name: str, default_probability: float
     data["stats"][name] = 0
 
     # Rebuild bucket
-    data["bucket"] = _create_initial_bucket(data["probabilities"])
+    data["bucket_counts"] = _initial_ticket_counts(data["probabilities"])
     data["total_draws"] = 0
     data["last_reset"] = datetime.now(TZ).isoformat()
 
@@ -803,7 +1163,7 @@ def remove_closer(name: str) -> Dict:
         del data["default_probabilities"][name]
 
     # Rebuild bucket
-    data["bucket"] = _create_initial_bucket(data["probabilities"])
+    data["bucket_counts"] = _initial_ticket_counts(data["probabilities"])
     data["total_draws"] = 0
     data["last_reset"] = datetime.now(TZ).isoformat()
 
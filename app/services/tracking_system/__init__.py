@@ -41,13 +41,15 @@ def recalculate_all_outcomes():
 
     logger.info("Recalculating all outcomes with new color mapping...")
 
-    # Berechne die letzten 30 Tage neu
+    # Berechne die letzten 30 Tage neu (ein paginierter Range-Durchlauf)
     today = datetime.now(TZ).date()
-    for i in range(30):
-        check_date = today - timedelta(days=i)
-        tracker.check_daily_outcomes(check_date)
+    result = tracker.check_outcomes_range(today - timedelta(days=29), today)
 
-    logger.info("Recalculation complete!")
+    logger.info(
+        f"Recalculation complete! {result['outcomes_tracked']} outcomes, "
+        f"{result['days_per_second']} days/s"
+    )
+    return result
 
 
 def backfill_september_data():
@@ -55,12 +57,6 @@ def backfill_september_data():
     Backfill tracking data from September 2nd, 2025 to today
     This will scan the Google Calendar and process all historical appointments
     """
-    from app.config.base import config
-    from app.core.google_calendar import get_google_calendar_service
-
-    service = get_google_calendar_service()
-    CENTRAL_CALENDAR_ID = config.CENTRAL_CALENDAR_ID
-
     logger.info("Starting September data backfill...")
 
     tracker = BookingTracker()
@@ -71,25 +67,24 @@ def backfill_september_data():
 
     # Calculate total days
     total_days = (today - start_date).days + 1
-    processed_days = 0
 
     logger.info(f"Backfilling from {start_date} to {today} ({total_days} days)")
 
-    # Process each day
-    current_date = start_date
-    while current_date <= today:
-        try:
-            logger.debug(f"Processing {current_date} ({processed_days + 1}/{total_days})")
-            tracker.check_daily_outcomes(current_date)
-            processed_days += 1
-
-        except Exception as e:
-            logger.error(f"Error processing {current_date}: {e}")
-
-        current_date += timedelta(days=1)
-
-    logger.info(f"Backfill complete! Processed {processed_days} days")
+    # Whole range in one paginated pass; failing days are reported, not fatal
+    try:
+        result = tracker.check_outcomes_range(start_date, today)
+    except Exception as e:
+        logger.error(f"Error backfilling {start_date}..{today}: {e}")
+        return None
+
+    logger.info(
+        f"Backfill complete! Processed {result['days']} days "
+        f"({result['outcomes_tracked']} outcomes, {result['days_per_second']} days/s)"
+    )
+    if result['failed_days']:
+        logger.warning(f"Backfill skipped {len(result['failed_days'])} failed day(s), re-run them individually")
     logger.info("Dashboard will now show data from September 2nd onwards")
+    return result
 
 
 # ----------------- Cron Job Function -----------------
@@ -8,6 +8,7 @@ from datetime import datetime
 from time import sleep as _sleep
 
 from app.services.tracking_system.converters import _get_potential_type
+from app.services.analytics_aggregates import invalidate_analytics_kpis
 
 logger = logging.getLogger(__name__)
 
@@ -102,6 +103,7 @@ def track_booking(tracker, customer_name, date, time_slot, user, color_id, descr
 
                     postgres_success = True
                     logger.info(f"Booking tracked to PostgreSQL: {booking_id} ({customer_name})")
+                    invalidate_analytics_kpis()
                 except Exception as e:
                     postgres_error = str(e)
                     logger.error(f"PostgreSQL write failed for {booking_id} ({customer_name}): {e}")
@@ -109,8 +111,12 @@ def track_booking(tracker, customer_name, date, time_slot, user, color_id, descr
             # 2. JSONL schreiben (immer, als Fallback)
             try:
                 os.makedirs(os.path.dirname(tracker.bookings_file), exist_ok=True)
-                with open(tracker.bookings_file, "a", encoding="utf-8") as f:
-                    f.write(json.dumps(booking_data, ensure_ascii=False) + "\n")
+                line = (json.dumps(booking_data, ensure_ascii=False) + "\n").encode("utf-8")
+                with open(tracker.bookings_file, "ab") as f:
+                    f.write(line)
+                    f.flush()
+                    offset = f.tell() - len(line)
+                _index_booking_line(tracker, offset, len(line), booking_data)
             except Exception as json_error:
                 if not postgres_success:
                     # Both writes failed — retry if attempts remain
@@ -172,6 +178,17 @@ def track_booking(tracker, customer_name, date, time_slot, user, color_id, descr
         return None
 
 
+def _index_booking_line(tracker, offset, length, booking_data):
+    """Sidecar-Index der JSONL-Datei fortschreiben (Lesepfad repariert fehlende Einträge)"""
+    try:
+        from app.services.tracking_system.booking_store import get_booking_store
+        get_booking_store(tracker.bookings_file).record_append(
+            offset, length, booking_data.get("date"), booking_data.get("user")
+        )
+    except Exception as e:
+        logger.debug(f"Booking index update skipped: {e}")
+
+
 def _queue_failed_booking(tracker, booking_data):
     """Speichere fehlgeschlagene Buchung in Failure-Queue für spätere Recovery"""
     try:
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Memory-mapped JSONL booking store with a sidecar offset index.
+
+Die JSON-Fallbacks lasen bookings.jsonl bisher komplett und dekodierten jede
+Zeile, auch wenn nur die letzten 30 Tage eines Users gebraucht wurden. Der
+Store hält pro Datei einen Index (Offset, Länge, Datum, User) je Zeile in
+einer Sidecar-Datei ``<datei>.idx``, mappt die JSONL-Datei per mmap und
+dekodiert nur die passenden Zeilen.
+
+Index-Format (Text, append-only):
+    # <inode>
+    <offset>\t<length>\t<date>\t<user>
+
+track_booking() hängt nach jedem JSONL-Append eine Index-Zeile an. Fehlende
+oder veraltete Index-Einträge (anderer Prozess, Crash, Rotation der Datei)
+werden beim Lesen durch einen Scan des nicht indizierten Datei-Endes ergänzt.
+"""
+
+import os
+import json
+import mmap
+import logging
+import tempfile
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = ".idx"
+
+# (offset, length inkl. Newline, date, user)
+Entry = Tuple[int, int, str, str]
+
+
+def _clean(value) -> str:
+    if value is None:
+        return ""
+    return str(value).replace("\t", " ").replace("\n", " ")
+
+
+class BookingJsonlStore:
+    """Indexierter Lesezugriff auf eine JSONL-Datei mit date/user-Feldern"""
+
+    def __init__(self, path: str, date_field: str = "date"):
+        self.path = path
+        # Quelle des Datums-Schlüssels (bei Zeitstempeln zählt der Tagesanteil)
+        self.date_field = date_field
+        self.index_path = path + INDEX_SUFFIX
+        self._lock = threading.Lock()
+        self._inode: Optional[int] = None
+        self._covered = 0
+        self._entries: List[Entry] = []
+        self._by_user: Dict[str, List[Entry]] = {}
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def iter_bookings(self, user: Optional[str] = None, start_date=None,
+                      end_date=None) -> Iterator[dict]:
+        """
+        Liefert Buchungen in Datei-Reihenfolge, gefiltert über den Index
+
+        Args:
+            user: Nur Buchungen dieses Users
+            start_date: Frühestes Datum (inklusive, date oder YYYY-MM-DD)
+            end_date: Spätestes Datum (inklusive, date oder YYYY-MM-DD)
+        """
+        entries = self._matching_entries(user, start_date, end_date)
+        if not entries:
+            return
+
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for offset, length, _, _ in entries:
+                    if offset + length > size:
+                        continue
+                    try:
+                        yield json.loads(mm[offset:offset + length])
+                    except ValueError:
+                        continue
+
+    def record_append(self, offset: int, length: int, date, user) -> None:
+        """
+        Registriert eine soeben angehängte JSONL-Zeile im Index
+
+        Args:
+            offset: Byte-Offset der Zeile in der JSONL-Datei
+            length: Länge der Zeile in Bytes inklusive Newline
+        """
+        entry = (offset, length, _clean(date)[:10], _clean(user))
+
+        with self._lock:
+            new_index = not os.path.exists(self.index_path)
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                if new_index:
+                    f.write(f"# {os.stat(self.path).st_ino}\n")
+                f.write(f"{offset}\t{length}\t{entry[2]}\t{entry[3]}\n")
+
+            # In-Memory-Index nur fortschreiben, wenn er lückenlos anschließt
+            if self._inode is not None and offset == self._covered:
+                self._add(entry)
+                self._covered = offset + length
+
+    def invalidate(self) -> None:
+        """Verwirft den In-Memory-Index (z.B. nach Ersetzen der Datei)"""
+        with self._lock:
+            self._reset()
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+
+    def _matching_entries(self, user, start_date, end_date) -> List[Entry]:
+        start = str(start_date) if start_date else None
+        end = str(end_date) if end_date else None
+
+        with self._lock:
+            if not self._refresh():
+                return []
+            candidates = self._by_user.get(user, []) if user is not None else self._entries
+
+            if start is None and end is None:
+                return list(candidates)
+
+            return [
+                e for e in candidates
+                if e[2] and (start is None or e[2] >= start) and (end is None or e[2] <= end)
+            ]
+
+    def _refresh(self) -> bool:
+        """Bringt den In-Memory-Index auf den Stand der Datei (Lock gehalten)"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._reset()
+            return False
+
+        if self._inode == st.st_ino and self._covered == st.st_size:
+            return True
+
+        if self._inode != st.st_ino or st.st_size < self._covered:
+            # Erstes Laden, Rotation oder Truncate
+            self._reset()
+            rewrite = self._load_index_file(st.st_ino, st.st_size)
+            self._inode = st.st_ino
+        else:
+            rewrite = False
+
+        if st.st_size > self._covered:
+            new_entries = self._scan(self._covered, st.st_size)
+            for entry in new_entries:
+                self._add(entry)
+            if new_entries:
+                self._covered = new_entries[-1][0] + new_entries[-1][1]
+                if rewrite:
+                    self._write_index_file()
+                else:
+                    self._append_index_lines(new_entries)
+        elif rewrite:
+            self._write_index_file()
+
+        return True
+
+    def _load_index_file(self, inode: int, size: int) -> bool:
+        """
+        Lädt den Sidecar-Index bis zur ersten Lücke
+
+        Returns:
+            True wenn die Index-Datei neu geschrieben werden sollte
+        """
+        if not os.path.exists(self.index_path):
+            return True
+
+        parsed = []
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                header = f.readline().strip()
+                if header != f"# {inode}":
+                    return True
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) != 4:
+                        continue
+                    try:
+                        parsed.append((int(parts[0]), int(parts[1]), parts[2], parts[3]))
+                    except ValueError:
+                        continue
+        except OSError as e:
+            logger.warning(f"Booking index unreadable, rebuilding: {e}")
+            return True
+
+        parsed.sort(key=lambda e: e[0])
+        expected = 0
+        dirty = False
+        for entry in parsed:
+            offset, length = entry[0], entry[1]
+            if offset < expected:
+                dirty = True  # Duplikat
+                continue
+            if offset > expected or offset + length > size:
+                dirty = True  # Lücke oder Eintrag jenseits des Dateiendes
+                break
+            self._add(entry)
+            expected = offset + length
+
+        self._covered = expected
+        return dirty
+
+    def _scan(self, start: int, end: int) -> List[Entry]:
+        """Indiziert vollständige Zeilen zwischen start und end"""
+        entries = []
+        with open(self.path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                end = min(end, len(mm))
+                pos = start
+                while pos < end:
+                    newline = mm.find(b"\n", pos, end)
+                    if newline == -1:
+                        break  # unvollständige letzte Zeile (Schreibvorgang läuft)
+                    length = newline + 1 - pos
+                    date, user = "", ""
+                    if length > 1:
+                        try:
+                            record = json.loads(mm[pos:newline + 1])
+                            date = _clean(record.get(self.date_field))[:10]
+                            user = _clean(record.get("user"))
+                        except (ValueError, AttributeError):
+                            pass
+                    entries.append((pos, length, date, user))
+                    pos = newline + 1
+        return entries
+
+    def _append_index_lines(self, entries: List[Entry]) -> None:
+        try:
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write("".join(f"{e[0]}\t{e[1]}\t{e[2]}\t{e[3]}\n" for e in entries))
+        except OSError as e:
+            logger.debug(f"Booking index append skipped: {e}")
+
+    def _write_index_file(self) -> None:
+        dir_name = os.path.dirname(self.index_path) or "."
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(f"# {self._inode}\n")
+                f.write("".join(f"{e[0]}\t{e[1]}\t{e[2]}\t{e[3]}\n" for e in self._entries))
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.debug(f"Booking index write skipped: {e}")
+
+    def _add(self, entry: Entry) -> None:
+        self._entries.append(entry)
+        self._by_user.setdefault(entry[3], []).append(entry)
+
+    def _reset(self) -> None:
+        self._inode = None
+        self._covered = 0
+        self._entries = []
+        self._by_user = {}
+
+
+_stores: Dict[str, BookingJsonlStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_booking_store(path: str, date_field: str = "date") -> BookingJsonlStore:
+    """Prozessweite Store-Instanz pro JSONL-Datei"""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = BookingJsonlStore(path, date_field=date_field)
+        return store
@@ -64,6 +64,10 @@ class BookingTracker:
         from app.services.tracking_system.outcome_analyzer import check_daily_outcomes
         return check_daily_outcomes(self, check_date)
 
+    def check_outcomes_range(self, start_date, end_date):
+        from app.services.tracking_system.outcome_analyzer import check_outcomes_range
+        return check_outcomes_range(self, start_date, end_date)
+
     # ---- customer_profiles ----
     def _update_customer_profiles(self):
         from app.services.tracking_system.customer_profiles import _update_customer_profiles
@@ -112,6 +116,10 @@ class BookingTracker:
         from app.services.tracking_system.historical import load_all_bookings
         return load_all_bookings(self)
 
+    def iter_all_bookings(self, batch_size=1000):
+        from app.services.tracking_system.historical import iter_all_bookings
+        return iter_all_bookings(self, batch_size)
+
     def load_historical_data(self):
         from app.services.tracking_system.historical import load_historical_data
         return load_historical_data(self)
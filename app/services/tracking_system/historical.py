@@ -12,6 +12,7 @@ import pytz
 
 from app.services.tracking_system.utils import _get_german_weekday
 from app.services.tracking_system.converters import _extract_status_from_title, _clean_customer_name
+from app.services.tracking_system.booking_store import get_booking_store
 
 logger = logging.getLogger(__name__)
 TZ = pytz.timezone("Europe/Berlin")
@@ -63,24 +64,17 @@ def get_user_bookings(tracker, user, start_date, end_date):
         if not os.path.exists(tracker.bookings_file):
             return bookings
 
-        with open(tracker.bookings_file, "r", encoding="utf-8") as f:
-            for line in f:
-                if line.strip():
-                    try:
-                        booking = json.loads(line)
-                        if booking.get("user") == user:
-                            booking_date = booking.get("date")
-                            if start_date <= booking_date <= end_date:
-                                bookings.append({
-                                    "date": booking["date"],
-                                    "time_slot": booking["time"],
-                                    "customer_name": booking["customer"],
-                                    "color_id": booking["color_id"],
-                                    "description": booking.get("description", ""),
-                                    "potential_type": booking.get("potential_type", "unknown")
-                                })
-                    except json.JSONDecodeError:
-                        continue
+        # Index-Lookup: nur Zeilen des Users im Zeitraum werden dekodiert
+        store = get_booking_store(tracker.bookings_file)
+        for booking in store.iter_bookings(user=user, start_date=start_date, end_date=end_date):
+            bookings.append({
+                "date": booking["date"],
+                "time_slot": booking["time"],
+                "customer_name": booking["customer"],
+                "color_id": booking["color_id"],
+                "description": booking.get("description", ""),
+                "potential_type": booking.get("potential_type", "unknown")
+            })
 
         return bookings
 
@@ -135,14 +129,7 @@ def load_all_bookings(tracker):
         if not os.path.exists(tracker.bookings_file):
             return bookings
 
-        with open(tracker.bookings_file, "r", encoding="utf-8") as f:
-            for line in f:
-                if line.strip():
-                    try:
-                        booking = json.loads(line)
-                        bookings.append(booking)
-                    except json.JSONDecodeError:
-                        continue
+        bookings.extend(get_booking_store(tracker.bookings_file).iter_bookings())
 
         return bookings
 
@@ -158,26 +145,87 @@ def _load_all_bookings_pg():
         rows = session.query(Booking).order_by(Booking.date.desc()).all()
         if not rows:
             return None
-        bookings = []
-        for b in rows:
-            bookings.append({
-                "booking_id": b.booking_id,
-                "customer": b.customer,
-                "date": str(b.date),
-                "time": b.time,
-                "weekday": b.weekday,
-                "week_number": b.week_number,
-                "user": b.username,
-                "potential_type": b.potential_type,
-                "color_id": b.color_id,
-                "description_length": b.description_length,
-                "has_description": b.has_description,
-                "booking_lead_time": b.booking_lead_time,
-                "booked_at_hour": b.booked_at_hour,
-                "booked_on_weekday": b.booked_on_weekday,
-                "booking_timestamp": b.booking_timestamp.isoformat() if b.booking_timestamp else None
-            })
-        return bookings
+        return [_booking_row_to_dict(b) for b in rows]
+
+
+def _booking_row_to_dict(b):
+    """Booking-Zeile (ORM-Objekt oder Core-Row) im bookings.jsonl-Format"""
+    return {
+        "booking_id": b.booking_id,
+        "customer": b.customer,
+        "date": str(b.date),
+        "time": b.time,
+        "weekday": b.weekday,
+        "week_number": b.week_number,
+        "user": b.username,
+        "potential_type": b.potential_type,
+        "color_id": b.color_id,
+        "description_length": b.description_length,
+        "has_description": b.has_description,
+        "booking_lead_time": b.booking_lead_time,
+        "booked_at_hour": b.booked_at_hour,
+        "booked_on_weekday": b.booked_on_weekday,
+        "booking_timestamp": b.booking_timestamp.isoformat() if b.booking_timestamp else None
+    }
+
+
+def iter_all_bookings(tracker, batch_size=1000):
+    """
+    Streamt alle Buchungen (PG-First, JSON-Fallback), ohne sie zu materialisieren
+
+    Gleiche Datensätze wie load_all_bookings(), aber als Generator: PG liest
+    in Keyset-Seiten (je eine kurze Session), der JSON-Fallback Zeile für Zeile.
+    Für Exports, deren Größe mit der Buchungshistorie wächst.
+    """
+    # 1. PostgreSQL-First
+    if POSTGRES_AVAILABLE and is_postgres_enabled():
+        yielded = False
+        try:
+            for booking in _iter_all_bookings_pg(batch_size):
+                yielded = True
+                yield booking
+        except Exception as e:
+            if yielded:
+                raise
+            logger.warning(f"PG iter_all_bookings failed, falling back to JSON: {e}")
+        if yielded:
+            return
+
+    # 2. JSON-Fallback
+    if not os.path.exists(tracker.bookings_file):
+        return
+
+    yield from get_booking_store(tracker.bookings_file).iter_bookings()
+
+
+def _iter_all_bookings_pg(batch_size):
+    """
+    PG: Booking-Tabelle in Keyset-Seiten per Core-Select (keine ORM-Identity-Map)
+
+    Jede Seite nutzt eine eigene, kurzlebige Session, die vor dem Yield
+    geschlossen wird: ein langsamer oder abgebrochener Download hält keine
+    DB-Verbindung fest.
+    """
+    from sqlalchemy import and_, or_, select
+    from app.utils.db_utils import db_session_scope_no_commit
+    table = Booking.__table__
+    last_key = None
+    while True:
+        stmt = select(table).order_by(table.c.date.desc(), table.c.id.desc()).limit(batch_size)
+        if last_key is not None:
+            last_date, last_id = last_key
+            stmt = stmt.where(or_(
+                table.c.date < last_date,
+                and_(table.c.date == last_date, table.c.id < last_id),
+            ))
+        page = []
+        with db_session_scope_no_commit() as session:
+            for row in session.execute(stmt):
+                page.append(_booking_row_to_dict(row))
+                last_key = (row.date, row.id)
+        yield from page
+        if len(page) < batch_size:
+            return
 
 
 def load_historical_data(tracker):
@@ -200,14 +248,9 @@ def load_historical_data(tracker):
 
         # Lade historische Buchungen
         if os.path.exists(historical_bookings_file):
-            with open(historical_bookings_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    if line.strip():
-                        try:
-                            booking = json.loads(line)
-                            historical_data["bookings"].append(booking)
-                        except json.JSONDecodeError:
-                            continue
+            historical_data["bookings"].extend(
+                get_booking_store(historical_bookings_file).iter_bookings()
+            )
 
         # Lade historische Outcomes
         if os.path.exists(historical_outcomes_file):
@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
-"""Daily outcome checking: scan calendar events, classify outcomes, write metrics."""
+"""Outcome checking: fetch calendar events per date range, classify outcomes, write metrics in bulk."""
 
 import os
 import re
 import json
 import logging
+import time as time_mod
 from datetime import datetime, timedelta, time
 from collections import defaultdict
 
@@ -13,6 +14,7 @@ import pytz
 from app.services.tracking_system.utils import _atomic_json_write
 from app.services.tracking_system.converters import _get_potential_type, _get_outcome_from_title_and_color
 from app.services.tracking_system.customer_profiles import _update_customer_profiles
+from app.services.analytics_aggregates import invalidate_analytics_kpis
 
 logger = logging.getLogger(__name__)
 TZ = pytz.timezone("Europe/Berlin")
@@ -47,11 +49,17 @@ except ImportError:
     POSTGRES_AVAILABLE = False
 
 
+# Google Calendar erlaubt bis zu 2500 Events pro Seite
+EVENTS_PAGE_SIZE = 2500
+
+
 def check_daily_outcomes(tracker, check_date=None):
     """
     Prüft alle Termine eines Tages auf No-Shows/Outcomes
     Standardmäßig prüft es den aktuellen Tag
     Sollte täglich um 21:00 Uhr laufen
+
+    Einzeltag-Variante von check_outcomes_range().
     """
     if check_date is None:
         check_date = datetime.now(TZ).date()
@@ -60,177 +68,338 @@ def check_daily_outcomes(tracker, check_date=None):
 
     logger.debug(f"Checking outcomes for {check_date}")
 
-    # Hole alle Events des Tages
-    start_time = TZ.localize(datetime.combine(check_date, time.min))
-    end_time = TZ.localize(datetime.combine(check_date, time.max))
-
     try:
-        events_result = tracker.service.events().list(
-            calendarId=CENTRAL_CALENDAR_ID,
-            timeMin=start_time.isoformat(),
-            timeMax=end_time.isoformat(),
-            singleEvents=True,
-            orderBy='startTime',
-            maxResults=100
-        ).execute()
-
-        events = events_result.get('items', [])
-        outcomes_tracked = 0
-        pg_failed_count = 0
-
-        for event in events:
-            # Skip Platzhalter (nur Zahlen)
-            if event.get("summary", "").isdigit():
-                continue
-
-            # Extrahiere Daten
-            customer_name = event.get("summary", "Unknown")
-            color_id = event.get("colorId", "9")  # Default: Graphit
-            event_start = event.get("start", {}).get("dateTime")
-
-            if not event_start:
-                continue
-
-            event_time = datetime.fromisoformat(event_start).strftime("%H:%M")
-
-            # Extrahiere Telefonist aus Event-Organizer
-            consultant_name = "Unknown"
-            consultant_email = None
-            consultants_map = consultant_config.get_consultants()
-
-            # Hole Organizer Email (Telefonist der den Termin erstellt hat)
-            organizer = event.get("organizer", {})
-            organizer_email = organizer.get("email", "").lower()
-
-            # Matche Organizer Email gegen Consultants Map
-            if organizer_email:
-                for name, email in consultants_map.items():
-                    if organizer_email == email.lower():
-                        consultant_name = name
-                        consultant_email = organizer_email
-                        break
-
-            # Fallback: Parse [Booked by: X] aus Description
-            if consultant_name == "Unknown":
-                description = event.get("description", "")
-                booked_by_match = re.search(r'\[Booked by:\s*([^\]]+)\]', description)
-                if booked_by_match:
-                    username = booked_by_match.group(1).strip().lower()
-                    # Map username to display name
-                    consultant_name = USERNAME_TO_DISPLAY.get(username, username.title())
-
-            # WICHTIG: Nutze titel-basierte Outcome-Bestimmung
-            outcome = _get_outcome_from_title_and_color(customer_name, color_id)
-
-            # Track outcome
-            outcome_data = {
-                "id": f"{check_date}_{event_time}_{customer_name}".replace(" ", "_"),
-                "timestamp": datetime.now(TZ).isoformat(),
-                "customer": customer_name,
-                "date": str(check_date),
-                "time": event_time,
-                "outcome": outcome,
-                "color_id": color_id,
-                "potential_type": _get_potential_type(color_id),
-                "checked_at": datetime.now(TZ).strftime("%H:%M"),
-                "description": event.get("description", ""),
-                "consultant": consultant_name,
-                "consultant_email": consultant_email
-            }
-
-            # Spezielle Behandlung für No-Shows
-            if outcome == "no_show":
-                outcome_data["alert"] = "NO_SHOW_DETECTED"
-                logger.warning(f"No-Show detected: {customer_name} at {event_time}")
-            elif outcome == "cancelled":
-                logger.info(f"Cancelled: {customer_name} at {event_time}")
-            elif outcome == "completed":
-                logger.info(f"Completed: {customer_name} at {event_time} (Color: {color_id})")
-
-            # ========== PostgreSQL Dual-Write (mit Retry) ==========
-            pg_write_ok = False
-            if POSTGRES_AVAILABLE and is_postgres_enabled():
-                for attempt in range(2):
-                    try:
-                        from app.utils.db_utils import db_session_scope
-                        with db_session_scope() as db_session:
-                            outcome_id = outcome_data["id"]
-                            existing = db_session.query(BookingOutcome).filter_by(
-                                outcome_id=outcome_id
-                            ).first()
-
-                            if existing:
-                                existing.outcome = outcome
-                                existing.color_id = color_id
-                                existing.potential_type = outcome_data["potential_type"]
-                                existing.checked_at = outcome_data["checked_at"]
-                                existing.description = outcome_data.get("description", "")
-                                existing.is_alert = outcome == "no_show"
-                                existing.consultant = outcome_data.get("consultant")
-                                existing.consultant_email = outcome_data.get("consultant_email")
-                            else:
-                                pg_outcome = BookingOutcome(
-                                    outcome_id=outcome_id,
-                                    customer=customer_name,
-                                    date=check_date,
-                                    time=event_time,
-                                    outcome=outcome,
-                                    color_id=color_id,
-                                    potential_type=outcome_data["potential_type"],
-                                    description=outcome_data.get("description", ""),
-                                    is_alert=outcome == "no_show",
-                                    checked_at=outcome_data["checked_at"],
-                                    outcome_timestamp=datetime.now(TZ),
-                                    consultant=outcome_data.get("consultant"),
-                                    consultant_email=outcome_data.get("consultant_email")
-                                )
-                                db_session.add(pg_outcome)
-                        pg_write_ok = True
-                        break
-                    except RuntimeError as e:
-                        # Database not initialized - log clearly and skip retries
-                        pg_failed_count += 1
-                        logger.error(f"PG outcome write SKIPPED (DB not initialized): {e}")
-                        break
-                    except Exception as e:
-                        if attempt == 0:
-                            import time as time_mod
-                            time_mod.sleep(1)
-                            logger.warning(f"PG outcome write retry for {outcome_data['id']}: {e}")
-                        else:
-                            pg_failed_count += 1
-                            logger.error(f"PG outcome write FAILED after retry for {outcome_data['id']}: {e}")
-
-            # Speichere Outcome (JSONL)
-            with open(tracker.outcomes_file, "a", encoding="utf-8") as f:
-                f.write(json.dumps(outcome_data, ensure_ascii=False) + "\n")
-
-            # HubSpot Queue Hook: Ghost/No-Show/Cancelled/Rescheduled → Review-Queue
-            if outcome in ("ghost", "no_show", "cancelled", "rescheduled"):
-                try:
-                    _queue_hubspot_outcome(outcome_data)
-                except Exception as hs_err:
-                    logger.warning(f"HubSpot queue hook failed: {hs_err}")
-
-            outcomes_tracked += 1
-
-        if pg_failed_count > 0:
-            logger.error(f"PG outcome writes: {pg_failed_count} of {outcomes_tracked} FAILED for {check_date}")
-        logger.info(f"Tracked {outcomes_tracked} outcomes for {check_date}")
-
-        # Berechne Tagesmetriken
-        _calculate_daily_metrics(tracker, check_date, events)
-
-        # Update Kundenprofile
-        _update_customer_profiles(tracker)
-
-        return outcomes_tracked
-
+        result = check_outcomes_range(tracker, check_date, check_date)
+        return result["outcomes_tracked"]
     except Exception as e:
         logger.error(f"Error checking outcomes: {e}")
         return 0
 
 
+def check_outcomes_range(tracker, start_date, end_date):
+    """
+    Range-basierte Outcome-Engine
+
+    Holt alle Events des Zeitraums in einem paginierten Durchlauf, gruppiert
+    sie nach Tag, klassifiziert die Tage nacheinander und schreibt Outcomes und
+    Tagesmetriken gebündelt (eine PG-Transaktion, ein JSONL-Append, ein
+    Metrics-File-Write). Ein fehlerhafter Tag wird übersprungen und in
+    failed_days gemeldet, der Rest des Zeitraums läuft weiter.
+
+    Args:
+        tracker: BookingTracker
+        start_date: Erster Tag (date oder YYYY-MM-DD)
+        end_date: Letzter Tag inklusive (date oder YYYY-MM-DD)
+
+    Returns:
+        Dict mit days, outcomes_tracked, failed_days, pg_failed, elapsed_seconds, days_per_second
+    """
+    start_date = _as_date(start_date)
+    end_date = _as_date(end_date)
+    if end_date < start_date:
+        start_date, end_date = end_date, start_date
+
+    started = time_mod.monotonic()
+    days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+    events_by_day = _fetch_events_range(tracker, start_date, end_date)
+
+    # Einmal pro Lauf statt pro Event
+    consultants_map = {
+        email.lower(): name for name, email in consultant_config.get_consultants().items() if email
+    }
+    now = datetime.now(TZ)
+
+    # Klassifikation ist reines CPU-Python: Threads bringen unter dem GIL nichts
+    outcomes = []
+    metrics_by_day = {}
+    failed_days = []
+    for day in days:
+        try:
+            day_outcomes, metrics = _classify_day(day, events_by_day.get(day, []), consultants_map, now)
+        except Exception as e:
+            logger.error(f"Outcome classification failed for {day}: {e}", exc_info=True)
+            failed_days.append({"date": str(day), "error": str(e)})
+            continue
+        outcomes.extend(day_outcomes)
+        metrics_by_day[str(day)] = metrics
+
+    for outcome_data in outcomes:
+        _log_outcome(outcome_data)
+
+    pg_failed_count = _write_outcomes_bulk(tracker, outcomes)
+
+    # HubSpot Queue Hook: Ghost/No-Show/Cancelled/Rescheduled → Review-Queue
+    for outcome_data in outcomes:
+        if outcome_data["outcome"] in ("ghost", "no_show", "cancelled", "rescheduled"):
+            try:
+                _queue_hubspot_outcome(outcome_data)
+            except Exception as hs_err:
+                logger.warning(f"HubSpot queue hook failed: {hs_err}")
+
+    if pg_failed_count > 0:
+        logger.error(f"PG outcome writes: {pg_failed_count} of {len(outcomes)} FAILED for {start_date}..{end_date}")
+
+    # Analytics KPI snapshots are stale now
+    invalidate_analytics_kpis()
+
+    # Tagesmetriken gebündelt speichern
+    _write_daily_metrics(tracker, metrics_by_day)
+
+    # Update Kundenprofile
+    _update_customer_profiles(tracker)
+
+    elapsed = time_mod.monotonic() - started
+    days_per_second = round(len(days) / elapsed, 2) if elapsed > 0 else float(len(days))
+    logger.info(
+        f"Tracked {len(outcomes)} outcomes for {start_date}..{end_date} "
+        f"({len(days)} days in {elapsed:.2f}s, {days_per_second} days/s)"
+    )
+    if failed_days:
+        logger.warning(
+            f"{len(failed_days)} of {len(days)} days failed for {start_date}..{end_date}: "
+            f"{', '.join(d['date'] for d in failed_days)}"
+        )
+
+    return {
+        "start_date": str(start_date),
+        "end_date": str(end_date),
+        "days": len(days),
+        "outcomes_tracked": len(outcomes),
+        "failed_days": failed_days,
+        "pg_failed": pg_failed_count,
+        "elapsed_seconds": round(elapsed, 3),
+        "days_per_second": days_per_second,
+    }
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+# ========== Fetch ==========
+
+def _fetch_events_range(tracker, start_date, end_date):
+    """Holt alle Events des Zeitraums (paginiert) gruppiert nach Tag"""
+    start_time = TZ.localize(datetime.combine(start_date, time.min))
+    end_time = TZ.localize(datetime.combine(end_date, time.max))
+
+    events_by_day = defaultdict(list)
+    page_token = None
+    pages = 0
+
+    while True:
+        params = {
+            "calendarId": CENTRAL_CALENDAR_ID,
+            "timeMin": start_time.isoformat(),
+            "timeMax": end_time.isoformat(),
+            "singleEvents": True,
+            "orderBy": "startTime",
+            "maxResults": EVENTS_PAGE_SIZE,
+        }
+        if page_token:
+            params["pageToken"] = page_token
+
+        events_result = tracker.service.events().list(**params).execute()
+        pages += 1
+
+        for event in events_result.get("items", []):
+            day = _event_day(event)
+            if day is not None and start_date <= day <= end_date:
+                events_by_day[day].append(event)
+
+        page_token = events_result.get("nextPageToken")
+        if not page_token:
+            break
+
+    logger.debug(f"Fetched {sum(len(v) for v in events_by_day.values())} events in {pages} page(s)")
+    return events_by_day
+
+
+def _event_day(event):
+    """Kalendertag (Europe/Berlin) eines Events"""
+    start = event.get("start", {})
+    if start.get("dateTime"):
+        dt = datetime.fromisoformat(start["dateTime"])
+        return dt.astimezone(TZ).date() if dt.tzinfo else dt.date()
+    if start.get("date"):
+        return datetime.strptime(start["date"], "%Y-%m-%d").date()
+    return None
+
+
+# ========== Classification ==========
+
+def _classify_day(day, events, consultants_map, now):
+    """Klassifiziert alle Events eines Tages → (Outcomes, Tagesmetriken)"""
+    outcomes = []
+    for event in events:
+        outcome_data = _classify_event(event, day, consultants_map, now)
+        if outcome_data is not None:
+            outcomes.append(outcome_data)
+    return outcomes, _compute_daily_metrics(day, events, now)
+
+
+def _classify_event(event, check_date, consultants_map, now):
+    """Outcome-Datensatz für ein Event (None für Platzhalter/ganztägige Events)"""
+    # Skip Platzhalter (nur Zahlen)
+    if event.get("summary", "").isdigit():
+        return None
+
+    # Extrahiere Daten
+    customer_name = event.get("summary", "Unknown")
+    color_id = event.get("colorId", "9")  # Default: Graphit
+    event_start = event.get("start", {}).get("dateTime")
+
+    if not event_start:
+        return None
+
+    event_time = datetime.fromisoformat(event_start).strftime("%H:%M")
+
+    # Extrahiere Telefonist aus Event-Organizer (Telefonist der den Termin erstellt hat)
+    consultant_name = "Unknown"
+    consultant_email = None
+
+    organizer_email = event.get("organizer", {}).get("email", "").lower()
+    if organizer_email and organizer_email in consultants_map:
+        consultant_name = consultants_map[organizer_email]
+        consultant_email = organizer_email
+
+    # Fallback: Parse [Booked by: X] aus Description
+    if consultant_name == "Unknown":
+        description = event.get("description", "")
+        booked_by_match = re.search(r'\[Booked by:\s*([^\]]+)\]', description)
+        if booked_by_match:
+            username = booked_by_match.group(1).strip().lower()
+            # Map username to display name
+            consultant_name = USERNAME_TO_DISPLAY.get(username, username.title())
+
+    # WICHTIG: Nutze titel-basierte Outcome-Bestimmung
+    outcome = _get_outcome_from_title_and_color(customer_name, color_id)
+
+    outcome_data = {
+        "id": f"{check_date}_{event_time}_{customer_name}".replace(" ", "_"),
+        "timestamp": now.isoformat(),
+        "customer": customer_name,
+        "date": str(check_date),
+        "time": event_time,
+        "outcome": outcome,
+        "color_id": color_id,
+        "potential_type": _get_potential_type(color_id),
+        "checked_at": now.strftime("%H:%M"),
+        "description": event.get("description", ""),
+        "consultant": consultant_name,
+        "consultant_email": consultant_email
+    }
+
+    # Spezielle Behandlung für No-Shows
+    if outcome == "no_show":
+        outcome_data["alert"] = "NO_SHOW_DETECTED"
+
+    return outcome_data
+
+
+def _log_outcome(outcome_data):
+    outcome = outcome_data["outcome"]
+    customer_name = outcome_data["customer"]
+    event_time = outcome_data["time"]
+    if outcome == "no_show":
+        logger.warning(f"No-Show detected: {customer_name} at {event_time}")
+    elif outcome == "cancelled":
+        logger.info(f"Cancelled: {customer_name} at {event_time}")
+    elif outcome == "completed":
+        logger.info(f"Completed: {customer_name} at {event_time} (Color: {outcome_data['color_id']})")
+
+
+# ========== Bulk Writes ==========
+
+def _write_outcomes_bulk(tracker, outcomes):
+    """
+    Schreibt Outcomes gebündelt: PG-Upsert in einer Transaktion (mit Retry),
+    danach ein einziger JSONL-Append.
+
+    Returns:
+        Anzahl der Outcomes, deren PG-Write fehlgeschlagen ist
+    """
+    if not outcomes:
+        return 0
+
+    pg_failed_count = 0
+
+    # ========== PostgreSQL Dual-Write (mit Retry) ==========
+    if POSTGRES_AVAILABLE and is_postgres_enabled():
+        for attempt in range(2):
+            try:
+                _upsert_outcomes_pg(outcomes)
+                break
+            except RuntimeError as e:
+                # Database not initialized - log clearly and skip retries
+                pg_failed_count = len(outcomes)
+                logger.error(f"PG outcome write SKIPPED (DB not initialized): {e}")
+                break
+            except Exception as e:
+                if attempt == 0:
+                    time_mod.sleep(1)
+                    logger.warning(f"PG outcome bulk write retry ({len(outcomes)} outcomes): {e}")
+                else:
+                    pg_failed_count = len(outcomes)
+                    logger.error(f"PG outcome bulk write FAILED after retry: {e}")
+
+    # Speichere Outcomes (JSONL, ein Append)
+    with open(tracker.outcomes_file, "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(o, ensure_ascii=False) + "\n" for o in outcomes))
+
+    return pg_failed_count
+
+
+def _upsert_outcomes_pg(outcomes):
+    """PG: Upsert aller Outcomes per outcome_id in einer Session"""
+    from app.utils.db_utils import db_session_scope
+
+    # Letzter Eintrag pro ID gewinnt (wie bei sequentiellen Einzel-Upserts)
+    by_id = {o["id"]: o for o in outcomes}
+    ids = list(by_id)
+
+    with db_session_scope() as db_session:
+        existing = {}
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            for row in db_session.query(BookingOutcome).filter(BookingOutcome.outcome_id.in_(chunk)):
+                existing[row.outcome_id] = row
+
+        outcome_timestamp = datetime.now(TZ)
+        for outcome_id, data in by_id.items():
+            row = existing.get(outcome_id)
+            if row is not None:
+                row.outcome = data["outcome"]
+                row.color_id = data["color_id"]
+                row.potential_type = data["potential_type"]
+                row.checked_at = data["checked_at"]
+                row.description = data.get("description", "")
+                row.is_alert = data["outcome"] == "no_show"
+                row.consultant = data.get("consultant")
+                row.consultant_email = data.get("consultant_email")
+            else:
+                db_session.add(BookingOutcome(
+                    outcome_id=outcome_id,
+                    customer=data["customer"],
+                    date=datetime.strptime(data["date"], "%Y-%m-%d").date(),
+                    time=data["time"],
+                    outcome=data["outcome"],
+                    color_id=data["color_id"],
+                    potential_type=data["potential_type"],
+                    description=data.get("description", ""),
+                    is_alert=data["outcome"] == "no_show",
+                    checked_at=data["checked_at"],
+                    outcome_timestamp=outcome_timestamp,
+                    consultant=data.get("consultant"),
+                    consultant_email=data.get("consultant_email")
+                ))
+
+
 def _queue_hubspot_outcome(outcome_data):
     """Erstelle ein HubSpot Review-Queue Item fuer Ghost/No-Show Outcomes."""
     from app.services.hubspot_service import hubspot_service
@@ -310,8 +479,8 @@ def _queue_hubspot_outcome(outcome_data):
             pass
 
 
-def _calculate_daily_metrics(tracker, date, events):
-    """Berechne und speichere Tagesstatistiken"""
+def _compute_daily_metrics(date, events, now=None):
+    """Berechne Tagesstatistiken aus den Events eines Tages"""
     metrics = {
         "date": str(date),
         "total_slots": 0,
@@ -324,7 +493,7 @@ def _calculate_daily_metrics(tracker, date, events):
         "by_hour": defaultdict(lambda: {"total": 0, "no_shows": 0, "ghosts": 0, "completed": 0, "cancelled": 0, "rescheduled": 0, "overhang": 0}),
         "by_user": defaultdict(lambda: {"total": 0, "no_shows": 0, "ghosts": 0, "completed": 0}),
         "by_potential": defaultdict(lambda: {"total": 0, "completed": 0}),
-        "calculated_at": datetime.now(TZ).isoformat()
+        "calculated_at": (now or datetime.now(TZ)).isoformat()
     }
 
     for event in events:
@@ -389,54 +558,40 @@ def _calculate_daily_metrics(tracker, date, events):
         metrics["completion_rate"] = 0
         metrics["cancellation_rate"] = 0
 
-    # PG Write (upsert by date)
+    return metrics
+
+
+def _write_daily_metrics(tracker, metrics_by_day):
+    """Speichert Tagesmetriken mehrerer Tage gebündelt (PG + JSON dual-write)"""
+    if not metrics_by_day:
+        return
+
+    # PG Write (upsert by date, eine Transaktion)
     if POSTGRES_AVAILABLE and is_postgres_enabled():
         try:
             from app.utils.db_utils import db_session_scope
             with db_session_scope() as session:
-                from datetime import date as date_type
-                metric_date = datetime.strptime(str(date), "%Y-%m-%d").date() if not isinstance(date, date_type) else date
-                existing = session.query(DailyMetrics).filter_by(date=metric_date).first()
-                if existing:
-                    existing.total_slots = metrics["total_slots"]
-                    existing.no_shows = metrics["no_shows"]
-                    existing.ghosts = metrics["ghosts"]
-                    existing.completed = metrics["completed"]
-                    existing.cancelled = metrics["cancelled"]
-                    existing.rescheduled = metrics["rescheduled"]
-                    existing.overhang = metrics["overhang"]
-                    existing.no_show_rate = metrics.get("no_show_rate", 0)
-                    existing.ghost_rate = metrics.get("ghost_rate", 0)
-                    existing.completion_rate = metrics.get("completion_rate", 0)
-                    existing.cancellation_rate = metrics.get("cancellation_rate", 0)
-                    existing.by_hour = json.dumps(dict(metrics["by_hour"]))
-                    existing.by_user = json.dumps(dict(metrics["by_user"]))
-                    existing.by_potential = json.dumps(dict(metrics["by_potential"]))
-                    existing.calculated_at = datetime.fromisoformat(metrics["calculated_at"])
-                else:
-                    session.add(DailyMetrics(
-                        date=metric_date,
-                        total_slots=metrics["total_slots"],
-                        no_shows=metrics["no_shows"],
-                        ghosts=metrics["ghosts"],
-                        completed=metrics["completed"],
-                        cancelled=metrics["cancelled"],
-                        rescheduled=metrics["rescheduled"],
-                        overhang=metrics["overhang"],
-                        no_show_rate=metrics.get("no_show_rate", 0),
-                        ghost_rate=metrics.get("ghost_rate", 0),
-                        completion_rate=metrics.get("completion_rate", 0),
-                        cancellation_rate=metrics.get("cancellation_rate", 0),
-                        by_hour=json.dumps(dict(metrics["by_hour"])),
-                        by_user=json.dumps(dict(metrics["by_user"])),
-                        by_potential=json.dumps(dict(metrics["by_potential"])),
-                        calculated_at=datetime.fromisoformat(metrics["calculated_at"])
-                    ))
-            logger.debug("Daily metrics written to PG")
+                metric_dates = {
+                    datetime.strptime(day, "%Y-%m-%d").date(): metrics
+                    for day, metrics in metrics_by_day.items()
+                }
+                existing_rows = {
+                    row.date: row for row in
+                    session.query(DailyMetrics).filter(DailyMetrics.date.in_(list(metric_dates)))
+                }
+                for metric_date, metrics in metric_dates.items():
+                    values = _daily_metrics_columns(metrics)
+                    existing = existing_rows.get(metric_date)
+                    if existing:
+                        for key, value in values.items():
+                            setattr(existing, key, value)
+                    else:
+                        session.add(DailyMetrics(date=metric_date, **values))
+            logger.debug(f"Daily metrics written to PG ({len(metrics_by_day)} days)")
         except Exception as e:
             logger.warning(f"PG daily metrics write failed: {e}")
 
-    # Speichere Metriken (JSON dual-write pattern)
+    # Speichere Metriken (JSON dual-write pattern, ein Write für alle Tage)
     try:
         if os.path.exists(tracker.metrics_file):
             with open(tracker.metrics_file, "r", encoding="utf-8") as f:
@@ -444,7 +599,7 @@ def _calculate_daily_metrics(tracker, date, events):
         else:
             all_metrics = {}
 
-        all_metrics[str(date)] = metrics
+        all_metrics.update(metrics_by_day)
 
         # Primary storage (atomic write)
         _atomic_json_write(tracker.metrics_file, all_metrics)
@@ -455,10 +610,28 @@ def _calculate_daily_metrics(tracker, date, events):
         except Exception as e:
             logger.warning(f"Could not write to persistent metrics: {e}")
 
-        logger.debug("Daily metrics saved")
-        logger.debug(f"Completed: {metrics['completed']} ({metrics['completion_rate']}%)")
-        logger.debug(f"No-Shows: {metrics['no_shows']} ({metrics['no_show_rate']}%)")
-        logger.debug(f"Cancelled: {metrics['cancelled']} ({metrics['cancellation_rate']}%)")
+        logger.debug(f"Daily metrics saved ({len(metrics_by_day)} days)")
 
     except Exception as e:
         logger.error(f"Error saving metrics: {e}")
+
+
+def _daily_metrics_columns(metrics):
+    """Tagesmetriken-Dict → DailyMetrics-Spaltenwerte"""
+    return {
+        "total_slots": metrics["total_slots"],
+        "no_shows": metrics["no_shows"],
+        "ghosts": metrics["ghosts"],
+        "completed": metrics["completed"],
+        "cancelled": metrics["cancelled"],
+        "rescheduled": metrics["rescheduled"],
+        "overhang": metrics["overhang"],
+        "no_show_rate": metrics.get("no_show_rate", 0),
+        "ghost_rate": metrics.get("ghost_rate", 0),
+        "completion_rate": metrics.get("completion_rate", 0),
+        "cancellation_rate": metrics.get("cancellation_rate", 0),
+        "by_hour": json.dumps(dict(metrics["by_hour"])),
+        "by_user": json.dumps(dict(metrics["by_user"])),
+        "by_potential": json.dumps(dict(metrics["by_potential"])),
+        "calculated_at": datetime.fromisoformat(metrics["calculated_at"]),
+    }
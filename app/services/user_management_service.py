@@ -125,7 +125,7 @@ class UserManagementService:
         admin_overrides = registry.get('admin_overrides', {})
 
         # Load shared data once
-        login_history = data_persistence.load_data('login_history', default={})
+        login_history = activity_tracking.get_login_history_map()
         scores = data_persistence.load_scores()
         online_users_list = activity_tracking.get_online_users(timeout_minutes=15)
         online_usernames = {u.get('username', '') if isinstance(u, dict) else u for u in online_users_list}
@@ -226,7 +226,7 @@ class UserManagementService:
             return None
 
         # Login history (last 20)
-        login_history = data_persistence.load_data('login_history', default={})
+        login_history = activity_tracking.get_login_history_map()
         user_logins = login_history.get(username, [])[:20]
         formatted_logins = []
         for entry in user_logins:
@@ -12,12 +12,19 @@ so we need OS-level file locks to prevent data corruption.
 import os
 import time
 import platform
+import threading
 from contextlib import contextmanager
 from typing import Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Erster Backoff-Schritt bei belegtem Lock (Sekunden), verdoppelt bis check_interval
+INITIAL_BACKOFF = 0.001
+
+# Pro Thread gehaltene Locks (Pfad -> [FileLock, Tiefe]) für Re-Entrancy
+_held = threading.local()
+
 # Import platform-specific locking mechanism
 try:
     import fcntl
@@ -65,8 +72,8 @@ class FileLock:
 
         Args:
             filepath: Path to file to lock
-            timeout: Maximum time to wait for lock (seconds)
-            check_interval: Time between lock attempts (seconds)
+            timeout: Maximum time to wait for lock (seconds), None = block
+            check_interval: Upper bound for the backoff between attempts (seconds)
         """
         self.filepath = filepath
         self.timeout = timeout
@@ -86,19 +93,28 @@ class FileLock:
                 os.O_CREAT | os.O_WRONLY | os.O_TRUNC
             )
 
-            # Try to acquire exclusive lock with timeout
-            start_time = time.time()
+            if self.timeout is None:
+                # Blocking flock: Kernel weckt uns, sobald der Lock frei ist
+                fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+                return True
+
+            # Uncontended: sofort. Sonst exponentieller Backoff ab 1 ms
+            # statt fester 100-ms-Schritte
+            deadline = time.monotonic() + self.timeout
+            delay = INITIAL_BACKOFF
             while True:
                 try:
                     fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
                     return True
                 except (IOError, OSError) as e:
                     # Lock is held by another process
-                    if time.time() - start_time >= self.timeout:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
                         raise FileLockException(
                             f"Timeout waiting for lock on {self.filepath}"
                         )
-                    time.sleep(self.check_interval)
+                    time.sleep(min(delay, remaining))
+                    delay = min(delay * 2, self.check_interval)
 
         except Exception as e:
             if self.lock_file is not None:
@@ -120,12 +136,9 @@ class FileLock:
             finally:
                 self.lock_file = None
 
-            # Clean up lock file
-            try:
-                if os.path.exists(self.lock_filepath):
-                    os.unlink(self.lock_filepath)
-            except:
-                pass
+            # Lock-Datei bleibt bestehen: ein unlink hier würde Wartenden
+            # einen Lock auf einem verwaisten Inode geben, während ein
+            # dritter Prozess eine neue Datei anlegt und ebenfalls lockt.
 
     def _acquire_msvcrt(self) -> bool:
         """Acquire lock using msvcrt (Windows)"""
@@ -240,19 +253,39 @@ def file_lock(
             modify(data)
             save_json(data)
 
+    Re-entrant per thread: nested ``file_lock`` calls for the same path
+    (e.g. atomic_update_json -> atomic_read_json) reuse the held lock instead
+    of deadlocking on a second file descriptor.
+
     Args:
         filepath: Path to file to lock
-        timeout: Maximum time to wait for lock (seconds)
-        check_interval: Time between lock attempts (seconds)
+        timeout: Maximum time to wait for lock (seconds), None = block
+        check_interval: Upper bound for the backoff between attempts (seconds)
 
     Raises:
         FileLockException: If lock cannot be acquired within timeout
     """
+    key = os.path.abspath(filepath)
+    held = getattr(_held, "locks", None)
+    if held is None:
+        held = _held.locks = {}
+
+    entry = held.get(key)
+    if entry is not None:
+        entry[1] += 1
+        try:
+            yield entry[0]
+        finally:
+            entry[1] -= 1
+        return
+
     lock = FileLock(filepath, timeout, check_interval)
     lock.acquire()
+    held[key] = [lock, 1]
     try:
         yield lock
     finally:
+        del held[key]
         lock.release()
 
 
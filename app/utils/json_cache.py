@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Per-process read cache for JSON files
+
+Decoded JSON objects are cached per path and validated against the file's
+(st_mtime_ns, st_size, st_ino) signature. An unchanged file costs one
+``stat`` instead of open + parse; writes by other Gunicorn workers are seen
+immediately because every atomic write replaces the file (new inode).
+
+Cached values are stored as pickle blobs and unpickled on every hit, so each
+caller gets its own copy and can mutate it without corrupting the cache.
+Writers hand over the serialized JSON text; it is decoded lazily on the
+first read so reads return exactly what ``json.load`` would.
+"""
+
+import os
+import json
+import pickle
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JSON_READ_CACHE_ENABLED = os.getenv("JSON_READ_CACHE", "true").lower() in ("true", "1", "yes")
+JSON_READ_CACHE_MAX_ENTRIES = int(os.getenv("JSON_READ_CACHE_MAX_ENTRIES", "256"))
+# Größere Dateien nicht im Speicher halten
+JSON_READ_CACHE_MAX_BYTES = int(os.getenv("JSON_READ_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# (st_mtime_ns, st_size, st_ino)
+Signature = Tuple[int, int, int]
+
+_MISS = object()
+
+
+def file_signature(st: os.stat_result) -> Signature:
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class JsonFileCache:
+    """LRU cache of decoded JSON files, validated by stat signature"""
+
+    def __init__(self, max_entries: int = JSON_READ_CACHE_MAX_ENTRIES,
+                 max_bytes: int = JSON_READ_CACHE_MAX_BYTES,
+                 enabled: bool = JSON_READ_CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # path -> [signature, pickle blob or None, pending JSON text or None]
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str) -> Any:
+        """
+        Returns a private copy of the cached object or ``_MISS``
+
+        Raises:
+            FileNotFoundError: if the file does not exist (entry is dropped)
+        """
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.invalidate(path)
+            raise
+
+        if not self.enabled:
+            return _MISS
+
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != file_signature(st):
+                self.misses += 1
+                return _MISS
+            self._entries.move_to_end(key)
+            self.hits += 1
+            blob, text = entry[1], entry[2]
+
+        if blob is not None:
+            return pickle.loads(blob)
+
+        # Vom Writer übergebener Text: einmalig dekodieren
+        data = json.loads(text)
+        with self._lock:
+            if self._entries.get(key) is entry:
+                entry[1] = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+                entry[2] = None
+        return data
+
+    def store(self, path: str, signature: Signature, data: Any) -> None:
+        """Caches a freshly decoded object (the caller keeps ``data``)"""
+        if not self._admit(signature):
+            return
+        try:
+            blob = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.debug(f"JSON cache skip for {path}: {e}")
+            return
+        self._put(path, [signature, blob, None])
+
+    def store_text(self, path: str, signature: Signature, text: str) -> None:
+        """Caches serialized JSON just written to ``path``"""
+        if self._admit(signature):
+            self._put(path, [signature, None, text])
+
+    def invalidate(self, path: str) -> None:
+        with self._lock:
+            self._entries.pop(os.path.abspath(path), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _admit(self, signature: Signature) -> bool:
+        return self.enabled and signature[1] <= self.max_bytes
+
+    def _put(self, path: str, entry: list) -> None:
+        key = os.path.abspath(path)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+# Globale Instanz
+json_file_cache = JsonFileCache()
@@ -15,6 +15,8 @@ import gzip
 
 # Use OS-level file locking for multi-process safety (Gunicorn workers)
 from app.utils.file_lock import file_lock
+from app.utils.json_cache import json_file_cache, file_signature, _MISS
+from app.utils import request_metrics
 
 # Setup logger
 logger = logging.getLogger(__name__)
@@ -32,11 +34,14 @@ def atomic_write_json(filepath: str, data: Any, compress: bool = False, indent:
     Returns:
         bool: Success status
     """
+    request_metrics.count("json_writes")
     try:
         # Ensure directory exists
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
 
         with file_lock(filepath):
+            json_text = json.dumps(data, ensure_ascii=False, indent=indent)
+
             # Write to temporary file first
             temp_dir = os.path.dirname(filepath)
             with tempfile.NamedTemporaryFile(
@@ -49,18 +54,25 @@ def atomic_write_json(filepath: str, data: Any, compress: bool = False, indent:
 
                 if compress:
                     # Compress JSON data
-                    json_bytes = json.dumps(data, ensure_ascii=False, indent=indent).encode('utf-8')
                     with gzip.GzipFile(fileobj=tmp_file, mode='wb') as gz:
-                        gz.write(json_bytes)
+                        gz.write(json_text.encode('utf-8'))
                 else:
                     # Regular JSON write
-                    json.dump(data, tmp_file, ensure_ascii=False, indent=indent)
+                    tmp_file.write(json_text)
 
                 tmp_filepath = tmp_file.name
+                # Signature of exactly the bytes written; a same-directory
+                # rename keeps inode and mtime, and a concurrent writer
+                # replacing filepath after the move can't be mistaken for ours
+                tmp_file.flush()
+                written_sig = file_signature(os.fstat(tmp_file.fileno()))
 
             # Atomic rename - this is the key to atomicity
             shutil.move(tmp_filepath, filepath)
 
+            # Read cache: next read of this file skips the parse
+            json_file_cache.store_text(filepath, written_sig, json_text)
+
             return True
 
     except Exception as e:
@@ -85,26 +97,31 @@ def atomic_read_json(filepath: str, default: Any = None, compressed: bool = None
     Returns:
         Loaded data or default value
     """
+    request_metrics.count("json_reads")
     try:
-        if not os.path.exists(filepath):
+        # Fast path: unchanged file -> one stat, no lock, no parse
+        try:
+            cached = json_file_cache.get(filepath)
+        except FileNotFoundError:
             return default
+        if cached is not _MISS:
+            return cached
 
         with file_lock(filepath):
-            # Auto-detect compression if not specified
+            with open(filepath, 'rb') as f:
+                signature = file_signature(os.fstat(f.fileno()))
+                raw = f.read()
+
+            # Auto-detect compression if not specified (gzip magic number)
             if compressed is None:
-                with open(filepath, 'rb') as f:
-                    # Check for gzip magic number
-                    magic = f.read(2)
-                    compressed = magic == b'\x1f\x8b'
+                compressed = raw[:2] == b'\x1f\x8b'
 
             if compressed:
-                # Read compressed JSON
-                with gzip.open(filepath, 'rt', encoding='utf-8') as f:
-                    return json.load(f)
-            else:
-                # Read regular JSON
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                raw = gzip.decompress(raw)
+            data = json.loads(raw.decode('utf-8'))
+
+        json_file_cache.store(filepath, signature, data)
+        return data
 
     except (json.JSONDecodeError, FileNotFoundError, PermissionError, OSError) as e:
         logger.warning(f"JSON read error for {filepath}: {e}")
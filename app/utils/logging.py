@@ -4,10 +4,17 @@ Structured Logging für Slot Booking Webapp
 Konsistente, strukturierte Logs mit verschiedenen Levels und Kontextinformationen
 """
 
-import logging
+import os
+import copy
 import json
 import time
 import sys
+import queue
+import atexit
+import logging
+import itertools
+import threading
+import logging.handlers
 from datetime import datetime
 from typing import Dict, Any, Optional, Union, List
 from contextlib import contextmanager
@@ -15,25 +22,49 @@ from functools import wraps
 import traceback
 from app.config.legacy_config import logging_config
 
+# Vorkonfigurierter Encoder: json.dumps(..., ensure_ascii=False) baut sonst
+# bei jedem Aufruf einen neuen JSONEncoder
+_json_encode = json.JSONEncoder(ensure_ascii=False).encode
+_BASE_FIELDS = frozenset(("timestamp", "level", "logger", "message", "module", "function", "line"))
+_SITE_CACHE_MAX = 4096
+
+
 class StructuredFormatter(logging.Formatter):
-    """Custom Formatter für strukturierte Logs"""
-    
-    def format(self, record):
-        # Basis-Log-Objekt
-        log_obj = {
-            "timestamp": datetime.utcfromtimestamp(record.created).isoformat() + "Z",
-            "level": record.levelname,
-            "logger": record.name,
-            "message": record.getMessage(),
-            "module": record.module,
-            "function": record.funcName,
-            "line": record.lineno
-        }
-        
+    """
+    Custom Formatter für strukturierte Logs
+
+    Die statischen Felder einer Log-Stelle (level, logger, module, function,
+    line) werden einmal kodiert und pro Aufrufstelle gecacht; nur Timestamp,
+    Message und die variablen Felder laufen pro Record durch den Encoder.
+    Die Ausgabe ist identisch zu ``json.dumps(log_obj, ensure_ascii=False)``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._site_cache: Dict[tuple, tuple] = {}
+
+    def _site_fields(self, record) -> tuple:
+        key = (record.name, record.levelname, record.module, record.funcName, record.lineno)
+        fields = self._site_cache.get(key)
+        if fields is None:
+            if len(self._site_cache) >= _SITE_CACHE_MAX:
+                self._site_cache.clear()
+            head = _json_encode({"level": record.levelname, "logger": record.name})[1:-1]
+            tail = _json_encode({
+                "module": record.module,
+                "function": record.funcName,
+                "line": record.lineno
+            })[1:-1]
+            fields = self._site_cache[key] = (head, tail)
+        return fields
+
+    def _variable_fields(self, record) -> Dict[str, Any]:
+        log_obj = {}
+
         # Extra-Felder hinzufügen (falls vorhanden)
         if hasattr(record, 'extra_fields'):
             log_obj.update(record.extra_fields)
-        
+
         # Exception-Informationen
         if record.exc_info:
             log_obj["exception"] = {
@@ -41,23 +72,352 @@ class StructuredFormatter(logging.Formatter):
                 "message": str(record.exc_info[1]),
                 "traceback": traceback.format_exception(*record.exc_info)
             }
-        
+
         # Performance-Metriken
         if hasattr(record, 'duration_ms'):
             log_obj["performance"] = {
                 "duration_ms": record.duration_ms,
                 "slow_query": record.duration_ms > logging_config.SLOW_QUERY_THRESHOLD
             }
-        
+
         # Request-Kontext (falls verfügbar)
         if hasattr(record, 'request_context'):
             log_obj["request"] = record.request_context
-        
+
         # User-Kontext
         if hasattr(record, 'user_context'):
             log_obj["user"] = record.user_context
-        
-        return json.dumps(log_obj, ensure_ascii=False)
+
+        return log_obj
+
+    def format(self, record):
+        timestamp = datetime.utcfromtimestamp(record.created).isoformat() + "Z"
+        message = record.getMessage()
+        variable = self._variable_fields(record)
+
+        if not _BASE_FIELDS.isdisjoint(variable):
+            # Extra-Felder überschreiben Basisfelder: langsamer Pfad, gleiche Semantik
+            log_obj = {
+                "timestamp": timestamp,
+                "level": record.levelname,
+                "logger": record.name,
+                "message": message,
+                "module": record.module,
+                "function": record.funcName,
+                "line": record.lineno
+            }
+            log_obj.update(variable)
+            return _json_encode(log_obj)
+
+        head, tail = self._site_fields(record)
+        parts = ['{"timestamp": ', _json_encode(timestamp), ', ', head,
+                 ', "message": ', _json_encode(message), ', ', tail]
+        if variable:
+            parts.append(', ')
+            parts.append(_json_encode(variable)[1:-1])
+        parts.append('}')
+        return ''.join(parts)
+
+# Asynchrone Log-Pipeline
+# Handler (Datei, Stream) laufen in einem Listener-Thread pro Worker; der
+# Request-Thread legt Records nur in eine begrenzte Queue.
+OVERFLOW_POLICIES = ("drop_new", "drop_old", "block")
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler mit Overflow-Policy und Zählern"""
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = "drop_new",
+                 block_timeout: float = 0.05):
+        super().__init__(log_queue)
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown log queue overflow policy: {overflow}")
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self._stats_lock = threading.Lock()
+        self.enqueued = 0
+        self.dropped = 0
+        self.dropped_by_level: Dict[str, int] = {}
+
+    def prepare(self, record):
+        """
+        Löst die Message im aufrufenden Thread auf (Args können sich sonst noch
+        ändern), lässt exc_info/extra-Felder aber für den Formatter intakt
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        if self.overflow == "block" or record.levelno >= logging.ERROR:
+            try:
+                self.queue.put(record, timeout=self.block_timeout)
+                self._count_enqueued()
+                return
+            except queue.Full:
+                if self.overflow == "block":
+                    self._count_dropped(record)
+                    return
+
+        try:
+            self.queue.put_nowait(record)
+            self._count_enqueued()
+            return
+        except queue.Full:
+            if self.overflow == "drop_new":
+                self._count_dropped(record)
+                return
+
+        # drop_old: ältesten Record verwerfen, neuen einreihen
+        try:
+            oldest = self.queue.get_nowait()
+            self._count_dropped(oldest)
+        except queue.Empty:
+            pass
+        try:
+            self.queue.put_nowait(record)
+            self._count_enqueued()
+        except queue.Full:
+            self._count_dropped(record)
+
+    def _count_enqueued(self):
+        with self._stats_lock:
+            self.enqueued += 1
+
+    def _count_dropped(self, record):
+        with self._stats_lock:
+            self.dropped += 1
+            self.dropped_by_level[record.levelname] = self.dropped_by_level.get(record.levelname, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "overflow": self.overflow,
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "dropped_by_level": dict(self.dropped_by_level),
+                "queue_depth": self.queue.qsize(),
+                "queue_size": self.queue.maxsize,
+            }
+
+
+class _FlushingQueueListener(logging.handlers.QueueListener):
+    """QueueListener, dessen Stop-Sentinel auch bei voller Queue ankommt"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class LogSampler(logging.Filter):
+    """
+    Sampling für DEBUG/INFO-Records gesprächiger Logger
+
+    ``rates`` bildet Logger-Namen (Präfix, z.B. ``app.services.tracking_system``)
+    auf eine Rate zwischen 0 und 1 ab. Rate 0.1 behält jeden zehnten Record;
+    WARNING und höher passieren immer.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self._lock = threading.Lock()
+        self.configure(rates or {})
+
+    def configure(self, rates: Dict[str, float]) -> None:
+        with self._lock:
+            self._every = {
+                name: (max(1, round(1 / rate)) if rate > 0 else 0)
+                for name, rate in rates.items()
+            }
+            self._counters = {name: itertools.count() for name in rates}
+            self._sampled_out = {name: 0 for name in rates}
+            self._match_cache: Dict[str, Optional[str]] = {}
+
+    def _match(self, logger_name: str) -> Optional[str]:
+        try:
+            return self._match_cache[logger_name]
+        except KeyError:
+            pass
+        best = None
+        for name in self._every:
+            if logger_name == name or logger_name.startswith(name + "."):
+                if best is None or len(name) > len(best):
+                    best = name
+        self._match_cache[logger_name] = best
+        return best
+
+    def filter(self, record) -> bool:
+        if record.levelno >= logging.WARNING or not self._every:
+            return True
+        name = self._match(record.name)
+        if name is None:
+            return True
+        every = self._every[name]
+        if every and next(self._counters[name]) % every == 0:
+            return True
+        with self._lock:
+            self._sampled_out[name] += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                name: {"rate": (1 / every if every else 0), "sampled_out": self._sampled_out[name]}
+                for name, every in self._every.items()
+            }
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """``"calendar_api=0.1, app.services.tracking_system=0.05"`` -> Dict"""
+    rates = {}
+    for item in spec.split(","):
+        name, _, rate = item.partition("=")
+        name = name.strip()
+        if not name:
+            continue
+        try:
+            rates[name] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            logging.getLogger(__name__).warning(f"Ignoring invalid LOG_SAMPLING entry: {item!r}")
+    return rates
+
+
+class LogPipeline:
+    """Eine begrenzte Queue + Listener-Thread für eine Gruppe von Handlern"""
+
+    def __init__(self, name: str, handlers: List[logging.Handler],
+                 maxsize: int = logging_config.LOG_QUEUE_SIZE,
+                 overflow: str = logging_config.LOG_QUEUE_OVERFLOW,
+                 block_timeout: float = logging_config.LOG_QUEUE_BLOCK_TIMEOUT):
+        self.name = name
+        self.handlers = list(handlers)
+        self.maxsize = maxsize
+        self.handler = BoundedQueueHandler(queue.Queue(maxsize), overflow, block_timeout)
+        self.handler.addFilter(log_sampler)
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self.start()
+
+    def start(self) -> None:
+        # Records unterhalb aller Handler-Level gar nicht erst einreihen
+        self.handler.setLevel(min((h.level for h in self.handlers), default=logging.NOTSET))
+        if self._listener is None:
+            self._listener = _FlushingQueueListener(
+                self.handler.queue, *self.handlers, respect_handler_level=True
+            )
+            self._listener.start()
+
+    def stop(self) -> None:
+        """Arbeitet die Queue ab und flusht alle Handler"""
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.stop()
+        for handler in self.handlers:
+            try:
+                handler.flush()
+            except Exception:
+                pass
+
+    def set_handlers(self, handlers: List[logging.Handler]) -> None:
+        """Tauscht die Ziel-Handler (bereits eingereihte Records gehen an die neuen)"""
+        self.stop()
+        for old in self.handlers:
+            if old not in handlers:
+                old.close()
+        self.handlers = list(handlers)
+        self.start()
+
+    def _after_fork(self) -> None:
+        # Der Listener-Thread existiert im Kind nicht mehr; Queue-Locks können
+        # vom Parent gehalten worden sein -> frische Queue, neuer Listener
+        self._listener = None
+        self.handler.queue = queue.Queue(self.maxsize)
+        self.start()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.handler.stats(), "running": self._listener is not None}
+
+
+_pipelines: Dict[str, LogPipeline] = {}
+_pipelines_lock = threading.Lock()
+log_sampler = LogSampler(parse_sampling(logging_config.LOG_SAMPLING))
+
+
+def queued_handlers(name: str, *handlers: logging.Handler) -> List[logging.Handler]:
+    """
+    Liefert die Handler, die an einen Logger gehängt werden sollen
+
+    Mit ``LOG_QUEUE_ENABLED`` ist das ein einzelner QueueHandler; die
+    übergebenen Handler schreiben dann im Listener-Thread. Ein zweiter Aufruf
+    mit demselben Namen (z.B. erneutes create_app) tauscht nur die Ziel-Handler
+    und gibt denselben QueueHandler zurück.
+    """
+    if not logging_config.LOG_QUEUE_ENABLED:
+        for handler in handlers:
+            if log_sampler not in handler.filters:
+                handler.addFilter(log_sampler)
+        return list(handlers)
+
+    with _pipelines_lock:
+        pipeline = _pipelines.get(name)
+        if pipeline is None:
+            pipeline = _pipelines[name] = LogPipeline(name, list(handlers))
+        else:
+            pipeline.set_handlers(list(handlers))
+        return [pipeline.handler]
+
+
+def shutdown_logging() -> None:
+    """Flusht alle Pipelines (atexit, vor logging.shutdown)"""
+    with _pipelines_lock:
+        pipelines = list(_pipelines.values())
+    for pipeline in pipelines:
+        pipeline.stop()
+
+
+def logging_stats() -> Dict[str, Any]:
+    """Queue-Zähler aller Pipelines und Sampling-Zähler"""
+    with _pipelines_lock:
+        pipelines = {name: p.stats() for name, p in _pipelines.items()}
+    return {"queue_enabled": logging_config.LOG_QUEUE_ENABLED,
+            "pipelines": pipelines, "sampling": log_sampler.stats()}
+
+
+def _restart_pipelines_after_fork() -> None:
+    for pipeline in _pipelines.values():
+        pipeline._after_fork()
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_pipelines_after_fork)
+
+
+_structured_handlers: Optional[List[logging.Handler]] = None
+
+
+def _get_structured_handlers() -> List[logging.Handler]:
+    """Gemeinsame Console-/File-Handler aller StructuredLogger (eine Pipeline)"""
+    global _structured_handlers
+    if _structured_handlers is None:
+        console_handler = logging.StreamHandler(sys.stdout)
+        if logging_config.ENABLE_STRUCTURED_LOGGING:
+            console_handler.setFormatter(StructuredFormatter())
+        else:
+            console_handler.setFormatter(logging.Formatter(logging_config.LOG_FORMAT))
+        sinks = [console_handler]
+
+        if logging_config.LOG_FILE:
+            try:
+                file_handler = logging.FileHandler(logging_config.LOG_FILE)
+                file_handler.setFormatter(StructuredFormatter())
+                sinks.append(file_handler)
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Could not set up file logging: {e}")
+
+        _structured_handlers = queued_handlers("structured", *sinks)
+    return _structured_handlers
+
 
 class StructuredLogger:
     """Strukturierter Logger mit erweiterten Features"""
@@ -71,25 +431,8 @@ class StructuredLogger:
         """Logger-Setup mit strukturiertem Format"""
         if not self.logger.handlers:  # Nur einmal konfigurieren
             self.logger.setLevel(getattr(logging, logging_config.LOG_LEVEL))
-            
-            # Console Handler
-            console_handler = logging.StreamHandler(sys.stdout)
-            if logging_config.ENABLE_STRUCTURED_LOGGING:
-                console_handler.setFormatter(StructuredFormatter())
-            else:
-                console_handler.setFormatter(
-                    logging.Formatter(logging_config.LOG_FORMAT)
-                )
-            self.logger.addHandler(console_handler)
-            
-            # File Handler (optional)
-            if logging_config.LOG_FILE:
-                try:
-                    file_handler = logging.FileHandler(logging_config.LOG_FILE)
-                    file_handler.setFormatter(StructuredFormatter())
-                    self.logger.addHandler(file_handler)
-                except Exception as e:
-                    self.logger.warning(f"Could not set up file logging: {e}")
+            for handler in _get_structured_handlers():
+                self.logger.addHandler(handler)
     
     def _log_with_context(
         self,
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Shared Redis Client
+Lazy, prozessweite Redis-Verbindung für Services mit Shared State
+
+Graceful degradation: Ohne REDIS_URL oder bei nicht erreichbarem Server
+liefert get_redis_client() None und die Services nutzen ihren In-Process-Fallback.
+"""
+
+import os
+import threading
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_initialized = False
+_lock = threading.Lock()
+
+
+def get_redis_client() -> Optional["redis.Redis"]:
+    """
+    Gibt die gemeinsame Redis-Verbindung zurück (decode_responses=True)
+
+    Returns:
+        Redis-Client oder None wenn Redis nicht konfiguriert/erreichbar ist
+    """
+    global _client, _initialized
+
+    if _initialized:
+        return _client
+
+    with _lock:
+        if _initialized:
+            return _client
+
+        redis_url = os.getenv('REDIS_URL')
+        if redis_url:
+            try:
+                import redis
+                client = redis.from_url(
+                    redis_url,
+                    decode_responses=True,
+                    socket_connect_timeout=3,
+                    socket_timeout=5,
+                )
+                client.ping()
+                _client = client
+                logger.info("Shared Redis client connected")
+            except Exception as e:
+                logger.warning(f"Shared Redis client unavailable, using in-process fallback: {e}")
+                _client = None
+
+        _initialized = True
+        return _client
+
+
+def reset_redis_client() -> None:
+    """Verwirft die gecachte Verbindung (Tests, Reconnect nach Fork)"""
+    global _client, _initialized
+    with _lock:
+        _client = None
+        _initialized = False
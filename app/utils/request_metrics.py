@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+Per-Request Performance-Instrumentierung
+
+Pro Request werden erfasst:
+- Latenz als Histogramm pro Endpoint
+- SQL-Statements und DB-Zeit (SQLAlchemy Engine-Events)
+- Google-Calendar- und HubSpot-API-Calls (``InstrumentedClient``)
+- atomic_read_json / atomic_write_json Aufrufe
+
+Jeder Worker hält seine Zähler im Speicher und schreibt höchstens alle
+``METRICS_SYNC_INTERVAL`` Sekunden einen Snapshot nach ``METRICS_DIR``.
+Der Prometheus-Endpoint summiert die Snapshots aller Worker. Requests über
+``SLOW_REQUEST_MS`` werden mit der kompletten Aufschlüsselung geloggt.
+"""
+
+import os
+import json
+import time
+import atexit
+import logging
+import tempfile
+import threading
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+REQUEST_METRICS_ENABLED = os.getenv("REQUEST_METRICS", "true").lower() in ("true", "1", "yes")
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(tempfile.gettempdir(), "business-hub-metrics"))
+METRICS_SYNC_INTERVAL = float(os.getenv("METRICS_SYNC_INTERVAL", "5"))
+# Snapshots beendeter Worker werden nach dieser Zeit ignoriert
+METRICS_STALE_SECONDS = float(os.getenv("METRICS_STALE_SECONDS", "3600"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Zähler pro Request (Name -> Prometheus-Metrik)
+COUNTERS = {
+    "sql_statements": "sql_statements_total",
+    "sql_seconds": "sql_duration_seconds_total",
+    "calendar_calls": "calendar_api_calls_total",
+    "hubspot_calls": "hubspot_api_calls_total",
+    "json_reads": "json_reads_total",
+    "json_writes": "json_writes_total",
+}
+
+_current: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_metrics", default=None)
+
+
+def count(name: str, amount: float = 1) -> None:
+    """Erhöht einen Zähler des laufenden Requests (außerhalb eines Requests: no-op)"""
+    stats = _current.get()
+    if stats is not None:
+        stats[name] = stats.get(name, 0) + amount
+
+
+def current_stats() -> Optional[Dict[str, float]]:
+    """Zähler des laufenden Requests (Kopie) oder None"""
+    stats = _current.get()
+    return dict(stats) if stats is not None else None
+
+
+class RequestMetrics:
+    """Histogramme und Zähler pro Endpoint für einen Worker"""
+
+    def __init__(self, metrics_dir: str = METRICS_DIR,
+                 sync_interval: float = METRICS_SYNC_INTERVAL,
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.metrics_dir = metrics_dir
+        self.sync_interval = sync_interval
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # endpoint -> {"count", "sum", "buckets": [...], "status": {code: n}, counter: value}
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+        self._last_sync = 0.0
+        self._atexit_registered = False
+
+    # ========== Erfassung ==========
+
+    def begin(self) -> None:
+        _current.set({})
+
+    def end(self, endpoint: str, method: str, status: int, duration: float) -> Dict[str, float]:
+        """Schließt den Request ab und verbucht ihn; gibt die Request-Zähler zurück"""
+        stats = _current.get() or {}
+        _current.set(None)
+        key = f"{method} {endpoint}"
+
+        with self._lock:
+            entry = self._endpoints.get(key)
+            if entry is None:
+                entry = self._endpoints[key] = {
+                    "count": 0, "sum": 0.0, "buckets": [0] * len(self.buckets), "status": {}
+                }
+            entry["count"] += 1
+            entry["sum"] += duration
+            for i, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    entry["buckets"][i] += 1
+            code = str(status)
+            entry["status"][code] = entry["status"].get(code, 0) + 1
+            for name, value in stats.items():
+                entry[name] = entry.get(name, 0) + value
+
+            due = time.monotonic() - self._last_sync >= self.sync_interval
+        if due:
+            self.sync()
+        return stats
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "buckets": list(self.buckets),
+                "endpoints": json.loads(json.dumps(self._endpoints)),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._endpoints.clear()
+
+    # ========== Worker-Aggregation ==========
+
+    def _snapshot_path(self, pid: Optional[int] = None) -> str:
+        return os.path.join(self.metrics_dir, f"worker-{pid or os.getpid()}.json")
+
+    def sync(self) -> None:
+        """Schreibt den Snapshot dieses Workers (atomar) nach metrics_dir"""
+        with self._lock:
+            self._last_sync = time.monotonic()
+        try:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            path = self._snapshot_path()
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.debug(f"Metrics snapshot write failed: {e}")
+
+    def aggregate(self) -> Dict[str, Any]:
+        """Summe über alle Worker (eigener Stand live, andere aus den Snapshots)"""
+        merged = self.snapshot()
+        own = os.path.basename(self._snapshot_path())
+        now = time.time()
+
+        try:
+            names = os.listdir(self.metrics_dir)
+        except FileNotFoundError:
+            names = []
+
+        for name in names:
+            if not (name.startswith("worker-") and name.endswith(".json")) or name == own:
+                continue
+            path = os.path.join(self.metrics_dir, name)
+            try:
+                if now - os.path.getmtime(path) > METRICS_STALE_SECONDS:
+                    continue
+                with open(path, "r", encoding="utf-8") as f:
+                    other = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if other.get("buckets") != merged["buckets"]:
+                continue
+            _merge_endpoints(merged["endpoints"], other.get("endpoints", {}))
+
+        return merged
+
+    # ========== Prometheus ==========
+
+    def render_prometheus(self, data: Optional[Dict[str, Any]] = None) -> str:
+        """Prometheus Text-Format (0.0.4)"""
+        data = data or self.aggregate()
+        buckets = data["buckets"]
+        endpoints = data["endpoints"]
+        lines: List[str] = []
+
+        lines.append("# HELP http_request_duration_seconds Request latency per endpoint")
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for key in sorted(endpoints):
+            entry = endpoints[key]
+            labels = _labels(key)
+            for bound, value in zip(buckets, entry["buckets"]):
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {value}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {entry["count"]}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {round(entry['sum'], 6)}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {entry['count']}")
+
+        lines.append("# HELP http_requests_total Requests per endpoint and status")
+        lines.append("# TYPE http_requests_total counter")
+        for key in sorted(endpoints):
+            labels = _labels(key)
+            for code, value in sorted(endpoints[key]["status"].items()):
+                lines.append(f'http_requests_total{{{labels},status="{code}"}} {value}')
+
+        for name, metric in COUNTERS.items():
+            lines.append(f"# HELP {metric} {name.replace('_', ' ')} caused by requests, per endpoint")
+            lines.append(f"# TYPE {metric} counter")
+            for key in sorted(endpoints):
+                value = endpoints[key].get(name, 0)
+                value = round(value, 6) if isinstance(value, float) else value
+                lines.append(f"{metric}{{{_labels(key)}}} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    # ========== Flask / SQLAlchemy ==========
+
+    def init_app(self, app) -> None:
+        """Registriert Request-Hooks und SQLAlchemy-Events"""
+        if not REQUEST_METRICS_ENABLED:
+            return
+
+        from flask import g, request
+
+        @app.before_request
+        def _metrics_begin():
+            g._metrics_start = time.perf_counter()
+            self.begin()
+
+        @app.after_request
+        def _metrics_end(response):
+            start = g.pop("_metrics_start", None)
+            if start is None:
+                return response
+            duration = time.perf_counter() - start
+            endpoint = request.endpoint or "unmatched"
+            stats = self.end(endpoint, request.method, response.status_code, duration)
+            if duration * 1000 >= SLOW_REQUEST_MS:
+                breakdown = ", ".join(f"{k}={round(v, 4) if isinstance(v, float) else v}"
+                                      for k, v in sorted(stats.items())) or "no calls"
+                logger.warning(
+                    f"Slow request {request.method} {request.path} ({endpoint}): "
+                    f"{round(duration * 1000)} ms, status {response.status_code}, {breakdown}"
+                )
+            return response
+
+        install_sqlalchemy_listeners()
+        if not self._atexit_registered:
+            atexit.register(self.sync)
+            self._atexit_registered = True
+
+
+def _labels(key: str) -> str:
+    method, _, endpoint = key.partition(" ")
+    endpoint = endpoint.replace("\\", "\\\\").replace('"', '\\"')
+    return f'endpoint="{endpoint}",method="{method}"'
+
+
+def _merge_endpoints(target: Dict[str, Any], source: Dict[str, Any]) -> None:
+    for key, entry in source.items():
+        mine = target.get(key)
+        if mine is None:
+            target[key] = entry
+            continue
+        mine["count"] += entry.get("count", 0)
+        mine["sum"] += entry.get("sum", 0.0)
+        mine["buckets"] = [a + b for a, b in zip(mine["buckets"], entry.get("buckets", []))]
+        for code, value in entry.get("status", {}).items():
+            mine["status"][code] = mine["status"].get(code, 0) + value
+        for name in COUNTERS:
+            if name in entry:
+                mine[name] = mine.get(name, 0) + entry[name]
+
+
+_listeners_installed = False
+
+
+def install_sqlalchemy_listeners() -> None:
+    """Zählt Statements und DB-Zeit für alle Engines (einmal pro Prozess)"""
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("_metrics_query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        count("sql_statements")
+        count("sql_seconds", elapsed)
+
+    _listeners_installed = True
+
+
+class InstrumentedClient:
+    """
+    Proxy um einen API-Client, der Aufrufe als Request-Zähler verbucht
+
+    Args:
+        target: echter Client
+        counter: Zählername (z.B. "hubspot_calls")
+        count_if: welche Methodennamen zählen (Standard: alle Aufrufe)
+        wrap_results: Rückgabewerte erneut wrappen (Builder-APIs wie
+                      ``service.events().list(...).execute()``)
+    """
+
+    __slots__ = ("_target", "_counter", "_count_if", "_wrap_results")
+
+    def __init__(self, target: Any, counter: str,
+                 count_if: Optional[Callable[[str], bool]] = None,
+                 wrap_results: bool = False):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_counter", counter)
+        object.__setattr__(self, "_count_if", count_if)
+        object.__setattr__(self, "_wrap_results", wrap_results)
+
+    def __getattr__(self, name: str) -> Any:
+        value = getattr(self._target, name)
+        if callable(value):
+            return self._wrap_callable(name, value)
+        if _is_plain(value):
+            return value
+        return InstrumentedClient(value, self._counter, self._count_if, self._wrap_results)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._target, name, value)
+
+    def _wrap_callable(self, name: str, func: Callable) -> Callable:
+        counted = self._count_if is None or self._count_if(name)
+
+        def call(*args, **kwargs):
+            if counted:
+                count(self._counter)
+            result = func(*args, **kwargs)
+            if self._wrap_results and not counted and not _is_plain(result):
+                return InstrumentedClient(result, self._counter, self._count_if, self._wrap_results)
+            return result
+
+        call.__name__ = getattr(func, "__name__", name)
+        return call
+
+    def __repr__(self) -> str:
+        return f"InstrumentedClient({self._target!r})"
+
+
+def _is_plain(value: Any) -> bool:
+    return value is None or isinstance(value, (str, bytes, int, float, bool, dict, list, tuple))
+
+
+# Globale Instanz
+request_metrics = RequestMetrics()
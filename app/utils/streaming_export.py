@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming Export Utilities
+Generatoren für CSV/ZIP/Excel-Downloads ohne vollständigen In-Memory-Aufbau
+
+Alle Helfer liefern Iteratoren, die direkt an ``flask.Response`` übergeben
+werden können. Dadurch wächst der Worker-Speicher nicht mit der Exportgröße
+und das erste Byte geht raus, bevor der gesamte Export gebaut ist.
+"""
+
+import csv
+import io
+import os
+import tempfile
+import zipfile
+import logging
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+# ========== CSV ==========
+
+def iter_csv(rows: Iterable[Sequence[Any]], header: Optional[Sequence[Any]] = None,
+             delimiter: str = ',', flush_every: int = 500) -> Iterator[str]:
+    """
+    Erzeugt CSV-Text blockweise aus einem Zeilen-Iterator
+
+    Args:
+        rows: Iterable von Zeilen (z.B. direkt aus einem DB-Cursor)
+        header: Optionale Kopfzeile
+        delimiter: Trennzeichen
+        flush_every: Anzahl Zeilen pro ausgegebenem Block
+
+    Yields:
+        CSV-Textblöcke
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter)
+
+    if header is not None:
+        writer.writerow(header)
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= flush_every:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+
+    remainder = buffer.getvalue()
+    if remainder:
+        yield remainder
+
+
+# ========== ZIP ==========
+
+class _ChunkSink(io.RawIOBase):
+    """Nicht-seekbares Schreibziel für zipfile, das Daten portionsweise abgibt."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries: Iterable[Tuple[str, str]],
+             compression: int = zipfile.ZIP_DEFLATED,
+             chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Streamt ein ZIP-Archiv aus Dateien auf der Platte
+
+    zipfile schreibt bei nicht-seekbaren Zielen Data-Descriptors, daher muss
+    weder das Archiv noch eine einzelne Datei komplett im Speicher liegen.
+
+    Args:
+        entries: Iterable von (Dateipfad, Archivname)
+        compression: zipfile-Kompressionsmethode
+        chunk_size: Lesegröße pro Block
+
+    Yields:
+        ZIP-Bytes
+    """
+    sink = _ChunkSink()
+
+    with zipfile.ZipFile(sink, 'w', compression) as zf:
+        for file_path, arcname in entries:
+            try:
+                info = zipfile.ZipInfo.from_file(file_path, arcname)
+                info.compress_type = compression
+                with open(file_path, 'rb') as src, zf.open(info, 'w') as dst:
+                    while True:
+                        block = src.read(chunk_size)
+                        if not block:
+                            break
+                        dst.write(block)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            except OSError as e:
+                logger.warning(f"Skipping {file_path} in ZIP export: {e}")
+
+            data = sink.drain()
+            if data:
+                yield data
+
+    # Central Directory
+    data = sink.drain()
+    if data:
+        yield data
+
+
+# ========== Files / Excel ==========
+
+def iter_file(path: str, chunk_size: int = CHUNK_SIZE, delete: bool = False) -> Iterator[bytes]:
+    """Liest eine Datei blockweise; löscht sie optional danach (auch bei Abbruch)."""
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(chunk_size)
+                if not block:
+                    break
+                yield block
+    finally:
+        if delete:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def iter_workbook(build: Callable[[Any], None], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Baut ein openpyxl-Workbook im write-only Modus und streamt es aus einer Temp-Datei
+
+    write-only Worksheets halten keine Zellen im Speicher; das fertige XLSX
+    wird auf die Platte gespoolt und von dort blockweise ausgeliefert.
+
+    Args:
+        build: Funktion, die das (write-only) Workbook befüllt
+
+    Returns:
+        Iterator über die XLSX-Bytes
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    build(wb)
+
+    fd, path = tempfile.mkstemp(suffix='.xlsx', prefix='export_')
+    os.close(fd)
+    try:
+        wb.save(path)
+    except Exception:
+        os.unlink(path)
+        raise
+
+    return iter_file(path, chunk_size=chunk_size, delete=True)
+
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Write-behind mirror for secondary JSON copies
+
+DataPersistence writes every payload twice: the primary file in persistent/
+and a legacy copy in static/. The static/ copy is only read as a fallback,
+so it does not need to be written on the request thread.
+
+``WriteBehindMirror.mirror(source, target)`` records that ``target`` should
+become a copy of ``source``. A background thread copies the *current* bytes
+of ``source`` on an interval, so a burst of saves to the same file collapses
+into one write of the latest version. Pending copies are flushed on
+``atexit`` and SIGTERM.
+"""
+
+import os
+import time
+import signal
+import atexit
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict
+
+from app.utils.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+MIRROR_WRITE_BEHIND = os.getenv("MIRROR_WRITE_BEHIND", "true").lower() in ("true", "1", "yes")
+MIRROR_FLUSH_INTERVAL = float(os.getenv("MIRROR_FLUSH_INTERVAL", "2.0"))
+
+
+class WriteBehindMirror:
+    """Coalescing background copier: target path -> latest source bytes"""
+
+    def __init__(self, interval: float = MIRROR_FLUSH_INTERVAL,
+                 enabled: bool = MIRROR_WRITE_BEHIND):
+        self.interval = interval
+        self.enabled = enabled
+        self._cond = threading.Condition()
+        # target -> (source, monotonic enqueue time of the oldest pending write)
+        self._pending: "OrderedDict[str, tuple]" = OrderedDict()
+        self._thread = None
+        self._stopped = False
+        self._flush_lock = threading.RLock()
+        self._stats = {
+            "submitted": 0,
+            "coalesced": 0,
+            "written": 0,
+            "errors": 0,
+            "last_flush_at": None,
+            "last_flush_max_lag": 0.0,
+        }
+        self._hooks_installed = False
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def mirror(self, source: str, target: str) -> None:
+        """Schedules ``target`` to be overwritten with the content of ``source``"""
+        if not self.enabled or self._stopped:
+            self._copy(source, target)
+            return
+
+        with self._cond:
+            self._stats["submitted"] += 1
+            previous = self._pending.get(target)
+            if previous is not None:
+                # Ältestes Enqueue behalten, damit der Lag ehrlich bleibt
+                self._stats["coalesced"] += 1
+                self._pending[target] = (source, previous[1])
+            else:
+                self._pending[target] = (source, time.monotonic())
+            self._ensure_started()
+
+    def flush(self) -> int:
+        """Writes all pending copies now; returns the number written"""
+        with self._flush_lock:
+            with self._cond:
+                batch = list(self._pending.items())
+                self._pending.clear()
+            if not batch:
+                return 0
+
+            now = time.monotonic()
+            written = 0
+            for target, (source, enqueued) in batch:
+                if self._copy(source, target):
+                    written += 1
+            with self._cond:
+                self._stats["written"] += written
+                self._stats["errors"] += len(batch) - written
+                self._stats["last_flush_at"] = time.time()
+                self._stats["last_flush_max_lag"] = round(
+                    max(now - enqueued for _, (_, enqueued) in batch), 3
+                )
+            return written
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, lag and counters for monitoring"""
+        with self._cond:
+            oldest = min((enq for _, enq in self._pending.values()), default=None)
+            return {
+                **self._stats,
+                "queue_depth": len(self._pending),
+                "oldest_pending_lag": round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+                "interval": self.interval,
+                "enabled": self.enabled,
+            }
+
+    def shutdown(self) -> None:
+        """Stops the background thread after a final flush"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self.flush()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self) -> None:
+        """Starts the flush thread lazily (lock held)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="write-behind-mirror", daemon=True)
+        self._thread.start()
+        if not self._hooks_installed:
+            self._install_shutdown_hooks()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                self._cond.wait(self.interval)
+                if self._stopped:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {e}")
+
+    def _install_shutdown_hooks(self) -> None:
+        self._hooks_installed = True
+        atexit.register(self.shutdown)
+
+        if threading.current_thread() is not threading.main_thread():
+            return
+        try:
+            previous = signal.getsignal(signal.SIGTERM)
+
+            def _on_sigterm(signum, frame):
+                self.shutdown()
+                if callable(previous):
+                    previous(signum, frame)
+                elif previous == signal.SIG_DFL:
+                    signal.signal(signum, signal.SIG_DFL)
+                    os.kill(os.getpid(), signum)
+
+            signal.signal(signal.SIGTERM, _on_sigterm)
+        except (ValueError, OSError) as e:
+            logger.debug(f"SIGTERM hook not installed: {e}")
+
+    @staticmethod
+    def _copy(source: str, target: str) -> bool:
+        """Atomically replaces target with the current content of source"""
+        if not os.path.exists(source):
+            logger.debug(f"Mirror source vanished: {source}")
+            return False
+
+        tmp_path = None
+        try:
+            with file_lock(source):
+                with open(source, "rb") as f:
+                    payload = f.read()
+
+            target_dir = os.path.dirname(target) or "."
+            os.makedirs(target_dir, exist_ok=True)
+            with file_lock(target):
+                fd, tmp_path = tempfile.mkstemp(dir=target_dir, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, target)
+                tmp_path = None
+            return True
+        except FileNotFoundError:
+            logger.debug(f"Mirror source vanished: {source}")
+            return False
+        except Exception as e:
+            logger.warning(f"Mirror write {source} -> {target} failed: {e}")
+            return False
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+
+
+# Globale Instanz
+static_mirror = WriteBehindMirror()
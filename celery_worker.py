@@ -4,6 +4,7 @@ Celery worker entry point.
 
 Usage:
     celery -A celery_worker:celery_app worker --loglevel=info
+    celery -A celery_worker:celery_app beat --loglevel=info   # periodic tasks
 
 For development with CELERY_TASK_ALWAYS_EAGER=true,
 tasks run synchronously inside the Flask process (no worker needed).
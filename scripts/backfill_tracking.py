@@ -79,6 +79,10 @@ def backfill_tracking_data(start_date_str="2025-09-01", end_date_str=None, dry_r
 
     current_date = start_date
 
+    # Vorhandene Tagesmetriken einmal laden statt pro Tag
+    from app.services.data_persistence import data_persistence
+    existing_metrics = data_persistence.load_data('daily_metrics', {})
+
     print("Starte Backfill...")
     print("-" * 70)
 
@@ -88,9 +92,6 @@ def backfill_tracking_data(start_date_str="2025-09-01", end_date_str=None, dry_r
 
         try:
             # Check if data already exists
-            from app.services.data_persistence import data_persistence
-            existing_metrics = data_persistence.load_data('daily_metrics', {})
-
             if date_str in existing_metrics and not dry_run:
                 print(f">> {date_str} ({day_name}) - Bereits vorhanden, ueberspringe...")
                 skipped_count += 1
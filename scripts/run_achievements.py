@@ -17,9 +17,9 @@ def run_achievement_check():
     try:
         from app.services.achievement_system import achievement_system
 
-        # Run MVP badge check
+        # MVP badges for completed weeks/months/years
         print("Checking MVP badges...")
-        achievement_system.auto_check_mvp_badges()
+        achievement_system.check_mvp_period_boundaries()
 
         # Process achievements for all users
         print("Processing achievements...")
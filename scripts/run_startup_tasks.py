@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Startup Maintenance Job
+Runs startup tasks outside the web workers (systemd timer / manual).
+
+Usage:
+    python scripts/run_startup_tasks.py                  # alle Tasks im Modus "cli"
+    python scripts/run_startup_tasks.py validate_data_integrity auto_cleanup_backups
+    python scripts/run_startup_tasks.py --all            # alle registrierten Tasks
+    python scripts/run_startup_tasks.py --list
+"""
+
+import sys
+import os
+import json
+
+# Add the project root to Python path
+project_root = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+# Load .env for standalone execution (cron jobs)
+from dotenv import load_dotenv
+load_dotenv(os.path.join(project_root, ".env"))
+
+# Boot selbst soll keine Tasks ausführen, das übernimmt dieser Job
+os.environ["STARTUP_TASKS"] = "off"
+
+if __name__ == "__main__":
+    from app import create_app
+    from app.config.production import ProductionConfig
+    app = create_app(ProductionConfig)
+
+    with app.app_context():
+        from app.core.startup_tasks import startup_runner
+
+        args = sys.argv[1:]
+        if "--list" in args:
+            for task in startup_runner.report()["tasks"]:
+                print(f"{task['name']:30s} {task['mode']}")
+            sys.exit(0)
+
+        names = startup_runner.task_names() if "--all" in args else [a for a in args if not a.startswith("--")]
+        results = startup_runner.run_cli(names or None, force=True)
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        sys.exit(1 if any(r["status"] == "failed" for r in results) else 0)
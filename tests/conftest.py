@@ -16,6 +16,49 @@ from unittest.mock import MagicMock, patch
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Runtime state (JSON stores, backups, sessions, startup markers, logs) goes to a
+# temp dir instead of the repo's data/ tree. Must be set before the first
+# app import: most services resolve PERSIST_BASE at import time.
+TEST_PERSIST_BASE = tempfile.mkdtemp(prefix="hub-tests-")
+os.environ["PERSIST_BASE"] = TEST_PERSIST_BASE
+os.environ["LOG_DIR"] = os.path.join(TEST_PERSIST_BASE, "logs")
+os.environ["COSMETICS_DIR"] = os.path.join(TEST_PERSIST_BASE, "persistent")
+
+
+@pytest.fixture(scope='session', autouse=True)
+def _cleanup_test_persist_base():
+    """Remove the temporary PERSIST_BASE after the test session"""
+    yield
+    shutil.rmtree(TEST_PERSIST_BASE, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def _isolated_data_persistence(tmp_path):
+    """Per-test persistent/, static/ and backups/ (manifest and snapshots) for data_persistence"""
+    from app.services.data_persistence import data_persistence
+
+    base = tmp_path / "_persist_base"
+    dirs = {name: base / sub for name, sub in
+            (("data_dir", "persistent"), ("static_dir", "static"), ("backup_dir", "backups"))}
+    for path in dirs.values():
+        path.mkdir(parents=True)
+    with patch.multiple(data_persistence, **dirs):
+        yield base
+
+
+@pytest.fixture(autouse=True)
+def _isolated_t2_bucket_store(_isolated_data_persistence):
+    """Per-test T2 bucket document, JSONL draw history (+ .idx sidecar), BUCKET_CONFIG and T2_CLOSERS"""
+    import copy
+    from app.services import t2_bucket_system
+
+    data_dir = _isolated_data_persistence / "persistent"
+    with patch.multiple(t2_bucket_system, DATA_DIR=str(data_dir),
+                        BUCKET_FILE=str(data_dir / "t2_bucket_system.json")), \
+            patch.dict(t2_bucket_system.BUCKET_CONFIG), \
+            patch.dict(t2_bucket_system.T2_CLOSERS, copy.deepcopy(t2_bucket_system.T2_CLOSERS), clear=True):
+        yield data_dir
+
 
 @pytest.fixture(scope='session')
 def app():
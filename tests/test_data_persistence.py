@@ -82,6 +82,7 @@ class TestDataPersistence:
         test_data = {'key': 'value'}
 
         mock_data_persistence.save_data('test_file', test_data)
+        mock_data_persistence.mirror.flush()  # static/ copy is write-behind
 
         assert (mock_data_persistence.static_dir / 'test_file.json').exists()
         with open(mock_data_persistence.static_dir / 'test_file.json', 'r') as f:
@@ -335,12 +335,14 @@ class TestAnalyticsIntegration:
             assert 'total_draws' in stats
             assert isinstance(stats['total_draws'], int)
 
-    def test_analytics_service_combined_stats_structure(self):
+    def test_analytics_service_combined_stats_structure(self, tmp_path):
         """Test analytics service returns correct combined stats structure"""
         from app.services.t2_analytics_service import t2_analytics_service
 
-        # Mock data persistence and tracking
+        # Mock data persistence and tracking (Sidecar-Index entsteht im tmp_path)
         with patch('app.services.data_persistence.data_persistence.load_data', return_value={}), \
+             patch('app.services.t2_analytics_service.TRACKING_BOOKINGS_FILE',
+                   str(tmp_path / 'bookings.jsonl')), \
              patch('app.services.tracking_system.tracking_system') as mock_tracking:
 
             mock_tracking.get_user_bookings.return_value = []
@@ -8,15 +8,30 @@ import pytest
 from datetime import datetime, timedelta
 from unittest.mock import MagicMock, patch
 
+from freezegun import freeze_time
+
 
 # ========== FIXTURES ==========
 
 @pytest.fixture
-def lockout_service():
-    """Create AccountLockoutService instance with PG disabled"""
-    with patch.dict('os.environ', {'USE_POSTGRES': 'false'}):
+def lockout_service(mock_data_persistence):
+    """Create AccountLockoutService instance with PG and Redis disabled (lokale Zähler, JSON im tmp)"""
+    with patch.dict('os.environ', {'USE_POSTGRES': 'false'}), \
+         patch('app.services.account_lockout.USE_POSTGRES', False), \
+         patch('app.services.account_lockout.data_persistence', mock_data_persistence), \
+         patch('app.services.account_lockout.get_redis_client', return_value=None):
         from app.services.account_lockout import AccountLockoutService
-        return AccountLockoutService()
+        yield AccountLockoutService()
+
+
+@pytest.fixture
+def worker_pair(lockout_service):
+    """Zwei Worker-Prozesse (eigene lokale Zähler) auf demselben JSON-Stand"""
+    from app.services.account_lockout import AccountLockoutService
+    workers = (lockout_service, AccountLockoutService())
+    for worker in workers:
+        worker.counters.sync_interval = 0
+    return workers
 
 
 @pytest.fixture
@@ -89,6 +104,7 @@ class TestRecordFailedAttempt:
             is_locked, duration = lockout_service.record_failed_attempt('newuser')
             assert is_locked is False
             assert duration is None
+            lockout_service.flush()
             assert 'newuser' in saved
             assert saved['newuser']['failed_attempts'] == 1
 
@@ -159,12 +175,15 @@ class TestRecordSuccessfulLogin:
         with patch.object(lockout_service, '_load_lockout_data', return_value=locked_account_data), \
              patch.object(lockout_service, '_save_lockout_data', side_effect=mock_save):
             lockout_service.record_successful_login('testuser')
+            assert lockout_service.is_locked_out('testuser') == (False, None)
+            lockout_service.flush()
             assert 'testuser' not in saved
 
     def test_no_op_for_unknown_user(self, lockout_service):
         with patch.object(lockout_service, '_load_lockout_data', return_value={}), \
              patch.object(lockout_service, '_save_lockout_data') as mock_save:
             lockout_service.record_successful_login('unknown')
+            lockout_service.flush()
             mock_save.assert_not_called()
 
 
@@ -181,6 +200,7 @@ class TestAdminUnlock:
              patch.object(lockout_service, '_save_lockout_data', side_effect=mock_save):
             result = lockout_service.admin_unlock('testuser')
             assert result is True
+            lockout_service.flush()
             assert 'testuser' not in saved
 
     def test_unlock_unknown_returns_false(self, lockout_service):
@@ -230,3 +250,213 @@ class TestDualWriteDisabled:
              patch('app.services.account_lockout.data_persistence') as mock_dp:
             lockout_service._save_lockout_data(data)
             mock_dp.save_data.assert_called_once_with(lockout_service.lockout_file, data)
+
+
+# ========== TESTS: Zähler-Store ==========
+
+class TestLockoutCounters:
+    """Atomare Zähler statt Load/Save der ganzen Lockout-Datei pro Versuch"""
+
+    def test_burst_does_not_rewrite_file_per_attempt(self, lockout_service):
+        with patch.object(lockout_service, '_load_lockout_data', return_value={}) as mock_load, \
+             patch.object(lockout_service, '_save_lockout_data') as mock_save:
+            # Unter der Sperr-Schwelle: keine Sofort-Persistierung
+            for i in range(50):
+                lockout_service.check_and_record_failure(f'user{i % 13}')
+                lockout_service.is_locked_out(f'user{i % 13}')
+
+            assert mock_load.call_count == 1  # nur Warmstart
+            mock_save.assert_not_called()
+
+            lockout_service.flush()
+            assert mock_save.call_count == 1
+            assert len(mock_save.call_args[0][0]) == 13
+
+    def test_is_locked_out_is_read_only(self, lockout_service):
+        with patch.object(lockout_service, '_load_lockout_data', return_value={}), \
+             patch.object(lockout_service, '_save_lockout_data'):
+            for _ in range(3):
+                lockout_service.check_and_record_failure('testuser')
+            assert lockout_service.is_locked_out('testuser') == (False, None)
+            assert lockout_service.get_lockout_info('testuser')['failed_attempts'] == 3
+
+    def test_tiers_escalate(self, lockout_service):
+        svc = lockout_service
+        results = []
+        with patch.object(svc, '_load_lockout_data', return_value={}):
+            for _ in range(svc.max_attempts_tier3):
+                results.append(svc.record_failed_attempt('testuser'))
+
+        assert results[svc.max_attempts_tier1 - 2] == (False, None)
+        assert results[svc.max_attempts_tier1 - 1] == (True, svc.lockout_duration_tier1)
+        assert results[svc.max_attempts_tier2 - 1] == (True, svc.lockout_duration_tier2)
+        assert results[svc.max_attempts_tier3 - 1] == (True, svc.lockout_duration_tier3)
+
+    def test_expired_lock_resets_entry(self, lockout_service):
+        svc = lockout_service
+        with patch.object(svc, '_load_lockout_data', return_value={}), freeze_time() as clock:
+            for _ in range(svc.max_attempts_tier1):
+                status, _ = svc.check_and_record_failure('testuser')
+            assert status == 'now_locked'
+            assert svc.check_and_record_failure('testuser')[0] == 'locked'
+            assert svc.get_lockout_info('testuser')['failed_attempts'] == svc.max_attempts_tier1
+
+            clock.tick(timedelta(minutes=svc.lockout_duration_tier1 + 1))
+            assert svc.is_locked_out('testuser') == (False, None)
+            assert svc.get_lockout_info('testuser') is None
+            assert svc.check_and_record_failure('testuser') == ('failed', None)
+            assert svc.get_lockout_info('testuser')['failed_attempts'] == 1
+
+    def test_expired_lock_resets_on_next_failure(self, lockout_service):
+        """Auch ohne vorherigen Login-Check beginnt der Zähler nach Ablauf neu"""
+        svc = lockout_service
+        with patch.object(svc, '_load_lockout_data', return_value={}), freeze_time() as clock:
+            for _ in range(svc.max_attempts_tier1):
+                svc.check_and_record_failure('testuser')
+
+            clock.tick(timedelta(minutes=svc.lockout_duration_tier1 + 1))
+            for _ in range(svc.max_attempts_tier1 - 1):
+                assert svc.check_and_record_failure('testuser') == ('failed', None)
+            assert svc.check_and_record_failure('testuser') == ('now_locked', svc.lockout_duration_tier1)
+
+    def test_attempt_window_expires(self, lockout_service):
+        from app.config.base import SecurityConfig
+        svc = lockout_service
+        with patch.object(svc, '_load_lockout_data', return_value={}), freeze_time() as clock:
+            svc.check_and_record_failure('testuser')
+            clock.tick(timedelta(minutes=SecurityConfig.LOCKOUT_ATTEMPT_WINDOW + 1))
+            assert svc.get_lockout_info('testuser') is None
+
+    def test_concurrent_failures_are_counted_exactly(self, lockout_service):
+        import threading
+        svc = lockout_service
+        start = threading.Barrier(8)
+
+        def attack():
+            start.wait()
+            for _ in range(25):
+                svc.counters.record_failure('victim', check_locked=False)
+
+        with patch.object(svc, '_load_lockout_data', return_value={}):
+            threads = [threading.Thread(target=attack) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(5)
+            assert svc.get_lockout_info('victim')['failed_attempts'] == 200
+
+    def test_locked_index_lists_without_scan(self, lockout_service):
+        svc = lockout_service
+        with patch.object(svc, '_load_lockout_data', return_value={}):
+            for i in range(20):
+                svc.check_and_record_failure(f'user{i}')
+            for _ in range(svc.max_attempts_tier1):
+                svc.check_and_record_failure('locked1')
+
+            # Nur gesperrte Accounts werden nachgeschlagen, nicht alle 21
+            with patch.object(svc.counters, 'get', wraps=svc.counters.get) as get:
+                accounts = svc.get_all_locked_accounts()
+
+            assert get.call_count == 1
+            assert [a['username'] for a in accounts] == ['locked1']
+            assert accounts[0]['failed_attempts'] == svc.max_attempts_tier1
+
+            svc.admin_unlock('locked1')
+            assert svc.get_all_locked_accounts() == []
+
+    def test_flush_merges_with_other_workers(self, lockout_service):
+        svc = lockout_service
+        stored = {'other': {'failed_attempts': 2, 'first_attempt': datetime.now().isoformat(),
+                            'last_attempt': datetime.now().isoformat(), 'locked_until': None}}
+
+        def save(data):
+            stored.clear()
+            stored.update(data)
+
+        with patch.object(svc, '_load_lockout_data', return_value={}):
+            svc.check_and_record_failure('mine')
+        with patch.object(svc, '_load_lockout_data', side_effect=lambda: dict(stored)), \
+             patch.object(svc, '_save_lockout_data', side_effect=save):
+            svc.flush()
+
+        assert set(stored) == {'other', 'mine'}
+        assert stored['mine']['failed_attempts'] == 1
+
+
+class TestWorkerSync:
+    """Ohne Redis: Sperren und Entsperrungen gelten in allen Workern"""
+
+    def test_lock_is_seen_by_other_worker(self, worker_pair):
+        first, second = worker_pair
+        assert second.is_locked_out('testuser') == (False, None)  # Warmstart
+
+        for _ in range(first.max_attempts_tier1):
+            first.check_and_record_failure('testuser')
+
+        is_locked, minutes = second.is_locked_out('testuser')
+        assert is_locked is True
+        assert minutes >= first.lockout_duration_tier1 - 1
+        assert second.check_and_record_failure('testuser')[0] == 'locked'
+        assert [a['username'] for a in second.get_all_locked_accounts()] == ['testuser']
+
+    def test_admin_unlock_reaches_other_worker(self, worker_pair):
+        first, second = worker_pair
+        for _ in range(first.max_attempts_tier1):
+            first.check_and_record_failure('testuser')
+
+        # Entsperrung in einem Worker, der die Sperre noch nicht kennt
+        second.counters.sync_interval = 3600
+        second.counters._synced_at = None
+        assert second.admin_unlock('testuser') is True
+
+        assert first.is_locked_out('testuser') == (False, None)
+        assert first.check_and_record_failure('testuser') == ('failed', None)
+
+    def test_pending_failures_survive_sync(self, worker_pair):
+        first, second = worker_pair
+        first.check_and_record_failure('testuser')
+        for _ in range(first.max_attempts_tier1):
+            second.check_and_record_failure('other')
+
+        # first hat noch nicht geflusht, der Abgleich darf den Zähler nicht verwerfen
+        assert first.get_lockout_info('testuser')['failed_attempts'] == 1
+        assert first.is_locked_out('other')[0] is True
+
+
+class TestRedisCounters:
+    """Redis-Pfad: ein Lua-Aufruf pro Fehlversuch, Sperr-Index im ZSET"""
+
+    def test_failure_uses_single_script_call(self, lockout_service):
+        import time
+        client = MagicMock()
+        until = time.time() + 15 * 60
+        client.eval.return_value = ['now_locked', str(until), '5']
+
+        with patch('app.services.account_lockout.get_redis_client', return_value=client), \
+             patch.object(lockout_service, '_load_lockout_data') as mock_load:
+            status, minutes = lockout_service.check_and_record_failure('testuser')
+
+        assert (status, minutes) == ('now_locked', lockout_service.lockout_duration_tier1)
+        args = client.eval.call_args[0]
+        assert args[1:4] == (2, 'lockout:user:testuser', 'lockout:locked')
+        # Tiers höchstes zuerst
+        assert list(args[8:]) == [15, 1440, 10, 60, 5, 15]
+        mock_load.assert_not_called()
+
+    def test_already_locked(self, lockout_service):
+        import time
+        client = MagicMock()
+        client.eval.return_value = ['locked', str(time.time() + 10 * 60 + 5), '7']
+
+        with patch('app.services.account_lockout.get_redis_client', return_value=client):
+            assert lockout_service.check_and_record_failure('testuser') == ('locked', 10)
+
+    def test_redis_error_falls_back_to_local(self, lockout_service):
+        client = MagicMock()
+        client.eval.side_effect = ConnectionError('down')
+        client.hgetall.side_effect = ConnectionError('down')
+
+        with patch('app.services.account_lockout.get_redis_client', return_value=client), \
+             patch.object(lockout_service, '_load_lockout_data', return_value={}):
+            assert lockout_service.check_and_record_failure('testuser') == ('failed', None)
+            assert lockout_service.get_lockout_info('testuser')['failed_attempts'] == 1
@@ -1,17 +1,18 @@
 # -*- coding: utf-8 -*-
 """
-Tests fuer Block 7 — ActivityTrackingService PG Dual-Write
+Tests fuer ActivityTrackingService / PresenceService
 
 Testet:
-- track_login: last_login Sync zu PG
-- update_online_status: last_activity Sync zu PG
-- get_online_users: PG-first read
-- Fallback zu JSON wenn USE_POSTGRES=False
+- track_login: last_login Sync zu PG, append-only Login-Log
+- update_online_status: Heartbeat ohne Datei-Rewrite, gebuendelter PG-Sync
+- get_online_users: Presence (Redis / In-Process) + PG fuer andere Worker
 """
 
+import json
+import time
 import pytest
 from datetime import datetime, timedelta
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, PropertyMock, patch
 
 # Import at module level to avoid pytz issues during patching
 from app.services.activity_tracking import ActivityTrackingService
@@ -21,13 +22,30 @@ from app.services.activity_tracking import ActivityTrackingService
 # Helpers
 # ---------------------------------------------------------------------------
 
-def _make_service():
+def _make_service(presence=None):
+    from app.services.presence_service import PresenceService
     svc = ActivityTrackingService.__new__(ActivityTrackingService)
     svc.login_history_file = 'login_history'
     svc.online_sessions_file = 'online_sessions'
+    svc.presence = presence or PresenceService(flush_interval=3600)
+    svc._history_cache = None
     return svc
 
 
+@pytest.fixture(autouse=True)
+def login_log(tmp_path):
+    """Login-Log immer im tmp_path (auch wenn data_persistence ein Mock ist)"""
+    with patch.object(ActivityTrackingService, 'login_log_path', new_callable=PropertyMock,
+                      return_value=tmp_path / 'login_history.jsonl'):
+        yield tmp_path / 'login_history.jsonl'
+
+
+@pytest.fixture
+def no_redis():
+    with patch('app.services.presence_service.get_redis_client', return_value=None):
+        yield
+
+
 def _make_pg_user(username='alice', last_login=None, last_activity=None, is_active=True):
     user = MagicMock()
     user.username = username
@@ -128,171 +146,238 @@ class TestTrackLogin:
 
 
 # ---------------------------------------------------------------------------
-# update_online_status — last_activity Sync
+# update_online_status — Heartbeat
 # ---------------------------------------------------------------------------
 
 class TestUpdateOnlineStatus:
-    """Tests fuer update_online_status PG-Sync."""
+    """Tests fuer update_online_status ueber den PresenceService."""
 
-    def test_update_online_status_active_syncs_last_activity(self):
-        """action='active' aktualisiert last_activity in PG."""
+    def test_heartbeat_does_not_touch_files_or_pg(self, no_redis):
+        """action='active' schreibt weder JSON noch PG pro Request."""
         svc = _make_service()
-
-        pg_user = _make_pg_user('alice')
         mock_session = MagicMock()
-        mock_session.query.return_value.filter_by.return_value.first.return_value = pg_user
-
         mock_dp = MagicMock()
-        mock_dp.load_data.return_value = {}
 
-        with patch('app.services.activity_tracking.USE_POSTGRES', True), \
-             patch('app.services.activity_tracking.POSTGRES_AVAILABLE', True), \
-             patch('app.services.activity_tracking.db_session_scope', return_value=_make_ctx(mock_session)), \
+        with patch('app.services.presence_service.USE_POSTGRES', True), \
+             patch('app.services.presence_service.POSTGRES_AVAILABLE', True), \
+             patch('app.services.presence_service.db_session_scope', return_value=_make_ctx(mock_session)), \
              patch('app.services.activity_tracking.data_persistence', mock_dp):
-            svc.update_online_status('alice', 'sess-123', action='active')
+            for _ in range(50):
+                svc.update_online_status('alice', 'sess-123', action='active')
 
-        assert pg_user.last_activity is not None
+        assert not mock_dp.save_data.called
+        assert not mock_dp.load_data.called
+        assert not mock_session.execute.called
+        assert svc.presence.pending_count() == 1
 
-    def test_update_online_status_logout_no_pg_write(self):
-        """action='logout' schreibt nicht in PG."""
+    def test_logout_removes_presence(self, no_redis):
         svc = _make_service()
+        svc.update_online_status('alice', 'sess-123', action='active')
+        svc.update_online_status('alice', 'sess-123', action='logout')
+
+        with patch('app.services.activity_tracking.USE_POSTGRES', False):
+            assert svc.get_online_users(timeout_minutes=15) == []
 
+    def test_flush_batches_last_activity(self, no_redis):
+        """Ausstehende Heartbeats gehen als ein executemany nach PG."""
+        svc = _make_service()
         mock_session = MagicMock()
 
-        mock_dp = MagicMock()
-        mock_dp.load_data.return_value = {'alice': {'session_id': 'sess-123', 'last_activity': '2026-01-01T10:00:00', 'status': 'online'}}
+        for user in ('alice', 'bob', 'alice'):
+            svc.update_online_status(user, 'sess', action='active')
 
-        with patch('app.services.activity_tracking.USE_POSTGRES', True), \
-             patch('app.services.activity_tracking.POSTGRES_AVAILABLE', True), \
-             patch('app.services.activity_tracking.db_session_scope', return_value=_make_ctx(mock_session)), \
-             patch('app.services.activity_tracking.data_persistence', mock_dp):
-            svc.update_online_status('alice', 'sess-123', action='logout')
+        with patch('app.services.presence_service.USE_POSTGRES', True), \
+             patch('app.services.presence_service.POSTGRES_AVAILABLE', True), \
+             patch('app.services.presence_service.db_session_scope', return_value=_make_ctx(mock_session)):
+            assert svc.presence.flush() == 2
 
-        # Kein PG-Query bei logout
-        assert not mock_session.query.called
+        assert mock_session.execute.call_count == 1
+        params = mock_session.execute.call_args[0][1]
+        assert sorted(p['b_username'] for p in params) == ['alice', 'bob']
+        assert svc.presence.pending_count() == 0
 
-    def test_update_online_status_no_pg_write_when_disabled(self):
-        """Mit USE_POSTGRES=False kein PG-Write."""
+    def test_flush_failure_keeps_pending(self, no_redis):
         svc = _make_service()
+        svc.update_online_status('alice', 'sess', action='active')
 
-        mock_session = MagicMock()
+        with patch('app.services.presence_service.USE_POSTGRES', True), \
+             patch('app.services.presence_service.POSTGRES_AVAILABLE', True), \
+             patch('app.services.presence_service.db_session_scope', return_value=_make_error_ctx()):
+            assert svc.presence.flush() == 0
 
-        mock_dp = MagicMock()
-        mock_dp.load_data.return_value = {}
+        assert svc.presence.pending_count() == 1
 
-        with patch('app.services.activity_tracking.USE_POSTGRES', False), \
-             patch('app.services.activity_tracking.data_persistence', mock_dp):
-            svc.update_online_status('alice', 'sess-123', action='active')
+    def test_heartbeat_flushes_after_interval(self, no_redis):
+        from app.services.presence_service import PresenceService
+        svc = _make_service(PresenceService(flush_interval=0))
 
-        assert not mock_session.query.called
+        with patch.object(svc.presence, 'flush') as flush:
+            svc.update_online_status('alice', 'sess', action='active')
+
+        flush.assert_called_once()
 
 
 # ---------------------------------------------------------------------------
-# get_online_users — PG-first read
+# get_online_users
 # ---------------------------------------------------------------------------
 
 class TestGetOnlineUsers:
-    """Tests fuer get_online_users PG-first Logik."""
+    """Tests fuer get_online_users."""
 
-    def test_get_online_users_returns_pg_data_when_available(self):
-        """Wenn PG verfuegbar, werden Online-User aus PG gelesen."""
+    def test_local_presence_when_postgres_disabled(self, no_redis):
         svc = _make_service()
+        svc.presence.heartbeat('charlie')
+        svc.presence.heartbeat('old', timestamp=time.time() - 30 * 60)
+
+        with patch('app.services.activity_tracking.USE_POSTGRES', False):
+            result = svc.get_online_users(timeout_minutes=15)
+
+        assert [u['username'] for u in result] == ['charlie']
+        assert result[0]['status'] == 'online'
+        assert result[0]['minutes_ago'] == 0
+
+    def test_expired_entries_dropped_lazily(self, no_redis):
+        from app.services.presence_service import PresenceService
+        svc = _make_service(PresenceService(flush_interval=3600, retention_seconds=60))
+        svc.presence.heartbeat('gone', timestamp=time.time() - 120)
 
-        now = datetime.now()
-        recent_activity = now - timedelta(minutes=5)
+        with patch('app.services.activity_tracking.USE_POSTGRES', False):
+            svc.get_online_users(timeout_minutes=15)
 
-        pg_user = _make_pg_user('alice', last_activity=recent_activity, is_active=True)
+        assert 'gone' not in svc.presence._local
 
+    def test_pg_users_from_other_workers_merged(self, no_redis):
+        """Ohne Redis kommen andere Worker ueber PG dazu."""
+        svc = _make_service()
+        svc.presence.heartbeat('bob')
+
+        pg_user = _make_pg_user('alice', last_activity=datetime.now() - timedelta(minutes=5))
         mock_session = MagicMock()
-        # query().filter(...).order_by(...).all() chain
         mock_session.query.return_value.filter.return_value.order_by.return_value.all.return_value = [pg_user]
 
         with patch('app.services.activity_tracking.USE_POSTGRES', True), \
              patch('app.services.activity_tracking.POSTGRES_AVAILABLE', True), \
-             patch('app.services.activity_tracking.db_session_scope', return_value=_make_ctx(mock_session)):
+             patch('app.services.activity_tracking.db_session_scope', return_value=_make_ctx(mock_session)), \
+             patch.object(svc.presence, 'flush'):
             result = svc.get_online_users(timeout_minutes=15)
 
-        assert len(result) == 1
-        assert result[0]['username'] == 'alice'
-        assert result[0]['status'] == 'online'
+        assert [u['username'] for u in result] == ['bob', 'alice']
 
-    def test_get_online_users_falls_back_to_json_on_pg_error(self):
-        """Bei PG-Fehler werden Online-User aus JSON gelesen."""
+    def test_pg_error_still_returns_local_presence(self, no_redis):
         svc = _make_service()
-
-        from datetime import datetime
-        import pytz
-        tz = pytz.timezone('Europe/Berlin')
-        now_str = datetime.now(tz).isoformat()
-
-        json_sessions = {
-            'bob': {
-                'session_id': 'sess-abc',
-                'last_activity': now_str,
-                'status': 'online'
-            }
-        }
-
-        mock_dp = MagicMock()
-        mock_dp.load_data.return_value = json_sessions
+        svc.presence.heartbeat('bob')
 
         with patch('app.services.activity_tracking.USE_POSTGRES', True), \
              patch('app.services.activity_tracking.POSTGRES_AVAILABLE', True), \
              patch('app.services.activity_tracking.db_session_scope', return_value=_make_error_ctx()), \
-             patch('app.services.activity_tracking.data_persistence', mock_dp):
+             patch.object(svc.presence, 'flush'):
             result = svc.get_online_users(timeout_minutes=15)
 
         assert any(u['username'] == 'bob' for u in result)
 
-    def test_get_online_users_uses_json_when_postgres_disabled(self):
-        """Mit USE_POSTGRES=False werden Online-User aus JSON gelesen."""
-        svc = _make_service()
+    def test_redis_sorted_set_used_when_available(self):
+        """Mit Redis: ZADD fuer Heartbeats, ZREVRANGEBYSCORE fuer die Abfrage, kein PG."""
+        client = MagicMock()
+        client.zrevrangebyscore.return_value = [('alice', time.time())]
+        mock_session = MagicMock()
 
-        from datetime import datetime
-        import pytz
-        tz = pytz.timezone('Europe/Berlin')
-        now_str = datetime.now(tz).isoformat()
+        with patch('app.services.presence_service.get_redis_client', return_value=client):
+            svc = _make_service()
+            svc.update_online_status('alice', 'sess', action='active')
+            with patch('app.services.activity_tracking.USE_POSTGRES', True), \
+                 patch('app.services.activity_tracking.POSTGRES_AVAILABLE', True), \
+                 patch('app.services.activity_tracking.db_session_scope', return_value=_make_ctx(mock_session)):
+                result = svc.get_online_users(timeout_minutes=15)
+
+        client.zadd.assert_called_once()
+        assert client.zadd.call_args[0][0] == 'presence:online'
+        client.zremrangebyscore.assert_called_once()
+        assert [u['username'] for u in result] == ['alice']
+        assert not mock_session.query.called
+        assert svc.presence._local == {}
 
-        json_sessions = {
-            'charlie': {
-                'session_id': 'sess-xyz',
-                'last_activity': now_str,
-                'status': 'online'
-            }
-        }
 
-        mock_dp = MagicMock()
-        mock_dp.load_data.return_value = json_sessions
+# ---------------------------------------------------------------------------
+# Login-Log — append-only
+# ---------------------------------------------------------------------------
+
+class TestLoginHistory:
+    """Tests fuer das append-only Login-Log."""
+
+    def _dp(self, tmp_path, legacy=None):
+        dp = MagicMock()
+        dp.data_dir = tmp_path
+        dp.load_data.return_value = legacy or {}
+        return dp
+
+    def test_login_appends_single_line(self, tmp_path):
+        svc = _make_service()
+        dp = self._dp(tmp_path)
 
         with patch('app.services.activity_tracking.USE_POSTGRES', False), \
-             patch('app.services.activity_tracking.data_persistence', mock_dp):
-            result = svc.get_online_users(timeout_minutes=15)
+             patch('app.services.activity_tracking.data_persistence', dp):
+            svc.track_login('alice', '1.2.3.4', 'Mozilla/5.0 Firefox', success=True)
+            svc.track_login('bob', '5.6.7.8', 'Mozilla/5.0 Chrome', success=False)
 
-        assert any(u['username'] == 'charlie' for u in result)
+        lines = (tmp_path / 'login_history.jsonl').read_text().splitlines()
+        assert [json.loads(line)['username'] for line in lines] == ['alice', 'bob']
+        assert not dp.save_data.called
 
-    def test_get_online_users_filters_expired_sessions_in_json_fallback(self):
-        """Abgelaufene JSON-Sessions werden herausgefiltert."""
+    def test_history_merges_legacy_and_log(self, tmp_path):
         svc = _make_service()
+        legacy = {'alice': [{'timestamp': '2026-01-01T10:00:00+01:00', 'success': True, 'ip_address': 'x'}]}
+        dp = self._dp(tmp_path, legacy)
 
-        from datetime import datetime, timedelta
-        import pytz
-        tz = pytz.timezone('Europe/Berlin')
-        old_time = (datetime.now(tz) - timedelta(minutes=30)).isoformat()
+        with patch('app.services.activity_tracking.USE_POSTGRES', False), \
+             patch('app.services.activity_tracking.data_persistence', dp):
+            svc.track_login('alice', '1.2.3.4', 'Mozilla/5.0 Firefox', success=True)
+            history = svc.get_user_login_history('alice')
+            activity = svc.get_all_login_activity()
 
-        json_sessions = {
-            'expired_user': {
-                'session_id': 'sess-old',
-                'last_activity': old_time,
-                'status': 'online'
-            }
-        }
+        assert [h['ip_address'] for h in history] == ['1.2.3.4', 'x']
+        assert activity[0]['username'] == 'alice'
+        assert len(activity) == 2
 
-        mock_dp = MagicMock()
-        mock_dp.load_data.return_value = json_sessions
+    def test_compaction_rewrites_legacy_and_truncates_log(self, tmp_path):
+        svc = _make_service()
+        dp = self._dp(tmp_path)
+        dp.save_data.return_value = True
 
         with patch('app.services.activity_tracking.USE_POSTGRES', False), \
-             patch('app.services.activity_tracking.data_persistence', mock_dp):
-            result = svc.get_online_users(timeout_minutes=15)
+             patch('app.services.activity_tracking.LOGIN_HISTORY_COMPACT_BYTES', 1), \
+             patch('app.services.activity_tracking.data_persistence', dp):
+            svc.track_login('alice', '1.2.3.4', 'Mozilla/5.0 Firefox', success=True)
+
+        saved = dp.save_data.call_args[0][1]
+        assert saved['alice'][0]['ip_address'] == '1.2.3.4'
+        assert 'username' not in saved['alice'][0]
+        assert (tmp_path / 'login_history.jsonl').read_text() == ''
+
+    def test_truncated_line_ignored(self, tmp_path):
+        svc = _make_service()
+        (tmp_path / 'login_history.jsonl').write_text(
+            json.dumps({'username': 'alice', 'timestamp': '2026-01-01T10:00:00+01:00'}) + '\n{"usern'
+        )
 
-        # Abgelaufene Session nicht in der Liste
-        assert not any(u['username'] == 'expired_user' for u in result)
+        with patch('app.services.activity_tracking.data_persistence', self._dp(tmp_path)):
+            assert list(svc.get_login_history_map()) == ['alice']
+
+    def test_history_map_parsed_once_until_log_changes(self, tmp_path):
+        svc = _make_service()
+        dp = self._dp(tmp_path)
+
+        with patch('app.services.activity_tracking.USE_POSTGRES', False), \
+             patch('app.services.activity_tracking.data_persistence', dp), \
+             patch.object(svc, '_read_login_log', wraps=svc._read_login_log) as read_log:
+            svc.track_login('alice', '1.2.3.4', 'Mozilla/5.0 Firefox', success=True)
+            svc.get_user_login_history('alice')
+            svc.get_all_login_activity()
+            assert read_log.call_count == 1
+
+            svc.track_login('bob', '5.6.7.8', 'Mozilla/5.0 Firefox', success=True)
+            history = svc.get_login_history_map()
+
+        assert read_log.call_count == 2
+        assert sorted(history) == ['alice', 'bob']
+        # Formatierte Felder landen nicht im gecachten Stand
+        assert 'formatted_time' not in history['alice'][0]
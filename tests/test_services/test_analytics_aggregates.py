@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Service Layer Tests - Analytics KPI Aggregates
+Tests for the single-pass KPI snapshot and its cache/invalidation.
+"""
+
+import pytest
+from datetime import datetime, date
+from unittest.mock import patch, MagicMock
+from sqlalchemy import event
+
+
+NOW = datetime(2026, 3, 20, 12, 0)
+
+
+def _booking(booking_id, username, day):
+    from app.models.booking import Booking
+    return Booking(
+        booking_id=booking_id, username=username, customer=f'Kunde {booking_id}',
+        date=day, time='14:00', weekday='Monday', week_number=1,
+        potential_type='normal', color_id='9', description_length=0,
+        has_description=False, booking_lead_time=1, booked_at_hour=10,
+        booked_on_weekday='Monday'
+    )
+
+
+def _outcome(outcome_id, consultant, day, outcome):
+    from app.models.booking import BookingOutcome
+    return BookingOutcome(
+        outcome_id=outcome_id, customer=f'Kunde {outcome_id}', date=day,
+        time='14:00', outcome=outcome, color_id='9', potential_type='normal',
+        consultant=consultant, checked_at='21:00'
+    )
+
+
+@pytest.fixture
+def seeded_session(db_session):
+    recent = date(2026, 3, 15)
+    previous = date(2026, 2, 10)
+    db_session.add_all([
+        _booking('b1', 'anna', recent),
+        _booking('b2', 'anna', recent),
+        _booking('b3', 'ben', recent),
+        _booking('b4', 'ben', previous),
+        _booking('b5', 'carl', date(2025, 1, 1)),  # outside both windows
+        _outcome('o1', 'anna', recent, 'completed'),
+        _outcome('o2', 'anna', recent, 'no_show'),
+        _outcome('o3', 'ben', recent, 'completed'),
+        _outcome('o4', None, recent, 'cancelled'),
+        _outcome('o5', 'ben', previous, 'completed'),  # outside window
+    ])
+    db_session.commit()
+    return db_session
+
+
+class TestKPIAggregatorCompute:
+
+    def test_booking_totals(self, seeded_session):
+        from app.services.analytics_aggregates import KPIAggregator
+        snapshot = KPIAggregator().compute(seeded_session, 28, now=NOW)
+
+        assert snapshot['bookings']['total'] == 3
+        assert snapshot['bookings']['previous'] == 1
+        assert snapshot['bookings']['unique_users'] == 2
+        assert snapshot['bookings']['by_user'] == {'anna': 2, 'ben': 1}
+
+    def test_outcome_totals(self, seeded_session):
+        from app.services.analytics_aggregates import KPIAggregator
+        snapshot = KPIAggregator().compute(seeded_session, 28, now=NOW)
+
+        outcomes = snapshot['outcomes']
+        assert outcomes['total'] == 4
+        assert outcomes['completed'] == 2
+        assert outcomes['no_show'] == 1
+        assert outcomes['by_consultant']['anna'] == {'total': 2, 'completed': 1, 'no_show': 1}
+        assert outcomes['by_consultant']['ben'] == {'total': 1, 'completed': 1, 'no_show': 0}
+
+    def test_constant_query_count(self, seeded_session):
+        """Snapshot needs exactly two statements regardless of user count."""
+        from app.services.analytics_aggregates import KPIAggregator
+        statements = []
+
+        def _count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = seeded_session.get_bind().engine
+        event.listen(engine, 'before_cursor_execute', _count)
+        try:
+            KPIAggregator().compute(seeded_session, 28, now=NOW)
+        finally:
+            event.remove(engine, 'before_cursor_execute', _count)
+
+        assert len(statements) == 2
+
+
+class TestKPIAggregatorCache:
+
+    def _cache(self):
+        store = {}
+        cache = MagicMock()
+        cache.get.side_effect = lambda cache_type, key: store.get((cache_type, key))
+        cache.set.side_effect = lambda cache_type, key, data: store.__setitem__((cache_type, key), data)
+        return cache
+
+    def test_disabled_without_postgres(self):
+        from app.services.analytics_aggregates import KPIAggregator
+        with patch('app.models.is_postgres_enabled', return_value=False):
+            assert KPIAggregator().get_window_kpis(28) is None
+
+    def test_cached_until_invalidated(self):
+        from app.services.analytics_aggregates import KPIAggregator
+        aggregator = KPIAggregator()
+        cache = self._cache()
+
+        with patch('app.models.is_postgres_enabled', return_value=True), \
+             patch('app.services.analytics_aggregates._get_cache', return_value=cache), \
+             patch('app.utils.db_utils.db_session_scope_no_commit'), \
+             patch.object(aggregator, 'compute', return_value={'bookings': {'total': 1}}) as compute:
+            aggregator.get_window_kpis(28)
+            aggregator.get_window_kpis(28)
+            assert compute.call_count == 1
+
+            aggregator.invalidate()
+            aggregator.get_window_kpis(28)
+            assert compute.call_count == 2
+
+    def test_windows_cached_separately(self):
+        from app.services.analytics_aggregates import KPIAggregator
+        aggregator = KPIAggregator()
+        cache = self._cache()
+
+        with patch('app.models.is_postgres_enabled', return_value=True), \
+             patch('app.services.analytics_aggregates._get_cache', return_value=cache), \
+             patch('app.utils.db_utils.db_session_scope_no_commit'), \
+             patch.object(aggregator, 'compute', return_value={}) as compute:
+            aggregator.get_window_kpis(7)
+            aggregator.get_window_kpis(28)
+            assert compute.call_count == 2
+
+
+class TestAnalyticsServiceSnapshot:
+
+    SNAPSHOT = {
+        'bookings': {'total': 20, 'previous': 10, 'unique_users': 4,
+                     'by_user': {'anna': 12, 'ben': 8}},
+        'outcomes': {'total': 18, 'completed': 10, 'no_show': 5,
+                     'by_consultant': {'anna': {'total': 10, 'completed': 8, 'no_show': 1}}},
+    }
+
+    @patch('app.services.analytics_service.data_persistence')
+    def test_dashboard_uses_single_snapshot(self, mock_dp):
+        from app.services.analytics_service import AnalyticsService
+        svc = AnalyticsService()
+        mock_dp.load_scores.return_value = {}
+
+        with patch('app.services.analytics_service.kpi_aggregator') as agg, \
+             patch.object(svc, '_get_hubspot_avg_deal_value', return_value=None), \
+             patch.object(svc, '_get_hubspot_total_deals', return_value=None):
+            agg.get_window_kpis.return_value = self.SNAPSHOT
+            kpis = svc.get_executive_kpis(28)
+            funnel = svc.get_funnel_data(28)
+            berater = svc.get_berater_stats(28)
+            overview = svc._get_overview_stats(28)
+
+        assert kpis['total_bookings'] == 20
+        assert kpis['conversion_rate'] == 50.0
+        assert kpis['no_show_rate'] == 25.0
+        assert [s['count'] for s in funnel['stages']] == [0, 15, 10]
+        assert berater['berater'][0] == {'name': 'anna', 'bookings': 12, 'conversion_rate': 80.0, 'revenue': None}
+        assert berater['berater'][1]['conversion_rate'] == 0
+        assert overview['growth_rate'] == 100.0
+        assert overview['avg_bookings_per_user'] == 5.0
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Tests fuer die Avatar-Aufloesung (app/services/avatar_service.py).
+
+Testet:
+- Batch-Aufloesung ueber das Manifest (ein Load fuer alle User)
+- Gleiches Ergebnis wie die Einzel-Aufloesung (Upload > Shop-PNG > Emoji)
+- Invalidierung bei Upload, Shop-Avatar, Loeschen und Avatar-Equip
+- Vorskalierte Upload-Varianten
+"""
+
+import io
+import json
+import pytest
+from unittest.mock import patch
+
+from PIL import Image
+
+SHOP = {
+    "ninja_male": {"name": "Ninja", "emoji": "🥷", "image": "/static/avatars/ninja_male.png"},
+}
+
+
+class FakeUpload:
+    def __init__(self, data, filename="me.png"):
+        self.filename = filename
+        self._stream = io.BytesIO(data)
+
+    def seek(self, *args):
+        return self._stream.seek(*args)
+
+    def tell(self):
+        return self._stream.tell()
+
+    def read(self, *args):
+        return self._stream.read(*args)
+
+
+def png_bytes(size=(300, 300)):
+    buf = io.BytesIO()
+    Image.new("RGB", size, (200, 50, 50)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def active():
+    return {
+        "anna.schmidt": {"avatar": "ninja_male"},
+        "max.muster": {"avatar": "🦊"},
+    }
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch, active):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("PERSIST_BASE", str(tmp_path / "data"))
+    from app.services import avatar_service as module
+    monkeypatch.setattr(module, "USE_POSTGRES", False)
+    svc = module.AvatarService()
+    loads = []
+
+    def load_all():
+        loads.append(1)
+        return dict(active), SHOP
+
+    monkeypatch.setattr(svc, "_load_all_active_cosmetics", load_all)
+    svc.cosmetics_loads = loads
+    return svc
+
+
+def write_avatars(service, data):
+    with open(service.avatars_file, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    service.invalidate_manifest()
+
+
+class TestManifest:
+
+    def test_batch_loads_metadata_and_cosmetics_once(self, service):
+        with patch.object(service, "_load_avatars", wraps=service._load_avatars) as load:
+            urls = service.get_all_avatar_urls(["anna.schmidt", "max.muster", "unbekannt"])
+            service.get_avatar_url("anna.schmidt")
+            service.get_avatar_emoji("max.muster")
+
+        assert urls == {"anna.schmidt": "/static/avatars/ninja_male.png",
+                        "max.muster": None, "unbekannt": None}
+        assert load.call_count == 1
+        assert len(service.cosmetics_loads) == 1
+
+    def test_resolution_priority(self, service):
+        open("static/uploads/avatars/max.muster.webp", "wb").close()
+        write_avatars(service, {
+            "max.muster": {"type": "upload", "path": "/static/uploads/avatars/max.muster.webp"},
+            # Upload-Datei fehlt -> Shop-PNG
+            "anna.schmidt": {"type": "upload", "path": "/static/uploads/avatars/anna.schmidt.webp"},
+            "tim.kreisel": {"type": "shop", "path": "/static/avatars/old.png"},
+        })
+
+        assert service.get_avatar_url("max.muster") == "/static/uploads/avatars/max.muster.webp"
+        assert service.get_avatar_url("anna.schmidt") == "/static/avatars/ninja_male.png"
+        assert service.get_avatar_url("tim.kreisel") == "/static/avatars/old.png"
+        assert service.get_avatar_emoji("max.muster") == "🦊"
+        assert service.get_avatar_emoji("anna.schmidt") == "🥷"
+        # Unbekannte User bekommen den Default-Avatar
+        assert service.get_avatar_emoji("unbekannt") == "🧑‍💼"
+        assert service.get_avatar_url(None) is None
+
+    def test_cached_until_invalidated(self, service, active):
+        service.get_manifest()
+        active["max.muster"] = {"avatar": "ninja_male"}
+
+        assert service.get_avatar_emoji("max.muster") == "🦊"
+        service.invalidate_manifest()
+        assert service.get_avatar_emoji("max.muster") == "🥷"
+        assert len(service.cosmetics_loads) == 2
+
+    def test_version_bump_reaches_other_instances(self, service, monkeypatch, active):
+        from app.services.avatar_service import AvatarService
+        other = AvatarService()
+        monkeypatch.setattr(other, "_load_all_active_cosmetics", lambda: (dict(active), SHOP))
+        assert other.get_avatar_emoji("max.muster") == "🦊"
+
+        active["max.muster"] = {"avatar": "🐼"}
+        service.invalidate_manifest()
+
+        assert other.get_avatar_emoji("max.muster") == "🐼"
+
+    def test_ttl_rebuilds_manifest(self, service):
+        from app.services import avatar_service as module
+        service.get_manifest()
+        with patch.object(module, "AVATAR_MANIFEST_TTL", 0):
+            service.get_manifest()
+        assert len(service.cosmetics_loads) == 2
+
+
+class TestInvalidationOnChange:
+
+    def test_upload_creates_variants_and_invalidates(self, service):
+        service.get_manifest()
+        result = service.save_uploaded_avatar("max.muster", FakeUpload(png_bytes()))
+
+        assert result["success"]
+        for px in (48, 64, 96, 128, 192):
+            with Image.open(f"static/uploads/avatars/max.muster-{px}.webp") as img:
+                assert img.size == (px, px)
+        assert service.get_avatar_url("max.muster") == "/static/uploads/avatars/max.muster.webp"
+        assert service.get_avatar_url("max.muster", px=24) == "/static/uploads/avatars/max.muster-48.webp"
+        assert service.get_avatar_url("max.muster", px=40) == "/static/uploads/avatars/max.muster-96.webp"
+        assert service.get_all_avatar_urls(["max.muster"], px=64) == {
+            "max.muster": "/static/uploads/avatars/max.muster-128.webp"}
+        assert "max.muster-48.webp" in service.get_avatar_html("max.muster", size="xs")
+
+    def test_delete_removes_variants_and_invalidates(self, service):
+        service.save_uploaded_avatar("max.muster", FakeUpload(png_bytes()))
+        assert service.get_avatar_url("max.muster")
+
+        assert service.delete_avatar("max.muster")["success"]
+
+        import os
+        assert not [f for f in os.listdir("static/uploads/avatars") if f.startswith("max.muster")]
+        assert service.get_avatar_url("max.muster") is None
+
+    def test_shop_avatar_invalidates(self, service):
+        assert service.get_avatar_url("tim.kreisel") is None
+        service.save_shop_avatar("tim.kreisel", "ninja_male")
+        assert service.get_avatar_url("tim.kreisel") == "/static/avatars/ninja_male.png"
+
+    def test_unequip_avatar_invalidates(self, service):
+        from app.services.cosmetics_shop import CosmeticsShop
+        shop = CosmeticsShop.__new__(CosmeticsShop)
+        shop.load_active_cosmetics = lambda: {"max.muster": {"avatar": "🦊", "effects": []}}
+        shop.save_active_cosmetics = lambda data: None
+        shop._pg_sync_unequip = lambda *args: None
+
+        with patch("app.services.avatar_service.avatar_service", service), \
+                patch.object(service, "invalidate_manifest") as invalidate:
+            shop.unequip_item("max.muster", "avatar")
+
+        assert invalidate.call_count == 1
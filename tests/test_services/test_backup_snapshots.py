@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Service Layer Tests - Backup Snapshots
+Tests for content-hashed, coalesced backups with a manifest index.
+"""
+
+import json
+import pytest
+from unittest.mock import patch
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    source = tmp_path / 'persist'
+    backups = tmp_path / 'backups'
+    source.mkdir()
+    backups.mkdir()
+    return source, backups
+
+
+def _write(source, filename, data):
+    (source / filename).write_text(json.dumps(data), encoding='utf-8')
+
+
+def _scheduler(**kwargs):
+    from app.services.backup_snapshots import BackupSnapshotScheduler
+    return BackupSnapshotScheduler(**kwargs)
+
+
+class TestSnapshot:
+
+    def test_identical_content_skipped(self, dirs):
+        source, backups = dirs
+        scheduler = _scheduler(min_interval=0)
+        _write(source, 'scores.json', {'a': 1})
+
+        first = scheduler.snapshot(backups, source, 'scores.json')
+        second = scheduler.snapshot(backups, source, 'scores.json')
+
+        assert first is not None
+        assert second is None
+        assert len(list(backups.glob('scores.json.*.backup'))) == 1
+
+    def test_changed_content_snapshotted(self, dirs):
+        source, backups = dirs
+        scheduler = _scheduler(min_interval=0)
+
+        for i in range(3):
+            _write(source, 'scores.json', {'a': i})
+            scheduler.snapshot(backups, source, 'scores.json')
+
+        entries = scheduler.entries(backups, 'scores.json')
+        assert len(entries) == 3
+        assert len({e['sha256'] for e in entries}) == 3
+        assert json.loads(scheduler.latest(backups, 'scores.json').read_text()) == {'a': 2}
+
+    def test_data_used_when_source_missing(self, dirs):
+        source, backups = dirs
+        scheduler = _scheduler()
+
+        name = scheduler.snapshot(backups, source, 'champions.json', {'x': 1})
+
+        assert json.loads((backups / name).read_text()) == {'x': 1}
+
+    def test_retention_uses_manifest(self, dirs):
+        source, backups = dirs
+        scheduler = _scheduler(max_backups=3, min_interval=0)
+
+        for i in range(6):
+            _write(source, 'scores.json', {'a': i})
+            scheduler.snapshot(backups, source, 'scores.json')
+
+        assert len(list(backups.glob('scores.json.*.backup'))) == 3
+        with patch('pathlib.Path.glob') as glob:
+            scheduler.enforce_retention(backups, 'scores.json')
+            assert len(scheduler.entries(backups, 'scores.json')) == 3
+        glob.assert_not_called()
+
+
+class TestCoalescing:
+
+    def test_burst_coalesced_into_trailing_snapshot(self, dirs):
+        source, backups = dirs
+        scheduler = _scheduler(min_interval=3600)
+
+        _write(source, 'scores.json', {'v': 0})
+        assert scheduler.request(backups, source, 'scores.json') is not None
+        for i in range(1, 20):
+            _write(source, 'scores.json', {'v': i})
+            assert scheduler.request(backups, source, 'scores.json') is None
+
+        assert len(scheduler.entries(backups, 'scores.json')) == 1
+
+        scheduler.flush_pending()
+
+        entries = scheduler.entries(backups, 'scores.json')
+        assert len(entries) == 2
+        assert json.loads(scheduler.latest(backups, 'scores.json').read_text()) == {'v': 19}
+
+    def test_files_coalesced_independently(self, dirs):
+        source, backups = dirs
+        scheduler = _scheduler(min_interval=3600)
+        _write(source, 'scores.json', {})
+        _write(source, 'user_badges.json', {})
+
+        assert scheduler.request(backups, source, 'scores.json') is not None
+        assert scheduler.request(backups, source, 'user_badges.json') is not None
+
+
+class TestManifest:
+
+    def test_rebuilt_from_existing_backups(self, dirs):
+        source, backups = dirs
+        (backups / 'scores.json.20250101_120000.backup').write_text('{"old": 1}')
+        (backups / 'scores.json.20250102_120000.backup').write_text('{"old": 2}')
+        scheduler = _scheduler(min_interval=0)
+
+        entries = scheduler.entries(backups, 'scores.json')
+        assert [e['name'] for e in entries] == [
+            'scores.json.20250101_120000.backup',
+            'scores.json.20250102_120000.backup',
+        ]
+
+        # Same content as the newest legacy backup -> deduplicated
+        (source / 'scores.json').write_text('{"old": 2}')
+        assert scheduler.snapshot(backups, source, 'scores.json') is None
+
+    def test_shared_between_instances(self, dirs):
+        source, backups = dirs
+        _write(source, 'scores.json', {'a': 1})
+        _scheduler(min_interval=0).snapshot(backups, source, 'scores.json')
+
+        other = _scheduler(min_interval=0)
+        assert other.snapshot(backups, source, 'scores.json') is None
+        assert (backups / 'manifest.json').exists()
+
+
+class TestDataPersistenceIntegration:
+
+    def test_restore_and_statistics(self, mock_data_persistence):
+        dp = mock_data_persistence
+        dp.save_scores({'alice': {'2026-03': 5}})
+
+        stats = dp.get_backup_statistics()
+        assert stats['scores.json']['count'] == 1
+        assert stats['scores.json']['latest'].startswith('scores.json.')
+
+        (dp.data_dir / 'scores.json').write_text('{}')
+        success, message = dp.restore_from_latest_backup('scores')
+        assert success
+        assert 'Wiederhergestellt' in message
+        assert json.loads((dp.data_dir / 'scores.json').read_text()) == {'alice': {'2026-03': 5}}
+
+    def test_repeated_saves_do_not_multiply_backups(self, mock_data_persistence):
+        dp = mock_data_persistence
+        for _ in range(10):
+            dp.save_scores({'alice': {'2026-03': 5}})
+
+        assert len(list(dp.backup_dir.glob('scores.json.*.backup'))) == 1
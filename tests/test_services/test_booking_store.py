@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Service Layer Tests - Booking JSONL Store
+Tests for the mmap'd bookings.jsonl reader and its sidecar offset index.
+"""
+
+import os
+import json
+import pytest
+from datetime import date
+from unittest.mock import patch, MagicMock, Mock
+
+
+@pytest.fixture(scope='module', autouse=True)
+def mock_google_credentials():
+    """Mock Google credentials to prevent loading during module import"""
+    with patch('app.utils.credentials.load_google_credentials', return_value=Mock()):
+        yield
+
+
+def _line(user, day, customer='Kunde'):
+    return json.dumps({'user': user, 'date': day, 'customer': customer, 'time': '10:00'}) + '\n'
+
+
+@pytest.fixture
+def bookings_file(tmp_path):
+    path = tmp_path / 'bookings.jsonl'
+    lines = []
+    for i in range(300):
+        lines.append(_line(f'user{i % 3}', f'2026-03-{i % 28 + 1:02d}', f'Kunde {i}'))
+    lines.insert(10, 'not-json\n')
+    lines.insert(20, '\n')
+    path.write_text(''.join(lines), encoding='utf-8')
+    return path
+
+
+def _store(path):
+    from app.services.tracking_system.booking_store import BookingJsonlStore
+    return BookingJsonlStore(str(path))
+
+
+class TestQueries:
+
+    def test_all_bookings_skip_invalid_lines(self, bookings_file):
+        assert len(list(_store(bookings_file).iter_bookings())) == 300
+
+    def test_user_and_date_filter(self, bookings_file):
+        store = _store(bookings_file)
+
+        result = list(store.iter_bookings(user='user1', start_date='2026-03-20', end_date=date(2026, 3, 22)))
+
+        expected = [
+            json.loads(line) for line in bookings_file.read_text().splitlines()
+            if line.startswith('{') and json.loads(line)['user'] == 'user1'
+            and '2026-03-20' <= json.loads(line)['date'] <= '2026-03-22'
+        ]
+        assert result == expected
+        assert result
+
+    def test_only_matching_lines_decoded(self, bookings_file):
+        store = _store(bookings_file)
+        list(store.iter_bookings())  # builds index
+
+        with patch('app.services.tracking_system.booking_store.json.loads', wraps=json.loads) as loads:
+            result = list(store.iter_bookings(user='user2', start_date='2026-03-28'))
+
+        assert loads.call_count == len(result)
+
+    def test_missing_file(self, tmp_path):
+        assert list(_store(tmp_path / 'missing.jsonl').iter_bookings()) == []
+
+
+class TestIndexMaintenance:
+
+    def test_sidecar_index_written_and_reused(self, bookings_file):
+        list(_store(bookings_file).iter_bookings(user='user0'))
+        index_path = str(bookings_file) + '.idx'
+        assert os.path.exists(index_path)
+
+        fresh = _store(bookings_file)
+        with patch.object(fresh, '_scan', wraps=fresh._scan) as scan:
+            assert len(list(fresh.iter_bookings(user='user0'))) == 100
+        scan.assert_not_called()
+
+    def test_record_append(self, bookings_file):
+        store = _store(bookings_file)
+        list(store.iter_bookings())
+
+        line = _line('new_user', '2026-04-01').encode('utf-8')
+        with open(bookings_file, 'ab') as f:
+            f.write(line)
+            offset = f.tell() - len(line)
+        store.record_append(offset, len(line), '2026-04-01', 'new_user')
+
+        with patch.object(store, '_scan', wraps=store._scan) as scan:
+            assert [b['user'] for b in store.iter_bookings(user='new_user')] == ['new_user']
+        scan.assert_not_called()
+
+        # A second process sees the appended index line
+        assert len(list(_store(bookings_file).iter_bookings(user='new_user'))) == 1
+
+    def test_unindexed_tail_is_caught_up(self, bookings_file):
+        store = _store(bookings_file)
+        list(store.iter_bookings())
+
+        with open(bookings_file, 'a', encoding='utf-8') as f:
+            f.write(_line('late', '2026-04-02'))
+            f.write('{"user": "partial"')  # write still in progress
+
+        assert len(list(store.iter_bookings(user='late'))) == 1
+        assert list(store.iter_bookings(user='partial')) == []
+
+    def test_rotated_file_rebuilds_index(self, bookings_file, tmp_path):
+        store = _store(bookings_file)
+        list(store.iter_bookings())
+
+        replacement = tmp_path / 'new.jsonl'
+        replacement.write_text(_line('solo', '2026-05-01'), encoding='utf-8')
+        os.replace(replacement, bookings_file)
+
+        assert [b['user'] for b in store.iter_bookings()] == ['solo']
+        assert [b['user'] for b in _store(bookings_file).iter_bookings()] == ['solo']
+
+
+class TestTrackBookingIndex:
+
+    def test_track_booking_updates_index(self, tmp_path):
+        from app.services.tracking_system.booking_recorder import track_booking
+        from app.services.tracking_system.booking_store import get_booking_store
+        tracker = MagicMock()
+        tracker.bookings_file = str(tmp_path / 'tracking' / 'bookings.jsonl')
+
+        with patch('app.services.tracking_system.booking_recorder.is_postgres_enabled', return_value=False):
+            track_booking(tracker, 'Müller, Anna', '2026-03-10', '10:00', 'anna', '2')
+            track_booking(tracker, 'Schmidt', '2026-03-11', '11:00', 'ben', '2')
+
+        with open(tracker.bookings_file + '.idx', encoding='utf-8') as f:
+            index_lines = f.read().splitlines()
+        assert len(index_lines) == 3  # header + 2 entries
+
+        store = get_booking_store(tracker.bookings_file)
+        bookings = list(store.iter_bookings(user='anna'))
+        assert [b['customer'] for b in bookings] == ['Müller, Anna']
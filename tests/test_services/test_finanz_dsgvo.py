@@ -203,6 +203,34 @@ class TestExecuteDeletion:
         assert doc.original_filename == '[GELOESCHT]'
         assert doc.stored_filename is None
 
+    @patch('app.services.finanz_dsgvo_service.get_db_session')
+    def test_execute_purges_partial_uploads(self, mock_db, dsgvo_service, mock_session_marked):
+        """Unfinished resumable uploads and temp files of the session are removed too."""
+        db = MagicMock()
+        mock_db.return_value = db
+        db.query.return_value.filter.return_value.first.return_value = mock_session_marked
+        db.query.return_value.filter.return_value.all.return_value = []
+
+        with patch('app.services.finanz_upload_service.FinanzUploadService.purge_session_partials',
+                   return_value=1) as purge:
+            dsgvo_service.execute_deletion(2)
+
+        purge.assert_called_once_with(2)
+
+    @patch('app.services.finanz_dsgvo_service.get_db_session')
+    def test_execute_purges_llm_and_embedding_caches(self, mock_db, dsgvo_service, mock_session_marked):
+        """Cached LLM answers and embeddings of the documents and the session are removed."""
+        db = MagicMock()
+        mock_db.return_value = db
+        db.query.return_value.filter.return_value.first.return_value = mock_session_marked
+        doc = MagicMock(stored_filename=None, file_hash='abc123')
+        db.query.return_value.filter.return_value.all.return_value = [doc]
+
+        with patch('app.services.finanz_dsgvo_service._purge_model_caches') as purge_caches:
+            dsgvo_service.execute_deletion(2)
+
+        assert [c.args[0] for c in purge_caches.call_args_list] == ['abc123', 'session:2']
+
     @patch('app.services.finanz_dsgvo_service.get_db_session')
     def test_execute_not_found_raises(self, mock_db, dsgvo_service):
         """Test that executing deletion on non-existent session raises."""
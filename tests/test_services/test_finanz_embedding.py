@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Finanzberatung Embedding Service Tests
+Tests for the process-wide model holder, micro-batching and the content-hash
+embedding cache in app/services/finanz_embedding_service.py.
+
+Runs CPU-only: the deterministic HashingEncoder replaces SentenceTransformer.
+"""
+
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+
+
+@pytest.fixture
+def fake_encoder():
+    from app.services.finanz_embedding_service import HashingEncoder, embedding_model
+    encoder = HashingEncoder(dim=8)
+    embedding_model.set_encoder(encoder, model_name='fake-model')
+    yield encoder
+    embedding_model.set_encoder(None)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    from app.services.finanz_embedding_service import EmbeddingCache
+    return EmbeddingCache(str(tmp_path / 'embeddings.sqlite3'))
+
+
+@pytest.fixture
+def batcher(fake_encoder, cache):
+    from app.services.finanz_embedding_service import EmbeddingBatcher, embedding_model
+    return EmbeddingBatcher(embedding_model, cache, max_batch=64, max_wait=0.01)
+
+
+class TestModelHolder:
+
+    def test_hashing_encoder_is_deterministic(self):
+        from app.services.finanz_embedding_service import HashingEncoder
+        first = HashingEncoder(dim=16).encode(['Riester-Vertrag'])[0]
+        second = HashingEncoder(dim=16).encode(['Riester-Vertrag'])[0]
+        other = HashingEncoder(dim=16).encode(['BU-Vertrag'])[0]
+
+        assert first == second
+        assert first != other
+        assert sum(x * x for x in first) == pytest.approx(1.0)
+
+    def test_model_loaded_once_for_all_services(self):
+        from app.services.finanz_embedding_service import (
+            EmbeddingModelHolder, EmbeddingBatcher, FinanzEmbeddingService,
+        )
+        holder = EmbeddingModelHolder(model_name='fake-model')
+        with patch.object(holder, '_load', return_value=MagicMock()) as load:
+            batcher = EmbeddingBatcher(holder)
+            models = {id(FinanzEmbeddingService(batcher)._get_model()) for _ in range(3)}
+
+        assert load.call_count == 1
+        assert len(models) == 1
+
+    def test_hashing_model_name_needs_no_ml_dependencies(self):
+        from app.services.finanz_embedding_service import (
+            EmbeddingModelHolder, HashingEncoder, HASHING_MODEL_NAME,
+        )
+        holder = EmbeddingModelHolder(model_name=HASHING_MODEL_NAME)
+        assert holder.is_available
+        assert isinstance(holder.get(), HashingEncoder)
+
+    def test_preload_only_when_finanz_enabled(self):
+        from app.services import finanz_embedding_service as svc
+        with patch.object(svc.embedding_model, 'preload') as preload:
+            with patch.object(svc.finanz_config, 'FINANZ_ENABLED', False):
+                svc.preload_embedding_model()
+            assert preload.call_count == 0
+
+            with patch.object(svc.finanz_config, 'FINANZ_ENABLED', True), \
+                    patch.object(svc.EmbeddingModelHolder, 'is_available', True):
+                svc.preload_embedding_model()
+            assert preload.call_count == 1
+
+
+class TestBatching:
+
+    def test_concurrent_documents_share_one_encode(self, fake_encoder, cache):
+        from app.services.finanz_embedding_service import EmbeddingBatcher, embedding_model
+        batcher = EmbeddingBatcher(embedding_model, cache, max_batch=64, max_wait=0.5)
+        start = threading.Barrier(5)
+        results = {}
+
+        def document(n):
+            start.wait()
+            results[n] = batcher.embed([f'doc{n} chunk{i}' for i in range(3)])
+
+        threads = [threading.Thread(target=document, args=(n,)) for n in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+
+        assert fake_encoder.calls == [15]
+        assert len(results) == 5
+        assert results[2][1] == fake_encoder.encode(['doc2 chunk1'])[0]
+
+    def test_large_document_split_into_max_batch(self, fake_encoder, cache):
+        from app.services.finanz_embedding_service import EmbeddingBatcher, embedding_model
+        batcher = EmbeddingBatcher(embedding_model, cache, max_batch=4, max_wait=0)
+
+        vectors = batcher.embed([f'chunk{i}' for i in range(10)])
+
+        assert len(vectors) == 10
+        assert fake_encoder.calls == [4, 4, 2]
+
+    def test_encoder_error_reaches_caller(self, batcher):
+        with patch.object(batcher.holder, 'get', return_value=None):
+            with pytest.raises(RuntimeError):
+                batcher.embed(['text'])
+
+
+class TestEmbeddingCache:
+
+    def test_rerun_skips_encoding(self, batcher, fake_encoder):
+        texts = ['Hausrat Allianz', 'KFZ SF-Klasse 12']
+        first = batcher.embed(texts)
+        second = batcher.embed(texts)
+
+        assert fake_encoder.calls == [2]
+        for cached, fresh in zip(second, first):
+            assert cached == pytest.approx(fresh, rel=1e-6)
+        assert batcher.stats['cache_hits'] == 2
+
+    def test_cache_shared_across_processes_by_file(self, batcher, fake_encoder, cache):
+        from app.services.finanz_embedding_service import EmbeddingBatcher, EmbeddingCache
+        batcher.embed(['Riester'])
+
+        reopened = EmbeddingBatcher(batcher.holder, EmbeddingCache(cache.path), max_wait=0)
+        reopened.embed(['Riester', 'BU'])
+
+        assert fake_encoder.calls == [1, 1]
+
+    def test_duplicate_chunks_encoded_once(self, batcher, fake_encoder):
+        vectors = batcher.embed(['same', 'same', 'other'])
+
+        assert fake_encoder.calls == [2]
+        assert vectors[0] == vectors[1]
+
+    def test_purge_by_owner(self, batcher, fake_encoder, cache):
+        batcher.embed(['Gehalt 4.200 EUR', 'Hausrat'], cache_owner='hash-a')
+        batcher.embed(['Hausrat', 'KFZ'], cache_owner='hash-b')
+
+        assert cache.purge('hash-a') == 2
+
+        batcher.embed(['Gehalt 4.200 EUR', 'Hausrat', 'KFZ'])
+        # Beide Chunks von hash-a neu berechnet, KFZ weiter aus dem Cache
+        assert fake_encoder.calls == [2, 1, 2]
+
+    def test_model_change_invalidates(self, batcher, fake_encoder):
+        batcher.embed(['Riester'])
+        batcher.holder.set_encoder(fake_encoder, model_name='other-model')
+        batcher.embed(['Riester'])
+
+        assert fake_encoder.calls == [1, 1]
+
+
+class TestEmbedDocument:
+
+    def test_embed_document_uses_batcher(self, batcher, fake_encoder):
+        from app.services import finanz_embedding_service as svc
+
+        doc = MagicMock(id=7, session_id=3, extracted_text='Vertrag ' * 50,
+                        original_filename='bu.pdf', document_type='bu')
+        db = MagicMock()
+        db.query.return_value.filter.return_value.first.return_value = doc
+        collection = MagicMock()
+        service = svc.FinanzEmbeddingService(batcher)
+
+        with patch.object(svc, 'HAS_TIKTOKEN', True), \
+                patch.object(svc, 'HAS_CHROMADB', True), \
+                patch.object(svc, 'get_db_session', return_value=db), \
+                patch.object(service, 'chunk_text', return_value=['a', 'b', 'c']), \
+                patch.object(service, '_get_collection', return_value=collection):
+            result = service.embed_document(7)
+
+        assert result == {'chunk_count': 3, 'collection_name': 'finanz_session_3', 'skipped': False}
+        kwargs = collection.upsert.call_args.kwargs
+        assert kwargs['ids'] == ['doc7_chunk0', 'doc7_chunk1', 'doc7_chunk2']
+        assert len(kwargs['embeddings']) == 3
+        assert fake_encoder.calls == [3]
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Finanzberatung Extraction Service Tests
+Tests for page-parallel PDF extraction, OCR skipping, raster cap and the
+per-page cache in app/services/finanz_extraction_service.py.
+
+pdfplumber/pytesseract are replaced by in-memory fakes; the thread pool is
+used so the fakes are visible to the workers.
+"""
+
+import threading
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+DENSE_TEXT = 'Vertragsnummer 12345 Beitrag monatlich ' * 20
+
+
+class FakeImage:
+    def convert(self, mode):
+        return self
+
+    def filter(self, f):
+        return self
+
+
+class FakePage:
+    width = 595.0
+    height = 842.0
+
+    def __init__(self, pdf, index, text, delay=0.0):
+        self.pdf, self.index, self.text, self.delay = pdf, index, text, delay
+
+    def extract_text(self):
+        time.sleep(self.delay)
+        with self.pdf.lock:
+            self.pdf.extracted.append(self.index)
+        return self.text
+
+    def to_image(self, resolution):
+        self.pdf.resolutions.append(resolution)
+        return SimpleNamespace(original=FakeImage())
+
+    def close(self):
+        pass
+
+
+class FakePdf:
+    def __init__(self, texts, delays=None):
+        self.lock = threading.Lock()
+        self.extracted, self.resolutions = [], []
+        delays = delays or [0.0] * len(texts)
+        self.pages = [FakePage(self, i, t, d) for i, (t, d) in enumerate(zip(texts, delays))]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeTesseract:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def image_to_string(self, img, lang='deu'):
+        with self._lock:
+            self.active += 1
+            self.calls += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return 'OCR Text Seite ' * 20
+
+
+@pytest.fixture
+def fake_libs():
+    """Install fake pdfplumber/pytesseract and a fresh thread-pool setup."""
+    from app.services import finanz_extraction_service as svc
+    from app.services import finanz_page_extraction as pages
+
+    state = SimpleNamespace(pdf=None, tesseract=FakeTesseract())
+    plumber = SimpleNamespace(open=lambda path: state.pdf)
+    image_enhance = SimpleNamespace(Contrast=lambda img: SimpleNamespace(enhance=lambda f: img))
+
+    with patch.object(svc, 'HAS_PDFPLUMBER', True), \
+            patch.object(pages, 'HAS_PDFPLUMBER', True), \
+            patch.object(pages, 'HAS_TESSERACT', True), \
+            patch.object(pages, 'pdfplumber', plumber, create=True), \
+            patch.object(pages, 'pytesseract', state.tesseract, create=True), \
+            patch.object(pages, 'ImageEnhance', image_enhance, create=True), \
+            patch.object(pages, 'ImageFilter', SimpleNamespace(SHARPEN=None), create=True), \
+            patch.object(svc.finanz_config, 'FINANZ_EXTRACT_POOL', 'thread'), \
+            patch.object(svc.finanz_config, 'FINANZ_EXTRACT_WORKERS', 4), \
+            patch.object(svc.finanz_config, 'FINANZ_OCR_MAX_RASTER_PAGES', 2), \
+            patch.object(svc, '_thread_raster_slots', None), \
+            patch.object(pages, '_raster_slots', None):
+        yield state
+        pages.close_pdf()
+
+
+@pytest.fixture
+def service(tmp_path):
+    from app.services.finanz_extraction_service import FinanzExtractionService, PageTextCache
+    return FinanzExtractionService(cache=PageTextCache(str(tmp_path / 'pages')))
+
+
+class TestPageParallelExtraction:
+
+    def test_pages_reassembled_in_order(self, fake_libs, service):
+        texts = [f'{DENSE_TEXT} Seite {i}' for i in range(6)]
+        # Later pages finish first
+        fake_libs.pdf = FakePdf(texts, delays=[0.06 - i * 0.01 for i in range(6)])
+        events = []
+
+        result = service._extract_pdf('/tmp/doc.pdf', 'hash1', events.append)
+
+        assert result['pages'] == texts
+        assert result['page_count'] == 6
+        assert result['text'] == '\n\n'.join(texts)
+        assert [e['pages_done'] for e in events] == [1, 2, 3, 4, 5, 6]
+        assert sorted(e['page'] for e in events) == [1, 2, 3, 4, 5, 6]
+        assert all(e['page_count'] == 6 and not e['cached'] for e in events)
+
+    def test_dense_pages_skip_ocr(self, fake_libs, service):
+        fake_libs.pdf = FakePdf([DENSE_TEXT, '', DENSE_TEXT, 'Seite 4'])
+        events = []
+
+        result = service._extract_pdf('/tmp/doc.pdf', None, events.append)
+
+        assert fake_libs.tesseract.calls == 2
+        assert result['pages'][0] == DENSE_TEXT
+        assert result['pages'][1].startswith('OCR Text')
+        assert {e['page']: e['ocr'] for e in events} == {1: False, 2: True, 3: False, 4: True}
+
+    def test_concurrent_rasterization_is_capped(self, fake_libs, service):
+        fake_libs.tesseract.delay = 0.05
+        fake_libs.pdf = FakePdf([''] * 8)
+
+        service._extract_pdf('/tmp/scan.pdf', None)
+
+        assert fake_libs.tesseract.calls == 8
+        assert fake_libs.tesseract.max_active <= 2
+
+    def test_reprocessing_uses_page_cache(self, fake_libs, service):
+        fake_libs.pdf = FakePdf([DENSE_TEXT, ''])
+        first = service._extract_pdf('/tmp/doc.pdf', 'hash2')
+
+        fake_libs.pdf = FakePdf([DENSE_TEXT, ''])
+        events = []
+        second = service._extract_pdf('/tmp/doc.pdf', 'hash2', events.append)
+
+        assert second == first
+        assert fake_libs.pdf.extracted == []
+        assert fake_libs.tesseract.calls == 1
+        assert all(e['cached'] for e in events)
+
+    def test_partial_cache_only_extracts_missing_pages(self, fake_libs, service):
+        service.cache.store('hash3', {'index': 1, 'text': 'cached', 'ocr': False})
+        fake_libs.pdf = FakePdf([DENSE_TEXT, 'unused', DENSE_TEXT])
+
+        result = service._extract_pdf('/tmp/doc.pdf', 'hash3')
+
+        assert result['pages'][1] == 'cached'
+        assert sorted(fake_libs.pdf.extracted) == [0, 2]
+
+    def test_page_error_fails_document(self, fake_libs, service):
+        fake_libs.pdf = FakePdf([DENSE_TEXT] * 3)
+
+        def boom():
+            raise RuntimeError('broken page')
+        fake_libs.pdf.pages[1].extract_text = boom
+
+        with pytest.raises(RuntimeError, match='broken page'):
+            service._extract_pdf('/tmp/doc.pdf', None)
+
+    def test_purge_removes_cached_pages(self, service):
+        service.cache.store('hash4', {'index': 0, 'text': 'x', 'ocr': False})
+        service.cache.purge('hash4')
+        assert service.cache.load('hash4') == {}
+
+
+class TestPageHelpers:
+
+    def test_text_density_normalized_to_a4(self):
+        from app.services.finanz_page_extraction import text_density
+        assert text_density('abc def', 595, 842) == pytest.approx(6)
+        # Same text on a quarter-size page is four times as dense
+        assert text_density('abc def', 297.5, 421) == pytest.approx(24)
+
+    def test_raster_resolution_respects_pixel_cap(self):
+        from app.services.finanz_page_extraction import raster_resolution
+        assert raster_resolution(595, 842, 300, 40_000_000) == 300
+        capped = raster_resolution(595 * 4, 842 * 4, 300, 40_000_000)
+        assert capped < 300
+        assert (595 * 4 / 72 * capped) * (842 * 4 / 72 * capped) <= 40_000_000
+
+    def test_threads_used_inside_daemon_process(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from app.services.finanz_extraction_service import FinanzExtractionService
+
+        daemon = SimpleNamespace(daemon=True)
+        with patch('multiprocessing.current_process', return_value=daemon):
+            executor = FinanzExtractionService()._make_executor(2)
+        try:
+            assert isinstance(executor, ThreadPoolExecutor)
+        finally:
+            executor.shutdown()
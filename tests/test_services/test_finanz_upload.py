@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+Finanzberatung Upload Service Tests
+Tests for streaming storage and resumable chunked uploads in
+app/services/finanz_upload_service.py and the upload routes.
+"""
+
+import hashlib
+import io
+import os
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+
+from werkzeug.datastructures import FileStorage
+
+PDF = b'%PDF-1.4\n' + bytes(range(256)) * 12_000  # ~3 MB
+EXE = b'MZ\x90\x00' + b'\x00' * 10_000
+
+
+class CountingStream(io.BytesIO):
+    """BytesIO that records every read() size"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+
+@pytest.fixture
+def upload_root(tmp_path):
+    from app.config.base import Config, FinanzConfig
+    with patch.object(Config, 'PERSIST_BASE', str(tmp_path)), \
+            patch.object(FinanzConfig, 'FINANZ_UPLOAD_BUFFER_KB', 64), \
+            patch.object(FinanzConfig, 'FINANZ_UPLOAD_CHUNK_MAX_MB', 1):
+        yield tmp_path / FinanzConfig.FINANZ_UPLOAD_DIR / '7'
+
+
+@pytest.fixture
+def db():
+    db = MagicMock()
+    db.query.return_value.filter.return_value.first.return_value = None
+    with patch('app.services.finanz_upload_service.get_db_session', return_value=db):
+        yield db
+
+
+@pytest.fixture
+def service():
+    from app.services.finanz_upload_service import FinanzUploadService
+    return FinanzUploadService()
+
+
+def stored_document(db):
+    return db.add.call_args[0][0]
+
+
+def files_in(directory):
+    return sorted(name for name in os.listdir(directory) if not name.startswith('.partial'))
+
+
+class TestStoreFile:
+
+    def test_streams_in_blocks_and_hashes_incrementally(self, service, db, upload_root):
+        stream = CountingStream(PDF)
+
+        service.store_file(FileStorage(stream=stream, filename='vertrag.pdf'), 7, 3, 'vertrag.pdf')
+
+        assert set(stream.reads) == {64 * 1024}  # nie ein unbegrenztes read()
+        doc = stored_document(db)
+        assert doc.file_hash == hashlib.sha256(PDF).hexdigest()
+        assert doc.file_size == len(PDF)
+        assert doc.mime_type == 'application/pdf'
+        assert doc.stored_filename.endswith('.pdf')
+        assert files_in(upload_root) == [doc.stored_filename]
+        assert (upload_root / doc.stored_filename).read_bytes() == PDF
+        db.commit.assert_called_once()
+
+    def test_size_limit_enforced_while_reading(self, service, db, upload_root):
+        from app.config.base import FinanzConfig
+        from app.services.finanz_upload_service import UploadRejected
+        stream = CountingStream(PDF)
+
+        with patch.object(FinanzConfig, 'FINANZ_MAX_FILE_SIZE_MB', 1), \
+                pytest.raises(UploadRejected) as exc:
+            service.store_file(FileStorage(stream=stream, filename='gross.pdf'), 7, 3, 'gross.pdf')
+
+        assert exc.value.status_code == 413
+        assert len(stream.reads) * 64 * 1024 <= 1024 * 1024 + 64 * 1024
+        assert files_in(upload_root) == []
+        db.add.assert_not_called()
+
+    def test_disallowed_type_rejected_after_first_block(self, service, db, upload_root):
+        from app.services.finanz_upload_service import UploadRejected
+        stream = CountingStream(EXE * 20)
+
+        with pytest.raises(UploadRejected) as exc:
+            service.store_file(FileStorage(stream=stream, filename='x.pdf'), 7, 3, 'x.pdf')
+
+        assert 'Dateityp nicht erlaubt' in exc.value.message
+        assert len(stream.reads) == 1
+        assert files_in(upload_root) == []
+
+    def test_empty_file(self, service, db, upload_root):
+        from app.services.finanz_upload_service import UploadRejected
+        with pytest.raises(UploadRejected, match='Leere Datei'):
+            service.store_file(FileStorage(stream=io.BytesIO(b''), filename='leer.pdf'), 7, 3, 'leer.pdf')
+
+    def test_duplicate_leaves_no_file(self, service, db, upload_root):
+        db.query.return_value.filter.return_value.first.return_value = MagicMock(id=1, original_filename='a.pdf')
+
+        with pytest.raises(ValueError, match='Duplikat'):
+            service.store_file(FileStorage(stream=io.BytesIO(PDF), filename='b.pdf'), 7, 3, 'b.pdf')
+
+        assert files_in(upload_root) == []
+
+    def test_db_failure_leaves_no_file(self, service, db, upload_root):
+        db.commit.side_effect = RuntimeError('db down')
+
+        with pytest.raises(RuntimeError):
+            service.store_file(FileStorage(stream=io.BytesIO(PDF), filename='b.pdf'), 7, 3, 'b.pdf')
+
+        assert files_in(upload_root) == []
+        db.rollback.assert_called_once()
+
+
+class TestResumable:
+
+    def send_all(self, service, upload_id, data, chunk=512 * 1024):
+        for offset in range(0, len(data), chunk):
+            part = data[offset:offset + chunk]
+            progress = service.append_chunk(7, upload_id, offset, io.BytesIO(part),
+                                            hashlib.sha256(part).hexdigest())
+        return progress
+
+    def test_chunked_upload_stores_document(self, service, db, upload_root):
+        upload = service.start_resumable_upload(7, 3, 'scan.pdf', len(PDF))
+
+        progress = self.send_all(service, upload['upload_id'], PDF)
+        assert progress['received'] == len(PDF)
+        service.finish_resumable_upload(7, upload['upload_id'])
+
+        doc = stored_document(db)
+        assert doc.file_hash == hashlib.sha256(PDF).hexdigest()
+        assert doc.original_filename == 'scan.pdf' and doc.token_id == 3
+        assert (upload_root / doc.stored_filename).read_bytes() == PDF
+        assert os.listdir(upload_root / '.partial') == []
+
+    def test_bad_checksum_rolls_back_chunk(self, service, db, upload_root):
+        from app.services.finanz_upload_service import UploadRejected
+        upload_id = service.start_resumable_upload(7, 3, 'scan.pdf', len(PDF))['upload_id']
+        first = PDF[:1024 * 1024]
+
+        with pytest.raises(UploadRejected, match='Pruefsumme'):
+            service.append_chunk(7, upload_id, 0, io.BytesIO(first), 'f' * 64)
+        assert service.get_resumable_upload(7, upload_id)['received'] == 0
+
+        progress = service.append_chunk(7, upload_id, 0, io.BytesIO(first), hashlib.sha256(first).hexdigest())
+        assert progress['received'] == len(first)
+
+    def test_offset_mismatch_reports_resume_point(self, service, db, upload_root):
+        from app.services.finanz_upload_service import UploadRejected
+        upload_id = service.start_resumable_upload(7, 3, 'scan.pdf', len(PDF))['upload_id']
+        service.append_chunk(7, upload_id, 0, io.BytesIO(PDF[:1000]))
+
+        with pytest.raises(UploadRejected) as exc:
+            service.append_chunk(7, upload_id, 0, io.BytesIO(PDF[:1000]))
+
+        assert exc.value.status_code == 409
+        assert service.get_resumable_upload(7, upload_id)['received'] == 1000
+
+    def test_chunk_limits(self, service, db, upload_root):
+        from app.services.finanz_upload_service import UploadRejected
+        upload_id = service.start_resumable_upload(7, 3, 'klein.pdf', 2000)
+
+        with pytest.raises(UploadRejected) as exc:
+            service.append_chunk(7, upload_id['upload_id'], 0, io.BytesIO(PDF[:3000]))
+        assert exc.value.status_code == 413
+
+        upload_id = service.start_resumable_upload(7, 3, 'scan.pdf', len(PDF))['upload_id']
+        with pytest.raises(UploadRejected) as exc:
+            service.append_chunk(7, upload_id, 0, io.BytesIO(PDF[:2 * 1024 * 1024]))
+        assert exc.value.status_code == 413
+        assert service.get_resumable_upload(7, upload_id)['received'] == 0
+
+    def test_announced_size_above_limit(self, service, db, upload_root):
+        from app.config.base import FinanzConfig
+        from app.services.finanz_upload_service import UploadRejected
+        with pytest.raises(UploadRejected) as exc:
+            service.start_resumable_upload(7, 3, 'riesig.pdf', FinanzConfig.FINANZ_MAX_FILE_SIZE_MB * 1024 * 1024 + 1)
+        assert exc.value.status_code == 413
+
+    def test_first_chunk_type_is_checked(self, service, db, upload_root):
+        from app.services.finanz_upload_service import UploadRejected
+        upload_id = service.start_resumable_upload(7, 3, 'x.pdf', len(EXE))['upload_id']
+
+        with pytest.raises(UploadRejected, match='Dateityp nicht erlaubt'):
+            service.append_chunk(7, upload_id, 0, io.BytesIO(EXE))
+        assert service.get_resumable_upload(7, upload_id)['received'] == 0
+
+    def test_incomplete_upload_cannot_finish(self, service, db, upload_root):
+        from app.services.finanz_upload_service import UploadRejected
+        upload_id = service.start_resumable_upload(7, 3, 'scan.pdf', len(PDF))['upload_id']
+        service.append_chunk(7, upload_id, 0, io.BytesIO(PDF[:1000]))
+
+        with pytest.raises(UploadRejected) as exc:
+            service.finish_resumable_upload(7, upload_id)
+
+        assert exc.value.status_code == 409
+        db.add.assert_not_called()
+
+    def test_duplicate_discards_partial(self, service, db, upload_root):
+        upload_id = service.start_resumable_upload(7, 3, 'scan.pdf', len(PDF))['upload_id']
+        self.send_all(service, upload_id, PDF)
+        db.query.return_value.filter.return_value.first.return_value = MagicMock(id=1, original_filename='a.pdf')
+
+        with pytest.raises(ValueError, match='Duplikat'):
+            service.finish_resumable_upload(7, upload_id)
+
+        assert os.listdir(upload_root / '.partial') == []
+        assert files_in(upload_root) == []
+
+    def test_stale_partials_are_swept(self, service, db, upload_root):
+        from app.config.base import FinanzConfig
+        old_id = service.start_resumable_upload(7, 3, 'alt.pdf', len(PDF))['upload_id']
+        stale = time.time() - FinanzConfig.FINANZ_UPLOAD_PARTIAL_TTL - 60
+        os.utime(upload_root / '.partial' / f'{old_id}.json', (stale, stale))
+
+        new_id = service.start_resumable_upload(7, 3, 'neu.pdf', len(PDF))['upload_id']
+
+        remaining = sorted(n for n in os.listdir(upload_root / '.partial') if not n.endswith('.lock'))
+        assert remaining == [f'{new_id}.json', f'{new_id}.part']
+
+    def test_sweep_all_covers_sessions_without_new_uploads(self, service, db, upload_root):
+        from app.config.base import FinanzConfig
+        old_id = service.start_resumable_upload(7, 3, 'alt.pdf', len(PDF))['upload_id']
+        orphan = upload_root / '.upload-crashed.tmp'
+        orphan.write_bytes(PDF[:100])
+        stale = time.time() - FinanzConfig.FINANZ_UPLOAD_PARTIAL_TTL - 60
+        os.utime(upload_root / '.partial' / f'{old_id}.json', (stale, stale))
+        os.utime(orphan, (stale, stale))
+        fresh_id = service.start_resumable_upload(8, 4, 'neu.pdf', len(PDF))['upload_id']
+
+        assert service.sweep_all_partials() == 2
+
+        assert not (upload_root / '.partial' / f'{old_id}.part').exists()
+        assert not orphan.exists()
+        assert (upload_root.parent / '8' / '.partial' / f'{fresh_id}.part').exists()
+
+    def test_purge_session_partials_removes_everything(self, service, db, upload_root):
+        service.start_resumable_upload(7, 3, 'scan.pdf', len(PDF))
+        (upload_root / '.upload-abc.tmp').write_bytes(b'x')
+        (upload_root / 'kept.pdf').write_bytes(b'%PDF')
+
+        assert service.purge_session_partials(7) == 2
+
+        assert sorted(os.listdir(upload_root)) == ['kept.pdf']
+
+    def test_open_uploads_per_token_are_capped(self, service, db, upload_root):
+        from app.config.base import FinanzConfig
+        from app.services.finanz_upload_service import UploadRejected
+        with patch.object(FinanzConfig, 'FINANZ_UPLOAD_MAX_PARTIALS_PER_TOKEN', 2):
+            service.start_resumable_upload(7, 3, 'a.pdf', len(PDF))
+            service.start_resumable_upload(7, 3, 'b.pdf', len(PDF))
+            with pytest.raises(UploadRejected) as exc:
+                service.start_resumable_upload(7, 3, 'c.pdf', len(PDF))
+            # Anderer Token derselben Session ist nicht betroffen
+            service.start_resumable_upload(7, 4, 'd.pdf', len(PDF))
+
+        assert exc.value.status_code == 429
+
+    @pytest.mark.parametrize('upload_id', ['../../etc/passwd', 'abc', ''])
+    def test_invalid_upload_id(self, service, upload_root, upload_id):
+        from app.services.finanz_upload_service import UploadRejected
+        with pytest.raises(UploadRejected) as exc:
+            service.get_resumable_upload(7, upload_id)
+        assert exc.value.status_code == 404
+
+
+class TestUploadRoutes:
+
+    @pytest.fixture
+    def client(self, upload_root, db):
+        from flask import Flask
+        from app.routes.finanzberatung import upload as upload_routes
+
+        token = MagicMock(id=3, session_id=7)
+        token.session.customer_name = 'Kunde'
+        app = Flask(__name__)
+        app.register_blueprint(upload_routes.upload_bp, url_prefix='/finanzberatung')
+        with patch.object(upload_routes.upload_service, 'validate_token', return_value=(True, token, '')), \
+                patch.object(upload_routes, 'sse_manager'):
+            yield app.test_client()
+
+    def test_resumable_flow(self, client, db):
+        base = '/finanzberatung/upload/tok'
+        start = client.post(f'{base}/resumable', json={'filename': 'scan.pdf', 'size': len(PDF)}).get_json()
+        assert start['success'] and start['chunk_size'] == 1024 * 1024
+
+        chunk = PDF[:start['chunk_size']]
+        response = client.put(f"{base}/resumable/{start['upload_id']}?offset=0", data=chunk,
+                              headers={'X-Chunk-SHA256': hashlib.sha256(chunk).hexdigest()})
+        assert response.get_json()['received'] == len(chunk)
+
+        # Wiederholter Chunk (Antwort verloren): 409 mit Fortsetzungspunkt
+        retry = client.put(f"{base}/resumable/{start['upload_id']}?offset=0", data=chunk)
+        assert retry.status_code == 409 and retry.get_json()['received'] == len(chunk)
+
+        for offset in range(len(chunk), len(PDF), start['chunk_size']):
+            client.put(f"{base}/resumable/{start['upload_id']}?offset={offset}",
+                       data=PDF[offset:offset + start['chunk_size']])
+        done = client.post(f"{base}/resumable/{start['upload_id']}/complete")
+
+        assert done.status_code == 200 and done.get_json()['success']
+        assert stored_document(db).file_hash == hashlib.sha256(PDF).hexdigest()
+
+    def test_submit_rejects_type_with_400(self, client, db):
+        response = client.post('/finanzberatung/upload/tok/submit',
+                               data={'file': (io.BytesIO(EXE), 'x.pdf')}, content_type='multipart/form-data')
+
+        assert response.status_code == 400
+        assert 'Dateityp nicht erlaubt' in response.get_json()['message']
+
+    def test_submit_rejects_oversized_body_before_parsing(self, client, db):
+        from app.config.base import FinanzConfig
+        with patch.object(FinanzConfig, 'FINANZ_MAX_FILE_SIZE_MB', 1):
+            response = client.post('/finanzberatung/upload/tok/submit',
+                                   data={'file': (io.BytesIO(PDF), 'gross.pdf')}, content_type='multipart/form-data')
+
+        assert response.status_code == 413
+        db.add.assert_not_called()
@@ -206,8 +206,13 @@ class TestAchievementChecking:
         badge_ids = [b['id'] for b in new_badges if b is not None]
         assert len(badge_ids) >= 2  # At least some badges earned
 
-    def test_add_points_and_check_achievements_integration(self, mock_achievement_system):
+    def test_add_points_and_check_achievements_integration(self, mock_achievement_system, tmp_path):
         """Test integrated points addition and achievement checking"""
+        from app.services.achievement_engine import AchievementEngine
+        # Eigenes Aggregat-Verzeichnis, sonst gelten Badges früherer Läufe als bereits vergeben
+        mock_achievement_system._own_engine = AchievementEngine(
+            system=mock_achievement_system, state_dir=str(tmp_path / 'aggregates'))
+
         with patch('app.core.extensions.data_persistence') as mock_dp:
             mock_dp.load_scores.return_value = {'test.user': {'2026-01': 100, 'today': 50}}
             mock_dp.load_daily_user_stats.return_value = {}
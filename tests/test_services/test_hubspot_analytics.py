@@ -1,13 +1,14 @@
 # -*- coding: utf-8 -*-
 """
 Service Layer Tests - HubSpot Analytics (Phase G.3)
-Tests for the 6 analytics methods in hubspot_service.py
+Tests for the snapshot-derived analytics methods in hubspot_service.py
 and their integration in analytics_service.py.
 """
 
 import sys
 import pytest
 import time
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock, PropertyMock
 
 
@@ -37,13 +38,35 @@ _ensure_hubspot_mocks()
 
 # ========== FIXTURES ==========
 
+@pytest.fixture(autouse=True)
+def clean_snapshot_store():
+    """Each test starts without a shared HubSpot snapshot."""
+    from app.services.hubspot_snapshot import hubspot_snapshot_store
+    hubspot_snapshot_store.clear()
+    yield
+    hubspot_snapshot_store.clear()
+
+
 @pytest.fixture
 def hs_service():
     """HubSpotService instance with mocked client."""
     _ensure_hubspot_mocks()
     from app.services.hubspot_service import HubSpotService
     svc = HubSpotService()
+    svc.config = SimpleNamespace(**{
+        k: getattr(svc.config, k) for k in dir(svc.config) if k.isupper()
+    })
+    svc.config.HUBSPOT_SNAPSHOT_INTERVAL = 900
+    svc.config.HUBSPOT_SNAPSHOT_WAIT = 0
+    svc.config.HUBSPOT_PIPELINE_ID = 'default'
+    svc.config.STAGE_MAPPING = {'rueckholung': '349476306'}
     svc.client = MagicMock()
+    # Empty, unpaged responses by default (MagicMock paging would loop forever)
+    empty = MagicMock(results=[], paging=None)
+    svc.client.crm.pipelines.pipeline_stages_api.get_all.return_value = empty
+    svc.client.crm.owners.owners_api.get_page.return_value = empty
+    svc.client.crm.deals.search_api.do_search.return_value = empty
+    svc.client.crm.contacts.search_api.do_search.return_value = empty
     svc._initialized = True
     return svc
 
@@ -76,6 +99,185 @@ class TestCache:
         assert hs_service._cache_get('nonexistent') is None
 
 
+# ========== SNAPSHOT HELPERS ==========
+
+def _snapshot(deals=None, contacts=None, stages=None, owners=None, built_at=None):
+    return {
+        'built_at': built_at if built_at is not None else time.time(),
+        'pipeline_id': 'default',
+        'stages': stages or [],
+        'owners': owners or {},
+        'deals': deals or [],
+        'contacts': contacts or [],
+    }
+
+
+def _use_snapshot(svc, snapshot):
+    """Feed a prebuilt snapshot into the service via the export hook."""
+    svc._export_snapshot = MagicMock(return_value=snapshot)
+    return svc._export_snapshot
+
+
+# ========== SNAPSHOT ==========
+
+class TestSnapshot:
+
+    def test_export_called_once_for_all_methods(self, hs_service):
+        export = _use_snapshot(hs_service, _snapshot(deals=[
+            {'id': '1', 'dealstage': '100', 'amount': '1000'},
+        ]))
+
+        hs_service.get_total_deals_count()
+        hs_service.get_avg_deal_value()
+        hs_service.get_pipeline_stats()
+        hs_service.get_conversion_rates()
+        hs_service.get_customer_segments()
+
+        assert export.call_count == 1
+        hs_service.client.crm.deals.search_api.do_search.assert_not_called()
+
+    def test_stale_snapshot_served_and_refresh_enqueued(self, hs_service):
+        from app.services.hubspot_snapshot import hubspot_snapshot_store
+        hubspot_snapshot_store.set(_snapshot(deals=[{'id': '1'}], built_at=time.time() - 99999))
+        export = _use_snapshot(hs_service, _snapshot(deals=[{'id': '1'}, {'id': '2'}]))
+
+        with patch('app.services.hubspot_tasks.refresh_hubspot_snapshot_task') as task:
+            assert hs_service.get_total_deals_count() == 1
+            hs_service._cache.clear()
+            assert hs_service.get_pipeline_stats() is not None
+
+        task.delay.assert_called_once()
+        export.assert_not_called()
+
+    def test_stale_refresh_falls_back_to_thread_without_celery(self, hs_service):
+        from app.services.hubspot_snapshot import hubspot_snapshot_store
+        hubspot_snapshot_store.set(_snapshot(deals=[{'id': '1'}], built_at=time.time() - 99999))
+        _use_snapshot(hs_service, _snapshot(deals=[{'id': '1'}, {'id': '2'}]))
+
+        with patch('app.services.hubspot_tasks.refresh_hubspot_snapshot_task') as task, \
+             patch('app.services.hubspot_service.threading.Thread') as thread:
+            task.delay.side_effect = ConnectionError('broker down')
+            assert hs_service.get_total_deals_count() == 1
+
+        thread.assert_called_once()
+        assert thread.call_args.kwargs['target'] == hs_service.refresh_snapshot
+        thread.return_value.start.assert_called_once()
+
+    def test_refresh_releases_enqueue_marker(self, hs_service):
+        from app.services.hubspot_snapshot import hubspot_snapshot_store
+        _use_snapshot(hs_service, _snapshot(deals=[{'id': '1'}]))
+
+        assert hubspot_snapshot_store.claim_refresh_enqueue() is True
+        assert hubspot_snapshot_store.claim_refresh_enqueue() is False
+        assert hs_service.refresh_snapshot() is True
+        assert hubspot_snapshot_store.claim_refresh_enqueue() is True
+
+    def test_stale_snapshot_served_while_other_worker_refreshes(self, hs_service):
+        from app.services.hubspot_snapshot import hubspot_snapshot_store
+        hubspot_snapshot_store.set(_snapshot(deals=[{'id': '1'}], built_at=time.time() - 99999))
+        export = _use_snapshot(hs_service, _snapshot())
+
+        with patch.object(hubspot_snapshot_store, 'claim_refresh_enqueue', return_value=False), \
+             patch('app.services.hubspot_tasks.refresh_hubspot_snapshot_task') as task:
+            assert hs_service.get_total_deals_count() == 1
+        task.delay.assert_not_called()
+        export.assert_not_called()
+
+    def test_cold_start_waits_for_other_worker(self, hs_service):
+        from app.services.hubspot_snapshot import hubspot_snapshot_store
+        export = _use_snapshot(hs_service, _snapshot())
+        built = _snapshot(deals=[{'id': '1'}, {'id': '2'}, {'id': '3'}])
+
+        with patch.object(hubspot_snapshot_store, 'acquire_refresh_lock', return_value=None), \
+             patch.object(hubspot_snapshot_store, 'wait_for_snapshot', return_value=built) as wait:
+            assert hs_service.get_total_deals_count() == 3
+        wait.assert_called_once()
+        export.assert_not_called()
+
+    def test_single_flight_across_threads(self, hs_service):
+        import threading
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_export():
+            calls.append(1)
+            started.set()
+            release.wait(2)
+            return _snapshot(deals=[{'id': '1'}])
+
+        hs_service._export_snapshot = slow_export
+        hs_service.config.HUBSPOT_SNAPSHOT_WAIT = 2
+
+        results = []
+        first = threading.Thread(target=lambda: results.append(hs_service.get_total_deals_count()))
+        first.start()
+        started.wait(2)
+        second = threading.Thread(target=lambda: results.append(hs_service.get_total_deals_count()))
+        second.start()
+        release.set()
+        first.join(3)
+        second.join(3)
+
+        assert len(calls) == 1
+        assert results == [1, 1]
+
+    def test_refresh_snapshot_stores_export(self, hs_service):
+        from app.services.hubspot_snapshot import hubspot_snapshot_store
+        _use_snapshot(hs_service, _snapshot(deals=[{'id': '1'}]))
+
+        assert hs_service.refresh_snapshot() is True
+        assert len(hubspot_snapshot_store.get()['deals']) == 1
+
+    def test_refresh_snapshot_unavailable(self, hs_service_unavailable):
+        assert hs_service_unavailable.refresh_snapshot() is False
+
+    def test_beat_schedule_uses_config_interval(self, app):
+        from app.config.base import HubSpotConfig
+        schedule = app.config["CELERY"]["beat_schedule"]["hubspot-snapshot-refresh"]["schedule"]
+        assert schedule == float(HubSpotConfig.HUBSPOT_SNAPSHOT_INTERVAL)
+
+    def test_export_builds_snapshot(self, hs_service):
+        stage = MagicMock(id='100', label='Neu', display_order=0, metadata={'isClosed': 'false'})
+        hs_service.client.crm.pipelines.pipeline_stages_api.get_all.return_value = MagicMock(results=[stage])
+
+        owner = MagicMock(id='7', first_name='Tanja', last_name='Brinster')
+        hs_service.client.crm.owners.owners_api.get_page.return_value = MagicMock(results=[owner], paging=None)
+
+        deal = MagicMock(id='d1', properties={'dealstage': '100', 'amount': '500'})
+        hs_service.client.crm.deals.search_api.do_search.return_value = MagicMock(results=[deal], paging=None)
+
+        contact = MagicMock(id='c1', properties={'hs_analytics_source': 'PAID_SEARCH'})
+        hs_service.client.crm.contacts.search_api.do_search.return_value = MagicMock(results=[contact], paging=None)
+
+        snapshot = hs_service._export_snapshot()
+        assert snapshot['stages'][0]['label'] == 'Neu'
+        assert snapshot['owners'] == {'7': 'Tanja Brinster'}
+        assert snapshot['deals'] == [{'id': 'd1', 'dealstage': '100', 'amount': '500'}]
+        assert snapshot['contacts'] == [{'id': 'c1', 'hs_analytics_source': 'PAID_SEARCH'}]
+
+    def test_search_all_pages_past_search_cap_by_object_id(self, hs_service):
+        pages = [
+            [MagicMock(id=str(i)) for i in range(1, 101)],
+            [MagicMock(id=str(i)) for i in range(101, 201)],
+            [MagicMock(id='201')],
+        ]
+        search_api = MagicMock()
+        search_api.do_search.side_effect = [MagicMock(results=p, total=25000) for p in pages]
+        request_cls = MagicMock(side_effect=lambda **kw: kw)
+        groups = [{"filters": [{"propertyName": "pipeline", "operator": "EQ", "value": "p"}]}]
+
+        results = hs_service._search_all(search_api, request_cls, filter_groups=groups, properties=['x'])
+
+        assert len(results) == 201
+        requests = [c.kwargs['public_object_search_request'] for c in search_api.do_search.call_args_list]
+        assert 'after' not in requests[1]
+        assert requests[0]['filter_groups'] == groups
+        assert requests[2]['filter_groups'][0]['filters'][-1] == {
+            "propertyName": "hs_object_id", "operator": "GT", "value": '200'}
+        assert groups[0]['filters'][-1]['propertyName'] == 'pipeline'
+
+
 # ========== GET TOTAL DEALS COUNT ==========
 
 class TestGetTotalDealsCount:
@@ -84,35 +286,26 @@ class TestGetTotalDealsCount:
         assert hs_service_unavailable.get_total_deals_count() is None
 
     def test_returns_count_all(self, hs_service):
-        mock_resp = MagicMock()
-        mock_resp.total = 125
-        hs_service.client.crm.deals.search_api.do_search.return_value = mock_resp
-
-        result = hs_service.get_total_deals_count()
-        assert result == 125
+        _use_snapshot(hs_service, _snapshot(deals=[{'id': str(i)} for i in range(125)]))
+        assert hs_service.get_total_deals_count() == 125
 
     def test_returns_count_filtered(self, hs_service):
-        mock_resp = MagicMock()
-        mock_resp.total = 30
-        hs_service.client.crm.deals.search_api.do_search.return_value = mock_resp
+        deals = [{'id': str(i), 'dealstage': '349476306'} for i in range(30)]
+        deals += [{'id': 'x', 'dealstage': '100'}]
+        _use_snapshot(hs_service, _snapshot(deals=deals))
 
-        result = hs_service.get_total_deals_count(stage='rueckholung')
-        assert result == 30
+        assert hs_service.get_total_deals_count(stage='rueckholung') == 30
 
     def test_uses_cache(self, hs_service):
-        mock_resp = MagicMock()
-        mock_resp.total = 50
-        hs_service.client.crm.deals.search_api.do_search.return_value = mock_resp
+        export = _use_snapshot(hs_service, _snapshot(deals=[{'id': str(i)} for i in range(50)]))
 
-        # First call fetches
         hs_service.get_total_deals_count()
-        # Second call uses cache
         result = hs_service.get_total_deals_count()
         assert result == 50
-        assert hs_service.client.crm.deals.search_api.do_search.call_count == 1
+        assert export.call_count == 1
 
     def test_handles_exception(self, hs_service):
-        hs_service.client.crm.deals.search_api.do_search.side_effect = Exception("API error")
+        hs_service.client.crm.pipelines.pipeline_stages_api.get_all.side_effect = Exception("API error")
         assert hs_service.get_total_deals_count() is None
 
 
@@ -124,47 +317,28 @@ class TestGetAvgDealValue:
         assert hs_service_unavailable.get_avg_deal_value() is None
 
     def test_calculates_average(self, hs_service):
-        deal1 = MagicMock()
-        deal1.properties = {'amount': '1000'}
-        deal2 = MagicMock()
-        deal2.properties = {'amount': '2000'}
-        deal3 = MagicMock()
-        deal3.properties = {'amount': '3000'}
-
-        mock_resp = MagicMock()
-        mock_resp.results = [deal1, deal2, deal3]
-        mock_resp.paging = None
-        hs_service.client.crm.deals.search_api.do_search.return_value = mock_resp
-
-        result = hs_service.get_avg_deal_value()
-        assert result == 2000.0
+        _use_snapshot(hs_service, _snapshot(deals=[
+            {'id': '1', 'amount': '1000'},
+            {'id': '2', 'amount': '2000'},
+            {'id': '3', 'amount': '3000'},
+        ]))
+        assert hs_service.get_avg_deal_value() == 2000.0
 
     def test_skips_invalid_amounts(self, hs_service):
-        deal1 = MagicMock()
-        deal1.properties = {'amount': '1500'}
-        deal2 = MagicMock()
-        deal2.properties = {'amount': 'invalid'}
-        deal3 = MagicMock()
-        deal3.properties = {'amount': None}
-
-        mock_resp = MagicMock()
-        mock_resp.results = [deal1, deal2, deal3]
-        mock_resp.paging = None
-        hs_service.client.crm.deals.search_api.do_search.return_value = mock_resp
-
-        result = hs_service.get_avg_deal_value()
-        assert result == 1500.0
+        _use_snapshot(hs_service, _snapshot(deals=[
+            {'id': '1', 'amount': '1500'},
+            {'id': '2', 'amount': 'invalid'},
+            {'id': '3', 'amount': None},
+            {'id': '4', 'amount': '0'},
+        ]))
+        assert hs_service.get_avg_deal_value() == 1500.0
 
     def test_returns_none_no_deals(self, hs_service):
-        mock_resp = MagicMock()
-        mock_resp.results = []
-        mock_resp.paging = None
-        hs_service.client.crm.deals.search_api.do_search.return_value = mock_resp
-
+        _use_snapshot(hs_service, _snapshot())
         assert hs_service.get_avg_deal_value() is None
 
     def test_handles_exception(self, hs_service):
-        hs_service.client.crm.deals.search_api.do_search.side_effect = Exception("fail")
+        hs_service.client.crm.pipelines.pipeline_stages_api.get_all.side_effect = Exception("fail")
         assert hs_service.get_avg_deal_value() is None
 
 
@@ -176,26 +350,15 @@ class TestGetPipelineStats:
         assert hs_service_unavailable.get_pipeline_stats() is None
 
     def test_returns_stage_counts(self, hs_service):
-        stage1 = MagicMock()
-        stage1.id = '100'
-        stage1.label = 'Neu'
-        stage2 = MagicMock()
-        stage2.id = '200'
-        stage2.label = 'Qualifiziert'
-
-        pipeline_resp = MagicMock()
-        pipeline_resp.results = [stage1, stage2]
-        hs_service.client.crm.pipelines.pipeline_stages_api.get_all.return_value = pipeline_resp
-
-        # Mock deal search for each stage count
-        count_resp1 = MagicMock()
-        count_resp1.total = 10
-        count_resp2 = MagicMock()
-        count_resp2.total = 5
-        hs_service.client.crm.deals.search_api.do_search.side_effect = [count_resp1, count_resp2]
-
-        result = hs_service.get_pipeline_stats()
-        assert result == {'Neu': 10, 'Qualifiziert': 5}
+        stages = [
+            {'id': '100', 'label': 'Neu', 'display_order': 0, 'metadata': {}},
+            {'id': '200', 'label': 'Qualifiziert', 'display_order': 1, 'metadata': {}},
+        ]
+        deals = [{'id': f'a{i}', 'dealstage': '100'} for i in range(10)]
+        deals += [{'id': f'b{i}', 'dealstage': '200'} for i in range(5)]
+        _use_snapshot(hs_service, _snapshot(deals=deals, stages=stages))
+
+        assert hs_service.get_pipeline_stats() == {'Neu': 10, 'Qualifiziert': 5}
 
     def test_handles_exception(self, hs_service):
         hs_service.client.crm.pipelines.pipeline_stages_api.get_all.side_effect = Exception("fail")
@@ -210,31 +373,24 @@ class TestGetLeadSourceAttribution:
         assert hs_service_unavailable.get_lead_source_attribution() is None
 
     def test_returns_attribution_data(self, hs_service):
-        # PAID_SEARCH is first in the list. It needs 2 calls (count + sample).
-        # The other 8 sources need 1 call each (count=0).
-        contact = MagicMock()
-        contact.id = 'c1'
-
-        # Build side_effect list: [PAID_SEARCH count, PAID_SEARCH sample, 8x zero]
-        paid_resp = MagicMock(total=50, results=[contact])
-        zero_resp = MagicMock(total=0, results=[])
-
-        side_effects = [paid_resp, paid_resp]  # count + sample for PAID_SEARCH
-        side_effects += [zero_resp] * 8        # remaining sources
-
-        hs_service.client.crm.contacts.search_api.do_search.side_effect = side_effects
-
-        # Mock association check (for sample contacts)
-        assoc_resp = MagicMock()
-        assoc_resp.results = [MagicMock()]  # Has deals
-        hs_service.client.crm.associations.v4.basic_api.get_page.return_value = assoc_resp
+        contacts = [
+            {'id': f'c{i}', 'hs_analytics_source': 'PAID_SEARCH', 'num_associated_deals': '1'}
+            for i in range(50)
+        ]
+        contacts += [
+            {'id': f'o{i}', 'hs_analytics_source': 'OFFLINE', 'num_associated_deals': '1' if i < 1 else '0'}
+            for i in range(4)
+        ]
+        _use_snapshot(hs_service, _snapshot(contacts=contacts))
 
         result = hs_service.get_lead_source_attribution()
         assert result is not None
-        assert len(result) == 1
+        assert len(result) == 2
         assert result[0]['channel'] == 'Paid Search'
         assert result[0]['leads'] == 50
         assert result[0]['conversion_rate'] == 100.0
+        assert result[1]['channel'] == 'Offline'
+        assert result[1]['conversion_rate'] == 25.0
 
     def test_handles_exception(self, hs_service):
         hs_service.client.crm.contacts.search_api.do_search.side_effect = Exception("fail")
@@ -249,28 +405,16 @@ class TestGetConversionRates:
         assert hs_service_unavailable.get_conversion_rates() is None
 
     def test_calculates_rates(self, hs_service):
-        stage1 = MagicMock()
-        stage1.id = '100'
-        stage1.label = 'Stage A'
-        stage1.display_order = 0
-        stage2 = MagicMock()
-        stage2.id = '200'
-        stage2.label = 'Stage B'
-        stage2.display_order = 1
-
-        pipeline_resp = MagicMock()
-        pipeline_resp.results = [stage2, stage1]  # Unsorted
-        hs_service.client.crm.pipelines.pipeline_stages_api.get_all.return_value = pipeline_resp
-
-        # Mock deal search: 2 deals, both entered Stage A, 1 entered Stage B
-        deal1 = MagicMock()
-        deal1.properties = {'hs_v2_date_entered_100': '2026-01-01', 'hs_v2_date_entered_200': '2026-02-01'}
-        deal2 = MagicMock()
-        deal2.properties = {'hs_v2_date_entered_100': '2026-01-15', 'hs_v2_date_entered_200': ''}
-
-        search_resp = MagicMock()
-        search_resp.results = [deal1, deal2]
-        hs_service.client.crm.deals.search_api.do_search.return_value = search_resp
+        stages = [  # Unsorted
+            {'id': '200', 'label': 'Stage B', 'display_order': 1, 'metadata': {}},
+            {'id': '100', 'label': 'Stage A', 'display_order': 0, 'metadata': {}},
+        ]
+        # 2 deals, both entered Stage A, 1 entered Stage B
+        deals = [
+            {'id': '1', 'hs_v2_date_entered_100': '2026-01-01', 'hs_v2_date_entered_200': '2026-02-01'},
+            {'id': '2', 'hs_v2_date_entered_100': '2026-01-15', 'hs_v2_date_entered_200': ''},
+        ]
+        _use_snapshot(hs_service, _snapshot(deals=deals, stages=stages))
 
         result = hs_service.get_conversion_rates()
         assert result is not None
@@ -290,41 +434,48 @@ class TestGetCustomerSegments:
         assert hs_service_unavailable.get_customer_segments() is None
 
     def test_returns_segments(self, hs_service):
-        # segment_props order: Familie (verheiratet), Selbstaendige, Angestellte, Rentner
-        contact = MagicMock()
-        contact.id = 'c1'
-
-        familie_resp = MagicMock(total=100, results=[contact])
-        zero_resp = MagicMock(total=0, results=[])
-
-        side_effects = [familie_resp]       # Familie
-        side_effects += [zero_resp] * 3     # rest
-
-        hs_service.client.crm.contacts.search_api.do_search.side_effect = side_effects
-
-        # Mock: contact has deal with amount
-        assoc_resp = MagicMock()
-        assoc_resp.results = [MagicMock(to_object_id='d1')]
-        hs_service.client.crm.associations.v4.basic_api.get_page.return_value = assoc_resp
-
-        deal = MagicMock()
-        deal.properties = {'dealname': 'Test', 'dealstage': '100', 'pipeline': 'default',
-                           'amount': '2500', 'datum_t1_neu': None, 'uhrzeit_t1': None,
-                           'telefonist_neu': None, 'createdate': None, 'closedate': None}
-        deal.id = 'd1'
-        hs_service.client.crm.deals.basic_api.get_by_id.return_value = deal
+        contacts = [
+            {'id': 'c1', 'familienstand': 'verheiratet', 'num_associated_deals': '1',
+             'recent_deal_amount': '2500'},
+            {'id': 'c2', 'familienstand': 'verheiratet', 'num_associated_deals': '0'},
+        ]
+        _use_snapshot(hs_service, _snapshot(contacts=contacts))
 
         result = hs_service.get_customer_segments()
         assert result is not None
         assert len(result) == 1
         assert result[0]['segment'] == 'Familie'
-        assert result[0]['count'] == 100
+        assert result[0]['count'] == 2
+        assert result[0]['avg_value'] == 2500.0
+        assert result[0]['conversion'] == 50.0
 
     def test_handles_exception(self, hs_service):
         hs_service.client.crm.contacts.search_api.do_search.side_effect = Exception("fail")
         assert hs_service.get_customer_segments() is None
 
 
+# ========== GET PER OWNER CONVERSION ==========
+
+class TestGetPerOwnerConversion:
+
+    def test_calculates_owner_rates(self, hs_service):
+        stages = [
+            {'id': 'won', 'label': 'Gewonnen', 'display_order': 2,
+             'metadata': {'isClosed': 'true', 'probability': '1.0'}},
+            {'id': 'open', 'label': 'Offen', 'display_order': 0, 'metadata': {}},
+        ]
+        deals = [
+            {'id': '1', 'hubspot_owner_id': '7', 'dealstage': 'won'},
+            {'id': '2', 'hubspot_owner_id': '7', 'dealstage': 'open'},
+            {'id': '3', 'hubspot_owner_id': '8', 'dealstage': 'open'},
+            {'id': '4', 'hubspot_owner_id': None, 'dealstage': 'won'},
+        ]
+        owners = {'7': 'Tanja Brinster', '8': 'Ben Kerstan'}
+        _use_snapshot(hs_service, _snapshot(deals=deals, stages=stages, owners=owners))
+
+        assert hs_service.get_per_owner_conversion() == {'Tanja Brinster': 50.0, 'Ben Kerstan': 0.0}
+
+
 # ========== ANALYTICS SERVICE INTEGRATION ==========
 
 class TestAnalyticsServiceIntegration:
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Tests fuer die HubSpot Webhook-Inbox (app/services/hubspot_webhook_inbox.py)
+und den Webhook-Endpoint (app/routes/hubspot_webhook.py).
+
+Testet:
+- Endpoint speichert den Roh-Batch und antwortet sofort
+- Drain: Dedup über Worker hinweg, Zusammenfassen pro Deal, ein Queue-Write
+- Fehler beim Queue-Write lassen Batch und Dedup-Keys unverändert
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+
+STAGE_A, STAGE_B, STAGE_C = "100", "349476306", "680987595"
+
+
+def stage_event(deal_id, new_stage, previous_stage, occurred_at, event_id=None):
+    return {
+        "eventId": event_id or occurred_at,
+        "subscriptionType": "deal.propertyChange",
+        "objectId": deal_id,
+        "propertyName": "dealstage",
+        "propertyValue": new_stage,
+        "previousPropertyValue": previous_stage,
+        "occurredAt": occurred_at,
+    }
+
+
+def raw(events):
+    return json.dumps(events).encode("utf-8")
+
+
+class QueueStore:
+    """In-Memory Review-Queue mit gezählten Saves"""
+
+    def __init__(self):
+        self.items = []
+        self.saves = 0
+        self.fail = False
+
+    def load(self):
+        return [dict(i) for i in self.items]
+
+    def save(self, queue):
+        if self.fail:
+            return False
+        self.saves += 1
+        self.items = queue
+        return True
+
+
+@pytest.fixture
+def queue():
+    from app.services.hubspot_queue_service import hubspot_queue_service
+    store = QueueStore()
+    with patch.object(hubspot_queue_service, '_load_queue', side_effect=store.load), \
+            patch.object(hubspot_queue_service, '_save_queue', side_effect=store.save):
+        yield store
+
+
+@pytest.fixture
+def hubspot():
+    fake = MagicMock()
+    fake.get_deal.side_effect = lambda deal_id: {
+        "id": deal_id, "dealname": f"Kunde {deal_id}", "dealstage": "x",
+        "datum_t1": "2026-03-02", "uhrzeit_t1": "10:00", "telefonist": "Tim",
+    }
+    with patch('app.services.hubspot_service.hubspot_service', fake), \
+            patch('app.services.audit_service.audit_service') as audit:
+        fake.audit = audit
+        yield fake
+
+
+@pytest.fixture
+def inbox_dir(tmp_path):
+    return str(tmp_path / "persistent" / "hubspot_webhooks")
+
+
+@pytest.fixture
+def inbox(inbox_dir):
+    from app.services.hubspot_webhook_inbox import HubSpotWebhookInbox
+    with patch('app.services.hubspot_webhook_inbox.get_redis_client', return_value=None):
+        yield HubSpotWebhookInbox(base_dir=inbox_dir, background=False)
+
+
+class TestDrain:
+
+    def test_burst_is_coalesced_into_one_queue_write(self, inbox, queue, hubspot):
+        # 300 Events in 3 Requests, 20 Deals mit je mehreren Stage-Wechseln
+        base = 1_760_000_000_000
+        events = []
+        for n in range(300):
+            deal = str(1000 + n % 20)
+            events.append(stage_event(deal, STAGE_B if n < 280 else STAGE_C, STAGE_A, base + n))
+        for start in range(0, 300, 100):
+            inbox.store(raw(events[start:start + 100]))
+
+        stats = inbox.drain()
+
+        assert stats == {"batches": 3, "events": 300, "duplicates": 0, "deals": 20, "queued": 20}
+        assert queue.saves == 1
+        assert hubspot.get_deal.call_count == 20
+        assert inbox.pending_batches() == []
+        by_deal = {i["deal_id"]: i for i in queue.items}
+        # Letzte Änderung gewinnt, Ausgangs-Stage aus der ersten
+        assert by_deal["1000"]["suggested_stage"] == STAGE_C
+        assert by_deal["1000"]["suggested_action"] == "lost"
+        assert by_deal["1000"]["suggested_note"] == f"HubSpot Stage-Change: {STAGE_A} → {STAGE_C}"
+        assert hubspot.audit.log_event.call_count == 20
+
+    def test_out_of_order_events_use_latest_occurrence(self, inbox, queue, hubspot):
+        inbox.store(raw([
+            stage_event("7", STAGE_C, STAGE_B, 2000),
+            stage_event("7", STAGE_B, STAGE_A, 1000),
+        ]))
+        inbox.drain()
+
+        assert queue.items[0]["suggested_stage"] == STAGE_C
+        assert queue.items[0]["suggested_note"].endswith(f"{STAGE_A} → {STAGE_C}")
+
+    def test_retry_on_other_worker_is_deduplicated(self, inbox, inbox_dir, queue, hubspot):
+        from app.services.hubspot_webhook_inbox import HubSpotWebhookInbox
+        batch = raw([stage_event("42", STAGE_B, STAGE_A, 1000)])
+        inbox.store(batch)
+        inbox.drain()
+
+        # Zweiter Worker: eigene Instanz, gleicher Dedup-Store
+        with patch('app.services.hubspot_webhook_inbox.get_redis_client', return_value=None):
+            other = HubSpotWebhookInbox(base_dir=inbox_dir, background=False)
+            other.store(batch)
+            stats = other.drain()
+
+        assert stats["duplicates"] == 1
+        assert stats["queued"] == 0
+        assert len(queue.items) == 1
+        assert other.pending_batches() == []
+
+    def test_non_stage_events_are_ignored(self, inbox, queue, hubspot):
+        inbox.store(raw([
+            {"subscriptionType": "deal.creation", "objectId": 1, "occurredAt": 1},
+            {"subscriptionType": "deal.propertyChange", "propertyName": "amount", "objectId": 1},
+        ]))
+        stats = inbox.drain()
+
+        assert stats["events"] == 0
+        assert queue.saves == 0
+        assert inbox.pending_batches() == []
+
+    def test_failed_queue_write_keeps_batch(self, inbox, queue, hubspot):
+        queue.fail = True
+        inbox.store(raw([stage_event("42", STAGE_B, STAGE_A, 1000)]))
+
+        with pytest.raises(IOError):
+            inbox.drain()
+        assert len(inbox.pending_batches()) == 1
+
+        queue.fail = False
+        stats = inbox.drain()
+        assert stats["queued"] == 1
+        assert inbox.pending_batches() == []
+
+    def test_unreadable_batch_is_set_aside(self, inbox, inbox_dir, queue, hubspot):
+        inbox.store(b"{not json")
+        inbox.store(raw([stage_event("42", STAGE_B, STAGE_A, 1000)]))
+
+        stats = inbox.drain()
+
+        assert stats["queued"] == 1
+        assert [f for f in os.listdir(inbox_dir) if f.endswith(".bad")]
+
+    def test_drain_respects_max_events_per_pass(self, inbox, queue, hubspot):
+        for n in range(3):
+            inbox.store(raw([stage_event(str(n), STAGE_B, STAGE_A, 1000 + n)]))
+
+        stats = inbox.drain(max_events=1)
+
+        assert stats["batches"] == 3
+        assert queue.saves == 3
+
+
+class TestBackgroundDrain:
+
+    def test_start_drains_leftovers_without_new_webhook(self, inbox, inbox_dir, queue, hubspot):
+        from app.services.hubspot_webhook_inbox import HubSpotWebhookInbox
+        # Batch aus einem abgestürzten Prozess, nie gedraint
+        inbox.store(raw([stage_event("9", STAGE_B, STAGE_A, 1000)]))
+
+        # Neuer Prozess nach dem Neustart: nur start(), kein store()/notify()
+        with patch('app.services.hubspot_webhook_inbox.get_redis_client', return_value=None):
+            fresh = HubSpotWebhookInbox(base_dir=inbox_dir, drain_delay=0, drain_interval=3600)
+            try:
+                fresh.start()
+                deadline = time.time() + 5
+                while fresh.pending_batches() and time.time() < deadline:
+                    time.sleep(0.02)
+            finally:
+                fresh.stop()
+
+        assert fresh.pending_batches() == []
+        assert [i["deal_id"] for i in queue.items] == ["9"]
+
+
+class TestRedisDedup:
+
+    def test_keys_checked_and_marked_with_ttl(self, tmp_path):
+        from app.services.hubspot_webhook_inbox import WebhookDedupStore
+        client = MagicMock()
+        pipe = client.pipeline.return_value
+        pipe.execute.return_value = [1, 0]
+        store = WebhookDedupStore(str(tmp_path / "seen.json"), ttl=3600)
+
+        with patch('app.services.hubspot_webhook_inbox.get_redis_client', return_value=client):
+            assert store.seen(["a", "b"]) == {"a"}
+            store.mark(["b"])
+
+        key = pipe.set.call_args[0][0]
+        assert key.startswith("hubspot:webhook:seen:")
+        assert pipe.set.call_args[1] == {"ex": 3600, "nx": True}
+        assert not (tmp_path / "seen.json").exists()
+
+    def test_file_store_expires_keys(self, tmp_path):
+        from app.services.hubspot_webhook_inbox import WebhookDedupStore
+        store = WebhookDedupStore(str(tmp_path / "seen.json"), ttl=60)
+        with patch('app.services.hubspot_webhook_inbox.get_redis_client', return_value=None):
+            store.mark(["a"])
+            assert store.seen(["a"]) == {"a"}
+            with patch('app.services.hubspot_webhook_inbox.time.time', return_value=time.time() + 120):
+                assert store.seen(["a"]) == set()
+
+
+class TestWebhookEndpoint:
+
+    SECRET = "test-webhook-secret"
+
+    def _post(self, client, body, secret=None):
+        timestamp = str(int(time.time() * 1000))
+        url = "http://localhost/api/hubspot/webhook"
+        signature = hmac.new(
+            (secret or self.SECRET).encode(), f"POST{url}{body.decode()}{timestamp}".encode(),
+            hashlib.sha256).hexdigest()
+        return client.post(url, data=body, content_type="application/json", headers={
+            "X-HubSpot-Signature-v3": signature,
+            "X-HubSpot-Request-Timestamp": timestamp,
+        })
+
+    @pytest.fixture
+    def stored(self):
+        from app.config.base import hubspot_config
+        batches = []
+        fake_inbox = MagicMock()
+        fake_inbox.store.side_effect = lambda body: batches.append(body) or "batch-1"
+        with patch.object(hubspot_config, 'HUBSPOT_WEBHOOK_SECRET', self.SECRET), \
+                patch('app.services.hubspot_webhook_inbox.webhook_inbox', fake_inbox):
+            fake_inbox.batches = batches
+            yield fake_inbox
+
+    def test_accepts_and_stores_raw_batch(self, client, stored):
+        body = raw([stage_event("1", STAGE_B, STAGE_A, 1000)] * 100)
+        with patch('app.services.hubspot_service.hubspot_service') as hubspot:
+            response = self._post(client, body)
+
+        assert response.status_code == 200
+        assert response.get_json() == {"status": "accepted", "events": 100}
+        assert stored.batches == [body]
+        # Keine Verarbeitung im Request
+        hubspot.get_deal.assert_not_called()
+
+    def test_invalid_signature_is_rejected(self, client, stored):
+        response = self._post(client, raw([{}]), secret="wrong")
+
+        assert response.status_code == 401
+        assert stored.batches == []
+
+    def test_store_failure_asks_hubspot_to_retry(self, client, stored):
+        stored.store.side_effect = OSError("disk full")
+        response = self._post(client, raw([stage_event("1", STAGE_B, STAGE_A, 1000)]))
+
+        assert response.status_code == 503
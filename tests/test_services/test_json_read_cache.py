@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Service Layer Tests - JSON Read Cache
+Tests for the stat-validated read cache behind atomic_read_json/DataPersistence.
+"""
+
+import os
+import json
+import pytest
+from unittest.mock import patch
+
+
+@pytest.fixture
+def cache():
+    from app.utils.json_cache import json_file_cache
+    json_file_cache.clear()
+    yield json_file_cache
+    json_file_cache.clear()
+
+
+class TestAtomicReadJson:
+
+    def test_unchanged_file_parsed_once(self, tmp_path, cache):
+        from app.utils.json_utils import atomic_read_json
+        path = tmp_path / 'data.json'
+        path.write_text(json.dumps({'a': [1, 2]}), encoding='utf-8')
+
+        with patch('app.utils.json_utils.json.loads', wraps=json.loads) as loads:
+            results = [atomic_read_json(str(path)) for _ in range(5)]
+
+        assert loads.call_count == 1
+        assert all(r == {'a': [1, 2]} for r in results)
+        assert cache.stats()['hits'] == 4
+
+    def test_copy_on_read(self, tmp_path, cache):
+        from app.utils.json_utils import atomic_read_json
+        path = tmp_path / 'data.json'
+        path.write_text(json.dumps({'a': [1]}), encoding='utf-8')
+
+        first = atomic_read_json(str(path))
+        first['a'].append(99)
+        first['b'] = True
+
+        assert atomic_read_json(str(path)) == {'a': [1]}
+        atomic_read_json(str(path))['a'].clear()
+        assert atomic_read_json(str(path)) == {'a': [1]}
+
+    def test_external_replace_detected(self, tmp_path, cache):
+        """Another worker replacing the file (new inode) invalidates the entry."""
+        from app.utils.json_utils import atomic_read_json
+        path = tmp_path / 'data.json'
+        path.write_text('{"v": 1}', encoding='utf-8')
+        assert atomic_read_json(str(path)) == {'v': 1}
+
+        other = tmp_path / 'other.json'
+        other.write_text('{"v": 2}', encoding='utf-8')
+        os.replace(other, path)
+
+        assert atomic_read_json(str(path)) == {'v': 2}
+
+    def test_in_place_rewrite_detected(self, tmp_path, cache):
+        from app.utils.json_utils import atomic_read_json
+        path = tmp_path / 'data.json'
+        path.write_text('{"v": 1}', encoding='utf-8')
+        assert atomic_read_json(str(path)) == {'v': 1}
+
+        path.write_text('{"v": 22}', encoding='utf-8')
+
+        assert atomic_read_json(str(path)) == {'v': 22}
+
+    def test_deleted_file_returns_default(self, tmp_path, cache):
+        from app.utils.json_utils import atomic_read_json
+        path = tmp_path / 'data.json'
+        path.write_text('{}', encoding='utf-8')
+        atomic_read_json(str(path))
+        path.unlink()
+
+        assert atomic_read_json(str(path), default='x') == 'x'
+        assert cache.stats()['entries'] == 0
+
+    def test_write_populates_cache(self, tmp_path, cache):
+        from app.utils.json_utils import atomic_write_json, atomic_read_json
+        path = str(tmp_path / 'data.json')
+        atomic_write_json(path, {1: 'int key'})
+
+        with patch('app.utils.json_utils.open', side_effect=AssertionError('file re-read')):
+            # Same result as a real json.load (keys become strings)
+            assert atomic_read_json(path) == {'1': 'int key'}
+
+    def test_write_does_not_cache_foreign_replacement(self, tmp_path, cache):
+        import shutil
+        from app.utils.json_utils import atomic_write_json, atomic_read_json
+        path = str(tmp_path / 'data.json')
+        real_move = shutil.move
+
+        def move_then_replace(src, dst):
+            real_move(src, dst)
+            # Another process swaps in its own file right after our rename
+            other = dst + '.other'
+            with open(other, 'w', encoding='utf-8') as f:
+                json.dump({'writer': 'other'}, f)
+            os.replace(other, dst)
+
+        with patch('app.utils.json_utils.shutil.move', side_effect=move_then_replace):
+            atomic_write_json(path, {'writer': 'us'})
+
+        assert atomic_read_json(path) == {'writer': 'other'}
+
+    def test_compressed_round_trip(self, tmp_path, cache):
+        from app.utils.json_utils import atomic_write_json, atomic_read_json
+        path = str(tmp_path / 'data.json')
+        atomic_write_json(path, {'z': 1}, compress=True)
+        cache.clear()
+
+        assert atomic_read_json(path) == {'z': 1}
+        assert atomic_read_json(path) == {'z': 1}
+        assert cache.stats()['hits'] == 1
+
+    def test_lru_bound(self, tmp_path):
+        from app.utils.json_cache import JsonFileCache, file_signature
+        small = JsonFileCache(max_entries=2)
+        for i in range(3):
+            path = tmp_path / f'{i}.json'
+            path.write_text('{}')
+            small.store(str(path), file_signature(os.stat(path)), {})
+
+        assert small.stats()['entries'] == 2
+
+
+class TestDataPersistenceLoads:
+
+    def test_repeated_loads_hit_cache(self, mock_data_persistence, cache):
+        dp = mock_data_persistence
+        with patch('app.services.data_persistence.USE_POSTGRES', False):
+            dp.save_badges({'alice': {'badges': [], 'earned_dates': {}, 'total_badges': 0}})
+            dp.save_daily_user_stats({'2026-03-02': {'alice': {'bookings': 2}}})
+
+            with patch('app.utils.json_utils.open', side_effect=AssertionError('file re-read')):
+                for _ in range(3):
+                    assert 'alice' in dp.load_badges()
+                    assert dp.load_daily_user_stats()['2026-03-02']['alice']['bookings'] == 2
+                    assert dp.load_data('user_badges') is not None
+
+    def test_load_sees_save(self, mock_data_persistence, cache):
+        dp = mock_data_persistence
+        with patch('app.services.data_persistence.USE_POSTGRES', False):
+            dp.save_champions({'2026-03': {'user': 'alice', 'score': 10}})
+            assert dp.load_champions()['2026-03']['user'] == 'alice'
+
+            dp.save_champions({'2026-03': {'user': 'bob', 'score': 12}})
+            assert dp.load_champions()['2026-03']['user'] == 'bob'
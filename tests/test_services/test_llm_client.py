@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+LLM Client Tests
+Tests for batching, response cache, budget and metrics in
+app/services/llm_client.py and the batched LLM paths of the classification
+and field extraction services.
+
+Runs against a local stub HTTP server that mimics the vLLM
+``/v1/chat/completions`` API.
+"""
+
+import json
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+
+class StubVLLM:
+    """Minimal vLLM stand-in; ``reply(prompt)`` returns the message content"""
+
+    def __init__(self, reply=None, delay=0.0):
+        self.reply = reply or (lambda prompt: json.dumps({"echo": prompt[-20:]}))
+        self.delay = delay
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != "/v1/chat/completions":
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                prompt = body["messages"][0]["content"]
+                with stub._lock:
+                    stub.prompts.append(prompt)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.delay)
+                    payload = json.dumps({
+                        "id": "cmpl-stub",
+                        "object": "chat.completion",
+                        "model": body["model"],
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": stub.reply(prompt)},
+                                     "finish_reason": "stop"}],
+                        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 10,
+                                  "total_tokens": len(prompt) // 4 + 10},
+                    }).encode()
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    from app.config.base import FinanzConfig
+    server = StubVLLM(delay=0.05)
+    with patch.object(FinanzConfig, "FINANZ_LLM_BASE_URL", server.base_url):
+        yield server
+    server.close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    from app.services.llm_client import LLMResponseCache
+    return LLMResponseCache(str(tmp_path / "llm_cache.sqlite3"))
+
+
+@pytest.fixture
+def client(cache):
+    from app.services.llm_client import LLMClient, LLMBudget
+    return LLMClient(cache=cache, budget=LLMBudget(0, 0), max_concurrency=3)
+
+
+class TestBatch:
+
+    def test_results_in_order_with_bounded_concurrency(self, stub, client):
+        prompts = [f"Dokument {n}" for n in range(9)]
+
+        results = client.chat_completions([{"prompt": p} for p in prompts])
+
+        assert results == [{"echo": p} for p in prompts]
+        assert 1 < stub.max_in_flight <= 3
+        metrics = client.metrics()
+        assert metrics["requests"] == 9
+        assert metrics["max_in_flight"] <= 3
+        assert metrics["prompt_tokens"] == sum(len(p) // 4 for p in prompts)
+        assert metrics["completion_tokens"] == 90
+        assert metrics["latency_p95_ms"] >= 50
+
+    def test_duplicate_prompts_sent_once(self, stub, client):
+        results = client.chat_completions([{"prompt": "gleich"}] * 4)
+
+        assert results == [{"echo": "gleich"}] * 4
+        assert stub.prompts == ["gleich"]
+
+    def test_invalid_json_gives_none_for_that_prompt(self, stub, client):
+        stub.reply = lambda prompt: "kein json" if prompt == "kaputt" else json.dumps({"ok": True})
+
+        assert client.chat_completions([{"prompt": "kaputt"}, {"prompt": "gut"}]) == [None, {"ok": True}]
+        assert client.metrics()["errors"] == 1
+
+    def test_server_down_returns_none(self, client):
+        from app.config.base import FinanzConfig
+        with patch.object(FinanzConfig, "FINANZ_LLM_BASE_URL", "http://127.0.0.1:9/v1"), \
+                patch("urllib3.util.retry.Retry.sleep"):
+            assert client.chat_completion("hallo", timeout=1) is None
+
+    def test_single_completion_keeps_interface(self, stub, client):
+        assert client.chat_completion("Vertrag", max_tokens=50, temperature=0.0) == {"echo": "Vertrag"}
+
+
+class TestCache:
+
+    def test_repeat_is_served_from_cache(self, stub, client, cache):
+        client.chat_completions([{"prompt": "a"}, {"prompt": "b"}])
+
+        # Neuer Client (z.B. nächster Worker-Prozess), gleicher Cache
+        from app.services.llm_client import LLMClient, LLMBudget
+        other = LLMClient(cache=cache, budget=LLMBudget(0, 0))
+        assert other.chat_completions([{"prompt": "a"}, {"prompt": "b"}]) == [{"echo": "a"}, {"echo": "b"}]
+
+        assert sorted(stub.prompts) == ["a", "b"]
+        assert other.metrics()["cache_hits"] == 2
+        assert other.metrics()["requests"] == 0
+
+    def test_key_includes_model_and_sampling_params(self, stub, client):
+        from app.config.base import FinanzConfig
+        client.chat_completion("p", temperature=0.1)
+        client.chat_completion("p", temperature=0.7)
+        client.chat_completion("p", max_tokens=500)
+        with patch.object(FinanzConfig, "FINANZ_LLM_MODEL", "other-model"):
+            client.chat_completion("p")
+
+        assert len(stub.prompts) == 4
+
+    def test_failures_are_not_cached(self, stub, client):
+        stub.reply = lambda prompt: "kein json"
+        client.chat_completion("p")
+        stub.reply = lambda prompt: json.dumps({"ok": True})
+
+        assert client.chat_completion("p") == {"ok": True}
+        assert len(stub.prompts) == 2
+
+    def test_size_limit_evicts_least_recently_used(self, tmp_path):
+        from app.services.llm_client import LLMResponseCache
+        cache = LLMResponseCache(str(tmp_path / "small.sqlite3"), max_bytes=1000)
+        for n in range(5):
+            cache.put(f"k{n}", {"text": "x" * 180})
+            time.sleep(0.01)
+        cache.get_many(["k0"])  # k0 frisch benutzt
+
+        cache.put("k5", {"text": "x" * 180})
+
+        assert cache.size() <= 1000
+        remaining = set(cache.get_many([f"k{n}" for n in range(6)]))
+        assert {"k0", "k5"} <= remaining
+        assert "k1" not in remaining
+
+    def test_purge_by_owner(self, stub, client, cache):
+        client.chat_completion("Einkommen Kunde A", cache_owner="hash-a")
+        client.chat_completion("Einkommen Kunde B", cache_owner="hash-b")
+        # Treffer eines anderen Dokuments mit gleichem Inhalt: beide Owner vermerkt
+        client.chat_completions([{"prompt": "Einkommen Kunde A", "cache_owner": "hash-c"}])
+        assert len(stub.prompts) == 2
+
+        assert cache.purge("hash-c") == 1
+
+        client.chat_completion("Einkommen Kunde A", cache_owner="hash-a")
+        client.chat_completion("Einkommen Kunde B", cache_owner="hash-b")
+        assert stub.prompts == ["Einkommen Kunde A", "Einkommen Kunde B", "Einkommen Kunde A"]
+        assert cache.purge("unbekannt") == 0
+
+
+class TestBudget:
+
+    def test_requests_wait_for_window(self, stub, cache):
+        from app.services.llm_client import LLMClient, LLMBudget
+        client = LLMClient(cache=cache, budget=LLMBudget(2, 0, max_wait=5, window=0.3), max_concurrency=4)
+
+        started = time.monotonic()
+        results = client.chat_completions([{"prompt": f"p{n}"} for n in range(4)])
+
+        assert all(results)
+        assert time.monotonic() - started >= 0.3
+        assert client.metrics()["budget_waits"] >= 2
+
+    def test_exhausted_budget_returns_none(self, stub, cache):
+        from app.services.llm_client import LLMClient, LLMBudget
+        client = LLMClient(cache=cache, budget=LLMBudget(0, 100, max_wait=0.05, window=60), max_concurrency=1)
+
+        results = client.chat_completions([{"prompt": "x" * 200, "max_tokens": 50},
+                                           {"prompt": "y" * 200, "max_tokens": 50}])
+
+        assert results[0] is not None and results[1] is None
+        assert client.metrics()["budget_rejected"] == 1
+
+    def test_estimate_settled_with_reported_usage(self, stub, client):
+        from app.services.llm_client import LLMBudget
+        client.budget = LLMBudget(0, 10_000)
+
+        client.chat_completion("z" * 400, max_tokens=1000)
+
+        # Schätzung 100 + 1000, Server meldet 100 + 10
+        assert client.budget.usage() == {"requests": 1, "tokens": 110}
+
+
+def _reply_requested_fields(prompt):
+    """Stub answer: every field listed in the prompt with a dummy value"""
+    requested = [line[2:].split(":")[0] for line in prompt.splitlines()
+                 if line.startswith("- ") and "(Typ:" in line]
+    return json.dumps({"fields": [
+        {"name": name, "value": "1", "confidence": 0.9, "source_text": "Beitrag"} for name in requested
+    ]})
+
+
+class TestServicesSubmitBatches:
+
+    def test_one_prompt_per_document(self, stub, client):
+        from app.services.finanz_field_extraction_service import FinanzFieldExtractionService
+        from app.config.finanz_checklist import get_fields_for_type
+        stub.reply = _reply_requested_fields
+
+        with patch("app.services.llm_client.llm_client", client):
+            results = FinanzFieldExtractionService()._extract_llm("bu", "Beitrag 12,50 EUR", ["Beitrag 12,50 EUR"])
+
+        assert len(stub.prompts) == 1
+        assert {r["name"] for r in results} == {f["name"] for f in get_fields_for_type("bu")}
+
+        # Unverändertes Dokument erneut: aus dem Cache
+        with patch("app.services.llm_client.llm_client", client):
+            FinanzFieldExtractionService()._extract_llm("bu", "Beitrag 12,50 EUR", ["Beitrag 12,50 EUR"])
+        assert len(stub.prompts) == 1
+
+    def test_failed_document_prompt_retried_per_group(self, stub, client):
+        from app.services.finanz_field_extraction_service import FinanzFieldExtractionService
+        from app.config.finanz_checklist import get_fields_for_type
+
+        def reply(prompt):
+            priorities = {p for p in ("muss", "soll", "kann") if f"Prioritaet: {p}" in prompt}
+            return "kein json" if len(priorities) > 1 else _reply_requested_fields(prompt)
+        stub.reply = reply
+
+        with patch("app.services.llm_client.llm_client", client):
+            results = FinanzFieldExtractionService()._extract_llm("bu", "Beitrag 12,50 EUR", ["Beitrag 12,50 EUR"])
+
+        priorities = {f["priority"] for f in get_fields_for_type("bu")}
+        assert len(stub.prompts) == 1 + len(priorities)
+        assert {r["name"] for r in results} == {f["name"] for f in get_fields_for_type("bu")}
+
+    def test_failed_group_falls_back_to_patterns(self, stub, client):
+        from app.services.finanz_field_extraction_service import FinanzFieldExtractionService
+        stub.reply = lambda prompt: "kein json" if "Prioritaet: muss" in prompt else json.dumps({"fields": []})
+        text = "Versicherer: Allianz\nBeitrag: 45,00 EUR"
+
+        with patch("app.services.llm_client.llm_client", client):
+            results = FinanzFieldExtractionService()._extract_llm("bu", text, [text])
+
+        assert "gesellschaft" in {r["name"] for r in results}
+
+    def test_classification_batch(self, stub, client):
+        from app.services.finanz_classification_service import FinanzClassificationService
+        stub.reply = lambda prompt: json.dumps(
+            {"type": "bu" if "Dokument-Text:\nBerufsunfaehigkeit" in prompt else "unbekannt", "confidence": 0.8})
+
+        with patch("app.services.llm_client.llm_client", client):
+            results = FinanzClassificationService()._classify_llm_batch(
+                ["Berufsunfaehigkeitsversicherung", "Hausratversicherung Allianz"])
+
+        assert [r["type_key"] for r in results] == ["bu", "sonstige"]
+        assert len(stub.prompts) == 2
+
+    def test_classify_documents_task_batches_extracted_docs(self):
+        from app.services import finanz_tasks
+
+        classify = patch(
+            "app.services.finanz_classification_service.FinanzClassificationService.classify_documents",
+            return_value={1: {"type_key": "bu", "type_label": "BU"}, 3: {"type_key": "kfz", "type_label": "KFZ"}},
+        )
+        with classify as batch, patch.object(finanz_tasks, "_publish_status"):
+            result = finanz_tasks.classify_documents_task.apply(
+                args=([{"document_id": 1, "status": "extracted"},
+                       {"document_id": 2, "status": "error"},
+                       {"document_id": 3, "status": "extracted"}],),
+                kwargs={"document_ids": [1, 2, 3]},
+            ).get()
+
+        batch.assert_called_once_with([1, 3])
+        assert [r["document_id"] for r in result] == [1, 3]
+        assert all(r["status"] == "classified" for r in result)
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Service Layer Tests - Log Pipeline
+Tests for the queued logging pipeline, overflow policies, sampling and the
+cached StructuredFormatter fast path.
+"""
+
+import json
+import logging
+import queue
+import sys
+import pytest
+
+
+def _record(name='calendar_api', level=logging.INFO, msg='hello %s', args=('world',), **attrs):
+    record = logging.LogRecord(name, level, '/app/x.py', 42, msg, args, None, func='fn')
+    for key, value in attrs.items():
+        setattr(record, key, value)
+    return record
+
+
+def _reference_format(record):
+    """Previous StructuredFormatter.format (json.dumps on the full dict)."""
+    from datetime import datetime
+    import traceback
+    log_obj = {
+        "timestamp": datetime.utcfromtimestamp(record.created).isoformat() + "Z",
+        "level": record.levelname,
+        "logger": record.name,
+        "message": record.getMessage(),
+        "module": record.module,
+        "function": record.funcName,
+        "line": record.lineno
+    }
+    if hasattr(record, 'extra_fields'):
+        log_obj.update(record.extra_fields)
+    if record.exc_info:
+        log_obj["exception"] = {
+            "type": record.exc_info[0].__name__,
+            "message": str(record.exc_info[1]),
+            "traceback": traceback.format_exception(*record.exc_info)
+        }
+    if hasattr(record, 'duration_ms'):
+        log_obj["performance"] = {"duration_ms": record.duration_ms,
+                                  "slow_query": record.duration_ms > 1000}
+    if hasattr(record, 'request_context'):
+        log_obj["request"] = record.request_context
+    if hasattr(record, 'user_context'):
+        log_obj["user"] = record.user_context
+    return json.dumps(log_obj, ensure_ascii=False)
+
+
+class CollectingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestStructuredFormatter:
+
+    @pytest.mark.parametrize('attrs', [
+        {},
+        {'extra_fields': {'operation': 'booking', 'slot': 'Müller'}},
+        {'duration_ms': 1500.5, 'user_context': {'user_id': 'anna'}},
+        {'request_context': {'method': 'GET', 'url': '/x'}, 'extra_fields': {}},
+        # Extra field overriding a base field takes the slow path
+        {'extra_fields': {'message': 'override', 'line': 7}},
+    ])
+    def test_output_identical_to_json_dumps(self, attrs):
+        from app.utils.logging import StructuredFormatter
+        formatter = StructuredFormatter()
+        record = _record(**attrs)
+
+        assert formatter.format(record) == _reference_format(record)
+        # Second call uses the cached call-site fields
+        assert formatter.format(record) == _reference_format(record)
+
+    def test_exception_info_preserved(self):
+        from app.utils.logging import StructuredFormatter
+        try:
+            raise ValueError('kaputt')
+        except ValueError:
+            record = _record(level=logging.ERROR, exc_info=sys.exc_info())
+
+        data = json.loads(StructuredFormatter().format(record))
+        assert data['exception']['type'] == 'ValueError'
+        assert data['message'] == 'hello world'
+
+
+class TestBoundedQueueHandler:
+
+    def test_drop_new_counts_drops(self):
+        from app.utils.logging import BoundedQueueHandler
+        handler = BoundedQueueHandler(queue.Queue(2), overflow='drop_new')
+        for i in range(5):
+            handler.handle(_record(msg=f'm{i}', args=()))
+
+        stats = handler.stats()
+        assert stats['enqueued'] == 2
+        assert stats['dropped'] == 3
+        assert stats['dropped_by_level'] == {'INFO': 3}
+        assert [handler.queue.get_nowait().msg for _ in range(2)] == ['m0', 'm1']
+
+    def test_drop_old_keeps_newest(self):
+        from app.utils.logging import BoundedQueueHandler
+        handler = BoundedQueueHandler(queue.Queue(2), overflow='drop_old')
+        for i in range(5):
+            handler.handle(_record(msg=f'm{i}', args=()))
+
+        assert handler.stats()['dropped'] == 3
+        assert [handler.queue.get_nowait().msg for _ in range(2)] == ['m3', 'm4']
+
+    def test_block_gives_up_after_timeout(self):
+        from app.utils.logging import BoundedQueueHandler
+        handler = BoundedQueueHandler(queue.Queue(1), overflow='block', block_timeout=0.01)
+        handler.handle(_record())
+        handler.handle(_record())
+        assert handler.stats()['dropped'] == 1
+
+    def test_prepare_resolves_message_and_keeps_extras(self):
+        from app.utils.logging import BoundedQueueHandler
+        handler = BoundedQueueHandler(queue.Queue(), overflow='drop_new')
+        args = ['before']
+        handler.handle(_record(msg='value %s', args=(args,), extra_fields={'k': 1}))
+        args.append('after')
+
+        queued = handler.queue.get_nowait()
+        assert queued.getMessage() == "value ['before']"
+        assert queued.extra_fields == {'k': 1}
+
+    def test_invalid_policy_rejected(self):
+        from app.utils.logging import BoundedQueueHandler
+        with pytest.raises(ValueError):
+            BoundedQueueHandler(queue.Queue(), overflow='sometimes')
+
+
+class TestLogSampler:
+
+    def test_samples_info_but_never_warnings(self):
+        from app.utils.logging import LogSampler
+        sampler = LogSampler({'app.services.tracking_system': 0.25})
+
+        kept = sum(sampler.filter(_record(name='app.services.tracking_system')) for _ in range(100))
+        assert kept == 25
+        assert sampler.filter(_record(name='app.services.tracking_system', level=logging.WARNING))
+        assert sampler.stats()['app.services.tracking_system']['sampled_out'] == 75
+
+    def test_prefix_match_and_unrelated_loggers(self):
+        from app.utils.logging import LogSampler
+        sampler = LogSampler({'calendar_api': 0})
+
+        assert not sampler.filter(_record(name='calendar_api.retry'))
+        assert sampler.filter(_record(name='calendar_apix'))
+        assert sampler.filter(_record(name='booking_system'))
+
+    def test_parse_sampling(self):
+        from app.utils.logging import parse_sampling
+        assert parse_sampling('a=0.1, b.c=2, bad=x,') == {'a': 0.1, 'b.c': 1.0}
+
+
+class TestLogPipeline:
+
+    def test_stop_flushes_every_record(self):
+        from app.utils.logging import LogPipeline
+        sink = CollectingHandler()
+        pipeline = LogPipeline('test-flush', [sink], maxsize=10000)
+        logger = logging.getLogger('tests.log_pipeline.flush')
+        logger.propagate = False
+        logger.addHandler(pipeline.handler)
+        try:
+            for i in range(500):
+                logger.warning('record %d', i)
+        finally:
+            pipeline.stop()
+            logger.removeHandler(pipeline.handler)
+
+        assert len(sink.records) == 500
+        assert sink.records[-1].getMessage() == 'record 499'
+        assert pipeline.stats()['running'] is False
+
+    def test_handler_levels_respected(self):
+        from app.utils.logging import LogPipeline
+        sink = CollectingHandler()
+        sink.setLevel(logging.WARNING)
+        pipeline = LogPipeline('test-levels', [sink])
+        logger = logging.getLogger('tests.log_pipeline.levels')
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(pipeline.handler)
+        try:
+            logger.info('chatty')
+            logger.error('broken')
+        finally:
+            pipeline.stop()
+            logger.removeHandler(pipeline.handler)
+
+        assert [r.levelno for r in sink.records] == [logging.ERROR]
+        # INFO never entered the queue
+        assert pipeline.stats()['enqueued'] == 1
+
+    def test_queued_handlers_reuses_pipeline(self):
+        from app.utils import logging as log_module
+        first = log_module.queued_handlers('test-reuse', CollectingHandler())
+        second_sink = CollectingHandler()
+        second = log_module.queued_handlers('test-reuse', second_sink)
+        try:
+            assert first == second
+            second[0].handle(_record(level=logging.WARNING))
+        finally:
+            log_module._pipelines.pop('test-reuse').stop()
+
+        assert len(second_sink.records) == 1
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+Tests fuer das Lootbox-System (app/services/lootbox_service.py).
+
+Beide Backends (SQLite als PG-Stand-in, JSON-Shards) laufen mit denselben Tests:
+- Kauf mit Abbuchung, Oeffnen mit Belohnung in einer Operation
+- Parallele Oeffnungen aus mehreren Threads ohne verlorene Updates
+- Append-only History mit Pagination
+- Uebernahme der Legacy-Daten (lootboxes.json / lootbox_data.history)
+"""
+
+import json
+import threading
+import pytest
+from contextlib import contextmanager
+from unittest.mock import patch
+
+USER = "anna.schmidt"
+
+
+@pytest.fixture
+def stores(tmp_path):
+    """PERSIST_BASE, Coins-, Scores-, Kosmetik- und Inventar-Dateien der JSON-Stores im tmp_path"""
+    from app.services.daily_quests import daily_quest_system
+    from app.services.data_persistence import data_persistence
+    from app.services.cosmetics_shop import cosmetics_shop
+    from app.services.gameplay_rewards import gameplay_rewards
+
+    persist_dir = tmp_path / "persistent"
+    persist_dir.mkdir()
+    coins_file = tmp_path / "user_coins.json"
+    coins_file.write_text(json.dumps({USER: 1000}), encoding="utf-8")
+    with patch.dict("os.environ", {"PERSIST_BASE": str(tmp_path)}), \
+            patch.object(daily_quest_system, "coins_file", str(coins_file)), \
+            patch.object(data_persistence, "data_dir", tmp_path), \
+            patch.object(data_persistence, "static_dir", tmp_path / "static"), \
+            patch.object(cosmetics_shop, "purchases_file", str(persist_dir / "cosmetic_purchases.json")), \
+            patch.object(cosmetics_shop, "active_cosmetics_file", str(persist_dir / "active_cosmetics.json")), \
+            patch.object(gameplay_rewards, "inventory_file", str(persist_dir / "user_inventory.json")), \
+            patch("app.services.cosmetics_shop.USE_POSTGRES", False), \
+            patch("app.services.data_persistence.USE_POSTGRES", False), \
+            patch("app.services.daily_quests.USE_POSTGRES", False):
+        yield tmp_path
+
+
+@pytest.fixture
+def engine(tmp_path):
+    from sqlalchemy import create_engine
+    from app.models.base import Base
+    from app.models import LootboxData, LootboxHistory, Score, User, UserCosmetic
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'lootbox.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(engine, tables=[
+        LootboxData.__table__, LootboxHistory.__table__, Score.__table__,
+        User.__table__, UserCosmetic.__table__,
+    ])
+    return engine
+
+
+@pytest.fixture(params=["postgres", "json"])
+def backend(request, stores):
+    if request.param == "json":
+        with patch("app.services.lootbox_service.USE_POSTGRES", False):
+            yield {"name": "json"}
+        return
+
+    from sqlalchemy.orm import sessionmaker
+    from app.models import User
+    engine = request.getfixturevalue("engine")
+    Session = sessionmaker(bind=engine)
+    with Session() as s:
+        s.add(User(username=USER, total_coins=1000))
+        s.commit()
+
+    @contextmanager
+    def scope(commit=True):
+        s = Session()
+        try:
+            yield s
+            if commit:
+                s.commit()
+        except Exception:
+            s.rollback()
+            raise
+        finally:
+            s.close()
+
+    with patch("app.services.lootbox_service.USE_POSTGRES", True), \
+            patch("app.services.lootbox_service.POSTGRES_AVAILABLE", True), \
+            patch("app.services.lootbox_service.db_session_scope", scope), \
+            patch("app.services.lootbox_service.db_session_scope_no_commit", lambda: scope(False)):
+        yield {"name": "postgres", "Session": Session}
+
+
+@pytest.fixture
+def service(stores):
+    from app.services.lootbox_service import LootboxService
+    return LootboxService()
+
+
+def coins_of(backend, stores):
+    if backend["name"] == "postgres":
+        from app.models import User
+        with backend["Session"]() as s:
+            return s.query(User.total_coins).filter_by(username=USER).scalar()
+    return json.loads((stores / "user_coins.json").read_text(encoding="utf-8"))[USER]
+
+
+def fixed_reward(reward):
+    return patch("app.services.lootbox_service.LootboxService._roll_loot", return_value=reward)
+
+
+class TestPurchaseAndOpen:
+
+    def test_purchase_charges_coins(self, backend, service, stores):
+        result = service.purchase_crate(USER, "rare", charge=True)
+
+        assert result["success"] and result["remaining_coins"] == 700
+        assert coins_of(backend, stores) == 700
+        assert [c["id"] for c in service.get_unopened_crates(USER)] == [result["crate_id"]]
+
+    def test_insufficient_coins_buys_nothing(self, backend, service, stores):
+        result = service.purchase_crate(USER, "legendary", charge=True)
+
+        assert not result["success"]
+        assert result["message"] == "Nicht genug Coins! Benötigt: 1500, Verfügbar: 1000"
+        assert coins_of(backend, stores) == 1000
+        assert service.get_unopened_crates(USER) == []
+
+    def test_open_grants_coins_and_records_history(self, backend, service, stores):
+        crate_id = service.purchase_crate(USER, "common")["crate_id"]
+
+        with fixed_reward({"type": "coins", "amount": 42, "display": "42 Coins"}):
+            result = service.open_crate(USER, crate_id)
+
+        assert result["success"] and result["applied"] == {"type": "coins", "amount": 42}
+        assert coins_of(backend, stores) == 1042
+        assert service.get_unopened_crates(USER) == []
+        history = service.get_loot_history(USER)
+        assert [h["crate_id"] for h in history] == [crate_id]
+        assert history[0]["reward"]["amount"] == 42
+        assert not service.open_crate(USER, crate_id)["success"]
+
+    def test_open_grants_xp_and_cosmetic(self, backend, service, stores):
+        crates = [service.purchase_crate(USER, "epic")["crate_id"] for _ in range(2)]
+
+        with fixed_reward({"type": "xp", "amount": 120, "display": "120 XP"}):
+            service.open_crate(USER, crates[0])
+        cosmetic = {"type": "cosmetic", "rarity": "epic", "item_id": "frame_fire", "item_type": "frame",
+                    "item_name": "Feuer", "display": "Feuer (epic)"}
+        with fixed_reward(cosmetic):
+            service.open_crate(USER, crates[1])
+
+        if backend["name"] == "postgres":
+            from app.models import Score, UserCosmetic
+            with backend["Session"]() as s:
+                assert s.query(Score.points).filter_by(username=USER).scalar() == 12
+                owned = s.query(UserCosmetic).filter_by(username=USER, item_id="frame_fire").one()
+                assert owned.is_owned and owned.name == "Feuer"
+        else:
+            scores = json.loads((stores / "scores.json").read_text(encoding="utf-8"))
+            assert list(scores[USER].values()) == [12]
+            purchases = json.loads((stores / "persistent" / "cosmetic_purchases.json").read_text(encoding="utf-8"))
+            assert purchases[USER]["frames"] == ["frame_fire"]
+
+    def test_failed_reward_rolls_back_open(self, backend, service, stores):
+        crate_id = service.purchase_crate(USER, "common")["crate_id"]
+
+        with fixed_reward({"type": "xp", "amount": 50, "display": "50 XP"}), \
+                patch("app.services.lootbox_service._PgLedger.add_points", side_effect=RuntimeError("db")), \
+                patch("app.services.lootbox_service._JsonLedger.add_points", side_effect=IOError("disk")):
+            result = service.open_crate(USER, crate_id)
+
+        assert not result["success"]
+        assert [c["id"] for c in service.get_unopened_crates(USER)] == [crate_id]
+        assert service.get_loot_history(USER) == []
+
+
+class TestConcurrency:
+
+    def test_parallel_opens_lose_no_updates(self, backend, service, stores):
+        crates = [service.purchase_crate(USER, "common", charge=True)["crate_id"] for _ in range(8)]
+        results = []
+        barrier = threading.Barrier(16)
+
+        def worker(crate_id):
+            barrier.wait()
+            results.append(service.open_crate(USER, crate_id))
+
+        # Jede Kiste wird von zwei Threads gleichzeitig geöffnet
+        threads = [threading.Thread(target=worker, args=(c,)) for c in crates * 2]
+        with fixed_reward({"type": "coins", "amount": 25, "display": "25 Coins"}):
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        assert sum(1 for r in results if r["success"]) == 8
+        assert coins_of(backend, stores) == 1000 - 8 * 100 + 8 * 25
+        assert service.get_unopened_crates(USER) == []
+        assert sorted(h["crate_id"] for h in service.get_loot_history(USER, limit=50)) == sorted(crates)
+
+    def test_parallel_purchases_respect_balance(self, backend, service, stores):
+        results = []
+        barrier = threading.Barrier(6)
+
+        def worker():
+            barrier.wait()
+            results.append(service.purchase_crate(USER, "rare", charge=True))
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sum(1 for r in results if r["success"]) == 3
+        assert coins_of(backend, stores) == 100
+        assert len(service.get_unopened_crates(USER)) == 3
+
+
+class TestHistory:
+
+    def test_pagination_newest_first(self, backend, service):
+        crates = [service.purchase_crate(USER, "common")["crate_id"] for _ in range(7)]
+        with fixed_reward({"type": "coins", "amount": 10, "display": "10 Coins"}):
+            for crate_id in crates:
+                service.open_crate(USER, crate_id)
+
+        newest_first = list(reversed(crates))
+        assert [h["crate_id"] for h in service.get_loot_history(USER, limit=3)] == newest_first[:3]
+        assert [h["crate_id"] for h in service.get_loot_history(USER, limit=3, offset=3)] == newest_first[3:6]
+        assert [h["crate_id"] for h in service.get_loot_history(USER, limit=3, offset=6)] == newest_first[6:]
+        assert service.get_loot_history(USER, limit=3, offset=9) == []
+
+    def test_history_is_not_truncated(self, backend, service):
+        crates = [service.purchase_crate(USER, "common")["crate_id"] for _ in range(55)]
+        with fixed_reward({"type": "coins", "amount": 10, "display": "10 Coins"}):
+            for crate_id in crates:
+                service.open_crate(USER, crate_id)
+
+        assert len(service.get_loot_history(USER, limit=100)) == 55
+
+
+class TestLegacyData:
+
+    LEGACY_ENTRY = {"crate_id": "old00001", "crate_type": "rare", "opened_at": "2026-03-01T10:00:00+01:00",
+                    "reward": {"type": "coins", "amount": 30, "display": "30 Coins"}}
+
+    def test_json_shard_is_seeded_from_lootboxes_json(self, stores, service):
+        (stores / "persistent" / "lootboxes.json").write_text(json.dumps({USER: {
+            "crates": [{"id": "keep0001", "type": "epic", "opened": False}],
+            "history": [self.LEGACY_ENTRY],
+            "pity_counter": 4,
+        }}), encoding="utf-8")
+
+        with patch("app.services.lootbox_service.USE_POSTGRES", False):
+            assert [c["id"] for c in service.get_unopened_crates(USER)] == ["keep0001"]
+            assert service.get_loot_history(USER) == [self.LEGACY_ENTRY]
+
+            new_id = service.purchase_crate(USER, "common")["crate_id"]
+            with fixed_reward({"type": "coins", "amount": 10, "display": "10 Coins"}):
+                service.open_crate(USER, new_id)
+
+            assert [h["crate_id"] for h in service.get_loot_history(USER)] == [new_id, "old00001"]
+            shard = json.loads((stores / "persistent" / "lootboxes" / f"{USER}.json").read_text(encoding="utf-8"))
+            assert shard["pity_counter"] == 5
+            assert [c["id"] for c in shard["crates"]] == ["keep0001"]
+
+    def test_pg_history_column_moves_to_table(self, stores, service, engine):
+        from sqlalchemy.orm import sessionmaker
+        from app.models import LootboxData
+        Session = sessionmaker(bind=engine)
+        with Session() as s:
+            s.add(LootboxData(username=USER, crates=[], history=[self.LEGACY_ENTRY], pity_counter=0))
+            s.commit()
+
+        @contextmanager
+        def scope():
+            s = Session()
+            try:
+                yield s
+                s.commit()
+            finally:
+                s.close()
+
+        with patch("app.services.lootbox_service.USE_POSTGRES", True), \
+                patch("app.services.lootbox_service.POSTGRES_AVAILABLE", True), \
+                patch("app.services.lootbox_service.db_session_scope", scope), \
+                patch("app.services.lootbox_service.db_session_scope_no_commit", scope):
+            service.purchase_crate(USER, "common")
+            assert service.get_loot_history(USER) == [self.LEGACY_ENTRY]
+
+        with Session() as s:
+            assert s.query(LootboxData.history).filter_by(username=USER).scalar() is None
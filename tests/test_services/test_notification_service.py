@@ -538,3 +538,216 @@ class TestPostgresIntegration:
 
                             # Should return PG count when PG is available
                             assert count == 2
+
+
+# ========== APPEND-LOG (EINZEL-NOTIFICATIONS) ==========
+
+@pytest.fixture
+def json_store(tmp_path):
+    """Real JSON persistence in tmp_path, PG disabled"""
+    import app.services.notification_service as svc_module
+    persistence = MagicMock()
+    persistence.data_dir = tmp_path
+    store = {}
+    persistence.load_data.side_effect = lambda name, default: {k: list(v) for k, v in store.items()}
+    persistence.save_data.side_effect = lambda name, data: store.update(data) or True
+
+    with patch.object(svc_module, 'data_persistence', persistence), \
+            patch.object(svc_module, 'USE_POSTGRES', False):
+        yield store
+
+
+class TestNotifyUser:
+    """notify_user/notify_users append instead of rewriting the whole store"""
+
+    def test_notify_user_does_not_touch_store(self, notification_service, json_store):
+        with patch.object(notification_service, '_load_all_notifications', side_effect=AssertionError), \
+                patch.object(notification_service, '_save_all_notifications', side_effect=AssertionError):
+            notif = notification_service.notify_user(
+                'test.user', 'Level Up!', 'Level 5', notification_type='success', show_popup=True,
+                actions=[{'text': 'Profil', 'url': '/slots/profile'}])
+
+        assert notif['title'] == 'Level Up!'
+        assert notif['show_popup'] is True
+        assert notif['actions'] == [{'text': 'Profil', 'url': '/slots/profile'}]
+        assert json_store == {}
+
+    def test_appended_notification_visible_in_json_fallback(self, notification_service, json_store):
+        json_store['test.user'] = [{'id': 'old', 'title': 'Alt', 'read': False, 'dismissed': False}]
+        notif = notification_service.notify_user('test.user', 'Neu', 'Badge')
+
+        titles = [n['title'] for n in notification_service.get_user_notifications('test.user')]
+        assert set(titles) == {'Alt', 'Neu'}
+        assert notification_service.get_unread_count('test.user') == 2
+        assert notification_service.dismiss_notification('test.user', notif['id'])
+
+    def test_full_save_compacts_append_log(self, notification_service, json_store, tmp_path):
+        notification_service.notify_user('test.user', 'Neu', 'Badge')
+        log = tmp_path / 'notifications' / 'test.user.jsonl'
+        assert log.exists()
+
+        notification_service._save_all_notifications(notification_service._load_all_notifications())
+
+        assert not log.exists()
+        assert [n['title'] for n in json_store['test.user']] == ['Neu']
+        # No duplicates after compaction
+        assert len(notification_service._load_all_notifications()['test.user']) == 1
+
+    def test_notify_users_single_pg_transaction(self, notification_service, json_store):
+        import app.services.notification_service as svc_module
+
+        mock_session = MagicMock()
+        mock_session.__enter__ = MagicMock(return_value=mock_session)
+        mock_session.__exit__ = MagicMock(return_value=False)
+
+        with patch.object(svc_module, 'USE_POSTGRES', True), \
+                patch.object(svc_module, 'POSTGRES_AVAILABLE', True), \
+                patch.object(svc_module, 'NotificationModel', MagicMock(), create=True), \
+                patch.object(svc_module, 'db_session_scope', return_value=mock_session) as scope:
+            created = notification_service.notify_users([
+                {'username': 'a.user', 'title': 'Badge 1', 'message': 'x'},
+                {'username': 'a.user', 'title': 'Badge 2', 'message': 'y'},
+                {'username': 'b.user', 'title': 'Badge 3', 'message': 'z'},
+            ])
+
+        assert [n['title'] for n in created] == ['Badge 1', 'Badge 2', 'Badge 3']
+        assert scope.call_count == 1
+        assert len(mock_session.add_all.call_args[0][0]) == 3
+
+    def test_badge_burst_sends_one_batch(self):
+        """Several badges in one check -> one notify_users call, no store rewrite"""
+        import threading
+        import app.services.achievement_system as ach_module
+        from app.services.notification_service import notification_service as service
+
+        system = ach_module.AchievementSystem.__new__(ach_module.AchievementSystem)
+        system._local = threading.local()
+        definition = {'name': 'Badge', 'description': 'd', 'emoji': '*',
+                      'rarity': 'common', 'category': 'c'}
+        badges_data = {}
+
+        with patch.object(ach_module, 'USE_POSTGRES', False), \
+                patch.object(service, 'notify_users') as notify_users, \
+                patch.object(service, '_load_all_notifications', side_effect=AssertionError):
+            with system.batched_notifications():
+                for badge_id in ('b1', 'b2', 'b3'):
+                    system.award_badge('test.user', badge_id, definition, badges_data)
+                assert notify_users.call_count == 0
+
+        assert notify_users.call_count == 1
+        assert len(notify_users.call_args[0][0]) == 3
+        assert badges_data['test.user']['total_badges'] == 3
+
+
+# ========== UNREAD-ZÄHLER / VERSIONSSTEMPEL ==========
+
+class TestNotificationState:
+    """Cached unread counters and version stamps for polling"""
+
+    def test_unread_count_cached_until_change(self, notification_service, json_store):
+        notification_service.notify_user('test.user', 'A', 'a')
+
+        with patch.object(notification_service, '_count_unread', wraps=notification_service._count_unread) as count:
+            assert notification_service.get_unread_count('test.user') == 1
+            assert notification_service.get_unread_count('test.user') == 1
+            assert count.call_count == 1
+
+            # Create maintains the cached counter without recounting
+            notification_service.notify_user('test.user', 'B', 'b')
+            assert notification_service.get_unread_count('test.user') == 2
+            assert count.call_count == 1
+
+            notification_service.mark_all_as_read('test.user')
+            assert notification_service.get_unread_count('test.user') == 0
+            assert count.call_count == 1
+
+    def test_version_changes_on_every_write(self, notification_service, json_store):
+        versions = [notification_service.get_notification_version('test.user')]
+        notif = notification_service.notify_user('test.user', 'A', 'a')
+        versions.append(notification_service.get_notification_version('test.user'))
+        notification_service.mark_as_read('test.user', notif['id'])
+        versions.append(notification_service.get_notification_version('test.user'))
+        notification_service.dismiss_notification('test.user', notif['id'])
+        versions.append(notification_service.get_notification_version('test.user'))
+        notification_service.create_notification(['admin'], 'Broadcast', 'x')
+        versions.append(notification_service.get_notification_version('alexander.nehm'))
+
+        assert len(set(versions[:4])) == 4
+        assert notification_service.get_notification_version('test.user') == versions[3]
+
+    def test_mark_as_read_recounts_once(self, notification_service, json_store):
+        notif = notification_service.notify_user('test.user', 'A', 'a')
+        assert notification_service.get_unread_count('test.user') == 1
+
+        notification_service.mark_as_read('test.user', notif['id'])
+        assert notification_service.get_unread_count('test.user') == 0
+
+    def test_stale_count_not_cached_after_change(self, notification_service):
+        state = notification_service.state
+        version, _ = state.get('test.user')
+        state.changed('test.user')
+        # Count computed against the old version must be discarded
+        state.set_unread('test.user', version, 5)
+        assert state.get('test.user')[1] is None
+
+    def test_local_state_expires(self):
+        from app.services.notification_service import NotificationState
+        state = NotificationState(local_ttl=0)
+        first, _ = state.get('test.user')
+        assert state.get('test.user')[0] != first
+
+
+class TestConditionalPolling:
+    """ETag/304 on the polled hub endpoints"""
+
+    @pytest.fixture
+    def client(self, json_store):
+        from flask import Flask
+        from app.routes.hub import hub_bp
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        app.register_blueprint(hub_bp)
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user'] = 'test.user'
+        return client
+
+    def test_unchanged_poll_returns_304_without_work(self, client):
+        from app.services.notification_service import notification_service as service
+        first = client.get('/api/notifications/popup')
+        assert first.status_code == 200
+        assert first.headers['Cache-Control'] == 'private, no-cache'
+        etag = first.headers['ETag']
+
+        with patch.object(service, 'get_user_notifications', side_effect=AssertionError), \
+                patch.object(service, '_load_all_notifications', side_effect=AssertionError):
+            second = client.get('/api/notifications/popup', headers={'If-None-Match': etag})
+        assert second.status_code == 304
+        assert second.headers['ETag'] == etag
+
+    def test_new_notification_changes_etag(self, client):
+        from app.services.notification_service import notification_service as service
+        etag = client.get('/api/dashboard-stats').headers['ETag']
+
+        service.notify_user('test.user', 'Neu', 'x', show_popup=True)
+        response = client.get('/api/dashboard-stats', headers={'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert response.get_json()['unread_notifications'] >= 1
+
+    def test_changed_live_stats_change_etag(self, client):
+        stats = {'timestamp': 't1', 'active_users': 12}
+        with patch('app.routes.hub.get_live_stats', side_effect=lambda user: dict(stats)):
+            etag = client.get('/api/dashboard-stats').headers['ETag']
+
+            # Nur der Zeitstempel neu: weiterhin 304
+            stats['timestamp'] = 't2'
+            assert client.get('/api/dashboard-stats', headers={'If-None-Match': etag}).status_code == 304
+
+            stats['active_users'] = 13
+            response = client.get('/api/dashboard-stats', headers={'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert response.get_json()['active_users'] == 13
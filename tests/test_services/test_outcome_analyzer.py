@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Service Layer Tests - Outcome Analyzer
+Tests for the paginated, range-based outcome engine.
+"""
+
+import json
+import pytest
+from datetime import date
+from unittest.mock import patch, MagicMock, Mock
+
+
+@pytest.fixture(scope='module', autouse=True)
+def mock_google_credentials():
+    """Mock Google credentials to prevent loading during module import"""
+    with patch('app.utils.credentials.load_google_credentials', return_value=Mock()):
+        yield
+
+
+def _event(day, hour, summary, color='2', organizer='anna@example.com'):
+    return {
+        'summary': summary,
+        'colorId': color,
+        'start': {'dateTime': f'{day}T{hour:02d}:00:00+01:00'},
+        'organizer': {'email': organizer},
+    }
+
+
+def _paged_service(pages):
+    """Calendar service mock returning the given pages via nextPageToken."""
+    service = MagicMock()
+    calls = []
+
+    def list_events(**params):
+        calls.append(params)
+        index = int(params.get('pageToken', 0))
+        page = {'items': pages[index]}
+        if index + 1 < len(pages):
+            page['nextPageToken'] = str(index + 1)
+        request = MagicMock()
+        request.execute.return_value = page
+        return request
+
+    service.events.return_value.list.side_effect = list_events
+    return service, calls
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    t = MagicMock()
+    t.outcomes_file = str(tmp_path / 'outcomes.jsonl')
+    t.metrics_file = str(tmp_path / 'daily_metrics.json')
+    t.persistent_metrics_file = str(tmp_path / 'tracking_metrics.json')
+    return t
+
+
+@pytest.fixture
+def no_side_effects():
+    with patch('app.services.tracking_system.outcome_analyzer.is_postgres_enabled', return_value=False), \
+         patch('app.services.tracking_system.outcome_analyzer._update_customer_profiles'), \
+         patch('app.services.tracking_system.outcome_analyzer._queue_hubspot_outcome'), \
+         patch('app.services.tracking_system.outcome_analyzer.invalidate_analytics_kpis'), \
+         patch('app.services.tracking_system.outcome_analyzer.consultant_config') as cc:
+        cc.get_consultants.return_value = {'Anna': 'Anna@example.com'}
+        yield cc
+
+
+class TestCheckOutcomesRange:
+
+    def test_paginates_and_groups_by_day(self, tracker, no_side_effects):
+        from app.services.tracking_system.outcome_analyzer import check_outcomes_range
+        pages = [
+            [_event('2026-03-02', 9 + i % 8, f'Kunde {i}') for i in range(150)],
+            [_event('2026-03-03', 10, 'Kunde X'), _event('2026-03-03', 11, '123')],
+        ]
+        tracker.service, calls = _paged_service(pages)
+
+        result = check_outcomes_range(tracker, '2026-03-02', '2026-03-04')
+
+        assert len(calls) == 2
+        assert calls[1]['pageToken'] == '1'
+        assert result['days'] == 3
+        assert result['outcomes_tracked'] == 151
+        assert result['days_per_second'] > 0
+
+        with open(tracker.metrics_file) as f:
+            metrics = json.load(f)
+        assert metrics['2026-03-02']['total_slots'] == 150
+        assert metrics['2026-03-03']['total_slots'] == 1  # placeholder skipped
+        assert metrics['2026-03-04']['total_slots'] == 0
+
+        with open(tracker.outcomes_file) as f:
+            lines = [json.loads(line) for line in f]
+        assert len(lines) == 151
+        assert {line['consultant'] for line in lines} == {'Anna'}
+
+    def test_failing_day_does_not_abort_range(self, tracker, no_side_effects):
+        from app.services.tracking_system import outcome_analyzer
+        tracker.service, _ = _paged_service([
+            [_event('2026-03-02', 9, 'Kunde A'), _event('2026-03-03', 9, 'Kunde B'),
+             _event('2026-03-04', 9, 'Kunde C')]
+        ])
+        classify_day = outcome_analyzer._classify_day
+
+        def flaky(day, *args):
+            if str(day) == '2026-03-03':
+                raise ValueError('kaputtes Event')
+            return classify_day(day, *args)
+
+        with patch.object(outcome_analyzer, '_classify_day', side_effect=flaky):
+            result = outcome_analyzer.check_outcomes_range(tracker, '2026-03-02', '2026-03-04')
+
+        assert result['outcomes_tracked'] == 2
+        assert result['failed_days'] == [{'date': '2026-03-03', 'error': 'kaputtes Event'}]
+        with open(tracker.metrics_file) as f:
+            assert sorted(json.load(f)) == ['2026-03-02', '2026-03-04']
+
+    def test_consultants_loaded_once(self, tracker, no_side_effects):
+        from app.services.tracking_system.outcome_analyzer import check_outcomes_range
+        tracker.service, _ = _paged_service([
+            [_event('2026-03-02', h, f'Kunde {h}') for h in range(9, 18)]
+        ])
+
+        check_outcomes_range(tracker, date(2026, 3, 2), date(2026, 3, 2))
+
+        assert no_side_effects.get_consultants.call_count == 1
+
+    def test_booked_by_fallback(self, tracker, no_side_effects):
+        from app.services.tracking_system.outcome_analyzer import check_outcomes_range
+        event = _event('2026-03-02', 9, 'Kunde', organizer='calendar@example.com')
+        event['description'] = 'Notiz [Booked by: tim.kreisel]'
+        tracker.service, _ = _paged_service([[event]])
+
+        check_outcomes_range(tracker, '2026-03-02', '2026-03-02')
+
+        with open(tracker.outcomes_file) as f:
+            outcome = json.loads(f.readline())
+        assert outcome['consultant'] == 'Tim'
+        assert outcome['consultant_email'] is None
+
+    def test_bulk_pg_upsert(self, tracker, no_side_effects, db_session):
+        from contextlib import contextmanager
+        from app.models.booking import BookingOutcome
+        from app.models.tracking import DailyMetrics
+        from app.services.tracking_system.outcome_analyzer import check_outcomes_range
+
+        @contextmanager
+        def scope():
+            yield db_session
+            db_session.flush()
+
+        tracker.service, _ = _paged_service([
+            [_event('2026-03-02', 9, 'Kunde A'), _event('2026-03-03', 9, 'Kunde B')]
+        ])
+
+        with patch('app.services.tracking_system.outcome_analyzer.is_postgres_enabled', return_value=True), \
+             patch('app.utils.db_utils.db_session_scope', scope):
+            check_outcomes_range(tracker, '2026-03-02', '2026-03-03')
+            # Second run updates instead of duplicating
+            check_outcomes_range(tracker, '2026-03-02', '2026-03-03')
+
+        assert db_session.query(BookingOutcome).count() == 2
+        assert db_session.query(DailyMetrics).count() == 2
+
+
+class TestCheckDailyOutcomes:
+
+    def test_single_day_returns_count(self, tracker, no_side_effects):
+        from app.services.tracking_system.outcome_analyzer import check_daily_outcomes
+        tracker.service, _ = _paged_service([
+            [_event('2026-03-02', 9 + i % 8, f'Kunde {i}') for i in range(120)]
+        ])
+
+        assert check_daily_outcomes(tracker, '2026-03-02') == 120
+
+    def test_returns_zero_on_api_error(self, tracker, no_side_effects):
+        from app.services.tracking_system.outcome_analyzer import check_daily_outcomes
+        tracker.service.events.return_value.list.side_effect = Exception('API down')
+
+        assert check_daily_outcomes(tracker, '2026-03-02') == 0
@@ -5,7 +5,7 @@ Tests fuer PG-Migration Block 4 — Cosmetics + Avatar + Lootbox Dual-Write
 Testet:
 - CosmeticsShop.load_purchases: PG-first read
 - CosmeticsShop.save_purchases: Dual-Write
-- LootboxService._load_data / _save_data: PG Dual-Write
+- LootboxService: PG-first Reads pro User, JSON-Shard-Fallback
 - AvatarService._load_avatars: PG-first read
 """
 
@@ -35,6 +35,7 @@ def _make_lootbox():
     """Return a LootboxService instance without touching real files."""
     svc = LootboxService.__new__(LootboxService)
     svc.lootbox_file = "fake/lootboxes.json"
+    svc.shard_dir = "fake/lootboxes"
     return svc
 
 
@@ -176,86 +177,64 @@ class TestCosmeticsShopSavePurchases:
 
 
 # ---------------------------------------------------------------------------
-# LootboxService — _load_data / _save_data (PG Dual-Write)
+# LootboxService — per-user reads (PG-first, JSON-Shard-Fallback)
 # ---------------------------------------------------------------------------
 
 class TestLootboxServicePG:
-    """Tests fuer LootboxService PG Dual-Write."""
+    """Tests fuer LootboxService PG-first Reads."""
 
-    def test_load_data_returns_pg_data(self):
-        """_load_data liest aus PG wenn verfuegbar."""
+    def test_unopened_crates_from_pg(self):
+        """get_unopened_crates liest die Zeile des Users aus PG."""
         svc = _make_lootbox()
 
-        mock_row = MagicMock()
-        mock_row.username = "eve"
-        mock_row.crates = [{"id": "abc123", "type": "common"}]
-        mock_row.history = []
-        mock_row.pity_counter = 3
-
         mock_session = MagicMock()
-        mock_session.query.return_value.all.return_value = [mock_row]
+        mock_session.query.return_value.filter_by.return_value.scalar.return_value = [
+            {"id": "abc123", "type": "common"},
+            {"id": "old999", "type": "rare", "opened": True},
+        ]
 
         with patch('app.services.lootbox_service.USE_POSTGRES', True), \
              patch('app.services.lootbox_service.POSTGRES_AVAILABLE', True), \
-             patch('app.services.lootbox_service.db_session_scope', return_value=_make_ctx(mock_session)):
-            result = svc._load_data()
+             patch('app.services.lootbox_service.db_session_scope_no_commit', return_value=_make_ctx(mock_session)):
+            result = svc.get_unopened_crates("eve")
 
-        assert "eve" in result
-        assert result["eve"]["pity_counter"] == 3
-        assert len(result["eve"]["crates"]) == 1
+        assert [c["id"] for c in result] == ["abc123"]
+        mock_session.query.return_value.filter_by.assert_called_once_with(username="eve")
 
-    def test_load_data_json_fallback_on_pg_error(self):
-        """_load_data faellt auf JSON zurueck wenn PG fehlschlaegt."""
+    def test_unopened_crates_shard_fallback_on_pg_error(self):
+        """get_unopened_crates faellt auf den JSON-Shard zurueck wenn PG fehlschlaegt."""
         svc = _make_lootbox()
 
         with patch('app.services.lootbox_service.USE_POSTGRES', True), \
              patch('app.services.lootbox_service.POSTGRES_AVAILABLE', True), \
-             patch('app.services.lootbox_service.db_session_scope', return_value=_make_error_ctx()), \
+             patch('app.services.lootbox_service.db_session_scope_no_commit', return_value=_make_error_ctx()), \
              patch('app.services.lootbox_service.atomic_read_json',
-                   return_value={"frank": {"crates": [], "history": [], "pity_counter": 0}}):
-            result = svc._load_data()
+                   return_value={"crates": [{"id": "f1", "type": "epic"}], "pity_counter": 0}) as read:
+            result = svc.get_unopened_crates("frank")
 
-        assert "frank" in result
+        assert [c["id"] for c in result] == ["f1"]
+        read.assert_called_once_with("fake/lootboxes/frank.json")
 
-    def test_save_data_upserts_to_pg_and_json(self):
-        """_save_data schreibt nach PG (upsert) und JSON."""
+    def test_history_page_from_pg(self):
+        """get_loot_history fragt eine Seite ab statt der ganzen History."""
+        from datetime import datetime
         svc = _make_lootbox()
 
-        data = {"grace": {"crates": [], "history": [], "pity_counter": 5}}
-
+        row = MagicMock(crate_id="c1", crate_type="rare", reward={"type": "xp", "amount": 50},
+                        opened_at=datetime(2026, 3, 1, 10, 0))
         mock_session = MagicMock()
-        mock_session.query.return_value.filter_by.return_value.first.return_value = None
+        query = mock_session.query.return_value.filter.return_value.order_by.return_value
+        query.offset.return_value.limit.return_value.all.return_value = [row]
 
-        mock_write = MagicMock()
         with patch('app.services.lootbox_service.USE_POSTGRES', True), \
              patch('app.services.lootbox_service.POSTGRES_AVAILABLE', True), \
-             patch('app.services.lootbox_service.db_session_scope', return_value=_make_ctx(mock_session)), \
-             patch('app.services.lootbox_service.atomic_write_json', mock_write):
-            svc._save_data(data)
+             patch('app.services.lootbox_service.db_session_scope_no_commit', return_value=_make_ctx(mock_session)):
+            result = svc.get_loot_history("grace", limit=10, offset=20)
 
-        assert mock_session.add.called
-        mock_write.assert_called_once()
-
-    def test_save_data_updates_existing_pg_row(self):
-        """_save_data aktualisiert bestehende PG-Zeile (kein add)."""
-        svc = _make_lootbox()
-
-        data = {"henry": {"crates": [{"id": "xyz"}], "history": [], "pity_counter": 2}}
-
-        existing_row = MagicMock()
-        mock_session = MagicMock()
-        mock_session.query.return_value.filter_by.return_value.first.return_value = existing_row
-
-        with patch('app.services.lootbox_service.USE_POSTGRES', True), \
-             patch('app.services.lootbox_service.POSTGRES_AVAILABLE', True), \
-             patch('app.services.lootbox_service.db_session_scope', return_value=_make_ctx(mock_session)), \
-             patch('app.services.lootbox_service.atomic_write_json', MagicMock()):
-            svc._save_data(data)
-
-        assert existing_row.crates == [{"id": "xyz"}]
-        assert existing_row.pity_counter == 2
-        # No new row inserted
-        assert not mock_session.add.called
+        query.offset.assert_called_once_with(20)
+        query.offset.return_value.limit.assert_called_once_with(10)
+        assert result == [{"crate_id": "c1", "crate_type": "rare", "reward": {"type": "xp", "amount": 50},
+                           "opened_at": "2026-03-01T10:00:00+01:00"}]
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Service Layer Tests - Request Metrics
+Tests for per-request latency histograms and SQL/API/JSON call accounting.
+"""
+
+import json
+import os
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+
+@pytest.fixture(autouse=True)
+def no_active_request():
+    """Tests share one thread; never leak request stats into the next test."""
+    from app.utils.request_metrics import _current
+    token = _current.set(None)
+    yield
+    _current.reset(token)
+
+
+@pytest.fixture
+def metrics(tmp_path):
+    from app.utils.request_metrics import RequestMetrics
+    return RequestMetrics(metrics_dir=str(tmp_path), sync_interval=3600)
+
+
+@pytest.fixture
+def app(metrics):
+    engine = create_engine("sqlite://")
+    app = Flask(__name__)
+    metrics.init_app(app)
+
+    @app.route('/query')
+    def query():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        return 'ok'
+
+    @app.route('/json/<path:name>')
+    def json_io(name):
+        from app.utils.json_utils import atomic_read_json, atomic_write_json
+        path = os.path.join(metrics.metrics_dir, 'data', name)
+        atomic_write_json(path, {'a': 1})
+        atomic_read_json(path)
+        return 'ok'
+
+    @app.route('/missing')
+    def missing():
+        return 'nope', 404
+
+    return app
+
+
+class TestRequestAccounting:
+
+    def test_sql_statements_counted_per_endpoint(self, app, metrics):
+        client = app.test_client()
+        client.get('/query')
+        client.get('/query')
+
+        entry = metrics.snapshot()['endpoints']['GET query']
+        assert entry['count'] == 2
+        assert entry['sql_statements'] == 4
+        assert entry['sql_seconds'] > 0
+        assert entry['status'] == {'200': 2}
+
+    def test_json_reads_and_writes_counted(self, app, metrics):
+        app.test_client().get('/json/x.json')
+
+        entry = metrics.snapshot()['endpoints']['GET json_io']
+        assert entry['json_writes'] == 1
+        assert entry['json_reads'] == 1
+
+    def test_counts_outside_request_are_ignored(self, metrics):
+        from app.utils.request_metrics import count, current_stats
+        count('sql_statements')
+        assert current_stats() is None
+        assert metrics.snapshot()['endpoints'] == {}
+
+    def test_histogram_buckets_are_cumulative(self, metrics):
+        metrics.begin()
+        metrics.end('ep', 'GET', 200, 0.03)
+        metrics.begin()
+        metrics.end('ep', 'GET', 500, 3.0)
+
+        entry = metrics.snapshot()['endpoints']['GET ep']
+        buckets = dict(zip(metrics.buckets, entry['buckets']))
+        assert buckets[0.025] == 0
+        assert buckets[0.05] == 1
+        assert buckets[2.5] == 1
+        assert buckets[5.0] == 2
+        assert entry['status'] == {'200': 1, '500': 1}
+
+    def test_slow_request_logged_with_breakdown(self, app, caplog):
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr('app.utils.request_metrics.SLOW_REQUEST_MS', 0)
+            with caplog.at_level('WARNING', logger='app.utils.request_metrics'):
+                app.test_client().get('/query')
+
+        message = next(r.getMessage() for r in caplog.records if 'Slow request' in r.getMessage())
+        assert 'GET /query (query)' in message
+        assert 'sql_statements=2' in message
+
+
+class TestInstrumentedClient:
+
+    def test_counts_only_execute_on_builder_api(self):
+        from app.utils.request_metrics import InstrumentedClient, RequestMetrics, current_stats
+
+        class Request:
+            def execute(self):
+                return {'items': []}
+
+        class Events:
+            def list(self, **kwargs):
+                return Request()
+
+        class Service:
+            def events(self):
+                return Events()
+
+        service = InstrumentedClient(Service(), 'calendar_calls',
+                                     count_if=lambda name: name == 'execute', wrap_results=True)
+        RequestMetrics().begin()
+        assert service.events().list(calendarId='x').execute() == {'items': []}
+        service.events().list(calendarId='y')
+        assert current_stats() == {'calendar_calls': 1}
+
+    def test_counts_leaf_calls_on_nested_client(self):
+        from app.utils.request_metrics import InstrumentedClient, RequestMetrics, current_stats
+
+        class BasicApi:
+            def get_page(self, limit=10):
+                return ['deal']
+
+        class Deals:
+            basic_api = BasicApi()
+
+        class Crm:
+            deals = Deals()
+
+        class Client:
+            crm = Crm()
+
+        client = InstrumentedClient(Client(), 'hubspot_calls')
+        RequestMetrics().begin()
+        assert client.crm.deals.basic_api.get_page(limit=5) == ['deal']
+        client.crm.deals.basic_api.get_page()
+        assert current_stats() == {'hubspot_calls': 2}
+
+
+class TestAggregation:
+
+    def test_merges_worker_snapshots(self, metrics, tmp_path):
+        metrics.begin()
+        metrics.end('ep', 'GET', 200, 0.01)
+
+        other = metrics.snapshot()
+        other['pid'] = 999999
+        other['endpoints']['GET ep']['sql_statements'] = 7
+        (tmp_path / 'worker-999999.json').write_text(json.dumps(other))
+
+        merged = metrics.aggregate()['endpoints']['GET ep']
+        assert merged['count'] == 2
+        assert merged['sql_statements'] == 7
+        assert merged['status'] == {'200': 2}
+
+    def test_sync_writes_own_snapshot(self, metrics, tmp_path):
+        metrics.begin()
+        metrics.end('ep', 'POST', 201, 0.2)
+        metrics.sync()
+
+        data = json.loads((tmp_path / f'worker-{os.getpid()}.json').read_text())
+        assert data['endpoints']['POST ep']['count'] == 1
+        # Own snapshot is not counted twice
+        assert metrics.aggregate()['endpoints']['POST ep']['count'] == 1
+
+    def test_prometheus_text_format(self, app, metrics):
+        client = app.test_client()
+        client.get('/query')
+        client.get('/missing')
+
+        body = metrics.render_prometheus()
+        assert '# TYPE http_request_duration_seconds histogram' in body
+        assert 'http_request_duration_seconds_bucket{endpoint="query",method="GET",le="+Inf"} 1' in body
+        assert 'http_requests_total{endpoint="missing",method="GET",status="404"} 1' in body
+        assert 'sql_statements_total{endpoint="query",method="GET"} 2' in body
+        assert body.endswith('\n')
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Service Layer Tests - Startup Tasks
+Tests for the once/deferred/cli startup task runner used by init_extensions.
+"""
+
+import multiprocessing
+import time
+import pytest
+from unittest.mock import patch
+
+
+def _runner(tmp_path, **kwargs):
+    from app.core.startup_tasks import StartupTaskRunner
+    kwargs.setdefault('deploy_id', 'deploy-1')
+    return StartupTaskRunner(state_dir=tmp_path, **kwargs)
+
+
+def _worker_boot(state_dir, counter_path, barrier):
+    """Simulated Gunicorn worker: registers one slow once-task and boots."""
+    from app.core.startup_tasks import StartupTaskRunner, MODE_ONCE
+
+    def task():
+        with open(counter_path, 'a') as f:
+            f.write('x')
+        time.sleep(0.2)
+
+    runner = StartupTaskRunner(state_dir=state_dir, deploy_id='deploy-1')
+    runner.register('bootstrap', task, MODE_ONCE)
+    barrier.wait()
+    runner.run_boot()
+
+
+class TestOnce:
+
+    def test_runs_once_per_deploy(self, tmp_path):
+        from app.core.startup_tasks import MODE_ONCE
+        calls = []
+
+        first = _runner(tmp_path)
+        first.register('bootstrap', lambda: calls.append(1), MODE_ONCE)
+        first.run_boot()
+
+        second = _runner(tmp_path)
+        second.register('bootstrap', lambda: calls.append(2), MODE_ONCE)
+        second.run_boot()
+
+        assert calls == [1]
+        assert second.report()['tasks'][0]['status'] == 'skipped'
+
+    def test_new_deploy_runs_again(self, tmp_path):
+        from app.core.startup_tasks import MODE_ONCE
+        calls = []
+        for deploy in ('deploy-1', 'deploy-2'):
+            runner = _runner(tmp_path, deploy_id=deploy)
+            runner.register('bootstrap', lambda: calls.append(deploy), MODE_ONCE)
+            runner.run_boot()
+
+        assert calls == ['deploy-1', 'deploy-2']
+
+    def test_failure_is_retried_by_next_worker(self, tmp_path):
+        from app.core.startup_tasks import MODE_ONCE
+
+        def boom():
+            raise RuntimeError('disk full')
+
+        first = _runner(tmp_path)
+        first.register('cleanup', boom, MODE_ONCE)
+        first.run_boot()
+        result = first.report()['tasks'][0]
+        assert result['status'] == 'failed'
+        assert result['error'] == 'disk full'
+
+        calls = []
+        second = _runner(tmp_path)
+        second.register('cleanup', lambda: calls.append(1), MODE_ONCE)
+        second.run_boot()
+        assert calls == [1]
+
+    def test_concurrent_workers_run_task_once(self, tmp_path):
+        """Losers wait for the winner and then skip; the task ran exactly once."""
+        ctx = multiprocessing.get_context('fork')
+        counter = tmp_path / 'count'
+        barrier = ctx.Barrier(4)
+        workers = [
+            ctx.Process(target=_worker_boot, args=(tmp_path, str(counter), barrier))
+            for _ in range(4)
+        ]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join(10)
+
+        assert all(w.exitcode == 0 for w in workers)
+        assert counter.read_text() == 'x'
+
+
+class TestDeferred:
+
+    def test_deferred_runs_in_background(self, tmp_path):
+        from app.core.startup_tasks import MODE_DEFERRED
+        runner = _runner(tmp_path, defer_delay=0)
+        calls = []
+        runner.register('integrity', lambda: calls.append(1), MODE_DEFERRED)
+
+        runner.run_boot()
+        runner._deferred_thread.join(5)
+
+        assert calls == [1]
+        assert runner.report()['tasks'][0]['status'] == 'ok'
+
+    def test_deferred_skipped_while_other_worker_runs_it(self, tmp_path):
+        from app.core.startup_tasks import MODE_DEFERRED
+        from app.utils.file_lock import file_lock
+        runner = _runner(tmp_path)
+        calls = []
+        runner.register('integrity', lambda: calls.append(1), MODE_DEFERRED)
+
+        # Another worker holds the task lock
+        with file_lock(str(tmp_path / 'integrity')):
+            result = _run_from_other_thread(runner, 'integrity')
+
+        assert calls == []
+        assert result['status'] == 'skipped'
+        assert result['reason'] == 'running in another worker'
+
+
+def _run_from_other_thread(runner, name):
+    """Run a task from a second thread (flock is per open file, so it conflicts)."""
+    import threading
+    out = {}
+    t = threading.Thread(target=lambda: out.update(runner.run_task(name, wait=False)))
+    t.start()
+    t.join(5)
+    return out
+
+
+class TestCliAndReport:
+
+    def test_cli_tasks_not_run_at_boot(self, tmp_path):
+        from app.core.startup_tasks import MODE_CLI, MODE_ONCE
+        runner = _runner(tmp_path)
+        calls = []
+        runner.register('integrity', lambda: calls.append('cli'), MODE_CLI)
+        runner.register('bootstrap', lambda: calls.append('once'), MODE_ONCE)
+
+        runner.run_boot()
+        assert calls == ['once']
+
+        results = runner.run_cli()
+        assert calls == ['once', 'cli']
+        assert results[0]['status'] == 'ok'
+
+    def test_cli_force_reruns_once_task(self, tmp_path):
+        from app.core.startup_tasks import MODE_ONCE
+        runner = _runner(tmp_path)
+        calls = []
+        runner.register('bootstrap', lambda: calls.append(1), MODE_ONCE)
+        runner.run_boot()
+
+        runner.run_cli(['bootstrap'], force=True)
+        assert calls == [1, 1]
+
+        with pytest.raises(KeyError):
+            runner.run_cli(['missing'])
+
+    def test_env_override_moves_task_to_cli(self, tmp_path, monkeypatch):
+        from app.core.startup_tasks import MODE_DEFERRED
+        monkeypatch.setenv('STARTUP_TASK_MODES', 'integrity=cli, bogus=sometimes')
+        runner = _runner(tmp_path)
+        runner.register('integrity', lambda: None, MODE_DEFERRED)
+
+        assert runner.task_names('cli') == ['integrity']
+
+    def test_app_registers_maintenance_for_timer(self, app):
+        """scripts/run_startup_tasks.py ohne Argumente (systemd-Timer) fuehrt die cli-Tasks aus"""
+        from app.core.startup_tasks import startup_runner, MODE_CLI, MODE_ONCE
+
+        cli_tasks = startup_runner.task_names(MODE_CLI)
+        for name in ('auto_cleanup_backups', 'validate_data_integrity', 'validate_scores_integrity',
+                     'sweep_finanz_partial_uploads'):
+            assert name in cli_tasks
+        assert startup_runner.task_names(MODE_ONCE) == ['bootstrap_from_static', 'migrate_userlist_passwords']
+
+    def test_report_has_sections_and_durations(self, tmp_path):
+        from app.core.startup_tasks import MODE_ONCE
+        runner = _runner(tmp_path)
+        with runner.timed('tracking_system'):
+            time.sleep(0.01)
+        runner.register('bootstrap', lambda: time.sleep(0.01), MODE_ONCE)
+        runner.run_boot()
+
+        report = runner.report()
+        assert report['sections'][0]['section'] == 'tracking_system'
+        assert report['boot_total_ms'] >= 10
+        assert report['tasks'][0]['duration_ms'] >= 10
+
+    def test_disabled_runs_nothing(self, tmp_path):
+        from app.core.startup_tasks import MODE_ONCE
+        runner = _runner(tmp_path)
+        calls = []
+        runner.register('bootstrap', lambda: calls.append(1), MODE_ONCE)
+
+        with patch('app.core.startup_tasks.STARTUP_TASKS_ENABLED', False):
+            runner.run_boot()
+
+        assert calls == []
+        assert runner.report()['tasks'][0]['status'] == 'pending'
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Service Layer Tests - Streaming Exports
+Tests for the CSV/ZIP/XLSX generators and the streamed booking export.
+"""
+
+import io
+import os
+import csv
+import zipfile
+import tracemalloc
+import pytest
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from unittest.mock import patch, MagicMock, Mock
+
+
+@pytest.fixture(scope='module', autouse=True)
+def mock_google_credentials():
+    """Mock Google credentials to prevent loading during module import"""
+    with patch('app.utils.credentials.load_google_credentials', return_value=Mock()):
+        yield
+
+
+class TestIterCsv:
+
+    def test_chunks_join_to_full_csv(self):
+        from app.utils.streaming_export import iter_csv
+        rows = ([i, f'name{i}'] for i in range(25))
+
+        chunks = list(iter_csv(rows, header=['id', 'name'], delimiter=';', flush_every=10))
+
+        assert len(chunks) == 3
+        parsed = list(csv.reader(io.StringIO(''.join(chunks)), delimiter=';'))
+        assert parsed[0] == ['id', 'name']
+        assert parsed[-1] == ['24', 'name24']
+        assert len(parsed) == 26
+
+    def test_empty_without_header(self):
+        from app.utils.streaming_export import iter_csv
+        assert list(iter_csv([])) == []
+
+
+class TestIterZip:
+
+    def test_round_trip(self, tmp_path):
+        from app.utils.streaming_export import iter_zip
+        (tmp_path / 'sub').mkdir()
+        a = tmp_path / 'a.json'
+        b = tmp_path / 'sub' / 'b.json'
+        a.write_text('{"a": 1}')
+        b.write_bytes(os.urandom(300_000))
+
+        data = b''.join(iter_zip([(str(a), 'a.json'), (str(b), 'sub/b.json')], chunk_size=4096))
+
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            assert zf.testzip() is None
+            assert zf.read('a.json') == b'{"a": 1}'
+            assert zf.read('sub/b.json') == b.read_bytes()
+
+    def test_missing_file_skipped(self, tmp_path):
+        from app.utils.streaming_export import iter_zip
+        a = tmp_path / 'a.json'
+        a.write_text('{}')
+
+        data = b''.join(iter_zip([(str(tmp_path / 'gone.json'), 'gone.json'), (str(a), 'a.json')]))
+
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            assert zf.namelist() == ['a.json']
+
+
+class TestIterWorkbook:
+
+    def test_write_only_workbook_streams_and_cleans_up(self):
+        pytest.importorskip('openpyxl')
+        from openpyxl import load_workbook
+        from app.utils.streaming_export import iter_workbook
+
+        def build(wb):
+            ws = wb.create_sheet('Daten')
+            ws.append(['Datum', 'Termine'])
+            for i in range(100):
+                ws.append([f'2026-01-{i % 28 + 1:02d}', i])
+
+        with patch('app.utils.streaming_export.os.unlink', wraps=os.unlink) as unlink:
+            data = b''.join(iter_workbook(build, chunk_size=1024))
+            temp_path = unlink.call_args[0][0]
+
+        assert not os.path.exists(temp_path)
+        ws = load_workbook(io.BytesIO(data), read_only=True)['Daten']
+        rows = list(ws.values)
+        assert rows[0] == ('Datum', 'Termine')
+        assert len(rows) == 101
+
+
+# ========== BOOKING EXPORT ==========
+
+ROW_COUNT = 100_000
+
+
+@pytest.fixture
+def large_booking_table(db_session):
+    """Booking table with 100k rows (bulk insert via Core)."""
+    from app.models.booking import Booking
+    start = date(2025, 1, 1)
+    stamp = datetime(2025, 1, 1, 9, 0)
+    rows = [
+        {
+            'booking_id': f'b{i}', 'customer': f'Kunde {i}',
+            'date': start + timedelta(days=i % 365), 'time': '14:00',
+            'weekday': 'Monday', 'week_number': 1, 'username': f'user{i % 20}',
+            'potential_type': 'normal', 'color_id': '9', 'description_length': 0,
+            'has_description': False, 'booking_lead_time': 1, 'booked_at_hour': 10,
+            'booked_on_weekday': 'Monday', 'booking_timestamp': stamp,
+            'created_at': stamp, 'updated_at': stamp,
+        }
+        for i in range(ROW_COUNT)
+    ]
+    db_session.execute(Booking.__table__.insert(), rows)
+    del rows
+    return db_session
+
+
+def _session_scope(session):
+    @contextmanager
+    def scope():
+        yield session
+    return scope
+
+
+class TestStreamedBookingExport:
+
+    def test_iter_all_bookings_json_fallback(self, tmp_path):
+        from app.services.tracking_system.historical import iter_all_bookings
+        bookings_file = tmp_path / 'bookings.jsonl'
+        bookings_file.write_text('{"user": "a"}\nnot-json\n\n{"user": "b"}\n')
+        tracker = MagicMock(bookings_file=str(bookings_file))
+
+        with patch('app.services.tracking_system.historical.is_postgres_enabled', return_value=False):
+            assert [b['user'] for b in iter_all_bookings(tracker)] == ['a', 'b']
+
+    def test_peak_memory_bounded_on_100k_rows(self, large_booking_table):
+        """Streaming CSV of 100k bookings never holds the export in memory."""
+        from app.services.tracking_system.historical import iter_all_bookings
+        from app.utils.streaming_export import iter_csv
+
+        tracker = MagicMock(bookings_file='/nonexistent')
+        with patch('app.services.tracking_system.historical.is_postgres_enabled', return_value=True), \
+             patch('app.utils.db_utils.db_session_scope_no_commit', _session_scope(large_booking_table)):
+            rows = ([b['date'], b['time'], b['customer'], b['user']] for b in iter_all_bookings(tracker))
+
+            total_bytes = 0
+            row_lines = 0
+            tracemalloc.start()
+            try:
+                for chunk in iter_csv(rows, header=['Date', 'Time', 'Customer', 'User']):
+                    total_bytes += len(chunk)
+                    row_lines += chunk.count('\n')
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+        assert row_lines == ROW_COUNT + 1
+        # Full CSV is several MB; peak is bounded by one keyset page
+        assert total_bytes > 3 * 1024 * 1024
+        assert peak < total_bytes / 2
+
+    def test_pg_pages_use_short_lived_sessions(self, db_session):
+        """Each keyset page opens and closes its own session; none stays open while yielding."""
+        from app.models.booking import Booking
+        from app.services.tracking_system.historical import iter_all_bookings
+
+        stamp = datetime(2025, 1, 1, 9, 0)
+        db_session.execute(Booking.__table__.insert(), [
+            {
+                'booking_id': f'k{i}', 'customer': f'Kunde {i}',
+                'date': date(2025, 1, 1 + i // 2), 'time': '14:00',
+                'weekday': 'Monday', 'week_number': 1, 'username': 'user',
+                'potential_type': 'normal', 'color_id': '9', 'description_length': 0,
+                'has_description': False, 'booking_lead_time': 1, 'booked_at_hour': 10,
+                'booked_on_weekday': 'Monday', 'booking_timestamp': stamp,
+                'created_at': stamp, 'updated_at': stamp,
+            }
+            for i in range(7)
+        ])
+
+        open_sessions = []
+        opened = []
+
+        @contextmanager
+        def tracking_scope():
+            open_sessions.append(1)
+            opened.append(1)
+            try:
+                yield db_session
+            finally:
+                open_sessions.pop()
+
+        tracker = MagicMock(bookings_file='/nonexistent')
+        with patch('app.services.tracking_system.historical.is_postgres_enabled', return_value=True), \
+             patch('app.utils.db_utils.db_session_scope_no_commit', tracking_scope):
+            seen = []
+            gen = iter_all_bookings(tracker, batch_size=3)
+            for booking in gen:
+                assert open_sessions == []
+                seen.append(booking['customer'])
+
+            assert sorted(seen) == sorted(f'Kunde {i}' for i in range(7))
+            assert len(seen) == len(set(seen))
+            assert len(opened) == 3
+
+            # Client bricht ab: keine Session bleibt offen
+            gen = iter_all_bookings(tracker, batch_size=3)
+            next(gen)
+            gen.close()
+            assert open_sessions == []
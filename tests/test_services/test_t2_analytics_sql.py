@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Tests fuer die SQL-Pfade der T2-Analytics (app/services/t2_analytics_service.py).
+
+Testet:
+- Gleiche Ergebnisse aus SQL (GROUP BY / gefilterte Queries) und JSON-Fallback
+  ueber einen gesetzten Zufallsdatensatz
+- JSON-Fallback liest pro User ueber den Sidecar-Index statt der Gesamthistorie
+- Suche mit LIKE-Sonderzeichen
+"""
+
+import json
+import random
+import pytest
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from unittest.mock import Mock, patch
+
+from freezegun import freeze_time
+
+NOW = "2026-03-18 14:30:00"
+USERS = ["anna.schmidt", "max.muster", "tim.kreisel"]
+CLOSERS = ["Alex", "David", "Jose", "Christian"]
+CUSTOMERS = ["Müller GmbH", "Schmidt & Söhne", "100%_Bau", "Meier", None]
+
+
+@pytest.fixture(scope='module', autouse=True)
+def mock_google_credentials():
+    """Mock Google credentials to prevent loading during module import"""
+    with patch('app.utils.credentials.load_google_credentials', return_value=Mock()):
+        yield
+
+
+@pytest.fixture
+def seeded(tmp_path):
+    """Gleicher Datensatz in SQLite (PG-Pfad) und in den JSON-Dateien"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.models.base import Base
+    from app.models import T2DrawHistory, T2Booking
+
+    engine = create_engine(f"sqlite:///{tmp_path / 't2.db'}")
+    Base.metadata.create_all(engine, tables=[T2DrawHistory.__table__, T2Booking.__table__])
+    Session = sessionmaker(bind=engine)
+
+    rng = random.Random(2026)
+    start = datetime(2025, 11, 1, 8, 0)
+    session = Session()
+    for _ in range(600):
+        session.add(T2DrawHistory(
+            username=rng.choice(USERS),
+            closer_drawn=rng.choice(CLOSERS),
+            draw_type=rng.choice(["T2", "T2", "T3"]),
+            customer_name=rng.choice(CUSTOMERS),
+            bucket_size_after=rng.randint(0, 20),
+            probability_after=rng.choice([1.0, 4.5, 9.0]),
+            drawn_at=start + timedelta(minutes=rng.randint(0, 137 * 24 * 60)),
+        ))
+    for n in range(400):
+        booking_day = date(2026, 1, 1) + timedelta(days=rng.randint(0, 100))
+        session.add(T2Booking(
+            booking_id=f"T2-{n:06d}",
+            coach=rng.choice(CLOSERS),
+            berater=rng.choice(CLOSERS),
+            customer=rng.choice(CUSTOMERS[:-1]),
+            date=booking_day,
+            time="14:00",
+            user=rng.choice(USERS),
+            status=rng.choice(["active", "active", "active", "cancelled", "rescheduled"]),
+            created_at=datetime.combine(booking_day, datetime.min.time()) - timedelta(days=rng.randint(0, 10)),
+        ))
+    session.commit()
+
+    # JSON-Spiegel: Draws aufgeteilt in Legacy-Array + JSONL, Buchungen als Dokument
+    draws = [d.to_dict() for d in session.query(T2DrawHistory).order_by(
+        T2DrawHistory.drawn_at, T2DrawHistory.id)]
+    bookings = [b.to_dict() for b in session.query(T2Booking).order_by(T2Booking.id)]
+    session.close()
+
+    bucket_file = tmp_path / "t2_bucket_system.json"
+    bucket_file.write_text(json.dumps({"draw_history": draws[:150]}), encoding="utf-8")
+    with open(tmp_path / "t2_draw_history.jsonl", "w", encoding="utf-8") as f:
+        for draw in draws[150:]:
+            f.write(json.dumps(draw, ensure_ascii=False) + "\n")
+    bookings_file = tmp_path / "t2_bookings.json"
+    bookings_file.write_text(json.dumps({"bookings": bookings}), encoding="utf-8")
+
+    @contextmanager
+    def session_scope():
+        s = Session()
+        try:
+            yield s
+        finally:
+            s.close()
+
+    with patch('app.services.t2_bucket_system.BUCKET_FILE', str(bucket_file)), \
+            patch('app.services.t2_bucket_system.USE_POSTGRES', False), \
+            patch('app.services.t2_analytics_service.T2_BOOKINGS_FILE', str(bookings_file)), \
+            patch('app.services.t2_analytics_service.TRACKING_BOOKINGS_FILE', str(tmp_path / "bookings.jsonl")), \
+            patch('app.services.t2_analytics_service.db_session_scope_no_commit', session_scope):
+        yield {"draws": draws, "bookings": bookings, "tmp_path": tmp_path}
+
+
+@pytest.fixture
+def service(seeded):
+    from app.services.t2_analytics_service import T2AnalyticsService
+    svc = T2AnalyticsService()
+    svc.data_persistence = type("Persistence", (), {
+        "load_data": staticmethod(lambda name, default=None: {"bookings": seeded["bookings"]})
+    })()
+    return svc
+
+
+def both(method, *args, **kwargs):
+    """Ergebnis über SQL und über den JSON-Fallback"""
+    with freeze_time(NOW, tz_offset=-1):
+        with patch('app.services.t2_analytics_service.is_postgres_enabled', return_value=True):
+            sql = method(*args, **kwargs)
+        with patch('app.services.t2_analytics_service.is_postgres_enabled', return_value=False):
+            fallback = method(*args, **kwargs)
+    return sql, fallback
+
+
+class TestEquivalence:
+
+    @pytest.mark.parametrize("username", USERS + ["unbekannt"])
+    def test_draw_stats(self, service, username):
+        sql, fallback = both(service.get_user_draw_stats, username)
+
+        assert sql == fallback
+        if username != "unbekannt":
+            assert sql["total_draws"] > 100
+            assert 0 < sql["this_month"] < sql["total_draws"]
+            assert sql["this_week"] <= sql["this_month"]
+
+    @pytest.mark.parametrize("query", ["müller", "SCHMIDT &", "100%_", "alex", "", "xyz"])
+    def test_search(self, service, query):
+        sql, fallback = both(service.search_draws, "max.muster", query)
+
+        assert sql == fallback
+
+    @pytest.mark.parametrize("days", [7, 30, 90])
+    def test_timeline(self, service, days):
+        sql, fallback = both(service.get_draw_timeline_data, "anna.schmidt", days)
+
+        assert sql == fallback
+        # total_draws zählt ab dem Cutoff-Zeitpunkt, die Kurve erst ab dem Folgetag
+        assert sql["total_draws"] >= sum(sql["counts"]) > 0
+
+    def test_combined_stats(self, service):
+        sql, fallback = both(service.get_combined_user_stats, "tim.kreisel")
+
+        assert sql == fallback
+        assert sql["t2_bookings"]["total"] == sum(
+            1 for b in service.data_persistence.load_data("t2_bookings")["bookings"] if b["user"] == "tim.kreisel")
+
+    def test_2h_booking_analytics(self, service):
+        sql, fallback = both(service.get_2h_booking_analytics, date(2026, 1, 15), date(2026, 3, 31))
+
+        assert sql == fallback
+        overall = sql["overall"]
+        assert overall["total_bookings"] == sum(s["total"] for s in sql["berater_stats"].values())
+        assert overall["total_cancelled"] > 0 and overall["total_rescheduled"] > 0
+
+    def test_search_escapes_like_wildcards(self, service):
+        sql, _ = both(service.search_draws, "max.muster", "100%_")
+
+        assert sql and all(d["customer_name"] == "100%_Bau" for d in sql)
+
+
+class TestJsonUserIndex:
+
+    def test_user_history_matches_full_history(self, seeded):
+        from app.services.t2_bucket_system import load_draw_history
+        full = load_draw_history()
+
+        for user in USERS:
+            assert load_draw_history(username=user) == [d for d in full if d["user"] == user]
+        assert load_draw_history(username="anna.schmidt", limit=3) == \
+            [d for d in full if d["user"] == "anna.schmidt"][-3:]
+
+    def test_only_user_lines_are_decoded(self, seeded):
+        from app.services import t2_bucket_system as t2
+        t2.load_draw_history(username="anna.schmidt")  # Index aufbauen
+
+        decoded = []
+        real_loads = json.loads
+        with patch('app.services.tracking_system.booking_store.json.loads',
+                   side_effect=lambda raw: decoded.append(1) or real_loads(raw)):
+            history = t2.load_draw_history(username="anna.schmidt")
+
+        jsonl_draws = [d for d in seeded["draws"][150:] if d["user"] == "anna.schmidt"]
+        assert len(decoded) == len(jsonl_draws)
+        assert len(history) > len(jsonl_draws)
+
+    def test_appended_draw_is_indexed(self, seeded):
+        from app.services import t2_bucket_system as t2
+        before = t2.load_draw_history(username="tim.kreisel")
+
+        t2._append_history_json({"user": "tim.kreisel", "closer": "Alex", "draw_type": "T2",
+                                 "customer_name": "Neu", "timestamp": "2026-03-18T14:00:00+01:00"})
+
+        after = t2.load_draw_history(username="tim.kreisel")
+        assert after[:-1] == before
+        assert after[-1]["customer_name"] == "Neu"
+        assert (seeded["tmp_path"] / "t2_draw_history.jsonl.idx").exists()
@@ -19,13 +19,21 @@ def mock_google_credentials():
         yield
 
 
+@pytest.fixture(autouse=True)
+def isolated_bucket_file(tmp_path):
+    """Keep lock files and the draw history JSONL out of the real data dir"""
+    with patch('app.services.t2_bucket_system.DATA_DIR', str(tmp_path)):
+        with patch('app.services.t2_bucket_system.BUCKET_FILE', str(tmp_path / 't2_bucket_system.json')):
+            yield tmp_path
+
+
 @pytest.fixture
 def mock_bucket_data():
     """Mock T2 Bucket State with 3 Closers"""
     return {
         "probabilities": {"Alex": 9.0, "David": 9.0, "Jose": 2.0},
         "default_probabilities": {"Alex": 9.0, "David": 9.0, "Jose": 2.0},
-        "bucket": ["Alex"]*9 + ["David"]*9 + ["Jose"]*2,
+        "bucket_counts": {"Alex": 9, "David": 9, "Jose": 2},
         "total_draws": 0,
         "stats": {"Alex": 0, "David": 0, "Jose": 0},
         "user_last_draw": {},
@@ -70,7 +78,7 @@ class TestDrawCloser:
         # GIVEN: Alex drawn
         with patch('app.services.t2_bucket_system.load_bucket_data', return_value=mock_bucket_data.copy()):
             with patch('app.services.t2_bucket_system.save_bucket_data') as mock_save:
-                with patch('random.choice', return_value='Alex'):
+                with patch('app.services.t2_bucket_system._pick_weighted', return_value='Alex'):
                     initial_prob = mock_bucket_data['probabilities']['Alex']
 
                     draw_closer(username='test.user', draw_type='T2')
@@ -85,13 +93,13 @@ class TestDrawCloser:
 
         with patch('app.services.t2_bucket_system.load_bucket_data', return_value=mock_bucket_data.copy()):
             with patch('app.services.t2_bucket_system.save_bucket_data') as mock_save:
-                initial_size = len(mock_bucket_data['bucket'])
+                initial_size = sum(mock_bucket_data['bucket_counts'].values())
 
                 draw_closer(username='test.user', draw_type='T2')
 
                 # THEN: Bucket size decreased by 1
                 saved_data = mock_save.call_args[0][0]
-                assert len(saved_data['bucket']) == initial_size - 1
+                assert sum(saved_data['bucket_counts'].values()) == initial_size - 1
 
     def test_draw_closer_stats_increment(self, mock_bucket_data, mock_postgres):
         """Test stats counter increments for drawn closer"""
@@ -99,7 +107,7 @@ class TestDrawCloser:
 
         with patch('app.services.t2_bucket_system.load_bucket_data', return_value=mock_bucket_data.copy()):
             with patch('app.services.t2_bucket_system.save_bucket_data') as mock_save:
-                with patch('random.choice', return_value='Alex'):
+                with patch('app.services.t2_bucket_system._pick_weighted', return_value='Alex'):
                     draw_closer(username='test.user', draw_type='T2')
 
                     # THEN: Alex's draw count incremented
@@ -112,7 +120,7 @@ class TestDrawCloser:
         from app.services.t2_bucket_system import draw_closer
 
         # GIVEN: Bucket with only 1 ticket
-        mock_bucket_data['bucket'] = ['Alex']
+        mock_bucket_data['bucket_counts'] = {'Alex': 1, 'David': 0, 'Jose': 0}
         mock_bucket_data['total_draws'] = 19
 
         with patch('app.services.t2_bucket_system.load_bucket_data', return_value=mock_bucket_data.copy()):
@@ -121,7 +129,7 @@ class TestDrawCloser:
 
                 # THEN: Bucket reset (should have 20 tickets again)
                 saved_data = mock_save.call_args[0][0]
-                assert len(saved_data['bucket']) == 20
+                assert sum(saved_data['bucket_counts'].values()) == 20
                 assert saved_data['total_draws'] == 0
 
     def test_draw_closer_max_draws_auto_reset(self, mock_bucket_data, mock_postgres):
@@ -130,7 +138,7 @@ class TestDrawCloser:
 
         # GIVEN: 19 draws completed, bucket has tickets
         mock_bucket_data['total_draws'] = 19
-        mock_bucket_data['bucket'] = ['Alex'] * 10
+        mock_bucket_data['bucket_counts'] = {'Alex': 10}
 
         with patch('app.services.t2_bucket_system.load_bucket_data', return_value=mock_bucket_data.copy()):
             with patch('app.services.t2_bucket_system.save_bucket_data') as mock_save:
@@ -154,7 +162,7 @@ class TestDrawCloser:
 
         with patch('app.services.t2_bucket_system.load_bucket_data', return_value=mock_bucket_data.copy()):
             with patch('app.services.t2_bucket_system.save_bucket_data') as mock_save:
-                with patch('random.choice', return_value='David'):
+                with patch('app.services.t2_bucket_system._pick_weighted', return_value='David'):
                     draw_closer(username='test.user', draw_type='T2', customer_name='Test Customer')
 
                     # THEN: User's last draw recorded
@@ -172,14 +180,15 @@ class TestDrawCloser:
                 with patch('app.services.t2_bucket_system.load_bucket_data', return_value=mock_bucket_data.copy()):
                     with patch('app.services.t2_bucket_system.save_bucket_data'):
                         with patch('app.services.t2_bucket_system.get_db_session') as mock_session:
-                            session = MagicMock()
-                            mock_session.return_value.__enter__.return_value = session
+                            # No bucket state row yet: draw runs on JSON and seeds PG via save_bucket_data
+                            session = mock_session.return_value
+                            session.query.return_value.filter_by.return_value.first.return_value = None
 
                             result = draw_closer(username='test.user', draw_type='T2')
 
                             # THEN: PostgreSQL session used
                             assert result['success'] is True
-                            # Session interaction depends on implementation
+                            session.query.assert_called()
 
 
 @pytest.mark.service
@@ -387,7 +396,7 @@ class TestProbabilityManagement:
 
                 # THEN: Bucket rebuilt (Alex now has 5 tickets)
                 saved_data = mock_save.call_args[0][0]
-                alex_count = saved_data['bucket'].count('Alex')
+                alex_count = saved_data['bucket_counts']['Alex']
                 assert alex_count == 5
 
     def test_update_probability_resets_draw_counter(self, mock_bucket_data, mock_postgres):
@@ -451,7 +460,7 @@ class TestBucketReset:
         from app.services.t2_bucket_system import reset_bucket
 
         # GIVEN: Half-empty bucket
-        mock_bucket_data['bucket'] = ['Alex'] * 5
+        mock_bucket_data['bucket_counts'] = {'Alex': 5}
 
         with patch('app.services.t2_bucket_system.load_bucket_data', return_value=mock_bucket_data.copy()):
             with patch('app.services.t2_bucket_system.save_bucket_data') as mock_save:
@@ -460,7 +469,5 @@ class TestBucketReset:
 
                 # THEN: Full bucket (9+9+2 = 20 tickets)
                 saved_data = mock_save.call_args[0][0]
-                assert len(saved_data['bucket']) == 20
-                assert saved_data['bucket'].count('Alex') == 9
-                assert saved_data['bucket'].count('David') == 9
-                assert saved_data['bucket'].count('Jose') == 2
+                assert sum(saved_data['bucket_counts'].values()) == 20
+                assert saved_data['bucket_counts'] == {'Alex': 9, 'David': 9, 'Jose': 2}
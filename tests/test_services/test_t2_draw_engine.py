@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+Service Layer Tests - T2 Draw Engine
+Tests for the count-based weighted draw and the compare-and-swap PG path.
+"""
+
+import json
+import random
+import pytest
+from collections import Counter
+from datetime import datetime
+from unittest.mock import patch, Mock
+
+
+@pytest.fixture(scope='module', autouse=True)
+def mock_google_credentials():
+    """Mock Google credentials to prevent loading during module import"""
+    with patch('app.utils.credentials.load_google_credentials', return_value=Mock()):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def isolated_bucket_file(tmp_path):
+    with patch('app.services.t2_bucket_system.DATA_DIR', str(tmp_path)):
+        with patch('app.services.t2_bucket_system.BUCKET_FILE', str(tmp_path / 't2_bucket_system.json')):
+            yield tmp_path
+
+
+def _state(counts=None):
+    return {
+        "probabilities": {"Alex": 9.0, "David": 9.0, "Jose": 2.0},
+        "default_probabilities": {"Alex": 9.0, "David": 9.0, "Jose": 2.0},
+        "bucket_counts": dict(counts or {"Alex": 9, "David": 9, "Jose": 2}),
+        "stats": {},
+        "total_draws": 0,
+        "bucket_size_config": 20,
+    }
+
+
+@pytest.mark.service
+class TestWeightedSampling:
+
+    def test_first_draw_matches_ticket_share(self):
+        from app.services.t2_bucket_system import _pick_weighted
+        rng = random.Random(1234)
+        counts = {"Alex": 9, "David": 9, "Jose": 2}
+
+        n = 40000
+        freq = Counter(_pick_weighted(counts, rng) for _ in range(n))
+
+        assert freq["Alex"] / n == pytest.approx(0.45, abs=0.01)
+        assert freq["David"] / n == pytest.approx(0.45, abs=0.01)
+        assert freq["Jose"] / n == pytest.approx(0.10, abs=0.01)
+
+    def test_later_positions_have_same_marginals(self):
+        """Drawing without replacement: every position sees the initial shares."""
+        from app.services.t2_bucket_system import _apply_draw
+        rng = random.Random(99)
+        n = 8000
+        fifth = Counter()
+        for _ in range(n):
+            state = _state()
+            for _ in range(5):
+                info = _apply_draw(state, rng)
+            fifth[info["closer"]] += 1
+
+        assert fifth["Jose"] / n == pytest.approx(0.10, abs=0.015)
+        assert fifth["Alex"] / n == pytest.approx(0.45, abs=0.02)
+
+    def test_full_cycle_draws_each_ticket_once(self):
+        from app.services.t2_bucket_system import _apply_draw
+        state = _state()
+        drawn = Counter(_apply_draw(state, random.Random(7))["closer"] for _ in range(20))
+
+        assert drawn == {"Alex": 9, "David": 9, "Jose": 2}
+        # 20th draw resets the cycle
+        assert state["total_draws"] == 0
+        assert state["bucket_counts"] == {"Alex": 9, "David": 9, "Jose": 2}
+
+    def test_zero_tickets_never_drawn(self):
+        from app.services.t2_bucket_system import _pick_weighted
+        rng = random.Random(0)
+        counts = {"Alex": 0, "David": 3, "Jose": 0}
+
+        assert {_pick_weighted(counts, rng) for _ in range(200)} == {"David"}
+        assert _pick_weighted({"Alex": 0}, rng) is None
+
+    def test_seeded_draws_are_deterministic(self):
+        from app.services.t2_bucket_system import _apply_draw
+
+        def sequence(seed):
+            rng = random.Random(seed)
+            state = _state()
+            return [_apply_draw(state, rng)["closer"] for _ in range(15)]
+
+        assert sequence(42) == sequence(42)
+
+
+@pytest.mark.service
+class TestJsonDraw:
+
+    def test_history_appended_as_jsonl(self, isolated_bucket_file):
+        from app.services import t2_bucket_system as t2
+
+        with patch.object(t2, 'USE_POSTGRES', False):
+            for i in range(3):
+                assert t2.draw_closer(username=f'user{i}', draw_type='T2')['success'] is True
+
+            lines = (isolated_bucket_file / 't2_draw_history.jsonl').read_text().splitlines()
+            assert [json.loads(line)['user'] for line in lines] == ['user0', 'user1', 'user2']
+
+            doc = json.loads((isolated_bucket_file / 't2_bucket_system.json').read_text())
+            assert 'bucket' not in doc
+            assert sum(doc['bucket_counts'].values()) == 17
+            assert doc['draw_history'] == []
+            assert [d['user'] for d in t2.load_draw_history(limit=2)] == ['user1', 'user2']
+
+    def test_legacy_ticket_list_migrated(self, isolated_bucket_file):
+        from app.services import t2_bucket_system as t2
+        (isolated_bucket_file / 't2_bucket_system.json').write_text(json.dumps({
+            "probabilities": {"Alex": 9.0, "David": 9.0, "Jose": 2.0},
+            "bucket": ["Alex", "Alex", "Jose"],
+            "total_draws": 17,
+        }))
+
+        with patch.object(t2, 'USE_POSTGRES', False):
+            assert t2.load_bucket_data()['bucket_counts'] == {"Alex": 2, "Jose": 1}
+
+
+@pytest.fixture
+def pg_sessions(tmp_path):
+    """Real committing sessions on a file-backed SQLite database"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.models.base import Base
+    from app.models import T2CloserConfig, T2BucketState, T2DrawHistory, T2UserLastDraw
+
+    engine = create_engine(f"sqlite:///{tmp_path / 't2.db'}")
+    Base.metadata.create_all(engine, tables=[
+        T2CloserConfig.__table__, T2BucketState.__table__,
+        T2DrawHistory.__table__, T2UserLastDraw.__table__,
+    ])
+    Session = sessionmaker(bind=engine)
+
+    session = Session()
+    session.add(T2BucketState(
+        singleton_id=1,
+        probabilities={"Alex": 9.0, "David": 9.0, "Jose": 2.0},
+        bucket=[],
+        ticket_counts={"Alex": 9, "David": 9, "Jose": 2},
+        version=0,
+        total_draws=0,
+        stats={},
+        max_draws_before_reset=20,
+        last_reset=datetime.now(),
+    ))
+    session.commit()
+    session.close()
+
+    with patch('app.services.t2_bucket_system.USE_POSTGRES', True), \
+            patch('app.services.t2_bucket_system.POSTGRES_AVAILABLE', True), \
+            patch('app.services.t2_bucket_system.get_db_session', side_effect=Session):
+        yield Session
+
+    engine.dispose()
+
+
+@pytest.mark.service
+class TestPostgresDraw:
+
+    def _row(self, Session):
+        from app.models import T2BucketState
+        session = Session()
+        try:
+            return session.query(T2BucketState).filter_by(singleton_id=1).one()
+        finally:
+            session.close()
+
+    def test_draw_updates_row_and_history(self, pg_sessions, isolated_bucket_file):
+        from app.services import t2_bucket_system as t2
+        from app.models import T2DrawHistory, T2UserLastDraw
+
+        result = t2.draw_closer(username='alice', draw_type='T2', customer_name='Kunde')
+
+        assert result['success'] is True
+        row = self._row(pg_sessions)
+        assert row.version == 1
+        assert sum(row.ticket_counts.values()) == 19
+        assert row.stats == {result['closer']: 1}
+
+        session = pg_sessions()
+        assert session.query(T2DrawHistory).count() == 1
+        assert session.query(T2UserLastDraw).filter_by(username='alice').one().last_closer_drawn == result['closer']
+        session.close()
+
+        # Committed state is mirrored to the JSON backup
+        doc = json.loads((isolated_bucket_file / 't2_bucket_system.json').read_text())
+        assert doc['version'] == 1
+        assert doc['bucket_counts'] == row.ticket_counts
+        assert doc['user_last_draw']['alice']['closer'] == result['closer']
+        lines = (isolated_bucket_file / 't2_draw_history.jsonl').read_text().splitlines()
+        assert [json.loads(line)['user'] for line in lines] == ['alice']
+
+    def test_late_mirror_does_not_overwrite_newer_counts(self, pg_sessions, isolated_bucket_file):
+        from app.services import t2_bucket_system as t2
+
+        t2.draw_closer(username='alice', draw_type='T2')
+        t2.draw_closer(username='bob', draw_type='T2')
+        doc = json.loads((isolated_bucket_file / 't2_bucket_system.json').read_text())
+
+        stale = dict(_state(), last_reset=None)
+        t2._mirror_draw_json(stale, 1, {
+            "user": "carol", "closer": "Jose", "draw_type": "T2", "customer_name": None,
+            "timestamp": datetime.now().isoformat(), "bucket_size_after": 1, "probability_after": 1.0,
+        })
+
+        after = json.loads((isolated_bucket_file / 't2_bucket_system.json').read_text())
+        assert after['version'] == 2
+        assert after['bucket_counts'] == doc['bucket_counts']
+        assert 'carol' in after['user_last_draw']
+
+    def test_pg_failure_does_not_fall_back_to_json_draw(self, pg_sessions, isolated_bucket_file):
+        from app.services import t2_bucket_system as t2
+
+        with patch.object(t2, '_draw_pg', side_effect=RuntimeError('db down')), \
+                patch.object(t2, '_draw_json') as json_draw, \
+                patch.object(t2, 'save_bucket_data') as save:
+            result = t2.draw_closer(username='dave', draw_type='T2')
+
+        assert result['success'] is False
+        json_draw.assert_not_called()
+        save.assert_not_called()
+        assert self._row(pg_sessions).version == 0
+
+    def test_version_conflict_retries_on_fresh_state(self, pg_sessions):
+        from app.services import t2_bucket_system as t2
+        from app.models import T2BucketState, T2DrawHistory
+        real_apply = t2._apply_draw
+        calls = []
+
+        def concurrent_writer(state, rng):
+            if not calls:
+                # Another worker commits a draw between our read and our update
+                other = pg_sessions()
+                row = other.query(T2BucketState).filter_by(singleton_id=1).one()
+                row.ticket_counts = {"Alex": 8, "David": 9, "Jose": 2}
+                row.stats = {"Alex": 1}
+                row.total_draws = 1
+                row.version = 1
+                other.commit()
+                other.close()
+            calls.append(dict(state["bucket_counts"]))
+            return real_apply(state, rng)
+
+        with patch.object(t2, '_apply_draw', side_effect=concurrent_writer):
+            result = t2.draw_closer(username='bob', draw_type='T2')
+
+        assert result['success'] is True
+        assert len(calls) == 2
+        assert calls[1] == {"Alex": 8, "David": 9, "Jose": 2}
+
+        row = self._row(pg_sessions)
+        assert row.version == 2
+        assert row.total_draws == 2
+        assert sum(row.ticket_counts.values()) == 18
+
+        session = pg_sessions()
+        assert session.query(T2DrawHistory).count() == 1
+        session.close()
+
+    def test_timeout_read_from_user_row_without_state_load(self, pg_sessions):
+        from app.services import t2_bucket_system as t2
+
+        with patch.object(t2, 'load_bucket_data', side_effect=AssertionError('whole-state load')):
+            first = t2.draw_closer(username='carol', draw_type='T2')
+            second = t2.draw_closer(username='carol', draw_type='T2')
+
+        assert first['success'] is True
+        assert second['success'] is False
+        assert second['timeout_remaining'] > 0
+        assert self._row(pg_sessions).version == 1
+
+    def test_load_draw_history_from_table(self, pg_sessions):
+        from app.services import t2_bucket_system as t2
+
+        for user in ('a', 'b', 'c'):
+            t2.draw_closer(username=user, draw_type='T2')
+
+        assert [d['user'] for d in t2.load_draw_history(limit=2)] == ['b', 'c']